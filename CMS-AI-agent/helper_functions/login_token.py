@@ -27,6 +27,9 @@ from typing import Optional
 # Add parent directory for apis import
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from apis import generate_cms_token
+from shared_modules import add_dtoc_to_path
+add_dtoc_to_path()  # cms_client is shared with dToC
+from cms_client import CMS_CLIENT
 
 logger = logging.getLogger(__name__)
 
@@ -109,6 +112,10 @@ def login_and_get_headers(cms_url: str, profile_alias: str = "default") -> Optio
     token_data = login_and_get_token(cms_url=cms_url, profile_alias=profile_alias)
     if not token_data:
         return None
+    # Long downloads outlive the token; the shared client regenerates it on 401
+    CMS_CLIENT.register_token_refresher(
+        cms_url, lambda: extract_token(login_and_get_token(cms_url=cms_url, profile_alias=profile_alias))
+    )
     return get_auth_headers(token_data)
 
 
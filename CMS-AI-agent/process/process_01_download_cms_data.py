@@ -3,6 +3,8 @@ Process 01: Download CMS Data for Training
 
 Downloads CMS data (pages, VComponents, etc.) for AI training.
 For each site in login_token.json: fetches GetSiteVComponents and saves to output/{site_slug}/.
+VComponents are synced incrementally (vcomponent_sync.py): output/{site_slug}/vcomponent_store.json
+keeps the last list and its last-modified watermark, so later runs only pull what changed.
 Also supports full download with site_id (pages, template pages, categories).
 
 Usage:
@@ -36,15 +38,19 @@ from helper_functions.vcomponent_page import (
 )
 from apis import (
     get_active_pages_from_api_all,
-    GetAllVComponents,
+    GetVComponentPage,
     GetTemplatePageByName,
     GetPageCategoryList,
 )
+from shared_modules import add_dtoc_to_path
+add_dtoc_to_path()  # vcomponent_sync is shared with dToC
+from vcomponent_sync import sync_vcomponents
 
 logger = logging.getLogger(__name__)
 
 OUTPUT_FOLDER = os.environ.get("CMS_OUTPUT_FOLDER", "output")
 TOKEN_FILENAME = "login_token.json"
+VCOMPONENT_STORE_FILENAME = "vcomponent_store.json"
 
 
 def _sanitize_site_slug(site_url: str) -> str:
@@ -98,6 +104,19 @@ def _load_last_sites(output_folder: Optional[str] = None) -> list:
         return []
 
 
+def _sync_site_vcomponents(site_url: str, headers: dict, site_folder: Path):
+    """
+    VComponents for one site, pulling only those created or changed since the last sync.
+
+    Returns the list, or an error dict like GetAllVComponents.
+    """
+    return sync_vcomponents(
+        lambda page_number, page_size, sort_key: GetVComponentPage(site_url, headers, page_number, page_size, sort_key),
+        str(site_folder / VCOMPONENT_STORE_FILENAME),
+        site_url,
+    )
+
+
 def fetch_and_save_site_vcomponents(
     site_url: str,
     headers: dict,
@@ -115,7 +134,7 @@ def fetch_and_save_site_vcomponents(
 
     logger.info(f"Fetching VComponents for {site_url}...")
 
-    vcomponents = GetAllVComponents(site_url, headers, page_size=1000)
+    vcomponents = _sync_site_vcomponents(site_url, headers, folder)
 
     if isinstance(vcomponents, dict) and "error" in vcomponents:
         logger.error(f"  Failed: {vcomponents.get('error', 'unknown')}")
@@ -424,7 +443,7 @@ def download_cms_data_for_training(
 
     # 3. Fetch all VComponents
     logger.info("Fetching VComponents...")
-    vcomponents = GetAllVComponents(site_url, headers, page_size=1000)
+    vcomponents = _sync_site_vcomponents(site_url, headers, Path(folder) / slug)
     if isinstance(vcomponents, dict) and "error" in vcomponents:
         logger.warning(f"  VComponents fetch failed: {vcomponents.get('error', 'unknown')}")
     else:
@@ -0,0 +1,18 @@
+"""
+CMS modules shared with dToC.
+
+cms_client.py, cms_calls.py and vcomponent_sync.py live only in ../dToC; this project imports them
+from there instead of keeping a copy. add_dtoc_to_path() appends the dToC folder to sys.path, after
+this project's own folder, so same-named local modules (apis.py, app.py) still take precedence.
+"""
+import sys
+from pathlib import Path
+
+DTOC_DIR = Path(__file__).resolve().parent.parent / "dToC"
+
+
+def add_dtoc_to_path() -> None:
+    """Make the shared dToC modules importable (idempotent)."""
+    path = str(DTOC_DIR)
+    if path not in sys.path:
+        sys.path.append(path)
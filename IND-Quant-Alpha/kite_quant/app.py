@@ -3,6 +3,8 @@ Flask server: dashboard, Start/Stop trading, 2:30 scheduler, /api/live, Kill Swi
 """
 from __future__ import annotations
 
+import atexit
+import contextvars
 import logging
 import os
 from functools import wraps
@@ -28,6 +30,15 @@ apply_config_to_env()
 from engine.ai_strategy_advisor import get_market_context, get_ai_strategy_recommendation, should_switch_strategy
 from engine.trade_frequency import calculate_max_trades_per_hour, get_frequency_status, get_trade_frequency_config, save_trade_frequency_config
 from engine.reconciliation_worker import BrokerReconciliationWorker
+from engine.session_store import SessionStore
+from engine.tick_engine import SessionTickEngine
+from engine.tick_profiler import get_tick_profiler, profile_stage
+from engine.market_snapshot import MARKET, snapshot_stats, snapshot_value
+from engine.tick_stream import get_tick_stream
+from engine.regime_service import RegimeService, get_regime, get_regime_service, set_regime_service
+from engine.universe_screener import ScreenContext, SingleFlight, UniverseScreener, fno_universe
+from engine.quote_gateway import get_quote_gateway
+from engine.option_chain import get_option_chain_engine
 from engine.strategy import compute_us_bias, suggest_min_trades, consensus_signal, compute_technicals
 from engine.data_fetcher import (
     fetch_nse_quote,
@@ -42,17 +53,15 @@ from engine.data_fetcher import (
 from engine.sentiment_engine import get_sentiment_for_symbol
 from engine.session_manager import get_session_manager, SessionStatus
 from engine.backtest import run_backtest
-from engine.zerodha_client import get_positions, get_positions_day, get_balance, get_zerodha_profile_info, kill_switch, search_instruments, get_quotes_bulk, get_nfo_option_tradingsymbol, get_nfo_option_contract, get_open_orders, get_orders_today
+from engine.zerodha_client import get_positions, get_positions_day, get_balance, get_zerodha_profile_info, kill_switch, search_instruments, get_quotes_bulk, get_nfo_option_contract, get_open_orders, get_orders_today
 from nifty_banknifty_engine import (
     get_index_market_bias as _engine_index_bias,
-    get_index_option_candidates,
-    pick_best_index_option,
     get_affordable_index_options,
     build_ai_trade_recommendation_index,
 )
 from engine.ai_strategy_advisor import get_market_context, get_ai_strategy_recommendation, should_switch_strategy
 from execution.executor import execute_entry, execute_exit, get_balance_for_mode
-from execution.trade_history_store import get_trade_history as get_stored_trade_history
+from execution.trade_history_store import get_trade_history as get_stored_trade_history, get_trade_journal
 from strategies import data_provider as strategy_data_provider
 from strategies.strategy_registry import get_strategy_for_session
 from risk.risk_manager import RiskConfig, RiskManager
@@ -61,10 +70,10 @@ from engine.algo_engine import load_algos, get_algo_by_id, get_suggested_algos,
 from engine.performance_context import build_live_performance_context
 import json
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta, time
 from functools import lru_cache
-from threading import Lock, RLock, Thread
+from threading import Lock, RLock
 from typing import Any
 try:
     from zoneinfo import ZoneInfo
@@ -88,12 +97,13 @@ DEFAULT_INVESTMENT_AMOUNT = 10000.0
 
 # Shared thread pool for timeout-protected API calls.
 # Keep this comfortably above per-tick fanout to avoid self-queue starvation.
-_timeout_executor = ThreadPoolExecutor(max_workers=24, thread_name_prefix="timeout_worker")
+_timeout_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="timeout_worker")
 
 def call_with_timeout(func, *args, timeout_seconds=10, **kwargs):
     """Execute function with timeout. Returns (success: bool, result: Any)."""
     try:
-        future = _timeout_executor.submit(func, *args, **kwargs)
+        # copy_context carries the caller's tick scope (market snapshot) into the timeout worker
+        future = _timeout_executor.submit(contextvars.copy_context().run, get_tick_profiler().bind_session(func), *args, **kwargs)
         result = future.result(timeout=timeout_seconds)
         return True, result
     except FutureTimeoutError:
@@ -1534,148 +1544,54 @@ def api_trade_suggestions():
 
 @app.route("/api/analytics")
 def api_analytics():
-    """Get profit analytics by weekday and time of day."""
+    """Profit analytics by weekday, time of day and strategy from the trade journal. ?range=week|month|all&mode=LIVE|PAPER|BACKTEST"""
     time_range = request.args.get("range", "week")
-    
+    mode = (request.args.get("mode") or "").strip().upper() or None
+
     try:
-        # TODO: Replace this with real trade data from database/logs
-        # For now, use dummy data to demonstrate the analytics
-        use_dummy = True  # Set to False once real trade data is available
-        
-        if use_dummy:
-            # Generate realistic dummy data
-            weekday_profits = {
-                "Monday": 2500.50,
-                "Tuesday": -800.25,
-                "Wednesday": 3200.75,
-                "Thursday": 1500.00,
-                "Friday": 4100.25,
-                "Saturday": 0,
-                "Sunday": 0
-            }
-            time_of_day_profits = {
-                "9-10 AM": 1800.50,
-                "10-11 AM": 2200.75,
-                "11-12 PM": -500.25,
-                "12-1 PM": 1500.00,
-                "1-2 PM": 3100.50,
-                "2-3 PM": 2400.75,
-                "3-4 PM": 1000.00
-            }
-            
-            total_trades = 45
-            best_day = {"day": "Friday", "profit": 4100.25}
-            worst_day = {"day": "Tuesday", "profit": -800.25}
-            best_time = {"time": "1-2 PM", "profit": 3100.50}
-            
-            return {
-                "ok": True,
-                "by_weekday": weekday_profits,
-                "by_time_of_day": time_of_day_profits,
-                "best_day": f"{best_day['day']} (₹{best_day['profit']:.2f})",
-                "worst_day": f"{worst_day['day']} (₹{worst_day['profit']:.2f})",
-                "best_time": f"{best_time['time']} (₹{best_time['profit']:.2f})",
-                "total_trades": total_trades,
-            }
-        
-        predictions_file = _predictions_file()
-        
-        if predictions_file.exists():
-            with open(predictions_file, "r") as f:
-                predictions = json.load(f)
-        else:
-            predictions = []
-        
-        # Filter by time range
-        now = datetime.now()
+        journal = get_trade_journal()
+        today = datetime.now(ZoneInfo("Asia/Kolkata")).date()
         if time_range == "week":
-            start_date = now - timedelta(days=7)
+            from_date = (today - timedelta(days=7)).isoformat()
         elif time_range == "month":
-            start_date = now - timedelta(days=30)
+            from_date = (today - timedelta(days=30)).isoformat()
         else:  # all
-            start_date = datetime(2000, 1, 1)
-        
-        # Initialize data structures
+            from_date = None
+
         weekday_profits = {
-            "Monday": 0, "Tuesday": 0, "Wednesday": 0, 
-            "Thursday": 0, "Friday": 0, "Saturday": 0, "Sunday": 0
+            "Monday": 0.0, "Tuesday": 0.0, "Wednesday": 0.0,
+            "Thursday": 0.0, "Friday": 0.0, "Saturday": 0.0, "Sunday": 0.0
         }
-        time_of_day_profits = {
-            "9-10 AM": 0, "10-11 AM": 0, "11-12 PM": 0, "12-1 PM": 0,
-            "1-2 PM": 0, "2-3 PM": 0, "3-4 PM": 0
-        }
-        
+        daily = journal.daily_pnl(mode=mode, from_date=from_date)
         total_trades = 0
+        for row in daily:
+            try:
+                weekday = datetime.strptime(row["date"], "%Y-%m-%d").strftime("%A")
+            except ValueError:
+                continue
+            weekday_profits[weekday] = round(weekday_profits[weekday] + row["net_pnl"], 2)
+            total_trades += row["trades"]
+        time_of_day_profits = journal.time_of_day_pnl(mode=mode, from_date=from_date)
+
         best_day = {"day": "N/A", "profit": 0}
         worst_day = {"day": "N/A", "profit": 0}
         best_time = {"time": "N/A", "profit": 0}
-        
-        # Process predictions data (mock profit calculation)
-        for pred in predictions:
-            try:
-                pred_date = datetime.strptime(pred.get("date", ""), "%Y-%m-%d")
-                if pred_date < start_date:
-                    continue
-                
-                # Mock profit calculation based on prediction accuracy
-                # In reality, this should come from actual trade data
-                price_change = pred.get("price_change_pct", 0)
-                if price_change is not None:
-                    # Simple mock: if prediction was correct, profit = abs(change) * 1000
-                    # if incorrect, profit = -abs(change) * 500
-                    predicted = pred.get("predicted_direction", "")
-                    actual = pred.get("actual_direction", "")
-                    
-                    if predicted and actual:
-                        if predicted == actual:
-                            profit = abs(price_change) * 1000
-                        else:
-                            profit = -abs(price_change) * 500
-                        
-                        # Aggregate by weekday
-                        weekday = pred_date.strftime("%A")
-                        weekday_profits[weekday] += profit
-                        
-                        # Aggregate by time of day (distribute randomly for now)
-                        # In reality, use actual trade timestamps
-                        import random
-                        random.seed(pred_date.toordinal())
-                        hour = random.randint(9, 15)
-                        if hour == 9:
-                            time_slot = "9-10 AM"
-                        elif hour == 10:
-                            time_slot = "10-11 AM"
-                        elif hour == 11:
-                            time_slot = "11-12 PM"
-                        elif hour == 12:
-                            time_slot = "12-1 PM"
-                        elif hour == 13:
-                            time_slot = "1-2 PM"
-                        elif hour == 14:
-                            time_slot = "2-3 PM"
-                        else:
-                            time_slot = "3-4 PM"
-                        
-                        time_of_day_profits[time_slot] += profit
-                        total_trades += 1
-            except (ValueError, KeyError):
-                continue
-        
-        # Find best/worst day and time
         for day, profit in weekday_profits.items():
             if profit > best_day["profit"]:
                 best_day = {"day": day, "profit": profit}
             if profit < worst_day["profit"]:
                 worst_day = {"day": day, "profit": profit}
-        
+
         for time, profit in time_of_day_profits.items():
             if profit > best_time["profit"]:
                 best_time = {"time": time, "profit": profit}
-        
+
         return {
             "ok": True,
             "by_weekday": weekday_profits,
             "by_time_of_day": time_of_day_profits,
+            "by_strategy": journal.strategy_stats(mode=mode),
+            "daily_pnl": daily,
             "best_day": f"{best_day['day']} (₹{best_day['profit']:.2f})" if best_day['day'] != "N/A" else "N/A",
             "worst_day": f"{worst_day['day']} (₹{worst_day['profit']:.2f})" if worst_day['day'] != "N/A" else "N/A",
             "best_time": f"{best_time['time']} (₹{best_time['profit']:.2f})" if best_time['time'] != "N/A" else "N/A",
@@ -2062,30 +1978,61 @@ LIQUID_FNO_STOCKS = [
     "TATAMOTORS", "KOTAKBANK", "LT", "HINDUNILVR", "ITC", "AXISBANK", "MARUTI",
     "BAJFINANCE", "WIPRO", "HCLTECH", "ASIANPAINT", "TITAN", "SUNPHARMA",
 ]
+# Streaming market regimes for the F&O watchlist (read by get_suggested_algos and the engine tick).
+set_regime_service(RegimeService(LIQUID_FNO_STOCKS))
 # Gold & Silver ETFs (NSE) for AI Trading Agent commodity block
 GOLD_SILVER_ETFS = ["GOLDBEES", "GOLDSHARE", "SILVERETF"]
-INTRADAY_PICKS_STOCK_COUNT = 12  # Score 12 stocks in parallel for faster response
-INTRADAY_PICKS_WORKERS = 6  # Parallel workers for scoring
+# Intraday picks universe: "fno" = every F&O stock underlying in today's instrument master (~200 names),
+# "liquid" = LIQUID_FNO_STOCKS only. The whole universe is scored in one vectorized pass.
+INTRADAY_PICKS_UNIVERSE = (os.getenv("INTRADAY_PICKS_UNIVERSE", "fno") or "fno").strip().lower()
 INTRADAY_PICKS_CACHE_TTL = timedelta(minutes=5)
 _intraday_picks_cache: dict | None = None
 _intraday_picks_cache_time: datetime | None = None
+_picks_flight = SingleFlight()
+
+
+def _screen_quotes(symbols: list[str]) -> dict[str, dict[str, Any]]:
+    """NSE quotes for the screener in one gateway batch; the stored opening range wins over the quote open."""
+    from engine.zerodha_client import get_quotes
+    quotes = {pair[0]: dict(q) for pair, q in get_quotes([(s, "NSE") for s in symbols]).items()}
+    stored = _load_opening_range().get("symbols", {})
+    for sym, q in quotes.items():
+        if stored.get(sym):
+            q["open"] = float(stored[sym])
+    return quotes
 
 
-def _score_stock_for_intraday(symbol: str) -> dict[str, Any]:
-    """Score one stock using the same Today's Market Prediction logic (US bias, sentiment, technicals, indices, VIX, price vs open, depth, 15m). Data from Zerodha when connected."""
+_universe_screener = UniverseScreener(load_quotes=_screen_quotes)
+
+
+def _screen_context() -> ScreenContext:
+    """Market-wide inputs of Today's Market Prediction, fetched once per scan."""
+    ctx = ScreenContext(us_bias=compute_us_bias().bias, market_open=_is_indian_market_open())
     try:
-        pred = _get_market_prediction(symbol)
-        score = pred.get("score", 0) or 0
-        factors = pred.get("factors", [])
-        prediction = pred.get("prediction", "NEUTRAL")
-        return {
-            "symbol": symbol,
-            "score": round(float(score), 3),
-            "tags": factors[:6],
-            "prediction": prediction,
-        }
+        ctx.nifty_pct = fetch_nifty50_live().get("pct_change")
+        ctx.bank_nifty_pct = fetch_bank_nifty_live().get("pct_change")
+    except Exception:
+        pass
+    try:
+        ctx.vix_value = fetch_india_vix().get("vix_value")
     except Exception:
-        return {"symbol": symbol, "score": 0.0, "tags": ["Error"], "prediction": "NEUTRAL"}
+        pass
+    return ctx
+
+
+def _intraday_picks_universe() -> list[str]:
+    if INTRADAY_PICKS_UNIVERSE == "liquid":
+        return list(LIQUID_FNO_STOCKS)
+    return fno_universe(LIQUID_FNO_STOCKS)
+
+
+def _scan_intraday(symbols: list[str], timeout_sec: float) -> list[dict[str, Any]]:
+    """Score symbols with the Today's Market Prediction logic (US bias, sentiment, technicals, indices, VIX, price vs open, depth, 15m)."""
+    try:
+        return _universe_screener.scan(symbols, _screen_context(), timeout_sec=timeout_sec)
+    except Exception as e:
+        logger.warning("[INTRADAY PICKS] Scan failed: %s", str(e))
+        return [{"symbol": sym, "score": 0.0, "tags": ["Error"], "prediction": "NEUTRAL"} for sym in symbols]
 
 
 def _get_ai_trade_suggestion(picks: list[dict]) -> dict[str, Any]:
@@ -2173,38 +2120,13 @@ def api_gpt_status():
 @app.route("/api/intraday-picks")
 def api_intraday_picks():
     """Top 15 intraday/F&O picks + AI/rules-based best-to-trade suggestion. Cached 5 min."""
-    global _intraday_picks_cache, _intraday_picks_cache_time
     force = request.args.get("refresh", "").lower() in ("1", "true", "yes")
     now = datetime.now()
     if not force and _intraday_picks_cache is not None and _intraday_picks_cache_time is not None:
         if now - _intraday_picks_cache_time < INTRADAY_PICKS_CACHE_TTL:
             return jsonify(_intraday_picks_cache)
-    symbols = LIQUID_FNO_STOCKS[:INTRADAY_PICKS_STOCK_COUNT]
-    results = []
-    with ThreadPoolExecutor(max_workers=INTRADAY_PICKS_WORKERS) as executor:
-        future_to_sym = {executor.submit(_score_stock_for_intraday, sym): sym for sym in symbols}
-        for future in as_completed(future_to_sym, timeout=75):
-            sym = future_to_sym[future]
-            try:
-                results.append(future.result())
-            except Exception:
-                results.append({"symbol": sym, "score": 0.0, "tags": ["Error"], "prediction": "NEUTRAL"})
-    # If as_completed timed out, add placeholders for any missing symbols
-    got = {r.get("symbol") for r in results}
-    for sym in symbols:
-        if sym not in got:
-            results.append({"symbol": sym, "score": 0.0, "tags": ["Timeout"], "prediction": "NEUTRAL"})
-    results.sort(key=lambda x: -(x.get("score") or 0))
-    picks = results[:15]
-    ai_suggestion = _get_ai_trade_suggestion(picks)
-    payload = {
-        "picks": picks,
-        "ai_suggestion": ai_suggestion,
-        "cached_at": now.isoformat(),
-    }
-    _intraday_picks_cache = payload
-    _intraday_picks_cache_time = now
-    return jsonify(payload)
+    _refresh_intraday_picks_cache_sync(timeout_sec=75)
+    return jsonify(_intraday_picks_cache)
 
 
 def _classify_signal_type(pick: dict) -> str:
@@ -2235,27 +2157,16 @@ INTRADAY_SIGNALS_TIMEOUT = 20
 
 
 def _refresh_intraday_picks_cache_sync(timeout_sec: int = INTRADAY_SIGNALS_TIMEOUT) -> None:
-    """Populate _intraday_picks_cache (symbols + ETFs). Call with lower timeout for API responsiveness."""
-    global _intraday_picks_cache, _intraday_picks_cache_time
-    now = datetime.now()
-    symbols = LIQUID_FNO_STOCKS[:INTRADAY_PICKS_STOCK_COUNT]
-    results = []
-    with ThreadPoolExecutor(max_workers=INTRADAY_PICKS_WORKERS) as executor:
-        future_to_sym = {executor.submit(_score_stock_for_intraday, sym): sym for sym in symbols}
-        for future in as_completed(future_to_sym, timeout=timeout_sec):
-            sym = future_to_sym[future]
-            try:
-                results.append(future.result())
-            except Exception:
-                results.append({"symbol": sym, "score": 0.0, "tags": ["Error"], "prediction": "NEUTRAL"})
-    got = {r.get("symbol") for r in results}
-    for sym in symbols:
-        if sym not in got:
-            results.append({"symbol": sym, "score": 0.0, "tags": ["Timeout"], "prediction": "NEUTRAL"})
-    results.sort(key=lambda x: -(x.get("score") or 0))
-    picks = results[:15]
-    _intraday_picks_cache = {"picks": picks, "ai_suggestion": _get_ai_trade_suggestion(picks), "cached_at": now.isoformat()}
-    _intraday_picks_cache_time = now
+    """Populate _intraday_picks_cache (top 15 of the picks universe). Concurrent callers share one in-flight scan."""
+
+    def refresh() -> None:
+        global _intraday_picks_cache, _intraday_picks_cache_time
+        now = datetime.now()
+        picks = _scan_intraday(_intraday_picks_universe(), timeout_sec)[:15]
+        _intraday_picks_cache = {"picks": picks, "ai_suggestion": _get_ai_trade_suggestion(picks), "cached_at": now.isoformat()}
+        _intraday_picks_cache_time = now
+
+    _picks_flight.do("intraday_picks", refresh)
 
 
 def _build_ai_trade_signals() -> dict:
@@ -2270,7 +2181,7 @@ def _build_ai_trade_signals() -> dict:
     if not cache_fresh:
         if _intraday_picks_cache is not None and _intraday_picks_cache.get("picks"):
             # Stale-while-revalidate: return stale immediately, refresh in background
-            Thread(target=_refresh_intraday_picks_cache_sync, kwargs={"timeout_sec": 45}).start()
+            _picks_flight.start("intraday_picks_revalidate", lambda: _refresh_intraday_picks_cache_sync(timeout_sec=45))
             picks = _intraday_picks_cache.get("picks", [])
         else:
             _refresh_intraday_picks_cache_sync(timeout_sec=INTRADAY_SIGNALS_TIMEOUT)
@@ -2338,13 +2249,7 @@ def _build_ai_trade_signals() -> dict:
             n_out.append(c)
             used_n.add(c["stock"])
     # Gold & Silver ETF block: score ETFs separately and return top 3
-    etf_picks = []
-    for sym in GOLD_SILVER_ETFS:
-        try:
-            etf_picks.append(_score_stock_for_intraday(sym))
-        except Exception:
-            etf_picks.append({"symbol": sym, "score": 0.0, "tags": [], "prediction": "NEUTRAL"})
-    etf_picks.sort(key=lambda x: -(x.get("score") or 0))
+    etf_picks = _scan_intraday(GOLD_SILVER_ETFS, INTRADAY_SIGNALS_TIMEOUT)
     etf_out = [to_card(p) for p in etf_picks[:3]]
     return {"momentum": m_out[:3], "reversal": r_out[:3], "news": n_out[:3], "etf": etf_out}
 
@@ -2387,7 +2292,7 @@ def get_index_market_bias() -> dict:
     AI market bias for NIFTY and BANKNIFTY. Delegates to nifty_banknifty_engine with US bias.
     Returns: niftyBias, bankNiftyBias, confidence, reasons. Cached 60s in engine.
     """
-    return _engine_index_bias(us_bias_data=_get_cached_us_bias())
+    return snapshot_value(MARKET, "index_bias", lambda: _engine_index_bias(us_bias_data=_get_cached_us_bias()))
 
 
 # --- AI Trade Recommendation + Session-Based Continuous Strategy Automation ---
@@ -2396,6 +2301,8 @@ INTRADAY_CUTOFF_TIME = time(15, 15)  # 3:15 PM IST
 # DEPRECATED: No longer used - replaced by dynamic hourly frequency
 # MAX_TRADES_PER_SESSION = 10
 SESSION_ENGINE_INTERVAL_SEC = 60
+SESSION_TICK_DEADLINE_SEC = 50  # Per-session budget inside one tick
+ENGINE_TICK_WORKERS = int(os.getenv("ENGINE_TICK_WORKERS", "16") or 16)
 LIVE_TRAILING_SYNC_INTERVAL_SEC = 20
 LIVE_MAX_LOSS_BUFFER = 50.0
 LIVE_MAX_HARD_LOSS = 350.0
@@ -2405,6 +2312,7 @@ LIVE_AI_SESSION_CANDLE_COUNT = int(os.getenv("LIVE_AI_SESSION_CANDLE_COUNT", "75
 LIVE_ENABLE_OI_PCR_FILTER = str(os.getenv("LIVE_ENABLE_OI_PCR_FILTER", "1")).strip().lower() in {"1", "true", "yes", "on"}
 LIVE_PCR_BULLISH_MAX = float(os.getenv("LIVE_PCR_BULLISH_MAX", "0.5") or 0.5)
 LIVE_PCR_BEARISH_MIN = float(os.getenv("LIVE_PCR_BEARISH_MIN", "1.5") or 1.5)
+OI_CHAIN_WINDOW_STRIKES = int(os.getenv("OI_CHAIN_WINDOW_STRIKES", "10") or 10)
 LIVE_MIN_PREV_CANDLE_MOVE_PCT = float(os.getenv("LIVE_MIN_PREV_CANDLE_MOVE_PCT", "0.10") or 0.10)
 ENTRY_SCORE_THRESHOLD = int(os.getenv("ENTRY_SCORE_THRESHOLD", "55") or 55)
 ENTRY_SCORE_THRESHOLD_MIN = 35
@@ -2417,6 +2325,7 @@ TIME_DECAY_MIN_PROFIT_RS = float(os.getenv("TIME_DECAY_MIN_PROFIT_RS", "120") or
 _SESSIONS_DIR = Path(__file__).resolve().parent / "data"
 _SESSIONS_FILE = _SESSIONS_DIR / "trade_sessions.json"
 _SESSIONS_HISTORY_FILE = _SESSIONS_DIR / "trade_sessions_history.json"
+_SESSIONS_CHANGES_FILE = _SESSIONS_DIR / "trade_sessions.changes.jsonl"
 _BROKER_ORDERS_HISTORY_FILE = _SESSIONS_DIR / "live_broker_orders_history.json"
 # ALL SESSION MUTATIONS REQUIRE LOCK
 _sessions_lock = RLock()
@@ -2440,69 +2349,41 @@ def is_market_open(now: datetime | None = None) -> bool:
     return market_open <= now.time() <= market_close
 
 
-def _load_trade_sessions() -> None:
-    """Load persisted sessions from JSON (called at startup)."""
-    global _trade_sessions
+def _session_date(session: dict) -> date | None:
+    """Return session's calendar date (from createdAt)."""
+    created = session.get("createdAt")
+    if not created:
+        return None
+    try:
+        if isinstance(created, str):
+            return datetime.fromisoformat(created.replace("Z", "+00:00")).date()
+        return None
+    except Exception:
+        return None
 
-    def _read_sessions_file(path: Path) -> list[dict]:
-        if not path.exists():
-            return []
-        try:
-            with open(path, encoding="utf-8") as f:
-                data = json.load(f)
-            sessions = data.get("sessions") if isinstance(data, dict) else []
-            return sessions if isinstance(sessions, list) else []
-        except Exception:
-            return []
 
-    def _split_sessions(sessions: list[dict]) -> tuple[list[dict], list[dict]]:
-        def _local_session_date(session: dict) -> date | None:
-            created = session.get("createdAt")
-            if not created or not isinstance(created, str):
-                return None
-            try:
-                return datetime.fromisoformat(created.replace("Z", "+00:00")).date()
-            except Exception:
-                return None
+def _session_is_history(session: dict, today: date) -> bool:
+    s_date = _session_date(session)
+    return s_date is not None and s_date < today
+
+
+_session_store = SessionStore(
+    today_file=_SESSIONS_FILE,
+    history_file=_SESSIONS_HISTORY_FILE,
+    changes_file=_SESSIONS_CHANGES_FILE,
+    get_sessions_fn=lambda: _trade_sessions,
+    sessions_lock=_sessions_lock,
+    is_history_fn=_session_is_history,
+)
 
-        today = datetime.now(ZoneInfo("Asia/Kolkata")).date()
-        today_sessions: list[dict] = []
-        history_sessions: list[dict] = []
-        for s in sessions:
-            s_date = _local_session_date(s)
-            if s_date is not None and s_date < today:
-                history_sessions.append(s)
-            else:
-                today_sessions.append(s)
-        return today_sessions, history_sessions
 
-    def _write_sessions_file(path: Path, sessions: list[dict]) -> None:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({"sessions": sessions, "updatedAt": datetime.now().isoformat()}, f, indent=2)
+def _load_trade_sessions() -> None:
+    """Load persisted sessions (today/history snapshots + change log) at startup."""
+    global _trade_sessions
 
     with _sessions_lock:
         try:
-            today_sessions = _read_sessions_file(_SESSIONS_FILE)
-            history_sessions = _read_sessions_file(_SESSIONS_HISTORY_FILE)
-
-            # Backward compatibility: if legacy file contains mixed dates, split and persist.
-            if today_sessions and not history_sessions:
-                split_today, split_history = _split_sessions(today_sessions)
-                if len(split_history) > 0:
-                    _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-                    _write_sessions_file(_SESSIONS_FILE, split_today)
-                    _write_sessions_file(_SESSIONS_HISTORY_FILE, split_history)
-                    today_sessions = split_today
-                    history_sessions = split_history
-
-            # Ensure both files exist so today's and history storage are always separate on disk.
-            _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-            if not _SESSIONS_FILE.exists():
-                _write_sessions_file(_SESSIONS_FILE, today_sessions)
-            if not _SESSIONS_HISTORY_FILE.exists():
-                _write_sessions_file(_SESSIONS_HISTORY_FILE, history_sessions)
-
-            _trade_sessions = (today_sessions or []) + (history_sessions or [])
+            _trade_sessions = _session_store.load()
             
             # Backward compatibility: Initialize new frequency and AI fields for old sessions
             now = datetime.now(ZoneInfo("Asia/Kolkata"))
@@ -2527,36 +2408,21 @@ def _load_trade_sessions() -> None:
         except Exception as e:
             logger.exception("Load trade sessions error: %s", str(e))
             _trade_sessions = []
+    # Fold the change log (and legacy mixed-date files) into separate today/history snapshots.
+    try:
+        _session_store.finish_recovery()
+    except Exception as e:
+        logger.exception("Recover trade sessions error: %s", str(e))
 
 
 def _save_trade_sessions() -> None:
-    """Persist sessions to separate today/history JSON files."""
-    def _split_sessions(sessions: list[dict]) -> tuple[list[dict], list[dict]]:
-        today = datetime.now(ZoneInfo("Asia/Kolkata")).date()
-        today_sessions: list[dict] = []
-        history_sessions: list[dict] = []
-        for s in sessions:
-            s_date = _session_date(s)
-            if s_date is not None and s_date < today:
-                history_sessions.append(s)
-            else:
-                today_sessions.append(s)
-        return today_sessions, history_sessions
-
-    _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-    with _sessions_lock:
-        try:
-            today_sessions, history_sessions = _split_sessions(_trade_sessions)
-            with open(_SESSIONS_FILE, "w", encoding="utf-8") as f:
-                json.dump({"sessions": today_sessions, "updatedAt": datetime.now().isoformat()}, f, indent=2)
-            with open(_SESSIONS_HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump({"sessions": history_sessions, "updatedAt": datetime.now().isoformat()}, f, indent=2)
-        except Exception as e:
-            logger.exception("Save trade sessions error: %s", str(e))
+    """Schedule persistence of changed sessions; the session store writes them off this thread."""
+    _session_store.request_save()
 
 
 # Load persisted sessions on startup (after first request may have created data dir)
 _load_trade_sessions()
+atexit.register(_session_store.stop)
 
 
 def _get_trade_sessions_ref() -> list[dict]:
@@ -2571,19 +2437,6 @@ def _trade_sessions_snapshot() -> list[dict]:
         return [dict(s) for s in _trade_sessions]
 
 
-def _session_date(session: dict) -> date | None:
-    """Return session's calendar date (from createdAt)."""
-    created = session.get("createdAt")
-    if not created:
-        return None
-    try:
-        if isinstance(created, str):
-            return datetime.fromisoformat(created.replace("Z", "+00:00")).date()
-        return None
-    except Exception:
-        return None
-
-
 def _order_date(order: dict) -> date | None:
     """Return order calendar date from broker timestamp fields."""
     ts = order.get("order_timestamp")
@@ -2707,6 +2560,7 @@ def _build_ai_trade_recommendation_stock(
     risk_per_trade = capital * (risk_pct / 100.0) if capital and risk_pct else 0
     options, rec, pred = _mock_option_chain(stock.upper())
     stock_indicators = {
+        "symbol": stock.upper(),
         "score": pred.get("score"),
         "prediction": pred.get("prediction"),
         "rsi": pred.get("rsi"),
@@ -3080,6 +2934,7 @@ def _pick_best_strategy(instrument: str, session: dict | None = None) -> tuple[s
     try:
         pred = _get_cached_prediction(instrument)
         stock_indicators = {
+            "symbol": instrument,
             "score": pred.get("score"),
             "prediction": pred.get("prediction"),
             "rsi": pred.get("rsi"),
@@ -3280,6 +3135,20 @@ def _safe_float(v: Any, default: float = 0.0) -> float:
         return default
 
 
+def _fetch_strike_oi(label: str, base: int, step: int) -> tuple[dict[int, float], dict[int, float], dict[int, float], dict[int, float], float | None]:
+    """CE/PE open interest (and % change off the day low) for ATM±2 strikes, plus max-pain over the chain window."""
+    strikes = [int(base + (off * step)) for off in (-2, -1, 0, 1, 2)]
+    # One incremental, batched refresh of the shared chain around the ATM strike.
+    chain = get_option_chain_engine().refresh(label, float(base), n=OI_CHAIN_WINDOW_STRIKES)
+    if chain is None:
+        return {}, {}, {}, {}, None
+    ce_ois = chain.values_at("CE", "oi", strikes)
+    pe_ois = chain.values_at("PE", "oi", strikes)
+    ce_oi_change_pct = chain.oi_change_pct_at("CE", strikes)
+    pe_oi_change_pct = chain.oi_change_pct_at("PE", strikes)
+    return ce_ois, pe_ois, ce_oi_change_pct, pe_oi_change_pct, chain.max_pain(chain.window(float(base), OI_CHAIN_WINDOW_STRIKES))
+
+
 def _build_oi_pcr_snapshot(
     instrument: str,
     spot_price: float,
@@ -3292,35 +3161,10 @@ def _build_oi_pcr_snapshot(
         return {"ok": False, "reason": "OI/PCR supported only for NIFTY/BANKNIFTY"}
     step = _index_strike_step(label)
     base = int(round(spot_price / step) * step)
-    offsets = [-2, -1, 0, 1, 2]
-    ce_ois: dict[int, float] = {}
-    pe_ois: dict[int, float] = {}
-    ce_oi_change_pct: dict[int, float] = {}
-    pe_oi_change_pct: dict[int, float] = {}
-    for off in offsets:
-        strike = int(base + (off * step))
-        ce_ts = get_nfo_option_tradingsymbol(label, strike, "CE")
-        pe_ts = get_nfo_option_tradingsymbol(label, strike, "PE")
-        if ce_ts:
-            try:
-                q = strategy_data_provider.get_quote(ce_ts, exchange="NFO") or {}
-                oi = _safe_float(q.get("oi"), 0.0)
-                ce_ois[strike] = oi
-                oi_low = _safe_float(q.get("oi_day_low"), 0.0)
-                if oi > 0 and oi_low > 0 and oi >= oi_low:
-                    ce_oi_change_pct[strike] = ((oi - oi_low) / oi_low) * 100.0
-            except Exception:
-                ce_ois[strike] = 0.0
-        if pe_ts:
-            try:
-                q = strategy_data_provider.get_quote(pe_ts, exchange="NFO") or {}
-                oi = _safe_float(q.get("oi"), 0.0)
-                pe_ois[strike] = oi
-                oi_low = _safe_float(q.get("oi_day_low"), 0.0)
-                if oi > 0 and oi_low > 0 and oi >= oi_low:
-                    pe_oi_change_pct[strike] = ((oi - oi_low) / oi_low) * 100.0
-            except Exception:
-                pe_ois[strike] = 0.0
+    # Strike OI is the same for every session on this index in a tick: load it once per snapshot.
+    ce_ois, pe_ois, ce_oi_change_pct, pe_oi_change_pct, max_pain = snapshot_value(
+        label, ("strike_oi", base), lambda: _fetch_strike_oi(label, base, step)
+    )
 
     ce_total = sum(v for v in ce_ois.values() if v > 0)
     pe_total = sum(v for v in pe_ois.values() if v > 0)
@@ -3370,6 +3214,7 @@ def _build_oi_pcr_snapshot(
         "ce_total_oi": round(ce_total, 2),
         "pe_total_oi": round(pe_total, 2),
         "pcr": round(pcr, 3),
+        "max_pain": max_pain,
         "pe_support_oi": round(pe_support_oi, 2),
         "ce_resistance_oi": round(ce_resistance_oi, 2),
         "pe_support_oi_change_pct": round(pe_support_oi_change_pct, 2),
@@ -3905,6 +3750,29 @@ def _manage_trade_real(session: dict) -> bool:
         return False
 
 
+def _close_orphaned_tick_trade(session: dict) -> None:
+    """
+    Tick engine callback (sessions lock not held): the session was stopped while a tick worker opened
+    a trade, which the engine attached to this copy. Exit it, as the kill API would have done.
+    """
+    result = execute_exit(session)
+    if not (result and result.get("success")):
+        logger.error(
+            "[SESSION STOPPED] %s | exit of trade opened during stop failed; position may still be open | result=%s",
+            session.get("sessionId"),
+            result,
+        )
+
+
+_session_tick_engine = SessionTickEngine(
+    sessions_lock=_sessions_lock,
+    save_sessions_fn=_save_trade_sessions,
+    max_workers=ENGINE_TICK_WORKERS,
+    session_deadline_sec=SESSION_TICK_DEADLINE_SEC,
+    on_orphaned_trade=_close_orphaned_tick_trade,
+)
+
+
 def _run_session_engine_tick() -> None:
     """Scheduler callback: run one engine tick in scheduler thread."""
     global _last_session_engine_tick_time
@@ -3949,19 +3817,70 @@ def _do_live_trailing_sync_tick(now: datetime) -> None:
 
 
 def _do_session_engine_tick(now: datetime) -> None:
-    """Actual tick logic (run in background thread)."""
+    """
+    Actual tick logic (run in background thread). Engine-wide checks run under the sessions lock;
+    ACTIVE sessions are then evaluated concurrently by the tick engine, each with its own deadline.
+    """
+    with _sessions_lock:
+        if not _session_engine_tick_precheck_locked(now):
+            return
+        active_sessions = [s for s in _trade_sessions if s.get("status") == "ACTIVE"]
+    _sync_tick_stream_subscriptions(active_sessions)
+    regime_service = get_regime_service()
+    if regime_service is not None:
+        regime_service.start()
+    stats = _session_tick_engine.run_tick(active_sessions, lambda s: _evaluate_session_tick(s, now))
+    logger.info(
+        "ENGINE TICK done | sessions=%s | duration=%.2fs | slowest=%.2fs | shared_loads=%s | shared_hits=%s",
+        stats.get("sessions"),
+        stats.get("duration_sec", 0.0),
+        stats.get("slowest_sec", 0.0),
+        stats.get("shared_loads"),
+        stats.get("shared_hits"),
+    )
     with _sessions_lock:
-        _do_session_engine_tick_locked(now)
+        engine_state["last_tick"] = now.isoformat()
+        _save_trade_sessions()
+
+
+def _regime_brief(instrument: str) -> dict | None:
+    """Published regime of a watchlist instrument for entry diagnostics (None when not tracked/ready)."""
+    row = get_regime(instrument)
+    if row is None:
+        return None
+    return {k: row.get(k) for k in ("regime", "quality_score", "tradable", "bar_time")}
+
+
+def _sync_tick_stream_subscriptions(sessions: list[dict]) -> None:
+    """Stream ticks for every ACTIVE session's instrument (and option contract) over the Kite WebSocket,
+    plus the regime service's watchlist so its bars close from ticks instead of REST polls."""
+    stream = get_tick_stream()
+    if stream is None:
+        return
+    from nifty_banknifty_engine.constants import nse_symbol
+
+    wanted: list[tuple[str, str]] = []
+    for s in sessions:
+        instrument = s.get("instrument")
+        if instrument:
+            wanted.append((nse_symbol(instrument), "NSE"))
+        if (s.get("exchange") or "").upper() == "NFO" and s.get("tradingsymbol"):
+            wanted.append((s["tradingsymbol"], "NFO"))
+    regime_service = get_regime_service()
+    if regime_service is not None:
+        wanted.extend((symbol, "NSE") for symbol in regime_service.symbols)
+    try:
+        stream.sync_subscriptions(wanted)
+    except Exception as e:
+        logger.warning("[TICK STREAM] Subscription sync failed: %s", str(e))
 
 
-def _do_session_engine_tick_locked(now: datetime) -> None:
-    """Actual tick logic (run in background thread)."""
-    tick_start_time = now
-    MAX_TICK_DURATION_SEC = 50  # Force exit if tick takes longer than 50s
+def _session_engine_tick_precheck_locked(now: datetime) -> bool:
+    """Engine-wide tick checks (lockdown, market hours, intraday cutoff). False = nothing to evaluate."""
     try:
         if not engine_state.get("running", True):
             logger.debug("ENGINE TICK skipped: engine not running")
-            return
+            return False
         emergency_sessions = [
             s for s in _trade_sessions
             if bool(
@@ -3976,15 +3895,15 @@ def _do_session_engine_tick_locked(now: datetime) -> None:
                 "ENGINE LOCKDOWN ACTIVE | sessions=%s | reason=emergency_lockdown",
                 [s.get("sessionId") for s in emergency_sessions],
             )
-            return
+            return False
         if not is_market_open(now):
             logger.debug("ENGINE TICK skipped: market closed (outside 9:15-15:30 IST or weekend)")
-            return
+            return False
         active_count = sum(1 for s in _trade_sessions if s.get("status") == "ACTIVE")
         logger.info("ENGINE TICK | active_sessions=%s", active_count)
     except Exception as e:
         logger.exception("ENGINE TICK | pre-check error: %s", str(e))
-        return
+        return False
     for s in _trade_sessions:
         if s.get("status") == "ACTIVE":
             logger.info(
@@ -3993,7 +3912,6 @@ def _do_session_engine_tick_locked(now: datetime) -> None:
                 s.get("exchange"),
                 s.get("tradingsymbol"),
             )
-    today = now.date()
     try:
         cutoff = INTRADAY_CUTOFF_TIME
         if now.time() >= cutoff:
@@ -4025,595 +3943,603 @@ def _do_session_engine_tick_locked(now: datetime) -> None:
                     )
             _save_trade_sessions()
             engine_state["last_tick"] = now.isoformat()
-            return
+            return False
     except Exception as e:
         logger.exception("Engine tick cutoff error: %s", str(e))
+        return False
+    return True
+
+
+def _evaluate_session_tick(session: dict, now: datetime) -> None:
+    """
+    One session's engine tick, run on a tick worker against a private copy of the session.
+    The tick engine applies the changed keys back under the sessions lock and saves.
+    """
+    today = now.date()
+    if session.get("status") != "ACTIVE":
         return
-    for session in _trade_sessions:
-        # Check if we're exceeding max tick duration
-        elapsed = (datetime.now(ZoneInfo("Asia/Kolkata")) - tick_start_time).total_seconds()
-        if elapsed > MAX_TICK_DURATION_SEC:
-            logger.warning(f"ENGINE TICK exceeded max duration ({MAX_TICK_DURATION_SEC}s), stopping processing")
-            break
-            
+    if (session.get("execution_mode") or "").upper() == "BACKTEST":
+        return
+    session_date = _session_date(session)
+    if session_date is not None and session_date < today:
+        session["status"] = "STOPPED"
+        session["stop_reason"] = "NEW_DAY"
+        session["stoppedAt"] = now.isoformat()
+        logger.info(
+            "[SESSION STOPPED] %s | reason=NEW_DAY | session_date=%s | today=%s",
+            session.get("sessionId"),
+            str(session_date),
+            str(today),
+        )
+        return
+    
+    # Reset hourly trade count if hour changed
+    current_hour = now.hour
+    if session.get("current_hour_block") != current_hour:
+        session["current_hour_block"] = current_hour
+        session["hourly_trade_count"] = 0
+        logger.info(f"[FREQ] Hour changed to {current_hour}, resetting hourly count for {session.get('instrument')}")
+    if session.get("current_trade_id"):
+        try:
+            with profile_stage("manage_trade"):
+                _manage_trade_real(session)
+        except Exception as e:
+            logger.exception("Engine tick manage trade error for %s: %s", session.get("instrument"), str(e))
+        return
+
+    # Mandatory centralized risk pre-entry gate (single source of truth).
+    try:
+        from engine.risk_engine import evaluate_entry
+
+        with profile_stage("risk_gate"):
+            risk_decision = evaluate_entry(session, now=now)
+        session.update(risk_decision.updated_session_state)
         if session.get("status") != "ACTIVE":
-            continue
-        if (session.get("execution_mode") or "").upper() == "BACKTEST":
-            continue
-        session_date = _session_date(session)
-        if session_date is not None and session_date < today:
-            session["status"] = "STOPPED"
-            session["stop_reason"] = "NEW_DAY"
-            session["stoppedAt"] = now.isoformat()
+            if not session.get("stoppedAt"):
+                session["stoppedAt"] = now.isoformat()
             logger.info(
-                "[SESSION STOPPED] %s | reason=NEW_DAY | session_date=%s | today=%s",
+                "[SESSION STOPPED] %s | reason=%s",
                 session.get("sessionId"),
-                str(session_date),
-                str(today),
+                session.get("stop_reason") or "RISK_ENGINE",
             )
-            continue
-        
-        # Reset hourly trade count if hour changed
-        current_hour = now.hour
-        if session.get("current_hour_block") != current_hour:
-            session["current_hour_block"] = current_hour
-            session["hourly_trade_count"] = 0
-            logger.info(f"[FREQ] Hour changed to {current_hour}, resetting hourly count for {session.get('instrument')}")
-        if session.get("current_trade_id"):
-            try:
-                if _manage_trade_real(session):
-                    _save_trade_sessions()
-            except Exception as e:
-                logger.exception("Engine tick manage trade error for %s: %s", session.get("instrument"), str(e))
-            continue
-
-        # Mandatory centralized risk pre-entry gate (single source of truth).
+            return
+        if not risk_decision.approved:
+            # Keep AI heartbeat fresh even when entry is blocked by risk gates
+            # (cooldown/trade caps/etc.), so UI timer does not drift into large overdue values.
+            if session.get("ai_auto_switching_enabled", False):
+                session["last_ai_strategy_check"] = now.isoformat()
+            logger.info(
+                "[RISK GATE] Entry blocked | %s | %s",
+                session.get("sessionId"),
+                "; ".join(risk_decision.errors) if risk_decision.errors else "Not approved",
+            )
+            return
+    except Exception as e:
+        logger.exception("[RISK GATE] evaluate_entry failed for %s: %s", session.get("sessionId"), str(e))
+        return
+    
+    # AI Strategy Auto-Switching (if enabled)
+    if session.get("ai_auto_switching_enabled", False):
         try:
-            from engine.risk_engine import evaluate_entry
-
-            risk_decision = evaluate_entry(session, now=now)
-            session.update(risk_decision.updated_session_state)
-            if session.get("status") != "ACTIVE":
-                if not session.get("stoppedAt"):
-                    session["stoppedAt"] = now.isoformat()
-                logger.info(
-                    "[SESSION STOPPED] %s | reason=%s",
-                    session.get("sessionId"),
-                    session.get("stop_reason") or "RISK_ENGINE",
-                )
-                continue
-            if not risk_decision.approved:
-                # Keep AI heartbeat fresh even when entry is blocked by risk gates
-                # (cooldown/trade caps/etc.), so UI timer does not drift into large overdue values.
-                if session.get("ai_auto_switching_enabled", False):
-                    session["last_ai_strategy_check"] = now.isoformat()
-                logger.info(
-                    "[RISK GATE] Entry blocked | %s | %s",
-                    session.get("sessionId"),
-                    "; ".join(risk_decision.errors) if risk_decision.errors else "Not approved",
-                )
-                continue
-        except Exception as e:
-            logger.exception("[RISK GATE] evaluate_entry failed for %s: %s", session.get("sessionId"), str(e))
-            continue
+            last_ai_check = session.get("last_ai_strategy_check")
+            ai_check_interval_minutes = session.get("ai_check_interval_minutes", 1)
+            should_run_ai = True
+            if last_ai_check:
+                try:
+                    last_check_dt = datetime.fromisoformat(last_ai_check)
+                    minutes_since = (now - last_check_dt).total_seconds() / 60
+                    should_run_ai = minutes_since >= ai_check_interval_minutes
+                except Exception:
+                    pass
         
-        # AI Strategy Auto-Switching (if enabled)
-        if session.get("ai_auto_switching_enabled", False):
-            try:
-                last_ai_check = session.get("last_ai_strategy_check")
-                ai_check_interval_minutes = session.get("ai_check_interval_minutes", 1)
-                should_run_ai = True
-                if last_ai_check:
+            if should_run_ai:
+                # Heartbeat timestamp first, so UI timer doesn't drift to large overdue
+                # if AI context/logging fails for this cycle.
+                session["last_ai_strategy_check"] = now.isoformat()
+                ai_recommendation = None
+                try:
+                    # Gather market context with timeouts
+                    success, nifty = call_with_timeout(snapshot_value, MARKET, "nifty50_live", fetch_nifty50_live, timeout_seconds=5)
+                    if not success:
+                        nifty = None
+                    
+                    success, banknifty = call_with_timeout(snapshot_value, MARKET, "banknifty_live", fetch_bank_nifty_live, timeout_seconds=5)
+                    if not success:
+                        banknifty = None
+                    
+                    success, vix = call_with_timeout(snapshot_value, MARKET, "india_vix", fetch_india_vix, timeout_seconds=5)
+                    if not success:
+                        vix = None
+                
+                    # Get recent candles for price action analysis
+                    instrument = session.get("instrument", "")
+                    recent_candles = None
                     try:
-                        last_check_dt = datetime.fromisoformat(last_ai_check)
-                        minutes_since = (now - last_check_dt).total_seconds() / 60
-                        should_run_ai = minutes_since >= ai_check_interval_minutes
+                        success, candles_df = call_with_timeout(
+                            strategy_data_provider.get_recent_candles, 
+                            instrument, 
+                            interval="5m", 
+                            count=LIVE_AI_SESSION_CANDLE_COUNT, 
+                            period="1d",
+                            timeout_seconds=8
+                        )
+                        if success and candles_df:
+                            recent_candles = [
+                                {
+                                    "open": c.get("open", 0),
+                                    "high": c.get("high", 0),
+                                    "low": c.get("low", 0),
+                                    "close": c.get("close", 0),
+                                    "volume": c.get("volume", 0),
+                                    "date": c.get("date"),
+                                }
+                                for c in candles_df
+                            ]
                     except Exception:
                         pass
-            
-                if should_run_ai:
-                    # Heartbeat timestamp first, so UI timer doesn't drift to large overdue
-                    # if AI context/logging fails for this cycle.
-                    session["last_ai_strategy_check"] = now.isoformat()
-                    ai_recommendation = None
+                
+                    expiry_type = None
                     try:
-                        # Gather market context with timeouts
-                        success, nifty = call_with_timeout(fetch_nifty50_live, timeout_seconds=5)
-                        if not success:
-                            nifty = None
-                        
-                        success, banknifty = call_with_timeout(fetch_bank_nifty_live, timeout_seconds=5)
-                        if not success:
-                            banknifty = None
-                        
-                        success, vix = call_with_timeout(fetch_india_vix, timeout_seconds=5)
-                        if not success:
-                            vix = None
-                    
-                        # Get recent candles for price action analysis
-                        instrument = session.get("instrument", "")
-                        recent_candles = None
-                        try:
-                            success, candles_df = call_with_timeout(
-                                strategy_data_provider.get_recent_candles, 
-                                instrument, 
-                                interval="5m", 
-                                count=LIVE_AI_SESSION_CANDLE_COUNT, 
-                                period="1d",
-                                timeout_seconds=8
-                            )
-                            if success and candles_df:
-                                recent_candles = [
-                                    {
-                                        "open": c.get("open", 0),
-                                        "high": c.get("high", 0),
-                                        "low": c.get("low", 0),
-                                        "close": c.get("close", 0),
-                                        "volume": c.get("volume", 0),
-                                        "date": c.get("date"),
-                                    }
-                                    for c in candles_df
-                                ]
-                        except Exception:
-                            pass
-                    
+                        expiry_type = get_expiry_type_for_date(now.date())
+                    except Exception:
                         expiry_type = None
-                        try:
-                            expiry_type = get_expiry_type_for_date(now.date())
-                        except Exception:
-                            expiry_type = None
-
-                        context = get_market_context(
-                            nifty_price=nifty.get("last_price") if nifty else None,
-                            nifty_change_pct=nifty.get("change_percent") if nifty else None,
-                            banknifty_price=banknifty.get("last_price") if banknifty else None,
-                            banknifty_change_pct=banknifty.get("change_percent") if banknifty else None,
-                            vix=vix,
-                            current_time=now.strftime("%Y-%m-%d %H:%M:%S"),
-                            recent_candles=recent_candles,
-                            expiry_type=expiry_type,
-                        )
-                    
-                        current_strategy = (session.get("recommendation") or {}).get("strategyName")
-                    
-                        # === ENHANCED AI DECISION LOGGING ===
-                        logger.info(
-                            "╔══════════════════════════════════════════════════════════════╗\n"
-                            "║ AI STRATEGY EVALUATION                                       ║\n"
-                            "╠══════════════════════════════════════════════════════════════╣"
-                        )
-                        logger.info(f"║ Instrument: {session.get('instrument', 'Unknown'):<48} ║")
-                        logger.info(f"║ Current Strategy: {current_strategy or 'None':<42} ║")
-                        nifty_change = context.get("nifty_change_pct")
-                        try:
-                            nifty_change = float(nifty_change) if nifty_change is not None else 0.0
-                        except Exception:
-                            nifty_change = 0.0
-                        logger.info(
-                            f"║ NIFTY: {context.get('nifty_price', 'N/A'):<10} | Change: {nifty_change:.2f}%{' '*19} ║"
-                        )
-                        vix_value = context.get('vix', 'N/A')
-                        vix_str = str(vix_value) if not isinstance(vix_value, dict) else str(vix_value.get('value', 'N/A'))
-                        logger.info(f"║ VIX: {vix_str:<10}{' '*43} ║")
-                        logger.info("╠══════════════════════════════════════════════════════════════╣")
-                    
-                        # Call AI with timeout (GPT can be slow)
+
+                    context = get_market_context(
+                        nifty_price=nifty.get("last_price") if nifty else None,
+                        nifty_change_pct=nifty.get("change_percent") if nifty else None,
+                        banknifty_price=banknifty.get("last_price") if banknifty else None,
+                        banknifty_change_pct=banknifty.get("change_percent") if banknifty else None,
+                        vix=vix,
+                        current_time=now.strftime("%Y-%m-%d %H:%M:%S"),
+                        recent_candles=recent_candles,
+                        expiry_type=expiry_type,
+                    )
+                
+                    current_strategy = (session.get("recommendation") or {}).get("strategyName")
+                
+                    # === ENHANCED AI DECISION LOGGING ===
+                    logger.info(
+                        "╔══════════════════════════════════════════════════════════════╗\n"
+                        "║ AI STRATEGY EVALUATION                                       ║\n"
+                        "╠══════════════════════════════════════════════════════════════╣"
+                    )
+                    logger.info(f"║ Instrument: {session.get('instrument', 'Unknown'):<48} ║")
+                    logger.info(f"║ Current Strategy: {current_strategy or 'None':<42} ║")
+                    nifty_change = context.get("nifty_change_pct")
+                    try:
+                        nifty_change = float(nifty_change) if nifty_change is not None else 0.0
+                    except Exception:
+                        nifty_change = 0.0
+                    logger.info(
+                        f"║ NIFTY: {context.get('nifty_price', 'N/A'):<10} | Change: {nifty_change:.2f}%{' '*19} ║"
+                    )
+                    vix_value = context.get('vix', 'N/A')
+                    vix_str = str(vix_value) if not isinstance(vix_value, dict) else str(vix_value.get('value', 'N/A'))
+                    logger.info(f"║ VIX: {vix_str:<10}{' '*43} ║")
+                    logger.info("╠══════════════════════════════════════════════════════════════╣")
+                
+                    # Call AI with timeout (GPT can be slow)
+                    with profile_stage("ai_strategy"):
                         success, ai_recommendation = call_with_timeout(
                             get_ai_strategy_recommendation, 
                             context, 
                             current_strategy,
                             timeout_seconds=15
                         )
-                        if not success:
-                            ai_recommendation = None
-                    
-                        session["last_ai_recommendation"] = ai_recommendation
+                    if not success:
+                        ai_recommendation = None
+                
+                    session["last_ai_recommendation"] = ai_recommendation
+                
+                    if ai_recommendation:
+                        recommended_strategy = ai_recommendation.get("recommended_strategy", "N/A")
+                        confidence = ai_recommendation.get("confidence", "N/A")
+                        reasoning = ai_recommendation.get("reasoning", "No reasoning provided")
+                        market_condition = ai_recommendation.get("market_condition", "N/A")
                     
-                        if ai_recommendation:
-                            recommended_strategy = ai_recommendation.get("recommended_strategy", "N/A")
-                            confidence = ai_recommendation.get("confidence", "N/A")
-                            reasoning = ai_recommendation.get("reasoning", "No reasoning provided")
-                            market_condition = ai_recommendation.get("market_condition", "N/A")
-                        
-                            logger.info(f"║ GPT Recommended: {recommended_strategy:<43} ║")
-                            logger.info(f"║ Confidence: {confidence:<48} ║")
-                            logger.info(f"║ Market Condition: {market_condition:<44} ║")
-                            logger.info("╠══════════════════════════════════════════════════════════════╣")
-                            logger.info(f"║ GPT Reasoning:")
-                            for line in reasoning.split('. '):
-                                if line.strip():
-                                    logger.info(f"║   • {line.strip()[:58]:<58} ║")
-                            logger.info("╠══════════════════════════════════════════════════════════════╣")
-                        
-                            should_switch, new_strategy = should_switch_strategy(
-                                ai_recommendation,
-                                current_strategy,
-                                min_confidence="medium",
+                        logger.info(f"║ GPT Recommended: {recommended_strategy:<43} ║")
+                        logger.info(f"║ Confidence: {confidence:<48} ║")
+                        logger.info(f"║ Market Condition: {market_condition:<44} ║")
+                        logger.info("╠══════════════════════════════════════════════════════════════╣")
+                        logger.info(f"║ GPT Reasoning:")
+                        for line in reasoning.split('. '):
+                            if line.strip():
+                                logger.info(f"║   • {line.strip()[:58]:<58} ║")
+                        logger.info("╠══════════════════════════════════════════════════════════════╣")
+                    
+                        should_switch, new_strategy = should_switch_strategy(
+                            ai_recommendation,
+                            current_strategy,
+                            min_confidence="medium",
+                        )
+                    
+                        if should_switch and new_strategy:
+                            logger.info(
+                                f"║ DECISION: SWITCH TO {new_strategy:<39} ║\n"
+                                f"║ Reason: Confidence threshold met ({confidence})         ║\n"
+                                "╚══════════════════════════════════════════════════════════════╝"
                             )
-                        
-                            if should_switch and new_strategy:
-                                logger.info(
-                                    f"║ DECISION: SWITCH TO {new_strategy:<39} ║\n"
-                                    f"║ Reason: Confidence threshold met ({confidence})         ║\n"
-                                    "╚══════════════════════════════════════════════════════════════╝"
-                                )
-                                # Update session strategy
-                                if "recommendation" not in session:
-                                    session["recommendation"] = {}
-                                session["recommendation"]["strategyName"] = new_strategy
-                                session["ai_strategy_switches"] = session.get("ai_strategy_switches", 0) + 1
-                                _save_trade_sessions()
-                            else:
-                                logger.info(
-                                    f"║ DECISION: KEEP {current_strategy or 'current strategy':<42} ║\n"
-                                    f"║ Reason: {'Low confidence' if not should_switch else 'Same strategy recommended':<51} ║\n"
-                                    "╚══════════════════════════════════════════════════════════════╝"
-                                )
+                            # Update session strategy
+                            if "recommendation" not in session:
+                                session["recommendation"] = {}
+                            session["recommendation"]["strategyName"] = new_strategy
+                            session["ai_strategy_switches"] = session.get("ai_strategy_switches", 0) + 1
                         else:
                             logger.info(
-                                "║ GPT Response: NOT AVAILABLE (check API key/config)          ║\n"
                                 f"║ DECISION: KEEP {current_strategy or 'current strategy':<42} ║\n"
+                                f"║ Reason: {'Low confidence' if not should_switch else 'Same strategy recommended':<51} ║\n"
                                 "╚══════════════════════════════════════════════════════════════╝"
                             )
-                    except Exception as e:
-                        logger.exception("[AI ADVISOR] Error during strategy evaluation: %s", str(e))
-            except Exception as e:
-                logger.exception("[AI ADVISOR] Outer error for %s: %s", session.get("instrument"), str(e))
-        
-        # Check dynamic hourly trade frequency
-        capital = session.get("virtual_balance") or DEFAULT_INVESTMENT_AMOUNT
-        if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
-            live_capital = None
-            success, bal = call_with_timeout(get_balance, timeout_seconds=5)
-            if success and bal:
-                live_capital = bal[0]
-            if live_capital and live_capital > 0:
-                capital = live_capital
-        
-        daily_pnl = session.get("daily_pnl", 0)
-        max_trades_this_hour, freq_mode = calculate_max_trades_per_hour(capital, daily_pnl)
-        if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
-            max_trades_this_hour = min(int(max_trades_this_hour), int(LIVE_HARD_MAX_TRADES_PER_HOUR))
-        session["frequency_mode"] = freq_mode
-        
-        trades_this_hour = session.get("hourly_trade_count", 0)
-        
-        # Block if hourly limit reached
-        if trades_this_hour >= max_trades_this_hour:
-            logger.info(
-                f"[FREQ] Hourly limit reached for {session.get('instrument')} | "
-                f"{trades_this_hour}/{max_trades_this_hour} | Mode: {freq_mode}"
-            )
-            continue
-        
-        instrument = session.get("instrument", "")
-        # Re-pick best option contract before each fresh entry cycle (no open trade).
-        # Safety: this updates only option selection metadata and keeps current strategy intact.
-        try:
-            is_nfo_session = (session.get("exchange") or "").upper() == "NFO"
-            normalized_instrument = str(instrument or "").upper().replace(" ", "")
-            if is_nfo_session and normalized_instrument in {"NIFTY", "BANKNIFTY"}:
-                repick_capital = float(capital or DEFAULT_INVESTMENT_AMOUNT)
+                    else:
+                        logger.info(
+                            "║ GPT Response: NOT AVAILABLE (check API key/config)          ║\n"
+                            f"║ DECISION: KEEP {current_strategy or 'current strategy':<42} ║\n"
+                            "╚══════════════════════════════════════════════════════════════╝"
+                        )
+                except Exception as e:
+                    logger.exception("[AI ADVISOR] Error during strategy evaluation: %s", str(e))
+        except Exception as e:
+            logger.exception("[AI ADVISOR] Outer error for %s: %s", session.get("instrument"), str(e))
+    
+    # Check dynamic hourly trade frequency
+    capital = session.get("virtual_balance") or DEFAULT_INVESTMENT_AMOUNT
+    if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
+        live_capital = None
+        success, bal = call_with_timeout(get_balance, timeout_seconds=5)
+        if success and bal:
+            live_capital = bal[0]
+        if live_capital and live_capital > 0:
+            capital = live_capital
+    
+    daily_pnl = session.get("daily_pnl", 0)
+    max_trades_this_hour, freq_mode = calculate_max_trades_per_hour(capital, daily_pnl)
+    if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
+        max_trades_this_hour = min(int(max_trades_this_hour), int(LIVE_HARD_MAX_TRADES_PER_HOUR))
+    session["frequency_mode"] = freq_mode
+    
+    trades_this_hour = session.get("hourly_trade_count", 0)
+    
+    # Block if hourly limit reached
+    if trades_this_hour >= max_trades_this_hour:
+        logger.info(
+            f"[FREQ] Hourly limit reached for {session.get('instrument')} | "
+            f"{trades_this_hour}/{max_trades_this_hour} | Mode: {freq_mode}"
+        )
+        return
+    
+    instrument = session.get("instrument", "")
+    # Re-pick best option contract before each fresh entry cycle (no open trade).
+    # Safety: this updates only option selection metadata and keeps current strategy intact.
+    try:
+        is_nfo_session = (session.get("exchange") or "").upper() == "NFO"
+        normalized_instrument = str(instrument or "").upper().replace(" ", "")
+        if is_nfo_session and normalized_instrument in {"NIFTY", "BANKNIFTY"}:
+            repick_capital = float(capital or DEFAULT_INVESTMENT_AMOUNT)
+            with profile_stage("option_repick"):
                 latest_rec = build_ai_trade_recommendation_index(normalized_instrument, repick_capital)
-                if latest_rec:
-                    prev_rec = session.get("recommendation") or {}
-                    prev_strategy_name = prev_rec.get("strategyName")
-                    merged_rec = {**prev_rec, **latest_rec}
-                    if prev_strategy_name:
-                        merged_rec["strategyName"] = prev_strategy_name
-                    session["recommendation"] = merged_rec
-
-                    new_symbol = str(latest_rec.get("tradingsymbol") or "").strip()
-                    if new_symbol:
-                        old_symbol = str(session.get("tradingsymbol") or "").strip()
-                        session["tradingsymbol"] = new_symbol
-                        if old_symbol and old_symbol != new_symbol:
-                            logger.info(
-                                "[OPTION REPICK] %s | %s -> %s | premium=%.2f",
-                                session.get("sessionId"),
-                                old_symbol,
-                                new_symbol,
-                                float(latest_rec.get("premium") or 0.0),
-                            )
-                else:
-                    logger.info(
-                        "[OPTION REPICK] %s | No fresh recommendation, keeping previous option selection",
-                        session.get("sessionId"),
-                    )
-        except Exception as repick_err:
-            logger.exception(
-                "[OPTION REPICK] Error for %s: %s",
-                session.get("sessionId"),
-                str(repick_err),
-            )
-
-        strategy_id, strategy_name = _pick_best_strategy(instrument, session=session)
-
-        # Anti-churn gate: keep minimum spacing between successful entries in LIVE mode.
-        if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
-            try:
-                last_entry_at_raw = session.get("last_successful_entry_at")
-                if last_entry_at_raw:
-                    last_entry_at = datetime.fromisoformat(str(last_entry_at_raw))
-                    since_last = (now - last_entry_at).total_seconds()
-                    if since_last < LIVE_MIN_SECONDS_BETWEEN_ENTRIES:
-                        wait_left = int(LIVE_MIN_SECONDS_BETWEEN_ENTRIES - since_last)
-                        session["last_entry_check"] = {
-                            "timestamp": now.isoformat(),
-                            "strategy": strategy_name,
-                            "can_enter": False,
-                            "entry_price": None,
-                            "block_reason": f"Entry cooldown active ({wait_left}s left)",
-                            "risk_approved": False,
-                            "risk_reason": "Entry cooldown",
-                            "calculated_lots": None,
-                            "max_trades_this_hour": max_trades_this_hour,
-                            "trades_this_hour": trades_this_hour,
-                            "frequency_mode": freq_mode,
-                        }
+            if latest_rec:
+                prev_rec = session.get("recommendation") or {}
+                prev_strategy_name = prev_rec.get("strategyName")
+                merged_rec = {**prev_rec, **latest_rec}
+                if prev_strategy_name:
+                    merged_rec["strategyName"] = prev_strategy_name
+                session["recommendation"] = merged_rec
+
+                new_symbol = str(latest_rec.get("tradingsymbol") or "").strip()
+                if new_symbol:
+                    old_symbol = str(session.get("tradingsymbol") or "").strip()
+                    session["tradingsymbol"] = new_symbol
+                    if old_symbol and old_symbol != new_symbol:
                         logger.info(
-                            "[ENTRY COOLDOWN] %s | waiting %ss before next entry",
+                            "[OPTION REPICK] %s | %s -> %s | premium=%.2f",
                             session.get("sessionId"),
-                            wait_left,
+                            old_symbol,
+                            new_symbol,
+                            float(latest_rec.get("premium") or 0.0),
                         )
-                        continue
-            except Exception:
-                pass
-
-        can_enter, entry_price = _check_entry_real(session, strategy_name_override=strategy_name)
-        # Entry diagnostics for Manual Mode: always record last check (timestamp, strategy, can_enter, risk result)
-        block_reason: str | None = None
-        if not can_enter:
-            block_reason = ((session.get("entry_diagnostics") or {}).get("blocked_reason")) or "Condition not met"
-            logger.info("Entry not met | %s | %s", session.get("instrument", "—"), block_reason)
-        elif entry_price is None:
-            block_reason = "Entry price None"
-        session["last_entry_check"] = {
-            "timestamp": now.isoformat(),
-            "strategy": strategy_name,
-            "can_enter": bool(can_enter),
-            "entry_price": entry_price,
-            "block_reason": block_reason,
-            "risk_approved": None,
-            "risk_reason": None,
-            "calculated_lots": None,
-            "max_trades_this_hour": max_trades_this_hour,
-            "trades_this_hour": trades_this_hour,
-            "frequency_mode": freq_mode,
-            "total_score": (session.get("entry_diagnostics") or {}).get("total_score"),
-            "score_breakdown": (session.get("entry_diagnostics") or {}).get("score_breakdown"),
-            "sizing_multiplier": (session.get("entry_diagnostics") or {}).get("sizing_multiplier"),
-            "target_stop_profile": (session.get("entry_diagnostics") or {}).get("target_stop_profile"),
-        }
-        if can_enter and entry_price is not None:
-            try:
-                # === ENHANCED ORDER PLACEMENT LOGGING ===
+            else:
                 logger.info(
-                    "\n"
-                    "╔══════════════════════════════════════════════════════════════╗\n"
-                    "║ ORDER PLACEMENT CHECK                                        ║\n"
-                    "╠══════════════════════════════════════════════════════════════╣"
+                    "[OPTION REPICK] %s | No fresh recommendation, keeping previous option selection",
+                    session.get("sessionId"),
                 )
-                logger.info(f"║ Instrument: {session.get('instrument', 'Unknown'):<48} ║")
-                logger.info(f"║ Strategy: {strategy_name:<50} ║")
-                logger.info(f"║ Entry Signal: YES | Entry Price: ₹{entry_price:<23.2f} ║")
-                logger.info("╠══════════════════════════════════════════════════════════════╣")
+    except Exception as repick_err:
+        logger.exception(
+            "[OPTION REPICK] Error for %s: %s",
+            session.get("sessionId"),
+            str(repick_err),
+        )
+
+    with profile_stage("strategy_select"):
+        strategy_id, strategy_name = _pick_best_strategy(instrument, session=session)
+
+    # Anti-churn gate: keep minimum spacing between successful entries in LIVE mode.
+    if (session.get("execution_mode") or "PAPER").upper() == "LIVE":
+        try:
+            last_entry_at_raw = session.get("last_successful_entry_at")
+            if last_entry_at_raw:
+                last_entry_at = datetime.fromisoformat(str(last_entry_at_raw))
+                since_last = (now - last_entry_at).total_seconds()
+                if since_last < LIVE_MIN_SECONDS_BETWEEN_ENTRIES:
+                    wait_left = int(LIVE_MIN_SECONDS_BETWEEN_ENTRIES - since_last)
+                    session["last_entry_check"] = {
+                        "timestamp": now.isoformat(),
+                        "strategy": strategy_name,
+                        "can_enter": False,
+                        "entry_price": None,
+                        "block_reason": f"Entry cooldown active ({wait_left}s left)",
+                        "risk_approved": False,
+                        "risk_reason": "Entry cooldown",
+                        "calculated_lots": None,
+                        "max_trades_this_hour": max_trades_this_hour,
+                        "trades_this_hour": trades_this_hour,
+                        "frequency_mode": freq_mode,
+                    }
+                    logger.info(
+                        "[ENTRY COOLDOWN] %s | waiting %ss before next entry",
+                        session.get("sessionId"),
+                        wait_left,
+                    )
+                    return
+        except Exception:
+            pass
+
+    with profile_stage("entry_check"):
+        can_enter, entry_price = _check_entry_real(session, strategy_name_override=strategy_name)
+    # Entry diagnostics for Manual Mode: always record last check (timestamp, strategy, can_enter, risk result)
+    block_reason: str | None = None
+    if not can_enter:
+        block_reason = ((session.get("entry_diagnostics") or {}).get("blocked_reason")) or "Condition not met"
+        logger.info("Entry not met | %s | %s", session.get("instrument", "—"), block_reason)
+    elif entry_price is None:
+        block_reason = "Entry price None"
+    session["last_entry_check"] = {
+        "timestamp": now.isoformat(),
+        "strategy": strategy_name,
+        "can_enter": bool(can_enter),
+        "entry_price": entry_price,
+        "block_reason": block_reason,
+        "risk_approved": None,
+        "risk_reason": None,
+        "calculated_lots": None,
+        "max_trades_this_hour": max_trades_this_hour,
+        "trades_this_hour": trades_this_hour,
+        "frequency_mode": freq_mode,
+        "total_score": (session.get("entry_diagnostics") or {}).get("total_score"),
+        "score_breakdown": (session.get("entry_diagnostics") or {}).get("score_breakdown"),
+        "sizing_multiplier": (session.get("entry_diagnostics") or {}).get("sizing_multiplier"),
+        "target_stop_profile": (session.get("entry_diagnostics") or {}).get("target_stop_profile"),
+        "market_regime": _regime_brief(instrument),
+    }
+    if can_enter and entry_price is not None:
+        try:
+            # === ENHANCED ORDER PLACEMENT LOGGING ===
+            logger.info(
+                "\n"
+                "╔══════════════════════════════════════════════════════════════╗\n"
+                "║ ORDER PLACEMENT CHECK                                        ║\n"
+                "╠══════════════════════════════════════════════════════════════╣"
+            )
+            logger.info(f"║ Instrument: {session.get('instrument', 'Unknown'):<48} ║")
+            logger.info(f"║ Strategy: {strategy_name:<50} ║")
+            logger.info(f"║ Entry Signal: YES | Entry Price: ₹{entry_price:<23.2f} ║")
+            logger.info("╠══════════════════════════════════════════════════════════════╣")
+            
+            strategy = get_strategy_for_session(session, strategy_data_provider, strategy_name_override=strategy_name)
+            rec = session.get("recommendation") or {}
+            symbol = session.get("instrument", "")
+            side = "BUY"
+            lot_size = int(session.get("lot_size") or rec.get("lotSize") or 1)
+            if lot_size <= 0:
+                lot_size = 1
+            is_nfo = (session.get("exchange") or "").upper() == "NFO"
+            if is_nfo and session.get("tradingsymbol"):
+                from engine.zerodha_client import get_quote as kite_get_quote
+                success, opt_quote = call_with_timeout(kite_get_quote, session["tradingsymbol"], exchange="NFO", timeout_seconds=5)
+                if not success or not opt_quote:
+                    opt_quote = {}
                 
-                strategy = get_strategy_for_session(session, strategy_data_provider, strategy_name_override=strategy_name)
-                rec = session.get("recommendation") or {}
-                symbol = session.get("instrument", "")
-                side = "BUY"
-                lot_size = int(session.get("lot_size") or rec.get("lotSize") or 1)
-                if lot_size <= 0:
-                    lot_size = 1
-                is_nfo = (session.get("exchange") or "").upper() == "NFO"
-                if is_nfo and session.get("tradingsymbol"):
-                    from engine.zerodha_client import get_quote as kite_get_quote
-                    success, opt_quote = call_with_timeout(kite_get_quote, session["tradingsymbol"], exchange="NFO", timeout_seconds=5)
-                    if not success or not opt_quote:
-                        opt_quote = {}
-                    
-                    option_premium = float(opt_quote.get("last", 0) or opt_quote.get("last_price", 0))
-                    if option_premium and option_premium > 0:
-                        entry_price = option_premium
-                    else:
-                        entry_price = float(rec.get("premium") or 0)
-                    if not entry_price or entry_price <= 0:
-                        session["last_entry_check"]["block_reason"] = "Option price unavailable"
-                        session["last_entry_check"]["risk_approved"] = False
-                        session["last_entry_check"]["risk_reason"] = "Option price unavailable"
-                        continue
-                    mode_now = (session.get("execution_mode") or "PAPER").upper()
-                    score_for_profile = int(session.get("last_entry_score") or 0)
-                    profile_cfg = _target_stop_profile_for_score(score_for_profile) if mode_now == "LIVE" else _target_stop_profile_for_score(0)
-                    stop_loss = round(entry_price * float(profile_cfg.get("stop_mult") or 0.90), 2)
-                    target = round(entry_price * float(profile_cfg.get("target_mult") or 1.15), 2)
-                    session["last_entry_target_stop_profile"] = profile_cfg.get("name")
-                    session["last_entry_check"]["target_stop_profile"] = profile_cfg.get("name")
-                    logger.info(f"║ Option Type: F&O ({session.get('tradingsymbol')}) | Premium: ₹{entry_price:.2f}{' '*(60-len(session.get('tradingsymbol', ''))-20)} ║")
+                option_premium = float(opt_quote.get("last", 0) or opt_quote.get("last_price", 0))
+                if option_premium and option_premium > 0:
+                    entry_price = option_premium
                 else:
-                    # Use F&O-aware stop/target for options (wider stops, realistic targets)
-                    if strategy:
-                        if hasattr(strategy, 'get_stop_loss_fo_aware'):
-                            stop_loss = strategy.get_stop_loss_fo_aware(entry_price, session)
-                            target = strategy.get_target_fo_aware(entry_price, session)
-                        else:
-                            stop_loss = strategy.get_stop_loss(entry_price)
-                            target = strategy.get_target(entry_price)
-                    else:
-                        stop_loss = None
-                        target = None
-                    logger.info(f"║ Instrument Type: Equity/Index{' '*35} ║")
-                
-                logger.info(f"║ Stop Loss: ₹{stop_loss:<46.2f} ║")
-                logger.info(f"║ Target: ₹{target:<49.2f} ║")
-                risk_reward = ((target - entry_price) / (entry_price - stop_loss)) if stop_loss and stop_loss < entry_price else 0
-                logger.info(f"║ Risk/Reward Ratio: 1:{risk_reward:<36.2f} ║")
-                logger.info("╠══════════════════════════════════════════════════════════════╣")
-                capital = session.get("virtual_balance")
-                execution_mode = (session.get("execution_mode") or "PAPER").upper()
-                if execution_mode == "LIVE":
-                    success, balance_data = call_with_timeout(get_balance, timeout_seconds=5)
-                    if success and balance_data:
-                        live_capital = balance_data[0]
-                        capital = live_capital or 0
+                    entry_price = float(rec.get("premium") or 0)
+                if not entry_price or entry_price <= 0:
+                    session["last_entry_check"]["block_reason"] = "Option price unavailable"
+                    session["last_entry_check"]["risk_approved"] = False
+                    session["last_entry_check"]["risk_reason"] = "Option price unavailable"
+                    return
+                mode_now = (session.get("execution_mode") or "PAPER").upper()
+                score_for_profile = int(session.get("last_entry_score") or 0)
+                profile_cfg = _target_stop_profile_for_score(score_for_profile) if mode_now == "LIVE" else _target_stop_profile_for_score(0)
+                stop_loss = round(entry_price * float(profile_cfg.get("stop_mult") or 0.90), 2)
+                target = round(entry_price * float(profile_cfg.get("target_mult") or 1.15), 2)
+                session["last_entry_target_stop_profile"] = profile_cfg.get("name")
+                session["last_entry_check"]["target_stop_profile"] = profile_cfg.get("name")
+                logger.info(f"║ Option Type: F&O ({session.get('tradingsymbol')}) | Premium: ₹{entry_price:.2f}{' '*(60-len(session.get('tradingsymbol', ''))-20)} ║")
+            else:
+                # Use F&O-aware stop/target for options (wider stops, realistic targets)
+                if strategy:
+                    if hasattr(strategy, 'get_stop_loss_fo_aware'):
+                        stop_loss = strategy.get_stop_loss_fo_aware(entry_price, session)
+                        target = strategy.get_target_fo_aware(entry_price, session)
                     else:
-                        capital = 0
-                if capital is None or capital <= 0:
-                    capital = DEFAULT_INVESTMENT_AMOUNT
-                
-                logger.info(f"║ Execution Mode: {execution_mode:<44} ║")
-                logger.info(f"║ Capital Available: ₹{capital:<41.2f} ║")
-                logger.info("╠══════════════════════════════════════════════════════════════╣")
-                
-                risk_config = RiskConfig(
-                    capital=float(capital),
-                    risk_percent_per_trade=float(rec.get("risk_percent_per_trade") or 1.0),
-                    max_daily_loss_percent=float(rec.get("max_daily_loss_percent") or 3.0),
-                    max_trades=100,  # No longer used - dynamic hourly frequency controls this
-                )
-                logger.info(f"║ Risk Per Trade: {risk_config.risk_percent_per_trade:.1f}%{' '*40} ║")
-                logger.info(f"║ Max Daily Loss: {risk_config.max_daily_loss_percent:.1f}%{' '*40} ║")
-                
-                risk_mgr = RiskManager(risk_config)
-                # For options always size on live premium, not stale recommendation premium.
-                if is_nfo:
-                    premium = float(entry_price)
+                        stop_loss = strategy.get_stop_loss(entry_price)
+                        target = strategy.get_target(entry_price)
                 else:
-                    premium = rec.get("premium")
-                if premium is not None:
-                    premium = float(premium)
-                stop_for_risk = stop_loss if stop_loss is not None and stop_loss != entry_price else entry_price * 0.995
-                approved, reason, lots = risk_mgr.validate_trade(
-                    session, entry_price, stop_for_risk, lot_size, premium=premium
-                )
-                sizing_multiplier = float(session.get("last_entry_sizing_multiplier") or 1.0)
-                sizing_note = ""
-                if approved and lots >= 1 and execution_mode == "LIVE":
-                    try:
-                        base_lots = int(lots)
-                        scaled_lots = int(base_lots * max(0.01, min(1.0, sizing_multiplier)))
-                        lots = max(1, scaled_lots)
-                        if lots != base_lots:
-                            sizing_note = f" | score sizing ({base_lots} -> {lots} lots, x{sizing_multiplier:.2f})"
-                    except Exception:
-                        pass
-                # Update diagnostics with risk result
-                session["last_entry_check"]["risk_approved"] = approved
-                session["last_entry_check"]["risk_reason"] = reason
-                session["last_entry_check"]["calculated_lots"] = lots
-                session["last_entry_check"]["sizing_multiplier"] = sizing_multiplier
-                
-                logger.info("╠══════════════════════════════════════════════════════════════╣")
-                logger.info(f"║ Risk Check Result: {('APPROVED' if approved else 'REJECTED'):<43} ║")
-                if approved:
-                    logger.info(f"║ Lot Size: {lot_size:<50} ║")
-                    logger.info(f"║ Lots Calculated: {lots:<45} ║")
-                    if sizing_note:
-                        logger.info(f"║ Sizing Note: {sizing_note:<46} ║")
-                    qty = lots * lot_size
-                    logger.info(f"║ Total Quantity: {qty:<46} ║")
-                    risk_amount = abs(entry_price - stop_for_risk) * qty
-                    logger.info(f"║ Risk Amount: ₹{risk_amount:<45.2f} ║")
-                    logger.info("╠══════════════════════════════════════════════════════════════╣")
-                    logger.info(f"║ ACTION: PLACING ORDER{' '*39} ║")
-                    logger.info("╚══════════════════════════════════════════════════════════════╝\n")
+                    stop_loss = None
+                    target = None
+                logger.info(f"║ Instrument Type: Equity/Index{' '*35} ║")
+            
+            logger.info(f"║ Stop Loss: ₹{stop_loss:<46.2f} ║")
+            logger.info(f"║ Target: ₹{target:<49.2f} ║")
+            risk_reward = ((target - entry_price) / (entry_price - stop_loss)) if stop_loss and stop_loss < entry_price else 0
+            logger.info(f"║ Risk/Reward Ratio: 1:{risk_reward:<36.2f} ║")
+            logger.info("╠══════════════════════════════════════════════════════════════╣")
+            capital = session.get("virtual_balance")
+            execution_mode = (session.get("execution_mode") or "PAPER").upper()
+            if execution_mode == "LIVE":
+                success, balance_data = call_with_timeout(get_balance, timeout_seconds=5)
+                if success and balance_data:
+                    live_capital = balance_data[0]
+                    capital = live_capital or 0
                 else:
-                    logger.info(f"║ Reason: {reason:<52} ║")
-                    logger.info("╠══════════════════════════════════════════════════════════════╣")
-                    logger.info(f"║ ACTION: ORDER REJECTED{' '*37} ║")
-                    logger.info("╚══════════════════════════════════════════════════════════════╝\n")
-                    
-                if not approved or lots < 1:
-                    session["last_entry_check"]["block_reason"] = reason or "Insufficient capital for position"
-                    continue
+                    capital = 0
+            if capital is None or capital <= 0:
+                capital = DEFAULT_INVESTMENT_AMOUNT
+            
+            logger.info(f"║ Execution Mode: {execution_mode:<44} ║")
+            logger.info(f"║ Capital Available: ₹{capital:<41.2f} ║")
+            logger.info("╠══════════════════════════════════════════════════════════════╣")
+            
+            risk_config = RiskConfig(
+                capital=float(capital),
+                risk_percent_per_trade=float(rec.get("risk_percent_per_trade") or 1.0),
+                max_daily_loss_percent=float(rec.get("max_daily_loss_percent") or 3.0),
+                max_trades=100,  # No longer used - dynamic hourly frequency controls this
+            )
+            logger.info(f"║ Risk Per Trade: {risk_config.risk_percent_per_trade:.1f}%{' '*40} ║")
+            logger.info(f"║ Max Daily Loss: {risk_config.max_daily_loss_percent:.1f}%{' '*40} ║")
+            
+            risk_mgr = RiskManager(risk_config)
+            # For options always size on live premium, not stale recommendation premium.
+            if is_nfo:
+                premium = float(entry_price)
+            else:
+                premium = rec.get("premium")
+            if premium is not None:
+                premium = float(premium)
+            stop_for_risk = stop_loss if stop_loss is not None and stop_loss != entry_price else entry_price * 0.995
+            approved, reason, lots = risk_mgr.validate_trade(
+                session, entry_price, stop_for_risk, lot_size, premium=premium
+            )
+            sizing_multiplier = float(session.get("last_entry_sizing_multiplier") or 1.0)
+            sizing_note = ""
+            if approved and lots >= 1 and execution_mode == "LIVE":
+                try:
+                    base_lots = int(lots)
+                    scaled_lots = int(base_lots * max(0.01, min(1.0, sizing_multiplier)))
+                    lots = max(1, scaled_lots)
+                    if lots != base_lots:
+                        sizing_note = f" | score sizing ({base_lots} -> {lots} lots, x{sizing_multiplier:.2f})"
+                except Exception:
+                    pass
+            # Update diagnostics with risk result
+            session["last_entry_check"]["risk_approved"] = approved
+            session["last_entry_check"]["risk_reason"] = reason
+            session["last_entry_check"]["calculated_lots"] = lots
+            session["last_entry_check"]["sizing_multiplier"] = sizing_multiplier
+            
+            logger.info("╠══════════════════════════════════════════════════════════════╣")
+            logger.info(f"║ Risk Check Result: {('APPROVED' if approved else 'REJECTED'):<43} ║")
+            if approved:
+                logger.info(f"║ Lot Size: {lot_size:<50} ║")
+                logger.info(f"║ Lots Calculated: {lots:<45} ║")
+                if sizing_note:
+                    logger.info(f"║ Sizing Note: {sizing_note:<46} ║")
                 qty = lots * lot_size
+                logger.info(f"║ Total Quantity: {qty:<46} ║")
+                risk_amount = abs(entry_price - stop_for_risk) * qty
+                logger.info(f"║ Risk Amount: ₹{risk_amount:<45.2f} ║")
+                logger.info("╠══════════════════════════════════════════════════════════════╣")
+                logger.info(f"║ ACTION: PLACING ORDER{' '*39} ║")
+                logger.info("╚══════════════════════════════════════════════════════════════╝\n")
+            else:
+                logger.info(f"║ Reason: {reason:<52} ║")
+                logger.info("╠══════════════════════════════════════════════════════════════╣")
+                logger.info(f"║ ACTION: ORDER REJECTED{' '*37} ║")
+                logger.info("╚══════════════════════════════════════════════════════════════╝\n")
+                
+            if not approved or lots < 1:
+                session["last_entry_check"]["block_reason"] = reason or "Insufficient capital for position"
+                return
+            qty = lots * lot_size
 
-                # Hard risk guard for LIVE/PAPER: never place a looser stop than max loss per trade.
-                # This keeps protective stop aligned with the configured Rs.300 cap policy.
-                max_loss_per_trade = min(300.0, float(session.get("risk_amount_per_trade") or 300.0))
-                if qty > 0 and stop_loss is not None:
-                    try:
-                        raw_stop = float(stop_loss)
-                        entry_px = float(entry_price)
-                        max_loss_distance = max_loss_per_trade / float(qty)
-                        if side.upper() == "BUY":
-                            capped_stop = round(entry_px - max_loss_distance, 2)
-                            # For long trades, higher stop is tighter (safer).
-                            if raw_stop < capped_stop:
-                                logger.warning(
-                                    "[RISK CLAMP] Tightening stop loss | session=%s | entry=%.2f | old_stop=%.2f | new_stop=%.2f | qty=%s | max_loss=%.2f",
-                                    session.get("sessionId"),
-                                    entry_px,
-                                    raw_stop,
-                                    capped_stop,
-                                    qty,
-                                    max_loss_per_trade,
-                                )
-                                stop_loss = capped_stop
-                        else:
-                            capped_stop = round(entry_px + max_loss_distance, 2)
-                            # For short trades, lower stop is tighter (safer).
-                            if raw_stop > capped_stop:
-                                logger.warning(
-                                    "[RISK CLAMP] Tightening stop loss | session=%s | entry=%.2f | old_stop=%.2f | new_stop=%.2f | qty=%s | max_loss=%.2f",
-                                    session.get("sessionId"),
-                                    entry_px,
-                                    raw_stop,
-                                    capped_stop,
-                                    qty,
-                                    max_loss_per_trade,
-                                )
-                                stop_loss = capped_stop
-                    except Exception:
-                        pass
-
-                # Enforce fixed 1:R target after final stop is set (prevents too-early exits from near targets).
-                if (
-                    execution_mode == "LIVE"
-                    and LIVE_ENFORCE_FIXED_RR
-                    and stop_loss is not None
-                    and target is not None
-                ):
-                    try:
-                        rr_target = _apply_fixed_rr_target(float(entry_price), float(stop_loss), side=side)
-                        if rr_target > 0:
-                            target = rr_target
-                            session["last_entry_check"]["target_stop_profile"] = (
-                                f"{session.get('last_entry_check', {}).get('target_stop_profile') or 'PROFILE'} + RR_1:{LIVE_TARGET_R_MULTIPLIER:.2f}"
+            # Hard risk guard for LIVE/PAPER: never place a looser stop than max loss per trade.
+            # This keeps protective stop aligned with the configured Rs.300 cap policy.
+            max_loss_per_trade = min(300.0, float(session.get("risk_amount_per_trade") or 300.0))
+            if qty > 0 and stop_loss is not None:
+                try:
+                    raw_stop = float(stop_loss)
+                    entry_px = float(entry_price)
+                    max_loss_distance = max_loss_per_trade / float(qty)
+                    if side.upper() == "BUY":
+                        capped_stop = round(entry_px - max_loss_distance, 2)
+                        # For long trades, higher stop is tighter (safer).
+                        if raw_stop < capped_stop:
+                            logger.warning(
+                                "[RISK CLAMP] Tightening stop loss | session=%s | entry=%.2f | old_stop=%.2f | new_stop=%.2f | qty=%s | max_loss=%.2f",
+                                session.get("sessionId"),
+                                entry_px,
+                                raw_stop,
+                                capped_stop,
+                                qty,
+                                max_loss_per_trade,
                             )
-                            logger.info(
-                                "[RR ENFORCE] session=%s | entry=%.2f | stop=%.2f | target=%.2f | rr=1:%.2f",
+                            stop_loss = capped_stop
+                    else:
+                        capped_stop = round(entry_px + max_loss_distance, 2)
+                        # For short trades, lower stop is tighter (safer).
+                        if raw_stop > capped_stop:
+                            logger.warning(
+                                "[RISK CLAMP] Tightening stop loss | session=%s | entry=%.2f | old_stop=%.2f | new_stop=%.2f | qty=%s | max_loss=%.2f",
                                 session.get("sessionId"),
-                                float(entry_price),
-                                float(stop_loss),
-                                float(target),
-                                float(LIVE_TARGET_R_MULTIPLIER),
+                                entry_px,
+                                raw_stop,
+                                capped_stop,
+                                qty,
+                                max_loss_per_trade,
                             )
-                    except Exception:
-                        pass
-                
-                # Log pre-execution state
-                logger.info(f"[ORDER EXECUTION] Calling execute_entry for {symbol} | Mode: {execution_mode}")
+                            stop_loss = capped_stop
+                except Exception:
+                    pass
+
+            # Enforce fixed 1:R target after final stop is set (prevents too-early exits from near targets).
+            if (
+                execution_mode == "LIVE"
+                and LIVE_ENFORCE_FIXED_RR
+                and stop_loss is not None
+                and target is not None
+            ):
                 try:
-                    from engine.risk_engine import evaluate_entry
-
-                    pre_exec_decision = evaluate_entry(session, now=now)
-                    session.update(pre_exec_decision.updated_session_state)
-                    if not pre_exec_decision.approved:
-                        reason = "; ".join(pre_exec_decision.errors) if pre_exec_decision.errors else "Risk engine rejected entry"
-                        logger.info("[RISK GATE] Pre-exec reject | %s | %s", session.get("sessionId"), reason)
-                        session["last_entry_check"]["block_reason"] = reason
-                        session["last_entry_check"]["risk_approved"] = False
-                        if session.get("status") != "ACTIVE" and not session.get("stoppedAt"):
-                            session["stoppedAt"] = now.isoformat()
-                        continue
-                except Exception as e:
-                    logger.exception("[RISK GATE] Pre-exec evaluate_entry failed for %s: %s", session.get("sessionId"), str(e))
-                    session["last_entry_check"]["block_reason"] = "Risk engine error"
+                    rr_target = _apply_fixed_rr_target(float(entry_price), float(stop_loss), side=side)
+                    if rr_target > 0:
+                        target = rr_target
+                        session["last_entry_check"]["target_stop_profile"] = (
+                            f"{session.get('last_entry_check', {}).get('target_stop_profile') or 'PROFILE'} + RR_1:{LIVE_TARGET_R_MULTIPLIER:.2f}"
+                        )
+                        logger.info(
+                            "[RR ENFORCE] session=%s | entry=%.2f | stop=%.2f | target=%.2f | rr=1:%.2f",
+                            session.get("sessionId"),
+                            float(entry_price),
+                            float(stop_loss),
+                            float(target),
+                            float(LIVE_TARGET_R_MULTIPLIER),
+                        )
+                except Exception:
+                    pass
+            
+            # Log pre-execution state
+            logger.info(f"[ORDER EXECUTION] Calling execute_entry for {symbol} | Mode: {execution_mode}")
+            try:
+                from engine.risk_engine import evaluate_entry
+
+                pre_exec_decision = evaluate_entry(session, now=now)
+                session.update(pre_exec_decision.updated_session_state)
+                if not pre_exec_decision.approved:
+                    reason = "; ".join(pre_exec_decision.errors) if pre_exec_decision.errors else "Risk engine rejected entry"
+                    logger.info("[RISK GATE] Pre-exec reject | %s | %s", session.get("sessionId"), reason)
+                    session["last_entry_check"]["block_reason"] = reason
                     session["last_entry_check"]["risk_approved"] = False
-                    continue
-                
+                    if session.get("status") != "ACTIVE" and not session.get("stoppedAt"):
+                        session["stoppedAt"] = now.isoformat()
+                    return
+            except Exception as e:
+                logger.exception("[RISK GATE] Pre-exec evaluate_entry failed for %s: %s", session.get("sessionId"), str(e))
+                session["last_entry_check"]["block_reason"] = "Risk engine error"
+                session["last_entry_check"]["risk_approved"] = False
+                return
+            
+            with profile_stage("order_placement"):
                 exec_ok, exec_result = call_with_timeout(
                     execute_entry,
                     session, symbol, side, qty,
@@ -4623,45 +4549,42 @@ def _do_session_engine_tick_locked(now: datetime) -> None:
                     target=target,
                     timeout_seconds=30
                 )
-                if not exec_ok or not (exec_result and exec_result.get("success")):
-                    err = (exec_result or {}).get("error") if isinstance(exec_result, dict) else None
-                    logger.warning(
-                        "[ORDER FAILED] Entry not confirmed | %s | reason=%s",
-                        session.get("instrument"),
-                        err or "timeout/failure",
-                    )
-                    session["last_entry_check"]["block_reason"] = err or "Order not confirmed"
-                    session["last_entry_check"]["risk_approved"] = False
-                    continue
-                
-                # Log post-execution
-                actual_entry_price = ((session.get("current_trade") or {}).get("entry_price")) or entry_price
-                logger.info(
-                    f"[ORDER SUCCESS] Trade executed | {symbol} | Qty: {qty} | "
-                    f"Entry: ₹{float(actual_entry_price):.2f} | SL: ₹{stop_loss:.2f} | Target: ₹{target:.2f}"
-                )
-                
-                # Increment hourly trade count after successful entry
-                session["last_successful_entry_at"] = now.isoformat()
-                session["hourly_trade_count"] = session.get("hourly_trade_count", 0) + 1
-                logger.info(
-                    f"[FREQ] Trade executed for {session.get('instrument')} | "
-                    f"Hour: {session.get('current_hour_block')} | "
-                    f"Count: {session['hourly_trade_count']}/{max_trades_this_hour}"
-                )
-                _save_trade_sessions()
-            except Exception as e:
-                logger.exception(f"[ORDER ERROR] Entry execution failed: {str(e)}")
-                logger.error(
-                    "╔══════════════════════════════════════════════════════════════╗\n"
-                    f"║ ERROR DURING ORDER PLACEMENT{' '*32} ║\n"
-                    f"║ {str(e)[:59]:<59} ║\n"
-                    "╚══════════════════════════════════════════════════════════════╝\n"
+            if not exec_ok or not (exec_result and exec_result.get("success")):
+                err = (exec_result or {}).get("error") if isinstance(exec_result, dict) else None
+                logger.warning(
+                    "[ORDER FAILED] Entry not confirmed | %s | reason=%s",
+                    session.get("instrument"),
+                    err or "timeout/failure",
                 )
-                session["last_entry_check"]["block_reason"] = f"Error: {e!s}"
+                session["last_entry_check"]["block_reason"] = err or "Order not confirmed"
                 session["last_entry_check"]["risk_approved"] = False
-    engine_state["last_tick"] = now.isoformat()
-    _save_trade_sessions()
+                return
+            
+            # Log post-execution
+            actual_entry_price = ((session.get("current_trade") or {}).get("entry_price")) or entry_price
+            logger.info(
+                f"[ORDER SUCCESS] Trade executed | {symbol} | Qty: {qty} | "
+                f"Entry: ₹{float(actual_entry_price):.2f} | SL: ₹{stop_loss:.2f} | Target: ₹{target:.2f}"
+            )
+            
+            # Increment hourly trade count after successful entry
+            session["last_successful_entry_at"] = now.isoformat()
+            session["hourly_trade_count"] = session.get("hourly_trade_count", 0) + 1
+            logger.info(
+                f"[FREQ] Trade executed for {session.get('instrument')} | "
+                f"Hour: {session.get('current_hour_block')} | "
+                f"Count: {session['hourly_trade_count']}/{max_trades_this_hour}"
+            )
+        except Exception as e:
+            logger.exception(f"[ORDER ERROR] Entry execution failed: {str(e)}")
+            logger.error(
+                "╔══════════════════════════════════════════════════════════════╗\n"
+                f"║ ERROR DURING ORDER PLACEMENT{' '*32} ║\n"
+                f"║ {str(e)[:59]:<59} ║\n"
+                "╚══════════════════════════════════════════════════════════════╝\n"
+            )
+            session["last_entry_check"]["block_reason"] = f"Error: {e!s}"
+            session["last_entry_check"]["risk_approved"] = False
 
 
 def _engine_status_for_api() -> dict:
@@ -4727,6 +4650,10 @@ def _engine_status_for_api() -> dict:
         "ai_expiry_awareness": ai_expiry_awareness,
         "is_expiry_day": is_expiry_day,
         "expiry_type": expiry_type,
+        "last_tick_stats": dict(_session_tick_engine.last_tick_stats),
+        "market_snapshot": snapshot_stats(),
+        "quote_gateway": get_quote_gateway().stats(),
+        "option_chain": dict(get_option_chain_engine().stats),
     }
 
 
@@ -4999,6 +4926,33 @@ def api_engine_status():
     })
 
 
+@app.route("/api/engine/metrics")
+def api_engine_metrics():
+    """
+    GET: engine tick profiler — per-stage latency p50/p95/p99, slowest sessions, broker/LLM call
+    counts (JSON). ?format=prometheus returns the Prometheus text exposition. Recording requires
+    ENGINE_PROFILING=1; otherwise only last_tick_stats is reported.
+    """
+    profiler = get_tick_profiler()
+    if (request.args.get("format") or "").lower() == "prometheus":
+        return Response(profiler.prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify({
+        **profiler.snapshot(),
+        "last_tick_stats": dict(_session_tick_engine.last_tick_stats),
+    })
+
+
+@app.route("/api/market/regimes")
+def api_market_regimes():
+    """GET: published market regime table of the F&O watchlist (regime, quality, per-timeframe metrics)."""
+    service = get_regime_service()
+    if service is None:
+        return jsonify({"ok": False, "error": "Regime service not running", "regimes": []})
+    table = service.table()
+    rows = sorted(table.values(), key=lambda r: -r["quality_score"])
+    return jsonify({"ok": True, "regimes": rows, "status": service.status()})
+
+
 @app.route("/api/logs")
 def api_get_logs():
     """GET /api/logs?mode=live|paper|backtest&lines=100: Fetch recent logs for specified mode."""
@@ -5108,17 +5062,9 @@ def api_trade_history():
     today_only = request.args.get("today", "").strip().lower() in ("1", "true", "yes")
     from_date = request.args.get("from_date", "").strip() or None
     to_date = request.args.get("to_date", "").strip() or None
-    trades = get_stored_trade_history(mode=mode, session_id=session_id)
-    if today_only and trades:
-        today_ist = datetime.now(ZoneInfo("Asia/Kolkata")).date().isoformat()
-        trades = [t for t in trades if (t.get("entry_time") or "")[:10] == today_ist]
-    if trades and (from_date or to_date):
-        def entry_date(t):
-            return (t.get("entry_time") or "")[:10]
-        if from_date:
-            trades = [t for t in trades if entry_date(t) >= from_date]
-        if to_date:
-            trades = [t for t in trades if entry_date(t) <= to_date]
+    if today_only:
+        from_date = to_date = datetime.now(ZoneInfo("Asia/Kolkata")).date().isoformat()
+    trades = get_stored_trade_history(mode=mode, session_id=session_id, from_date=from_date, to_date=to_date)
     return jsonify({"trades": trades})
 
 
@@ -5240,6 +5186,221 @@ def api_backtest_results():
     return jsonify({"runs": runs})
 
 
+@app.route("/api/backtest/sweep", methods=["POST"])
+def api_backtest_sweep():
+    """
+    POST /api/backtest/sweep: parallel parameter sweep (instruments x strategies x date ranges x risk params).
+    Body: instruments, strategies (omit for every strategy), date_ranges [{from_date, to_date}],
+    risk_params [{risk_percent_per_trade, max_daily_loss_percent, max_trades, initial_capital}], timeframe, max_workers.
+    Streams progress (SSE) and ends with the ranked leaderboard.
+    """
+    from backtest.batch_runner import build_sweep_grid, run_parameter_sweep
+    data = request.get_json() or {}
+    instruments = [str(i).strip().upper() for i in (data.get("instruments") or ["NIFTY"]) if str(i).strip()]
+    strategies = data.get("strategies") or None
+    default_from = (date.today() - timedelta(days=30)).isoformat()
+    default_to = date.today().isoformat()
+    date_ranges = [
+        (r.get("from_date") or default_from, r.get("to_date") or default_to)
+        for r in (data.get("date_ranges") or [{}])
+    ]
+    allowed_risk_keys = ("initial_capital", "risk_percent_per_trade", "max_daily_loss_percent", "max_trades")
+    try:
+        risk_params = [
+            {k: (int(v) if k == "max_trades" else float(v)) for k, v in (r or {}).items() if k in allowed_risk_keys}
+            for r in (data.get("risk_params") or [{}])
+        ]
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "Invalid risk_params"}), 400
+    timeframe = data.get("timeframe") or "5minute"
+    max_workers = data.get("max_workers")
+    jobs = build_sweep_grid(instruments, strategies, date_ranges, risk_params, timeframe=timeframe)
+    if not jobs:
+        return jsonify({"ok": False, "error": "Empty sweep grid"}), 400
+    logger.info(f"[SWEEP] Starting {len(jobs)} runs: {len(instruments)} instruments, {len(date_ranges)} ranges")
+    return _stream_backtest_job(
+        lambda progress: run_parameter_sweep(
+            jobs,
+            max_workers=int(max_workers) if max_workers else None,
+            progress_callback=progress,
+        ),
+        {"type": "start", "message": f"Running {len(jobs)} backtests...", "total": len(jobs), "progress": 0},
+        "SWEEP",
+    )
+
+
+def _stream_backtest_job(run, start_event, tag):
+    """
+    SSE response for a long backtest job: run(progress_callback) executes on a background thread,
+    its progress events are streamed as they arrive, and the stream ends with
+    {"type": "complete", "result"} or {"type": "error"}. Pings keep idle connections open.
+    """
+
+    def generate_progress():
+        """Generator function for streaming progress updates"""
+        import json
+        import threading
+        import queue
+
+        progress_queue = queue.Queue()
+        result_container = {"result": None, "error": None}
+
+        def run_job_thread():
+            try:
+                result_container["result"] = run(progress_queue.put)
+            except Exception as e:
+                logger.exception(f"[{tag}] Error: {str(e)}")
+                result_container["error"] = str(e)
+            finally:
+                progress_queue.put({"type": "done"})
+
+        thread = threading.Thread(target=run_job_thread)
+        thread.daemon = True
+        thread.start()
+
+        yield f"data: {json.dumps(start_event)}\n\n"
+
+        while True:
+            try:
+                data = progress_queue.get(timeout=1)
+                if data.get("type") == "done":
+                    if result_container["error"]:
+                        yield f"data: {json.dumps({'type': 'error', 'error': result_container['error']})}\n\n"
+                    else:
+                        yield f"data: {json.dumps({'type': 'complete', 'result': result_container['result']})}\n\n"
+                    break
+                yield f"data: {json.dumps(data)}\n\n"
+            except queue.Empty:
+                yield f"data: {json.dumps({'type': 'ping'})}\n\n"
+            except Exception as e:
+                logger.exception(f"[{tag}] Stream error: {str(e)}")
+                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                break
+
+    return Response(generate_progress(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route("/api/backtest/walk-forward", methods=["POST"])
+def api_backtest_walk_forward():
+    """
+    POST /api/backtest/walk-forward: walk-forward optimisation of one strategy.
+    Body: instrument, strategy, from_date, to_date, timeframe, grid {param: [values]} (stop_mult,
+    target_mult and the strategy's PARAMS), train_days, test_days, step_days, anchored, objective
+    (net_pnl | sharpe | profit_factor | calmar), min_trades, risk {...}, mc_sims, mc_seed, max_workers.
+    Streams progress (SSE) and ends with the result, which is also saved to the results store.
+    """
+    from backtest.walk_forward import OBJECTIVES, param_grid, run_walk_forward
+    data = request.get_json() or {}
+    instrument = (data.get("instrument") or "").strip().upper() or "NIFTY"
+    strategy = data.get("strategy") or "Momentum Breakout"
+    from_date = data.get("from_date") or (date.today() - timedelta(days=90)).isoformat()
+    to_date = data.get("to_date") or date.today().isoformat()
+    grid = data.get("grid") or {"stop_mult": [0.75, 1.0, 1.5], "target_mult": [0.75, 1.0, 1.5]}
+    objective = data.get("objective") or "net_pnl"
+    if not isinstance(grid, dict) or not all(isinstance(v, list) for v in grid.values()):
+        return jsonify({"ok": False, "error": "grid must map parameter names to lists of values"}), 400
+    if objective not in OBJECTIVES:
+        return jsonify({"ok": False, "error": f"objective must be one of {list(OBJECTIVES)}"}), 400
+    allowed_risk_keys = ("initial_capital", "risk_percent_per_trade", "max_daily_loss_percent", "max_trades")
+    try:
+        risk = {k: (int(v) if k == "max_trades" else float(v)) for k, v in (data.get("risk") or {}).items() if k in allowed_risk_keys}
+        train_days = int(data.get("train_days") or 20)
+        test_days = int(data.get("test_days") or 5)
+        step_days = int(data["step_days"]) if data.get("step_days") else None
+        min_trades = int(data.get("min_trades") if data.get("min_trades") is not None else 3)
+        mc_sims = int(data.get("mc_sims") if data.get("mc_sims") is not None else 1000)
+        mc_seed = int(data["mc_seed"]) if data.get("mc_seed") is not None else None
+        max_workers = int(data["max_workers"]) if data.get("max_workers") else None
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "Invalid numeric parameter"}), 400
+    combos = len(param_grid(grid)) or 1
+    logger.info(f"[WALK-FORWARD] Starting {instrument} {strategy}: {combos} parameter sets, {train_days}/{test_days} day windows")
+    return _stream_backtest_job(
+        lambda progress: run_walk_forward(
+            instrument, strategy, from_date, to_date, grid,
+            timeframe=data.get("timeframe") or "5minute",
+            train_days=train_days,
+            test_days=test_days,
+            step_days=step_days,
+            anchored=bool(data.get("anchored")),
+            objective=objective,
+            min_trades=min_trades,
+            risk=risk,
+            mc_sims=mc_sims,
+            mc_seed=mc_seed,
+            max_workers=max_workers,
+            progress_callback=progress,
+        ),
+        {"type": "start", "message": f"Walk-forward over {combos} parameter sets...", "progress": 0},
+        "WALK-FORWARD",
+    )
+
+
+@app.route("/api/backtest/runs")
+def api_backtest_runs():
+    """GET /api/backtest/runs: saved run summaries. Query: kind (backtest | walk_forward | monte_carlo), instrument, strategy, limit."""
+    from backtest.results_store import get_results_store
+    try:
+        limit = int(request.args["limit"]) if request.args.get("limit") else 100
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid limit"}), 400
+    runs = get_results_store().runs(
+        kind=request.args.get("kind") or None,
+        instrument=request.args.get("instrument") or None,
+        strategy=request.args.get("strategy") or None,
+        limit=limit,
+    )
+    return jsonify({"ok": True, "runs": runs})
+
+
+@app.route("/api/backtest/runs/<run_id>")
+def api_backtest_run_detail(run_id):
+    """GET /api/backtest/runs/<run_id>: full saved result (trades, equity curve, walk-forward windows)."""
+    from backtest.results_store import get_results_store
+    result = get_results_store().get(run_id)
+    if result is None:
+        return jsonify({"ok": False, "error": "Run not found"}), 404
+    return jsonify({"ok": True, "result": result})
+
+
+@app.route("/api/backtest/monte-carlo", methods=["POST"])
+def api_backtest_monte_carlo():
+    """
+    POST /api/backtest/monte-carlo: trade-order resampling of a saved run's trades.
+    Body: run_id, n_sims (default 1000), method (shuffle | bootstrap), seed, ruin_drawdown_pct.
+    The distribution is saved to the results store (kind "monte_carlo") and returned.
+    """
+    from backtest.monte_carlo import MC_METHODS, run_monte_carlo
+    from backtest.results_store import get_results_store
+    data = request.get_json() or {}
+    store = get_results_store()
+    source = store.get(str(data.get("run_id") or ""))
+    if source is None:
+        return jsonify({"ok": False, "error": "Run not found"}), 404
+    method = data.get("method") or "shuffle"
+    if method not in MC_METHODS:
+        return jsonify({"ok": False, "error": f"method must be one of {list(MC_METHODS)}"}), 400
+    try:
+        result = run_monte_carlo(
+            [float(t.get("pnl") or 0) for t in source.get("trades") or []],
+            initial_capital=float(source.get("initial_capital") or 100000.0),
+            n_sims=min(int(data.get("n_sims") or 1000), 200000),
+            method=method,
+            seed=int(data["seed"]) if data.get("seed") is not None else None,
+            ruin_drawdown_pct=float(data.get("ruin_drawdown_pct") or 50.0),
+            max_workers=None,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    result.update({k: source.get(k) for k in ("instrument", "strategy", "from_date", "to_date", "timeframe")})
+    result["source_run_id"] = source["run_id"]
+    store.save(result, kind="monte_carlo")
+    return jsonify({"ok": True, "result": result})
+
+
 @app.route("/api/backtest/run-ai", methods=["POST"])
 def api_backtest_run_ai():
     """
@@ -5446,26 +5607,43 @@ def _run_ai_backtest(
     from strategies.strategy_registry import get_strategy_for_session, STRATEGY_MAP
     from strategies import data_provider as strategy_data_provider
     from engine.ai_strategy_advisor import get_market_context, get_ai_strategy_recommendation, should_switch_strategy
+    from backtest.ai_backtest import iter_day_results
     
-    # Fetch all historical data at once using yfinance
+    # Fetch all historical data at once: local OHLC cache / Zerodha first, yfinance fallback
+    interval_map = {"5minute": "5m", "15minute": "15m", "1hour": "1h"}
+    yf_interval = interval_map.get(timeframe, "5m")
+    all_data = None
     try:
-        ticker_symbol = instrument
-        # Convert Indian symbols to yfinance format
-        if instrument in ["NIFTY 50", "NIFTY", "NIFTY50"]:
-            ticker_symbol = "^NSEI"
-        elif instrument in ["BANKNIFTY", "NIFTY BANK", "BANK NIFTY"]:
-            ticker_symbol = "^NSEBANK"
-        elif not ticker_symbol.endswith(".NS"):
-            ticker_symbol = f"{instrument}.NS"
-        
-        logger.info(f"[AI BACKTEST] Fetching historical data for {ticker_symbol} from {from_date} to {to_date}")
-        
-        # Fetch intraday data (5 minute candles)
-        interval_map = {"5minute": "5m", "15minute": "15m", "1hour": "1h"}
-        yf_interval = interval_map.get(timeframe, "5m")
-        
-        ticker = yf.Ticker(ticker_symbol)
-        all_data = ticker.history(start=from_date, end=to_date + timedelta(days=1), interval=yf_interval)
+        from engine.data_fetcher import fetch_nse_ohlc_range
+        from nifty_banknifty_engine.constants import nse_symbol as _nse_symbol
+        cached = fetch_nse_ohlc_range(
+            _nse_symbol(instrument),
+            yf_interval,
+            datetime.combine(from_date, time.min),
+            datetime.combine(to_date + timedelta(days=1), time.min),
+        )
+        if cached is not None and not cached.empty:
+            all_data = cached.set_index("Datetime")
+            logger.info(f"[AI BACKTEST] Loaded {len(all_data)} candles from OHLC cache")
+    except Exception as e:
+        logger.warning(f"[AI BACKTEST] OHLC cache load failed, falling back to yfinance: {e}")
+    
+    try:
+        if all_data is None:
+            ticker_symbol = instrument
+            # Convert Indian symbols to yfinance format
+            if instrument in ["NIFTY 50", "NIFTY", "NIFTY50"]:
+                ticker_symbol = "^NSEI"
+            elif instrument in ["BANKNIFTY", "NIFTY BANK", "BANK NIFTY"]:
+                ticker_symbol = "^NSEBANK"
+            elif not ticker_symbol.endswith(".NS"):
+                ticker_symbol = f"{instrument}.NS"
+            
+            logger.info(f"[AI BACKTEST] Fetching historical data for {ticker_symbol} from {from_date} to {to_date}")
+            
+            # Fetch intraday data (5 minute candles)
+            ticker = yf.Ticker(ticker_symbol)
+            all_data = ticker.history(start=from_date, end=to_date + timedelta(days=1), interval=yf_interval)
         
         if all_data.empty:
             return {"success": False, "error": f"No historical data available for {instrument}"}
@@ -5486,12 +5664,53 @@ def _run_ai_backtest(
     # Calculate total days for progress percentage
     total_days = (to_date - from_date).days + 1
     
-    # Iterate through each trading day
+    # Build each trading day's candles first; days start from the same capital, so they are
+    # simulated independently (in worker processes) and cumulative P&L is chained in date order.
+    days = []
     current_date = from_date
     day_count = 0
     
     while current_date <= to_date:
         day_count += 1
+        job = None
+        
+        # Filter candles for this specific day
+        try:
+            day_data = all_data[all_data.index.date == current_date]
+            
+            if day_data.empty or len(day_data) < 5:
+                logger.info(f"[AI BACKTEST] Skipping {current_date}: Insufficient data ({len(day_data)} candles)")
+            else:
+                # Convert to list of dicts for compatibility (use lowercase keys)
+                candles = []
+                for idx, row in day_data.iterrows():
+                    candles.append({
+                        "timestamp": idx.isoformat(),  # Convert Timestamp to ISO string
+                        "open": float(row["Open"]),
+                        "high": float(row["High"]),
+                        "low": float(row["Low"]),
+                        "close": float(row["Close"]),
+                        "volume": int(row["Volume"])
+                    })
+                job = {
+                    "instrument": instrument,
+                    "trade_date": current_date,
+                    "candles": candles,
+                    "current_capital": initial_capital,  # RESET TO INITIAL CAPITAL EACH DAY
+                    "risk_percent": risk_percent,
+                    "ai_enabled": ai_enabled,
+                    "ai_check_interval": ai_check_interval,
+                }
+                
+        except Exception as e:
+            logger.warning(f"[AI BACKTEST] Failed to process data for {current_date}: {e}")
+        
+        days.append((day_count, current_date, job))
+        current_date += timedelta(days=1)
+    
+    day_results = iter_day_results([job for _, _, job in days if job])
+    
+    for day_count, current_date, job in days:
         progress_pct = int((day_count / total_days) * 100)
         
         # Store progress for streaming API
@@ -5506,44 +5725,13 @@ def _run_ai_backtest(
                 "cumulative_pnl": cumulative_pnl
             })
         
-        logger.info(f"[AI BACKTEST] Processing day {day_count}/{total_days}: {current_date} ({progress_pct}%)")
-        
-        # Filter candles for this specific day
-        try:
-            day_data = all_data[all_data.index.date == current_date]
-            
-            if day_data.empty or len(day_data) < 5:
-                logger.info(f"[AI BACKTEST] Skipping {current_date}: Insufficient data ({len(day_data)} candles)")
-                current_date += timedelta(days=1)
-                continue
-            
-            # Convert to list of dicts for compatibility (use lowercase keys)
-            candles = []
-            for idx, row in day_data.iterrows():
-                candles.append({
-                    "timestamp": idx.isoformat(),  # Convert Timestamp to ISO string
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"])
-                })
-                
-        except Exception as e:
-            logger.warning(f"[AI BACKTEST] Failed to process data for {current_date}: {e}")
-            current_date += timedelta(days=1)
+        if job is None:
             continue
         
+        logger.info(f"[AI BACKTEST] Processing day {day_count}/{total_days}: {current_date} ({progress_pct}%)")
+        
         # Simulate trading for this day (WITH FRESH CAPITAL EACH DAY)
-        day_result = _simulate_trading_day(
-            instrument=instrument,
-            trade_date=current_date,
-            candles=candles,
-            current_capital=initial_capital,  # RESET TO INITIAL CAPITAL EACH DAY
-            risk_percent=risk_percent,
-            ai_enabled=ai_enabled,
-            ai_check_interval=ai_check_interval,
-        )
+        _, day_result = next(day_results)
         
         # Update tracking
         all_trades.extend(day_result["trades"])
@@ -5577,8 +5765,7 @@ def _run_ai_backtest(
         if daily_pnl <= -max_loss_limit:
             logger.warning(f"[AI BACKTEST] Day {current_date}: Daily loss limit exceeded (₹{daily_pnl:.2f} <= -₹{max_loss_limit:.2f}), but continuing to next day with fresh capital")
             # Continue to next day (don't break) - each day is independent
-        
-        current_date += timedelta(days=1)
+    day_results.close()
     
     # Calculate summary metrics
     wins = sum(1 for t in all_trades if t.get("net_pnl", t.get("pnl", 0)) > 0)
@@ -5637,634 +5824,6 @@ def _run_ai_backtest(
     }
 
 
-def _simulate_trading_day(
-    instrument: str,
-    trade_date: date,
-    candles: list[dict],
-    current_capital: float,
-    risk_percent: float,
-    ai_enabled: bool,
-    ai_check_interval: int,
-) -> dict:
-    """
-    Simulate a single trading day with F&O options (just like live/paper trading).
-    - Calls GPT to analyze market and recommend F&O option
-    - Trades the recommended option for the day
-    - Uses dynamic hourly frequency from Settings
-    - Same logic as Paper/Live for consistency
-    Returns day summary with trades and P&L.
-    """
-    from strategies.strategy_registry import get_strategy_for_session, STRATEGY_MAP
-    from strategies import data_provider as strategy_data_provider
-    from engine.trade_frequency import calculate_max_trades_per_hour, get_trade_frequency_config
-    from engine.position_sizing import calculate_fo_position_size
-    from engine.brokerage_calculator import calculate_fo_charges, calculate_net_pnl
-    
-    # F&O options approach - use GPT recommendation for daily option selection
-    # This allows us to trade F&O options (same as Live/Paper)
-    is_index = instrument.upper() in ["NIFTY", "NIFTY 50", "NIFTY50", "BANKNIFTY", "BANK NIFTY", "NIFTY BANK"]
-    
-    # Default values (will be set by F&O logic below)
-    simulate_as_option = False
-    lot_size = 1
-    
-    logger.info(f"[AI BACKTEST] Simulating {instrument} with REAL strategy logic and F&O options")
-    
-    # === STEP 1: Get GPT F&O Recommendation for the day (just like live/paper) ===
-    logger.info(f"[AI BACKTEST F&O] {trade_date}: Getting GPT recommendation for index options...")
-    
-    # Determine if NIFTY or BANKNIFTY
-    index_name = "NIFTY"
-    if "BANK" in instrument.upper():
-        index_name = "BANKNIFTY"
-    
-    # Get market bias using historical data (first few candles of the day)
-    try:
-        # Get first 15 candles for market context (better sample)
-        opening_sample = min(15, len(candles))
-        opening_candles = candles[:opening_sample]
-        
-        # Improved bias detection: Look at overall trend + volatility
-        open_price = candles[0]["open"]
-        current_price = candles[opening_sample-1]["close"]
-        price_trend = ((current_price - open_price) / open_price) * 100
-        
-        # Calculate volatility (price range in opening)
-        high_prices = [c["high"] for c in opening_candles]
-        low_prices = [c["low"] for c in opening_candles]
-        volatility = ((max(high_prices) - min(low_prices)) / open_price) * 100
-        
-        # More aggressive bias detection (trade even on slight bias)
-        # Lower threshold to 0.15% so we don't skip days
-        if price_trend > 0.15:
-            bias = "BULLISH"
-        elif price_trend < -0.15:
-            bias = "BEARISH"
-        else:
-            # Instead of skipping NEUTRAL days, pick direction based on volatility
-            # If volatile, trade based on last few candles momentum
-            recent_momentum = ((candles[opening_sample-1]["close"] - candles[max(0, opening_sample-5)]["close"]) / 
-                             candles[max(0, opening_sample-5)]["close"]) * 100
-            bias = "BULLISH" if recent_momentum > 0 else "BEARISH"
-        
-        logger.info(f"[AI BACKTEST F&O] {trade_date}: Market bias = {bias} (trend: {price_trend:.2f}%, vol: {volatility:.2f}%)")
-        
-        # === STEP 2: Select F&O option (same logic as Live/Paper: best premium = lower premium, more lots) ===
-        spot_price = candles[0]["open"]
-        candidates = get_index_option_candidates(index_name, bias, spot_price)
-        best_option = pick_best_index_option(candidates, current_capital)
-
-        if not best_option:
-            logger.info(f"[AI BACKTEST F&O] {trade_date}: Insufficient capital for {index_name} options. Skipping day.")
-            return {
-                "trades": [],
-                "daily_pnl": 0,
-                "ending_capital": current_capital,
-                "ai_switches": 0,
-                "frequency_mode": "NORMAL",
-                "hourly_breakdown": {},
-                "daily_summary": {
-                    "date": trade_date.isoformat(),
-                    "trades": 0,
-                    "wins": 0,
-                    "losses": 0,
-                    "pnl": 0,
-                    "cumulative_pnl": 0,
-                    "strategies": [],
-                    "ai_switches": 0,
-                    "frequency_mode": "NORMAL",
-                }
-            }
-
-        selected_strike = best_option["strike"]
-        option_type = best_option["type"]
-        premium_per_contract = best_option["premium"]
-        lot_size = best_option["lotSize"]
-        from engine.position_sizing import calculate_fo_position_size
-        max_lots, total_cost, _ = calculate_fo_position_size(
-            capital=current_capital, premium=premium_per_contract, lot_size=lot_size
-        )
-
-        logger.info(f"[AI BACKTEST F&O] {trade_date}: Trading {index_name} {selected_strike} {option_type} (best premium Rs.{premium_per_contract:.2f} = more lots)")
-        logger.info(f"[AI BACKTEST] Capital: Rs.{current_capital:.0f}, Premium: Rs.{premium_per_contract:.2f}, "
-                   f"Lot size: {lot_size}, Max lots: {max_lots}, Total cost: Rs.{total_cost:.2f}")
-        
-        # Trade F&O options
-        simulate_as_option = True
-        
-    except Exception as e:
-        logger.exception(f"[AI BACKTEST F&O] {trade_date}: Failed to get F&O recommendation: {e}")
-        # Skip day if can't get recommendation
-        return {
-            "trades": [],
-            "daily_pnl": 0,
-            "ending_capital": current_capital,
-            "ai_switches": 0,
-            "strategies_used": [],
-            "frequency_mode": "NORMAL",
-            "hourly_breakdown": {},
-            "daily_summary": {
-                "date": trade_date.isoformat(),
-                "trades": 0,
-                "wins": 0,
-                "losses": 0,
-                "pnl": 0,
-                "cumulative_pnl": 0,
-                "strategies": [],
-                "frequency_mode": "NORMAL",
-                "hourly_breakdown": {},
-                "total_trades_attempted": 0,
-                "ai_switches": 0,
-            },
-        }
-    
-    # Day tracking
-    day_trades = []
-    day_pnl = 0
-    current_position = None
-    strategies_used = set()
-    ai_switches_today = 0
-    current_strategy_name = "Momentum Breakout"  # Default starting strategy
-    
-    # Track last AI check time
-    last_ai_check_idx = 0
-    
-    # Dynamic frequency tracking
-    hourly_trade_counts = {}  # hour -> trade_count
-    frequency_mode = "NORMAL"
-    
-    # Log candle data for debugging
-    logger.info(f"[AI BACKTEST] Day {trade_date}: Starting with {len(candles)} candles")
-    if len(candles) < 5:
-        logger.warning(f"[AI BACKTEST] Day {trade_date}: Insufficient candles ({len(candles)}), skipping day")
-        return {
-            "trades": [],
-            "daily_pnl": 0,
-            "ending_capital": current_capital,
-            "ai_switches": 0,
-            "strategies_used": [],
-            "frequency_mode": "NORMAL",
-            "hourly_breakdown": {},
-            "daily_summary": {
-                "date": trade_date.isoformat(),
-                "trades": 0,
-                "wins": 0,
-                "losses": 0,
-                "pnl": 0,
-                "cumulative_pnl": 0,
-                "strategies": [],
-                "frequency_mode": "NORMAL",
-                "hourly_breakdown": {},
-                "total_trades_attempted": 0,
-                "ai_switches": 0,
-            },
-        }
-    
-    candles_processed = 0
-    candles_skipped_hours = 0
-    entry_checks = 0
-    entries_triggered = 0
-    
-    # Simulate each candle (5-minute intervals)
-    for idx, candle in enumerate(candles):
-        candle_time = candle.get("timestamp") or candle.get("date")
-        ltp = candle.get("close")
-        
-        # Skip if outside market hours (9:15 - 15:15 IST)
-        # yfinance often returns UTC: 9:15 IST = 03:45 UTC, so we must convert to IST
-        current_hour = 9  # Default
-        if candle_time:
-            try:
-                candle_dt = datetime.fromisoformat(str(candle_time).replace("Z", "+00:00"))
-                ist = ZoneInfo("Asia/Kolkata")
-                if candle_dt.tzinfo is not None:
-                    candle_dt_ist = candle_dt.astimezone(ist)
-                else:
-                    # Naive timestamps from yfinance are typically UTC
-                    candle_dt_ist = candle_dt.replace(tzinfo=ZoneInfo("UTC")).astimezone(ist)
-                candle_time_obj = candle_dt_ist.time()
-                current_hour = candle_dt_ist.hour
-                if candle_time_obj < time(9, 15) or candle_time_obj > time(15, 15):
-                    candles_skipped_hours += 1
-                    continue
-            except Exception:
-                pass
-        
-        candles_processed += 1
-        
-        # Initialize hourly counter
-        if current_hour not in hourly_trade_counts:
-            hourly_trade_counts[current_hour] = 0
-        
-        # AI strategy evaluation (every N candles) - CHECK MORE FREQUENTLY
-        candles_since_check = idx - last_ai_check_idx
-        # Check every 6 candles (30 min for 5min candles) OR every 12 candles if we have a position
-        check_interval = 12 if current_position else 6  # More frequent when no position
-        
-        if candles_since_check >= check_interval:
-            # Try AI first if enabled
-            if ai_enabled:
-                # Get market context for REAL AI
-                recent_candles = candles[max(0, idx-20):idx+1]
-                
-                try:
-                    # Build market context FOR AI (needs proper format)
-                    # AI expects: nifty, banknifty, vix, timestamp
-                    context = {
-                        "instrument": instrument,
-                        "current_price": ltp,
-                        "timestamp": str(candle_time),
-                        "nifty": {
-                            "price": ltp if is_index else candles[0].get("close", ltp),  # Use first candle as reference
-                            "change_pct": 0.0  # Not available in backtest
-                        },
-                        "banknifty": {
-                            "price": 0.0,  # Not available in backtest
-                            "change_pct": 0.0
-                        },
-                        "vix": 15.0,  # Assume moderate volatility
-                        "recent_candles": recent_candles[-10:],  # Last 10 candles
-                    }
-                    
-                    # Call REAL GPT API for strategy recommendation
-                    ai_recommendation = get_ai_strategy_recommendation(context, current_strategy_name)
-                    
-                    if not ai_recommendation:
-                        logger.info(f"[AI BACKTEST] GPT not available or returned no recommendation - keeping {current_strategy_name}")
-                    
-                    if ai_recommendation:
-                        # Use GPT's recommendation with confidence threshold
-                        should_switch, new_strategy = should_switch_strategy(
-                            ai_recommendation,
-                            current_strategy_name,
-                            min_confidence="medium"  # Only switch if GPT is confident
-                        )
-                        
-                        if should_switch and new_strategy:
-                            current_strategy_name = new_strategy
-                            ai_switches_today += 1
-                            confidence = ai_recommendation.get("confidence", "")
-                            reasoning = ai_recommendation.get("reasoning", "")
-                            logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: GPT switched to {new_strategy} (confidence: {confidence})")
-                            logger.info(f"[AI BACKTEST] GPT reasoning: {reasoning[:100]}...")
-                            
-                except Exception as e:
-                    logger.warning(f"[AI BACKTEST] GPT strategy check failed: {e}")
-            else:
-                # AI disabled - rotate strategies manually for diversity
-                strategies_list = ["Momentum Breakout", "RSI Reversal Fade", "Pullback Continuation"]
-                current_idx = strategies_list.index(current_strategy_name) if current_strategy_name in strategies_list else 0
-                next_idx = (current_idx + 1) % len(strategies_list)
-                new_strategy = strategies_list[next_idx]
-                if new_strategy != current_strategy_name:
-                    current_strategy_name = new_strategy
-                    ai_switches_today += 1
-                    logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: Rotated to {new_strategy} (AI disabled - auto-rotation)")
-            
-            last_ai_check_idx = idx
-        
-        strategies_used.add(current_strategy_name)
-        
-        # Check if we have open position - manage exit (with F&O premium calculation)
-        if current_position:
-            # For F&O options, calculate current premium based on underlying movement
-            if current_position.get("is_option"):
-                underlying_move = ltp - current_position["index_price_at_entry"]
-                delta_effect = 0.5 if option_type == "CE" else -0.5
-                premium_change = underlying_move * abs(delta_effect)
-                option_ltp = current_position["entry_price"] + premium_change
-                option_ltp = max(10, option_ltp)  # Floor at Rs.10
-                exit_price_check = option_ltp
-            else:
-                exit_price_check = ltp
-            
-            # Check stop loss (simple price comparison)
-            if exit_price_check <= current_position["stop_loss"]:
-                exit_pnl = (current_position["stop_loss"] - current_position["entry_price"]) * current_position["qty"]
-                
-                # Calculate brokerage & taxes
-                from engine.brokerage_calculator import calculate_fo_charges, calculate_net_pnl
-                charges = calculate_fo_charges(
-                    entry_price=current_position["entry_price"],
-                    exit_price=current_position["stop_loss"],
-                    qty=current_position["qty"],
-                    lot_size=current_position.get("lot_size", 50)
-                )
-                net_pnl = calculate_net_pnl(exit_pnl, charges)
-                
-                day_trades.append({
-                    "date": trade_date.isoformat(),
-                    "strategy": current_position["strategy"],
-                    "entry_time": str(current_position["entry_time"]),
-                    "exit_time": str(candle_time),
-                    "entry_price": current_position["entry_price"],
-                    "exit_price": current_position["stop_loss"],
-                    "qty": current_position["qty"],
-                    "pnl": exit_pnl,
-                    "charges": charges,
-                    "net_pnl": net_pnl,
-                    "exit_reason": "STOP_LOSS",
-                    "capital_used": current_position.get("capital_used", 0),
-                    "capital_remaining": current_position.get("capital_remaining", 0),
-                    "lots": current_position.get("lots", 1),
-                    "price_per_lot": current_position.get("price_per_lot", 0),
-                    "option_type": current_position.get("option_type"),
-                    "strike": current_position.get("strike"),
-                })
-                day_pnl += net_pnl  # Use NET P&L for capital tracking
-                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: EXIT STOP_LOSS @ Rs.{current_position['stop_loss']:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
-                current_position = None
-                continue
-            
-            # Check target (simple price comparison)
-            if exit_price_check >= current_position["target"]:
-                exit_pnl = (current_position["target"] - current_position["entry_price"]) * current_position["qty"]
-                
-                # Calculate brokerage & taxes
-                from engine.brokerage_calculator import calculate_fo_charges, calculate_net_pnl
-                charges = calculate_fo_charges(
-                    entry_price=current_position["entry_price"],
-                    exit_price=current_position["target"],
-                    qty=current_position["qty"],
-                    lot_size=current_position.get("lot_size", 50)
-                )
-                net_pnl = calculate_net_pnl(exit_pnl, charges)
-                
-                day_trades.append({
-                    "date": trade_date.isoformat(),
-                    "strategy": current_position["strategy"],
-                    "entry_time": str(current_position["entry_time"]),
-                    "exit_time": str(candle_time),
-                    "entry_price": current_position["entry_price"],
-                    "exit_price": current_position["target"],
-                    "qty": current_position["qty"],
-                    "pnl": exit_pnl,
-                    "charges": charges,
-                    "net_pnl": net_pnl,
-                    "exit_reason": "TARGET",
-                    "capital_used": current_position.get("capital_used", 0),
-                    "capital_remaining": current_position.get("capital_remaining", 0),
-                    "lots": current_position.get("lots", 1),
-                    "price_per_lot": current_position.get("price_per_lot", 0),
-                    "option_type": current_position.get("option_type"),
-                    "strike": current_position.get("strike"),
-                })
-                day_pnl += net_pnl  # Use NET P&L for capital tracking
-                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: EXIT TARGET @ Rs.{current_position['target']:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
-                current_position = None
-                continue
-        
-        # Entry logic - check dynamic hourly frequency
-        if not current_position:
-            entry_checks += 1
-            
-            # Calculate dynamic trades per hour based on capital and drawdown
-            max_trades_this_hour, freq_mode = calculate_max_trades_per_hour(
-                capital=current_capital + day_pnl,
-                daily_pnl=day_pnl
-            )
-            frequency_mode = freq_mode
-            
-            # Check if frequency limiting is disabled in backtest (from Settings)
-            freq_config = get_trade_frequency_config()
-            backtest_disable_limit = freq_config.get("backtest_disable_frequency_limit", False)
-            
-            trades_this_hour = hourly_trade_counts.get(current_hour, 0)
-            
-            # Block if hourly limit reached (unless disabled for backtest)
-            if not backtest_disable_limit and trades_this_hour >= max_trades_this_hour:
-                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: Hourly limit reached ({trades_this_hour}/{max_trades_this_hour}) Mode: {freq_mode}")
-                continue
-            
-            # Entry logic - USE UNIFIED FUNCTION (same as Live/Paper)
-            should_enter = False
-            entry_price = ltp
-            entry_reason = ""
-            
-            # Use shared entry logic
-            from engine.unified_entry import should_enter_trade
-            
-            should_enter, entry_reason = should_enter_trade(
-                mode="BACKTEST",
-                current_price=ltp,
-                recent_candles=candles[max(0, idx-10):idx+1],  # Last 10 candles
-                strategy_name=current_strategy_name,
-                frequency_check_passed=True,  # Already checked above
-                instrument=instrument,  # Pass instrument for AI context
-                use_ai=ai_enabled,  # Use AI validation if enabled
-            )
-            
-            if should_enter:
-                # Load REAL strategy to get stop loss and target (same as Live/Paper)
-                mock_session = {
-                    "instrument": instrument,
-                    "recommendation": {"strategyName": current_strategy_name},
-                    "execution_mode": "BACKTEST",
-                }
-                
-                try:
-                    class MockDataProvider:
-                        def get_recent_candles(self, *args, **kwargs):
-                            return []
-                        def get_ltp(self, *args, **kwargs):
-                            return entry_price
-                    
-                    strategy = get_strategy_for_session(mock_session, MockDataProvider(), current_strategy_name)
-                    
-                    # For F&O options, calculate premium and use option-specific sizing
-                    if simulate_as_option:
-                        from engine.position_sizing import calculate_fo_position_size
-                        
-                        # Calculate current option premium based on underlying movement
-                        underlying_move_from_spot = ltp - spot_price
-                        delta_effect = 0.5 if option_type == "CE" else -0.5
-                        premium_change = underlying_move_from_spot * abs(delta_effect)
-                        option_premium = premium_per_contract + premium_change
-                        option_premium = max(50, option_premium)  # Floor at Rs.50
-                        
-                        # Use centralized F&O position sizing (NO CAP - use full 80%)
-                        lots, position_cost, can_afford = calculate_fo_position_size(
-                            capital=current_capital,
-                            premium=option_premium,
-                            lot_size=lot_size
-                        )
-                        # REMOVED CAP: Use maximum affordable lots (80% of capital)
-                        # lots = min(max_lots, lots)  # OLD: Artificial cap removed
-                        
-                        if not can_afford or lots < 1:
-                            logger.debug(f"[AI BACKTEST] Cannot afford trade: Premium={option_premium:.2f}, Lots={lots}")
-                            continue
-                        
-                        qty = lots * lot_size
-                        entry_price = option_premium
-                        
-                        logger.info(f"[AI BACKTEST POSITION] Premium: Rs.{option_premium:.2f}, Affordable lots: {lots}, Total capital used: Rs.{position_cost:.2f} ({position_cost/current_capital*100:.1f}%)")
-                        
-                        # F&O-specific stop/target - TARGET unchanged (greedy), LOSS capped at ₹300/trade
-                        stop_loss = option_premium * 0.90   # 10% stop base
-                        target = option_premium * 1.15      # 15% target (keep full profit)
-                        MAX_LOSS_PER_TRADE = 300.0         # Cap gross loss per trade (≤ ₹300; net ≈ ₹350 after charges)
-                        loss_at_stop = (entry_price - stop_loss) * qty
-                        if loss_at_stop > MAX_LOSS_PER_TRADE and qty > 0:
-                            stop_loss = entry_price - (MAX_LOSS_PER_TRADE / qty)
-                            stop_loss = round(max(1.0, stop_loss), 2)
-                            logger.info(f"[AI BACKTEST F&O] Stop tightened to cap loss at ₹{MAX_LOSS_PER_TRADE:.0f} | SL: Rs.{stop_loss:.2f}")
-                        
-                        logger.info(f"[AI BACKTEST F&O] {index_name} {selected_strike} {option_type}: "
-                                  f"Premium={option_premium:.2f}, Lots={lots}, Qty={qty}, "
-                                  f"Target=Rs.{target:.2f} (15% - quick exit for volume)")
-                    else:
-                        # Regular stock/index (fallback)
-                        if strategy:
-                            stop_loss = strategy.get_stop_loss(entry_price)
-                            target = strategy.get_target(entry_price)
-                        else:
-                            stop_loss = entry_price * 0.985
-                            target = entry_price * 1.03
-                        
-                        # Calculate position sizing
-                        risk_amount = current_capital * risk_percent / 100
-                        risk_per_share = abs(entry_price - stop_loss)
-                        
-                        if risk_per_share > 0:
-                            qty_float = risk_amount / risk_per_share
-                            qty = max(1, int(qty_float))
-                        else:
-                            qty = max(1, int(risk_amount / entry_price))
-                        
-                        logger.info(f"[AI BACKTEST] Position Sizing: Qty={qty}, Entry={entry_price:.2f}, SL={stop_loss:.2f}")
-                    
-                except Exception as e:
-                    logger.warning(f"[AI BACKTEST] Failed to calculate position: {e}")
-                    continue
-                
-                entries_triggered += 1
-                
-                if qty > 0:
-                    # Calculate capital usage for this trade
-                    capital_used = entry_price * qty
-                    capital_remaining = current_capital - capital_used
-                    lots_used = qty // lot_size if lot_size > 1 else 1
-                    price_per_lot = entry_price * lot_size  # Cost of 1 lot
-                    
-                    current_position = {
-                        "strategy": current_strategy_name,
-                        "entry_time": candle_time,
-                        "entry_price": entry_price,
-                        "stop_loss": stop_loss,
-                        "target": target,
-                        "qty": qty,
-                        "is_option": simulate_as_option,
-                        "lot_size": lot_size,
-                        "index_price_at_entry": ltp if simulate_as_option else None,
-                        "capital_used": capital_used,
-                        "capital_remaining": capital_remaining,
-                        "lots": lots_used,
-                        "price_per_lot": price_per_lot,
-                        "option_type": option_type if simulate_as_option else None,
-                        "strike": selected_strike if simulate_as_option else None,
-                    }
-                    strategies_used.add(current_strategy_name)
-                    
-                    # Increment hourly counter
-                    hourly_trade_counts[current_hour] = hourly_trade_counts.get(current_hour, 0) + 1
-                    
-                    logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: ENTRY {current_strategy_name} @Rs.{entry_price:.2f} × {qty} (Lots:{lots_used} @ Rs.{price_per_lot:.2f}/lot) | SL:Rs.{stop_loss:.2f} Target:Rs.{target:.2f}")
-                    logger.info(f"[AI BACKTEST] Capital Used: Rs.{capital_used:.2f} ({capital_used/current_capital*100:.1f}%) | Remaining: Rs.{capital_remaining:.2f} | {entry_reason}")
-                else:
-                    logger.warning(f"[AI BACKTEST] {trade_date} {candle_time}: Entry signal but qty=0")
-    
-    # Close any open position at end of day
-    if current_position:
-        MAX_LOSS_PER_TRADE = 300.0  # Same cap as intraday stop (gross loss per trade)
-        # Calculate exit price based on position type
-        if current_position.get("is_option"):
-            # For F&O options, calculate final premium based on underlying movement
-            underlying_move = candles[-1]["close"] - current_position["index_price_at_entry"]
-            delta_effect = 0.5 if option_type == "CE" else -0.5
-            premium_change = underlying_move * abs(delta_effect)
-            exit_price = current_position["entry_price"] + premium_change
-            exit_price = max(10, exit_price)  # Floor at Rs.10
-            
-            logger.info(f"[AI BACKTEST F&O] EOD: Index moved from {current_position['index_price_at_entry']:.2f} to {candles[-1]['close']:.2f}, "
-                       f"Option premium: {current_position['entry_price']:.2f} → {exit_price:.2f}")
-        else:
-            exit_price = candles[-1]["close"]
-        
-        exit_pnl = (exit_price - current_position["entry_price"]) * current_position["qty"]
-        # Cap DAY_END loss at same ₹300/trade as intraday stop (so last closing loss is never above 300 gross)
-        if exit_pnl < 0 and abs(exit_pnl) > MAX_LOSS_PER_TRADE:
-            qty = current_position["qty"]
-            exit_pnl = -MAX_LOSS_PER_TRADE
-            exit_price = current_position["entry_price"] - (MAX_LOSS_PER_TRADE / qty)
-            exit_price = round(max(1.0, exit_price), 2)
-            logger.info(f"[AI BACKTEST F&O] EOD loss capped at ₹{MAX_LOSS_PER_TRADE:.0f} gross (effective exit Rs.{exit_price:.2f})")
-        
-        # Calculate brokerage & taxes
-        from engine.brokerage_calculator import calculate_fo_charges, calculate_net_pnl
-        charges = calculate_fo_charges(
-            entry_price=current_position["entry_price"],
-            exit_price=exit_price,
-            qty=current_position["qty"],
-            lot_size=current_position.get("lot_size", 50)
-        )
-        net_pnl = calculate_net_pnl(exit_pnl, charges)
-        
-        day_trades.append({
-            "date": trade_date.isoformat(),
-            "strategy": current_position["strategy"],
-            "entry_time": str(current_position["entry_time"]),
-            "exit_time": str(candles[-1].get("timestamp", "")),
-            "entry_price": current_position["entry_price"],
-            "exit_price": exit_price,
-            "qty": current_position["qty"],
-            "pnl": exit_pnl,
-            "charges": charges,
-            "net_pnl": net_pnl,
-            "exit_reason": "DAY_END",
-            "capital_used": current_position.get("capital_used", 0),
-            "capital_remaining": current_position.get("capital_remaining", 0),
-            "lots": current_position.get("lots", 1),
-            "price_per_lot": current_position.get("price_per_lot", 0),
-            "option_type": current_position.get("option_type"),
-            "strike": current_position.get("strike"),
-        })
-        day_pnl += net_pnl  # Use NET P&L for capital tracking
-        logger.info(f"[AI BACKTEST] {trade_date} EOD: Closed position @ Rs.{exit_price:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
-        current_position = None
-    
-    # Log day statistics for debugging
-    logger.info(f"[AI BACKTEST] Day {trade_date} Stats: Candles processed={candles_processed}, "
-                f"Skipped (hours)={candles_skipped_hours}, Entry checks={entry_checks}, "
-                f"Trades executed={len(day_trades)}, AI Switches={ai_switches_today}")
-    
-    # Day summary
-    wins = sum(1 for t in day_trades if t["pnl"] > 0)
-    losses = sum(1 for t in day_trades if t["pnl"] <= 0)
-    total_trades_all_hours = sum(hourly_trade_counts.values())
-    
-    return {
-        "trades": day_trades,
-        "daily_pnl": day_pnl,
-        "ending_capital": current_capital + day_pnl,
-        "ai_switches": ai_switches_today,
-        "frequency_mode": frequency_mode,
-        "hourly_breakdown": dict(hourly_trade_counts),
-        "daily_summary": {
-            "date": trade_date.isoformat(),
-            "trades": len(day_trades),
-            "wins": wins,
-            "losses": losses,
-            "pnl": day_pnl,
-            "cumulative_pnl": 0,  # Will be filled by caller
-            "strategies": list(strategies_used),
-            "ai_switches": ai_switches_today,
-            "frequency_mode": frequency_mode,
-            "total_trades_attempted": total_trades_all_hours,
-        }
-    }
-
-
 @app.route("/api/settings/trade-frequency")
 def api_get_trade_frequency():
     """GET /api/settings/trade-frequency: Get trade frequency configuration."""
@@ -6472,6 +6031,7 @@ def api_options(stock: str):
     try:
         options, ai_recommendation, pred = _mock_option_chain(stock.upper())
         stock_indicators = {
+            "symbol": stock.upper(),
             "score": pred.get("score"),
             "prediction": pred.get("prediction"),
             "rsi": pred.get("rsi"),
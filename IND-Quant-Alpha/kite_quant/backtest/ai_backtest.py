@@ -0,0 +1,709 @@
+"""
+AI backtest day simulation.
+
+simulate_trading_day() replays one day of candles through the F&O option selection, the AI
+strategy advisor and the unified entry logic (same as Paper/Live). Days start from the same
+capital, so they are independent: iter_day_results() fans days out over a ProcessPoolExecutor and
+yields results in date order, and the caller chains cumulative P&L afterwards.
+
+Advisor calls are replayed from the content-addressed decision cache (engine.llm_decisions), so a
+rerun over the same days makes no model calls; workers share the cache file and the backend.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from engine.ai_strategy_advisor import get_ai_strategy_recommendation, should_switch_strategy
+from engine.llm_decisions import DECISION_CACHE_FILE, DecisionCache, get_decision_cache, get_llm_backend, set_decision_cache, set_llm_backend
+from nifty_banknifty_engine import get_index_option_candidates, pick_best_index_option
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for day simulation; 0 = one per CPU, 1 = simulate in-process.
+AI_BACKTEST_WORKERS = int(os.getenv("AI_BACKTEST_WORKERS", "0") or 0)
+# Decision cache file for AI backtests; "0" or empty disables replay of recorded decisions.
+AI_BACKTEST_DECISION_CACHE = os.getenv("AI_BACKTEST_DECISION_CACHE", str(DECISION_CACHE_FILE)).strip()
+
+
+def simulate_trading_day(
+    instrument: str,
+    trade_date: date,
+    candles: list[dict],
+    current_capital: float,
+    risk_percent: float,
+    ai_enabled: bool,
+    ai_check_interval: int,
+) -> dict:
+    """
+    Simulate a single trading day with F&O options (just like live/paper trading).
+    - Calls GPT to analyze market and recommend F&O option
+    - Trades the recommended option for the day
+    - Uses dynamic hourly frequency from Settings
+    - Same logic as Paper/Live for consistency
+    Returns day summary with trades and P&L.
+    """
+    from strategies.strategy_registry import get_strategy_for_session
+    from engine.trade_frequency import calculate_max_trades_per_hour, get_trade_frequency_config
+    from engine.position_sizing import calculate_fo_position_size
+    from engine.brokerage_calculator import calculate_fo_charges, calculate_net_pnl
+    
+    # F&O options approach - use GPT recommendation for daily option selection
+    # This allows us to trade F&O options (same as Live/Paper)
+    is_index = instrument.upper() in ["NIFTY", "NIFTY 50", "NIFTY50", "BANKNIFTY", "BANK NIFTY", "NIFTY BANK"]
+    
+    # Default values (will be set by F&O logic below)
+    simulate_as_option = False
+    lot_size = 1
+    
+    logger.info(f"[AI BACKTEST] Simulating {instrument} with REAL strategy logic and F&O options")
+    
+    # === STEP 1: Get GPT F&O Recommendation for the day (just like live/paper) ===
+    logger.info(f"[AI BACKTEST F&O] {trade_date}: Getting GPT recommendation for index options...")
+    
+    # Determine if NIFTY or BANKNIFTY
+    index_name = "NIFTY"
+    if "BANK" in instrument.upper():
+        index_name = "BANKNIFTY"
+    
+    # Get market bias using historical data (first few candles of the day)
+    try:
+        # Get first 15 candles for market context (better sample)
+        opening_sample = min(15, len(candles))
+        opening_candles = candles[:opening_sample]
+        
+        # Improved bias detection: Look at overall trend + volatility
+        open_price = candles[0]["open"]
+        current_price = candles[opening_sample-1]["close"]
+        price_trend = ((current_price - open_price) / open_price) * 100
+        
+        # Calculate volatility (price range in opening)
+        high_prices = [c["high"] for c in opening_candles]
+        low_prices = [c["low"] for c in opening_candles]
+        volatility = ((max(high_prices) - min(low_prices)) / open_price) * 100
+        
+        # More aggressive bias detection (trade even on slight bias)
+        # Lower threshold to 0.15% so we don't skip days
+        if price_trend > 0.15:
+            bias = "BULLISH"
+        elif price_trend < -0.15:
+            bias = "BEARISH"
+        else:
+            # Instead of skipping NEUTRAL days, pick direction based on volatility
+            # If volatile, trade based on last few candles momentum
+            recent_momentum = ((candles[opening_sample-1]["close"] - candles[max(0, opening_sample-5)]["close"]) / 
+                             candles[max(0, opening_sample-5)]["close"]) * 100
+            bias = "BULLISH" if recent_momentum > 0 else "BEARISH"
+        
+        logger.info(f"[AI BACKTEST F&O] {trade_date}: Market bias = {bias} (trend: {price_trend:.2f}%, vol: {volatility:.2f}%)")
+        
+        # === STEP 2: Select F&O option (same logic as Live/Paper: best premium = lower premium, more lots) ===
+        spot_price = candles[0]["open"]
+        candidates = get_index_option_candidates(index_name, bias, spot_price)
+        best_option = pick_best_index_option(candidates, current_capital)
+
+        if not best_option:
+            logger.info(f"[AI BACKTEST F&O] {trade_date}: Insufficient capital for {index_name} options. Skipping day.")
+            return {
+                "trades": [],
+                "daily_pnl": 0,
+                "ending_capital": current_capital,
+                "ai_switches": 0,
+                "frequency_mode": "NORMAL",
+                "hourly_breakdown": {},
+                "daily_summary": {
+                    "date": trade_date.isoformat(),
+                    "trades": 0,
+                    "wins": 0,
+                    "losses": 0,
+                    "pnl": 0,
+                    "cumulative_pnl": 0,
+                    "strategies": [],
+                    "ai_switches": 0,
+                    "frequency_mode": "NORMAL",
+                }
+            }
+
+        selected_strike = best_option["strike"]
+        option_type = best_option["type"]
+        premium_per_contract = best_option["premium"]
+        lot_size = best_option["lotSize"]
+        max_lots, total_cost, _ = calculate_fo_position_size(
+            capital=current_capital, premium=premium_per_contract, lot_size=lot_size
+        )
+
+        logger.info(f"[AI BACKTEST F&O] {trade_date}: Trading {index_name} {selected_strike} {option_type} (best premium Rs.{premium_per_contract:.2f} = more lots)")
+        logger.info(f"[AI BACKTEST] Capital: Rs.{current_capital:.0f}, Premium: Rs.{premium_per_contract:.2f}, "
+                   f"Lot size: {lot_size}, Max lots: {max_lots}, Total cost: Rs.{total_cost:.2f}")
+        
+        # Trade F&O options
+        simulate_as_option = True
+        
+    except Exception as e:
+        logger.exception(f"[AI BACKTEST F&O] {trade_date}: Failed to get F&O recommendation: {e}")
+        # Skip day if can't get recommendation
+        return {
+            "trades": [],
+            "daily_pnl": 0,
+            "ending_capital": current_capital,
+            "ai_switches": 0,
+            "strategies_used": [],
+            "frequency_mode": "NORMAL",
+            "hourly_breakdown": {},
+            "daily_summary": {
+                "date": trade_date.isoformat(),
+                "trades": 0,
+                "wins": 0,
+                "losses": 0,
+                "pnl": 0,
+                "cumulative_pnl": 0,
+                "strategies": [],
+                "frequency_mode": "NORMAL",
+                "hourly_breakdown": {},
+                "total_trades_attempted": 0,
+                "ai_switches": 0,
+            },
+        }
+    
+    # Day tracking
+    day_trades = []
+    day_pnl = 0
+    current_position = None
+    strategies_used = set()
+    ai_switches_today = 0
+    current_strategy_name = "Momentum Breakout"  # Default starting strategy
+    
+    # Track last AI check time
+    last_ai_check_idx = 0
+    
+    # Dynamic frequency tracking
+    hourly_trade_counts = {}  # hour -> trade_count
+    frequency_mode = "NORMAL"
+    
+    # Log candle data for debugging
+    logger.info(f"[AI BACKTEST] Day {trade_date}: Starting with {len(candles)} candles")
+    if len(candles) < 5:
+        logger.warning(f"[AI BACKTEST] Day {trade_date}: Insufficient candles ({len(candles)}), skipping day")
+        return {
+            "trades": [],
+            "daily_pnl": 0,
+            "ending_capital": current_capital,
+            "ai_switches": 0,
+            "strategies_used": [],
+            "frequency_mode": "NORMAL",
+            "hourly_breakdown": {},
+            "daily_summary": {
+                "date": trade_date.isoformat(),
+                "trades": 0,
+                "wins": 0,
+                "losses": 0,
+                "pnl": 0,
+                "cumulative_pnl": 0,
+                "strategies": [],
+                "frequency_mode": "NORMAL",
+                "hourly_breakdown": {},
+                "total_trades_attempted": 0,
+                "ai_switches": 0,
+            },
+        }
+    
+    candles_processed = 0
+    candles_skipped_hours = 0
+    entry_checks = 0
+    entries_triggered = 0
+    
+    # Simulate each candle (5-minute intervals)
+    for idx, candle in enumerate(candles):
+        candle_time = candle.get("timestamp") or candle.get("date")
+        ltp = candle.get("close")
+        
+        # Skip if outside market hours (9:15 - 15:15 IST)
+        # yfinance often returns UTC: 9:15 IST = 03:45 UTC, so we must convert to IST
+        current_hour = 9  # Default
+        candle_dt_ist = None
+        if candle_time:
+            try:
+                candle_dt = datetime.fromisoformat(str(candle_time).replace("Z", "+00:00"))
+                ist = ZoneInfo("Asia/Kolkata")
+                if candle_dt.tzinfo is not None:
+                    candle_dt_ist = candle_dt.astimezone(ist)
+                else:
+                    # Naive timestamps from yfinance are typically UTC
+                    candle_dt_ist = candle_dt.replace(tzinfo=ZoneInfo("UTC")).astimezone(ist)
+                candle_time_obj = candle_dt_ist.time()
+                current_hour = candle_dt_ist.hour
+                if candle_time_obj < time(9, 15) or candle_time_obj > time(15, 15):
+                    candles_skipped_hours += 1
+                    continue
+            except Exception:
+                pass
+        
+        candles_processed += 1
+        
+        # Initialize hourly counter
+        if current_hour not in hourly_trade_counts:
+            hourly_trade_counts[current_hour] = 0
+        
+        # AI strategy evaluation (every N candles) - CHECK MORE FREQUENTLY
+        candles_since_check = idx - last_ai_check_idx
+        # Check every 6 candles (30 min for 5min candles) OR every 12 candles if we have a position
+        check_interval = 12 if current_position else 6  # More frequent when no position
+        
+        if candles_since_check >= check_interval:
+            # Try AI first if enabled
+            if ai_enabled:
+                # Get market context for REAL AI
+                recent_candles = candles[max(0, idx-20):idx+1]
+                
+                try:
+                    # Build market context FOR AI (needs proper format)
+                    # AI expects: nifty, banknifty, vix, timestamp
+                    context = {
+                        "instrument": instrument,
+                        "current_price": ltp,
+                        "timestamp": str(candle_time),
+                        "nifty": {
+                            "price": ltp if is_index else candles[0].get("close", ltp),  # Use first candle as reference
+                            "change_pct": 0.0  # Not available in backtest
+                        },
+                        "banknifty": {
+                            "price": 0.0,  # Not available in backtest
+                            "change_pct": 0.0
+                        },
+                        "vix": 15.0,  # Assume moderate volatility
+                        "recent_candles": recent_candles[-10:],  # Last 10 candles
+                    }
+                    
+                    # Call REAL GPT API for strategy recommendation
+                    ai_recommendation = get_ai_strategy_recommendation(context, current_strategy_name)
+                    
+                    if not ai_recommendation:
+                        logger.info(f"[AI BACKTEST] GPT not available or returned no recommendation - keeping {current_strategy_name}")
+                    
+                    if ai_recommendation:
+                        # Use GPT's recommendation with confidence threshold
+                        should_switch, new_strategy = should_switch_strategy(
+                            ai_recommendation,
+                            current_strategy_name,
+                            min_confidence="medium"  # Only switch if GPT is confident
+                        )
+                        
+                        if should_switch and new_strategy:
+                            current_strategy_name = new_strategy
+                            ai_switches_today += 1
+                            confidence = ai_recommendation.get("confidence", "")
+                            reasoning = ai_recommendation.get("reasoning", "")
+                            logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: GPT switched to {new_strategy} (confidence: {confidence})")
+                            logger.info(f"[AI BACKTEST] GPT reasoning: {reasoning[:100]}...")
+                            
+                except Exception as e:
+                    logger.warning(f"[AI BACKTEST] GPT strategy check failed: {e}")
+            else:
+                # AI disabled - rotate strategies manually for diversity
+                strategies_list = ["Momentum Breakout", "RSI Reversal Fade", "Pullback Continuation"]
+                current_idx = strategies_list.index(current_strategy_name) if current_strategy_name in strategies_list else 0
+                next_idx = (current_idx + 1) % len(strategies_list)
+                new_strategy = strategies_list[next_idx]
+                if new_strategy != current_strategy_name:
+                    current_strategy_name = new_strategy
+                    ai_switches_today += 1
+                    logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: Rotated to {new_strategy} (AI disabled - auto-rotation)")
+            
+            last_ai_check_idx = idx
+        
+        strategies_used.add(current_strategy_name)
+        
+        # Check if we have open position - manage exit (with F&O premium calculation)
+        if current_position:
+            # For F&O options, calculate current premium based on underlying movement
+            if current_position.get("is_option"):
+                underlying_move = ltp - current_position["index_price_at_entry"]
+                delta_effect = 0.5 if option_type == "CE" else -0.5
+                premium_change = underlying_move * abs(delta_effect)
+                option_ltp = current_position["entry_price"] + premium_change
+                option_ltp = max(10, option_ltp)  # Floor at Rs.10
+                exit_price_check = option_ltp
+            else:
+                exit_price_check = ltp
+            
+            # Check stop loss (simple price comparison)
+            if exit_price_check <= current_position["stop_loss"]:
+                exit_pnl = (current_position["stop_loss"] - current_position["entry_price"]) * current_position["qty"]
+                
+                # Calculate brokerage & taxes
+                charges = calculate_fo_charges(
+                    entry_price=current_position["entry_price"],
+                    exit_price=current_position["stop_loss"],
+                    qty=current_position["qty"],
+                    lot_size=current_position.get("lot_size", 50)
+                )
+                net_pnl = calculate_net_pnl(exit_pnl, charges)
+                
+                day_trades.append({
+                    "date": trade_date.isoformat(),
+                    "strategy": current_position["strategy"],
+                    "entry_time": str(current_position["entry_time"]),
+                    "exit_time": str(candle_time),
+                    "entry_price": current_position["entry_price"],
+                    "exit_price": current_position["stop_loss"],
+                    "qty": current_position["qty"],
+                    "pnl": exit_pnl,
+                    "charges": charges,
+                    "net_pnl": net_pnl,
+                    "exit_reason": "STOP_LOSS",
+                    "capital_used": current_position.get("capital_used", 0),
+                    "capital_remaining": current_position.get("capital_remaining", 0),
+                    "lots": current_position.get("lots", 1),
+                    "price_per_lot": current_position.get("price_per_lot", 0),
+                    "option_type": current_position.get("option_type"),
+                    "strike": current_position.get("strike"),
+                })
+                day_pnl += net_pnl  # Use NET P&L for capital tracking
+                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: EXIT STOP_LOSS @ Rs.{current_position['stop_loss']:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
+                current_position = None
+                continue
+            
+            # Check target (simple price comparison)
+            if exit_price_check >= current_position["target"]:
+                exit_pnl = (current_position["target"] - current_position["entry_price"]) * current_position["qty"]
+                
+                # Calculate brokerage & taxes
+                charges = calculate_fo_charges(
+                    entry_price=current_position["entry_price"],
+                    exit_price=current_position["target"],
+                    qty=current_position["qty"],
+                    lot_size=current_position.get("lot_size", 50)
+                )
+                net_pnl = calculate_net_pnl(exit_pnl, charges)
+                
+                day_trades.append({
+                    "date": trade_date.isoformat(),
+                    "strategy": current_position["strategy"],
+                    "entry_time": str(current_position["entry_time"]),
+                    "exit_time": str(candle_time),
+                    "entry_price": current_position["entry_price"],
+                    "exit_price": current_position["target"],
+                    "qty": current_position["qty"],
+                    "pnl": exit_pnl,
+                    "charges": charges,
+                    "net_pnl": net_pnl,
+                    "exit_reason": "TARGET",
+                    "capital_used": current_position.get("capital_used", 0),
+                    "capital_remaining": current_position.get("capital_remaining", 0),
+                    "lots": current_position.get("lots", 1),
+                    "price_per_lot": current_position.get("price_per_lot", 0),
+                    "option_type": current_position.get("option_type"),
+                    "strike": current_position.get("strike"),
+                })
+                day_pnl += net_pnl  # Use NET P&L for capital tracking
+                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: EXIT TARGET @ Rs.{current_position['target']:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
+                current_position = None
+                continue
+        
+        # Entry logic - check dynamic hourly frequency
+        if not current_position:
+            entry_checks += 1
+            
+            # Calculate dynamic trades per hour based on capital and drawdown
+            max_trades_this_hour, freq_mode = calculate_max_trades_per_hour(
+                capital=current_capital + day_pnl,
+                daily_pnl=day_pnl
+            )
+            frequency_mode = freq_mode
+            
+            # Check if frequency limiting is disabled in backtest (from Settings)
+            freq_config = get_trade_frequency_config()
+            backtest_disable_limit = freq_config.get("backtest_disable_frequency_limit", False)
+            
+            trades_this_hour = hourly_trade_counts.get(current_hour, 0)
+            
+            # Block if hourly limit reached (unless disabled for backtest)
+            if not backtest_disable_limit and trades_this_hour >= max_trades_this_hour:
+                logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: Hourly limit reached ({trades_this_hour}/{max_trades_this_hour}) Mode: {freq_mode}")
+                continue
+            
+            # Entry logic - USE UNIFIED FUNCTION (same as Live/Paper)
+            should_enter = False
+            entry_price = ltp
+            entry_reason = ""
+            
+            # Use shared entry logic
+            from engine.unified_entry import should_enter_trade
+            
+            should_enter, entry_reason = should_enter_trade(
+                mode="BACKTEST",
+                current_price=ltp,
+                recent_candles=candles[max(0, idx-10):idx+1],  # Last 10 candles
+                strategy_name=current_strategy_name,
+                frequency_check_passed=True,  # Already checked above
+                instrument=instrument,  # Pass instrument for AI context
+                use_ai=ai_enabled,  # Use AI validation if enabled
+                as_of=candle_dt_ist,  # Candle time, so AI prompts (and cached decisions) are reproducible
+            )
+            
+            if should_enter:
+                # Load REAL strategy to get stop loss and target (same as Live/Paper)
+                mock_session = {
+                    "instrument": instrument,
+                    "recommendation": {"strategyName": current_strategy_name},
+                    "execution_mode": "BACKTEST",
+                }
+                
+                try:
+                    class MockDataProvider:
+                        def get_recent_candles(self, *args, **kwargs):
+                            return []
+                        def get_ltp(self, *args, **kwargs):
+                            return entry_price
+                    
+                    strategy = get_strategy_for_session(mock_session, MockDataProvider(), current_strategy_name)
+                    
+                    # For F&O options, calculate premium and use option-specific sizing
+                    if simulate_as_option:
+                        
+                        # Calculate current option premium based on underlying movement
+                        underlying_move_from_spot = ltp - spot_price
+                        delta_effect = 0.5 if option_type == "CE" else -0.5
+                        premium_change = underlying_move_from_spot * abs(delta_effect)
+                        option_premium = premium_per_contract + premium_change
+                        option_premium = max(50, option_premium)  # Floor at Rs.50
+                        
+                        # Use centralized F&O position sizing (NO CAP - use full 80%)
+                        lots, position_cost, can_afford = calculate_fo_position_size(
+                            capital=current_capital,
+                            premium=option_premium,
+                            lot_size=lot_size
+                        )
+                        # REMOVED CAP: Use maximum affordable lots (80% of capital)
+                        # lots = min(max_lots, lots)  # OLD: Artificial cap removed
+                        
+                        if not can_afford or lots < 1:
+                            logger.debug(f"[AI BACKTEST] Cannot afford trade: Premium={option_premium:.2f}, Lots={lots}")
+                            continue
+                        
+                        qty = lots * lot_size
+                        entry_price = option_premium
+                        
+                        logger.info(f"[AI BACKTEST POSITION] Premium: Rs.{option_premium:.2f}, Affordable lots: {lots}, Total capital used: Rs.{position_cost:.2f} ({position_cost/current_capital*100:.1f}%)")
+                        
+                        # F&O-specific stop/target - TARGET unchanged (greedy), LOSS capped at ₹300/trade
+                        stop_loss = option_premium * 0.90   # 10% stop base
+                        target = option_premium * 1.15      # 15% target (keep full profit)
+                        MAX_LOSS_PER_TRADE = 300.0         # Cap gross loss per trade (≤ ₹300; net ≈ ₹350 after charges)
+                        loss_at_stop = (entry_price - stop_loss) * qty
+                        if loss_at_stop > MAX_LOSS_PER_TRADE and qty > 0:
+                            stop_loss = entry_price - (MAX_LOSS_PER_TRADE / qty)
+                            stop_loss = round(max(1.0, stop_loss), 2)
+                            logger.info(f"[AI BACKTEST F&O] Stop tightened to cap loss at ₹{MAX_LOSS_PER_TRADE:.0f} | SL: Rs.{stop_loss:.2f}")
+                        
+                        logger.info(f"[AI BACKTEST F&O] {index_name} {selected_strike} {option_type}: "
+                                  f"Premium={option_premium:.2f}, Lots={lots}, Qty={qty}, "
+                                  f"Target=Rs.{target:.2f} (15% - quick exit for volume)")
+                    else:
+                        # Regular stock/index (fallback)
+                        if strategy:
+                            stop_loss = strategy.get_stop_loss(entry_price)
+                            target = strategy.get_target(entry_price)
+                        else:
+                            stop_loss = entry_price * 0.985
+                            target = entry_price * 1.03
+                        
+                        # Calculate position sizing
+                        risk_amount = current_capital * risk_percent / 100
+                        risk_per_share = abs(entry_price - stop_loss)
+                        
+                        if risk_per_share > 0:
+                            qty_float = risk_amount / risk_per_share
+                            qty = max(1, int(qty_float))
+                        else:
+                            qty = max(1, int(risk_amount / entry_price))
+                        
+                        logger.info(f"[AI BACKTEST] Position Sizing: Qty={qty}, Entry={entry_price:.2f}, SL={stop_loss:.2f}")
+                    
+                except Exception as e:
+                    logger.warning(f"[AI BACKTEST] Failed to calculate position: {e}")
+                    continue
+                
+                entries_triggered += 1
+                
+                if qty > 0:
+                    # Calculate capital usage for this trade
+                    capital_used = entry_price * qty
+                    capital_remaining = current_capital - capital_used
+                    lots_used = qty // lot_size if lot_size > 1 else 1
+                    price_per_lot = entry_price * lot_size  # Cost of 1 lot
+                    
+                    current_position = {
+                        "strategy": current_strategy_name,
+                        "entry_time": candle_time,
+                        "entry_price": entry_price,
+                        "stop_loss": stop_loss,
+                        "target": target,
+                        "qty": qty,
+                        "is_option": simulate_as_option,
+                        "lot_size": lot_size,
+                        "index_price_at_entry": ltp if simulate_as_option else None,
+                        "capital_used": capital_used,
+                        "capital_remaining": capital_remaining,
+                        "lots": lots_used,
+                        "price_per_lot": price_per_lot,
+                        "option_type": option_type if simulate_as_option else None,
+                        "strike": selected_strike if simulate_as_option else None,
+                    }
+                    strategies_used.add(current_strategy_name)
+                    
+                    # Increment hourly counter
+                    hourly_trade_counts[current_hour] = hourly_trade_counts.get(current_hour, 0) + 1
+                    
+                    logger.info(f"[AI BACKTEST] {trade_date} {candle_time}: ENTRY {current_strategy_name} @Rs.{entry_price:.2f} × {qty} (Lots:{lots_used} @ Rs.{price_per_lot:.2f}/lot) | SL:Rs.{stop_loss:.2f} Target:Rs.{target:.2f}")
+                    logger.info(f"[AI BACKTEST] Capital Used: Rs.{capital_used:.2f} ({capital_used/current_capital*100:.1f}%) | Remaining: Rs.{capital_remaining:.2f} | {entry_reason}")
+                else:
+                    logger.warning(f"[AI BACKTEST] {trade_date} {candle_time}: Entry signal but qty=0")
+    
+    # Close any open position at end of day
+    if current_position:
+        MAX_LOSS_PER_TRADE = 300.0  # Same cap as intraday stop (gross loss per trade)
+        # Calculate exit price based on position type
+        if current_position.get("is_option"):
+            # For F&O options, calculate final premium based on underlying movement
+            underlying_move = candles[-1]["close"] - current_position["index_price_at_entry"]
+            delta_effect = 0.5 if option_type == "CE" else -0.5
+            premium_change = underlying_move * abs(delta_effect)
+            exit_price = current_position["entry_price"] + premium_change
+            exit_price = max(10, exit_price)  # Floor at Rs.10
+            
+            logger.info(f"[AI BACKTEST F&O] EOD: Index moved from {current_position['index_price_at_entry']:.2f} to {candles[-1]['close']:.2f}, "
+                       f"Option premium: {current_position['entry_price']:.2f} → {exit_price:.2f}")
+        else:
+            exit_price = candles[-1]["close"]
+        
+        exit_pnl = (exit_price - current_position["entry_price"]) * current_position["qty"]
+        # Cap DAY_END loss at same ₹300/trade as intraday stop (so last closing loss is never above 300 gross)
+        if exit_pnl < 0 and abs(exit_pnl) > MAX_LOSS_PER_TRADE:
+            qty = current_position["qty"]
+            exit_pnl = -MAX_LOSS_PER_TRADE
+            exit_price = current_position["entry_price"] - (MAX_LOSS_PER_TRADE / qty)
+            exit_price = round(max(1.0, exit_price), 2)
+            logger.info(f"[AI BACKTEST F&O] EOD loss capped at ₹{MAX_LOSS_PER_TRADE:.0f} gross (effective exit Rs.{exit_price:.2f})")
+        
+        # Calculate brokerage & taxes
+        charges = calculate_fo_charges(
+            entry_price=current_position["entry_price"],
+            exit_price=exit_price,
+            qty=current_position["qty"],
+            lot_size=current_position.get("lot_size", 50)
+        )
+        net_pnl = calculate_net_pnl(exit_pnl, charges)
+        
+        day_trades.append({
+            "date": trade_date.isoformat(),
+            "strategy": current_position["strategy"],
+            "entry_time": str(current_position["entry_time"]),
+            "exit_time": str(candles[-1].get("timestamp", "")),
+            "entry_price": current_position["entry_price"],
+            "exit_price": exit_price,
+            "qty": current_position["qty"],
+            "pnl": exit_pnl,
+            "charges": charges,
+            "net_pnl": net_pnl,
+            "exit_reason": "DAY_END",
+            "capital_used": current_position.get("capital_used", 0),
+            "capital_remaining": current_position.get("capital_remaining", 0),
+            "lots": current_position.get("lots", 1),
+            "price_per_lot": current_position.get("price_per_lot", 0),
+            "option_type": current_position.get("option_type"),
+            "strike": current_position.get("strike"),
+        })
+        day_pnl += net_pnl  # Use NET P&L for capital tracking
+        logger.info(f"[AI BACKTEST] {trade_date} EOD: Closed position @ Rs.{exit_price:.2f} | Gross P&L: Rs.{exit_pnl:.2f} | Charges: Rs.{charges['total_charges']:.2f} | Net P&L: Rs.{net_pnl:.2f}")
+        current_position = None
+    
+    # Log day statistics for debugging
+    logger.info(f"[AI BACKTEST] Day {trade_date} Stats: Candles processed={candles_processed}, "
+                f"Skipped (hours)={candles_skipped_hours}, Entry checks={entry_checks}, "
+                f"Trades executed={len(day_trades)}, AI Switches={ai_switches_today}")
+    
+    # Day summary
+    wins = sum(1 for t in day_trades if t["pnl"] > 0)
+    losses = sum(1 for t in day_trades if t["pnl"] <= 0)
+    total_trades_all_hours = sum(hourly_trade_counts.values())
+    
+    return {
+        "trades": day_trades,
+        "daily_pnl": day_pnl,
+        "ending_capital": current_capital + day_pnl,
+        "ai_switches": ai_switches_today,
+        "frequency_mode": frequency_mode,
+        "hourly_breakdown": dict(hourly_trade_counts),
+        "daily_summary": {
+            "date": trade_date.isoformat(),
+            "trades": len(day_trades),
+            "wins": wins,
+            "losses": losses,
+            "pnl": day_pnl,
+            "cumulative_pnl": 0,  # Will be filled by caller
+            "strategies": list(strategies_used),
+            "ai_switches": ai_switches_today,
+            "frequency_mode": frequency_mode,
+            "total_trades_attempted": total_trades_all_hours,
+        }
+    }
+
+
+def _init_day_worker(backend: Any, cache_path: str | None) -> None:
+    """Pool initializer: the parent's LLM backend and decision cache file."""
+    set_llm_backend(backend)
+    set_decision_cache(DecisionCache(cache_path) if cache_path else None)
+
+
+def _simulate_day_job(job: dict[str, Any]) -> dict[str, Any]:
+    return simulate_trading_day(**job)
+
+
+def iter_day_results(
+    jobs: Iterable[dict[str, Any]],
+    *,
+    max_workers: int | None = None,
+    cache_path: str | Path | None = AI_BACKTEST_DECISION_CACHE,
+) -> Iterator[tuple[dict[str, Any], dict[str, Any]]]:
+    """
+    Simulate independent days (simulate_trading_day keyword arguments per job) and yield
+    (job, day_result) in job order. Days run in worker processes when more than one worker and
+    day are available; a day whose worker fails is re-run in this process. cache_path installs
+    the decision cache for the run (this thread and every worker).
+    """
+    jobs = list(jobs)
+    workers = max(1, min(max_workers or AI_BACKTEST_WORKERS or os.cpu_count() or 1, len(jobs) or 1))
+    saved_cache = get_decision_cache()
+    cache = DecisionCache(cache_path) if cache_path and str(cache_path) != "0" else None
+    set_decision_cache(cache)
+    try:
+        if workers == 1:
+            for job in jobs:
+                yield job, simulate_trading_day(**job)
+            return
+        logger.info("[AI BACKTEST] Simulating %s days on %s worker processes", len(jobs), workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_day_worker,
+            initargs=(get_llm_backend(), str(cache.path) if cache is not None else None),
+        ) as pool:
+            futures = [pool.submit(_simulate_day_job, job) for job in jobs]
+            for job, fut in zip(jobs, futures):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    logger.warning(f"[AI BACKTEST] Worker failed for {job['trade_date']}, simulating in-process: {e}")
+                    result = simulate_trading_day(**job)
+                yield job, result
+    finally:
+        set_decision_cache(saved_cache)
@@ -1,20 +1,243 @@
 """
 Data provider for backtest: serves candles up to current index. No live/zerodha calls.
+
+Candles are stored column-wise in contiguous float64 arrays (CandleStore). Rolling VWAP and
+RSI, plus EMA, Wilder RSI and ATR series, are computed once per window/period over the whole
+store with the engine.indicators batch functions, so every provider call at bar i is an array lookup instead of a slice-and-recompute.
+get_recent_candles returns a CandleWindow of read-only CandleView rows, so strategies written
+against the dict API (candles[-1]["close"], c.get("volume", 0)) keep working unchanged.
 """
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from engine import indicators
+from engine.indicators import rsi_simple_last as _rsi_from_prices
+
+_IST = ZoneInfo("Asia/Kolkata")
+
+CANDLE_FIELDS = ("date", "open", "high", "low", "close", "volume")
+_PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _to_epoch(value: Any) -> float:
+    """Seconds since epoch for a candle date (datetime or ISO string); NaN when unparseable."""
+    if value is None or value == "":
+        return float("nan")
+    try:
+        if hasattr(value, "timestamp"):
+            return float(value.timestamp())
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return float("nan")
+
+
+class CandleStore:
+    """Column-oriented OHLCV store: one contiguous float64 array per field plus bar dates."""
+
+    __slots__ = ("open", "high", "low", "close", "volume", "timestamp", "_dates", "_columns", "_lists")
+
+    def __init__(
+        self,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        timestamp: np.ndarray | None = None,
+        dates: Sequence[Any] | None = None,
+    ):
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        n = len(self.close)
+        if timestamp is None:
+            timestamp = np.full(n, np.nan)
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+        # None: derive ISO dates (IST) from timestamp on access, e.g. for stores rebuilt from shared memory.
+        self._dates = dates
+        self._columns = {
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "timestamp": self.timestamp,
+        }
+        # Python-float copies for per-bar scalar access from CandleView (much cheaper than
+        # indexing a numpy array and boxing the result on every strategy lookup).
+        self._lists: dict[str, list[float]] = {f: self._columns[f].tolist() for f in _PRICE_FIELDS}
+
+    @classmethod
+    def from_candles(cls, candles: Sequence[Mapping[str, Any]]) -> "CandleStore":
+        """Build from the legacy list-of-dicts candle format (date, open, high, low, close, volume)."""
+        cols = {f: np.fromiter((float(c.get(f) or 0) for c in candles), dtype=np.float64, count=len(candles))
+                for f in _PRICE_FIELDS}
+        dates = [c.get("date", c.get("timestamp", "")) for c in candles]
+        timestamp = np.fromiter((_to_epoch(d) for d in dates), dtype=np.float64, count=len(dates))
+        return cls(timestamp=timestamp, dates=dates, **cols)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CandleStore":
+        """Build from a fetch_nse_ohlc-style frame (Datetime, Open, High, Low, Close, Volume) without iterrows."""
+        lower = {str(c).lower(): c for c in df.columns}
+
+        def col(name: str) -> np.ndarray:
+            src = lower.get(name)
+            if src is None:
+                return np.zeros(len(df), dtype=np.float64)
+            return pd.to_numeric(df[src], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+        dt_col = lower.get("datetime") or lower.get("date")
+        if dt_col is not None:
+            dt = pd.to_datetime(df[dt_col], errors="coerce", utc=True)
+            timestamp = ((dt - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+            dates = df[dt_col].array
+        else:
+            timestamp, dates = None, None
+        return cls(col("open"), col("high"), col("low"), col("close"), col("volume"), timestamp=timestamp, dates=dates)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def column_list(self, name: str) -> list[float]:
+        return self._lists[name]
+
+    def date(self, i: int) -> str:
+        if self._dates is None:
+            ts = self.timestamp[i]
+            return "" if np.isnan(ts) else datetime.fromtimestamp(float(ts), _IST).isoformat()
+        d = self._dates[i]
+        return d.isoformat() if hasattr(d, "isoformat") else str(d)
+
+    def take(self, mask_or_index: np.ndarray) -> "CandleStore":
+        """New store with only the selected bars (boolean mask or integer index array)."""
+        idx = np.flatnonzero(mask_or_index) if np.asarray(mask_or_index).dtype == bool else np.asarray(mask_or_index)
+        return CandleStore(
+            self.open[idx], self.high[idx], self.low[idx], self.close[idx], self.volume[idx],
+            timestamp=self.timestamp[idx],
+            dates=(
+                None if self._dates is None
+                else self._dates.take(idx) if hasattr(self._dates, "take")
+                else [self._dates[int(i)] for i in idx]
+            ),
+        )
+
+
+class CandleView(Mapping):
+    """Read-only dict-like view of one bar in a CandleStore."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: CandleStore, i: int):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        col = self._store._lists.get(key)
+        if col is not None:
+            return col[self._i]
+        if key == "date":
+            return self._store.date(self._i)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        col = self._store._lists.get(key)
+        if col is not None:
+            return col[self._i]
+        if key == "date":
+            return self._store.date(self._i)
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CANDLE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(CANDLE_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"CandleView({dict(self)!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(self)
+
+
+class CandleWindow(Sequence):
+    """Read-only view of bars [start, stop) in a CandleStore; slicing returns another window."""
+
+    __slots__ = ("_store", "_start", "_stop")
+
+    def __init__(self, store: CandleStore, start: int, stop: int):
+        self._store = store
+        self._start = start
+        self._stop = max(start, stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, key: int | slice) -> Any:
+        n = self._stop - self._start
+        if isinstance(key, slice):
+            start, stop, step = key.indices(n)
+            if step != 1:
+                return [CandleView(self._store, self._start + j) for j in range(start, stop, step)]
+            return CandleWindow(self._store, self._start + start, self._start + max(start, stop))
+        if key < 0:
+            key += n
+        if key < 0 or key >= n:
+            raise IndexError("candle index out of range")
+        return CandleView(self._store, self._start + key)
+
+    def __iter__(self) -> Iterator[CandleView]:
+        store = self._store
+        for i in range(self._start, self._stop):
+            yield CandleView(store, i)
+
+    def column(self, name: str) -> np.ndarray:
+        """Array slice (no copy) of one field over this window."""
+        return self._store.column(name)[self._start:self._stop]
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        return [CandleView(self._store, i).to_dict() for i in range(self._start, self._stop)]
 
 
 class BacktestDataProvider:
-    """Provides get_recent_candles, get_ltp, get_vwap, get_rsi from a fixed candle list and current index."""
+    """Provides get_recent_candles, get_ltp, get_vwap, get_rsi, get_ema, get_atr from a fixed candle store and current index."""
 
-    def __init__(self, candles: list[dict[str, Any]], current_index: int = 0):
-        self.candles = candles
+    def __init__(self, candles: list[dict[str, Any]] | CandleStore, current_index: int = 0):
+        self.store = candles if isinstance(candles, CandleStore) else CandleStore.from_candles(candles)
+        self.candles = CandleWindow(self.store, 0, len(self.store))
         self.current_index = current_index
+        self._series: dict[tuple[str, int], np.ndarray] = {}
+        close = self.store.close
+        # Legacy RSI drops zero closes before differencing; only then fall back to per-call compute.
+        self._has_zero_close = bool(len(close) and (close == 0).any())
 
     def set_index(self, i: int) -> None:
-        self.current_index = max(0, min(i, len(self.candles) - 1))
+        self.current_index = max(0, min(i, len(self.store) - 1))
+
+    def _cached(self, name: str, period: int, build) -> np.ndarray:
+        key = (name, period)
+        arr = self._series.get(key)
+        if arr is None:
+            arr = build()
+            self._series[key] = arr
+        return arr
 
     def get_recent_candles(
         self,
@@ -22,52 +245,80 @@ class BacktestDataProvider:
         interval: str = "5m",
         count: int = 20,
         period: str = "1d",
-    ) -> list[dict[str, Any]]:
-        end = self.current_index + 1
+    ) -> CandleWindow:
+        end = self.current_index + 1 if len(self.store) else 0
         start = max(0, end - count)
-        return self.candles[start:end]
+        return CandleWindow(self.store, start, end)
 
     def get_ltp(self, instrument: str) -> float:
-        if not self.candles or self.current_index < 0:
+        if not len(self.store) or self.current_index < 0:
             return 0.0
-        c = self.candles[self.current_index]
-        return float(c.get("close", 0) or c.get("open", 0))
+        i = self.current_index
+        return float(self.store.close[i] or self.store.open[i])
 
-    def get_vwap(self, instrument: str, interval: str = "5m", count: int = 50) -> float:
-        candles = self.get_recent_candles(instrument, interval=interval, count=count)
-        if not candles:
+    def get_quote(self, instrument: str, exchange: str = "NSE") -> dict[str, Any]:
+        if not len(self.store):
+            return {"last": 0.0, "last_price": 0.0}
+        i = self.current_index
+        ltp = self.get_ltp(instrument)
+        return {
+            "last": ltp,
+            "last_price": ltp,
+            "open": float(self.store.open[i]),
+            "high": float(self.store.high[i]),
+            "low": float(self.store.low[i]),
+        }
+
+    def get_vwap(self, instrument: str, interval: str = "5m", count: int = 50, period: str | None = None) -> float:
+        """Volume-weighted average price over the last `count` bars ending at the current index."""
+        if not len(self.store) or count <= 0:
             return 0.0
-        total_vtp = 0.0
-        total_vol = 0.0
-        for c in candles:
-            typical = (c.get("high", 0) + c.get("low", 0) + c.get("close", 0)) / 3.0
-            vol = c.get("volume") or 0
-            total_vtp += typical * vol
-            total_vol += vol
-        if total_vol <= 0:
-            return float(candles[-1].get("close", 0))
-        return round(total_vtp / total_vol, 2)
-
-    def get_rsi(self, instrument: str, interval: str = "5m", period: int = 14, count: int | None = None) -> float | None:
+        i = self.current_index
+        s = self.store
+        value = self._cached("vwap", count, lambda: indicators.rolling_vwap(s.high, s.low, s.close, s.volume, count))[i]
+        if np.isnan(value):
+            return float(self.store.close[i])
+        return round(float(value), 2)
+
+    def get_rsi(
+        self,
+        instrument: str,
+        interval: str = "5m",
+        period: int = 14,
+        count: int | None = None,
+        data_period: str | None = None,
+        wilder: bool = False,
+    ) -> float | None:
+        """
+        RSI at the current index. Default matches the live provider (simple average of the last
+        `period` changes within the last `count` bars); wilder=True uses Wilder smoothing over the full series.
+        """
         need = count or period + 2
-        candles = self.get_recent_candles(instrument, interval=interval, count=need)
-        if not candles:
+        available = min(need, self.current_index + 1) if len(self.store) else 0
+        if available < period + 1:
+            return None
+        if wilder:
+            value = self._cached("wilder_rsi", period, lambda: indicators.rsi(self.store.close, period))[self.current_index]
+            return None if np.isnan(value) else float(value)
+        if self._has_zero_close:
+            candles = self.get_recent_candles(instrument, interval=interval, count=need)
+            closes = [float(c.get("close", 0)) for c in candles if c.get("close")]
+            if len(closes) < period + 1:
+                return None
+            return _rsi_from_prices(closes, period)
+        return float(self._cached("rsi", period, lambda: indicators.rsi_simple(self.store.close, period))[self.current_index])
+
+    def get_ema(self, instrument: str, period: int = 20, interval: str = "5m") -> float | None:
+        """EMA of close (span=period, seeded with the first close) at the current index; None before `period` bars."""
+        if self.current_index + 1 < period or not len(self.store):
             return None
-        closes = [float(c.get("close", 0)) for c in candles if c.get("close")]
-        if len(closes) < period + 1:
+        ema = self._cached("ema", period, lambda: indicators.ema(self.store.close, period))
+        return float(ema[self.current_index])
+
+    def get_atr(self, instrument: str, period: int = 14, interval: str = "5m") -> float | None:
+        """Wilder ATR at the current index; None before `period` bars."""
+        if self.current_index + 1 < period or not len(self.store):
             return None
-        return _rsi_from_prices(closes, period)
-
-
-def _rsi_from_prices(prices: list[float], period: int) -> float | None:
-    if not prices or len(prices) < period + 1:
-        return None
-    changes = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
-    gains = [c if c > 0 else 0.0 for c in changes[-period:]]
-    losses = [-c if c < 0 else 0.0 for c in changes[-period:]]
-    avg_gain = sum(gains) / period
-    avg_loss = sum(losses) / period
-    if avg_loss == 0:
-        return 100.0
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+        s = self.store
+        return float(self._cached("atr", period, lambda: indicators.atr(s.high, s.low, s.close, period))[self.current_index])
+
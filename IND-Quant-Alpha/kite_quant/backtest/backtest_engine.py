@@ -4,13 +4,17 @@ Deterministic, offline. Does not use the real-time session engine.
 """
 from __future__ import annotations
 
-import json
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta
 from typing import Any
 
-from engine.data_fetcher import fetch_nse_ohlc
+import numpy as np
+import pandas as pd
+
+from backtest.backtest_data_provider import BacktestDataProvider, CandleStore
+from backtest.results_store import get_results_store
+from engine.data_fetcher import fetch_nse_ohlc, fetch_nse_ohlc_range
 from engine.risk_engine import evaluate_post_exit
+from strategies.base_strategy import BaseStrategy
 from strategies.strategy_registry import STRATEGY_MAP
 from risk.risk_manager import RiskConfig, RiskManager
 from nifty_banknifty_engine.constants import nse_symbol as _nse_symbol
@@ -24,48 +28,44 @@ def _interval_kite(interval: str) -> str:
     return interval or "5m"
 
 
-def _load_candles(instrument: str, from_date: str, to_date: str, timeframe: str) -> list[dict[str, Any]]:
-    """Load historical candles for instrument and date range. Uses NIFTY/BANKNIFTY symbol mapping."""
+def _load_candles(instrument: str, from_date: str, to_date: str, timeframe: str) -> CandleStore:
+    """
+    Load historical candles for instrument and date range into a columnar CandleStore.
+    Uses NIFTY/BANKNIFTY symbol mapping. Falls back to the whole fetched range when no bar
+    falls inside [from_date, to_date].
+    """
     symbol = _nse_symbol(instrument)
     kite_interval = _interval_kite(timeframe)
+    empty = CandleStore.from_candles([])
     try:
         start = datetime.strptime(from_date[:10], "%Y-%m-%d")
         end = datetime.strptime(to_date[:10], "%Y-%m-%d")
-        days = max(1, (end - start).days + 1)
-        period = "60d" if days > 30 else ("30d" if days > 5 else "5d")
-        df = fetch_nse_ohlc(symbol, interval=kite_interval, period=period)
+        df = fetch_nse_ohlc_range(symbol, kite_interval, start, end + timedelta(days=1))
+        if df is None or df.empty:
+            days = max(1, (end - start).days + 1)
+            period = "60d" if days > 30 else ("30d" if days > 5 else "5d")
+            df = fetch_nse_ohlc(symbol, interval=kite_interval, period=period)
         if df is None or df.empty or "Close" not in df.columns:
-            return []
-        out = []
-        for _, row in df.iterrows():
-            d = row.get("Datetime")
-            if d is not None and hasattr(d, "date"):
-                if not (start.date() <= d.date() <= end.date()):
-                    continue
-            c = {
-                "date": d.isoformat() if d is not None and hasattr(d, "isoformat") else str(d),
-                "open": float(row.get("Open", row.get("open", 0))),
-                "high": float(row.get("High", row.get("high", 0))),
-                "low": float(row.get("Low", row.get("low", 0))),
-                "close": float(row.get("Close", row.get("close", 0))),
-                "volume": float(row.get("Volume", row.get("volume", 0))),
-            }
-            out.append(c)
-        if not out:
-            for _, row in df.iterrows():
-                d = row.get("Datetime")
-                c = {
-                    "date": d.isoformat() if d is not None and hasattr(d, "isoformat") else str(d),
-                    "open": float(row.get("Open", row.get("open", 0))),
-                    "high": float(row.get("High", row.get("high", 0))),
-                    "low": float(row.get("Low", row.get("low", 0))),
-                    "close": float(row.get("Close", row.get("close", 0))),
-                    "volume": float(row.get("Volume", row.get("volume", 0))),
-                }
-                out.append(c)
-        return out
+            return empty
+        store = CandleStore.from_frame(df)
+        if "Datetime" not in df.columns:
+            return store
+        # Compare on the bar's own calendar date (exchange-local, not UTC) like the per-row filter did.
+        dt = df["Datetime"]
+        if pd.api.types.is_datetime64_any_dtype(dt):
+            local = dt.dt.tz_localize(None) if dt.dt.tz is not None else dt
+            dated = local.notna().to_numpy()
+            in_range = ((local >= pd.Timestamp(start)) & (local < pd.Timestamp(end) + pd.Timedelta(days=1))).to_numpy(dtype=bool)
+        else:
+            bar_dates = [d.date() if hasattr(d, "date") else None for d in dt]
+            dated = np.array([d is not None for d in bar_dates], dtype=bool)
+            in_range = np.array([d is not None and start.date() <= d <= end.date() for d in bar_dates], dtype=bool)
+        keep = in_range | ~dated
+        if not in_range.any():
+            return store
+        return store.take(keep)
     except Exception:
-        return []
+        return empty
 
 
 def run_backtest_engine(
@@ -78,12 +78,51 @@ def run_backtest_engine(
     risk_percent_per_trade: float = 1.0,
     max_daily_loss_percent: float = 3.0,
     max_trades: int = 20,
+    vectorized: bool = True,
+    strategy_params: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     """
     Run backtest: load candles, loop candle-by-candle, use strategy + RiskManager.
     Returns dict with trades, net_pnl, win_rate, max_drawdown, equity_curve.
     """
     candles = _load_candles(instrument, from_date, to_date, timeframe)
+    return run_backtest_on_candles(
+        candles,
+        instrument=instrument,
+        strategy_name=strategy_name,
+        from_date=from_date,
+        to_date=to_date,
+        timeframe=timeframe,
+        initial_capital=initial_capital,
+        risk_percent_per_trade=risk_percent_per_trade,
+        max_daily_loss_percent=max_daily_loss_percent,
+        max_trades=max_trades,
+        vectorized=vectorized,
+        strategy_params=strategy_params,
+    )
+
+
+def run_backtest_on_candles(
+    candles: CandleStore,
+    instrument: str,
+    strategy_name: str,
+    from_date: str,
+    to_date: str,
+    timeframe: str = "5minute",
+    initial_capital: float = 100000.0,
+    risk_percent_per_trade: float = 1.0,
+    max_daily_loss_percent: float = 3.0,
+    max_trades: int = 20,
+    vectorized: bool = True,
+    strategy_params: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Run backtest on an already-loaded candle store (used by run_backtest_engine and the batch runner).
+    With vectorized=True, strategies that implement compute_signals get all entries/stops/targets
+    in one pass; other strategies (and vectorized=False) call check_entry candle by candle.
+    strategy_params: the strategy's tunable PARAMS, plus stop_mult / target_mult scaling the
+    stop and target distance from entry (1.0 = the strategy's own levels).
+    """
     if len(candles) < 10:
         return {
             "error": "Insufficient candle data",
@@ -94,9 +133,13 @@ def run_backtest_engine(
             "equity_curve": [],
         }
     StrategyClass = STRATEGY_MAP.get(strategy_name) or STRATEGY_MAP.get("Momentum Breakout")
-    from backtest.backtest_data_provider import BacktestDataProvider
+    params = dict(strategy_params or {})
+    stop_mult = float(params.pop("stop_mult", 1.0))
+    target_mult = float(params.pop("target_mult", 1.0))
     provider = BacktestDataProvider(candles)
-    strategy = StrategyClass(instrument, provider)
+    candles = provider.candles
+    strategy = StrategyClass(instrument, provider, params=params)
+    signals = _vectorized_signals(strategy, provider.store) if vectorized else None
     config = RiskConfig(
         capital=initial_capital,
         risk_percent_per_trade=risk_percent_per_trade,
@@ -145,6 +188,15 @@ def run_backtest_engine(
                 if dd > max_drawdown:
                     max_drawdown = dd
                 equity_curve.append({"index": i, "equity": equity, "date": candle.get("date", "")})
+        elif signals is not None:
+            if signals.entry[i]:
+                entry_price = float(signals.entry_price[i])
+                stop_loss = float(signals.stop_loss[i])
+                target = float(signals.target[i])
+                stop_loss, target = _scale_exits(entry_price, stop_loss, target, stop_mult, target_mult)
+                current_trade = _open_trade(
+                    risk_mgr, session, candle, strategy_name, entry_price, stop_loss, target
+                )
         else:
             result = strategy.check_entry()
             if isinstance(result, dict):
@@ -160,18 +212,10 @@ def run_backtest_engine(
                 else:
                     stop_loss = strategy.get_stop_loss(entry_price)
                     target = strategy.get_target(entry_price)
-                stop_for_risk = stop_loss if stop_loss != entry_price else entry_price * 0.995
-                approved, reason, lots = risk_mgr.validate_trade(session, entry_price, stop_for_risk, 1, premium=None)
-                if approved and lots > 0:
-                    qty = lots
-                    current_trade = {
-                        "entry_price": entry_price,
-                        "stop_loss": stop_loss,
-                        "target": target,
-                        "qty": qty,
-                        "entry_time": candle.get("date", ""),
-                        "strategy_name": strategy_name,
-                    }
+                stop_loss, target = _scale_exits(entry_price, stop_loss, target, stop_mult, target_mult)
+                current_trade = _open_trade(
+                    risk_mgr, session, candle, strategy_name, entry_price, stop_loss, target
+                )
     wins = sum(1 for t in trades if t.get("pnl", 0) > 0)
     total = len(trades)
     win_rate = (wins / total * 100) if total else 0
@@ -179,6 +223,7 @@ def run_backtest_engine(
     return {
         "instrument": instrument,
         "strategy": strategy_name,
+        "strategy_params": {**strategy.params, "stop_mult": stop_mult, "target_mult": target_mult},
         "from_date": from_date,
         "to_date": to_date,
         "timeframe": timeframe,
@@ -193,36 +238,75 @@ def run_backtest_engine(
     }
 
 
+def _vectorized_signals(strategy: Any, store: CandleStore) -> Any:
+    """
+    Strategy's compute_signals over the whole store, or None to fall back to check_entry.
+    Strategies overriding the F&O-aware stop/target hooks stay bar-by-bar, since the signal
+    arrays only carry get_stop_loss/get_target values.
+    """
+    cls = type(strategy)
+    if (
+        cls.get_stop_loss_fo_aware is not BaseStrategy.get_stop_loss_fo_aware
+        or cls.get_target_fo_aware is not BaseStrategy.get_target_fo_aware
+    ):
+        return None
+    try:
+        signals = strategy.compute_signals(store)
+    except Exception:
+        return None
+    if signals is None or len(signals.entry) != len(store):
+        return None
+    return signals
+
+
+def _scale_exits(
+    entry_price: float, stop_loss: float, target: float, stop_mult: float, target_mult: float
+) -> tuple[float, float]:
+    """Scale the stop and target distance from entry (walk-forward parameters); 1.0 leaves them as set."""
+    if stop_mult != 1.0:
+        stop_loss = round(entry_price - (entry_price - stop_loss) * stop_mult, 2)
+    if target_mult != 1.0 and target:
+        target = round(entry_price + (target - entry_price) * target_mult, 2)
+    return stop_loss, target
+
+
+def _open_trade(
+    risk_mgr: RiskManager,
+    session: dict[str, Any],
+    candle: Any,
+    strategy_name: str,
+    entry_price: float,
+    stop_loss: float,
+    target: float,
+) -> dict[str, Any] | None:
+    """Size the entry through RiskManager; returns the open trade or None when rejected."""
+    stop_for_risk = stop_loss if stop_loss != entry_price else entry_price * 0.995
+    approved, reason, lots = risk_mgr.validate_trade(session, entry_price, stop_for_risk, 1, premium=None)
+    if not (approved and lots > 0):
+        return None
+    return {
+        "entry_price": entry_price,
+        "stop_loss": stop_loss,
+        "target": target,
+        "qty": lots,
+        "entry_time": candle.get("date", ""),
+        "strategy_name": strategy_name,
+    }
+
+
 def save_backtest_result(result: dict[str, Any]) -> None:
-    """Append backtest result to data/backtest_results.json."""
-    base = Path(__file__).resolve().parent.parent
-    path = base / "data" / "backtest_results.json"
-    path.parent.mkdir(parents=True, exist_ok=True)
+    """Append backtest result to the results store (data/backtest_results.jsonl); sets result["run_id"]."""
     try:
-        data = {"runs": [], "updatedAt": datetime.now().isoformat()}
-        if path.exists():
-            with open(path, encoding="utf-8") as f:
-                data = json.load(f)
-        runs = data.get("runs") or []
-        result["run_id"] = f"bt_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        runs.append(result)
-        data["runs"] = runs[-100:]
-        data["updatedAt"] = datetime.now().isoformat()
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        get_results_store().save(result, kind="backtest")
     except Exception:
         pass
 
 
-def load_backtest_results() -> list[dict[str, Any]]:
-    """Load all backtest runs from data/backtest_results.json."""
-    base = Path(__file__).resolve().parent.parent
-    path = base / "data" / "backtest_results.json"
-    if not path.exists():
-        return []
+def load_backtest_results(limit: int | None = None) -> list[dict[str, Any]]:
+    """Full results of saved backtest runs, oldest first; limit keeps the most recent N."""
+    store = get_results_store()
     try:
-        with open(path, encoding="utf-8") as f:
-            data = json.load(f)
-        return data.get("runs") or []
+        runs = (store.get(r["run_id"]) for r in store.runs(kind="backtest", limit=limit))
+        return [r for r in runs if r is not None]
     except Exception:
         return []
@@ -0,0 +1,214 @@
+"""
+Batch backtest runner: parameter sweep over instruments x strategies x date ranges x risk settings.
+
+Each candle series is loaded once in the parent and published to workers through
+multiprocessing.shared_memory as a (6, n) float64 block, so runs never re-fetch or
+re-pickle candles. Runs fan out over a ProcessPoolExecutor and the results are
+ranked into a leaderboard (net PnL, then win rate, then lowest max drawdown).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from backtest.backtest_data_provider import CandleStore
+from backtest.backtest_engine import _load_candles, run_backtest_on_candles
+from strategies.strategy_registry import STRATEGY_MAP
+
+logger = logging.getLogger(__name__)
+
+# Row order of the shared (6, n) block; matches CandleStore's columns.
+_SHARED_ROWS = ("timestamp", "open", "high", "low", "close", "volume")
+
+# Worker-side attachments: shm name -> (SharedMemory, CandleStore). Kept for the worker's lifetime.
+_attached: dict[str, tuple[shared_memory.SharedMemory, CandleStore]] = {}
+
+
+def unique_strategy_names() -> list[str]:
+    """One display name per strategy class in STRATEGY_MAP (aliases skipped)."""
+    seen: set[type] = set()
+    names = []
+    for name, cls in STRATEGY_MAP.items():
+        if cls in seen:
+            continue
+        seen.add(cls)
+        names.append(name)
+    return names
+
+
+@dataclass
+class SweepJob:
+    """One backtest run in a sweep grid."""
+
+    job_id: int
+    instrument: str
+    strategy: str
+    from_date: str
+    to_date: str
+    timeframe: str = "5minute"
+    risk: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def series_key(self) -> tuple[str, str, str, str]:
+        return (self.instrument, self.from_date, self.to_date, self.timeframe)
+
+
+def build_sweep_grid(
+    instruments: Iterable[str],
+    strategies: Iterable[str] | None = None,
+    date_ranges: Iterable[tuple[str, str]] = (),
+    risk_params: Iterable[dict[str, float]] | None = None,
+    timeframe: str = "5minute",
+) -> list[SweepJob]:
+    """
+    Cartesian grid of runs. strategies=None uses every strategy class once; each risk_params
+    entry may set initial_capital, risk_percent_per_trade, max_daily_loss_percent, max_trades.
+    """
+    strategy_names = list(strategies) if strategies else unique_strategy_names()
+    risks = list(risk_params) if risk_params else [{}]
+    jobs = []
+    for instrument in instruments:
+        for from_date, to_date in date_ranges:
+            for strategy in strategy_names:
+                for risk in risks:
+                    jobs.append(SweepJob(len(jobs), instrument, strategy, from_date, to_date, timeframe, dict(risk)))
+    return jobs
+
+
+def _publish(store: CandleStore) -> tuple[shared_memory.SharedMemory, tuple[str, int]]:
+    """Copy a store into a new shared-memory block; returns (owner handle, (name, bars)) for workers."""
+    n = len(store)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(_SHARED_ROWS) * n * 8))
+    block = np.ndarray((len(_SHARED_ROWS), n), dtype=np.float64, buffer=shm.buf)
+    for row, name in enumerate(_SHARED_ROWS):
+        block[row] = store.column(name)
+    return shm, (shm.name, n)
+
+
+def _attach(spec: tuple[str, int]) -> CandleStore:
+    """Zero-copy CandleStore over a published block (cached per worker process)."""
+    name, n = spec
+    hit = _attached.get(name)
+    if hit is not None:
+        return hit[1]
+    # Pool workers share the parent's resource tracker, so attaching here does not take ownership;
+    # the parent closes and unlinks every block when the sweep finishes.
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(_SHARED_ROWS), n), dtype=np.float64, buffer=shm.buf)
+    store = CandleStore(block[1], block[2], block[3], block[4], block[5], timestamp=block[0])
+    _attached[name] = (shm, store)
+    return store
+
+
+def _summarize(job: SweepJob, result: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "job_id": job.job_id,
+        "instrument": job.instrument,
+        "strategy": job.strategy,
+        "from_date": job.from_date,
+        "to_date": job.to_date,
+        "timeframe": job.timeframe,
+        "risk": job.risk,
+        "net_pnl": result.get("net_pnl", 0),
+        "win_rate": result.get("win_rate", 0),
+        "max_drawdown": result.get("max_drawdown", 0),
+        "total_trades": result.get("total_trades", 0),
+        "final_equity": result.get("final_equity"),
+        "error": result.get("error"),
+    }
+
+
+def _run_job(job: SweepJob, spec: tuple[str, int]) -> dict[str, Any]:
+    """Worker entry point: one backtest on a shared candle series, summary only (no equity curve)."""
+    store = _attach(spec)
+    result = run_backtest_on_candles(
+        store,
+        instrument=job.instrument,
+        strategy_name=job.strategy,
+        from_date=job.from_date,
+        to_date=job.to_date,
+        timeframe=job.timeframe,
+        **job.risk,
+    )
+    return _summarize(job, result)
+
+
+def rank_results(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Leaderboard: highest net PnL first, ties broken by win rate then lower max drawdown; errored runs last."""
+    ok = [r for r in results if not r.get("error")]
+    failed = [r for r in results if r.get("error")]
+    ok.sort(key=lambda r: (-float(r.get("net_pnl") or 0), -float(r.get("win_rate") or 0), float(r.get("max_drawdown") or 0)))
+    for rank, r in enumerate(ok, start=1):
+        r["rank"] = rank
+    return ok + failed
+
+
+def run_parameter_sweep(
+    jobs: list[SweepJob],
+    max_workers: int | None = None,
+    progress_callback: Callable[[dict[str, Any]], None] | None = None,
+    load_candles: Callable[[str, str, str, str], CandleStore] = _load_candles,
+) -> dict[str, Any]:
+    """
+    Run all jobs across a process pool. Candle series are loaded once per
+    (instrument, from_date, to_date, timeframe) and shared with workers.
+    Returns {"leaderboard", "total_runs", "failed_runs", "series_loaded", "elapsed_sec"}.
+    """
+    started = time.perf_counter()
+    owners: list[shared_memory.SharedMemory] = []
+    specs: dict[tuple[str, str, str, str], tuple[str, int]] = {}
+    results: list[dict[str, Any]] = []
+    try:
+        for job in jobs:
+            key = job.series_key
+            if key in specs:
+                continue
+            store = load_candles(*key)
+            shm, spec = _publish(store)
+            owners.append(shm)
+            specs[key] = spec
+            logger.info("[SWEEP] Loaded %s bars for %s %s..%s", len(store), job.instrument, job.from_date, job.to_date)
+
+        total = len(jobs)
+        workers = max(1, min(max_workers or os.cpu_count() or 1, total or 1))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_job, job, specs[job.series_key]): job for job in jobs}
+            for done, fut in enumerate(as_completed(futures), start=1):
+                job = futures[fut]
+                try:
+                    summary = fut.result()
+                except Exception as e:
+                    logger.exception("[SWEEP] Run %s (%s %s) failed", job.job_id, job.instrument, job.strategy)
+                    summary = _summarize(job, {"error": str(e)})
+                results.append(summary)
+                if progress_callback:
+                    progress_callback({
+                        "type": "progress",
+                        "done": done,
+                        "total": total,
+                        "progress": int(done / total * 100) if total else 100,
+                        "last": summary,
+                    })
+    finally:
+        for shm in owners:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+
+    leaderboard = rank_results(results)
+    return {
+        "leaderboard": leaderboard,
+        "total_runs": len(results),
+        "failed_runs": sum(1 for r in results if r.get("error")),
+        "series_loaded": len(specs),
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+    }
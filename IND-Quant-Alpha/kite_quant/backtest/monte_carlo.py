@@ -0,0 +1,135 @@
+"""
+Monte Carlo robustness for a backtest's trade list: resample the order of closed-trade P&L and
+measure the spread of drawdowns and final equity a different sequence would have produced.
+
+Equity paths are computed as whole matrices (one row per simulation): cumulative sums for the
+equity, np.maximum.accumulate for the running peak, so a few thousand paths take milliseconds.
+Drawdown follows backtest_engine: the peak starts at initial capital and is measured after each
+closed trade. Simulations run in fixed-size chunks seeded from one SeedSequence, so results for a
+given seed do not depend on how many worker processes share the chunks.
+
+Methods:
+- "shuffle": permute the trade order (final equity is fixed; only the path changes).
+- "bootstrap": draw trades with replacement (final equity varies too).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MC_CHUNK_SIMS = 2000
+MC_METHODS = ("shuffle", "bootstrap")
+_PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+
+def equity_paths(pnl: np.ndarray, initial_capital: float) -> np.ndarray:
+    """(sims, trades + 1) equity after each trade for a (sims, trades) P&L matrix; column 0 is the start."""
+    pnl = np.atleast_2d(np.asarray(pnl, dtype=np.float64))
+    out = np.empty((pnl.shape[0], pnl.shape[1] + 1), dtype=np.float64)
+    out[:, 0] = initial_capital
+    np.cumsum(pnl, axis=1, out=out[:, 1:])
+    out[:, 1:] += initial_capital
+    return out
+
+
+def max_drawdowns(equity: np.ndarray) -> np.ndarray:
+    """Max drawdown fraction of each equity row (peak-to-trough over the running peak)."""
+    equity = np.atleast_2d(equity)
+    peak = np.maximum.accumulate(equity, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, (peak - equity) / peak, 0.0)
+    return dd.max(axis=1)
+
+
+def trade_metrics(pnls: Iterable[float], initial_capital: float) -> dict[str, Any]:
+    """Headline metrics of one trade sequence (net P&L, win rate, drawdown %, per-trade Sharpe, profit factor)."""
+    pnl = np.asarray(list(pnls), dtype=np.float64)
+    n = len(pnl)
+    if not n:
+        return {"total_trades": 0, "net_pnl": 0.0, "win_rate": 0.0, "max_drawdown": 0.0,
+                "sharpe": 0.0, "profit_factor": None, "final_equity": round(initial_capital, 2)}
+    equity = equity_paths(pnl, initial_capital)
+    std = pnl.std(ddof=1) if n > 1 else 0.0
+    gains, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+    return {
+        "total_trades": n,
+        "net_pnl": round(float(pnl.sum()), 2),
+        "win_rate": round(float((pnl > 0).mean() * 100), 2),
+        "max_drawdown": round(float(max_drawdowns(equity)[0] * 100), 2),
+        "sharpe": round(float(pnl.mean() / std * np.sqrt(n)), 4) if std > 0 else 0.0,
+        "profit_factor": round(float(gains / losses), 4) if losses > 0 else None,  # None: no losing trades
+        "final_equity": round(float(equity[0, -1]), 2),
+    }
+
+
+def _simulate_chunk(
+    pnl: np.ndarray, initial_capital: float, sims: int, seed: np.random.SeedSequence, method: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """(max drawdown fraction, final equity) for `sims` resampled paths."""
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        paths = pnl[rng.integers(0, len(pnl), size=(sims, len(pnl)))]
+    else:
+        paths = rng.permuted(np.broadcast_to(pnl, (sims, len(pnl))), axis=1)
+    equity = equity_paths(paths, initial_capital)
+    return max_drawdowns(equity), equity[:, -1].copy()
+
+
+def _pct(values: np.ndarray, scale: float = 1.0) -> dict[str, float]:
+    return {f"p{q}": round(float(np.percentile(values, q)) * scale, 2) for q in _PERCENTILES}
+
+
+def run_monte_carlo(
+    pnls: Iterable[float],
+    initial_capital: float = 100000.0,
+    n_sims: int = 1000,
+    method: str = "shuffle",
+    seed: int | None = None,
+    ruin_drawdown_pct: float = 50.0,
+    max_workers: int | None = 1,
+) -> dict[str, Any]:
+    """
+    Drawdown and final-equity distribution over n_sims resampled trade sequences.
+    max_workers > 1 (None = cpu count) spreads chunks of MC_CHUNK_SIMS paths over a process pool.
+    Returns percentiles of max drawdown (%) and final equity, probability of a losing run and of
+    a drawdown of at least ruin_drawdown_pct, and where the actual sequence's drawdown ranks.
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"method must be one of {MC_METHODS}")
+    pnl = np.asarray(list(pnls), dtype=np.float64)
+    n_sims = max(1, int(n_sims))
+    actual = trade_metrics(pnl, initial_capital)
+    if not len(pnl):
+        return {"method": method, "n_sims": 0, "trades": 0, "actual": actual, "error": "No trades to resample"}
+    sizes = [MC_CHUNK_SIMS] * (n_sims // MC_CHUNK_SIMS) + ([n_sims % MC_CHUNK_SIMS] if n_sims % MC_CHUNK_SIMS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(sizes)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_chunk, [pnl] * len(sizes), [initial_capital] * len(sizes), sizes, seeds, [method] * len(sizes)))
+    else:
+        parts = [_simulate_chunk(pnl, initial_capital, s, sq, method) for s, sq in zip(sizes, seeds)]
+    dd = np.concatenate([p[0] for p in parts])
+    final = np.concatenate([p[1] for p in parts])
+    actual_dd = max_drawdowns(equity_paths(pnl, initial_capital))[0]
+    return {
+        "method": method,
+        "n_sims": n_sims,
+        "trades": len(pnl),
+        "seed": seed,
+        "initial_capital": initial_capital,
+        "actual": actual,
+        "max_drawdown_pct": {**_pct(dd, 100.0), "mean": round(float(dd.mean() * 100), 2), "max": round(float(dd.max() * 100), 2)},
+        "final_equity": {**_pct(final), "mean": round(float(final.mean()), 2)},
+        "prob_loss": round(float((final < initial_capital).mean()), 4),
+        "prob_ruin": round(float((dd * 100 >= ruin_drawdown_pct).mean()), 4),
+        "ruin_drawdown_pct": ruin_drawdown_pct,
+        # Share of resampled paths with a drawdown no worse than the actual sequence's.
+        "actual_drawdown_rank": round(float((dd <= actual_dd + 1e-12).mean()), 4),
+    }
@@ -0,0 +1,205 @@
+"""
+Backtest results store: data/backtest_results.jsonl, one run per line, no run cap.
+
+Saving a run appends one line instead of rewriting a JSON file capped at the last 100 runs.
+Only a small summary of each run (kind, instrument, strategy, dates, headline metrics) and the
+byte span of its line are kept in memory, indexed by run_id, kind, instrument and strategy;
+full results (trades, equity curves, walk-forward windows) are read back from disk on demand.
+Lines appended by another process (backtest workers) are picked up on the next read. The
+legacy data/backtest_results.json is imported once when the store does not exist yet.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from threading import RLock
+from typing import Any
+
+_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+LEGACY_RESULTS_FILE = _DATA_DIR / "backtest_results.json"
+RESULTS_FILE = _DATA_DIR / "backtest_results.jsonl"
+
+_RUN_ID_PREFIX = {"backtest": "bt", "walk_forward": "wf", "monte_carlo": "mc"}
+_SUMMARY_FIELDS = (
+    "instrument", "strategy", "from_date", "to_date", "timeframe",
+    "net_pnl", "win_rate", "max_drawdown", "total_trades", "final_equity",
+)
+
+
+def new_run_id(kind: str = "backtest") -> str:
+    """bt_/wf_/mc_ + timestamp + random suffix (unique across processes saving in the same second)."""
+    prefix = _RUN_ID_PREFIX.get(kind, kind[:2] or "bt")
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+class BacktestResultStore:
+    """JSONL results store with an in-memory summary index and on-demand full reads."""
+
+    def __init__(self, path: Path, legacy_path: Path | None = None) -> None:
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._lock = RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._offset = 0
+        self._summaries: list[dict[str, Any]] = []
+        self._spans: list[tuple[int, int]] = []
+        self._by_id: dict[str, int] = {}
+        self._by_kind: dict[str, list[int]] = {}
+        self._by_instrument: dict[str, list[int]] = {}
+        self._by_strategy: dict[str, list[int]] = {}
+
+    # --- Loading / indexing ---
+
+    def _import_legacy(self) -> None:
+        """One-time import of the legacy JSON runs (the JSON file is left as is)."""
+        if self.path.exists() or not self.legacy_path or not self.legacy_path.exists():
+            return
+        try:
+            with open(self.legacy_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        runs = data.get("runs") if isinstance(data, dict) else None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for run in runs or []:
+                if isinstance(run, dict):
+                    record = {"kind": "backtest", **run}
+                    record.setdefault("run_id", new_run_id("backtest"))
+                    f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        os.replace(tmp, self.path)
+
+    def _refresh(self) -> None:
+        """Index lines appended since the last read (by this or another process)."""
+        self._import_legacy()
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            if self._offset:
+                self._reset()
+            return
+        if size < self._offset:  # store replaced or truncated
+            self._reset()
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b"\n") + 1  # a partially written last line is picked up next time
+        pos = 0
+        while pos < end:
+            nl = chunk.index(b"\n", pos)
+            line = chunk[pos:nl]
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict) and record.get("run_id"):
+                    self._index(record, (self._offset + pos, nl - pos))
+            pos = nl + 1
+        self._offset += end
+
+    def _index(self, record: dict[str, Any], span: tuple[int, int]) -> None:
+        run_id = str(record["run_id"])
+        summary = {
+            "run_id": run_id,
+            "kind": str(record.get("kind") or "backtest"),
+            "created_at": record.get("created_at"),
+            **{k: record.get(k) for k in _SUMMARY_FIELDS},
+        }
+        prev = self._by_id.get(run_id)
+        if prev is not None:  # re-saved run: latest line wins, keeps its original position
+            self._summaries[prev] = summary
+            self._spans[prev] = span
+            return
+        pos = len(self._summaries)
+        self._summaries.append(summary)
+        self._spans.append(span)
+        self._by_id[run_id] = pos
+        self._by_kind.setdefault(summary["kind"], []).append(pos)
+        self._by_instrument.setdefault(str(summary["instrument"] or "").upper(), []).append(pos)
+        self._by_strategy.setdefault(str(summary["strategy"] or ""), []).append(pos)
+
+    # --- Writes ---
+
+    def save(self, result: dict[str, Any], kind: str = "backtest") -> str:
+        """Append one run; sets result["run_id"] (kept if already present) and returns it."""
+        result.setdefault("run_id", new_run_id(kind))
+        record = {"kind": kind, "created_at": datetime.now().isoformat(), **result}
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._refresh()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._refresh()
+        return result["run_id"]
+
+    # --- Queries ---
+
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """Full result of one run (read from its line on disk)."""
+        with self._lock:
+            self._refresh()
+            pos = self._by_id.get(run_id)
+            if pos is None:
+                return None
+            start, length = self._spans[pos]
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                return json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+    def runs(
+        self,
+        kind: str | None = None,
+        instrument: str | None = None,
+        strategy: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Run summaries in save order matching every given filter; limit keeps the most recent N."""
+        with self._lock:
+            self._refresh()
+            candidates: list[list[int]] = []
+            if kind:
+                candidates.append(self._by_kind.get(kind, []))
+            if instrument:
+                candidates.append(self._by_instrument.get(instrument.upper(), []))
+            if strategy:
+                candidates.append(self._by_strategy.get(strategy, []))
+            if not candidates:
+                positions: list[int] | range = range(len(self._summaries))
+            else:
+                candidates.sort(key=len)
+                rest = [set(c) for c in candidates[1:]]
+                positions = [p for p in candidates[0] if all(p in r for r in rest)]
+            if limit is not None:
+                positions = positions[-limit:] if limit > 0 else []
+            return [dict(self._summaries[p]) for p in positions]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._summaries)
+
+
+_store = BacktestResultStore(RESULTS_FILE, legacy_path=LEGACY_RESULTS_FILE)
+
+
+def get_results_store() -> BacktestResultStore:
+    return _store
+
+
+def set_results_store(store: BacktestResultStore | None) -> None:
+    """Install a store (tests); None restores data/backtest_results.jsonl."""
+    global _store
+    _store = store if store is not None else BacktestResultStore(RESULTS_FILE, legacy_path=LEGACY_RESULTS_FILE)
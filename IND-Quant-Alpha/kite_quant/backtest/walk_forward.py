@@ -0,0 +1,327 @@
+"""
+Walk-forward optimisation: tune strategy parameters on rolling in-sample windows and judge the
+chosen parameters only on the out-of-sample window that follows.
+
+The candle series is loaded once and published to workers through shared memory (as in the
+batch runner). For every window, each parameter combination from the grid is backtested on the
+in-sample bars across a process pool; the best combination by the objective (subject to a
+minimum trade count) is then replayed on the out-of-sample bars. Out-of-sample trades from all
+windows are stitched into one equity curve, and Monte Carlo trade-order resampling
+(backtest.monte_carlo) gives its drawdown distribution. Windows are counted in trading days
+(IST calendar dates of the bars) and each window is replayed from a cold start.
+
+Tunable parameters: stop_mult / target_mult for every strategy (scale the stop and target
+distance from entry), plus the strategy's own PARAMS (e.g. Momentum Breakout lookback).
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable
+
+import numpy as np
+
+from backtest.backtest_data_provider import CandleStore
+from backtest.backtest_engine import _load_candles, run_backtest_on_candles
+from backtest.batch_runner import _attach, _publish
+from backtest.monte_carlo import run_monte_carlo, trade_metrics
+from backtest.results_store import get_results_store
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVES = ("net_pnl", "sharpe", "profit_factor", "calmar")
+BARS_PER_DAY = 75  # 5-minute NSE session; day split for stores without timestamps
+_IST_OFFSET_SEC = 19800
+
+
+@dataclass
+class WalkForwardWindow:
+    """Bar ranges (end exclusive) of one in-sample / out-of-sample pair."""
+
+    index: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def day_bounds(store: CandleStore, bars_per_day: int = BARS_PER_DAY) -> np.ndarray:
+    """First bar index of each trading day, followed by len(store)."""
+    ts = store.timestamp
+    if len(ts) and np.isfinite(ts).all():
+        day = np.floor((ts + _IST_OFFSET_SEC) / 86400.0)
+        starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    else:
+        starts = np.arange(0, len(store), max(1, bars_per_day))
+    return np.r_[starts, len(store)].astype(int)
+
+
+def build_windows(
+    bounds: np.ndarray,
+    train_days: int,
+    test_days: int,
+    step_days: int | None = None,
+    anchored: bool = False,
+) -> list[WalkForwardWindow]:
+    """
+    Rolling windows over trading days: train_days in-sample then test_days out-of-sample,
+    advancing by step_days (default test_days). anchored=True grows the in-sample window from
+    the first day instead of rolling it.
+    """
+    n_days = len(bounds) - 1
+    step = max(1, int(step_days or test_days))
+    windows = []
+    k = 0
+    while True:
+        train_hi = k * step + train_days
+        test_hi = train_hi + test_days
+        if test_hi > n_days:
+            break
+        train_lo = 0 if anchored else k * step
+        windows.append(WalkForwardWindow(
+            len(windows), int(bounds[train_lo]), int(bounds[train_hi]), int(bounds[train_hi]), int(bounds[test_hi])
+        ))
+        k += 1
+    return windows
+
+
+def param_grid(grid: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    """Cartesian product of {param: [values]}; an empty grid is the strategy's defaults."""
+    keys = [k for k, values in grid.items() if values]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+def _score(metrics: dict[str, Any], objective: str, min_trades: int, initial_capital: float) -> tuple:
+    """Sort key (higher is better): enough trades first, then the objective, then net P&L."""
+    if metrics.get("error"):
+        return (False, float("-inf"), float("-inf"))
+    net = float(metrics.get("net_pnl") or 0)
+    if objective == "sharpe":
+        value = float(metrics.get("sharpe") or 0)
+    elif objective == "profit_factor":
+        pf = metrics.get("profit_factor")
+        value = (float("inf") if net > 0 else 0.0) if pf is None else float(pf)
+    elif objective == "calmar":
+        value = (net / initial_capital * 100.0) / max(float(metrics.get("max_drawdown") or 0), 0.01)
+    else:
+        value = net
+    return (int(metrics.get("total_trades") or 0) >= min_trades, value, net)
+
+
+def _run_window_job(
+    spec: tuple[str, int],
+    lo: int,
+    hi: int,
+    instrument: str,
+    strategy: str,
+    timeframe: str,
+    params: dict[str, Any],
+    risk: dict[str, float],
+    keep_trades: bool,
+) -> dict[str, Any]:
+    """Worker entry point: backtest bars [lo, hi) of a shared series with one parameter set."""
+    store = _attach(spec).take(np.arange(lo, hi))
+    result = run_backtest_on_candles(
+        store,
+        instrument=instrument,
+        strategy_name=strategy,
+        from_date=store.date(0)[:10] if len(store) else "",
+        to_date=store.date(len(store) - 1)[:10] if len(store) else "",
+        timeframe=timeframe,
+        strategy_params=params,
+        **risk,
+    )
+    trades = result.get("trades") or []
+    out = {"error": result.get("error"), **trade_metrics((t["pnl"] for t in trades), risk.get("initial_capital", 100000.0))}
+    # The engine's totals use unrounded trade P&L; prefer them over sums of the rounded trades.
+    out.update({k: result[k] for k in ("net_pnl", "win_rate", "max_drawdown", "final_equity") if k in result})
+    if keep_trades:
+        out["trades"] = trades
+    return out
+
+
+def _window_dates(store: CandleStore, w: WalkForwardWindow) -> dict[str, Any]:
+    return {
+        **asdict(w),
+        "train_from": store.date(w.train_start)[:10],
+        "train_to": store.date(w.train_end - 1)[:10],
+        "test_from": store.date(w.test_start)[:10],
+        "test_to": store.date(w.test_end - 1)[:10],
+    }
+
+
+def run_walk_forward(
+    instrument: str,
+    strategy: str,
+    from_date: str,
+    to_date: str,
+    grid: dict[str, list[Any]],
+    timeframe: str = "5minute",
+    train_days: int = 20,
+    test_days: int = 5,
+    step_days: int | None = None,
+    anchored: bool = False,
+    objective: str = "net_pnl",
+    min_trades: int = 3,
+    risk: dict[str, float] | None = None,
+    mc_sims: int = 1000,
+    mc_seed: int | None = None,
+    max_workers: int | None = None,
+    progress_callback: Callable[[dict[str, Any]], None] | None = None,
+    load_candles: Callable[[str, str, str, str], CandleStore] = _load_candles,
+    save: bool = True,
+) -> dict[str, Any]:
+    """
+    Walk-forward optimisation of one strategy on one instrument over grid ({param: [values]}).
+    risk may set initial_capital, risk_percent_per_trade, max_daily_loss_percent, max_trades.
+    Returns per-window best parameters with in-/out-of-sample metrics, the stitched out-of-sample
+    trades, equity curve and metrics, walk-forward efficiency, parameter stability and a Monte
+    Carlo drawdown distribution. save=True stores the result (kind "walk_forward").
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    started = time.perf_counter()
+    risk = dict(risk or {})
+    initial_capital = float(risk.setdefault("initial_capital", 100000.0))
+    combos = param_grid(grid) or [{}]
+    store = load_candles(instrument, from_date, to_date, timeframe)
+    windows = build_windows(day_bounds(store), int(train_days), int(test_days), step_days, anchored)
+    if not windows:
+        return {"error": f"Need at least {int(train_days) + int(test_days)} trading days of candles", "windows": []}
+
+    owners: list[shared_memory.SharedMemory] = []
+    total = len(windows) * len(combos) + len(windows)
+    done = 0
+
+    def report(phase: str) -> None:
+        if progress_callback:
+            progress_callback({
+                "type": "progress", "phase": phase, "done": done, "total": total,
+                "progress": int(done / total * 100) if total else 100,
+            })
+
+    in_sample: dict[int, list[tuple[dict[str, Any], dict[str, Any]]]] = {w.index: [] for w in windows}
+    out_sample: dict[int, dict[str, Any]] = {}
+    best: dict[int, tuple[dict[str, Any], dict[str, Any]]] = {}
+    try:
+        shm, spec = _publish(store)
+        owners.append(shm)
+        logger.info("[WALK-FORWARD] %s %s: %s windows x %s parameter sets on %s bars",
+                    instrument, strategy, len(windows), len(combos), len(store))
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(windows) * len(combos)))
+        job_args = (instrument, strategy, timeframe)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_run_window_job, spec, w.train_start, w.train_end, *job_args, params, risk, False): (w, params)
+                for w in windows for params in combos
+            }
+            for fut in as_completed(futures):
+                w, params = futures[fut]
+                try:
+                    metrics = fut.result()
+                except Exception as e:
+                    logger.exception("[WALK-FORWARD] In-sample run failed (window %s, %s)", w.index, params)
+                    metrics = {"error": str(e)}
+                in_sample[w.index].append((params, metrics))
+                done += 1
+                report("in_sample")
+
+            futures = {}
+            for w in windows:
+                # Grid order breaks exact ties, so the choice does not depend on completion order.
+                ranked = sorted(
+                    in_sample[w.index],
+                    key=lambda pm: (_score(pm[1], objective, min_trades, initial_capital), -combos.index(pm[0])),
+                    reverse=True,
+                )
+                best[w.index] = ranked[0]
+                fut = pool.submit(_run_window_job, spec, w.test_start, w.test_end, *job_args, ranked[0][0], risk, True)
+                futures[fut] = w
+            for fut in as_completed(futures):
+                w = futures[fut]
+                try:
+                    out_sample[w.index] = fut.result()
+                except Exception as e:
+                    logger.exception("[WALK-FORWARD] Out-of-sample run failed (window %s)", w.index)
+                    out_sample[w.index] = {"error": str(e), "trades": []}
+                done += 1
+                report("out_of_sample")
+    finally:
+        for shm in owners:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+
+    window_rows = []
+    trades: list[dict[str, Any]] = []
+    stability: dict[str, dict[str, int]] = {}
+    is_pnl_per_day, oos_pnl_per_day = [], []
+    bounds = day_bounds(store)
+    for w in windows:
+        params, is_metrics = best[w.index]
+        oos = out_sample[w.index]
+        oos_trades = oos.pop("trades", []) or []
+        for t in oos_trades:
+            trades.append({**t, "window": w.index})
+        for name, value in params.items():
+            bucket = stability.setdefault(name, {})
+            bucket[str(value)] = bucket.get(str(value), 0) + 1
+        train_days_n = int(np.searchsorted(bounds, w.train_end) - np.searchsorted(bounds, w.train_start))
+        test_days_n = int(np.searchsorted(bounds, w.test_end) - np.searchsorted(bounds, w.test_start))
+        is_pnl_per_day.append(float(is_metrics.get("net_pnl") or 0) / max(train_days_n, 1))
+        oos_pnl_per_day.append(float(oos.get("net_pnl") or 0) / max(test_days_n, 1))
+        window_rows.append({
+            **_window_dates(store, w),
+            "best_params": params,
+            "in_sample": is_metrics,
+            "out_of_sample": oos,
+            "candidates": len(in_sample[w.index]),
+        })
+
+    pnls = np.array([t["pnl"] for t in trades], dtype=np.float64)
+    equity = initial_capital + np.cumsum(pnls)
+    equity_curve = [{"index": 0, "equity": initial_capital, "date": store.date(windows[0].test_start)}] + [
+        {"index": i + 1, "equity": round(float(e), 2), "date": t.get("exit_time", "")}
+        for i, (e, t) in enumerate(zip(equity, trades))
+    ]
+    oos_metrics = trade_metrics(pnls, initial_capital)
+    mean_is = float(np.mean(is_pnl_per_day)) if is_pnl_per_day else 0.0
+    result = {
+        "instrument": instrument,
+        "strategy": strategy,
+        "from_date": from_date,
+        "to_date": to_date,
+        "timeframe": timeframe,
+        "objective": objective,
+        "grid": grid,
+        "train_days": int(train_days),
+        "test_days": int(test_days),
+        "step_days": int(step_days or test_days),
+        "anchored": bool(anchored),
+        "min_trades": min_trades,
+        "risk": risk,
+        "initial_capital": initial_capital,
+        **oos_metrics,
+        "windows": window_rows,
+        "trades": trades,
+        "equity_curve": equity_curve,
+        # Out-of-sample P&L per day relative to the chosen parameters' in-sample P&L per day.
+        "walk_forward_efficiency": round(float(np.mean(oos_pnl_per_day)) / mean_is, 4) if mean_is > 0 else None,
+        "param_stability": stability,
+        "monte_carlo": run_monte_carlo(pnls, initial_capital, n_sims=mc_sims, seed=mc_seed) if mc_sims else None,
+        "total_runs": total,
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+    }
+    if save:
+        try:
+            get_results_store().save(result, kind="walk_forward")
+        except Exception:
+            logger.exception("[WALK-FORWARD] Could not save result")
+    return result
@@ -0,0 +1,70 @@
+"""
+Synthetic OHLCV candles for the test scripts (test_*.py); not a test module itself.
+
+make_candles() builds a seeded random walk as Kite-style candle dicts, make_store() wraps it in a
+CandleStore and frame() turns candles into an OHLCV DataFrame. Timestamps follow `start`: pass an
+IST-aware datetime to get "+05:30" dates like Kite's.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Hashable
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+IST = timezone(timedelta(hours=5, minutes=30))
+# Intraday sessions: 75 x 5m bars a day from 09:15 IST (pass as make_candles(..., **SESSIONS))
+SESSIONS = {"start": datetime(2024, 1, 1, 9, 15, tzinfo=IST), "session_bars": 75}
+
+
+def make_candles(
+    n: int = 600,
+    seed: Hashable = 7,
+    price: float = 22000.0,
+    vol: float = 0.0007,
+    drift: float = 0.0,
+    start: datetime = datetime(2024, 2, 9, 9, 15),
+    interval_minutes: int = 5,
+    session_bars: int | None = None,
+    spike_prob: float = 0.0,
+    flat_prob: float = 0.0,
+    zero_volume_prob: float = 0.0,
+) -> list[dict[str, Any]]:
+    """
+    n candles; each close moves by gauss(drift, vol) of the open.
+
+    session_bars: bars per trading day (75 for 5m); the next day starts at `start`'s time.
+    spike_prob: chance of a bar with a 4x move and 5x volume (breakout/climax signals).
+    flat_prob / zero_volume_prob: chance of close == open / volume == 0 (edge cases for indicators).
+    """
+    rng = random.Random(seed)
+    step = timedelta(minutes=interval_minutes)
+    candles = []
+    for i in range(n):
+        day, bar = divmod(i, session_bars) if session_bars else (0, i)
+        o = price
+        spike = rng.random() < spike_prob
+        c = o * (1 + rng.gauss(drift, vol) * (4 if spike else 1))
+        if rng.random() < flat_prob:
+            c = o
+        h = max(o, c) + abs(rng.gauss(0, vol / 2)) * o
+        l = min(o, c) - abs(rng.gauss(0, vol / 2)) * o
+        v = 0 if rng.random() < zero_volume_prob else rng.randint(1000, 9000) * (5 if spike else 1)
+        candles.append({
+            "date": (start + timedelta(days=day) + bar * step).isoformat(),
+            "open": round(o, 2), "high": round(h, 2), "low": round(l, 2), "close": round(c, 2), "volume": float(v),
+        })
+        price = c
+    return candles
+
+
+def make_store(n: int = 600, seed: Hashable = 7, **kwargs: Any):
+    """make_candles() as a CandleStore."""
+    from backtest.backtest_data_provider import CandleStore
+
+    return CandleStore.from_candles(make_candles(n, seed, **kwargs))
+
+
+def frame(candles: list[dict[str, Any]]):
+    """OHLCV DataFrame of candle dicts (other keys such as date dropped)."""
+    import pandas as pd
+
+    return pd.DataFrame(candles)[OHLCV]
@@ -6,16 +6,11 @@ from __future__ import annotations
 
 import json
 import logging
-import os
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from engine.llm_decisions import complete_cached, get_llm_backend
 
 logger = logging.getLogger(__name__)
 _GOVERNANCE_PROMPT_PATH = Path(__file__).resolve().parents[2] / "ai_governance_prompt.txt"
@@ -341,47 +336,33 @@ def get_ai_strategy_recommendation(
     current_strategy: str | None = None,
 ) -> dict[str, Any] | None:
     """
-    Get AI-powered strategy recommendation using OpenAI GPT.
-    Returns None if OpenAI is not configured or fails.
+    Get AI-powered strategy recommendation from the configured LLM backend (OpenAI GPT by default).
+    Calls go through the decision cache when one is installed (AI backtests), keyed by the prompt.
+    Returns a reject payload if the backend is not configured or fails.
     """
-    if not OPENAI_AVAILABLE:
-        logger.warning("OpenAI library not installed. Install with: pip install openai")
-        return _reject_recommendation("OpenAI library not available")
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("OPENAI_API_KEY not configured. AI strategy selection disabled.")
-        return _reject_recommendation("OPENAI_API_KEY missing")
+    backend = get_llm_backend()
+    unavailable = backend.unavailable_reason()
+    if unavailable:
+        return _reject_recommendation(unavailable)
     
     try:
         # Must load governance prompt before every call.
         governance_prompt = _load_governance_prompt()
-        client = openai.OpenAI(api_key=api_key)
         
         prompt = build_gpt_prompt(context, current_strategy)
         
         logger.info(f"[AI ADVISOR] Requesting strategy recommendation...")
         
-        response = client.chat.completions.create(
-            model="gpt-5",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert intraday trading advisor specializing in Indian markets.\n\n"
-                        "You MUST obey this governance policy exactly:\n"
-                        f"{governance_prompt}\n\n"
-                        "If any rule is violated or input is insufficient, you MUST output a reject JSON."
-                    ),
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3,  # Lower temperature for more consistent recommendations
-            max_completion_tokens=500,
+        result = complete_cached(
+            backend,
+            (
+                "You are an expert intraday trading advisor specializing in Indian markets.\n\n"
+                "You MUST obey this governance policy exactly:\n"
+                f"{governance_prompt}\n\n"
+                "If any rule is violated or input is insufficient, you MUST output a reject JSON."
+            ),
+            prompt,
         )
-        
-        result = response.choices[0].message.content
         try:
             recommendation = json.loads(result)
         except json.JSONDecodeError as e:
@@ -95,6 +95,21 @@ def get_algos_grouped() -> dict[str, list[dict[str, Any]]]:
     return grouped
 
 
+def _regime_row(stock_indicators: dict[str, Any]) -> dict[str, Any] | None:
+    """Regime row for get_suggested_algos: given explicitly, else looked up by symbol."""
+    regime = stock_indicators.get("regime")
+    if isinstance(regime, dict):
+        return regime
+    if isinstance(regime, str) and regime:
+        return {"regime": regime.upper(), "quality_score": stock_indicators.get("regime_quality", 50.0)}
+    symbol = stock_indicators.get("symbol")
+    if not symbol:
+        return None
+    from engine.regime_service import get_regime
+
+    return get_regime(str(symbol))
+
+
 def get_suggested_algos(
     stock_indicators: dict[str, Any],
     market_indicators: dict[str, Any] | None = None,
@@ -103,8 +118,14 @@ def get_suggested_algos(
     """
     Score all algos from algos.json and return top N algo ids for current conditions.
     Used in Manual Mode (show as tags) and AI Mode (auto-pick top algo).
+    The market regime comes from stock_indicators["regime"] (a regime name or a regime table row)
+    or, given stock_indicators["symbol"], from the published regime table (engine.regime_service);
+    its fit is weighted by the regime's quality score. Without one, scoring ignores the regime.
     """
     market_indicators = market_indicators or {}
+    regime_row = _regime_row(stock_indicators)
+    regime = (regime_row or {}).get("regime")
+    regime_weight = max(0.0, min(1.0, float((regime_row or {}).get("quality_score") or 0) / 100.0))
     score_raw = stock_indicators.get("score") or 0
     prediction = (stock_indicators.get("prediction") or "NEUTRAL").upper()
     rsi = stock_indicators.get("rsi")
@@ -114,7 +135,7 @@ def get_suggested_algos(
     abs_trend = abs(trend_strength)
     # Volatility: high VIX or high sentiment move
     vix_high = market_indicators.get("vix_high", False)
-    volatility_high = vix_high or abs(sentiment_score) > 0.5
+    volatility_high = vix_high or abs(sentiment_score) > 0.5 or regime == "HIGH_VOL"
 
     def score_algo(algo: dict[str, Any]) -> float:
         aid = algo.get("id", "")
@@ -173,6 +194,24 @@ def get_suggested_algos(
         if aid == "volume_climax_reversal" and volatility_high:
             s += 0.5
 
+        # Market regime: trend algos in trends, range algos in ranges; dead tape penalises both
+        if regime and market_type == "TREND":
+            if regime in ("TREND_UP", "TREND_DOWN"):
+                s += 1.5 * regime_weight
+                if (regime == "TREND_UP" and prediction == "BULLISH") or (regime == "TREND_DOWN" and prediction == "BEARISH"):
+                    s += 0.3 * regime_weight
+            elif regime == "RANGE":
+                s -= 0.8
+            elif regime == "LOW_VOL":
+                s -= 0.6
+        if regime and market_type == "RANGE":
+            if regime == "RANGE":
+                s += 1.5 * regime_weight
+            elif regime in ("TREND_UP", "TREND_DOWN"):
+                s -= 0.8
+            elif regime == "LOW_VOL":
+                s -= 0.3
+
         # RSI alignment for directional algos
         if rsi is not None and market_type == "TREND":
             if prediction == "BULLISH" and rsi > 55:
@@ -178,22 +178,125 @@ def fetch_india_vix() -> dict[str, Any]:
     return {"vix_value": 16.5}
 
 
+# Kite interval names for fetch_nse_ohlc's short interval codes (Zerodha uses "5minute" not "minute5").
+_KITE_INTERVALS = {
+    "1m": "minute",
+    "3m": "3minute",
+    "5m": "5minute",
+    "15m": "15minute",
+    "30m": "30minute",
+    "1h": "60minute",
+    "1d": "day",
+}
+
+
+def _resolve_nse_token(symbol: str) -> int | None:
+    """Instrument token for an NSE tradingsymbol, or index name (e.g. "NIFTY 50"), via the instrument master."""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    from .instrument_master import get_instrument_master
+
+    instrument_token = get_instrument_master().token(symbol, "NSE")
+    if not instrument_token:
+        logger.error(f"✗ Could not find instrument token for: {symbol}")
+    return instrument_token
+
+
+def _ohlc_window(kite_interval: str, period: str) -> tuple[datetime, datetime]:
+    """(from_date, to_date) in IST for a fetch_nse_ohlc period."""
+    from zoneinfo import ZoneInfo
+    to_date = datetime.now(ZoneInfo("Asia/Kolkata"))
+
+    # For intraday intervals, fetch from market open (9:15 AM IST) to capture full day's movement
+    if "minute" in kite_interval.lower() and period == "1d":
+        # Fetch from today's market open at 9:15 AM IST
+        today_market_open = to_date.replace(hour=9, minute=15, second=0, microsecond=0)
+        if to_date.time() < today_market_open.time():
+            # Before market open - fetch from previous trading day
+            from_date = (today_market_open - timedelta(days=1))
+        else:
+            # After market open - fetch from today's 9:15 AM
+            from_date = today_market_open
+    elif period == "1d":
+        from_date = to_date - timedelta(days=1)
+    elif period == "5d":
+        from_date = to_date - timedelta(days=5)
+    elif period == "30d":
+        from_date = to_date - timedelta(days=30)
+    elif period == "60d":
+        from_date = to_date - timedelta(days=60)
+    else:
+        from_date = to_date - timedelta(days=60)
+    return from_date, to_date
+
+
+def _historical_to_frame(data: list[dict[str, Any]]) -> pd.DataFrame:
+    """Kite historical_data rows -> DataFrame with Datetime, Open, High, Low, Close, Volume."""
+    df = pd.DataFrame(data)
+    df = df.rename(columns={
+        "date": "Datetime",
+        "open": "Open",
+        "high": "High",
+        "low": "Low",
+        "close": "Close",
+        "volume": "Volume"
+    })
+    if "Datetime" in df.columns:
+        df["Datetime"] = pd.to_datetime(df["Datetime"])
+    return df
+
+
+# Max calendar days per Kite historical_data request for each interval.
+_KITE_MAX_DAYS = {
+    "minute": 60,
+    "3minute": 100,
+    "5minute": 100,
+    "15minute": 200,
+    "30minute": 200,
+    "60minute": 400,
+    "day": 2000,
+}
+
+
 def fetch_nse_ohlc(
     symbol: str,
     interval: str = "5m",
     period: str = "1d",
     api_key: str | None = None,
     base_url: str | None = None,
+    use_cache: bool = True,
 ) -> pd.DataFrame:
     """
     Fetch NSE OHLC for symbol. Uses Zerodha Kite Connect if credentials given,
     else returns empty for backtest to fill from yfinance.
+
+    Candles go through the on-disk OHLC cache (engine.ohlc_cache): only the tail since the
+    last stored bar is requested from Kite, and with no Kite client the cached bars are served.
+    Pass use_cache=False to always hit the broker.
+    """
+    kite_interval = _KITE_INTERVALS.get(interval, "5minute")
+    from_date, to_date = _ohlc_window(kite_interval, period)
+    print(f"[CANDLE FETCH] START: symbol={symbol}, interval={interval}, period={period}", flush=True)
+    return fetch_nse_ohlc_range(symbol, interval, from_date, to_date, use_cache=use_cache)
+
+
+def fetch_nse_ohlc_range(
+    symbol: str,
+    interval: str,
+    from_date: datetime,
+    to_date: datetime,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Fetch NSE OHLC for symbol between from_date and to_date (naive datetimes are IST).
+    Same frame format and caching as fetch_nse_ohlc; long ranges are split into
+    Kite-sized requests.
     """
     import logging
     logger = logging.getLogger(__name__)
     
-    print(f"[CANDLE FETCH] START: symbol={symbol}, interval={interval}, period={period}", flush=True)
-    logger.info(f"fetch_nse_ohlc called: symbol={symbol}, interval={interval}, period={period}")
+    logger.info(f"fetch_nse_ohlc called: symbol={symbol}, interval={interval}, from={from_date}, to={to_date}")
     
     try:
         from . import zerodha_client
@@ -203,124 +306,54 @@ def fetch_nse_ohlc(
         if not kite:
             print(f"[CANDLE FETCH] ERROR: No Kite client!", flush=True)
             logger.warning("No Kite client available")
-            return pd.DataFrame()
-        
-        print(f"[CANDLE FETCH] Kite client OK", flush=True)
-        
-        # Map interval to Kite format (Zerodha uses "5minute" not "minute5")
-        interval_map = {
-            "1m": "minute",
-            "3m": "3minute",
-            "5m": "5minute",
-            "15m": "15minute",
-            "30m": "30minute",
-            "1h": "60minute",
-            "1d": "day",
-        }
-        kite_interval = interval_map.get(interval, "5minute")
-        
-        # Get instrument token
-        # For indices like "NIFTY 50", match by name or tradingsymbol
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        # Get instruments list (will be cached at kiteconnect level)
-        print(f"[CANDLE FETCH] Fetching instruments list...", flush=True)
-        try:
-            instruments = kite.instruments("NSE")
-            print(f"[CANDLE FETCH] Got {len(instruments)} instruments", flush=True)
-        except Exception as e:
-            print(f"[CANDLE FETCH] ERROR fetching instruments: {e}", flush=True)
-            logger.exception(f"Failed to fetch instruments list for {symbol}: {e}")
-            return pd.DataFrame()
-            
-        instrument_token = None
-        symbol_upper = symbol.upper()
-        
-        print(f"[CANDLE FETCH] Searching for: {symbol_upper}", flush=True)
-        logger.info(f"Searching for instrument: {symbol_upper} among {len(instruments)} NSE instruments")
-        
-        # First try exact tradingsymbol match
-        for inst in instruments:
-            if inst.get("tradingsymbol", "").upper() == symbol_upper:
-                instrument_token = inst["instrument_token"]
-                logger.info(f"✓ Found by tradingsymbol: token={instrument_token}, {inst.get('name')}")
-                break
+            if not use_cache:
+                return pd.DataFrame()
+        else:
+            print(f"[CANDLE FETCH] Kite client OK", flush=True)
         
-        # If not found, try name match for indices
-        if not instrument_token:
-            for inst in instruments:
-                if inst.get("name", "").upper() == symbol_upper:
-                    instrument_token = inst["instrument_token"]
-                    logger.info(f"✓ Found by name: token={instrument_token}, tradingsymbol={inst.get('tradingsymbol')}")
+        kite_interval = _KITE_INTERVALS.get(interval, "5minute")
+        max_days = _KITE_MAX_DAYS.get(kite_interval, 60)
+
+        def _fetch_range(range_from: datetime, range_to: datetime) -> pd.DataFrame | None:
+            instrument_token = _resolve_nse_token(symbol)
+            if not instrument_token:
+                return None
+            logger.info(f"Using instrument_token={instrument_token} for {symbol}")
+
+            data: list[dict[str, Any]] = []
+            chunk_from = range_from
+            while chunk_from <= range_to:
+                chunk_to = min(range_to, chunk_from + timedelta(days=max_days))
+                # Fetch historical data
+                print(f"[CANDLE FETCH] Calling historical_data: token={instrument_token}, from={chunk_from}, to={chunk_to}, interval={kite_interval}", flush=True)
+                logger.info(f"Fetching historical: token={instrument_token}, from={chunk_from}, to={chunk_to}, interval={kite_interval}")
+                data.extend(kite.historical_data(
+                    instrument_token=instrument_token,
+                    from_date=chunk_from,
+                    to_date=chunk_to,
+                    interval=kite_interval
+                ) or [])
+                if chunk_to >= range_to:
                     break
-        
-        if not instrument_token:
-            logger.error(f"✗ Could not find instrument token for: {symbol}")
-            logger.error(f"Sample instruments: {[{k: v for k, v in inst.items() if k in ['name', 'tradingsymbol', 'instrument_type']} for inst in instruments[:5]]}")
-            return pd.DataFrame()
-        
-        logger.info(f"Using instrument_token={instrument_token} for {symbol}")
-        
-        # Calculate from/to dates based on period
-        from datetime import datetime, timedelta
-        from zoneinfo import ZoneInfo
-        to_date = datetime.now(ZoneInfo("Asia/Kolkata"))
-        
-        # For intraday intervals, fetch from market open (9:15 AM IST) to capture full day's movement
-        if "minute" in kite_interval.lower() and period == "1d":
-            # Fetch from today's market open at 9:15 AM IST
-            today_market_open = to_date.replace(hour=9, minute=15, second=0, microsecond=0)
-            if to_date.time() < today_market_open.time():
-                # Before market open - fetch from previous trading day
-                from_date = (today_market_open - timedelta(days=1))
-            else:
-                # After market open - fetch from today's 9:15 AM
-                from_date = today_market_open
-        elif period == "1d":
-            from_date = to_date - timedelta(days=1)
-        elif period == "5d":
-            from_date = to_date - timedelta(days=5)
-        elif period == "30d":
-            from_date = to_date - timedelta(days=30)
-        elif period == "60d":
-            from_date = to_date - timedelta(days=60)
+                chunk_from = chunk_to
+
+            print(f"[CANDLE FETCH] Received {len(data)} records", flush=True)
+            logger.info(f"Received {len(data)} candle records from Zerodha")
+            if not data:
+                return pd.DataFrame()
+            return _historical_to_frame(data)
+
+        if use_cache:
+            from .ohlc_cache import get_ohlc_cache
+            df = get_ohlc_cache().fetch(symbol, kite_interval, from_date, to_date, _fetch_range if kite else None)
         else:
-            from_date = to_date - timedelta(days=60)
-        
-        # Fetch historical data
-        print(f"[CANDLE FETCH] Calling historical_data: token={instrument_token}, from={from_date}, to={to_date}, interval={kite_interval}", flush=True)
-        logger.info(f"Fetching historical: token={instrument_token}, from={from_date}, to={to_date}, interval={kite_interval}")
-        
-        data = kite.historical_data(
-            instrument_token=instrument_token,
-            from_date=from_date,
-            to_date=to_date,
-            interval=kite_interval
-        )
-        
-        print(f"[CANDLE FETCH] Received {len(data) if data else 0} records", flush=True)
-        logger.info(f"Received {len(data) if data else 0} candle records from Zerodha")
-        
-        if not data:
+            df = _fetch_range(from_date, to_date)
+
+        if df is None or df.empty:
             print(f"[CANDLE FETCH] ERROR: Empty data!", flush=True)
             logger.error(f"No historical data returned from Zerodha for {symbol}")
             return pd.DataFrame()
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        df = df.rename(columns={
-            "date": "Datetime",
-            "open": "Open",
-            "high": "High",
-            "low": "Low",
-            "close": "Close",
-            "volume": "Volume"
-        })
-        
-        if "Datetime" in df.columns:
-            df["Datetime"] = pd.to_datetime(df["Datetime"])
-        
         logger.info(f"Successfully fetched {len(df)} candles for {symbol}")
         return df
     except Exception as e:
@@ -0,0 +1,129 @@
+"""
+Deterministic in-memory broker implementing engine.order_state.BrokerInterface (plus the optional
+batched get_orders_status) for order-lifecycle tests and offline runs.
+
+Orders advance by status polls, not wall time: an order OPENs on placement and COMPLETEs after
+fill_after_polls polls (batched or single), optionally passing through a partial fill. Latency
+can be injected into each broker call to measure how waiters behave under a slow broker.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+
+class FakeBroker:
+    """Scriptable broker; counters record every call so tests can assert on broker load."""
+
+    def __init__(
+        self,
+        *,
+        fill_after_polls: int = 1,
+        fill_price: float = 100.0,
+        partial_fill_ratio: float | None = None,
+        place_latency_sec: float = 0.0,
+        status_latency_sec: float = 0.0,
+        reject_symbols: tuple[str, ...] = (),
+    ) -> None:
+        self.fill_after_polls = max(0, int(fill_after_polls))
+        self.fill_price = float(fill_price)
+        self.partial_fill_ratio = partial_fill_ratio
+        self.place_latency_sec = place_latency_sec
+        self.status_latency_sec = status_latency_sec
+        self.reject_symbols = {s.upper() for s in reject_symbols}
+        self._scripts: dict[str, int] = {}
+        self._orders: dict[str, dict[str, Any]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.calls = {"place": 0, "status": 0, "batch_status": 0, "cancel": 0}
+
+    def script(self, symbol: str, *, fill_after_polls: int) -> None:
+        """Per-symbol fill delay (in polls) overriding the default."""
+        self._scripts[symbol.upper()] = max(0, int(fill_after_polls))
+
+    def add_order(self, status: str = "OPEN", quantity: int = 1, symbol: str = "EXT") -> str:
+        """Register an order placed outside OrderManager (e.g. a protective stop)."""
+        with self._lock:
+            order_id = self._next_id()
+            self._orders[order_id] = {
+                "symbol": symbol, "quantity": quantity, "status": status,
+                "filled": 0, "polls": 0, "fill_after": None,
+            }
+            return order_id
+
+    def set_status(self, order_id: str, status: str) -> None:
+        with self._lock:
+            self._orders[order_id]["status"] = status
+
+    # --- BrokerInterface ---
+
+    def place_order(self, request: Any) -> dict[str, Any]:
+        if self.place_latency_sec:
+            time.sleep(self.place_latency_sec)
+        symbol = str(request.symbol).upper()
+        with self._lock:
+            self.calls["place"] += 1
+            if symbol in self.reject_symbols:
+                return {"success": False, "order_id": None, "error": "Rejected by fake broker"}
+            order_id = self._next_id()
+            self._orders[order_id] = {
+                "symbol": symbol,
+                "quantity": int(request.quantity),
+                "status": "OPEN",
+                "filled": 0,
+                "polls": 0,
+                "fill_after": self._scripts.get(symbol, self.fill_after_polls),
+            }
+        return {"success": True, "order_id": order_id, "error": None}
+
+    def get_order_status(self, broker_order_id: str) -> dict[str, Any]:
+        if self.status_latency_sec:
+            time.sleep(self.status_latency_sec)
+        with self._lock:
+            self.calls["status"] += 1
+            return self._poll(broker_order_id)
+
+    def get_orders_status(self, broker_order_ids: list[str]) -> dict[str, dict[str, Any]]:
+        if self.status_latency_sec:
+            time.sleep(self.status_latency_sec)
+        with self._lock:
+            self.calls["batch_status"] += 1
+            return {oid: self._poll(oid) for oid in broker_order_ids if oid in self._orders}
+
+    def cancel_order(self, broker_order_id: str) -> dict[str, Any]:
+        with self._lock:
+            self.calls["cancel"] += 1
+            order = self._orders.get(broker_order_id)
+            if order is None:
+                return {"success": False, "cancelled": False, "error": "Unknown order"}
+            if order["status"] in ("COMPLETE", "CANCELLED", "REJECTED"):
+                return {"success": False, "cancelled": False, "error": f"Order is {order['status']}"}
+            order["status"] = "CANCELLED"
+            return {"success": True, "cancelled": True}
+
+    # --- internals (caller holds _lock) ---
+
+    def _next_id(self) -> str:
+        self._seq += 1
+        return f"FB{self._seq:06d}"
+
+    def _poll(self, order_id: str) -> dict[str, Any]:
+        order = self._orders.get(order_id)
+        if order is None:
+            return {"status": "REJECTED", "reject_reason": "Unknown order"}
+        if order["status"] == "OPEN" and order["fill_after"] is not None:
+            order["polls"] += 1
+            if order["polls"] >= order["fill_after"]:
+                order["status"] = "COMPLETE"
+                order["filled"] = order["quantity"]
+            elif self.partial_fill_ratio:
+                order["filled"] = max(order["filled"], int(order["quantity"] * self.partial_fill_ratio))
+        filled = order["filled"]
+        return {
+            "order_id": order_id,
+            "status": order["status"],
+            "filled_quantity": filled,
+            "avg_fill_price": self.fill_price if filled else None,
+            "reject_reason": None,
+        }
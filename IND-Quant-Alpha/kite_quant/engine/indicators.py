@@ -0,0 +1,498 @@
+"""
+Technical indicators shared by the live and backtest paths.
+
+Two forms of every indicator, numerically equivalent:
+- Batch functions (ema, rsi, atr, adx, vwap, ...) take whole OHLCV columns and return one value per
+  bar as float64 arrays. The backtest provider, engine.strategy and engine.market_state use these.
+- Streaming state objects (EMA, WilderRSI, SimpleRSI, ATR, ADX, RollingVWAP, ...) advance by one bar
+  in O(1) with update(), and peek() gives the value a not-yet-closed bar would produce without
+  committing it.
+
+CandleSeries binds a streaming indicator to a candle list that grows at the end (the live data
+provider's get_recent_candles): each call commits only the bars closed since the previous call and
+peeks the forming bar, so an engine tick advances the indicator by one bar instead of recomputing
+the whole window. candle_series() keeps one CandleSeries per key for the process.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Hashable, Sequence
+
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+MAX_CANDLE_SERIES = 2048
+
+
+def _arr(values: Any) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+# --- Batch (vectorized) ---
+
+
+def trailing_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the last `window` values ending at each index (shorter at the start of the series)."""
+    values = _arr(values)
+    if window <= 1:
+        return values.copy()
+    padded = np.concatenate((np.zeros(window - 1, dtype=np.float64), values))
+    return np.lib.stride_tricks.sliding_window_view(padded, window).sum(axis=1)
+
+
+def ema(values: Any, period: int) -> np.ndarray:
+    """EMA with span=period seeded with the first value (pandas ewm, adjust=False)."""
+    return pd.Series(_arr(values)).ewm(span=period, adjust=False).mean().to_numpy(dtype=np.float64)
+
+
+def wilder(values: Any, period: int) -> np.ndarray:
+    """Wilder smoothing (alpha=1/period, adjust=False), seeded with the first value."""
+    return pd.Series(_arr(values)).ewm(alpha=1 / period, adjust=False).mean().to_numpy(dtype=np.float64)
+
+
+def ema_last(values: Sequence[float], period: int) -> float:
+    """EMA of a window seeded with the window's first value; the strategies' candles[-n:] EMA."""
+    if not len(values):
+        return 0.0
+    k = 2.0 / (period + 1)
+    out = float(values[0])
+    for x in values[1:]:
+        out = float(x) * k + out * (1 - k)
+    return out
+
+
+def rsi(close: Any, period: int = 14) -> np.ndarray:
+    """Wilder RSI per bar; NaN while the average loss is zero."""
+    close = _arr(close)
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = wilder(gain, period)
+    avg_loss = wilder(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def rsi_simple(close: Any, period: int = 14) -> np.ndarray:
+    """RSI from the simple average of the last `period` changes at every bar (the live provider's RSI)."""
+    change = np.diff(_arr(close), prepend=np.nan)
+    change[0] = 0.0
+    avg_gain = trailing_sum(np.where(change > 0, change, 0.0), period) / period
+    avg_loss = trailing_sum(np.where(change < 0, -change, 0.0), period) / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+
+
+def rsi_simple_last(prices: Sequence[float], period: int) -> float | None:
+    """rsi_simple at the last price; None with fewer than period + 1 prices."""
+    if not prices or len(prices) < period + 1:
+        return None
+    changes = [prices[i] - prices[i - 1] for i in range(len(prices) - period, len(prices))]
+    avg_gain = sum(c if c > 0 else 0.0 for c in changes) / period
+    avg_loss = sum(-c if c < 0 else 0.0 for c in changes) / period
+    if avg_loss == 0:
+        return 100.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def true_range(high: Any, low: Any, close: Any) -> np.ndarray:
+    """True range; the first bar (no previous close) is high - low."""
+    high, low, close = _arr(high), _arr(low), _arr(close)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    """Wilder ATR."""
+    return wilder(true_range(high, low, close), period)
+
+
+def atr_pct(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    """Wilder ATR as % of close; 0 where close is 0."""
+    close = _arr(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = atr(high, low, close, period) / np.where(close == 0, np.nan, close) * 100.0
+    return np.where(np.isfinite(out), out, 0.0)
+
+
+def _directional_movement(high: np.ndarray, low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    up = np.diff(high, prepend=np.nan)
+    down = -np.diff(low, prepend=np.nan)
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    return plus_dm, minus_dm
+
+
+def adx(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    """Wilder ADX; 0 where directional indicators are undefined."""
+    high, low = _arr(high), _arr(low)
+    plus_dm, minus_dm = _directional_movement(high, low)
+    tr_avg = wilder(true_range(high, low, close), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tr_avg = np.where(tr_avg == 0, np.nan, tr_avg)
+        plus_di = 100 * wilder(plus_dm, period) / tr_avg
+        minus_di = 100 * wilder(minus_dm, period) / tr_avg
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return wilder(np.where(np.isfinite(dx), dx, 0.0), period)
+
+
+def volume_ratio(volume: Any, lookback: int = 20) -> np.ndarray:
+    """Volume / rolling mean volume (at least max(5, lookback // 2) bars); 1.0 where undefined."""
+    volume = pd.Series(_arr(volume))
+    avg = volume.rolling(lookback, min_periods=max(5, lookback // 2)).mean().to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = volume.to_numpy() / np.where(avg == 0, np.nan, avg)
+    return np.where(np.isfinite(out), out, 1.0)
+
+
+def trend_bias(close: Any, fast: int = 10, slow: int = 30) -> np.ndarray:
+    """(EMA fast - EMA slow) / close, clipped to +-2% and scaled to [-1, 1]."""
+    close = _arr(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = (ema(close, fast) - ema(close, slow)) / np.where(close == 0, np.nan, close)
+    raw = np.where(np.isfinite(raw), raw, 0.0)
+    return np.clip(raw, -0.02, 0.02) / 0.02
+
+
+def typical_price(high: Any, low: Any, close: Any) -> np.ndarray:
+    return (_arr(high) + _arr(low) + _arr(close)) / 3.0
+
+
+def vwap(high: Any, low: Any, close: Any, volume: Any) -> np.ndarray:
+    """Cumulative VWAP from the first bar; the typical price itself when there is no volume."""
+    typical = typical_price(high, low, close)
+    volume = _arr(volume)
+    if not volume.sum():
+        return typical
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(typical * volume) / np.cumsum(volume)
+
+
+def rolling_vwap(high: Any, low: Any, close: Any, volume: Any, count: int) -> np.ndarray:
+    """VWAP over the last `count` bars at every bar; NaN where the window has no volume."""
+    volume = _arr(volume)
+    total_vtp = trailing_sum(typical_price(high, low, close) * volume, count)
+    total_vol = trailing_sum(volume, count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_vol > 0, total_vtp / total_vol, np.nan)
+
+
+# --- Streaming (O(1) per bar) ---
+
+
+class EMA:
+    """Streaming EMA seeded with the first value; alpha defaults to 2 / (period + 1)."""
+
+    FIELDS = ("close",)
+
+    def __init__(self, period: int = 14, *, alpha: float | None = None) -> None:
+        self.alpha = float(alpha) if alpha is not None else 2.0 / (period + 1)
+        self.value = NAN
+        self.count = 0
+
+    def peek(self, x: float) -> float:
+        if self.count == 0:
+            return float(x)
+        return float(x) * self.alpha + self.value * (1 - self.alpha)
+
+    def update(self, x: float) -> float:
+        self.value = self.peek(x)
+        self.count += 1
+        return self.value
+
+
+class Wilder(EMA):
+    """Streaming Wilder smoothing (alpha = 1 / period)."""
+
+    def __init__(self, period: int = 14) -> None:
+        super().__init__(alpha=1.0 / period)
+
+
+class WilderRSI:
+    """Streaming counterpart of rsi(): NaN while the average loss is zero."""
+
+    FIELDS = ("close",)
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self._gain = Wilder(period)
+        self._loss = Wilder(period)
+        self._prev: float | None = None
+        self.value = NAN
+
+    def _changes(self, close: float) -> tuple[float, float]:
+        delta = 0.0 if self._prev is None else float(close) - self._prev
+        return (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return NAN
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def peek(self, close: float) -> float:
+        gain, loss = self._changes(close)
+        return self._rsi(self._gain.peek(gain), self._loss.peek(loss))
+
+    def update(self, close: float) -> float:
+        gain, loss = self._changes(close)
+        self.value = self._rsi(self._gain.update(gain), self._loss.update(loss))
+        self._prev = float(close)
+        return self.value
+
+
+class _RollingSum:
+    """Sum over the last n values kept by add/subtract; exactly 0 whenever the window holds only zeros."""
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.values: deque[float] = deque()
+        self.total = 0.0
+        self.nonzero = 0
+
+    def peek(self, x: float) -> float:
+        total, nonzero = self.total + x, self.nonzero + (x != 0)
+        if len(self.values) >= self.n:
+            total -= self.values[0]
+            nonzero -= self.values[0] != 0
+        return total if nonzero else 0.0
+
+    def push(self, x: float) -> float:
+        self.total = self.peek(x)
+        self.values.append(x)
+        self.nonzero += x != 0
+        if len(self.values) > self.n:
+            self.nonzero -= self.values.popleft() != 0
+        return self.total
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class SimpleRSI:
+    """Streaming counterpart of rsi_simple_last(): NaN until period changes have been seen."""
+
+    FIELDS = ("close",)
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self._gains = _RollingSum(period)
+        self._losses = _RollingSum(period)
+        self._prev: float | None = None
+        self._changes = 0
+        self.value = NAN
+
+    def _rsi(self, gains: float, losses: float, changes: int) -> float:
+        if changes < self.period:
+            return NAN
+        if losses == 0:
+            return 100.0
+        return 100 - (100 / (1 + (gains / self.period) / (losses / self.period)))
+
+    def peek(self, close: float) -> float:
+        if self._prev is None:
+            return NAN
+        delta = float(close) - self._prev
+        gains = self._gains.peek(delta if delta > 0 else 0.0)
+        losses = self._losses.peek(-delta if delta < 0 else 0.0)
+        return self._rsi(gains, losses, self._changes + 1)
+
+    def update(self, close: float) -> float:
+        if self._prev is not None:
+            delta = float(close) - self._prev
+            self._gains.push(delta if delta > 0 else 0.0)
+            self._losses.push(-delta if delta < 0 else 0.0)
+            self._changes += 1
+            self.value = self._rsi(self._gains.total, self._losses.total, self._changes)
+        self._prev = float(close)
+        return self.value
+
+
+def _true_range(high: float, low: float, prev_close: float | None) -> float:
+    if prev_close is None:
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class ATR:
+    """Streaming Wilder ATR."""
+
+    FIELDS = ("high", "low", "close")
+
+    def __init__(self, period: int = 14) -> None:
+        self._tr = Wilder(period)
+        self._prev: float | None = None
+        self.value = NAN
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self._tr.peek(_true_range(float(high), float(low), self._prev))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.value = self._tr.update(_true_range(float(high), float(low), self._prev))
+        self._prev = float(close)
+        return self.value
+
+
+class ADX:
+    """Streaming counterpart of adx(); also exposes the latest ATR (Wilder TR average)."""
+
+    FIELDS = ("high", "low", "close")
+
+    def __init__(self, period: int = 14) -> None:
+        self._tr = Wilder(period)
+        self._plus = Wilder(period)
+        self._minus = Wilder(period)
+        self._dx = Wilder(period)
+        self._prev: tuple[float, float, float] | None = None
+        self.value = NAN
+
+    def _inputs(self, high: float, low: float) -> tuple[float, float, float]:
+        if self._prev is None:
+            return high - low, 0.0, 0.0
+        prev_high, prev_low, prev_close = self._prev
+        up, down = high - prev_high, prev_low - low
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        return _true_range(high, low, prev_close), plus_dm, minus_dm
+
+    @staticmethod
+    def _dx_of(tr_avg: float, plus: float, minus: float) -> float:
+        if tr_avg == 0:
+            return 0.0
+        plus_di, minus_di = 100 * plus / tr_avg, 100 * minus / tr_avg
+        total = plus_di + minus_di
+        return 100 * abs(plus_di - minus_di) / total if total else 0.0
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        tr, plus_dm, minus_dm = self._inputs(float(high), float(low))
+        dx = self._dx_of(self._tr.peek(tr), self._plus.peek(plus_dm), self._minus.peek(minus_dm))
+        return self._dx.peek(dx)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr, plus_dm, minus_dm = self._inputs(float(high), float(low))
+        dx = self._dx_of(self._tr.update(tr), self._plus.update(plus_dm), self._minus.update(minus_dm))
+        self.value = self._dx.update(dx)
+        self._prev = (float(high), float(low), float(close))
+        return self.value
+
+    @property
+    def atr(self) -> float:
+        return self._tr.value
+
+
+class RollingVWAP:
+    """Streaming counterpart of rolling_vwap(): VWAP of the last `count` bars, NaN without volume."""
+
+    FIELDS = ("high", "low", "close", "volume")
+
+    def __init__(self, count: int = 20) -> None:
+        self._vtp = _RollingSum(count)
+        self._vol = _RollingSum(count)
+        self.value = NAN
+
+    @staticmethod
+    def _vwap(vtp: float, vol: float) -> float:
+        return vtp / vol if vol > 0 else NAN
+
+    def peek(self, high: float, low: float, close: float, volume: float) -> float:
+        typical = (float(high) + float(low) + float(close)) / 3.0
+        return self._vwap(self._vtp.peek(typical * float(volume)), self._vol.peek(float(volume)))
+
+    def update(self, high: float, low: float, close: float, volume: float) -> float:
+        typical = (float(high) + float(low) + float(close)) / 3.0
+        self.value = self._vwap(self._vtp.push(typical * float(volume)), self._vol.push(float(volume)))
+        return self.value
+
+
+class VolumeRatio:
+    """Streaming counterpart of volume_ratio()."""
+
+    FIELDS = ("volume",)
+
+    def __init__(self, lookback: int = 20) -> None:
+        self._sum = _RollingSum(lookback)
+        self.min_periods = max(5, lookback // 2)
+        self.value = NAN
+
+    def _ratio(self, volume: float, total: float, n: int) -> float:
+        if n < self.min_periods or total == 0:
+            return 1.0
+        return volume / (total / n)
+
+    def peek(self, volume: float) -> float:
+        n = min(len(self._sum) + 1, self._sum.n)
+        return self._ratio(float(volume), self._sum.peek(float(volume)), n)
+
+    def update(self, volume: float) -> float:
+        total = self._sum.push(float(volume))
+        self.value = self._ratio(float(volume), total, len(self._sum))
+        return self.value
+
+
+class CandleSeries:
+    """
+    A streaming indicator kept in step with a candle list that grows at the end. Bars before the
+    last are committed once (matched by their "date"); the last, possibly forming, bar is peeked.
+    When the list no longer contains the last committed bar (gap, new day, other window) the
+    indicator is rebuilt from the list.
+    """
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self.indicator = factory()
+        self._last_date: Any = None
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.rebuilds = 0
+
+    def _fields(self, candle: Any) -> list[float]:
+        return [float(candle.get(f) or 0) for f in self.indicator.FIELDS]
+
+    def _start(self, closed: Sequence[Any]) -> int:
+        if self._last_date is not None:
+            for i in range(len(closed) - 1, -1, -1):
+                date = closed[i].get("date")
+                if date == self._last_date:
+                    return i + 1
+                if str(date) < str(self._last_date):
+                    break
+        self.indicator = self._factory()
+        self.rebuilds += 1
+        return 0
+
+    def value(self, candles: Sequence[Any]) -> float:
+        if not len(candles):
+            return NAN
+        with self._lock:
+            closed = candles[:-1]
+            if closed:
+                for candle in closed[self._start(closed):]:
+                    self.indicator.update(*self._fields(candle))
+                    self.updates += 1
+                self._last_date = closed[-1].get("date")
+            return self.indicator.peek(*self._fields(candles[-1]))
+
+
+_series: OrderedDict[Hashable, CandleSeries] = OrderedDict()
+_series_lock = threading.Lock()
+
+
+def candle_series(key: Hashable, factory: Callable[[], Any]) -> CandleSeries:
+    """Process-wide CandleSeries for key (e.g. ("rsi", symbol, interval, period)), least recently used evicted."""
+    with _series_lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = CandleSeries(factory)
+            while len(_series) > MAX_CANDLE_SERIES:
+                _series.popitem(last=False)
+        else:
+            _series.move_to_end(key)
+        return series
+
+
+def clear_candle_series() -> None:
+    with _series_lock:
+        _series.clear()
@@ -0,0 +1,323 @@
+"""
+Instrument master: the Kite NSE + NFO instrument dumps, loaded once per trading day.
+
+The dump is persisted to data/instruments/master_<date>.json, so a cold start reads today's file
+(or the latest one when the broker is unreachable) instead of calling kite.instruments().
+Lookups are hash indexes (tradingsymbol, name, token). Options sit in a sorted
+(underlying, expiry, strike, type) index and searchable symbols in a sorted prefix index, so
+strike/expiry lookups and prefix search are binary searches instead of list scans.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+_DEFAULT_DIR = Path(__file__).resolve().parents[1] / "data" / "instruments"
+_KEEP_FILES = 5
+
+# Fields kept from the Kite dump (the rest is never read).
+_FIELDS = (
+    "instrument_token", "tradingsymbol", "name", "expiry", "strike",
+    "lot_size", "tick_size", "instrument_type", "segment", "exchange",
+)
+
+# Standard indices (F&O underlyings) - always searchable even if not in NSE dump
+FNO_INDEX_LIST = [
+    {"symbol": "NIFTY 50", "name": "Nifty 50 Index", "instrument_type": "INDEX", "exchange": "NSE"},
+    {"symbol": "NIFTY BANK", "name": "Nifty Bank Index", "instrument_type": "INDEX", "exchange": "NSE"},
+    {"symbol": "MIDCPNIFTY", "name": "Nifty Midcap Select", "instrument_type": "INDEX", "exchange": "NSE"},
+]
+_FNO_FUT_KEYWORDS = ("NIFTY", "BANKNIFTY", "MIDCPNIFTY")
+_MAX_SEARCH_FUTURES = 40
+
+
+def _slim(row: dict[str, Any], exchange: str) -> dict[str, Any]:
+    out = {k: row.get(k) for k in _FIELDS}
+    out["exchange"] = out.get("exchange") or exchange
+    expiry = out.get("expiry")
+    if isinstance(expiry, (date, datetime)):
+        out["expiry"] = expiry.isoformat()[:10]
+    elif not expiry:
+        out["expiry"] = ""
+    return out
+
+
+class InstrumentMaster:
+    """Indexed view over one day's NSE + NFO instruments."""
+
+    def __init__(self, rows: Iterable[dict[str, Any]], as_of: str = "") -> None:
+        self.as_of = as_of
+        self.rows: list[dict[str, Any]] = list(rows)
+        self._by_symbol: dict[tuple[str, str], dict[str, Any]] = {}
+        self._by_name: dict[tuple[str, str], dict[str, Any]] = {}
+        self._by_token: dict[int, dict[str, Any]] = {}
+        option_keys = []
+        for row in self.rows:
+            exchange = (row.get("exchange") or "").upper()
+            symbol = (row.get("tradingsymbol") or "").upper()
+            name = (row.get("name") or "").upper()
+            token = row.get("instrument_token")
+            # First row wins, like the original top-to-bottom scans.
+            if symbol:
+                self._by_symbol.setdefault((exchange, symbol), row)
+            if name:
+                self._by_name.setdefault((exchange, name), row)
+            if token is not None:
+                self._by_token.setdefault(int(token), row)
+            itype = (row.get("instrument_type") or "").upper()
+            if exchange == "NFO" and itype in ("CE", "PE") and row.get("expiry"):
+                option_keys.append(((name, row["expiry"], float(row.get("strike") or 0), itype), len(option_keys), row))
+        option_keys.sort(key=lambda k: k[:2])
+        self._option_keys = [k[0] for k in option_keys]
+        self._option_rows = [k[2] for k in option_keys]
+        self._expiries: dict[str, list[str]] = {}
+        for name, expiry, *_ in self._option_keys:
+            listed = self._expiries.setdefault(name, [])
+            if not listed or listed[-1] != expiry:
+                listed.append(expiry)
+        self._build_search_index()
+
+    # --- Persistence / loading ---
+
+    @classmethod
+    def from_dumps(cls, dumps: dict[str, list[dict[str, Any]]], as_of: str = "") -> "InstrumentMaster":
+        rows = [_slim(r, exchange) for exchange, raw in dumps.items() for r in (raw or [])]
+        return cls(rows, as_of=as_of)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"as_of": self.as_of, "rows": self.rows}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_file(cls, path: Path) -> "InstrumentMaster":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("rows") or [], as_of=data.get("as_of") or "")
+
+    # --- Token / symbol lookups ---
+
+    def get(self, tradingsymbol: str, exchange: str = "NSE") -> dict[str, Any] | None:
+        return self._by_symbol.get(((exchange or "NSE").upper(), (tradingsymbol or "").strip().upper()))
+
+    def by_token(self, token: int) -> dict[str, Any] | None:
+        return self._by_token.get(int(token))
+
+    def token(self, symbol: str, exchange: str = "NSE") -> int | None:
+        """Token for a tradingsymbol, else for an exact name match (index names like "NIFTY 50")."""
+        exchange = (exchange or "NSE").upper()
+        key = (symbol or "").strip().upper()
+        row = self._by_symbol.get((exchange, key)) or self._by_name.get((exchange, key))
+        return int(row["instrument_token"]) if row and row.get("instrument_token") is not None else None
+
+    def fno_underlyings(self) -> list[str]:
+        """NSE stocks with NFO futures (the F&O stock universe), sorted; index underlyings are excluded."""
+        names = {
+            (row.get("name") or "").upper()
+            for row in self.rows
+            if (row.get("exchange") or "").upper() == "NFO" and (row.get("instrument_type") or "").upper() == "FUT"
+        }
+        return sorted(n for n in names if n and ("NSE", n) in self._by_symbol)
+
+    # --- Options ---
+
+    def expiries(self, underlying: str, on_or_after: str = "") -> list[str]:
+        listed = self._expiries.get((underlying or "").upper(), [])
+        return listed[bisect_left(listed, on_or_after):]
+
+    def option_chain(self, underlying: str, expiry: str) -> list[dict[str, Any]]:
+        """All CE/PE contracts of one expiry, ordered by strike then type."""
+        name = (underlying or "").upper()
+        lo = bisect_left(self._option_keys, (name, expiry))
+        hi = bisect_left(self._option_keys, (name, expiry + "\x00"))
+        return self._option_rows[lo:hi]
+
+    def option(
+        self,
+        underlying: str,
+        strike: float,
+        option_type: str,
+        expiry: str | None = None,
+        on_or_after: str = "",
+    ) -> dict[str, Any] | None:
+        """Contract for underlying/strike/type: given expiry, else the nearest expiry on/after on_or_after."""
+        name = (underlying or "").upper()
+        opt = (option_type or "CE").upper()
+        for exp in ([expiry] if expiry else self.expiries(name, on_or_after)):
+            key = (name, exp, float(strike), opt)
+            i = bisect_left(self._option_keys, key)
+            if i < len(self._option_keys) and self._option_keys[i] == key:
+                return self._option_rows[i]
+        return None
+
+    # --- Symbol search ---
+
+    def _build_search_index(self) -> None:
+        """Search universe: F&O indices, NSE EQ/INDEX symbols and the first index futures (same as before)."""
+        universe: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        for inst in FNO_INDEX_LIST:
+            seen.add(inst["symbol"])
+            universe.append(dict(inst))
+        for row in self.rows:
+            itype = (row.get("instrument_type") or "").upper()
+            if row.get("segment") == "NSE" and itype in ("EQ", "INDEX"):
+                s = (row.get("tradingsymbol") or "").strip()
+                if s and s not in seen:
+                    seen.add(s)
+                    universe.append({"symbol": s, "name": (row.get("name") or "").strip(), "instrument_type": itype, "exchange": "NSE"})
+        futures = 0
+        for row in self.rows:
+            if futures >= _MAX_SEARCH_FUTURES:
+                break
+            if (row.get("exchange") or "").upper() != "NFO" or (row.get("instrument_type") or "").upper() != "FUT":
+                continue
+            s = (row.get("tradingsymbol") or "").strip()
+            if s and s not in seen and any(kw in s for kw in _FNO_FUT_KEYWORDS):
+                seen.add(s)
+                universe.append({"symbol": s, "name": (row.get("name") or "").strip() or s, "instrument_type": "FUT", "exchange": "NFO"})
+                futures += 1
+        self.search_universe = universe
+        # Small groups (indices, futures) are scanned; equities use the sorted prefix index.
+        self._search_small = [i for i in universe if i["instrument_type"] in ("INDEX", "FUT")]
+        equities = sorted((i for i in universe if i["instrument_type"] not in ("INDEX", "FUT")), key=lambda i: i["symbol"])
+        self._eq_symbols = [i["symbol"] for i in equities]
+        self._eq_rows = equities
+        self._eq_upper_names = [(i.get("name") or "").upper() for i in equities]
+
+    @staticmethod
+    def _matches(inst: dict[str, Any], q: str, name_upper: str) -> bool:
+        sym = inst.get("symbol") or ""
+        return q in sym or q in name_upper
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """INDEX first, then FUT, then EQ; prefix matches before other matches within each group."""
+        q = (query or "").strip().upper()
+        if not q or len(q) < 2:
+            return []
+
+        def prefix_sort_key(x: dict[str, Any]) -> tuple[int, str]:
+            s = x.get("symbol") or ""
+            return (0 if s.startswith(q) else 1, s)
+
+        index_results = [i for i in self._search_small if i["instrument_type"] == "INDEX" and self._matches(i, q, (i.get("name") or "").upper())]
+        fut_results = [i for i in self._search_small if i["instrument_type"] == "FUT" and self._matches(i, q, (i.get("name") or "").upper())]
+        index_results.sort(key=prefix_sort_key)
+        fut_results.sort(key=prefix_sort_key)
+        out = (index_results + fut_results)[:limit]
+        need = limit - len(out)
+        if need <= 0:
+            return out
+        lo = bisect_left(self._eq_symbols, q)
+        hi = bisect_right(self._eq_symbols, q + "\uffff")
+        eq_results = self._eq_rows[lo:hi][:need]
+        if len(eq_results) < need:
+            # Not enough prefix hits: fall back to substring matches on symbol/name.
+            rest = [
+                self._eq_rows[i]
+                for i in range(len(self._eq_rows))
+                if not lo <= i < hi and (q in self._eq_symbols[i] or q in self._eq_upper_names[i])
+            ]
+            eq_results = eq_results + rest[: need - len(eq_results)]
+        return out + eq_results
+
+    def option_rows(self) -> list[dict[str, Any]]:
+        return list(self._option_rows)
+
+
+def _fetch_dumps() -> dict[str, list[dict[str, Any]]] | None:
+    from engine.zerodha_client import _get_kite
+
+    kite = _get_kite()
+    if not kite:
+        return None
+    import socket
+    socket.setdefaulttimeout(60)
+    return {"NSE": kite.instruments("NSE"), "NFO": kite.instruments("NFO")}
+
+
+class InstrumentMasterStore:
+    """Loads today's master from disk, else from the broker (then persists it), else the latest file."""
+
+    def __init__(self, root: str | Path | None = None, fetch_dumps: Callable[[], Any] = _fetch_dumps) -> None:
+        self.root = Path(root) if root else _DEFAULT_DIR
+        self._fetch_dumps = fetch_dumps
+        self._lock = threading.Lock()
+        self._master: InstrumentMaster | None = None
+
+    def _path(self, day: str) -> Path:
+        return self.root / f"master_{day}.json"
+
+    def _latest_file(self) -> Path | None:
+        files = sorted(self.root.glob("master_*.json"))
+        return files[-1] if files else None
+
+    def get(self, today: date | None = None, force: bool = False) -> InstrumentMaster:
+        day = (today or datetime.now(IST).date()).isoformat()
+        master = self._master
+        if master is not None and master.as_of == day and not force:
+            return master
+        with self._lock:
+            master = self._master
+            if master is not None and master.as_of == day and not force:
+                return master
+            path = self._path(day)
+            if path.exists() and not force:
+                self._master = InstrumentMaster.load_file(path)
+                return self._master
+            try:
+                dumps = self._fetch_dumps()
+            except Exception as e:
+                logger.warning("[INSTRUMENTS] Broker dump failed: %s", str(e))
+                dumps = None
+            if dumps:
+                master = InstrumentMaster.from_dumps(dumps, as_of=day)
+                try:
+                    master.save(path)
+                    self._prune()
+                except Exception as e:
+                    logger.warning("[INSTRUMENTS] Could not persist master: %s", str(e))
+                logger.info("[INSTRUMENTS] Loaded %s instruments from broker for %s", len(master.rows), day)
+                self._master = master
+                return master
+            if master is not None:
+                return master
+            latest = self._latest_file()
+            self._master = InstrumentMaster.load_file(latest) if latest else InstrumentMaster([], as_of="")
+            return self._master
+
+    def _prune(self) -> None:
+        for old in sorted(self.root.glob("master_*.json"))[:-_KEEP_FILES]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+_store: InstrumentMasterStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_instrument_master(force: bool = False) -> InstrumentMaster:
+    """Process-wide master for today (INSTRUMENTS_DIR overrides the data directory)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = InstrumentMasterStore(os.getenv("INSTRUMENTS_DIR") or None)
+    return _store.get(force=force)
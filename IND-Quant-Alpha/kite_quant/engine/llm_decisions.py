@@ -0,0 +1,299 @@
+"""
+LLM backends and a content-addressed decision cache for the AI strategy advisor.
+
+Every model call made by engine.ai_strategy_advisor goes through complete_cached(): the key is a
+sha256 over (model, system prompt, user prompt), where the user prompt is
+ai_strategy_advisor.build_gpt_prompt(context, current_strategy). Backtests install a
+DecisionCache (data/llm_decision_cache.jsonl, one {"key", "model", "response", "created_at"} per
+line), so a rerun over the same days replays the recorded responses instead of calling the API
+again. The cache is installed per thread, so live and paper advisor calls stay uncached.
+
+Backends:
+- OpenAIBackend: chat completions with JSON output (the production path).
+- StubLLMBackend: deterministic rule-based answers parsed from the prompt, for offline backtests
+  and tests. Selected with AI_LLM_BACKEND=stub or set_llm_backend(StubLLMBackend()).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from engine.tick_profiler import count_call, profile_stage
+
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DECISION_CACHE_FILE = _DATA_DIR / "llm_decision_cache.jsonl"
+DEFAULT_MODEL = "gpt-5"
+
+
+class OpenAIBackend:
+    """OpenAI chat completions, JSON object output."""
+
+    name = "openai"
+
+    def __init__(self, *, model: str = DEFAULT_MODEL, temperature: float = 0.3, max_completion_tokens: int = 500) -> None:
+        self.model = model
+        self.temperature = temperature
+        self.max_completion_tokens = max_completion_tokens
+
+    def unavailable_reason(self) -> str | None:
+        if not OPENAI_AVAILABLE:
+            logger.warning("OpenAI library not installed. Install with: pip install openai")
+            return "OpenAI library not available"
+        if not os.getenv("OPENAI_API_KEY"):
+            logger.warning("OPENAI_API_KEY not configured. AI strategy selection disabled.")
+            return "OPENAI_API_KEY missing"
+        return None
+
+    def complete(self, system_prompt: str, prompt: str) -> str:
+        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        response = client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            response_format={"type": "json_object"},
+            temperature=self.temperature,  # Lower temperature for more consistent recommendations
+            max_completion_tokens=self.max_completion_tokens,
+        )
+        return response.choices[0].message.content
+
+
+_TREND_RE = re.compile(r"^- Trend: (.+)$", re.MULTILINE)
+_TIME_RE = re.compile(r"^- Time: (.+)$", re.MULTILINE)
+_CURRENT_RE = re.compile(r"^Currently using strategy: (.+)$", re.MULTILINE)
+_VWAP_SIDE_RE = re.compile(r"^- VWAP side: (\w+)", re.MULTILINE)
+_CHARGES_RE = re.compile(r"^- Charges dominating: True$", re.MULTILINE)
+
+
+class StubLLMBackend:
+    """
+    Offline stand-in for the model: answers the advisor's JSON schema from the facts in the prompt
+    (recent trend, VWAP side, time of day, charge pressure). Same prompt, same answer.
+    """
+
+    name = "stub"
+
+    def __init__(self, *, model: str = "stub-rules") -> None:
+        self.model = model
+        self.calls = 0
+
+    def unavailable_reason(self) -> str | None:
+        return None
+
+    @staticmethod
+    def _hour(prompt: str) -> int | None:
+        m = _TIME_RE.search(prompt)
+        if not m:
+            return None
+        try:
+            ts = datetime.fromisoformat(m.group(1).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return (ts.astimezone(IST) if ts.tzinfo else ts).hour
+
+    def complete(self, system_prompt: str, prompt: str) -> str:
+        self.calls += 1
+        trend = (_TREND_RE.search(prompt) or [None, ""])[1].strip().lower()
+        vwap_side = (_VWAP_SIDE_RE.search(prompt) or [None, ""])[1].strip().lower()
+        current = (_CURRENT_RE.search(prompt) or [None, "None"])[1].strip()
+        hour = self._hour(prompt)
+
+        if _CHARGES_RE.search(prompt):
+            strategy, bias, confidence = current if current != "None" else "Pullback Continuation", "neutral", "low"
+            reasoning = "Charges dominate the session; staying defensive."
+        elif trend in ("bullish", "up", "uptrend") or vwap_side == "above":
+            strategy, bias, confidence = "Momentum Breakout", "bullish", "high" if trend and vwap_side == "above" else "medium"
+            reasoning = "Price trending up and holding above VWAP."
+        elif trend in ("bearish", "down", "downtrend") or vwap_side == "below":
+            strategy, bias, confidence = "Pullback Continuation", "bearish", "high" if trend and vwap_side == "below" else "medium"
+            reasoning = "Price trending down below VWAP; trade pullbacks with the trend."
+        elif hour is not None and hour < 10:
+            strategy, bias, confidence = "Momentum Breakout", "neutral", "medium"
+            reasoning = "Opening hour: favour breakouts of the opening range."
+        elif hour is not None and hour >= 14:
+            strategy, bias, confidence = "Pullback Continuation", "neutral", "medium"
+            reasoning = "Closing session: follow the established day trend on pullbacks."
+        else:
+            strategy, bias, confidence = "RSI Reversal Fade", "neutral", "medium"
+            reasoning = "Mid-session range: fade RSI extremes."
+        return json.dumps({
+            "recommended_strategy": strategy,
+            "confidence": confidence,
+            "reasoning": reasoning,
+            "switch_from_current": strategy != current,
+            "market_assessment": f"stub: trend={trend or 'n/a'} vwap={vwap_side or 'n/a'} hour={hour}",
+            "market_bias": bias,
+        })
+
+
+class DecisionCache:
+    """Append-only JSONL of model responses keyed by content hash; shared by backtest worker processes."""
+
+    def __init__(self, path: str | Path = DECISION_CACHE_FILE) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._offset = 0
+        self._responses: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, system_prompt: str, prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, system_prompt, prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def _refresh(self) -> None:
+        """Load entries appended since the last read (by this or another process)."""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return
+        if size < self._offset:  # cache file replaced or truncated
+            self._offset = 0
+            self._responses.clear()
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b"\n") + 1  # a partially written last line is picked up next time
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get("key") and isinstance(entry.get("response"), str):
+                self._responses[entry["key"]] = entry["response"]
+        self._offset += end
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                self._refresh()
+                response = self._responses.get(key)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def put(self, key: str, model: str, response: str) -> None:
+        line = json.dumps(
+            {"key": key, "model": model, "response": response, "created_at": datetime.now(IST).isoformat()},
+            separators=(",", ":"),
+        ) + "\n"
+        with self._lock:
+            self._refresh()
+            if key in self._responses:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._responses)
+
+    def stats(self) -> dict[str, Any]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "path": str(self.path)}
+
+
+def _is_json_object(text: Any) -> bool:
+    try:
+        return isinstance(json.loads(text), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+def _complete(backend: Any, system_prompt: str, prompt: str) -> str:
+    count_call(f"llm.{backend.name}")
+    with profile_stage("llm_call"):
+        return backend.complete(system_prompt, prompt)
+
+
+def complete_cached(backend: Any, system_prompt: str, prompt: str) -> str:
+    """
+    backend.complete() through the installed decision cache. Only well-formed JSON objects are
+    recorded, so a malformed answer is retried on the next run instead of replayed.
+    """
+    cache = get_decision_cache()
+    if cache is None:
+        return _complete(backend, system_prompt, prompt)
+    key = DecisionCache.key(backend.model, system_prompt, prompt)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug("[AI CACHE] Replaying cached decision %s", key[:12])
+        count_call("llm.cache_hit")
+        return cached
+    response = _complete(backend, system_prompt, prompt)
+    if _is_json_object(response):
+        cache.put(key, backend.model, response)
+    return response
+
+
+def build_llm_backend(name: str | None = None) -> Any:
+    """Backend by name ("openai" | "stub"); defaults to AI_LLM_BACKEND, then openai."""
+    name = (name or os.getenv("AI_LLM_BACKEND") or "openai").strip().lower()
+    if name == "stub":
+        return StubLLMBackend()
+    if name != "openai":
+        logger.warning("Unknown AI_LLM_BACKEND=%s, using openai", name)
+    return OpenAIBackend()
+
+
+_backend: Any = None
+_state_lock = threading.RLock()
+# Per thread: a backtest running inside the web app must not route live advisor calls into its cache.
+_local = threading.local()
+
+
+def get_llm_backend() -> Any:
+    global _backend
+    with _state_lock:
+        if _backend is None:
+            _backend = build_llm_backend()
+        return _backend
+
+
+def set_llm_backend(backend: Any | None) -> None:
+    """Install a backend (offline backtests / tests); None re-reads AI_LLM_BACKEND on next use."""
+    global _backend
+    with _state_lock:
+        _backend = backend
+
+
+def get_decision_cache() -> DecisionCache | None:
+    return getattr(_local, "cache", None)
+
+
+def set_decision_cache(cache: DecisionCache | None) -> None:
+    """Install a decision cache for model calls made by the calling thread; None disables caching."""
+    _local.cache = cache
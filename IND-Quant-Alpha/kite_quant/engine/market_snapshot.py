@@ -0,0 +1,100 @@
+"""
+Per-tick, per-instrument market snapshots.
+
+Within one engine tick the entry check, entry score, OI/PCR snapshot, index bias and the
+strategy's own check_entry/get_stop_loss/get_target all ask for the same instrument's data.
+A MarketSnapshot holds that data for one (symbol, exchange) for the lifetime of the tick:
+candles per (interval, period) as one full list that every caller slices, the quote/LTP, the
+strike OI block used for PCR, and so on. Tick-wide values (VIX, index levels, index bias) live
+on the MARKET snapshot. Each item is loaded once (single-flight) and every later use is a hit.
+
+Snapshots hang off the active TickScope, so strategies reach them through strategies.data_provider
+without signature changes. The scope is visible only to the tick's own workers (and calls they hand
+to call_with_timeout); elsewhere there is no snapshot and loaders run directly.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Hashable
+
+from engine.tick_engine import TickScope, current_tick_scope
+
+MARKET = "__MARKET__"  # pseudo-instrument for tick-wide values (VIX, index levels, index bias)
+
+_totals_lock = threading.Lock()
+_totals = {"snapshots": 0, "hits": 0, "misses": 0}
+
+
+class MarketSnapshot:
+    """One tick's market data for one instrument; each item is loaded on first use and reused."""
+
+    def __init__(self, symbol: str, exchange: str = "NSE", scope: TickScope | None = None) -> None:
+        self.symbol = symbol
+        self.exchange = exchange
+        self._scope = scope
+        self._cache = TickScope(scope.tick_id if scope else 0)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: Hashable, loader: Callable[[], Any]) -> Any:
+        loaded = []
+
+        def load() -> Any:
+            loaded.append(True)
+            return loader()
+
+        value = self._cache.get(name, load)
+        _record(self, hit=not loaded)
+        return value
+
+    def candles(self, interval: str, period: str, loader: Callable[[], list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        """Full candle list for (interval, period); callers slice the tail they need."""
+        return self.get(("candles", interval, period), loader)
+
+    def quote(self, loader: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        return self.get("quote", loader)
+
+
+def _record(snapshot: MarketSnapshot, hit: bool) -> None:
+    name = "hits" if hit else "misses"
+    with _totals_lock:
+        _totals[name] += 1
+        if hit:
+            snapshot.hits += 1
+        else:
+            snapshot.misses += 1
+    if snapshot._scope is not None:
+        snapshot._scope.count(f"snapshot_{name}")
+
+
+def market_snapshot(symbol: str, exchange: str = "NSE") -> MarketSnapshot | None:
+    """The current tick's snapshot for symbol/exchange (created on first use), or None outside a tick."""
+    scope = current_tick_scope()
+    if scope is None:
+        return None
+    key = ((symbol or "").strip().upper(), (exchange or "NSE").strip().upper())
+
+    def create() -> MarketSnapshot:
+        with _totals_lock:
+            _totals["snapshots"] += 1
+        scope.count("snapshots")
+        return MarketSnapshot(key[0], key[1], scope=scope)
+
+    return scope.get(("market_snapshot",) + key, create)
+
+
+def snapshot_value(symbol: str, name: Hashable, loader: Callable[[], Any], exchange: str = "NSE") -> Any:
+    """Load name for symbol through the current tick's snapshot; outside a tick, call loader()."""
+    snapshot = market_snapshot(symbol, exchange)
+    if snapshot is None:
+        return loader()
+    return snapshot.get(name, loader)
+
+
+def snapshot_stats() -> dict[str, Any]:
+    """Cumulative snapshot counters since process start."""
+    with _totals_lock:
+        totals = dict(_totals)
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate_pct"] = round(totals["hits"] / lookups * 100.0, 1) if lookups else 0.0
+    return totals
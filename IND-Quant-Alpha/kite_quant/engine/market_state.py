@@ -22,6 +22,8 @@ from typing import Literal
 import numpy as np
 import pandas as pd
 
+from engine import indicators
+
 Regime = Literal["TREND_UP", "TREND_DOWN", "RANGE", "LOW_VOL", "HIGH_VOL"]
 
 
@@ -63,73 +65,52 @@ def _validate_ohlcv(df: pd.DataFrame, name: str) -> pd.DataFrame:
     return out
 
 
-def _wilder_smooth(series: pd.Series, period: int) -> pd.Series:
-    return series.ewm(alpha=1 / period, adjust=False).mean()
-
-
-def _compute_adx(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
-
-    up_move = high.diff()
-    down_move = -low.diff()
-
-    plus_dm = pd.Series(
-        np.where((up_move > down_move) & (up_move > 0), up_move, 0.0),
-        index=df.index,
-    )
-    minus_dm = pd.Series(
-        np.where((down_move > up_move) & (down_move > 0), down_move, 0.0),
-        index=df.index,
+def _latest_metrics(df: pd.DataFrame) -> TimeframeMetrics:
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    return TimeframeMetrics(
+        adx=float(indicators.adx(high, low, close)[-1]),
+        atr_pct=float(indicators.atr_pct(high, low, close)[-1]),
+        volume_ratio=float(indicators.volume_ratio(df["volume"].to_numpy(dtype=np.float64))[-1]),
+        trend_bias=float(indicators.trend_bias(close)[-1]),
     )
 
-    tr1 = high - low
-    tr2 = (high - close.shift(1)).abs()
-    tr3 = (low - close.shift(1)).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1).fillna(0.0)
-
-    atr = _wilder_smooth(tr, period).replace(0, np.nan)
-    plus_di = 100 * _wilder_smooth(plus_dm, period) / atr
-    minus_di = 100 * _wilder_smooth(minus_dm, period) / atr
-
-    dx = (100 * (plus_di - minus_di).abs() / (plus_di + minus_di)).replace([np.inf, -np.inf], np.nan)
-    adx = _wilder_smooth(dx.fillna(0.0), period).fillna(0.0)
-    return adx
-
-
-def _compute_atr_pct(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
-    tr1 = high - low
-    tr2 = (high - close.shift(1)).abs()
-    tr3 = (low - close.shift(1)).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1).fillna(0.0)
-    atr = _wilder_smooth(tr, period)
-    atr_pct = (atr / close.replace(0, np.nan) * 100.0).replace([np.inf, -np.inf], np.nan).fillna(0.0)
-    return atr_pct
 
+TIMEFRAME_WEIGHTS = (0.2, 0.3, 0.5)  # 1m, 5m, 15m
+LOW_VOL_THRESHOLD = 0.18
+HIGH_VOL_THRESHOLD = 1.2
+ADX_TREND_THRESHOLD = 22.0
 
-def _compute_volume_ratio(df: pd.DataFrame, lookback: int = 20) -> pd.Series:
-    avg_vol = df["volume"].rolling(lookback, min_periods=max(5, lookback // 2)).mean()
-    ratio = (df["volume"] / avg_vol.replace(0, np.nan)).replace([np.inf, -np.inf], np.nan).fillna(1.0)
-    return ratio
 
+def classify_regimes(metrics: np.ndarray) -> tuple[list[Regime], np.ndarray, np.ndarray]:
+    """
+    Regime and quality for many instruments at once.
 
-def _compute_trend_bias(df: pd.DataFrame) -> pd.Series:
-    fast = df["close"].ewm(span=10, adjust=False).mean()
-    slow = df["close"].ewm(span=30, adjust=False).mean()
-    raw = ((fast - slow) / df["close"].replace(0, np.nan)).replace([np.inf, -np.inf], np.nan).fillna(0.0)
-    return raw.clip(-0.02, 0.02) / 0.02  # normalize roughly to [-1, 1]
-
+    metrics has shape (3, n, 4): timeframes (1m, 5m, 15m) x instruments x
+    (adx, atr_pct, volume_ratio, trend_bias). Returns (regimes, quality scores, weighted
+    metrics of shape (n, 4)), with the same thresholds and scoring as detect_market_state.
+    """
+    w1, w5, w15 = TIMEFRAME_WEIGHTS
+    weighted = metrics[0] * w1 + metrics[1] * w5 + metrics[2] * w15
+    adx_w, atr_w, vol_w, trend_w = weighted.T
+
+    regime = np.where(
+        atr_w < LOW_VOL_THRESHOLD,
+        "LOW_VOL",
+        np.where(
+            atr_w > HIGH_VOL_THRESHOLD,
+            "HIGH_VOL",
+            np.where(adx_w >= ADX_TREND_THRESHOLD, np.where(trend_w >= 0, "TREND_UP", "TREND_DOWN"), "RANGE"),
+        ),
+    )
 
-def _latest_metrics(df: pd.DataFrame) -> TimeframeMetrics:
-    adx = float(_compute_adx(df).iloc[-1])
-    atr_pct = float(_compute_atr_pct(df).iloc[-1])
-    volume_ratio = float(_compute_volume_ratio(df).iloc[-1])
-    trend_bias = float(_compute_trend_bias(df).iloc[-1])
-    return TimeframeMetrics(adx=adx, atr_pct=atr_pct, volume_ratio=volume_ratio, trend_bias=trend_bias)
+    trend_component = np.clip((adx_w - 10.0) / 30.0, 0.0, 1.0) * 40.0
+    volume_component = np.clip((vol_w - 0.7) / 1.0, 0.0, 1.0) * 25.0
+    alignment_component = np.clip((1.0 - np.std(metrics[:, :, 3], axis=0)) * 20.0, 0.0, 20.0)
+    volatility_penalty = np.where(regime == "LOW_VOL", 20.0, np.where(regime == "HIGH_VOL", 10.0, 0.0))
+    quality = np.clip(trend_component + volume_component + alignment_component - volatility_penalty, 0.0, 100.0)
+    return [str(r) for r in regime], quality, weighted
 
 
 def detect_market_state(
@@ -157,35 +138,13 @@ def detect_market_state(
     m5 = _latest_metrics(df5)
     m15 = _latest_metrics(df15)
 
-    w1, w5, w15 = 0.2, 0.3, 0.5
-    adx_w = m1.adx * w1 + m5.adx * w5 + m15.adx * w15
-    atr_w = m1.atr_pct * w1 + m5.atr_pct * w5 + m15.atr_pct * w15
-    vol_w = m1.volume_ratio * w1 + m5.volume_ratio * w5 + m15.volume_ratio * w15
-    trend_w = m1.trend_bias * w1 + m5.trend_bias * w5 + m15.trend_bias * w15
-
-    low_vol_threshold = 0.18
-    high_vol_threshold = 1.2
-    adx_trend_threshold = 22.0
-
-    if atr_w < low_vol_threshold:
-        regime: Regime = "LOW_VOL"
-    elif atr_w > high_vol_threshold:
-        regime = "HIGH_VOL"
-    elif adx_w >= adx_trend_threshold:
-        regime = "TREND_UP" if trend_w >= 0 else "TREND_DOWN"
-    else:
-        regime = "RANGE"
-
-    trend_component = np.clip((adx_w - 10.0) / 30.0, 0.0, 1.0) * 40.0
-    volume_component = np.clip((vol_w - 0.7) / 1.0, 0.0, 1.0) * 25.0
-    alignment_component = (1.0 - np.std([m1.trend_bias, m5.trend_bias, m15.trend_bias])) * 20.0
-    alignment_component = float(np.clip(alignment_component, 0.0, 20.0))
-    volatility_penalty = 0.0
-    if regime == "LOW_VOL":
-        volatility_penalty = 20.0
-    elif regime == "HIGH_VOL":
-        volatility_penalty = 10.0
-    quality = float(np.clip(trend_component + volume_component + alignment_component - volatility_penalty, 0.0, 100.0))
+    stacked = np.array(
+        [[m.adx, m.atr_pct, m.volume_ratio, m.trend_bias] for m in (m1, m5, m15)], dtype=np.float64
+    )[:, None, :]
+    regimes, qualities, weighted = classify_regimes(stacked)
+    adx_w, atr_w, vol_w, trend_w = weighted[0]
+    regime: Regime = regimes[0]
+    quality = float(qualities[0])
 
     return MarketState(
         regime=regime,
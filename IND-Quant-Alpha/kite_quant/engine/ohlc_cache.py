@@ -0,0 +1,310 @@
+"""
+Persistent per-symbol / per-interval OHLC candle cache under data/ohlc_cache.
+
+Each series is stored as one .npy file holding a (6, n) float64 array
+(timestamp, open, high, low, close, volume): every column is a contiguous row
+and the file is opened with mmap_mode="r", so repeat reads are a binary search
+plus a small slice copy. A meta.json sidecar records which broker range has
+already been fetched, so callers only pull the missing tail since the last
+stored bar (and any head before the first stored bar).
+
+fetch_nse_ohlc routes through this cache, which makes it shared by the live
+strategy data provider, the candle-by-candle backtest and the AI backtest.
+When no broker client is available the cache is served as-is, so backtests
+can run fully offline against whatever has been stored.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+_DEFAULT_DIR = Path(__file__).resolve().parents[1] / "data" / "ohlc_cache"
+
+# Row order inside each stored (6, n) array.
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+_FRAME_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Repeat requests within this window never go to the broker (covers every session in one engine tick).
+DEFAULT_REFRESH_TTL_SEC = 20.0
+
+_MARKET_OPEN = (9, 15)
+_MARKET_CLOSE = (15, 30)
+
+FetchFn = Callable[[datetime, datetime], pd.DataFrame]
+
+
+def _safe_name(symbol: str) -> str:
+    return re.sub(r"[^A-Z0-9._-]+", "_", symbol.strip().upper()) or "_"
+
+
+def _to_ts(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return dt.timestamp()
+
+
+def _market_open_between(start_ts: float, end_ts: float) -> bool:
+    """True if any NSE cash-session minute (Mon-Fri 09:15-15:30 IST) falls in (start_ts, end_ts]."""
+    if end_ts <= start_ts:
+        return False
+    start = datetime.fromtimestamp(start_ts, IST)
+    end = datetime.fromtimestamp(end_ts, IST)
+    day = start.date()
+    while day <= end.date():
+        if day.weekday() < 5:
+            open_dt = datetime(day.year, day.month, day.day, *_MARKET_OPEN, tzinfo=IST)
+            close_dt = datetime(day.year, day.month, day.day, *_MARKET_CLOSE, tzinfo=IST)
+            if start < close_dt and end >= open_dt:
+                return True
+        day += timedelta(days=1)
+    return False
+
+
+def frame_to_array(df: pd.DataFrame) -> np.ndarray:
+    """fetch_nse_ohlc-style frame (Datetime, Open, High, Low, Close, Volume) -> sorted (6, n) float64 array."""
+    if df is None or df.empty:
+        return np.empty((len(COLUMNS), 0), dtype=np.float64)
+    lower = {str(c).lower(): c for c in df.columns}
+    dt_col = lower.get("datetime") or lower.get("date")
+    if dt_col is not None:
+        dt = pd.to_datetime(df[dt_col], utc=True)
+    else:
+        dt = pd.to_datetime(pd.Series(df.index, index=df.index), utc=True)
+    ts = ((dt - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+    rows = [ts]
+    for name in COLUMNS[1:]:
+        src = lower.get(name)
+        if src is None:
+            rows.append(np.zeros(len(df), dtype=np.float64))
+        else:
+            rows.append(pd.to_numeric(df[src], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64))
+    arr = np.vstack(rows)
+    arr = arr[:, ~np.isnan(arr[0])]
+    arr = arr[:, np.argsort(arr[0], kind="stable")]
+    # Overlapping request chunks can repeat a bar; keep the last copy of each timestamp.
+    last_of_ts = np.append(arr[0, 1:] != arr[0, :-1], True)
+    return np.ascontiguousarray(arr[:, last_of_ts])
+
+
+def array_to_frame(arr: np.ndarray) -> pd.DataFrame:
+    """(6, n) array -> frame in fetch_nse_ohlc format (tz-aware IST Datetime column)."""
+    data: dict[str, Any] = {
+        "Datetime": pd.to_datetime(np.asarray(arr[0]), unit="s", utc=True).tz_convert(IST),
+    }
+    for i, name in enumerate(_FRAME_COLUMNS, start=1):
+        data[name] = np.array(arr[i], dtype=np.float64)
+    return pd.DataFrame(data)
+
+
+def merge_bars(old: np.ndarray | None, new: np.ndarray) -> np.ndarray:
+    """Union of two (6, n) arrays by timestamp; bars in `new` replace cached bars with the same timestamp."""
+    if old is None or old.shape[1] == 0:
+        return np.ascontiguousarray(new)
+    if new.shape[1] == 0:
+        return np.ascontiguousarray(old)
+    keep_old = old[:, ~np.isin(old[0], new[0])]
+    merged = np.concatenate((keep_old, new), axis=1)
+    order = np.argsort(merged[0], kind="stable")
+    return np.ascontiguousarray(merged[:, order])
+
+
+class OHLCCache:
+    """On-disk candle cache keyed by (symbol, interval); thread-safe, memory-mapped reads."""
+
+    def __init__(self, root: Path | str | None = None, refresh_ttl_sec: float = DEFAULT_REFRESH_TTL_SEC):
+        self.root = Path(root) if root is not None else _DEFAULT_DIR
+        self.refresh_ttl_sec = refresh_ttl_sec
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # (symbol, interval) -> (meta mtime_ns, meta, mmapped array)
+        self._memo: dict[tuple[str, str], tuple[int, dict[str, Any], np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.broker_fetches = 0
+
+    # --- storage -----------------------------------------------------------------
+
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / _safe_name(interval) / _safe_name(symbol)
+
+    def _lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _load(self, symbol: str, interval: str) -> tuple[dict[str, Any], np.ndarray | None]:
+        key = (symbol.upper(), interval)
+        meta_path = self._dir(symbol, interval) / "meta.json"
+        try:
+            mtime = meta_path.stat().st_mtime_ns
+        except OSError:
+            self._memo.pop(key, None)
+            return {}, None
+        memo = self._memo.get(key)
+        if memo is not None and memo[0] == mtime:
+            return memo[1], memo[2]
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            arr = np.load(meta_path.parent / meta["file"], mmap_mode="r")
+        except Exception as e:
+            logger.warning("[OHLC CACHE] unreadable cache for %s %s: %s", symbol, interval, e)
+            return {}, None
+        self._memo[key] = (mtime, meta, arr)
+        return meta, arr
+
+    def _write(self, symbol: str, interval: str, arr: np.ndarray, meta: dict[str, Any]) -> None:
+        folder = self._dir(symbol, interval)
+        folder.mkdir(parents=True, exist_ok=True)
+        gen = int(meta.get("generation", 0)) + 1
+        name = f"bars.{gen}.npy"
+        tmp = folder / f"{name}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr, dtype=np.float64))
+        # New generation file + meta swap: readers holding an mmap of the old file are never disturbed.
+        os.replace(tmp, folder / name)
+        meta = dict(meta, file=name, generation=gen, symbol=symbol.upper(), interval=interval, bars=int(arr.shape[1]))
+        meta_tmp = folder / "meta.json.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, folder / "meta.json")
+        self._memo.pop((symbol.upper(), interval), None)
+        for old in folder.glob("bars.*.npy"):
+            if old.name != name:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass  # still mapped (Windows); removed on a later write
+
+    # --- public API --------------------------------------------------------------
+
+    def read_array(self, symbol: str, interval: str, start: datetime | None = None, end: datetime | None = None) -> np.ndarray:
+        """Cached bars with start <= timestamp <= end as a (6, n) array view (empty if nothing cached)."""
+        _, arr = self._load(symbol, interval)
+        if arr is None:
+            return np.empty((len(COLUMNS), 0), dtype=np.float64)
+        ts = arr[0]
+        lo = int(np.searchsorted(ts, _to_ts(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, _to_ts(end), side="right")) if end is not None else len(ts)
+        return arr[:, lo:hi]
+
+    def read(self, symbol: str, interval: str, start: datetime | None = None, end: datetime | None = None) -> pd.DataFrame:
+        """Cached bars in [start, end] as a fetch_nse_ohlc-format frame; no broker access."""
+        arr = self.read_array(symbol, interval, start, end)
+        if arr.shape[1] == 0:
+            return pd.DataFrame()
+        return array_to_frame(arr)
+
+    def store(self, symbol: str, interval: str, df: pd.DataFrame, covered_from: datetime | None = None, covered_to: datetime | None = None) -> None:
+        """Merge a fetched frame into the cache (e.g. to seed it from a recorded file)."""
+        with self._lock((symbol.upper(), interval)):
+            meta, arr = self._load(symbol, interval)
+            new = frame_to_array(df)
+            merged = merge_bars(None if arr is None else np.asarray(arr), new)
+            meta = dict(meta)
+            if covered_from is not None:
+                meta["covered_from"] = min(meta.get("covered_from", float("inf")), _to_ts(covered_from))
+            elif merged.shape[1]:
+                meta.setdefault("covered_from", float(merged[0, 0]))
+            if covered_to is not None:
+                meta["covered_to"] = max(meta.get("covered_to", 0.0), _to_ts(covered_to))
+            elif merged.shape[1]:
+                meta["covered_to"] = max(meta.get("covered_to", 0.0), float(merged[0, -1]))
+            meta.setdefault("fetched_at", 0.0)
+            self._write(symbol, interval, merged, meta)
+
+    def fetch(
+        self,
+        symbol: str,
+        interval: str,
+        start: datetime,
+        end: datetime,
+        fetch_fn: FetchFn | None,
+        now: float | None = None,
+    ) -> pd.DataFrame:
+        """
+        Bars in [start, end]. Only the uncovered head (before covered_from) and the tail since
+        the last stored bar are requested from fetch_fn; everything else is read from disk.
+        fetch_fn=None (no broker) serves whatever is cached.
+        """
+        now = time.time() if now is None else now
+        start_ts, end_ts = _to_ts(start), _to_ts(end)
+        with self._lock((symbol.upper(), interval)):
+            meta, arr = self._load(symbol, interval)
+            gaps: list[tuple[float, float]] = []
+            if fetch_fn is not None:
+                if arr is None or arr.shape[1] == 0:
+                    gaps.append((start_ts, end_ts))
+                else:
+                    covered_from = float(meta.get("covered_from", arr[0, 0]))
+                    covered_to = float(meta.get("covered_to", arr[0, -1]))
+                    if start_ts < covered_from:
+                        gaps.append((start_ts, float(arr[0, 0])))
+                    fresh = (now - float(meta.get("fetched_at", 0.0))) < self.refresh_ttl_sec
+                    if end_ts > covered_to and not fresh and _market_open_between(covered_to, end_ts):
+                        # Refetch from the last stored bar: it may have been a still-forming candle.
+                        gaps.append((float(arr[0, -1]), end_ts))
+            if not gaps:
+                self.hits += 1
+                return self.read(symbol, interval, start, end)
+
+            self.misses += 1
+            merged = None if arr is None else np.asarray(arr)
+            fetched_any = False
+            for gap_start, gap_end in gaps:
+                try:
+                    df = fetch_fn(datetime.fromtimestamp(gap_start, IST), datetime.fromtimestamp(gap_end, IST))
+                    self.broker_fetches += 1
+                except Exception as e:
+                    logger.warning("[OHLC CACHE] broker fetch failed for %s %s: %s", symbol, interval, e)
+                    continue
+                if df is None:
+                    continue
+                fetched_any = True
+                merged = merge_bars(merged, frame_to_array(df))
+            if fetched_any and merged is not None and merged.shape[1]:
+                meta = dict(meta)
+                meta["covered_from"] = min(float(meta.get("covered_from", start_ts)), start_ts)
+                meta["covered_to"] = max(float(meta.get("covered_to", 0.0)), min(end_ts, now))
+                meta["fetched_at"] = now
+                self._write(symbol, interval, merged, meta)
+            return self.read(symbol, interval, start, end)
+
+    def stats(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "broker_fetches": self.broker_fetches, "root": str(self.root)}
+
+
+_cache: OHLCCache | None = None
+_cache_guard = threading.Lock()
+
+
+def get_ohlc_cache() -> OHLCCache:
+    """Process-wide cache instance (data/ohlc_cache, or OHLC_CACHE_DIR when set)."""
+    global _cache
+    with _cache_guard:
+        if _cache is None:
+            _cache = OHLCCache(os.getenv("OHLC_CACHE_DIR") or None)
+        return _cache
@@ -0,0 +1,349 @@
+"""
+Option-chain snapshots with strike-indexed NumPy arrays.
+
+An OptionChain holds one underlying/expiry: the strike ladder from the instrument master and,
+per strike, CE/PE open interest, day-low OI, LTP and implied volatility in float arrays (NaN =
+not fetched yet). PCR, max-pain, ATM±N windows and affordability filters are array operations
+over those columns instead of per-strike quote loops.
+
+OptionChainEngine keeps one chain per (underlying, expiry) and refreshes it incrementally: only
+the strikes in the requested window whose quotes are older than max_age_sec are re-quoted, all
+in one batched call (tick stream first, then the quote gateway). Recommendation, paper, live and
+the OI/PCR filter share the same chains.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from engine.instrument_master import get_instrument_master
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+CHAIN_MAX_AGE_SEC = float(os.getenv("OPTION_CHAIN_MAX_AGE_SEC", "1.0") or 1.0)
+RISK_FREE_RATE = float(os.getenv("OPTION_CHAIN_RISK_FREE_RATE", "0.065") or 0.065)
+_FIELDS = ("oi", "oi_low", "ltp", "iv")
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz-Stegun 7.1.26 erf, |error| < 1.5e-7)."""
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def bs_price(spot: float, strikes: np.ndarray, years: float, sigma: np.ndarray, is_call: bool, rate: float = RISK_FREE_RATE) -> np.ndarray:
+    """Black-Scholes price for arrays of strikes/vols."""
+    sqrt_t = np.sqrt(years)
+    d1 = (np.log(spot / strikes) + (rate + 0.5 * sigma * sigma) * years) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    disc = np.exp(-rate * years)
+    if is_call:
+        return spot * _norm_cdf(d1) - strikes * disc * _norm_cdf(d2)
+    return strikes * disc * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+
+
+def implied_vol(spot: float, strikes: np.ndarray, years: float, prices: np.ndarray, is_call: bool, iterations: int = 60) -> np.ndarray:
+    """Vectorized bisection IV; NaN where the price is missing or outside no-arbitrage bounds."""
+    strikes = np.asarray(strikes, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    out = np.full(strikes.shape, np.nan)
+    if spot <= 0 or years <= 0 or strikes.size == 0:
+        return out
+    lo = np.full(strikes.shape, 1e-4)
+    hi = np.full(strikes.shape, 5.0)
+    valid = np.isfinite(prices) & (prices > 0)
+    valid &= prices > bs_price(spot, strikes, years, lo, is_call) - 1e-9
+    valid &= prices < bs_price(spot, strikes, years, hi, is_call)
+    if not valid.any():
+        return out
+    k, p, lo, hi = strikes[valid], prices[valid], lo[valid], hi[valid]
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        above = bs_price(spot, k, years, mid, is_call) > p
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    out[valid] = 0.5 * (lo + hi)
+    return out
+
+
+def years_to_expiry(expiry: str, now: datetime | None = None) -> float:
+    """Year fraction until 15:30 IST on expiry (floored at one minute)."""
+    try:
+        exp = datetime.combine(date.fromisoformat(expiry[:10]), datetime.min.time()).replace(hour=15, minute=30, tzinfo=IST)
+    except ValueError:
+        return 0.0
+    now = now or datetime.now(IST)
+    return max((exp - now).total_seconds(), 60.0) / (365.0 * 86400.0)
+
+
+class OptionChain:
+    """One underlying/expiry: strike ladder plus per-strike CE/PE columns."""
+
+    def __init__(self, underlying: str, expiry: str, rows: Iterable[dict[str, Any]]) -> None:
+        self.underlying = (underlying or "").upper()
+        self.expiry = expiry
+        by_strike: dict[float, dict[str, str]] = {}
+        lot_size = None
+        for row in rows:
+            strike = float(row.get("strike") or 0)
+            itype = (row.get("instrument_type") or "").upper()
+            if strike <= 0 or itype not in ("CE", "PE"):
+                continue
+            by_strike.setdefault(strike, {})[itype] = (row.get("tradingsymbol") or "").strip().upper()
+            if lot_size is None and row.get("lot_size"):
+                lot_size = int(row["lot_size"])
+        self.strikes = np.array(sorted(by_strike), dtype=float)
+        self.lot_size = lot_size
+        self.symbols = {
+            side: [by_strike[k].get(side) for k in self.strikes.tolist()] for side in ("CE", "PE")
+        }
+        self._index = {
+            sym: (side, i) for side, syms in self.symbols.items() for i, sym in enumerate(syms) if sym
+        }
+        n = len(self.strikes)
+        self.columns = {(side, f): np.full(n, np.nan) for side in ("CE", "PE") for f in _FIELDS}
+        self.fetched_at = np.zeros(n)
+        self.spot = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    def column(self, side: str, field: str) -> np.ndarray:
+        return self.columns[(side.upper(), field)]
+
+    # --- Strike selection ---
+
+    def atm_index(self, spot: float) -> int:
+        """Index of the strike nearest to spot."""
+        if not len(self.strikes):
+            return -1
+        i = int(np.searchsorted(self.strikes, spot))
+        if i >= len(self.strikes):
+            return len(self.strikes) - 1
+        if i > 0 and spot - self.strikes[i - 1] <= self.strikes[i] - spot:
+            return i - 1
+        return i
+
+    def window(self, spot: float, n: int) -> np.ndarray:
+        """Indices of ATM±n strikes (clipped to the ladder)."""
+        atm = self.atm_index(spot)
+        if atm < 0:
+            return np.array([], dtype=int)
+        return np.arange(max(0, atm - n), min(len(self.strikes), atm + n + 1))
+
+    def indices_for(self, strikes: Iterable[float]) -> np.ndarray:
+        """Ladder indices for exact strikes (strikes not listed are dropped)."""
+        wanted = np.asarray(list(strikes), dtype=float)
+        idx = np.searchsorted(self.strikes, wanted)
+        idx = np.clip(idx, 0, max(0, len(self.strikes) - 1))
+        if not len(self.strikes):
+            return np.array([], dtype=int)
+        return np.unique(idx[self.strikes[idx] == wanted])
+
+    def values_at(self, side: str, field: str, strikes: Iterable[float]) -> dict[int, float]:
+        """{strike: value} for listed strikes with a known value."""
+        idx = self.indices_for(strikes)
+        col = self.column(side, field)
+        return {int(self.strikes[i]): float(col[i]) for i in idx if np.isfinite(col[i])}
+
+    def oi_change_pct_at(self, side: str, strikes: Iterable[float]) -> dict[int, float]:
+        """{strike: % OI change off the day low} for listed strikes where it is defined."""
+        idx = self.indices_for(strikes)
+        pct = self.oi_change_pct(side)
+        return {int(self.strikes[i]): float(pct[i]) for i in idx if np.isfinite(pct[i])}
+
+    # --- Updates ---
+
+    def apply_quotes(self, quotes: dict[str, dict[str, Any]], spot: float, now: float) -> int:
+        """Write quotes (keyed by tradingsymbol, zerodha_client.get_quote shape) into the columns."""
+        touched: dict[str, list[int]] = {"CE": [], "PE": []}
+        with self.lock:
+            for sym, q in quotes.items():
+                hit = self._index.get((sym or "").upper())
+                if hit is None or not q:
+                    continue
+                side, i = hit
+                self.columns[(side, "oi")][i] = float(q.get("oi") or 0.0)
+                self.columns[(side, "oi_low")][i] = float(q.get("oi_day_low") or 0.0)
+                self.columns[(side, "ltp")][i] = float(q.get("last") or q.get("last_price") or 0.0)
+                self.fetched_at[i] = now
+                touched[side].append(i)
+            if spot > 0:
+                self.spot = float(spot)
+                years = years_to_expiry(self.expiry)
+                for side, idx in touched.items():
+                    if idx:
+                        idx_arr = np.array(idx)
+                        self.columns[(side, "iv")][idx_arr] = implied_vol(
+                            spot, self.strikes[idx_arr], years, self.columns[(side, "ltp")][idx_arr], side == "CE"
+                        )
+        return sum(len(v) for v in touched.values())
+
+    # --- Analytics ---
+
+    def pcr(self, idx: np.ndarray | None = None) -> float | None:
+        """PE/CE open-interest ratio over idx (default: whole chain); None without both sides."""
+        ce = self.column("CE", "oi") if idx is None else self.column("CE", "oi")[idx]
+        pe = self.column("PE", "oi") if idx is None else self.column("PE", "oi")[idx]
+        ce_total = float(np.nansum(np.where(ce > 0, ce, 0.0)))
+        pe_total = float(np.nansum(np.where(pe > 0, pe, 0.0)))
+        if ce_total <= 0 or pe_total <= 0:
+            return None
+        return pe_total / ce_total
+
+    def max_pain(self, idx: np.ndarray | None = None) -> float | None:
+        """Strike at which option writers pay out least (over idx, default whole chain)."""
+        sel = slice(None) if idx is None else idx
+        k = self.strikes[sel]
+        ce = np.nan_to_num(self.column("CE", "oi")[sel])
+        pe = np.nan_to_num(self.column("PE", "oi")[sel])
+        if not len(k) or (ce.sum() <= 0 and pe.sum() <= 0):
+            return None
+        settle = k[:, None]
+        payout = (np.maximum(settle - k[None, :], 0.0) * ce[None, :]).sum(axis=1)
+        payout += (np.maximum(k[None, :] - settle, 0.0) * pe[None, :]).sum(axis=1)
+        return float(k[int(np.argmin(payout))])
+
+    def oi_change_pct(self, side: str) -> np.ndarray:
+        """% OI change off the day low per strike (NaN where OI or day low is unknown/zero)."""
+        oi = self.column(side, "oi")
+        low = self.column(side, "oi_low")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = (oi - low) / low * 100.0
+        return np.where((oi > 0) & (low > 0) & (oi >= low), pct, np.nan)
+
+    def affordable(self, side: str, idx: np.ndarray, budget: float, lot_size: int | None = None) -> np.ndarray:
+        """Boolean mask over idx: one lot at the live premium fits within budget."""
+        ltp = self.column(side, "ltp")[idx]
+        lot = lot_size or self.lot_size or 1
+        return np.isfinite(ltp) & (ltp > 0) & (ltp * lot <= budget)
+
+
+def _default_quotes(symbols: list[str]) -> dict[str, dict[str, Any]]:
+    """NFO quotes: fresh tick-stream quotes first, everything else in one gateway batch."""
+    from engine.tick_stream import get_tick_stream
+    from engine.zerodha_client import get_quotes
+
+    stream = get_tick_stream()
+    out: dict[str, dict[str, Any]] = {}
+    missing = []
+    for sym in symbols:
+        q = stream.get_quote(sym, "NFO") if stream else None
+        if q:
+            out[sym] = q
+        else:
+            missing.append(sym)
+    if missing:
+        for (sym, _), q in get_quotes([(s, "NFO") for s in missing]).items():
+            out[sym] = q
+    return out
+
+
+class OptionChainEngine:
+    """Per (underlying, expiry) chains, refreshed incrementally with batched quotes."""
+
+    def __init__(
+        self,
+        *,
+        master_fn: Callable[[], Any] = get_instrument_master,
+        quotes_fn: Callable[[list[str]], dict[str, dict[str, Any]]] = _default_quotes,
+        max_age_sec: float = CHAIN_MAX_AGE_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._master_fn = master_fn
+        self._quotes_fn = quotes_fn
+        self.max_age_sec = max_age_sec
+        self._clock = clock
+        self._chains: dict[tuple[str, str], OptionChain] = {}
+        self._lock = threading.Lock()
+        self.stats = {"chains": 0, "refreshes": 0, "quote_calls": 0, "strikes_quoted": 0, "strikes_fresh": 0}
+
+    def nearest_expiry(self, underlying: str, today: date | None = None) -> str | None:
+        expiries = self._master_fn().expiries((underlying or "").upper(), (today or date.today()).isoformat())
+        return expiries[0] if expiries else None
+
+    def chain(self, underlying: str, expiry: str | None = None) -> OptionChain | None:
+        """Chain for underlying/expiry (nearest listed expiry by default), built on first use."""
+        underlying = (underlying or "").upper()
+        expiry = expiry or self.nearest_expiry(underlying)
+        if not expiry:
+            return None
+        key = (underlying, expiry)
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is None:
+                chain = OptionChain(underlying, expiry, self._master_fn().option_chain(underlying, expiry))
+                if not len(chain):
+                    return None
+                self._chains = {k: c for k, c in self._chains.items() if k[1] >= expiry or k[0] != underlying}
+                self._chains[key] = chain
+                self.stats["chains"] += 1
+            return chain
+
+    def refresh(
+        self,
+        underlying: str,
+        spot: float,
+        *,
+        n: int = 2,
+        strikes: Iterable[float] | None = None,
+        expiry: str | None = None,
+        max_age_sec: float | None = None,
+    ) -> OptionChain | None:
+        """Re-quote stale strikes in the ATM±n window (or the given strikes) in one batched call."""
+        chain = self.chain(underlying, expiry)
+        if chain is None:
+            return None
+        idx = chain.indices_for(strikes) if strikes is not None else chain.window(spot, n)
+        now = self._clock()
+        age = self.max_age_sec if max_age_sec is None else max_age_sec
+        with chain.lock:
+            stale = idx[now - chain.fetched_at[idx] > age] if len(idx) else idx
+        self.stats["refreshes"] += 1
+        self.stats["strikes_fresh"] += int(len(idx) - len(stale))
+        symbols = [chain.symbols[side][i] for i in stale.tolist() for side in ("CE", "PE") if chain.symbols[side][i]]
+        if symbols:
+            try:
+                quotes = self._quotes_fn(symbols)
+            except Exception as e:
+                logger.warning("[OPTION CHAIN] Quote refresh failed | %s %s | %s", chain.underlying, chain.expiry, str(e))
+                quotes = {}
+            self.stats["quote_calls"] += 1
+            self.stats["strikes_quoted"] += int(len(stale))
+            chain.apply_quotes(quotes, spot, now)
+        return chain
+
+
+_engine: OptionChainEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_option_chain_engine() -> OptionChainEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OptionChainEngine()
+        return _engine
+
+
+def set_option_chain_engine(engine: OptionChainEngine | None) -> None:
+    """Install an engine (tests / replay); None resets to the default on next use."""
+    global _engine
+    with _engine_lock:
+        _engine = engine
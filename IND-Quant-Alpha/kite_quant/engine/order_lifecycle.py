@@ -0,0 +1,231 @@
+"""
+Asyncio-driven order lifecycle service.
+
+OrderLifecycleService extends OrderManager with one background event loop that owns fill polling
+for every open order. Callers (entry, exit, emergency flatten, stop/target cancel confirmation)
+register a waiter and block only their own thread; the loop polls all open orders in a single
+batched broker call per interval (kite.orders() for Zerodha) and resolves each waiter as its order
+reaches a terminal state. Broker order updates (websocket postbacks) resolve waiters immediately
+without waiting for the next poll. While nobody is waiting the loop is idle and makes no calls.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any
+
+from engine.order_state import TERMINAL_STATES, BrokerInterface, ManagedOrder, OrderManager
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_BROKER_STATUSES = {"COMPLETE", "FILLED", "CANCELLED", "CANCELED", "REJECTED"}
+
+
+class OrderLifecycleService(OrderManager):
+    """OrderManager whose waiters share one batched poller running on a background event loop."""
+
+    def __init__(self, broker: BrokerInterface, *, poll_interval_sec: float = 0.5) -> None:
+        super().__init__(broker)
+        self.poll_interval_sec = max(0.01, float(poll_interval_sec))
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        # Loop-thread only: futures waiting on managed orders / on orders placed outside the manager.
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._watchers: dict[str, list[asyncio.Future]] = {}
+        self._external: dict[str, dict[str, Any]] = {}  # broker_order_id -> latest payload (under _lock)
+        self.stats = {"polls": 0, "orders_polled": 0, "resolved": 0, "timeouts": 0, "order_updates": 0}
+
+    # --- Loop management ---
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop thread (idempotent)."""
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run() -> None:
+                asyncio.set_event_loop(loop)
+                self._wake = asyncio.Event()
+                self._task = loop.create_task(self._poll_loop())
+                ready.set()
+                try:
+                    loop.run_until_complete(self._task)
+                except asyncio.CancelledError:
+                    pass
+                finally:
+                    pending = asyncio.all_tasks(loop)
+                    for task in pending:
+                        task.cancel()
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                    loop.run_until_complete(loop.shutdown_default_executor())
+                    loop.close()
+
+            self._thread = threading.Thread(target=run, name="order_lifecycle", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def stop(self) -> None:
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None and self._task is not None:
+            loop.call_soon_threadsafe(self._task.cancel)
+            if self._thread is not None:
+                self._thread.join(timeout=2)
+
+    # --- Waiting (async API, runs on the service loop) ---
+
+    async def wait_terminal(self, client_order_id: str, timeout_sec: float) -> ManagedOrder:
+        """Wait until client_order_id is FILLED/REJECTED/CANCELLED or timeout; returns the latest order."""
+        order = self.get_order(client_order_id)
+        if order.state in TERMINAL_STATES:
+            return order
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client_order_id, []).append(fut)
+        return await self._await(fut, self._waiters, client_order_id, timeout_sec, lambda: self.get_order(client_order_id))
+
+    async def wait_broker_order(self, broker_order_id: str, timeout_sec: float) -> dict[str, Any] | None:
+        """Wait until an order placed outside the manager is terminal; returns its terminal status payload,
+        or None if it is still open (or unknown) at timeout."""
+        payload = self._external_payload(broker_order_id)
+        if self._is_terminal_payload(payload):
+            return payload
+        with self._lock:
+            self._external.setdefault(broker_order_id, {})
+        fut = asyncio.get_running_loop().create_future()
+        self._watchers.setdefault(broker_order_id, []).append(fut)
+        try:
+            return await self._await(
+                fut, self._watchers, broker_order_id, timeout_sec, lambda: self._terminal_payload(broker_order_id)
+            )
+        finally:
+            if broker_order_id not in self._watchers:
+                with self._lock:
+                    self._external.pop(broker_order_id, None)
+
+    async def _await(self, fut: asyncio.Future, registry: dict[str, list[asyncio.Future]], key: str, timeout_sec: float, latest: Any) -> Any:
+        assert self._wake is not None
+        self._wake.set()
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, timeout_sec))
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return latest()
+        finally:
+            futs = registry.get(key) or []
+            if fut in futs:
+                futs.remove(fut)
+            if not futs:
+                registry.pop(key, None)
+
+    # --- Waiting (sync API, any thread; blocks only the caller) ---
+
+    def wait_for_terminal(self, client_order_id: str, timeout_sec: float) -> ManagedOrder:
+        loop = self.start()
+        future = asyncio.run_coroutine_threadsafe(self.wait_terminal(client_order_id, timeout_sec), loop)
+        return future.result(timeout=timeout_sec + 5.0)
+
+    def wait_for_broker_order(self, broker_order_id: str, timeout_sec: float) -> dict[str, Any] | None:
+        loop = self.start()
+        future = asyncio.run_coroutine_threadsafe(self.wait_broker_order(broker_order_id, timeout_sec), loop)
+        return future.result(timeout=timeout_sec + 5.0)
+
+    # --- Broker order updates (postbacks / websocket) ---
+
+    def on_order_update(self, payload: dict[str, Any]) -> None:
+        """Apply a normalized order update from any thread and resolve affected waiters."""
+        self.stats["order_updates"] += 1
+        try:
+            self.apply_order_update(payload)
+        except Exception:
+            logger.exception("order update failed order_id=%s", payload.get("order_id"))
+        broker_order_id = str(payload.get("order_id") or "")
+        with self._lock:
+            if broker_order_id in self._external:
+                self._external[broker_order_id] = payload
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._resolve_ready)
+
+    # --- Poller ---
+
+    async def _poll_loop(self) -> None:
+        assert self._wake is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._waiters and not self._watchers:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            try:
+                await loop.run_in_executor(None, self._poll_once)
+            except Exception:
+                logger.exception("order lifecycle poll failed")
+            self._resolve_ready()
+            await asyncio.sleep(self.poll_interval_sec)
+
+    def _poll_once(self) -> None:
+        """One batched status call covering every open managed order and every watched external order."""
+        with self._lock:
+            managed = {
+                o.broker_order_id: cid
+                for cid, o in self._orders.items()
+                if o.state not in TERMINAL_STATES and o.broker_order_id
+            }
+            external = [oid for oid in self._external if oid not in managed]
+        ids = list(managed) + external
+        if not ids:
+            return
+        payloads = self.fetch_statuses(ids)
+        self.stats["polls"] += 1
+        self.stats["orders_polled"] += len(ids)
+        for broker_order_id, cid in managed.items():
+            payload = payloads.get(broker_order_id)
+            if payload:
+                try:
+                    self.apply_status(cid, payload)
+                except Exception:
+                    logger.exception("apply_status failed client_order_id=%s", cid)
+        with self._lock:
+            for broker_order_id in external:
+                if payloads.get(broker_order_id) and broker_order_id in self._external:
+                    self._external[broker_order_id] = payloads[broker_order_id]
+
+    def _resolve_ready(self) -> None:
+        for cid in list(self._waiters):
+            order = self.get_order(cid)
+            if order.state in TERMINAL_STATES:
+                self._resolve(self._waiters.pop(cid), order)
+        for broker_order_id in list(self._watchers):
+            payload = self._external_payload(broker_order_id)
+            if self._is_terminal_payload(payload):
+                self._resolve(self._watchers.pop(broker_order_id), payload)
+
+    def _resolve(self, futs: list[asyncio.Future], result: Any) -> None:
+        for fut in futs:
+            if not fut.done():
+                fut.set_result(result)
+                self.stats["resolved"] += 1
+
+    def _external_payload(self, broker_order_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            cid = self._by_broker_id.get(broker_order_id)
+            if cid is None:
+                return self._external.get(broker_order_id)
+        order = self.get_order(cid)
+        return {"order_id": broker_order_id, "status": order.state.value, "filled_quantity": order.filled_quantity}
+
+    def _terminal_payload(self, broker_order_id: str) -> dict[str, Any] | None:
+        payload = self._external_payload(broker_order_id)
+        return payload if self._is_terminal_payload(payload) else None
+
+    @staticmethod
+    def _is_terminal_payload(payload: dict[str, Any] | None) -> bool:
+        return bool(payload) and str(payload.get("status") or "").upper() in TERMINAL_BROKER_STATUSES
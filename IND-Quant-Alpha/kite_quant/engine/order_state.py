@@ -3,7 +3,7 @@ Robust order state machine for broker order lifecycle management.
 
 This module provides:
 - OrderState enum
-- Pydantic dataclasses for order payloads
+- Dataclasses for order payloads
 - BrokerInterface protocol
 - OrderManager with safe state transitions and reconciliation
 """
@@ -14,14 +14,12 @@ import asyncio
 import logging
 import time
 import uuid
-from dataclasses import field
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
 from enum import Enum
 from threading import RLock
 from typing import Any, Protocol
 
-from pydantic.dataclasses import dataclass
-
 logger = logging.getLogger(__name__)
 
 
@@ -150,6 +148,11 @@ class BrokerInterface(Protocol):
             {"success": bool, "cancelled": bool, "error": str | None}
         """
 
+    # Optional: brokers that can list many orders at once may also implement
+    #   get_orders_status(broker_order_ids: list[str]) -> dict[str, dict[str, Any]]
+    # returning get_order_status-style payloads keyed by broker_order_id (ids not found omitted).
+    # OrderManager.poll_open_orders() uses it to poll every open order in one call.
+
 
 class OrderManager:
     """Stateful order lifecycle manager with safe transitions."""
@@ -157,6 +160,7 @@ class OrderManager:
     def __init__(self, broker: BrokerInterface) -> None:
         self._broker = broker
         self._orders: dict[str, ManagedOrder] = {}
+        self._by_broker_id: dict[str, str] = {}
         self._lock = RLock()
 
     def send_order(self, request: OrderRequest) -> ManagedOrder:
@@ -181,6 +185,7 @@ class OrderManager:
             with self._lock:
                 if success and broker_order_id:
                     order.broker_order_id = str(broker_order_id)
+                    self._by_broker_id[order.broker_order_id] = request.client_order_id
                     self._transition(order, OrderState.ACKNOWLEDGED, reason="Broker acknowledged order")
                 else:
                     err = str(result.get("error") or "Broker rejected order")
@@ -208,11 +213,74 @@ class OrderManager:
 
         try:
             status_payload = self._broker.get_order_status(broker_order_id)
-            snapshot = self._to_snapshot(broker_order_id, status_payload)
         except Exception as exc:
             logger.exception("poll_status failed client_order_id=%s", client_order_id)
             return order
 
+        return self.apply_status(client_order_id, status_payload)
+
+    def poll_open_orders(self) -> dict[str, ManagedOrder]:
+        """Poll every non-terminal order in one batched broker call (falls back to one call per order).
+
+        Returns the orders that were polled, keyed by client_order_id.
+        """
+        with self._lock:
+            open_orders = {
+                cid: o.broker_order_id
+                for cid, o in self._orders.items()
+                if o.state not in TERMINAL_STATES and o.broker_order_id
+            }
+        if not open_orders:
+            return {}
+        payloads = self.fetch_statuses(list(open_orders.values()))
+        out: dict[str, ManagedOrder] = {}
+        for cid, broker_order_id in open_orders.items():
+            payload = payloads.get(broker_order_id)
+            out[cid] = self.apply_status(cid, payload) if payload else self.get_order(cid)
+        return out
+
+    def fetch_statuses(self, broker_order_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Status payloads for broker_order_ids; one call when the broker supports batching."""
+        if not broker_order_ids:
+            return {}
+        batched = getattr(self._broker, "get_orders_status", None)
+        if callable(batched):
+            try:
+                return batched(list(broker_order_ids)) or {}
+            except Exception:
+                logger.exception("batched order status failed ids=%s", len(broker_order_ids))
+                return {}
+        payloads: dict[str, dict[str, Any]] = {}
+        for broker_order_id in broker_order_ids:
+            try:
+                payloads[broker_order_id] = self._broker.get_order_status(broker_order_id)
+            except Exception:
+                logger.exception("order status failed broker_order_id=%s", broker_order_id)
+        return payloads
+
+    def apply_order_update(self, payload: dict[str, Any]) -> ManagedOrder | None:
+        """Apply a broker order update (postback / websocket) keyed by order_id. None if not ours."""
+        broker_order_id = str(payload.get("order_id") or "")
+        with self._lock:
+            client_order_id = self._by_broker_id.get(broker_order_id)
+        if not client_order_id:
+            return None
+        return self.apply_status(client_order_id, payload)
+
+    def apply_status(self, client_order_id: str, status_payload: dict[str, Any]) -> ManagedOrder:
+        """Apply one broker status payload with safe state transitions."""
+        with self._lock:
+            order = self._get_order_or_raise(client_order_id)
+            if order.state in TERMINAL_STATES or not order.broker_order_id:
+                return order
+            broker_order_id = order.broker_order_id
+
+        try:
+            snapshot = self._to_snapshot(broker_order_id, status_payload)
+        except Exception:
+            logger.exception("apply_status failed client_order_id=%s", client_order_id)
+            return order
+
         with self._lock:
             order = self._get_order_or_raise(client_order_id)
             if order.state in TERMINAL_STATES:
@@ -232,10 +300,15 @@ class OrderManager:
                 self._transition(order, OrderState.REJECTED, reason=order.reject_reason or "Rejected by broker")
                 return order
 
-            if mapped in (OrderState.PARTIAL_FILLED, OrderState.FILLED):
+            # Kite keeps partially filled orders OPEN with filled_quantity > 0.
+            if mapped in (OrderState.PARTIAL_FILLED, OrderState.FILLED) or (
+                mapped == OrderState.ACKNOWLEDGED and snapshot.filled_quantity > 0
+            ):
                 self.reconcile_fill(client_order_id, snapshot)
                 return self._get_order_or_raise(client_order_id)
 
+            if order.state == OrderState.PARTIAL_FILLED and mapped == OrderState.ACKNOWLEDGED:
+                return order
             self._transition(order, mapped, reason=f"Broker status={snapshot.status}")
             return order
 
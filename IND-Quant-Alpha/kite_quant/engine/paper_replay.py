@@ -0,0 +1,274 @@
+"""
+Accelerated paper-trading replay on a recorded tick (or candle) feed.
+
+PaperReplay runs SessionTickEngine ticks, execution.paper_executor entries/exits and the risk
+engine's entry gate against recorded market data on a virtual clock:
+- Ticks are fed into a private TickStore/TickStream installed as the process tick stream, so the
+  paper executor and strategies.data_provider read the recording instead of the broker.
+- engine.sim_clock is a VirtualClock advanced one engine tick (step_sec) at a time; simulated
+  execution latency is accounted, never slept.
+- Fills use a seeded PaperFillModel (per-session generators), and closed trades go to a private
+  journal, so two runs with the same feed, sessions and seed produce identical trades.
+A full trading day of several sessions at a one-minute step replays in a few seconds.
+
+The clock, tick stream, fill model and journal are process-wide, so a replay refuses to start while
+the live engine or the live tick stream is running in the same process (ReplayConflictError); run
+replays from a script or a separate worker process.
+
+Sessions are evaluated by the evaluate(session, now) passed to run(). signal_evaluator() is a
+minimal stand-in (stop/target exits, risk gate, one signal function); it does not cover the app's
+strategy selection, trailing stops or AI exits. app._evaluate_session_tick has the same signature
+and can be passed instead, but it also calls broker/GPT paths that are not part of the recording.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from engine.risk_engine import evaluate_entry
+from engine.sim_clock import VirtualClock, get_clock, set_clock
+from engine.tick_engine import SessionTickEngine, busy_tick_engines
+from engine.tick_replay import load_recorded_ticks
+from engine import tick_stream as tick_stream_mod
+from engine.tick_stream import TickStore, TickStream, get_tick_stream, set_tick_stream
+from execution import paper_executor
+from execution.trade_history_store import TradeJournal, get_trade_journal, set_trade_journal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEP_SEC = 60.0
+LIVE_ENGINE_QUIET_SEC = 300.0  # a live engine that ticked this recently counts as running
+
+# evaluate(session, now) for one ACTIVE session on one engine tick (mutates the session copy).
+Evaluator = Callable[[dict[str, Any], datetime], None]
+# signal(session, candles_1m, now) -> {"side", "stop_loss", "target", "qty"?} or None.
+SignalFn = Callable[[dict[str, Any], list[dict[str, Any]], datetime], dict[str, Any] | None]
+
+
+class ReplayConflictError(RuntimeError):
+    """A replay would swap the process-wide clock/stream/journal under a running live engine."""
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value or 0)
+
+
+def candles_to_ticks(candles: Iterable[dict[str, Any]], instrument_token: int, *, interval_sec: int = 60) -> list[dict[str, Any]]:
+    """
+    Expand OHLCV candles into four ticks per bar (open, first extreme, second extreme, close) so
+    candle recordings drive the same replay as tick recordings. Up bars visit the low first.
+    """
+    ticks: list[dict[str, Any]] = []
+    day_open = day_high = day_low = None
+    volume = 0.0
+    offsets = (0, interval_sec // 4, interval_sec // 2, interval_sec - 1)
+    for c in candles:
+        start = _epoch(c.get("date") or c.get("start"))
+        o, h, lo, cl = float(c["open"]), float(c["high"]), float(c["low"]), float(c["close"])
+        path = (o, lo, h, cl) if cl >= o else (o, h, lo, cl)
+        bar_volume = float(c.get("volume") or 0)
+        for i, (offset, price) in enumerate(zip(offsets, path)):
+            day_open = price if day_open is None else day_open
+            day_high = price if day_high is None else max(day_high, price)
+            day_low = price if day_low is None else min(day_low, price)
+            volume += bar_volume / 4 if i else 0.0
+            ticks.append({
+                "instrument_token": int(instrument_token),
+                "last_price": price,
+                "volume_traded": volume,
+                "exchange_timestamp": start + offset,
+                "ohlc": {"open": day_open, "high": day_high, "low": day_low, "close": day_open},
+            })
+    return ticks
+
+
+def load_recorded_candles(path: str | Path, instrument_token: int, *, interval_sec: int = 60) -> list[dict[str, Any]]:
+    """Candle recording (JSON list or JSONL of OHLCV bars) as replay ticks."""
+    text = Path(path).read_text(encoding="utf-8").strip()
+    if text.startswith("["):
+        candles = json.loads(text)
+    else:
+        candles = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return candles_to_ticks(candles, instrument_token, interval_sec=interval_sec)
+
+
+def signal_evaluator(signal: SignalFn) -> Evaluator:
+    """
+    Minimal paper session tick for replays: manage the open trade against its stop/target on the
+    streamed LTP, otherwise pass the risk engine's entry gate and ask signal() for an entry.
+    A stand-in for app._evaluate_session_tick, not a copy of it (see the module docstring).
+    """
+
+    def evaluate(session: dict[str, Any], now: datetime) -> None:
+        if session.get("status") != "ACTIVE":
+            return
+        stream = get_tick_stream()
+        trade = session.get("current_trade")
+        if trade:
+            quote = stream.get_quote(trade["symbol"], trade.get("exchange") or "NSE") if stream else None
+            if not quote:
+                return
+            ltp = float(quote["last"])
+            long = (trade.get("side") or "BUY").upper() == "BUY"
+            stop, target = trade.get("stop_loss"), trade.get("target")
+            if stop is not None and (ltp <= stop if long else ltp >= stop):
+                trade["exit_reason"] = "STOP_LOSS"
+            elif target is not None and (ltp >= target if long else ltp <= target):
+                trade["exit_reason"] = "TARGET"
+            else:
+                return
+            paper_executor.exit_paper_trade(session, ltp)
+            return
+        decision = evaluate_entry(session, now=now)
+        session.update(decision.updated_session_state)
+        if session.get("status") != "ACTIVE" or not decision.approved:
+            return
+        symbol = session.get("tradingsymbol") or session.get("instrument") or ""
+        exchange = (session.get("exchange") or "NSE").upper()
+        candles = stream.get_candles(symbol, "1m", 60, exchange) if stream else []
+        entry = signal(session, candles, now)
+        if not entry:
+            return
+        qty = int(entry.get("qty") or session.get("lot_size") or 1)
+        paper_executor.place_paper_trade(
+            session,
+            symbol,
+            entry.get("side") or "BUY",
+            qty,
+            strategy_name=str(entry.get("strategy") or "replay"),
+            stop_loss=entry.get("stop_loss"),
+            target=entry.get("target"),
+        )
+
+    return evaluate
+
+
+class PaperReplay:
+    """Replays one recording through SessionTickEngine + paper executor in virtual time."""
+
+    def __init__(
+        self,
+        ticks: Iterable[dict[str, Any]],
+        *,
+        instruments: dict[tuple[str, str], int],
+        seed: int = 0,
+        step_sec: float = DEFAULT_STEP_SEC,
+        max_workers: int = 4,
+        max_latency_sec: float = paper_executor.MAX_SIM_LATENCY_SEC,
+        journal_path: str | Path | None = None,
+    ) -> None:
+        self.ticks = sorted(ticks, key=lambda t: _epoch(t.get("exchange_timestamp")))
+        self.instruments = {(s.upper(), e.upper()): int(tok) for (s, e), tok in instruments.items()}
+        self.seed = seed
+        self.step_sec = max(1.0, float(step_sec))
+        self.max_workers = max_workers
+        self.max_latency_sec = max_latency_sec
+        self.journal_path = Path(journal_path) if journal_path else None
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs: Any) -> "PaperReplay":
+        return cls(load_recorded_ticks(path), **kwargs)
+
+    @staticmethod
+    def check_live_idle() -> None:
+        """Raise ReplayConflictError if the live tick stream or another tick engine is running."""
+        live_stream = tick_stream_mod._stream
+        if live_stream is not None and (live_stream.started or live_stream.connected):
+            raise ReplayConflictError("live tick stream is running in this process; replay would hijack it")
+        if busy_tick_engines(LIVE_ENGINE_QUIET_SEC):
+            raise ReplayConflictError("a session tick engine is running in this process; replay would hijack it")
+
+    @contextmanager
+    def _installed(self, clock: VirtualClock, stream: TickStream, journal: TradeJournal) -> Iterator[None]:
+        saved = (get_clock(), tick_stream_mod._stream, paper_executor.get_paper_fill_model(), get_trade_journal())
+        saved_enabled = os.environ.get("TICK_STREAM_ENABLED")
+        os.environ["TICK_STREAM_ENABLED"] = "1"
+        set_clock(clock)
+        set_tick_stream(stream)
+        paper_executor.set_paper_fill_model(
+            paper_executor.PaperFillModel(self.seed, max_latency_sec=self.max_latency_sec)
+        )
+        set_trade_journal(journal)
+        try:
+            yield
+        finally:
+            set_clock(saved[0])
+            set_tick_stream(saved[1])
+            paper_executor.set_paper_fill_model(saved[2])
+            set_trade_journal(saved[3])
+            if saved_enabled is None:
+                os.environ.pop("TICK_STREAM_ENABLED", None)
+            else:
+                os.environ["TICK_STREAM_ENABLED"] = saved_enabled
+
+    def run(self, sessions: list[dict[str, Any]], evaluate: Evaluator, *, square_off: bool = True) -> dict[str, Any]:
+        """
+        Step the virtual clock from the first to the last recorded tick, feeding ticks up to each
+        step and running one engine tick over the ACTIVE sessions. Sessions are updated in place;
+        returns the closed trades and replay stats.
+
+        Raises:
+            ReplayConflictError: The live engine or tick stream is running in this process.
+        """
+        self.check_live_idle()
+        if not self.ticks:
+            return {"trades": [], "sessions": sessions, "stats": {"ticks": 0, "steps": 0}}
+        started = time.perf_counter()
+        first = _epoch(self.ticks[0].get("exchange_timestamp"))
+        last = _epoch(self.ticks[-1].get("exchange_timestamp"))
+        clock = VirtualClock(first - first % self.step_sec)
+        store = TickStore(stale_sec=None)
+        stream = TickStream(ticker_factory=lambda: None, resolve_token=lambda s, e: self.instruments.get((s, e)), store=store)
+        stream.sync_subscriptions(self.instruments)
+        engine = SessionTickEngine(
+            sessions_lock=threading.Lock(), save_sessions_fn=lambda: None, max_workers=self.max_workers
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = TradeJournal(self.journal_path or Path(tmp) / "replay_trades.jsonl")
+            with self._installed(clock, stream, journal):
+                steps = 0
+                i = 0
+                while True:
+                    step_end = clock.time() + self.step_sec
+                    while i < len(self.ticks) and _epoch(self.ticks[i].get("exchange_timestamp")) < step_end:
+                        tick = self.ticks[i]
+                        store.update([tick], received=_epoch(tick.get("exchange_timestamp")))
+                        i += 1
+                    clock.advance_to(step_end)
+                    now = clock.now()
+                    active = [s for s in sessions if s.get("status") == "ACTIVE"]
+                    if active:
+                        engine.run_tick(active, lambda s, now=now: evaluate(s, now))
+                    steps += 1
+                    if i >= len(self.ticks) and clock.time() > last:
+                        break
+                if square_off:
+                    for session in sessions:
+                        if session.get("current_trade"):
+                            session["current_trade"]["exit_reason"] = "SQUARE_OFF"
+                            paper_executor.exit_paper_trade(session)
+                trades = journal.trades()
+            engine.shutdown()
+        stats = {
+            "ticks": len(self.ticks),
+            "steps": steps,
+            "start": datetime.fromtimestamp(first).astimezone(now.tzinfo).isoformat(),
+            "end": now.isoformat(),
+            "trades": len(trades),
+            "simulated_latency_sec": round(clock.slept_sec, 3),
+            "wall_sec": round(time.perf_counter() - started, 3),
+        }
+        logger.info("PAPER REPLAY | %s", stats)
+        return {"trades": trades, "sessions": sessions, "stats": stats}
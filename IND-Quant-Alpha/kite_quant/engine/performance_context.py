@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 from zoneinfo import ZoneInfo
 
 IST = ZoneInfo("Asia/Kolkata")
 _DATA_DIR = Path(__file__).resolve().parents[1] / "data"
-_TRADE_HISTORY_FILE = _DATA_DIR / "trade_history.json"
 _BROKER_ORDERS_HISTORY_FILE = _DATA_DIR / "live_broker_orders_history.json"
 
 
@@ -61,15 +60,13 @@ def build_live_performance_context(
     """
     Build charge-aware, rolling live performance metrics for AI prompts/gates.
     """
+    from execution.trade_history_store import get_trade_history
+
     today = datetime.now(IST).date()
 
-    trade_rows = (_read_json(_TRADE_HISTORY_FILE).get("trades") or [])
+    # Journal date index narrows to today's LIVE rows; entry time is still checked in IST.
     live_today: list[dict[str, Any]] = []
-    for t in trade_rows:
-        if not isinstance(t, dict):
-            continue
-        if str(t.get("mode") or "").upper() != "LIVE":
-            continue
+    for t in get_trade_history(mode="LIVE", from_date=(today - timedelta(days=1)).isoformat(), to_date=today.isoformat()):
         et = _parse_ts(t.get("entry_time"))
         if not et or et.date() != today:
             continue
@@ -141,8 +138,7 @@ def build_live_performance_context(
     )
 
     # Lightweight learning profile from historical setups (if setup_features are present).
-    hist_live = [t for t in trade_rows if isinstance(t, dict) and str(t.get("mode") or "").upper() == "LIVE"]
-    hist_recent = hist_live[-120:]
+    hist_recent = get_trade_history(mode="LIVE", limit=120)
     learned_matches: list[dict[str, Any]] = []
     current_bucket = str((current_session_features or {}).get("first_hour_breakout") or "na").lower()
     current_vwap_side = str((current_session_features or {}).get("vwap_side") or "na").lower()
@@ -0,0 +1,239 @@
+"""
+Batched Kite quote gateway.
+
+Every quote in the app (get_quote, get_quotes_bulk, session LTPs, paper fills, VIX, OI/PCR strike
+quotes) goes through one QuoteGateway:
+- A sub-second TTL cache answers repeat requests for the same "EXCHANGE:SYMBOL" key.
+- Cache misses from concurrent callers are collected for a short window and sent as a single
+  multi-key kite.quote() call (NSE and NFO keys mixed, up to 500 keys per call).
+- Broker calls draw from a token bucket sized to the quote API's per-second budget, so bursts
+  wait for a token instead of hitting the broker's rate limit.
+Counters (calls saved, throttled calls, wait time) are exposed via stats() so the number of
+sessions one API key can carry can be sized from real traffic.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+MAX_KEYS_PER_CALL = 500  # Kite quote API limit
+QUOTE_RATE_PER_SEC = float(os.getenv("QUOTE_RATE_PER_SEC", "1") or 1)
+QUOTE_TTL_SEC = float(os.getenv("QUOTE_TTL_SEC", "0.5") or 0.5)
+QUOTE_BATCH_WINDOW_SEC = float(os.getenv("QUOTE_BATCH_WINDOW_SEC", "0.02") or 0.02)
+
+
+def quote_key(symbol: str, exchange: str = "NSE") -> str:
+    """Kite quote key, e.g. NSE:RELIANCE or NFO:NIFTY2421522000CE (symbol may already carry the exchange)."""
+    symbol = (symbol or "").strip().upper()
+    if ":" in symbol:
+        return symbol
+    return f"{(exchange or 'NSE').strip().upper()}:{symbol}"
+
+
+class TokenBucket:
+    """Classic token bucket: rate tokens per second, at most capacity stored."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = max(1e-6, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.keys: set[str] = set()
+        self.callers = 0
+        self.done = threading.Event()
+        self.result: dict[str, Any] = {}
+        self.error: Exception | None = None
+
+
+class QuoteGateway:
+    """Coalescing, rate-limited, TTL-cached front for kite.quote()."""
+
+    def __init__(
+        self,
+        fetch_fn: Callable[[list[str]], dict[str, Any]],
+        *,
+        ttl_sec: float = QUOTE_TTL_SEC,
+        window_sec: float = QUOTE_BATCH_WINDOW_SEC,
+        rate_per_sec: float = QUOTE_RATE_PER_SEC,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._fetch = fetch_fn
+        self.ttl_sec = ttl_sec
+        self.window_sec = window_sec
+        self._clock = clock
+        self._bucket = TokenBucket(rate_per_sec, burst, clock=clock)
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[float, Any]] = {}
+        self._open: _Batch | None = None  # collecting keys
+        self._in_flight: dict[str, _Batch] = {}  # key -> batch already sent to the broker
+        self._counters = {
+            "requests": 0,
+            "keys_requested": 0,
+            "cache_hits": 0,
+            "broker_calls": 0,
+            "broker_keys": 0,
+            "throttled_calls": 0,
+            "throttle_wait_sec": 0.0,
+            "errors": 0,
+        }
+
+    def get_many(self, keys: Iterable[str], timeout: float | None = 10.0) -> dict[str, Any]:
+        """Raw kite.quote() entries for keys (missing keys are absent). Raises on broker errors."""
+        wanted = list(dict.fromkeys(k for k in keys if k))
+        if not wanted:
+            return {}
+        now = self._clock()
+        out: dict[str, Any] = {}
+        waits: list[_Batch] = []
+        lead: _Batch | None = None
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["keys_requested"] += len(wanted)
+            missing = []
+            for key in wanted:
+                cached = self._cache.get(key)
+                if cached is not None and now - cached[0] <= self.ttl_sec:
+                    out[key] = cached[1]
+                    self._counters["cache_hits"] += 1
+                elif key in self._in_flight:
+                    waits.append(self._in_flight[key])
+                else:
+                    missing.append(key)
+            if missing:
+                if self._open is None:
+                    self._open = lead = _Batch()
+                batch = self._open
+                batch.keys.update(missing)
+                batch.callers += 1
+                waits.append(batch)
+        if lead is not None:
+            self._dispatch(lead)
+        for batch in dict.fromkeys(waits):
+            if not batch.done.wait(timeout):
+                raise TimeoutError("quote batch timed out")
+            if batch.error is not None:
+                raise batch.error
+            for key in wanted:
+                if key in batch.result and key not in out:
+                    out[key] = batch.result[key]
+        return out
+
+    def get(self, key: str, timeout: float | None = 10.0) -> Any:
+        return self.get_many([key], timeout=timeout).get(key)
+
+    def _dispatch(self, batch: _Batch) -> None:
+        """Leader: let concurrent callers join for window_sec, then send one broker call per 500 keys."""
+        if self.window_sec > 0:
+            time.sleep(self.window_sec)
+        with self._lock:
+            if self._open is batch:
+                self._open = None
+            keys = sorted(batch.keys)
+            for key in keys:
+                self._in_flight[key] = batch
+        try:
+            for i in range(0, len(keys), MAX_KEYS_PER_CALL):
+                chunk = keys[i:i + MAX_KEYS_PER_CALL]
+                waited = self._bucket.acquire()
+                raw = self._fetch(chunk) or {}
+                with self._lock:
+                    self._counters["broker_calls"] += 1
+                    self._counters["broker_keys"] += len(chunk)
+                    if waited > 0:
+                        self._counters["throttled_calls"] += 1
+                        self._counters["throttle_wait_sec"] += waited
+                    fetched_at = self._clock()
+                    for key, value in raw.items():
+                        self._cache[key] = (fetched_at, value)
+                batch.result.update(raw)
+        except Exception as e:
+            batch.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            logger.warning("[QUOTES] Batch of %s keys failed: %s", len(keys), str(e))
+        finally:
+            with self._lock:
+                for key in keys:
+                    if self._in_flight.get(key) is batch:
+                        del self._in_flight[key]
+                self._prune_cache()
+            batch.done.set()
+
+    def _prune_cache(self) -> None:
+        if len(self._cache) < 4 * MAX_KEYS_PER_CALL:
+            return
+        cutoff = self._clock() - self.ttl_sec
+        for key in [k for k, (at, _) in self._cache.items() if at < cutoff]:
+            del self._cache[key]
+
+    def stats(self) -> dict[str, Any]:
+        """Counters; calls_saved = quote requests that did not need their own broker call."""
+        with self._lock:
+            c = dict(self._counters)
+        c["calls_saved"] = max(0, c["requests"] - c["broker_calls"])
+        c["throttle_wait_sec"] = round(c["throttle_wait_sec"], 3)
+        c["avg_keys_per_call"] = round(c["broker_keys"] / c["broker_calls"], 2) if c["broker_calls"] else 0.0
+        c["rate_per_sec"] = self._bucket.rate
+        return c
+
+
+def _kite_quote(keys: list[str]) -> dict[str, Any]:
+    from engine.zerodha_client import _get_kite
+
+    kite = _get_kite()
+    if not kite:
+        return {}
+    return kite.quote(keys) or {}
+
+
+_gateway: QuoteGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def get_quote_gateway() -> QuoteGateway:
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = QuoteGateway(_kite_quote)
+        return _gateway
+
+
+def set_quote_gateway(gateway: QuoteGateway | None) -> None:
+    """Install a gateway (tests / replay); None resets to the default on next use."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
@@ -0,0 +1,333 @@
+"""
+Streaming market regimes for a watchlist (the liquid F&O stocks).
+
+For every instrument and timeframe (1m, 5m, 15m) the service keeps the streaming state of
+engine.market_state's metrics (engine.indicators ADX + Wilder ATR, volume ratio, EMA 10/30 trend
+bias) and advances it by one bar as each bar closes, instead of recomputing them over candle
+windows. 15m bars are built from closed 5m bars. After each batch of closed bars the regime of the
+whole watchlist is classified in one vectorized pass (market_state.classify_regimes over a
+timeframe x instrument x metric array) and published as a fresh table: readers (get_suggested_algos,
+the tick engine, the API) never take a lock and never recompute indicators.
+
+Bars come from the tick stream (a bar-close listener) and from REST candles via refresh(), which
+feeds only closed bars newer than the last one seen and skips series that are already current, so
+the streamed and REST paths can run side by side. An instrument enters the table once every
+timeframe has MIN_BARS bars (detect_market_state's minimum).
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from engine import indicators
+from engine.market_state import classify_regimes, is_tradable_regime
+from engine.sim_clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+TIMEFRAMES = ("1m", "5m", "15m")
+TIMEFRAME_SECONDS = {"1m": 60, "5m": 300, "15m": 900}
+METRIC_FIELDS = ("adx", "atr_pct", "volume_ratio", "trend_bias")
+MIN_BARS = 20
+REGIME_REFRESH_SEC = float(os.getenv("REGIME_REFRESH_SEC", "60") or 60)
+# REST history for a cold series (15m is derived from 5m); covers MIN_BARS 15m bars before 10:15.
+REGIME_HISTORY_PERIOD = "5d"
+
+_TF_INDEX = {tf: i for i, tf in enumerate(TIMEFRAMES)}
+
+
+def _bar_epoch(value: Any) -> int | None:
+    """Bar start as epoch seconds from an epoch number, datetime/Timestamp or ISO string (naive = IST)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if hasattr(value, "to_pydatetime"):
+        value = value.to_pydatetime()
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=IST)
+    return int(value.timestamp())
+
+
+def _field(bar: dict[str, Any], name: str) -> float:
+    value = bar.get(name)
+    if value is None:
+        value = bar.get(name.capitalize())
+    return float(value or 0.0)
+
+
+class _SeriesState:
+    """Streaming market_state metrics of one instrument/timeframe, one closed bar at a time."""
+
+    __slots__ = ("adx", "volume", "fast", "slow", "last_start")
+
+    def __init__(self) -> None:
+        self.adx = indicators.ADX(14)
+        self.volume = indicators.VolumeRatio(20)
+        self.fast = indicators.EMA(10)
+        self.slow = indicators.EMA(30)
+        self.last_start: int | None = None
+
+    def update(self, start: int, high: float, low: float, close: float, volume: float) -> tuple[float, float, float, float] | None:
+        """Advance by one closed bar; None (ignored) when the bar is not newer than the last one."""
+        if self.last_start is not None and start <= self.last_start:
+            return None
+        self.last_start = start
+        adx = self.adx.update(high, low, close)
+        vol_ratio = self.volume.update(volume)
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        atr_pct = self.adx.atr / close * 100.0 if close else 0.0
+        bias = (fast - slow) / close if close else 0.0
+        if not math.isfinite(atr_pct):
+            atr_pct = 0.0
+        if not math.isfinite(bias):
+            bias = 0.0
+        return adx, atr_pct, vol_ratio, max(-0.02, min(0.02, bias)) / 0.02
+
+
+class RegimeService:
+    """Per-instrument incremental regime metrics for a fixed watchlist and the published regime table."""
+
+    def __init__(self, symbols: Iterable[str], *, min_bars: int = MIN_BARS) -> None:
+        self.symbols = list(dict.fromkeys((s or "").strip().upper() for s in symbols if (s or "").strip()))
+        self.min_bars = min_bars
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self._series = {(s, tf): _SeriesState() for s in self.symbols for tf in TIMEFRAMES}
+        self._metrics = np.zeros((len(TIMEFRAMES), n, len(METRIC_FIELDS)), dtype=np.float64)
+        self._bars = np.zeros((len(TIMEFRAMES), n), dtype=np.int64)
+        self._pending_15m: dict[str, dict[str, Any]] = {}
+        self._fetched: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()  # writers only (ticker thread, refresher); readers use _table
+        self._table: dict[str, dict[str, Any]] = {}
+        self.evaluations = 0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- Feeding bars ---
+
+    def _apply(self, symbol: str, interval: str, start: int, bar: dict[str, Any]) -> bool:
+        high, low, close, volume = (_field(bar, k) for k in ("high", "low", "close", "volume"))
+        values = self._series[(symbol, interval)].update(start, high, low, close, volume)
+        if values is None:
+            return False
+        tf, i = _TF_INDEX[interval], self._index[symbol]
+        self._metrics[tf, i] = values
+        self._bars[tf, i] += 1
+        if interval == "5m":
+            ohlcv = {"open": _field(bar, "open"), "high": high, "low": low, "close": close, "volume": volume}
+            self._roll_15m(symbol, start, ohlcv)
+        return True
+
+    def _roll_15m(self, symbol: str, start: int, bar: dict[str, float]) -> None:
+        """Merge a closed 5m bar into its 15m bucket; the bucket closes with its third 5m bar or
+        when a 5m bar of a later bucket arrives (missing bars)."""
+        bucket = start // 900 * 900
+        pending = self._pending_15m.get(symbol)
+        if pending is not None and pending["start"] != bucket:
+            self._apply(symbol, "15m", pending["start"], pending)
+            pending = None
+        if pending is None:
+            pending = {"start": bucket, **bar}
+        else:
+            pending["high"] = max(pending["high"], bar["high"])
+            pending["low"] = min(pending["low"], bar["low"])
+            pending["close"] = bar["close"]
+            pending["volume"] += bar["volume"]
+        if start - bucket >= 600:
+            self._pending_15m.pop(symbol, None)
+            self._apply(symbol, "15m", bucket, pending)
+        else:
+            self._pending_15m[symbol] = pending
+
+    def update_bar(self, symbol: str, interval: str, bar: dict[str, Any]) -> bool:
+        """Feed one closed 1m or 5m bar ({"start" or "date", open, high, low, close, volume}).
+        Returns False for unknown symbols/intervals and bars not newer than the last one fed.
+        Call evaluate() to republish the table."""
+        symbol = (symbol or "").strip().upper()
+        if symbol not in self._index or interval not in ("1m", "5m"):
+            return False
+        start = _bar_epoch(bar.get("start", bar.get("date", bar.get("Datetime"))))
+        if start is None:
+            return False
+        with self._lock:
+            return self._apply(symbol, interval, start, bar)
+
+    def on_bars(self, bars: Iterable[tuple[str, str, str, dict[str, Any]]]) -> int:
+        """Tick-stream bar-close listener: feed a batch of (symbol, exchange, interval, bar) and
+        re-evaluate the watchlist once if any bar was new. Returns the number of bars applied."""
+        applied = sum(1 for symbol, _exchange, interval, bar in bars if self.update_bar(symbol, interval, bar))
+        if applied:
+            self.evaluate()
+        return applied
+
+    def feed_candles(self, symbol: str, interval: str, candles: Any, now: float | None = None) -> int:
+        """Feed the closed bars of a candle list or OHLC DataFrame (the forming bar is skipped)."""
+        if candles is None:
+            return 0
+        if hasattr(candles, "to_dict"):
+            candles = candles.to_dict("records")
+        now = get_clock().time() if now is None else now
+        seconds = TIMEFRAME_SECONDS[interval]
+        applied = 0
+        for bar in candles:
+            start = _bar_epoch(bar.get("start", bar.get("date", bar.get("Datetime"))))
+            if start is None or start + seconds > now:
+                continue
+            applied += self.update_bar(symbol, interval, {**bar, "start": start})
+        return applied
+
+    def refresh(self, fetch: Callable[[str, str], Any] | None = None, now: float | None = None) -> int:
+        """
+        Bring every series up to the last closed bar from REST candles, then re-evaluate.
+        A series is fetched at most once per bar interval and only when its last bar is older
+        than the last closed bar (streamed series are skipped). fetch(symbol, interval) returns
+        candles or an OHLC DataFrame; defaults to data_fetcher.fetch_nse_ohlc.
+        """
+        if fetch is None:
+            from engine.data_fetcher import fetch_nse_ohlc
+
+            def fetch(symbol: str, interval: str) -> Any:
+                return fetch_nse_ohlc(symbol, interval, REGIME_HISTORY_PERIOD)
+
+        now = get_clock().time() if now is None else now
+        applied = 0
+        for symbol in self.symbols:
+            for interval in ("1m", "5m"):
+                seconds = TIMEFRAME_SECONDS[interval]
+                last_closed = int(now // seconds * seconds) - seconds
+                series = self._series[(symbol, interval)]
+                if series.last_start is not None and series.last_start >= last_closed:
+                    continue
+                if self._fetched.get((symbol, interval), -1.0) >= last_closed + seconds:
+                    continue  # already asked the broker since this bar closed
+                self._fetched[(symbol, interval)] = now
+                try:
+                    applied += self.feed_candles(symbol, interval, fetch(symbol, interval), now=now)
+                except Exception as e:
+                    logger.warning("[REGIME] Candle fetch failed | %s %s | %s", symbol, interval, str(e))
+        self.evaluate()
+        return applied
+
+    # --- Evaluation / publishing ---
+
+    def evaluate(self) -> dict[str, dict[str, Any]]:
+        """Classify every ready instrument in one vectorized pass and publish the table."""
+        with self._lock:
+            ready = np.flatnonzero((self._bars >= self.min_bars).all(axis=0))
+            metrics = self._metrics[:, ready, :].copy()
+            last_start = {s: self._series[(s, "1m")].last_start for s in (self.symbols[i] for i in ready)}
+            self.evaluations += 1
+        table: dict[str, dict[str, Any]] = {}
+        if len(ready):
+            regimes, quality, weighted = classify_regimes(metrics)
+            updated_at = get_clock().now().isoformat()
+            for k, i in enumerate(ready):
+                symbol = self.symbols[i]
+                q = float(quality[k])
+                bar_start = last_start[symbol]
+                table[symbol] = {
+                    "symbol": symbol,
+                    "regime": regimes[k],
+                    "quality_score": q,
+                    "tradable": is_tradable_regime(regimes[k], q),
+                    **{f"{name}_weighted": float(weighted[k, j]) for j, name in enumerate(METRIC_FIELDS)},
+                    "timeframes": {
+                        tf: {name: float(metrics[t, k, j]) for j, name in enumerate(METRIC_FIELDS)}
+                        for t, tf in enumerate(TIMEFRAMES)
+                    },
+                    "bar_time": datetime.fromtimestamp(bar_start + 60, IST).isoformat() if bar_start is not None else None,
+                    "updated_at": updated_at,
+                }
+        self._table = table
+        return table
+
+    def table(self) -> dict[str, dict[str, Any]]:
+        """Latest published regime table (symbol -> row). Do not mutate."""
+        return self._table
+
+    def regime(self, symbol: str) -> dict[str, Any] | None:
+        return self._table.get((symbol or "").strip().upper())
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            bars = {tf: int(self._bars[t].min()) if self.symbols else 0 for t, tf in enumerate(TIMEFRAMES)}
+        return {
+            "symbols": len(self.symbols),
+            "ready": len(self._table),
+            "min_bars": bars,
+            "evaluations": self.evaluations,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+    # --- Background refresh ---
+
+    def start(self) -> None:
+        """Refresh from REST every REGIME_REFRESH_SEC in a daemon thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="regime_service", daemon=True)
+        self._thread.start()
+        logger.info("[REGIME] Service started | %s symbols | refresh every %.0fs", len(self.symbols), REGIME_REFRESH_SEC)
+
+    def stop(self, timeout: float = 3.0) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.exception("[REGIME] Refresh loop error: %s", str(e))
+            self._stop_event.wait(REGIME_REFRESH_SEC)
+
+
+_service: RegimeService | None = None
+
+
+def _on_bar_close(bars: list[tuple[str, str, str, dict[str, Any]]]) -> None:
+    service = _service
+    if service is not None:
+        service.on_bars(bars)
+
+
+def get_regime_service() -> RegimeService | None:
+    return _service
+
+
+def set_regime_service(service: RegimeService | None) -> None:
+    """Install the process-wide service (app startup / tests) and route streamed bar closes to it;
+    None removes it."""
+    global _service
+    from engine.tick_stream import add_bar_close_listener
+
+    _service = service
+    add_bar_close_listener(_on_bar_close)
+
+
+def get_regime(symbol: str) -> dict[str, Any] | None:
+    """Published regime row for symbol, or None (no service, unknown symbol or not enough bars)."""
+    service = _service
+    return service.regime(symbol) if service is not None else None
@@ -0,0 +1,238 @@
+"""
+Incremental trade-session persistence.
+
+Saving no longer rewrites trade_sessions.json / trade_sessions_history.json on the caller's
+thread. request_save() only flags the store; a background writer wakes after a short coalescing
+window, serialises the sessions (briefly under the sessions lock), and appends just the sessions
+whose content changed since the last write to a change log (one JSON line per session, deletions
+included). The log is folded into the two snapshot files (atomic replace) once it grows, when the
+IST day rolls over (so yesterday's sessions move to the history file) and at shutdown.
+
+Startup recovery reads the snapshots and replays the change log on top; a partially written
+last log line is ignored.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from engine.tick_profiler import profile_stage
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# ALL SESSION MUTATIONS REQUIRE LOCK
+
+
+def session_key(session: dict[str, Any], index: int = 0) -> str:
+    return str(session.get("sessionId") or session.get("session_id") or f"_unkeyed_{index}")
+
+
+def _read_snapshot(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        sessions = data.get("sessions") if isinstance(data, dict) else []
+        return [s for s in sessions if isinstance(s, dict)] if isinstance(sessions, list) else []
+    except Exception:
+        return []
+
+
+def _write_snapshot(path: Path, sessions: list[dict[str, Any]]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"sessions": sessions, "updatedAt": datetime.now().isoformat()}, f, indent=2)
+    os.replace(tmp, path)
+
+
+class SessionStore:
+    """Dirty-tracking session persistence with a coalescing background writer."""
+
+    def __init__(
+        self,
+        *,
+        today_file: Path,
+        history_file: Path,
+        get_sessions_fn: Callable[[], list[dict[str, Any]]],
+        sessions_lock: Any,
+        is_history_fn: Callable[[dict[str, Any], date], bool],
+        changes_file: Path | None = None,
+        coalesce_seconds: float = 0.5,
+        compact_after: int = 500,
+    ) -> None:
+        self.today_file = Path(today_file)
+        self.history_file = Path(history_file)
+        self.changes_file = Path(changes_file) if changes_file else self.today_file.with_name("trade_sessions.changes.jsonl")
+        self._get_sessions = get_sessions_fn
+        self._sessions_lock = sessions_lock
+        self._is_history = is_history_fn
+        self._coalesce = max(0.0, coalesce_seconds)
+        self._compact_after = max(1, compact_after)
+        self._written: dict[str, str] = {}  # session key -> JSON last persisted
+        self._log_lines = 0
+        self._compacted_day: date | None = None
+        self._recovery_needs_compaction = True
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self.stats = {"save_requests": 0, "writes": 0, "sessions_written": 0, "deletes_written": 0, "compactions": 0}
+
+    # --- Recovery ---
+
+    def load(self) -> list[dict[str, Any]]:
+        """Sessions from today + history snapshots with the change log replayed on top."""
+        by_key: dict[str, dict[str, Any]] = {}
+        today_snapshot = _read_snapshot(self.today_file)
+        for i, s in enumerate(today_snapshot + _read_snapshot(self.history_file)):
+            by_key.setdefault(session_key(s, i), s)
+        today = datetime.now(IST).date()
+        self._recovery_needs_compaction = (
+            not self.today_file.exists()
+            or not self.history_file.exists()
+            or any(self._is_history(s, today) for s in today_snapshot)
+        )
+        replayed = 0
+        if self.changes_file.exists():
+            with open(self.changes_file, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        continue
+                    key = str(change.get("id") or "")
+                    if not key:
+                        continue
+                    if change.get("deleted"):
+                        by_key.pop(key, None)
+                    elif isinstance(change.get("session"), dict):
+                        by_key[key] = change["session"]
+                    replayed += 1
+        if replayed:
+            logger.info("[SESSION STORE] Replayed %s session changes", replayed)
+            self._recovery_needs_compaction = True
+        return list(by_key.values())
+
+    def finish_recovery(self) -> None:
+        """
+        Start dirty tracking from the recovered sessions. The snapshots are rewritten only when the
+        change log had entries, a snapshot file is missing, or the today file holds older sessions.
+        """
+        with self._io_lock:
+            if self._recovery_needs_compaction:
+                self._write_changes(force_compact=True)
+                return
+            with self._sessions_lock:
+                sessions = self._get_sessions()
+                self._written = {session_key(s, i): json.dumps(s, default=str, separators=(",", ":")) for i, s in enumerate(sessions)}
+            self._compacted_day = datetime.now(IST).date()
+
+    # --- Save path ---
+
+    def request_save(self) -> None:
+        """Mark sessions as possibly changed; the background writer persists them shortly."""
+        self.stats["save_requests"] += 1
+        self._ensure_thread()
+        self._wake.set()
+
+    def flush(self) -> int:
+        """Synchronously persist pending changes. Returns the number of sessions written or deleted."""
+        with self._io_lock, profile_stage("persist"):
+            return self._write_changes()
+
+    def compact(self) -> None:
+        """Persist everything into the today/history snapshots and clear the change log."""
+        with self._io_lock:
+            self._write_changes(force_compact=True)
+
+    def start(self) -> None:
+        self._ensure_thread()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake.set()
+        thread = self._thread
+        if thread and thread.is_alive():
+            thread.join(timeout=5)
+        try:
+            self.compact()
+        except Exception as e:
+            logger.exception("[SESSION STORE] Final compaction failed: %s", str(e))
+
+    def _ensure_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="session_store_writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake.wait()
+            if self._stop_event.is_set():
+                return
+            # Coalesce bursts (tick merge + trailing sync + API edits) into one write.
+            self._stop_event.wait(self._coalesce)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("[SESSION STORE] Write failed: %s", str(e))
+
+    def _write_changes(self, force_compact: bool = False) -> int:
+        with self._sessions_lock:
+            sessions = self._get_sessions()
+            current = {session_key(s, i): json.dumps(s, default=str, separators=(",", ":")) for i, s in enumerate(sessions)}
+        changed = [k for k, text in current.items() if self._written.get(k) != text]
+        deleted = [k for k in self._written if k not in current]
+        if (changed or deleted) and not force_compact:
+            self.changes_file.parent.mkdir(parents=True, exist_ok=True)
+            lines = [f'{{"id":{json.dumps(k)},"session":{current[k]}}}\n' for k in changed]
+            lines += [f'{{"id":{json.dumps(k)},"deleted":true}}\n' for k in deleted]
+            with open(self.changes_file, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self._log_lines += len(lines)
+            self.stats["writes"] += 1
+            self.stats["sessions_written"] += len(changed)
+            self.stats["deletes_written"] += len(deleted)
+        self._written = current
+        today = datetime.now(IST).date()
+        if force_compact or self._log_lines >= self._compact_after or self._compacted_day != today:
+            self._compact(current, today)
+        return len(changed) + len(deleted)
+
+    def _compact(self, current: dict[str, str], today: date) -> None:
+        today_sessions: list[dict[str, Any]] = []
+        history_sessions: list[dict[str, Any]] = []
+        for text in current.values():
+            s = json.loads(text)
+            (history_sessions if self._is_history(s, today) else today_sessions).append(s)
+        self.today_file.parent.mkdir(parents=True, exist_ok=True)
+        # The change log is only cleared after both replaces, so a crash in between is repaired
+        # by replaying it on the next load().
+        _write_snapshot(self.history_file, history_sessions)
+        _write_snapshot(self.today_file, today_sessions)
+        with open(self.changes_file, "w", encoding="utf-8"):
+            pass
+        self._log_lines = 0
+        self._compacted_day = today
+        self.stats["compactions"] += 1
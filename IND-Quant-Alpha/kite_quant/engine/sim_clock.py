@@ -0,0 +1,79 @@
+"""
+Process clock used by paper execution and the tick store.
+
+WallClock is the default (real time, real sleeps). Replays install a VirtualClock: time moves only
+when the replay driver advances it, and sleep() records the simulated latency without blocking, so
+a whole trading day runs in seconds and produces the same timestamps on every run.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+class WallClock:
+    """Real time."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now(IST)
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Replay time. advance()/advance_to() move it; sleep() only accounts the simulated delay."""
+
+    def __init__(self, start: datetime | float) -> None:
+        self._epoch = start.timestamp() if isinstance(start, datetime) else float(start)
+        self._lock = threading.Lock()
+        self.slept_sec = 0.0
+        self.sleeps = 0
+
+    def time(self) -> float:
+        return self._epoch
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._epoch, IST)
+
+    def sleep(self, seconds: float) -> None:
+        # Sessions evaluated concurrently in one engine tick all see the tick's time; moving the
+        # clock here would make timestamps depend on thread scheduling.
+        with self._lock:
+            self.slept_sec += max(0.0, float(seconds))
+            self.sleeps += 1
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self._epoch += max(0.0, float(seconds))
+
+    def advance_to(self, when: datetime | float) -> None:
+        epoch = when.timestamp() if isinstance(when, datetime) else float(when)
+        with self._lock:
+            self._epoch = max(self._epoch, epoch)
+
+
+_clock: Any = WallClock()
+
+
+def get_clock() -> Any:
+    return _clock
+
+
+def set_clock(clock: Any | None) -> None:
+    """Install a clock (replay / tests); None restores wall time."""
+    global _clock
+    _clock = clock if clock is not None else WallClock()
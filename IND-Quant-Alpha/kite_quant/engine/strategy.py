@@ -10,6 +10,7 @@ from typing import Any
 import pandas as pd
 
 from . import data_fetcher
+from . import indicators
 
 
 class Signal(str, Enum):
@@ -41,45 +42,22 @@ def compute_us_bias() -> USBias:
     return USBias(prev, pct, bias, block, date_str)
 
 
-def _rsi(series: pd.Series, period: int = 14) -> pd.Series:
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
-    avg_gain = gain.ewm(alpha=1 / period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / period, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, float("nan"))
-    return 100 - (100 / (1 + rs))
-
-
-def _ema(series: pd.Series, period: int) -> pd.Series:
-    return series.ewm(span=period, adjust=False).mean()
-
-
-def _vwap_from_ohlc(df: pd.DataFrame) -> pd.Series:
-    if "Volume" not in df.columns or df["Volume"].sum() == 0:
-        typical = (df["High"] + df["Low"] + df["Close"]) / 3
-        return typical
-    typical = (df["High"] + df["Low"] + df["Close"]) / 3
-    return (typical * df["Volume"]).cumsum() / df["Volume"].cumsum()
-
-
 def compute_technicals(df: pd.DataFrame) -> dict[str, Any]:
     """RSI, EMA9, EMA15, VWAP, and price vs EMAs."""
     if df.empty or len(df) < 20:
         return {}
     close = df["Close"] if "Close" in df.columns else df["close"]
-    close = pd.Series(close).astype(float)
-    rsi = _rsi(close, 14)
-    ema9 = _ema(close, 9)
-    ema15 = _ema(close, 15)
-    last = close.iloc[-1]
+    close = pd.Series(close).astype(float).to_numpy()
+    rsi = indicators.rsi(close, 14)
+    ema9 = indicators.ema(close, 9)
+    ema15 = indicators.ema(close, 15)
     return {
-        "rsi": float(rsi.iloc[-1]) if len(rsi) else None,
-        "ema9": float(ema9.iloc[-1]) if len(ema9) else None,
-        "ema15": float(ema15.iloc[-1]) if len(ema15) else None,
-        "price": float(last),
-        "ema9_cross_up": bool(ema9.iloc[-1] > ema15.iloc[-1] and len(ema9) > 1 and ema9.iloc[-2] <= ema15.iloc[-2]) if len(ema9) > 1 else False,
-        "ema9_cross_down": bool(ema9.iloc[-1] < ema15.iloc[-1] and len(ema9) > 1 and ema9.iloc[-2] >= ema15.iloc[-2]) if len(ema9) > 1 else False,
+        "rsi": float(rsi[-1]),
+        "ema9": float(ema9[-1]),
+        "ema15": float(ema15[-1]),
+        "price": float(close[-1]),
+        "ema9_cross_up": bool(ema9[-1] > ema15[-1] and ema9[-2] <= ema15[-2]),
+        "ema9_cross_down": bool(ema9[-1] < ema15[-1] and ema9[-2] >= ema15[-2]),
     }
 
 
@@ -0,0 +1,325 @@
+"""
+Event-driven session tick engine.
+
+Each engine tick fans the ACTIVE sessions out over a worker pool so one slow broker/candle/GPT
+call no longer delays every other session:
+- Each session is evaluated on a private copy with its own deadline; the global sessions lock is
+  taken only to snapshot the session and to apply the changed keys back (commit).
+- The commit is a three-way merge against the snapshot, so changes made meanwhile by API handlers
+  or the trailing-stop sync (also nested ones, e.g. current_trade.trailing_stop) are kept. If the
+  session was stopped meanwhile, the tick result is discarded; a trade the tick opened is recorded
+  on the stopped session and closed through on_orphaned_trade after the lock is released.
+- Market data used by several sessions in the same tick (candles, quotes, index levels, balance)
+  is fetched once per tick through the active TickScope and shared (single-flight). The scope is a
+  ContextVar carried into the tick's workers, so API handlers and other engines never see it.
+- A session still being evaluated when the next tick starts is skipped, never run twice.
+- With ENGINE_PROFILING on, each session's evaluation and commit are timed by engine.tick_profiler.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import copy
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Hashable
+
+from engine.tick_profiler import get_tick_profiler
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Set on a stopped session while the trade its last tick opened is being closed.
+ORPHANED_EXIT_PENDING = "orphaned_exit_pending"
+
+
+class TickScope:
+    """Per-tick shared market data. get() loads each key once; concurrent callers wait for the first."""
+
+    def __init__(self, tick_id: int) -> None:
+        self.tick_id = tick_id
+        self._lock = threading.Lock()
+        self._values: dict[Hashable, Any] = {}
+        self._pending: dict[Hashable, threading.Event] = {}
+        self.loads = 0
+        self.shared = 0
+        self.counters: dict[str, int] = {}
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Per-tick counter reported in last_tick_stats (e.g. market snapshot hits/misses)."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                value = self._values.get(key, _MISSING)
+                if value is not _MISSING:
+                    self.shared += 1
+                    return value
+                event = self._pending.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._pending[key] = event
+                    break
+            # Another session is loading this key: wait for it, then re-check (it may have failed).
+            event.wait()
+        try:
+            value = loader()
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+            raise
+        with self._lock:
+            self._values[key] = value
+            self._pending.pop(key, None)
+            self.loads += 1
+        event.set()
+        return value
+
+
+_current_scope: contextvars.ContextVar[TickScope | None] = contextvars.ContextVar("tick_scope", default=None)
+_engines: "weakref.WeakSet[SessionTickEngine]" = weakref.WeakSet()
+
+
+def current_tick_scope() -> TickScope | None:
+    """The TickScope of the engine tick this code runs for, or None (API handlers, other threads)."""
+    return _current_scope.get()
+
+
+def _merge_value(live: Any, before: Any, after: Any, path: str, changed: list[str], conflicts: list[str]) -> Any:
+    """Three-way merge of one value; returns the value to keep on the live session."""
+    if after == before:
+        return live
+    if live == before:
+        changed.append(path)
+        return after
+    if isinstance(live, dict) and isinstance(before, dict) and isinstance(after, dict):
+        merged = dict(live)
+        for key in set(before) | set(after):
+            sub_path = f"{path}.{key}"
+            value = _merge_value(live.get(key, _MISSING), before.get(key, _MISSING), after.get(key, _MISSING),
+                                 sub_path, changed, conflicts)
+            if value is _MISSING:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+        return merged
+    if isinstance(before, dict) != isinstance(after, dict):
+        # The tick itself opened or closed the trade (a broker order was placed): that outcome must stand
+        changed.append(path)
+        conflicts.append(path)
+        return after
+    # Both sides set the same field (e.g. trailing_stop): the live value is the newer one
+    conflicts.append(path)
+    return live
+
+
+def apply_session_changes(
+    live: dict[str, Any], before: dict[str, Any], after: dict[str, Any]
+) -> tuple[list[str], list[str]]:
+    """
+    Merge a tick worker's result (before -> after) into the live session dict.
+
+    Keys (and nested dict fields) changed meanwhile by API handlers or the trailing-stop sync,
+    but not by the tick, are kept. When both changed the same field the live value wins, except
+    when the tick opened or closed a trade (dict <-> None), which always applies.
+
+    Returns:
+        (changed paths, conflicting paths) - paths like "current_trade.trailing_stop".
+    """
+    changed: list[str] = []
+    conflicts: list[str] = []
+    for key in set(before) | set(after):
+        value = _merge_value(live.get(key, _MISSING), before.get(key, _MISSING), after.get(key, _MISSING),
+                             key, changed, conflicts)
+        if value is _MISSING:
+            live.pop(key, None)
+        else:
+            live[key] = value
+    return changed, conflicts
+
+
+def stopped_during_tick(live: dict[str, Any], before: dict[str, Any]) -> bool:
+    """True when the session was ACTIVE at the snapshot and was stopped (API kill, cutoff) before commit."""
+    return before.get("status") == "ACTIVE" and live.get("status") != "ACTIVE"
+
+
+class SessionTickEngine:
+    """Runs one evaluation per ACTIVE session per tick on a thread pool, with per-session deadlines."""
+
+    def __init__(
+        self,
+        *,
+        sessions_lock: Any,
+        save_sessions_fn: Callable[[], None],
+        max_workers: int = 16,
+        session_deadline_sec: float = 50.0,
+        on_orphaned_trade: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        """
+        on_orphaned_trade(session) is called when the session was stopped during evaluation but the
+        tick opened a trade; it gets a private copy with that trade attached (sessions lock not held)
+        and should exit it. Its changes are merged back like a tick result.
+        """
+        self._sessions_lock = sessions_lock
+        self._save_sessions = save_sessions_fn
+        self._on_orphaned_trade = on_orphaned_trade
+        self._deadline = max(1.0, float(session_deadline_sec))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="session_tick")
+        self._in_flight: set[str] = set()
+        self._in_flight_lock = threading.Lock()
+        self._tick_id = 0
+        self.last_tick_monotonic: float | None = None
+        self.last_tick_stats: dict[str, Any] = {}
+        _engines.add(self)
+
+    @staticmethod
+    def _session_key(session: dict[str, Any]) -> str:
+        return str(session.get("sessionId") or id(session))
+
+    def _evaluate(
+        self,
+        key: str,
+        live: dict[str, Any],
+        evaluate: Callable[[dict[str, Any]], None],
+    ) -> float:
+        started = time.perf_counter()
+        profiler = get_tick_profiler()
+        try:
+            with profiler.session_scope(key):
+                with self._sessions_lock:
+                    before = copy.deepcopy(live)
+                work = copy.deepcopy(before)
+                try:
+                    evaluate(work)
+                except Exception as e:
+                    logger.exception("ENGINE TICK | session=%s | evaluation error: %s", key, str(e))
+                with profiler.stage("commit"):
+                    with self._sessions_lock:
+                        changed, orphaned = self._commit(key, live, before, work)
+                    if changed:
+                        self._save_sessions()
+                if orphaned:
+                    self._close_orphaned_trade(key, live)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(key)
+        return time.perf_counter() - started
+
+    def _commit(
+        self, key: str, live: dict[str, Any], before: dict[str, Any], work: dict[str, Any]
+    ) -> tuple[bool, bool]:
+        """
+        Apply the worker's result to the live session (sessions lock held).
+
+        Returns:
+            (live changed, trade to close via _close_orphaned_trade)
+        """
+        if stopped_during_tick(live, before):
+            opened = work.get("current_trade") if not before.get("current_trade") else None
+            logger.warning(
+                "ENGINE TICK | session=%s | stopped during evaluation (status=%s); tick result discarded%s",
+                key,
+                live.get("status"),
+                " | closing trade opened by this tick" if opened else "",
+            )
+            if not opened:
+                return False, False
+            # The broker position is real: keep it visible on the session until the exit lands
+            live["current_trade"] = opened
+            live["current_trade_id"] = work.get("current_trade_id")
+            if self._on_orphaned_trade is None:
+                return True, False
+            live[ORPHANED_EXIT_PENDING] = True
+            return True, True
+        changed, conflicts = apply_session_changes(live, before, work)
+        if conflicts:
+            logger.info("ENGINE TICK | session=%s | concurrent updates kept/resolved: %s", key, sorted(conflicts))
+        return bool(changed), False
+
+    def _close_orphaned_trade(self, key: str, live: dict[str, Any]) -> None:
+        """Run on_orphaned_trade on a private copy outside the sessions lock, then merge its result."""
+        with self._sessions_lock:
+            before = copy.deepcopy(live)
+        work = copy.deepcopy(before)
+        try:
+            self._on_orphaned_trade(work)
+        except Exception as e:
+            logger.exception("ENGINE TICK | session=%s | closing orphaned trade failed: %s", key, str(e))
+        work.pop(ORPHANED_EXIT_PENDING, None)
+        with self._sessions_lock:
+            apply_session_changes(live, before, work)
+        self._save_sessions()
+
+    def run_tick(
+        self,
+        sessions: list[dict[str, Any]],
+        evaluate: Callable[[dict[str, Any]], None],
+    ) -> dict[str, Any]:
+        """
+        Evaluate sessions concurrently inside a fresh TickScope. Waits up to the per-session
+        deadline; sessions that overrun keep running and commit when they finish.
+        """
+        self._tick_id += 1
+        self.last_tick_monotonic = time.monotonic()
+        profiler = get_tick_profiler()
+        profiler.begin_tick(self._tick_id)
+        scope = TickScope(self._tick_id)
+        started = time.perf_counter()
+        futures = {}
+        skipped = []
+        for live in sessions:
+            key = self._session_key(live)
+            with self._in_flight_lock:
+                if key in self._in_flight:
+                    skipped.append(key)
+                    continue
+                self._in_flight.add(key)
+            # One context per worker (a Context cannot be entered by two threads at once)
+            context = contextvars.copy_context()
+            context.run(_current_scope.set, scope)
+            futures[self._executor.submit(context.run, self._evaluate, key, live, evaluate)] = key
+        done, not_done = wait(futures, timeout=self._deadline)
+        timings = {futures[f]: round(f.result(), 3) for f in done if f.exception() is None}
+        overrun = sorted(futures[f] for f in not_done)
+        if skipped:
+            logger.warning("ENGINE TICK | sessions still evaluating from previous tick, skipped: %s", skipped)
+        if overrun:
+            logger.warning("ENGINE TICK | sessions exceeded %.0fs deadline (will commit on finish): %s", self._deadline, overrun)
+        self.last_tick_stats = {
+            "tick_id": self._tick_id,
+            "sessions": len(futures),
+            "completed": len(done),
+            "overrun": overrun,
+            "skipped_in_flight": skipped,
+            "duration_sec": round(time.perf_counter() - started, 3),
+            "slowest_sec": max(timings.values()) if timings else 0.0,
+            "shared_loads": scope.loads,
+            "shared_hits": scope.shared,
+            **scope.counters,
+        }
+        profiler.end_tick(self.last_tick_stats)
+        return self.last_tick_stats
+
+    def busy(self, within_sec: float) -> bool:
+        """True while sessions are in flight or when a tick started in the last within_sec seconds."""
+        with self._in_flight_lock:
+            if self._in_flight:
+                return True
+        last = self.last_tick_monotonic
+        return last is not None and time.monotonic() - last < within_sec
+
+    def shutdown(self) -> None:
+        _engines.discard(self)
+        self._executor.shutdown(wait=False)
+
+
+def busy_tick_engines(within_sec: float, exclude: SessionTickEngine | None = None) -> list[SessionTickEngine]:
+    """Engines in this process (other than exclude) that are ticking; see SessionTickEngine.busy."""
+    return [engine for engine in list(_engines) if engine is not exclude and engine.busy(within_sec)]
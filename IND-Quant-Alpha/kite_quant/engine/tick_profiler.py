@@ -0,0 +1,342 @@
+"""
+Engine tick latency profiler.
+
+Times the stages of the session engine tick (candle fetch, risk gate, strategy evaluation, AI
+calls, order placement, session commit and persistence) into fixed-bucket latency histograms:
+- stage(name) is a context manager. Inside a tick worker (session_scope) the time is also
+  attributed to that session; elsewhere (e.g. the session-store writer) it is only recorded
+  globally. Stages nest and their times are inclusive (entry_check contains its candle fetch).
+- count(name) counts events, e.g. broker API calls (broker.<method>), per tick, per session and
+  in total. profiled_client() wraps a KiteConnect client so every API call is counted and timed.
+- bind_session(func) carries the session attribution into helper threads (call_with_timeout).
+- snapshot() is the JSON behind /api/engine/metrics: per-stage count/mean/max and p50/p95/p99,
+  the slowest sessions of the last tick and overall, and call counts; prometheus() renders the same
+  data in the Prometheus text exposition format.
+Disabled (ENGINE_PROFILING unset, the default) every hook returns a shared no-op: no clock reads,
+no locks, no allocations.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+
+ENGINE_PROFILING = str(os.getenv("ENGINE_PROFILING", "0")).strip().lower() in {"1", "true", "yes", "on"}
+
+# Histogram upper bounds in seconds (Prometheus-style, cumulative on export); the last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0)
+SLOWEST_SESSIONS = 5
+
+_NULL = nullcontext()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with interpolated percentiles."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Estimate of the q-quantile (0..1), linear within the bucket and capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * max(0.0, rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class _SessionRun:
+    """One session's evaluation within a tick: inclusive stage times and event counts."""
+
+    __slots__ = ("key", "tick_id", "stages", "calls")
+
+    def __init__(self, key: str, tick_id: int) -> None:
+        self.key = key
+        self.tick_id = tick_id
+        self.stages: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+
+
+class TickProfiler:
+    """Per-stage latency histograms for the engine tick, globally and per session."""
+
+    def __init__(self, *, enabled: bool = ENGINE_PROFILING, slowest: int = SLOWEST_SESSIONS) -> None:
+        self.enabled = bool(enabled)
+        self.slowest = max(1, int(slowest))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._stages: dict[str, LatencyHistogram] = {}
+        self._session_stages: dict[str, dict[str, LatencyHistogram]] = {}
+        self._calls: dict[str, int] = {}
+        self._tick_id = 0
+        self._ticks = 0
+        self._tick_calls: dict[str, int] = {}
+        self._tick_runs: list[_SessionRun] = []
+        self._last_tick: dict[str, Any] = {}
+        self._started = time.time()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # --- Recording hooks ---
+
+    def stage(self, name: str) -> Any:
+        """Context manager timing one stage (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        run = getattr(self._local, "run", None)
+        with self._lock:
+            self._stages.setdefault(name, LatencyHistogram()).observe(seconds)
+            if run is not None:
+                run.stages[name] = run.stages.get(name, 0.0) + seconds
+                self._session_stages.setdefault(run.key, {}).setdefault(name, LatencyHistogram()).observe(seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        run = getattr(self._local, "run", None)
+        with self._lock:
+            self._calls[name] = self._calls.get(name, 0) + n
+            self._tick_calls[name] = self._tick_calls.get(name, 0) + n
+            if run is not None:
+                run.calls[name] = run.calls.get(name, 0) + n
+
+    def session_scope(self, key: str) -> Any:
+        """Attribute stages and counts on this thread to a session; times the whole evaluation."""
+        if not self.enabled:
+            return _NULL
+        return self._session(key)
+
+    @contextmanager
+    def _session(self, key: str) -> Iterator[None]:
+        run = _SessionRun(key, self._tick_id)
+        saved = getattr(self._local, "run", None)
+        self._local.run = run
+        try:
+            with self._timed("session"):
+                yield
+        finally:
+            self._local.run = saved
+            with self._lock:
+                self._tick_runs.append(run)
+
+    def bind_session(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """func, re-entering the caller's session attribution when run on another thread."""
+        run = getattr(self._local, "run", None) if self.enabled else None
+        if run is None:
+            return func
+        local = self._local
+
+        def bound(*args: Any, **kwargs: Any) -> Any:
+            saved = getattr(local, "run", None)
+            local.run = run
+            try:
+                return func(*args, **kwargs)
+            finally:
+                local.run = saved
+
+        return bound
+
+    def begin_tick(self, tick_id: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._tick_id = tick_id
+            self._tick_calls = {}
+            self._tick_runs = [r for r in self._tick_runs if r.tick_id >= tick_id]
+
+    def end_tick(self, stats: dict[str, Any]) -> None:
+        """Close a tick: record its duration and keep its slowest sessions and call counts."""
+        if not self.enabled:
+            return
+        duration = float(stats.get("duration_sec") or 0.0)
+        with self._lock:
+            self._ticks += 1
+            self._stages.setdefault("tick", LatencyHistogram()).observe(duration)
+            runs = sorted(
+                (r for r in self._tick_runs if r.tick_id == stats.get("tick_id", self._tick_id)),
+                key=lambda r: -r.stages.get("session", 0.0),
+            )
+            self._last_tick = {
+                "tick_id": stats.get("tick_id", self._tick_id),
+                "duration_ms": round(duration * 1000, 3),
+                "sessions": stats.get("sessions"),
+                "overrun": list(stats.get("overrun") or []),
+                "calls": dict(self._tick_calls),
+                "slowest_sessions": [self._run_summary(r) for r in runs[: self.slowest]],
+            }
+
+    @staticmethod
+    def _run_summary(run: _SessionRun) -> dict[str, Any]:
+        return {
+            "session": run.key,
+            "total_ms": round(run.stages.get("session", 0.0) * 1000, 3),
+            "stages_ms": {k: round(v * 1000, 3) for k, v in sorted(run.stages.items(), key=lambda kv: -kv[1]) if k != "session"},
+            "calls": dict(run.calls),
+        }
+
+    # --- Reports ---
+
+    def snapshot(self) -> dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            stages = {name: h.summary() for name, h in sorted(self._stages.items())}
+            per_session = []
+            for key, hists in self._session_stages.items():
+                total = hists.get("session")
+                if total is None or not total.count:
+                    continue
+                per_session.append({
+                    "session": key,
+                    "ticks": total.count,
+                    "p95_ms": round(total.percentile(0.95) * 1000, 3),
+                    "max_ms": round(total.max * 1000, 3),
+                    "slowest_stage": max(
+                        ((name, h.percentile(0.95)) for name, h in hists.items() if name != "session"),
+                        key=lambda kv: kv[1],
+                        default=(None, 0.0),
+                    )[0],
+                })
+            per_session.sort(key=lambda s: -s["p95_ms"])
+            return {
+                "enabled": True,
+                "since": self._started,
+                "ticks": self._ticks,
+                "stages": stages,
+                "calls": dict(sorted(self._calls.items())),
+                "broker_calls": sum(n for name, n in self._calls.items() if name.startswith("broker.")),
+                "last_tick": dict(self._last_tick),
+                "slowest_sessions": per_session[: self.slowest],
+            }
+
+    def prometheus(self, prefix: str = "engine") -> str:
+        """Prometheus text exposition (stage histograms in seconds, call counters)."""
+        lines: list[str] = []
+        with self._lock:
+            stages = {name: (list(h.counts), h.count, h.total) for name, h in sorted(self._stages.items())}
+            calls = dict(sorted(self._calls.items()))
+            ticks = self._ticks
+        lines.append(f"# HELP {prefix}_stage_seconds Engine tick stage latency.")
+        lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+        for name, (counts, count, total) in stages.items():
+            label = _label(name)
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {count}')
+        lines.append(f"# HELP {prefix}_calls_total Counted engine events (broker API calls, ...).")
+        lines.append(f"# TYPE {prefix}_calls_total counter")
+        for name, n in calls.items():
+            lines.append(f'{prefix}_calls_total{{name="{_label(name)}"}} {n}')
+        lines.append(f"# HELP {prefix}_ticks_total Profiled engine ticks.")
+        lines.append(f"# TYPE {prefix}_ticks_total counter")
+        lines.append(f"{prefix}_ticks_total {ticks}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _ProfiledClient:
+    """Proxy counting and timing every method call on a broker client as broker.<method>."""
+
+    def __init__(self, client: Any, profiler: TickProfiler, prefix: str) -> None:
+        self._client = client
+        self._profiler = profiler
+        self._prefix = prefix
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        profiler, metric = self._profiler, f"{self._prefix}.{name}"
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            profiler.count(metric)
+            with profiler.stage(metric):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def profiled_client(client: Any, prefix: str = "broker") -> Any:
+    """client itself when profiling is off (or client is None), else a counting/timing proxy."""
+    profiler = _profiler
+    if client is None or not profiler.enabled:
+        return client
+    return _ProfiledClient(client, profiler, prefix)
+
+
+_profiler = TickProfiler()
+
+
+def get_tick_profiler() -> TickProfiler:
+    return _profiler
+
+
+def set_tick_profiler(profiler: TickProfiler | None) -> None:
+    """Install a profiler (tests / runtime toggle); None restores the ENGINE_PROFILING default."""
+    global _profiler
+    _profiler = profiler if profiler is not None else TickProfiler()
+
+
+def profile_stage(name: str) -> Any:
+    """Shorthand for get_tick_profiler().stage(name)."""
+    return _profiler.stage(name)
+
+
+def count_call(name: str, n: int = 1) -> None:
+    _profiler.count(name, n)
@@ -0,0 +1,259 @@
+"""
+Local Kite ticker replay server for tests and offline runs.
+
+Speaks enough of the Kite WebSocket protocol for the real KiteTicker client: it accepts the
+subscribe/mode messages and streams recorded ticks encoded as Kite binary packets (full mode;
+32-byte packets for indices). Point KiteTicker at it with root=server.url (or KITE_TICKER_ROOT).
+Recorded ticks are JSONL in KiteTicker's parsed-tick shape; timestamps may be epoch seconds.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_INDICES_SEGMENT = 9
+
+
+def _epoch(value: Any) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value or 0)
+
+
+def _price(value: Any) -> int:
+    return int(round(float(value or 0) * 100))
+
+
+def encode_packet(tick: dict[str, Any]) -> bytes:
+    """One tick as a Kite full-mode binary packet (prices in paise)."""
+    token = int(tick["instrument_token"])
+    ohlc = tick.get("ohlc") or {}
+    ts = _epoch(tick.get("exchange_timestamp"))
+    if token & 0xFF == _INDICES_SEGMENT:
+        return struct.pack(
+            ">IIIIIIII",
+            token,
+            _price(tick.get("last_price")),
+            _price(ohlc.get("high")),
+            _price(ohlc.get("low")),
+            _price(ohlc.get("open")),
+            _price(ohlc.get("close")),
+            0,
+            ts,
+        )
+    head = struct.pack(
+        ">IIIIIIIIIIIIIIII",
+        token,
+        _price(tick.get("last_price")),
+        int(tick.get("last_traded_quantity") or 0),
+        _price(tick.get("average_traded_price")),
+        int(tick.get("volume_traded") or 0),
+        int(tick.get("total_buy_quantity") or 0),
+        int(tick.get("total_sell_quantity") or 0),
+        _price(ohlc.get("open")),
+        _price(ohlc.get("high")),
+        _price(ohlc.get("low")),
+        _price(ohlc.get("close")),
+        _epoch(tick.get("last_trade_time")) or ts,
+        int(tick.get("oi") or 0),
+        int(tick.get("oi_day_high") or 0),
+        int(tick.get("oi_day_low") or 0),
+        ts,
+    )
+    return head + b"\x00" * 120  # empty 5+5 market depth
+
+
+def encode_frame(ticks: list[dict[str, Any]]) -> bytes:
+    """Kite binary message: packet count, then (length, packet) pairs."""
+    packets = [encode_packet(t) for t in ticks]
+    out = [struct.pack(">H", len(packets))]
+    for packet in packets:
+        out.append(struct.pack(">H", len(packet)))
+        out.append(packet)
+    return b"".join(out)
+
+
+def load_recorded_ticks(path: str | Path) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_recorded_ticks(path: str | Path, ticks: Iterable[dict[str, Any]]) -> None:
+    """Write parsed ticks (e.g. captured from on_ticks) as JSONL; datetimes become epoch seconds."""
+    with open(path, "w", encoding="utf-8") as f:
+        for tick in ticks:
+            row = {k: (_epoch(v) if isinstance(v, datetime) else v) for k, v in tick.items() if k != "depth"}
+            f.write(json.dumps(row) + "\n")
+
+
+def _ws_frame(payload: bytes, opcode: int) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack(">BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+
+def _read_client_frame(conn: socket.socket) -> tuple[int, bytes]:
+    b1, b2 = _recv_exact(conn, 2)
+    opcode = b1 & 0x0F
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if b2 & 0x80 else b"\x00\x00\x00\x00"
+    data = _recv_exact(conn, length)
+    return opcode, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+
+class TickReplayServer:
+    """
+    Serves recorded ticks to one KiteTicker client at a time. Ticks sharing an
+    exchange_timestamp go out in one frame, frame_interval_sec apart, and only for
+    subscribed tokens (ticks recorded before a token is subscribed wait for it).
+    """
+
+    def __init__(
+        self,
+        ticks: list[dict[str, Any]],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        frame_interval_sec: float = 0.005,
+    ) -> None:
+        self.ticks = list(ticks)
+        self.frame_interval_sec = frame_interval_sec
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(4)
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.subscribed: set[int] = set()
+        self.frames_sent = 0
+        self.done = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "TickReplayServer":
+        self._thread = threading.Thread(target=self._serve, name="tick_replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            try:
+                self._session(conn)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _handshake(self, conn: socket.socket) -> None:
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                raise ConnectionError("no handshake")
+            request += chunk
+        key = ""
+        for line in request.decode("latin-1").split("\r\n"):
+            if line.lower().startswith("sec-websocket-key:"):
+                key = line.split(":", 1)[1].strip()
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        conn.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+
+    def _read_loop(self, conn: socket.socket, closed: threading.Event) -> None:
+        try:
+            while not closed.is_set():
+                opcode, data = _read_client_frame(conn)
+                if opcode == 0x8:
+                    break
+                if opcode == 0x1:
+                    message = json.loads(data.decode())
+                    if message.get("a") == "subscribe":
+                        self.subscribed.update(int(t) for t in message.get("v") or [])
+                    elif message.get("a") == "unsubscribe":
+                        self.subscribed.difference_update(int(t) for t in message.get("v") or [])
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            closed.set()
+
+    def _session(self, conn: socket.socket) -> None:
+        self._handshake(conn)
+        closed = threading.Event()
+        threading.Thread(target=self._read_loop, args=(conn, closed), daemon=True).start()
+        groups: list[list[dict[str, Any]]] = []
+        for tick in self.ticks:
+            if groups and groups[-1][0].get("exchange_timestamp") == tick.get("exchange_timestamp"):
+                groups[-1].append(tick)
+            else:
+                groups.append([tick])
+        pending = list(groups)
+        while not closed.is_set() and not self._stop.is_set():
+            if not pending:
+                self.done.set()
+                conn.sendall(_ws_frame(b"\x00", 0x2))  # heartbeat, like Kite's 1-byte frames
+                closed.wait(1.0)
+                continue
+            group = pending[0]
+            if not all(int(t["instrument_token"]) in self.subscribed for t in group):
+                closed.wait(0.01)
+                continue
+            pending.pop(0)
+            conn.sendall(_ws_frame(encode_frame(group), 0x2))
+            self.frames_sent += 1
+            if self.frame_interval_sec:
+                time.sleep(self.frame_interval_sec)
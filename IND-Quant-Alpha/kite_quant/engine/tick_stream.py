@@ -0,0 +1,397 @@
+"""
+Kite WebSocket tick streaming: latest-tick table and in-memory 1m/5m candles.
+
+A single KiteTicker connection subscribes (full mode) to the instruments of ACTIVE sessions.
+The ticker's callback thread is the only writer; readers (strategies, exit checks, APIs) never
+take a lock: every update replaces an immutable snapshot (a fresh dict / tuple) in a plain dict,
+and CPython dict get/set are atomic. strategies.data_provider consults the stream first for
+quotes, LTP and the latest 1m/5m candles and falls back to REST when the stream has no fresh data.
+Bar-close listeners (engine.regime_service) receive each batch of bars closed by a tick batch.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from engine.sim_clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+CANDLE_INTERVALS = {"1m": 60, "5m": 300}
+MAX_BARS_PER_SERIES = int(os.getenv("TICK_STREAM_MAX_BARS", "400") or 400)
+TICK_STALE_SEC = float(os.getenv("TICK_STREAM_STALE_SEC", "5") or 5)
+
+# Callbacks for order updates pushed on the ticker connection (registered before a stream exists).
+_order_update_listeners: list[Callable[[dict[str, Any]], None]] = []
+
+
+def add_order_update_listener(fn: Callable[[dict[str, Any]], None]) -> None:
+    if fn not in _order_update_listeners:
+        _order_update_listeners.append(fn)
+
+
+# Callbacks for closed candles: fn([(symbol, exchange, interval, bar), ...]) once per tick batch,
+# called on the ticker thread; bar is the store's {"start", "open", "high", "low", "close", "volume"}.
+_bar_close_listeners: list[Callable[[list[tuple[str, str, str, dict[str, Any]]]], None]] = []
+
+
+def add_bar_close_listener(fn: Callable[[list[tuple[str, str, str, dict[str, Any]]]], None]) -> None:
+    if fn not in _bar_close_listeners:
+        _bar_close_listeners.append(fn)
+
+
+def _interval_key(interval: str) -> str | None:
+    """Map strategy interval names to the streamed candle intervals (None = not streamed)."""
+    value = (interval or "").lower()
+    if value in ("1m", "1min", "1minute", "minute"):
+        return "1m"
+    if value in ("5m", "5min", "5minute"):
+        return "5m"
+    return None
+
+
+def _tick_epoch(tick: dict[str, Any], received: float) -> float:
+    ts = tick.get("exchange_timestamp") or tick.get("last_trade_time")
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, (int, float)) and ts > 0:
+        return float(ts)
+    return received
+
+
+class TickStore:
+    """
+    Latest tick per instrument token plus rolling 1m/5m candles built from the ticks.
+    update() must be called from one thread (the ticker callback); all readers are lock-free.
+    """
+
+    def __init__(self, max_bars: int = MAX_BARS_PER_SERIES, stale_sec: float | None = TICK_STALE_SEC) -> None:
+        self.max_bars = max_bars
+        self.stale_sec = stale_sec
+        self._latest: dict[int, dict[str, Any]] = {}
+        self._received: dict[int, float] = {}
+        self._forming: dict[tuple[int, str], dict[str, Any]] = {}
+        self._closed: dict[tuple[int, str], tuple[dict[str, Any], ...]] = {}
+        self._last_volume: dict[int, float] = {}
+        self.ticks_seen = 0
+
+    def update(self, ticks: Iterable[dict[str, Any]], received: float | None = None) -> list[tuple[int, str, dict[str, Any]]]:
+        """Apply a tick batch; returns the (token, interval, bar) bars it closed, oldest first."""
+        received = get_clock().time() if received is None else received
+        closed: list[tuple[int, str, dict[str, Any]]] = []
+        for tick in ticks:
+            token = tick.get("instrument_token")
+            price = tick.get("last_price")
+            if token is None or price is None:
+                continue
+            token = int(token)
+            self._latest[token] = dict(tick)
+            self._received[token] = received
+            self.ticks_seen += 1
+            self._roll(token, float(price), tick, _tick_epoch(tick, received), closed)
+        return closed
+
+    def _roll(
+        self, token: int, price: float, tick: dict[str, Any], epoch: float, closed_out: list[tuple[int, str, dict[str, Any]]]
+    ) -> None:
+        cumulative = tick.get("volume_traded")
+        traded = 0.0
+        if cumulative is not None:
+            prev = self._last_volume.get(token)
+            # Day volume is cumulative: a bar's volume is the increase seen inside it.
+            traded = max(0.0, float(cumulative) - prev) if prev is not None else 0.0
+            self._last_volume[token] = float(cumulative)
+        for name, seconds in CANDLE_INTERVALS.items():
+            key = (token, name)
+            start = int(epoch // seconds * seconds)
+            bar = self._forming.get(key)
+            if bar is not None and start < bar["start"]:
+                continue  # late tick for an already closed bar
+            if bar is not None and start > bar["start"]:
+                closed = self._closed.get(key, ()) + (bar,)
+                self._closed[key] = closed[-self.max_bars:]
+                closed_out.append((token, name, bar))
+                bar = None
+            if bar is None:
+                bar = {"start": start, "open": price, "high": price, "low": price, "close": price, "volume": traded}
+            else:
+                bar = {
+                    "start": start,
+                    "open": bar["open"],
+                    "high": max(bar["high"], price),
+                    "low": min(bar["low"], price),
+                    "close": price,
+                    "volume": bar["volume"] + traded,
+                }
+            self._forming[key] = bar
+
+    def latest(self, token: int, max_age_sec: float | None = None) -> dict[str, Any] | None:
+        """Latest tick, or None when older than max_age_sec (default: the store's stale_sec; a
+        store built with stale_sec=None, as replays use, never goes stale)."""
+        tick = self._latest.get(token)
+        if tick is None:
+            return None
+        if max_age_sec is None:
+            max_age_sec = self.stale_sec
+        if max_age_sec is not None and get_clock().time() - self._received.get(token, 0.0) > max_age_sec:
+            return None
+        return tick
+
+    def candles(self, token: int, interval: str, count: int | None = None) -> list[dict[str, Any]]:
+        """Closed bars plus the forming bar, newest last, in the data-provider candle shape."""
+        key = _interval_key(interval)
+        if key is None:
+            return []
+        bars = list(self._closed.get((token, key), ()))
+        forming = self._forming.get((token, key))
+        if forming is not None:
+            bars.append(forming)
+        if count is not None:
+            bars = bars[-count:] if count > 0 else []
+        return [
+            {
+                "date": datetime.fromtimestamp(b["start"], IST).isoformat(),
+                "open": b["open"],
+                "high": b["high"],
+                "low": b["low"],
+                "close": b["close"],
+                "volume": b["volume"],
+            }
+            for b in bars
+        ]
+
+
+def _default_resolve_token(symbol: str, exchange: str) -> int | None:
+    """Instrument token from the instrument master (NSE tradingsymbol/index name, or NFO contract)."""
+    from engine.instrument_master import get_instrument_master
+
+    return get_instrument_master().token(symbol, exchange)
+
+
+def _default_ticker_factory() -> Any:
+    api_key = os.getenv("ZERODHA_API_KEY")
+    access_token = os.getenv("ZERODHA_ACCESS_TOKEN")
+    if not api_key or not access_token:
+        return None
+    try:
+        from kiteconnect import KiteTicker
+    except ImportError:
+        return None
+    root = os.getenv("KITE_TICKER_ROOT") or None
+    return KiteTicker(api_key, access_token, root=root)
+
+
+class TickStream:
+    """Owns the KiteTicker connection and the TickStore; subscriptions follow the active sessions."""
+
+    def __init__(
+        self,
+        ticker_factory: Callable[[], Any] = _default_ticker_factory,
+        resolve_token: Callable[[str, str], int | None] = _default_resolve_token,
+        store: TickStore | None = None,
+    ) -> None:
+        self.store = store or TickStore()
+        self._ticker_factory = ticker_factory
+        self._resolve = resolve_token
+        self._ticker: Any = None
+        self._connected = threading.Event()
+        self._lock = threading.Lock()  # subscription bookkeeping only; never taken by readers
+        self._tokens: dict[tuple[str, str], int] = {}
+        self._symbols: dict[int, tuple[str, str]] = {}  # token -> (symbol, exchange), for bar listeners
+        self._subscribed: set[int] = set()
+
+    @staticmethod
+    def _key(symbol: str, exchange: str = "NSE") -> tuple[str, str]:
+        return ((symbol or "").strip().upper(), (exchange or "NSE").strip().upper())
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    @property
+    def started(self) -> bool:
+        """True between start() and stop() (the ticker may still be connecting)."""
+        return self._ticker is not None
+
+    def token_for(self, symbol: str, exchange: str = "NSE") -> int | None:
+        return self._tokens.get(self._key(symbol, exchange))
+
+    def start(self) -> bool:
+        """Connect the ticker in its own thread (idempotent). False when no ticker is available."""
+        with self._lock:
+            if self._ticker is not None:
+                return True
+            ticker = self._ticker_factory()
+            if ticker is None:
+                return False
+            ticker.on_ticks = self._on_ticks
+            ticker.on_connect = self._on_connect
+            ticker.on_close = self._on_close
+            ticker.on_error = self._on_error
+            ticker.on_order_update = self._on_order_update
+            self._ticker = ticker
+        ticker.connect(threaded=True)
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            ticker, self._ticker = self._ticker, None
+            self._subscribed.clear()
+        self._connected.clear()
+        if ticker is not None:
+            try:
+                ticker.close()
+            except Exception:
+                pass
+
+    def wait_connected(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def sync_subscriptions(self, instruments: Iterable[tuple[str, str]]) -> list[int]:
+        """Subscribe (full mode) to every (symbol, exchange) not yet streamed. Returns tokens wanted."""
+        wanted = []
+        for symbol, exchange in instruments:
+            key = self._key(symbol, exchange)
+            if not key[0]:
+                continue
+            token = self._tokens.get(key)
+            if token is None:
+                try:
+                    token = self._resolve(key[0], key[1])
+                except Exception as e:
+                    logger.warning("[TICK STREAM] Token lookup failed | %s:%s | %s", key[1], key[0], str(e))
+                    token = None
+                if token is None:
+                    continue
+                self._tokens[key] = int(token)
+                self._symbols[int(token)] = key
+            wanted.append(int(token))
+        if not wanted or not self.start():
+            return wanted
+        self._subscribe(wanted)
+        return wanted
+
+    def _subscribe(self, tokens: list[int]) -> None:
+        with self._lock:
+            ticker = self._ticker
+            new = [t for t in tokens if t not in self._subscribed]
+            if ticker is None or not new or not self._connected.is_set():
+                return
+            self._subscribed.update(new)
+        ticker.subscribe(new)
+        ticker.set_mode(ticker.MODE_FULL, new)
+        logger.info("[TICK STREAM] Subscribed %s tokens (total %s)", len(new), len(self._subscribed))
+
+    def _on_ticks(self, ws: Any, ticks: list[dict[str, Any]]) -> None:
+        closed = self.store.update(ticks)
+        if closed and _bar_close_listeners:
+            self._dispatch_bars(closed)
+
+    def _dispatch_bars(self, closed: list[tuple[int, str, dict[str, Any]]]) -> None:
+        bars = [(*self._symbols[token], interval, bar) for token, interval, bar in closed if token in self._symbols]
+        if not bars:
+            return
+        for fn in list(_bar_close_listeners):
+            try:
+                fn(bars)
+            except Exception as e:
+                logger.warning("[TICK STREAM] Bar close listener failed | %s", str(e))
+
+    def _on_connect(self, ws: Any, response: Any) -> None:
+        self._connected.set()
+        with self._lock:
+            # Resubscribe everything after a (re)connect; the server forgets subscriptions.
+            self._subscribed.clear()
+        self._subscribe(list(set(self._tokens.values())))
+        logger.info("[TICK STREAM] Connected")
+
+    def _on_close(self, ws: Any, code: Any, reason: Any) -> None:
+        self._connected.clear()
+        logger.warning("[TICK STREAM] Closed | code=%s | reason=%s", code, reason)
+
+    def _on_error(self, ws: Any, code: Any, reason: Any) -> None:
+        logger.warning("[TICK STREAM] Error | code=%s | reason=%s", code, reason)
+
+    def _on_order_update(self, ws: Any, data: dict[str, Any]) -> None:
+        for fn in list(_order_update_listeners):
+            try:
+                fn(data)
+            except Exception as e:
+                logger.warning("[TICK STREAM] Order update listener failed | %s", str(e))
+
+    # --- Data-provider lookups (lock-free) ---
+
+    def get_quote(self, symbol: str, exchange: str = "NSE") -> dict[str, Any] | None:
+        """Quote in engine.zerodha_client.get_quote's shape from the latest fresh tick, else None."""
+        token = self.token_for(symbol, exchange)
+        tick = self.store.latest(token) if token is not None else None
+        if tick is None:
+            return None
+        ohlc = tick.get("ohlc") or {}
+        last = float(tick.get("last_price") or 0)
+        return {
+            "symbol": symbol,
+            "last": last,
+            "last_price": last,
+            "open": float(ohlc.get("open") or 0),
+            "high": float(ohlc.get("high") or 0),
+            "low": float(ohlc.get("low") or 0),
+            "buy_quantity": int(tick.get("total_buy_quantity") or 0),
+            "sell_quantity": int(tick.get("total_sell_quantity") or 0),
+            "oi": float(tick.get("oi") or 0),
+            "oi_day_high": float(tick.get("oi_day_high") or 0),
+            "oi_day_low": float(tick.get("oi_day_low") or 0),
+            "volume": float(tick.get("volume_traded") or 0),
+            "source": "stream",
+        }
+
+    def get_candles(self, symbol: str, interval: str, count: int, exchange: str = "NSE") -> list[dict[str, Any]]:
+        token = self.token_for(symbol, exchange)
+        if token is None or self.store.latest(token) is None:
+            return []
+        return self.store.candles(token, interval, count)
+
+
+def merge_streamed_candles(history: list[dict[str, Any]], streamed: list[dict[str, Any]], count: int) -> list[dict[str, Any]]:
+    """
+    REST history with streamed bars laid over its tail: streamed bars starting at or after the
+    last historical bar replace it (the broker's last bar is usually still forming).
+    """
+    if not streamed:
+        return history
+    if not history:
+        return streamed[-count:]
+    first_stream = streamed[0]["date"]
+    kept = [c for c in history if str(c.get("date", "")) < first_stream]
+    return (kept + streamed)[-count:]
+
+
+_stream: TickStream | None = None
+_stream_lock = threading.Lock()
+
+
+def get_tick_stream() -> TickStream | None:
+    """Process-wide stream, or None when disabled (TICK_STREAM_ENABLED=0)."""
+    global _stream
+    if str(os.getenv("TICK_STREAM_ENABLED", "1")).strip().lower() not in {"1", "true", "yes", "on"}:
+        return None
+    with _stream_lock:
+        if _stream is None:
+            _stream = TickStream()
+        return _stream
+
+
+def set_tick_stream(stream: TickStream | None) -> None:
+    """Install a stream (tests / replay); None removes it."""
+    global _stream
+    with _stream_lock:
+        _stream = stream
@@ -62,21 +62,24 @@ def get_ai_market_analysis(
     instrument: str,
     current_price: float,
     recent_candles: list[dict] | None = None,
-    force_refresh: bool = False
+    force_refresh: bool = False,
+    as_of: datetime | None = None,
 ) -> dict:
     """
     Get AI's current market analysis with caching.
+    as_of: market time of the analysis (backtests pass the candle time); defaults to now.
     Returns: {bias: bullish/bearish/neutral, conviction: low/medium/high, reasoning: str}
     """
     try:
         from datetime import datetime as dt
 
-        now = dt.now()
+        # Naive IST wall time, so backtest candle times and live timestamps share one cache.
+        now = as_of.astimezone(ZoneInfo("Asia/Kolkata")).replace(tzinfo=None) if as_of and as_of.tzinfo else (as_of or dt.now())
 
-        # Check cache validity
+        # Check cache validity (a timestamp ahead of now is another run's analysis, not a fresh one)
         if not force_refresh and _ai_entry_cache["timestamp"]:
             age = (now - _ai_entry_cache["timestamp"]).total_seconds()
-            if age < _ai_entry_cache["ttl_seconds"]:
+            if 0 <= age < _ai_entry_cache["ttl_seconds"]:
                 logger.debug(f"[AI CACHE] Using cached analysis (age: {age:.0f}s)")
                 return {
                     "approved": True,
@@ -165,7 +168,8 @@ def ai_validate_entry(
     current_price: float,
     recent_candles: list[dict] | None,
     price_change_pct: float,
-    instrument: str = "NIFTY"
+    instrument: str = "NIFTY",
+    as_of: datetime | None = None,
 ) -> tuple[bool, str]:
     """
     AI AGENTIC VALIDATION - SIMPLE SAFETY FILTER
@@ -180,7 +184,8 @@ def ai_validate_entry(
             instrument=instrument,
             current_price=current_price,
             recent_candles=recent_candles,
-            force_refresh=False
+            force_refresh=False,
+            as_of=as_of,
         )
         
         if not ai_analysis.get("approved", False):
@@ -241,6 +246,7 @@ def check_unified_entry(
     strategy_name: str = "Momentum Breakout",
     instrument: str = "NIFTY",
     use_ai_validation: bool = True,
+    as_of: datetime | None = None,
 ) -> tuple[bool, str]:
     """
     UNIFIED ENTRY LOGIC - Used by Live, Paper, and Backtest.
@@ -252,6 +258,7 @@ def check_unified_entry(
         strategy_name: Current strategy (for logging purposes)
         instrument: Trading instrument
         use_ai_validation: Enable AI validation (default True)
+        as_of: Market time of the check (backtests pass the candle time)
     
     Returns:
         (should_enter, reason)
@@ -317,7 +324,8 @@ def check_unified_entry(
                 current_price=current_price,
                 recent_candles=recent_candles,
                 price_change_pct=price_change_pct,
-                instrument=instrument
+                instrument=instrument,
+                as_of=as_of,
             )
             
             if not ai_approved:
@@ -348,6 +356,7 @@ def should_enter_trade(
     frequency_check_passed: bool = True,
     instrument: str = "NIFTY",
     use_ai: bool = True,
+    as_of: datetime | None = None,
 ) -> tuple[bool, str]:
     """
     Master entry function for ALL modes.
@@ -361,6 +370,7 @@ def should_enter_trade(
         frequency_check_passed: Has hourly frequency check passed?
         instrument: Trading instrument
         use_ai: Enable AI validation (default True)
+        as_of: Market time of the check (backtests pass the candle time)
     
     Returns:
         (should_enter, reason)
@@ -385,6 +395,7 @@ def should_enter_trade(
             strategy_name=strategy_name,
             instrument=instrument,
             use_ai_validation=use_ai,
+            as_of=as_of,
         )
         logger.info(f"[{mode}] Entry Decision: {should_enter} | Reason: {reason}")
         return should_enter, reason
@@ -0,0 +1,467 @@
+"""
+Vectorized intraday picks screener for the F&O stock universe.
+
+Intraday picks used to be scored one stock at a time (_get_market_prediction in a thread pool),
+each stock repeating the US bias, index, VIX, quote and candle fetches. A scan now:
+- takes the market-wide inputs (US bias, Nifty / Bank Nifty change, India VIX) once (ScreenContext);
+- loads the per-symbol inputs for the whole universe on the screener's long-lived bounded pool
+  under a single deadline (loads still queued at the deadline are cancelled; a load that hangs
+  keeps one of the max_workers threads, so stalled loads never pile up across scans):
+  daily candles (through the OHLC cache), today's first 15m bar (cached for the day) and the news
+  sentiment score (cached for SENTIMENT_TTL_SEC); quotes come in one gateway batch;
+- aligns the daily closes into a (symbols x bars) panel and computes RSI(14) and the EMA 9/15
+  cross for every symbol at once; the rest of the score is array arithmetic over the universe.
+
+Scores, predictions and factor tags follow _get_market_prediction's weights and wording, so a pick
+reads the same as the per-stock Today's Market Prediction. Symbols whose candles did not load
+before the deadline are returned with a "Timeout" tag and a zero score, as before.
+
+SingleFlight deduplicates refreshes: concurrent callers of a key share one in-flight scan, and a
+stale-while-revalidate refresh starts at most one background thread per key.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Hashable, Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+SCREEN_WORKERS = int(os.getenv("INTRADAY_SCREEN_WORKERS", "16") or 16)
+SENTIMENT_TTL_SEC = float(os.getenv("INTRADAY_SCREEN_SENTIMENT_TTL_SEC", "300") or 300)
+MIN_DAILY_BARS = 20  # compute_technicals' minimum
+DAILY_DAYS = 60
+
+
+@dataclass
+class ScreenContext:
+    """Market-wide inputs shared by every symbol of a scan."""
+
+    us_bias: int = 0  # +1 bullish, -1 bearish, 0 neutral (strategy.compute_us_bias)
+    nifty_pct: float | None = None
+    bank_nifty_pct: float | None = None
+    vix_value: float | None = None
+    market_open: bool = False
+
+
+# --- Single-flight ---
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """At most one in-flight call per key; callers arriving meanwhile wait for and share its result."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float | None = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            lead = call is None
+            if lead:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not lead:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"in-flight call {key!r} timed out")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def start(self, key: Hashable, fn: Callable[[], Any]) -> bool:
+        """Run fn in a background thread unless a call for key is already in flight."""
+        with self._lock:
+            if key in self._calls:
+                return False
+            call = self._calls[key] = _Call()
+
+        def run() -> None:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                logger.warning("[SCREENER] Background refresh %r failed: %s", key, str(e))
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        threading.Thread(target=run, name=f"single_flight:{key}", daemon=True).start()
+        return True
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+
+# --- Panel technicals ---
+
+
+def candle_panel(series: list[np.ndarray | None]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Right-align per-symbol bar arrays into a (symbols, bars) panel. Shorter series are padded on
+    the left with their first value, which leaves first-value-seeded EMA / Wilder averages (and
+    RSI) unchanged; empty series are all NaN. Returns (panel, lengths).
+    """
+    lengths = np.array([0 if s is None else len(s) for s in series], dtype=np.int64)
+    width = max(2, int(lengths.max()) if len(lengths) else 0)
+    panel = np.full((len(series), width), np.nan, dtype=np.float64)
+    for i, s in enumerate(series):
+        if s is not None and len(s):
+            panel[i, width - len(s):] = s
+            panel[i, : width - len(s)] = s[0]
+    return panel, lengths
+
+
+def _ewm_rows(panel: np.ndarray, **kwargs: float) -> np.ndarray:
+    """indicators.ema / indicators.wilder applied to every row at once (adjust=False, first-value seed)."""
+    return pd.DataFrame(panel.T).ewm(adjust=False, **kwargs).mean().to_numpy(dtype=np.float64).T
+
+
+def panel_technicals(panel: np.ndarray, lengths: np.ndarray) -> dict[str, np.ndarray]:
+    """compute_technicals for every row: rsi, ema9, ema15, price, cross_up/cross_down and valid (enough bars)."""
+    delta = np.diff(panel, axis=1, prepend=np.nan)
+    avg_gain = _ewm_rows(np.where(delta > 0, delta, 0.0), alpha=1 / 14)
+    avg_loss = _ewm_rows(np.where(delta < 0, -delta, 0.0), alpha=1 / 14)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain[:, -1] / np.where(avg_loss[:, -1] == 0, np.nan, avg_loss[:, -1])))
+    ema9 = _ewm_rows(panel, span=9)
+    ema15 = _ewm_rows(panel, span=15)
+    valid = lengths >= MIN_DAILY_BARS
+    return {
+        "valid": valid,
+        "rsi": rsi,
+        "ema9": ema9[:, -1],
+        "ema15": ema15[:, -1],
+        "price": panel[:, -1],
+        "cross_up": valid & (ema9[:, -1] > ema15[:, -1]) & (ema9[:, -2] <= ema15[:, -2]),
+        "cross_down": valid & (ema9[:, -1] < ema15[:, -1]) & (ema9[:, -2] >= ema15[:, -2]),
+    }
+
+
+# --- Scoring ---
+
+
+def _closes(df: Any) -> np.ndarray | None:
+    if df is None or getattr(df, "empty", True):
+        return None
+    col = "Close" if "Close" in df.columns else "close"
+    return pd.Series(df[col]).astype(float).to_numpy()
+
+
+def score_universe(
+    symbols: list[str],
+    tech: dict[str, np.ndarray],
+    sentiment: np.ndarray,
+    context: ScreenContext,
+    quotes: dict[str, dict[str, Any]] | None = None,
+    first_bars: np.ndarray | None = None,
+) -> list[dict[str, Any]]:
+    """
+    _get_market_prediction's score for every symbol at once. quotes (symbol -> open/last/buy/sell
+    quantities) and first_bars ((n, 2) open/close of today's first 15m bar, NaN when unknown) are
+    used only while the market is open. Returns one pick per symbol, in symbols order.
+    """
+    n = len(symbols)
+    score = np.zeros(n, dtype=np.float64)
+    score += 0.4 * context.us_bias if context.us_bias in (1, -1) else 0.0
+
+    sentiment = np.nan_to_num(np.asarray(sentiment, dtype=np.float64))
+    score += np.where(sentiment > 0.3, 0.3, np.where(sentiment < -0.3, -0.3, 0.0))
+
+    rsi = tech["rsi"]
+    has_rsi = tech["valid"] & (rsi != 0)  # NaN RSI still counts as present (reported as neutral)
+    score += np.where(has_rsi & (rsi > 60), 0.15, np.where(has_rsi & (rsi < 40), -0.15, 0.0))
+    score += np.where(tech["cross_up"], 0.15, np.where(tech["cross_down"], -0.15, 0.0))
+
+    index_bias = 0
+    if context.nifty_pct is not None and context.bank_nifty_pct is not None:
+        if context.nifty_pct > 0.3 and context.bank_nifty_pct > 0.3:
+            index_bias = 1
+        elif context.nifty_pct < -0.3 and context.bank_nifty_pct < -0.3:
+            index_bias = -1
+    score += 0.05 * index_bias
+    vix_high = context.vix_value is not None and float(context.vix_value) > 18
+
+    pct_vs_open = np.full(n, np.nan)
+    imbalance = np.full(n, np.nan)
+    chg_15m = np.full(n, np.nan)
+    if context.market_open:
+        quotes = quotes or {}
+        q = np.array([[float((quotes.get(s) or {}).get(k) or 0) for k in ("open", "last", "buy_quantity", "sell_quantity")]
+                      for s in symbols], dtype=np.float64).reshape(n, 4)
+        open_p, last_p, buy_q, sell_q = q.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct_vs_open = np.where((open_p > 0) & (last_p > 0), (last_p - open_p) / open_p * 100, np.nan)
+            imbalance = np.where((buy_q != 0) & (sell_q != 0), (buy_q - sell_q) / (buy_q + sell_q), np.nan)
+            if first_bars is not None:
+                o15, c15 = np.asarray(first_bars, dtype=np.float64).reshape(n, 2).T
+                chg_15m = np.where((o15 != 0) & (c15 != 0), (c15 - o15) / o15 * 100, np.nan)
+        score += np.where(pct_vs_open > 0.2, 0.03, np.where(pct_vs_open < -0.2, -0.03, 0.0))
+        score += np.where(imbalance > 0.1, 0.02, np.where(imbalance < -0.1, -0.02, 0.0))
+        score += np.where(chg_15m > 0.15, 0.02, np.where(chg_15m < -0.15, -0.02, 0.0))
+
+    us_tag = {1: "US Market: Bullish (+1%)", -1: "US Market: Bearish (<-0.5%)"}.get(context.us_bias, "US Market: Neutral")
+    picks = []
+    for i, symbol in enumerate(symbols):
+        factors = [us_tag]
+        sent = float(sentiment[i])
+        mood = "Positive" if sent > 0.3 else ("Negative" if sent < -0.3 else "Neutral")
+        factors.append(f"Sentiment: {mood} ({sent:.2f})")
+        if has_rsi[i]:
+            r = float(rsi[i])
+            factors.append(f"RSI: {'Bullish' if r > 60 else ('Bearish' if r < 40 else 'Neutral')} ({r:.1f})")
+        if tech["cross_up"][i]:
+            factors.append("EMA: Bullish Cross")
+        elif tech["cross_down"][i]:
+            factors.append("EMA: Bearish Cross")
+        if index_bias == 1:
+            factors.append("Indices: Bullish (Nifty & Bank Nifty up)")
+        elif index_bias == -1:
+            factors.append("Indices: Bearish (Nifty & Bank Nifty down)")
+        if vix_high:
+            factors.append(f"High VIX: cautious ({float(context.vix_value):.1f})")
+        if pct_vs_open[i] > 0.2:
+            factors.append(f"Price vs open: above (+{pct_vs_open[i]:.2f}%)")
+        elif pct_vs_open[i] < -0.2:
+            factors.append(f"Price vs open: below ({pct_vs_open[i]:.2f}%)")
+        if imbalance[i] > 0.1:
+            factors.append("Depth: bid bias")
+        elif imbalance[i] < -0.1:
+            factors.append("Depth: ask bias")
+        if chg_15m[i] > 0.15:
+            factors.append("Intraday 15m: bullish")
+        elif chg_15m[i] < -0.15:
+            factors.append("Intraday 15m: bearish")
+
+        s = float(score[i])
+        if s > 0.2:
+            prediction, confidence = "BULLISH", min(100, int((s + 1) * 50))
+        elif s < -0.2:
+            prediction, confidence = "BEARISH", min(100, int((abs(s) + 1) * 50))
+        else:
+            prediction, confidence = "NEUTRAL", 50
+        if vix_high:
+            confidence = min(confidence, 72)
+        picks.append({
+            "symbol": symbol,
+            "score": round(s, 2),
+            "tags": factors[:6],
+            "prediction": prediction,
+            "confidence": confidence,
+            "rsi": float(rsi[i]) if tech["valid"][i] else None,
+            "sentiment_score": sent,
+            "vix_high": vix_high,
+        })
+    return picks
+
+
+def _timeout_pick(symbol: str) -> dict[str, Any]:
+    return {"symbol": symbol, "score": 0.0, "tags": ["Timeout"], "prediction": "NEUTRAL"}
+
+
+# --- Default loaders ---
+
+
+def _default_daily(symbol: str) -> Any:
+    from engine.data_fetcher import get_historical_for_prediction
+
+    return get_historical_for_prediction(symbol, days=DAILY_DAYS)
+
+
+def _default_intraday(symbol: str) -> Any:
+    from engine.data_fetcher import fetch_nse_ohlc
+
+    return fetch_nse_ohlc(symbol, interval="15m", period="1d")
+
+
+def _default_sentiment(symbol: str) -> float:
+    from engine.sentiment_engine import get_sentiment_for_symbol
+
+    return float(get_sentiment_for_symbol(symbol).get("score", 0) or 0)
+
+
+def _default_quotes(symbols: list[str]) -> dict[str, dict[str, Any]]:
+    from engine.zerodha_client import get_quotes
+
+    return {pair[0]: quote for pair, quote in get_quotes([(s, "NSE") for s in symbols]).items()}
+
+
+def fno_universe(fallback: Iterable[str] = ()) -> list[str]:
+    """F&O stock underlyings from today's instrument master; fallback when the master has none."""
+    try:
+        from engine.instrument_master import get_instrument_master
+
+        names = get_instrument_master().fno_underlyings()
+    except Exception as e:
+        logger.warning("[SCREENER] F&O universe unavailable: %s", str(e))
+        names = []
+    return names or list(fallback)
+
+
+# --- Screener ---
+
+
+class UniverseScreener:
+    """Scores a symbol universe in one pass; per-symbol inputs load concurrently under one deadline."""
+
+    def __init__(
+        self,
+        *,
+        load_daily: Callable[[str], Any] = _default_daily,
+        load_intraday: Callable[[str], Any] = _default_intraday,
+        load_sentiment: Callable[[str], float] = _default_sentiment,
+        load_quotes: Callable[[list[str]], dict[str, dict[str, Any]]] = _default_quotes,
+        max_workers: int = SCREEN_WORKERS,
+        sentiment_ttl_sec: float = SENTIMENT_TTL_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._load_daily = load_daily
+        self._load_intraday = load_intraday
+        self._load_sentiment = load_sentiment
+        self._load_quotes = load_quotes
+        self.max_workers = max(1, max_workers)
+        self.sentiment_ttl_sec = sentiment_ttl_sec
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sentiment: dict[str, tuple[float, float]] = {}  # symbol -> (fetched_at, score)
+        self._first_bars: dict[tuple[str, str], tuple[float, float]] = {}  # (symbol, day) -> (open, close), closed bars only
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="screener")
+        self.last_stats: dict[str, Any] = {}
+
+    def _first_bar(self, symbol: str, day: str) -> tuple[float, float] | None:
+        df = self._load_intraday(symbol)
+        if df is None or getattr(df, "empty", True):
+            return None
+        row = df.iloc[0]
+        bar = (float(row.get("Open", row.get("open", 0)) or 0), float(row.get("Close", row.get("close", 0)) or 0))
+        if len(df) >= 2:  # the first bar has closed: fixed for the rest of the day
+            with self._lock:
+                self._first_bars[(symbol, day)] = bar
+        return bar
+
+    def _sentiment_of(self, symbol: str) -> float:
+        score = float(self._load_sentiment(symbol) or 0)
+        with self._lock:
+            self._sentiment[symbol] = (self._clock(), score)
+        return score
+
+    def scan(self, symbols: Iterable[str], context: ScreenContext, timeout_sec: float = 20.0) -> list[dict[str, Any]]:
+        """Picks for every symbol, best score first."""
+        started = self._clock()
+        symbols = list(dict.fromkeys((s or "").strip().upper() for s in symbols if (s or "").strip()))
+        n = len(symbols)
+        if not n:
+            return []
+        day = datetime.now(IST).date().isoformat()
+        sentiment = np.zeros(n, dtype=np.float64)
+        first_bars = np.full((n, 2), np.nan, dtype=np.float64)
+        daily: list[Any] = [None] * n
+        daily_done = np.zeros(n, dtype=bool)
+        fresh_sentiment = np.zeros(n, dtype=bool)
+        cached_bars = 0
+        with self._lock:
+            for i, s in enumerate(symbols):
+                hit = self._sentiment.get(s)
+                if hit is not None and started - hit[0] < self.sentiment_ttl_sec:
+                    sentiment[i] = hit[1]
+                    fresh_sentiment[i] = True
+                bar = self._first_bars.get((s, day))
+                if bar is not None:
+                    first_bars[i] = bar
+                    cached_bars += 1
+
+        pool = self._pool
+        futures: dict[Any, tuple[str, int]] = {}
+        quotes: dict[str, dict[str, Any]] = {}
+        try:
+            if context.market_open:
+                futures[pool.submit(self._load_quotes, symbols)] = ("quotes", -1)
+            for i, s in enumerate(symbols):
+                futures[pool.submit(self._load_daily, s)] = ("daily", i)
+            for i, s in enumerate(symbols):
+                if not fresh_sentiment[i]:
+                    futures[pool.submit(self._sentiment_of, s)] = ("sentiment", i)
+                if context.market_open and np.isnan(first_bars[i, 0]):
+                    futures[pool.submit(self._first_bar, s, day)] = ("first_bar", i)
+            done, not_done = wait(futures, timeout=max(0.0, timeout_sec - (self._clock() - started)))
+        finally:
+            # Loads that have not started are dropped; running ones finish on the shared pool
+            stalled = sum(1 for future in futures if not future.done() and not future.cancel())
+
+        errors = 0
+        for future in done:
+            kind, i = futures[future]
+            try:
+                value = future.result()
+            except Exception as e:
+                errors += 1
+                logger.debug("[SCREENER] %s load failed | %s | %s", kind, symbols[i] if i >= 0 else "*", str(e))
+                value = None
+                if kind == "daily":
+                    daily_done[i] = True
+                continue
+            if kind == "quotes":
+                quotes = value or {}
+            elif kind == "daily":
+                daily[i] = _closes(value)
+                daily_done[i] = True
+            elif kind == "sentiment":
+                sentiment[i] = float(value or 0)
+            elif kind == "first_bar" and value is not None:
+                first_bars[i] = value
+
+        panel, lengths = candle_panel(daily)
+        tech = panel_technicals(panel, lengths)
+        picks = score_universe(symbols, tech, sentiment, context, quotes=quotes, first_bars=first_bars)
+        picks = [p if daily_done[i] else _timeout_pick(p["symbol"]) for i, p in enumerate(picks)]
+        picks.sort(key=lambda p: -(p.get("score") or 0))
+        self.last_stats = {
+            "symbols": n,
+            "timeouts": int((~daily_done).sum()),
+            "load_errors": errors,
+            "pending_loads": len(not_done),
+            "stalled_loads": stalled,
+            "sentiment_cached": int(fresh_sentiment.sum()),
+            "first_bars_cached": cached_bars,
+            "panel_bars": int(panel.shape[1]),
+            "elapsed_sec": round(self._clock() - started, 3),
+        }
+        return picks
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -5,7 +5,6 @@ Uses kiteconnect library for Zerodha API.
 from __future__ import annotations
 
 import os
-import time
 from datetime import date, datetime
 from typing import Any
 
@@ -16,26 +15,13 @@ except ImportError:
     KITE_AVAILABLE = False
     KiteConnect = None
 
-# Cache for NSE instruments (symbol search). TTL 24 hours.
-_instruments_cache: list[dict[str, Any]] = []
-_instruments_cache_time: float = 0
-INSTRUMENTS_CACHE_TTL_SEC = 24 * 3600
-
-# Cache for NFO options (index option tradingsymbol resolution).
-_nfo_options_cache: list[dict[str, Any]] = []
-_nfo_options_cache_time: float = 0
-NFO_CACHE_TTL_SEC = 3600
-
-# Standard indices (F&O underlyings) - always searchable even if not in NSE dump (FINNIFTY removed)
-_FNO_INDEX_LIST = [
-    {"symbol": "NIFTY 50", "name": "Nifty 50 Index", "instrument_type": "INDEX", "exchange": "NSE"},
-    {"symbol": "NIFTY BANK", "name": "Nifty Bank Index", "instrument_type": "INDEX", "exchange": "NSE"},
-    {"symbol": "MIDCPNIFTY", "name": "Nifty Midcap Select", "instrument_type": "INDEX", "exchange": "NSE"},
-]
+from engine.instrument_master import get_instrument_master
+from engine.quote_gateway import get_quote_gateway, quote_key
+from engine.tick_profiler import profiled_client
 
 
 def _get_kite() -> KiteConnect | None:
-    """Initialize and return KiteConnect instance."""
+    """Initialize and return KiteConnect instance (counted/timed per API call when ENGINE_PROFILING is on)."""
     import logging
     logger = logging.getLogger(__name__)
     
@@ -56,7 +42,7 @@ def _get_kite() -> KiteConnect | None:
         kite = KiteConnect(api_key=api_key)
         kite.set_access_token(access_token)
         logger.info("Kite client created successfully")
-        return kite
+        return profiled_client(kite)
     except Exception as e:
         logger.exception(f"Failed to create Kite client: {e}")
         return None
@@ -64,39 +50,13 @@ def _get_kite() -> KiteConnect | None:
 
 def _get_instrument_token(symbol: str) -> int | None:
     """Convert NSE symbol to instrument token. Format: NSE:SYMBOL"""
-    kite = _get_kite()
-    if not kite:
-        return None
-    
-    try:
-        instruments = kite.instruments("NSE")
-        for inst in instruments:
-            if inst["tradingsymbol"] == symbol.upper():
-                return inst["instrument_token"]
-        return None
-    except Exception:
-        return None
+    row = get_instrument_master().get(symbol, "NSE")
+    return int(row["instrument_token"]) if row else None
 
 
 def _load_nfo_options_cache(force: bool = False) -> list[dict[str, Any]]:
-    """Load NFO instruments (options) for index option tradingsymbol resolution."""
-    global _nfo_options_cache, _nfo_options_cache_time
-    now = time.time()
-    if not force and _nfo_options_cache and (now - _nfo_options_cache_time) < NFO_CACHE_TTL_SEC:
-        return _nfo_options_cache
-    kite = _get_kite()
-    if not kite:
-        return _nfo_options_cache
-    try:
-        import socket
-        socket.setdefaulttimeout(60)
-        raw = kite.instruments("NFO")
-        out = [inst for inst in raw if (inst.get("instrument_type") or "").upper() in ("CE", "PE")]
-        _nfo_options_cache = out
-        _nfo_options_cache_time = now
-        return out
-    except Exception:
-        return _nfo_options_cache
+    """NFO options (CE/PE) from the instrument master, ordered by underlying, expiry, strike."""
+    return get_instrument_master(force=force).option_rows()
 
 
 def get_nfo_option_tradingsymbol(
@@ -128,127 +88,32 @@ def get_nfo_option_contract(
     opt = (option_type or "CE").upper()
     if opt not in ("CE", "PE"):
         opt = "CE"
-    strike_str = str(int(strike))
-    instruments = _load_nfo_options_cache()
-    for inst in instruments:
-        ts = (inst.get("tradingsymbol") or "").strip()
-        if not ts.startswith(underlying):
-            continue
-        if not ts.endswith(opt):
-            continue
-        if strike_str not in ts:
-            continue
-        lot_size_raw = inst.get("lot_size")
-        try:
-            lot_size = int(lot_size_raw) if lot_size_raw is not None else None
-        except (TypeError, ValueError):
-            lot_size = None
-        return {
-            "tradingsymbol": ts,
-            "lot_size": lot_size,
-            "strike": strike,
-            "option_type": opt,
-            "underlying": underlying,
-        }
-    return None
+    # Nearest live expiry with this exact strike (sorted option index, no list scan).
+    inst = get_instrument_master().option(underlying, int(strike), opt, on_or_after=date.today().isoformat())
+    if not inst:
+        return None
+    lot_size_raw = inst.get("lot_size")
+    try:
+        lot_size = int(lot_size_raw) if lot_size_raw is not None else None
+    except (TypeError, ValueError):
+        lot_size = None
+    return {
+        "tradingsymbol": (inst.get("tradingsymbol") or "").strip(),
+        "lot_size": lot_size,
+        "strike": strike,
+        "option_type": opt,
+        "underlying": underlying,
+    }
 
 
 def _load_instruments_cache(force: bool = False) -> list[dict[str, Any]]:
-    """Load NSE instruments from Zerodha and cache. Returns EQ (equity) + INDEX (Nifty, Bank Nifty, etc.) for search/F&O."""
-    global _instruments_cache, _instruments_cache_time
-    now = time.time()
-    if not force and _instruments_cache and (now - _instruments_cache_time) < INSTRUMENTS_CACHE_TTL_SEC:
-        return _instruments_cache
-    kite = _get_kite()
-    if not kite:
-        return _instruments_cache
-    try:
-        import socket
-        socket.setdefaulttimeout(30)
-        raw = kite.instruments("NSE")
-        out = []
-        seen = set()
-        for i in _FNO_INDEX_LIST:
-            s = (i.get("symbol") or "").strip()
-            if s and s not in seen:
-                seen.add(s)
-                out.append({**i, "symbol": s})
-        for inst in raw:
-            seg = inst.get("segment") or ""
-            itype = (inst.get("instrument_type") or "").upper()
-            if seg == "NSE" and (itype == "EQ" or itype == "INDEX"):
-                s = (inst.get("tradingsymbol") or "").strip()
-                if s and s not in seen:
-                    seen.add(s)
-                    out.append({
-                        "symbol": s,
-                        "name": (inst.get("name") or "").strip(),
-                        "instrument_type": itype,
-                        "exchange": "NSE",
-                    })
-        # Load NFO (F&O) futures for main indices so "nifty" shows Nifty futures
-        try:
-            nfo_raw = kite.instruments("NFO")
-            fno_keywords = ("NIFTY", "BANKNIFTY", "MIDCPNIFTY")
-            nfo_count = 0
-            for inst in nfo_raw:
-                if nfo_count >= 40:
-                    break
-                itype = (inst.get("instrument_type") or "").upper()
-                if itype != "FUT":
-                    continue
-                s = (inst.get("tradingsymbol") or "").strip()
-                if not s or s in seen:
-                    continue
-                if any(kw in s for kw in fno_keywords):
-                    seen.add(s)
-                    out.append({
-                        "symbol": s,
-                        "name": (inst.get("name") or "").strip() or s,
-                        "instrument_type": "FUT",
-                        "exchange": "NFO",
-                    })
-                    nfo_count += 1
-        except Exception:
-            pass
-        _instruments_cache = out
-        _instruments_cache_time = now
-        return out
-    except Exception:
-        return _instruments_cache
+    """Searchable instruments: F&O indices, NSE EQ + INDEX, and index futures (from the instrument master)."""
+    return get_instrument_master(force=force).search_universe
 
 
 def search_instruments(query: str, limit: int = 20) -> list[dict[str, Any]]:
     """Search NSE equity and index symbols. INDEX (Nifty, Bank Nifty, F&O underlyings) always first, then EQ."""
-    q = (query or "").strip().upper()
-    if not q or len(q) < 2:
-        return []
-    instruments = _load_instruments_cache()
-    q_lower = query.strip().lower()
-    index_results = []
-    fut_results = []
-    eq_results = []
-    for inst in instruments:
-        sym = inst.get("symbol") or ""
-        name = inst.get("name") or ""
-        if not (q in sym or q_lower in name.lower() or sym.startswith(q) or q in (name or "").upper()):
-            continue
-        itype = (inst.get("instrument_type") or "").upper()
-        if itype == "INDEX":
-            index_results.append(inst)
-        elif itype == "FUT":
-            fut_results.append(inst)
-        else:
-            eq_results.append(inst)
-    # Order: INDEX (F&O underlyings) first, then FUT (futures), then EQ
-    def prefix_sort_key(x):
-        s = x.get("symbol") or ""
-        return (0 if s.startswith(q) else 1, s)
-    index_results.sort(key=prefix_sort_key)
-    fut_results.sort(key=prefix_sort_key)
-    eq_results.sort(key=prefix_sort_key)
-    combined = index_results + fut_results + eq_results
-    return combined[:limit]
+    return get_instrument_master().search(query, limit=limit)
 
 
 def place_order(
@@ -311,6 +176,28 @@ def place_order(
         return {"error": str(e), "success": False}
 
 
+def order_status_payload(order_id: str, latest: dict[str, Any]) -> dict[str, Any]:
+    """Normalize one Kite order row (order_history entry, orders() row or postback) to a status payload."""
+    status = str(latest.get("status") or "").upper()
+    filled_quantity = int(latest.get("filled_quantity") or 0)
+    avg_fill_price = latest.get("average_price")
+    try:
+        avg_fill_price = float(avg_fill_price) if avg_fill_price is not None else None
+    except (TypeError, ValueError):
+        avg_fill_price = None
+    reject_reason = latest.get("status_message") or latest.get("status_message_raw")
+    return {
+        "success": True,
+        "order_id": order_id,
+        "status": status,
+        "filled_quantity": filled_quantity,
+        "avg_fill_price": avg_fill_price,
+        "reject_reason": reject_reason,
+        "raw": latest,
+        "fills": [],
+    }
+
+
 def get_order_status(order_id: str) -> dict[str, Any]:
     """Fetch latest broker order status and fill details for an order_id."""
     kite = _get_kite()
@@ -327,29 +214,29 @@ def get_order_status(order_id: str) -> dict[str, Any]:
             return {"success": False, "error": f"No order history found for {order_id}"}
 
         latest = history[-1] if isinstance(history, list) else history
-        status = str(latest.get("status") or "").upper()
-        filled_quantity = int(latest.get("filled_quantity") or 0)
-        avg_fill_price = latest.get("average_price")
-        try:
-            avg_fill_price = float(avg_fill_price) if avg_fill_price is not None else None
-        except (TypeError, ValueError):
-            avg_fill_price = None
-        reject_reason = latest.get("status_message") or latest.get("status_message_raw")
-
-        return {
-            "success": True,
-            "order_id": order_id,
-            "status": status,
-            "filled_quantity": filled_quantity,
-            "avg_fill_price": avg_fill_price,
-            "reject_reason": reject_reason,
-            "raw": latest,
-            "fills": [],
-        }
+        return order_status_payload(order_id, latest)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def get_order_statuses(order_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Status payloads (as get_order_status) for many order_ids from one kite.orders() call.
+    Ids missing from today's order book are absent; raises if the order book cannot be fetched."""
+    wanted = {str(oid) for oid in order_ids if oid}
+    if not wanted:
+        return {}
+    kite = _get_kite()
+    if not kite:
+        raise RuntimeError("Kite Connect not initialized")
+    out: dict[str, dict[str, Any]] = {}
+    for o in kite.orders() or []:
+        oid = str(o.get("order_id") or "")
+        if oid in wanted:
+            # orders() lists one row per order with its latest state.
+            out[oid] = order_status_payload(oid, o)
+    return out
+
+
 def cancel_order(order_id: str, variety: str = "regular") -> dict[str, Any]:
     """Cancel an order at broker and return normalized result."""
     kite = _get_kite()
@@ -680,86 +567,107 @@ def get_zerodha_profile_info() -> dict[str, Any]:
         return {"connected": False, "error": str(e)}
 
 
+def _quote_from_raw(symbol: str, ltp_data: dict[str, Any]) -> dict[str, Any]:
+    """Convert one kite.quote() entry to the quote dict used across the app."""
+    depth = ltp_data.get("depth", {})
+    buy_qty = sum(item.get("quantity", 0) for item in (depth.get("buy") or []) if item.get("quantity"))
+    sell_qty = sum(item.get("quantity", 0) for item in (depth.get("sell") or []) if item.get("quantity"))
+    if not buy_qty and not sell_qty:
+        buy_qty = int(ltp_data.get("buy_quantity", 0))
+        sell_qty = int(ltp_data.get("sell_quantity", 0))
+    return {
+        "symbol": symbol,
+        "last": float(ltp_data.get("last_price", 0)),
+        "last_price": float(ltp_data.get("last_price", 0)),
+        "open": float(ltp_data.get("ohlc", {}).get("open", 0)),
+        "high": float(ltp_data.get("ohlc", {}).get("high", 0)),
+        "low": float(ltp_data.get("ohlc", {}).get("low", 0)),
+        "buy_quantity": buy_qty,
+        "sell_quantity": sell_qty,
+        "oi": float(ltp_data.get("oi") or ltp_data.get("open_interest") or 0),
+        "oi_day_high": float(
+            ltp_data.get("oi_day_high")
+            or ltp_data.get("high_oi")
+            or ltp_data.get("day_high_oi")
+            or 0
+        ),
+        "oi_day_low": float(
+            ltp_data.get("oi_day_low")
+            or ltp_data.get("low_oi")
+            or ltp_data.get("day_low_oi")
+            or 0
+        ),
+    }
+
+
 def get_quote(symbol: str, exchange: str = "NSE") -> dict[str, Any]:
-    """Get current quote. For NFO options pass exchange='NFO' and symbol as tradingsymbol (e.g. NIFTY24SEP2622500CE)."""
-    kite = _get_kite()
-    if not kite:
-        return {"symbol": symbol, "last": 0.0, "open": 0.0, "high": 0.0, "low": 0.0}
-    key = f"{(exchange or 'NSE').upper()}:{(symbol or '').strip().upper()}"
+    """Get current quote. For NFO options pass exchange='NFO' and symbol as tradingsymbol (e.g. NIFTY24SEP2622500CE).
+    Goes through the shared quote gateway, so concurrent callers share one batched kite.quote() call."""
+    key = quote_key(symbol, exchange)
     try:
-        quote = kite.quote(key)
-        ltp_data = quote.get(key, {})
-        depth = ltp_data.get("depth", {})
-        buy_qty = sum(item.get("quantity", 0) for item in (depth.get("buy") or []) if item.get("quantity"))
-        sell_qty = sum(item.get("quantity", 0) for item in (depth.get("sell") or []) if item.get("quantity"))
-        if not buy_qty and not sell_qty:
-            buy_qty = int(ltp_data.get("buy_quantity", 0))
-            sell_qty = int(ltp_data.get("sell_quantity", 0))
-        return {
-            "symbol": symbol,
-            "last": float(ltp_data.get("last_price", 0)),
-            "last_price": float(ltp_data.get("last_price", 0)),
-            "open": float(ltp_data.get("ohlc", {}).get("open", 0)),
-            "high": float(ltp_data.get("ohlc", {}).get("high", 0)),
-            "low": float(ltp_data.get("ohlc", {}).get("low", 0)),
-            "buy_quantity": buy_qty,
-            "sell_quantity": sell_qty,
-            "oi": float(ltp_data.get("oi") or ltp_data.get("open_interest") or 0),
-            "oi_day_high": float(
-                ltp_data.get("oi_day_high")
-                or ltp_data.get("high_oi")
-                or ltp_data.get("day_high_oi")
-                or 0
-            ),
-            "oi_day_low": float(
-                ltp_data.get("oi_day_low")
-                or ltp_data.get("low_oi")
-                or ltp_data.get("day_low_oi")
-                or 0
-            ),
-        }
+        ltp_data = get_quote_gateway().get(key)
     except Exception:
+        ltp_data = None
+    if not ltp_data:
         return {"symbol": symbol, "last": 0.0, "open": 0.0, "high": 0.0, "low": 0.0}
+    return _quote_from_raw(symbol, ltp_data)
 
 
-def get_quotes_bulk(symbols: list[str]) -> dict[str, dict[str, Any]]:
-    """Get quotes for multiple NSE symbols in one call. Returns dict keyed by symbol with last, open, high, low, change, change_pct."""
-    kite = _get_kite()
-    if not kite or not symbols:
+def get_quotes(requests: list[tuple[str, str]]) -> dict[tuple[str, str], dict[str, Any]]:
+    """Quotes for many (symbol, exchange) pairs (NSE and NFO mixed) in one gateway batch.
+    Returns dict keyed by the requested pair; pairs the broker did not return are absent."""
+    keys = {(sym, exch): quote_key(sym, exch) for sym, exch in requests if sym}
+    if not keys:
         return {}
-    instruments = [f"NSE:{s.upper()}" for s in symbols if s and isinstance(s, str)]
-    if not instruments:
+    try:
+        raw = get_quote_gateway().get_many(keys.values())
+    except Exception:
         return {}
+    return {pair: _quote_from_raw(pair[0], raw[key]) for pair, key in keys.items() if raw.get(key)}
+
+
+def prefetch_quotes(requests: list[tuple[str, str]]) -> None:
+    """Warm the gateway cache for (symbol, exchange) pairs so the get_quote() calls that follow are hits."""
     try:
-        import socket
-        socket.setdefaulttimeout(10)
-        raw = kite.quote(instruments)
-        out = {}
-        for sym in symbols:
-            sym = (sym or "").strip().upper()
-            if not sym:
-                continue
-            key = f"NSE:{sym}"
-            ltp_data = raw.get(key, {})
-            last = float(ltp_data.get("last_price", 0))
-            ohlc = ltp_data.get("ohlc") or {}
-            open_p = float(ohlc.get("open", 0))
-            high = float(ohlc.get("high", 0))
-            low = float(ohlc.get("low", 0))
-            change = last - open_p if open_p else 0
-            change_pct = (change / open_p * 100) if open_p else 0
-            out[sym] = {
-                "symbol": sym,
-                "last": last,
-                "open": open_p,
-                "high": high,
-                "low": low,
-                "change": round(change, 2),
-                "change_pct": round(change_pct, 2),
-            }
-        return out
+        get_quote_gateway().get_many(quote_key(sym, exch) for sym, exch in requests if sym)
+    except Exception:
+        pass
+
+
+def get_quotes_bulk(symbols: list[str]) -> dict[str, dict[str, Any]]:
+    """Get quotes for multiple symbols in one call. Symbols are NSE unless prefixed (e.g. "NFO:NIFTY24SEP2622500CE").
+    Returns dict keyed by symbol (as passed, upper-cased) with last, open, high, low, change, change_pct."""
+    wanted = {}
+    for sym in symbols or []:
+        sym = (sym or "").strip().upper() if isinstance(sym, str) else ""
+        if sym:
+            wanted[sym] = quote_key(sym)
+    if not wanted:
+        return {}
+    try:
+        raw = get_quote_gateway().get_many(wanted.values())
     except Exception:
         return {}
+    out = {}
+    for sym, key in wanted.items():
+        ltp_data = raw.get(key, {})
+        last = float(ltp_data.get("last_price", 0))
+        ohlc = ltp_data.get("ohlc") or {}
+        open_p = float(ohlc.get("open", 0))
+        high = float(ohlc.get("high", 0))
+        low = float(ohlc.get("low", 0))
+        change = last - open_p if open_p else 0
+        change_pct = (change / open_p * 100) if open_p else 0
+        out[sym] = {
+            "symbol": sym,
+            "last": last,
+            "open": open_p,
+            "high": high,
+            "low": low,
+            "change": round(change, 2),
+            "change_pct": round(change_pct, 2),
+        }
+    return out
 
 
 def close_position(symbol: str, quantity: int | None = None) -> dict[str, Any]:
@@ -14,14 +14,18 @@ try:
 except ImportError:
     from backports.zoneinfo import ZoneInfo
 
-from engine.order_state import OrderManager, OrderRequest, OrderState
+from engine.order_lifecycle import OrderLifecycleService
+from engine.order_state import OrderRequest, OrderState
 from engine.risk_engine import evaluate_post_exit
 from engine.zerodha_client import cancel_order as kite_cancel_order
 from engine.zerodha_client import get_open_orders as kite_get_open_orders
 from engine.zerodha_client import get_quote as kite_get_quote
 from engine.zerodha_client import get_order_status as kite_get_order_status
+from engine.zerodha_client import get_order_statuses as kite_get_order_statuses
+from engine.zerodha_client import order_status_payload as kite_order_status_payload
 from engine.zerodha_client import get_positions as kite_get_positions
 from engine.zerodha_client import place_order as kite_place_order
+from engine.tick_stream import add_order_update_listener
 from execution.trade_history_store import append_trade
 
 logger = logging.getLogger(__name__)
@@ -71,23 +75,30 @@ class _ZerodhaBrokerAdapter:
             return {"status": "REJECTED", "reject_reason": data.get("error") or "Status lookup failed"}
         return data
 
+    def get_orders_status(self, broker_order_ids: list[str]) -> dict[str, dict[str, Any]]:
+        return kite_get_order_statuses(broker_order_ids)
+
     def cancel_order(self, broker_order_id: str) -> dict[str, Any]:
         return kite_cancel_order(broker_order_id)
 
 
-_order_manager = OrderManager(_ZerodhaBrokerAdapter())
+# One lifecycle service polls every open order in a single kite.orders() call per interval;
+# waiters block only their own session's thread.
+_order_manager = OrderLifecycleService(_ZerodhaBrokerAdapter(), poll_interval_sec=ORDER_POLL_INTERVAL_SEC)
+
+
+def _on_kite_order_update(data: dict[str, Any]) -> None:
+    order_id = str((data or {}).get("order_id") or "")
+    if order_id:
+        _order_manager.on_order_update(kite_order_status_payload(order_id, data))
+
+
+add_order_update_listener(_on_kite_order_update)
 
 
 def _wait_for_terminal_fill(client_order_id: str, timeout_sec: float = ORDER_FILL_TIMEOUT_SEC) -> Any:
-    """Poll order manager until terminal state or timeout."""
-    deadline = time.time() + max(0.1, timeout_sec)
-    order = _order_manager.get_order(client_order_id)
-    while time.time() < deadline:
-        order = _order_manager.poll_status(client_order_id)
-        if order.state in (OrderState.FILLED, OrderState.REJECTED, OrderState.CANCELLED):
-            return order
-        time.sleep(ORDER_POLL_INTERVAL_SEC)
-    return order
+    """Wait on the lifecycle service until terminal state or timeout."""
+    return _order_manager.wait_for_terminal(client_order_id, timeout_sec=max(0.1, timeout_sec))
 
 
 def _sanitize_partial_policy() -> str:
@@ -322,11 +333,6 @@ def _flatten_with_retries(symbol: str, exchange: str, side: str, qty: int, retri
     return {"success": False, "state": "POSITION_STILL_OPEN", "attempts": retries, "error": last_error}
 
 
-def _is_stop_order_cleared(status: str) -> bool:
-    s = str(status or "").upper()
-    return s in {"CANCELLED", "CANCELED", "REJECTED"}
-
-
 def _is_order_open(order_id: str) -> tuple[bool, str | None]:
     """Check if a broker order is still present in open-orders list."""
     try:
@@ -374,21 +380,17 @@ def _cancel_and_confirm_stop_order(session: dict, trade: dict) -> dict[str, Any]
                 STOP_CANCEL_RETRIES,
                 last_error,
             )
-        deadline = time.time() + STOP_OPEN_ORDERS_POLL_TIMEOUT_SEC
-        while time.time() < deadline:
-            is_open, open_status = _is_stop_order_open(stop_order_id)
-            if not is_open:
-                # Optional terminal status fetch for audit logging.
-                status_res = kite_get_order_status(stop_order_id)
-                final_status = str(status_res.get("status") or "").upper() if status_res.get("success") else "NOT_PRESENT_IN_OPEN_ORDERS"
-                trade["stop_order_status"] = final_status
-                session["stop_order_status"] = final_status
-                return {"success": True, "cancelled": True, "status": final_status}
-            if _is_stop_order_cleared(str(open_status or "")):
-                trade["stop_order_status"] = str(open_status or "").upper()
-                session["stop_order_status"] = str(open_status or "").upper()
-                return {"success": True, "cancelled": True, "status": str(open_status or "").upper()}
-            time.sleep(POST_CANCEL_POLL_INTERVAL_SEC)
+        payload = _order_manager.wait_for_broker_order(stop_order_id, timeout_sec=STOP_OPEN_ORDERS_POLL_TIMEOUT_SEC)
+        if payload:
+            final_status = str(payload.get("status") or "").upper()
+            trade["stop_order_status"] = final_status
+            session["stop_order_status"] = final_status
+            return {"success": True, "cancelled": True, "status": final_status}
+        is_open, _ = _is_stop_order_open(stop_order_id)
+        if not is_open:
+            trade["stop_order_status"] = "NOT_PRESENT_IN_OPEN_ORDERS"
+            session["stop_order_status"] = "NOT_PRESENT_IN_OPEN_ORDERS"
+            return {"success": True, "cancelled": True, "status": "NOT_PRESENT_IN_OPEN_ORDERS"}
 
     return {
         "success": False,
@@ -421,20 +423,17 @@ def _cancel_and_confirm_target_order(session: dict, trade: dict) -> dict[str, An
                 STOP_CANCEL_RETRIES,
                 last_error,
             )
-        deadline = time.time() + STOP_OPEN_ORDERS_POLL_TIMEOUT_SEC
-        while time.time() < deadline:
-            is_open, open_status = _is_target_order_open(target_order_id)
-            if not is_open:
-                status_res = kite_get_order_status(target_order_id)
-                final_status = str(status_res.get("status") or "").upper() if status_res.get("success") else "NOT_PRESENT_IN_OPEN_ORDERS"
-                trade["target_order_status"] = final_status
-                session["target_order_status"] = final_status
-                return {"success": True, "cancelled": True, "status": final_status}
-            if _is_stop_order_cleared(str(open_status or "")):
-                trade["target_order_status"] = str(open_status or "").upper()
-                session["target_order_status"] = str(open_status or "").upper()
-                return {"success": True, "cancelled": True, "status": str(open_status or "").upper()}
-            time.sleep(POST_CANCEL_POLL_INTERVAL_SEC)
+        payload = _order_manager.wait_for_broker_order(target_order_id, timeout_sec=STOP_OPEN_ORDERS_POLL_TIMEOUT_SEC)
+        if payload:
+            final_status = str(payload.get("status") or "").upper()
+            trade["target_order_status"] = final_status
+            session["target_order_status"] = final_status
+            return {"success": True, "cancelled": True, "status": final_status}
+        is_open, _ = _is_target_order_open(target_order_id)
+        if not is_open:
+            trade["target_order_status"] = "NOT_PRESENT_IN_OPEN_ORDERS"
+            session["target_order_status"] = "NOT_PRESENT_IN_OPEN_ORDERS"
+            return {"success": True, "cancelled": True, "status": "NOT_PRESENT_IN_OPEN_ORDERS"}
 
     return {
         "success": False,
@@ -1028,13 +1027,7 @@ def place_live_order(
     except Exception as e:
         logger.warning("LIVE ENTRY cancel request failed | client_order_id=%s | err=%s", request.client_order_id, str(e))
 
-    deadline = time.time() + POST_CANCEL_RECONCILE_TIMEOUT_SEC
-    latest = managed
-    while time.time() < deadline:
-        latest = _order_manager.poll_status(request.client_order_id)
-        if latest.state in (OrderState.FILLED, OrderState.REJECTED, OrderState.CANCELLED):
-            break
-        time.sleep(POST_CANCEL_POLL_INTERVAL_SEC)
+    latest = _order_manager.wait_for_terminal(request.client_order_id, timeout_sec=POST_CANCEL_RECONCILE_TIMEOUT_SEC)
 
     filled_qty = int(latest.filled_quantity or 0)
     avg_fill = float(latest.avg_fill_price or 0.0)
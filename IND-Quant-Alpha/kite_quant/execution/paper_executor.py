@@ -1,20 +1,20 @@
 """
 PAPER executor: live market data, simulated balance. No broker calls.
+
+Quotes come from the tick stream when it has a fresh tick (else the REST quote), time from
+engine.sim_clock and fill randomness from the installed PaperFillModel, so the same code runs live
+paper sessions and deterministic accelerated replays (engine.paper_replay).
 """
 from __future__ import annotations
 
 import logging
 import random
-import time
-from datetime import datetime
+import threading
 from typing import Any
 
-try:
-    from zoneinfo import ZoneInfo
-except ImportError:
-    from backports.zoneinfo import ZoneInfo
-
 from engine.risk_engine import evaluate_post_exit
+from engine.sim_clock import get_clock
+from engine.tick_stream import get_tick_stream
 from engine.zerodha_client import get_quote
 from execution.trade_history_store import append_trade
 
@@ -25,6 +25,57 @@ BASE_SLIPPAGE_BPS = 3.0
 PARTIAL_FILL_PROB_LIMIT = 0.35
 
 
+class PaperFillModel:
+    """
+    Randomness behind paper fills: execution latency, limit-order partial fills, slippage jitter.
+    Unseeded, all sessions share one generator. Seeded, each session draws from its own generator
+    (seed + sessionId), so fills do not depend on the order concurrent sessions are evaluated in.
+    """
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        *,
+        max_latency_sec: float = MAX_SIM_LATENCY_SEC,
+        partial_fill_prob: float = PARTIAL_FILL_PROB_LIMIT,
+    ) -> None:
+        self.seed = seed
+        self.max_latency_sec = float(max_latency_sec)
+        self.partial_fill_prob = float(partial_fill_prob)
+        self._shared = random.Random(seed)
+        self._rngs: dict[str, random.Random] = {}
+        self._lock = threading.Lock()
+
+    def rng(self, session: dict) -> random.Random:
+        if self.seed is None:
+            return self._shared
+        key = str(session.get("sessionId") or "")
+        with self._lock:
+            rng = self._rngs.get(key)
+            if rng is None:
+                rng = self._rngs[key] = random.Random(f"{self.seed}:{key}")
+            return rng
+
+
+_fill_model = PaperFillModel()
+
+
+def get_paper_fill_model() -> PaperFillModel:
+    return _fill_model
+
+
+def set_paper_fill_model(model: PaperFillModel | None) -> None:
+    """Install a fill model (replay / tests); None restores the unseeded default."""
+    global _fill_model
+    _fill_model = model if model is not None else PaperFillModel()
+
+
+def _paper_quote(symbol: str, exchange: str) -> dict[str, Any]:
+    stream = get_tick_stream()
+    streamed = stream.get_quote(symbol, exchange) if stream else None
+    return streamed or get_quote(symbol, exchange=exchange)
+
+
 def place_paper_trade(
     session: dict,
     symbol: str,
@@ -46,8 +97,10 @@ def place_paper_trade(
         symbol = session.get("instrument") or symbol
         exchange = "NSE"
 
-    _simulate_latency()
-    quote = get_quote(symbol, exchange=exchange)
+    model = _fill_model
+    rng = model.rng(session)
+    _simulate_latency(rng, model.max_latency_sec)
+    quote = _paper_quote(symbol, exchange)
     ltp = float(quote.get("last", 0) or quote.get("last_price", 0))
     if ltp <= 0 and price is not None:
         ltp = float(price)
@@ -80,7 +133,7 @@ def place_paper_trade(
 
     # Limit order simulator: may be partial fill or no fill.
     if limit_order and limit_price is not None:
-        market_buy_price = _apply_slippage(ltp, side="BUY", spread_pct=spread_pct, volatility_pct=volatility_pct)
+        market_buy_price = _apply_slippage(ltp, side="BUY", spread_pct=spread_pct, volatility_pct=volatility_pct, rng=rng)
         if market_buy_price > limit_price:
             return {
                 "success": False,
@@ -91,8 +144,8 @@ def place_paper_trade(
         # For NFO paper mode, avoid random partial fills so deployed capital matches sizing
         # (closer to live behavior expected by this project).
         allow_partial_fill = exchange != "NFO"
-        if allow_partial_fill and random.random() < PARTIAL_FILL_PROB_LIMIT and requested_lots > 1:
-            fill_ratio = random.uniform(0.4, 0.9)
+        if allow_partial_fill and rng.random() < model.partial_fill_prob and requested_lots > 1:
+            fill_ratio = rng.uniform(0.4, 0.9)
             if exchange == "NFO":
                 partial_lots = max(1, int(requested_lots * fill_ratio))
                 partial_lots = min(partial_lots, requested_lots - 1)
@@ -108,7 +161,7 @@ def place_paper_trade(
         entry_price = min(limit_price, market_buy_price)
         order_type = "LIMIT"
     else:
-        entry_price = _apply_slippage(ltp, side="BUY", spread_pct=spread_pct, volatility_pct=volatility_pct)
+        entry_price = _apply_slippage(ltp, side="BUY", spread_pct=spread_pct, volatility_pct=volatility_pct, rng=rng)
         order_type = "MARKET"
 
     if entry_price <= 0:
@@ -117,7 +170,7 @@ def place_paper_trade(
     entry_turnover = entry_price * fill_qty
     entry_charges = _estimate_charges(turnover=entry_turnover, side="BUY")
 
-    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+    now = get_clock().now()
     order_id = f"paper_ord_{now.strftime('%Y%m%d%H%M%S')}_{symbol}"
     trade_id = f"tr_{now.strftime('%Y%m%d%H%M%S')}_{symbol}"
     session["current_trade_id"] = trade_id
@@ -185,8 +238,10 @@ def exit_paper_trade(session: dict, exit_price: float | None = None) -> dict[str
         return {"success": True, "pnl": trade.get("pnl"), "exit_price": trade.get("exit_price")}
     symbol = trade["symbol"]
     exchange = trade.get("exchange") or "NSE"
-    _simulate_latency()
-    quote = get_quote(symbol, exchange=exchange)
+    model = _fill_model
+    rng = model.rng(session)
+    _simulate_latency(rng, model.max_latency_sec)
+    quote = _paper_quote(symbol, exchange)
     ltp = float(quote.get("last", 0) or quote.get("last_price", 0))
     if exit_price is None:
         exit_price = ltp
@@ -197,7 +252,7 @@ def exit_paper_trade(session: dict, exit_price: float | None = None) -> dict[str
     spread_pct = _estimate_spread_pct(quote)
     fill_side = "SELL" if side == "BUY" else "BUY"
     # Simulate market exit fill with slippage around latest price.
-    exit_fill = _apply_slippage(float(exit_price), side=fill_side, spread_pct=spread_pct, volatility_pct=volatility_pct)
+    exit_fill = _apply_slippage(float(exit_price), side=fill_side, spread_pct=spread_pct, volatility_pct=volatility_pct, rng=rng)
     pnl = (exit_fill - entry_price) * qty if side == "BUY" else (entry_price - exit_fill) * qty
     gross_pnl = round(pnl, 2)
 
@@ -227,7 +282,8 @@ def exit_paper_trade(session: dict, exit_price: float | None = None) -> dict[str
     total_charges = round(entry_charges + exit_charges, 2)
     raw_net_pnl = round(gross_pnl - total_charges, 2)
 
-    risk_decision = evaluate_post_exit(session, trade_pnl=raw_net_pnl, trade_time=datetime.now(ZoneInfo("Asia/Kolkata")))
+    now = get_clock().now()
+    risk_decision = evaluate_post_exit(session, trade_pnl=raw_net_pnl, trade_time=now)
     session.update(risk_decision.updated_session_state)
     # Keep trade-level P&L as actual executed result.
     # Risk engine may keep a capped stream for policy accounting separately.
@@ -242,9 +298,8 @@ def exit_paper_trade(session: dict, exit_price: float | None = None) -> dict[str
         except Exception:
             risk_capped_pnl = raw_net_pnl
     if session.get("status") == "STOPPED" and not session.get("stoppedAt"):
-        session["stoppedAt"] = datetime.now(ZoneInfo("Asia/Kolkata")).isoformat()
+        session["stoppedAt"] = now.isoformat()
 
-    now = datetime.now(ZoneInfo("Asia/Kolkata"))
     trade["exit_time"] = now.isoformat()
     trade["exit_price"] = exit_fill
     trade["pnl"] = net_pnl
@@ -306,9 +361,10 @@ def exit_paper_trade(session: dict, exit_price: float | None = None) -> dict[str
     }
 
 
-def _simulate_latency() -> None:
-    """Simulate execution latency (50ms to 1000ms)."""
-    time.sleep(random.uniform(0.05, MAX_SIM_LATENCY_SEC))
+def _simulate_latency(rng: random.Random, max_latency_sec: float = MAX_SIM_LATENCY_SEC) -> None:
+    """Simulate execution latency (50ms to max_latency_sec) on the process clock; a replay's
+    virtual clock accounts it without sleeping."""
+    get_clock().sleep(rng.uniform(0.05, max_latency_sec))
 
 
 def _estimate_volatility_pct(quote: dict[str, Any]) -> float:
@@ -339,14 +395,20 @@ def _estimate_spread_pct(quote: dict[str, Any]) -> float:
     return max(0.02, min(0.6, base + imbalance_penalty))
 
 
-def _apply_slippage(mid_price: float, side: str, spread_pct: float, volatility_pct: float) -> float:
+def _apply_slippage(
+    mid_price: float,
+    side: str,
+    spread_pct: float,
+    volatility_pct: float,
+    rng: random.Random | None = None,
+) -> float:
     """Apply side-aware slippage from spread and volatility."""
     if mid_price <= 0:
         return mid_price
     slip_bps = BASE_SLIPPAGE_BPS
     slip_bps += spread_pct * 35.0
     slip_bps += volatility_pct * 10.0
-    slip_bps *= random.uniform(0.8, 1.25)
+    slip_bps *= (rng or random).uniform(0.8, 1.25)
     slip_pct = max(0.0, min(0.8, slip_bps / 10000.0 * 100.0))
     if side.upper() == "BUY":
         return round(mid_price * (1 + slip_pct / 100.0), 2)
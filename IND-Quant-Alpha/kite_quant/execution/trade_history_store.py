@@ -1,10 +1,18 @@
 """
-Persist closed trades to data/trade_history.json.
+Persist closed trades to an append-only journal, data/trade_history.jsonl (one trade per line).
+
+Appends write a single line instead of rewriting the whole history. The journal is indexed in
+memory by mode, session_id and entry date, and daily P&L, per-strategy win rate and time-of-day
+P&L are kept up to date as trades are indexed, so readers query instead of re-parsing the file.
+Lines appended by another process are picked up on the next read (the reader tails the file).
+The legacy data/trade_history.json is imported once when the journal does not exist yet.
 """
 from __future__ import annotations
 
 import json
+import os
 import re
+from bisect import bisect_left, bisect_right, insort
 from pathlib import Path
 from threading import RLock
 from typing import Any
@@ -12,7 +20,9 @@ from typing import Any
 _BASE = Path(__file__).resolve().parent.parent
 _DATA_DIR = _BASE / "data"
 _HISTORY_FILE = _DATA_DIR / "trade_history.json"
-_lock = RLock()
+_JOURNAL_FILE = _DATA_DIR / "trade_history.jsonl"
+
+TIME_OF_DAY_SLOTS = ("9-10 AM", "10-11 AM", "11-12 PM", "12-1 PM", "1-2 PM", "2-3 PM", "3-4 PM")
 
 
 def _to_float(v: Any) -> float | None:
@@ -119,39 +129,249 @@ def _normalize_trade_record(trade: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def _load_all() -> list[dict[str, Any]]:
-    if not _HISTORY_FILE.exists():
-        return []
-    with _lock:
+def _time_slot(entry_time: str) -> str | None:
+    """Market-hour bucket of an ISO entry time (IST wall clock); pre-open counts as 9-10, post-close as 3-4."""
+    try:
+        hour = int(entry_time[11:13])
+    except (TypeError, ValueError):
+        return None
+    return TIME_OF_DAY_SLOTS[min(max(hour, 9), 15) - 9]
+
+
+def _new_agg() -> dict[str, Any]:
+    return {"trades": 0, "wins": 0, "losses": 0, "net_pnl": 0.0, "gross_pnl": 0.0, "charges": 0.0}
+
+
+def _add_to_agg(agg: dict[str, Any], trade: dict[str, Any]) -> None:
+    net = _to_float(trade.get("net_pnl", trade.get("pnl"))) or 0.0
+    agg["trades"] += 1
+    agg["wins"] += 1 if net > 0 else 0
+    agg["losses"] += 1 if net < 0 else 0
+    agg["net_pnl"] += net
+    gross = _to_float(trade.get("gross_pnl"))
+    agg["gross_pnl"] += net if gross is None else gross
+    agg["charges"] += _to_float(trade.get("charges")) or 0.0
+
+
+def _merge_aggs(aggs: list[dict[str, Any]]) -> dict[str, Any]:
+    out = _new_agg()
+    for agg in aggs:
+        for k in out:
+            out[k] += agg[k]
+    return out
+
+
+def _rounded(agg: dict[str, Any]) -> dict[str, Any]:
+    trades = agg["trades"]
+    return {
+        "trades": trades,
+        "wins": agg["wins"],
+        "losses": agg["losses"],
+        "win_rate_pct": round(agg["wins"] / trades * 100.0, 2) if trades else 0.0,
+        "net_pnl": round(agg["net_pnl"], 2),
+        "gross_pnl": round(agg["gross_pnl"], 2),
+        "charges": round(agg["charges"], 2),
+    }
+
+
+class TradeJournal:
+    """JSONL trade journal with in-memory indexes and running aggregates."""
+
+    def __init__(self, path: Path, legacy_path: Path | None = None) -> None:
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._lock = RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._offset = 0
+        self._trades: list[dict[str, Any]] = []
+        self._by_mode: dict[str, list[int]] = {}
+        self._by_session: dict[str, list[int]] = {}
+        self._by_date: dict[str, list[int]] = {}
+        self._dates: list[str] = []
+        # Aggregates keyed by mode first so "all modes" is a merge of a handful of entries.
+        self._daily: dict[tuple[str, str], dict[str, Any]] = {}
+        self._strategy: dict[tuple[str, str], dict[str, Any]] = {}
+        self._slots: dict[tuple[str, str, str], dict[str, Any]] = {}
+
+    # --- Loading / indexing ---
+
+    def _import_legacy(self) -> None:
+        """One-time import of the legacy JSON history into the journal (the JSON file is left as is)."""
+        if self.path.exists() or not self.legacy_path or not self.legacy_path.exists():
+            return
         try:
-            with open(_HISTORY_FILE, encoding="utf-8") as f:
+            with open(self.legacy_path, encoding="utf-8") as f:
                 data = json.load(f)
-            return data.get("trades") if isinstance(data, dict) else (data if isinstance(data, list) else [])
         except Exception:
-            return []
+            return
+        trades = data.get("trades") if isinstance(data, dict) else (data if isinstance(data, list) else [])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for t in trades or []:
+                if isinstance(t, dict):
+                    f.write(json.dumps(t, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+
+    def _refresh(self) -> None:
+        """Index lines appended since the last read (by this or another process)."""
+        self._import_legacy()
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            if self._offset:
+                self._reset()
+            return
+        if size < self._offset:  # journal replaced or truncated
+            self._reset()
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b"\n") + 1  # a partially written last line is picked up next time
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                trade = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(trade, dict):
+                self._index(trade)
+        self._offset += end
+
+    def _index(self, trade: dict[str, Any]) -> None:
+        pos = len(self._trades)
+        self._trades.append(trade)
+        mode = str(trade.get("mode") or "").upper()
+        day = str(trade.get("entry_time") or "")[:10]
+        self._by_mode.setdefault(mode, []).append(pos)
+        session_id = trade.get("session_id")
+        if session_id:
+            self._by_session.setdefault(str(session_id), []).append(pos)
+        if day not in self._by_date:
+            insort(self._dates, day)
+        self._by_date.setdefault(day, []).append(pos)
+        _add_to_agg(self._daily.setdefault((mode, day), _new_agg()), trade)
+        strategy = str(trade.get("strategy") or "")
+        _add_to_agg(self._strategy.setdefault((mode, strategy), _new_agg()), trade)
+        slot = _time_slot(str(trade.get("entry_time") or ""))
+        if slot:
+            _add_to_agg(self._slots.setdefault((mode, day, slot), _new_agg()), trade)
+
+    def _days(self, from_date: str | None, to_date: str | None) -> list[str]:
+        lo = bisect_left(self._dates, from_date) if from_date else 0
+        hi = bisect_right(self._dates, to_date) if to_date else len(self._dates)
+        return self._dates[lo:hi]
+
+    # --- Writes ---
+
+    def append(self, trade: dict[str, Any]) -> None:
+        line = json.dumps(_normalize_trade_record(trade), separators=(",", ":")) + "\n"
+        with self._lock:
+            self._refresh()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._refresh()
+
+    # --- Queries ---
+
+    def trades(
+        self,
+        mode: str | None = None,
+        session_id: str | None = None,
+        from_date: str | None = None,
+        to_date: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Trades in journal order matching every given filter; limit keeps the most recent N."""
+        with self._lock:
+            self._refresh()
+            candidates: list[list[int]] = []
+            if mode:
+                candidates.append(self._by_mode.get(mode.upper(), []))
+            if session_id:
+                candidates.append(self._by_session.get(session_id, []))
+            if from_date or to_date:
+                candidates.append(sorted(p for d in self._days(from_date, to_date) for p in self._by_date[d]))
+            if not candidates:
+                positions: list[int] | range = range(len(self._trades))
+            else:
+                candidates.sort(key=len)
+                rest = [set(c) for c in candidates[1:]]
+                positions = [p for p in candidates[0] if all(p in r for r in rest)]
+            if limit is not None:
+                positions = positions[-limit:] if limit > 0 else []
+            return [dict(self._trades[p]) for p in positions]
+
+    def daily_pnl(self, mode: str | None = None, from_date: str | None = None, to_date: str | None = None) -> list[dict[str, Any]]:
+        """Per-entry-date totals, oldest first."""
+        with self._lock:
+            self._refresh()
+            modes = [mode.upper()] if mode else list(self._by_mode)
+            rows = []
+            for day in self._days(from_date, to_date):
+                aggs = [self._daily[(m, day)] for m in modes if (m, day) in self._daily]
+                if aggs:
+                    rows.append({"date": day, **_rounded(_merge_aggs(aggs))})
+            return rows
+
+    def strategy_stats(self, mode: str | None = None) -> dict[str, dict[str, Any]]:
+        """Per-strategy totals and win rate."""
+        with self._lock:
+            self._refresh()
+            grouped: dict[str, list[dict[str, Any]]] = {}
+            for (m, strategy), agg in self._strategy.items():
+                if not mode or m == mode.upper():
+                    grouped.setdefault(strategy, []).append(agg)
+            return {strategy: _rounded(_merge_aggs(aggs)) for strategy, aggs in grouped.items()}
+
+    def time_of_day_pnl(self, mode: str | None = None, from_date: str | None = None, to_date: str | None = None) -> dict[str, float]:
+        """Net P&L per market-hour slot (by entry time)."""
+        with self._lock:
+            self._refresh()
+            modes = [mode.upper()] if mode else list(self._by_mode)
+            out = {slot: 0.0 for slot in TIME_OF_DAY_SLOTS}
+            for day in self._days(from_date, to_date):
+                for m in modes:
+                    for slot in TIME_OF_DAY_SLOTS:
+                        agg = self._slots.get((m, day, slot))
+                        if agg:
+                            out[slot] += agg["net_pnl"]
+            return {slot: round(v, 2) for slot, v in out.items()}
+
+
+_journal = TradeJournal(_JOURNAL_FILE, legacy_path=_HISTORY_FILE)
+
+
+def get_trade_journal() -> TradeJournal:
+    return _journal
+
+
+def set_trade_journal(journal: TradeJournal | None) -> None:
+    """Install a journal (replay / tests); None restores data/trade_history.jsonl."""
+    global _journal
+    _journal = journal if journal is not None else TradeJournal(_JOURNAL_FILE, legacy_path=_HISTORY_FILE)
 
 
 def append_trade(trade: dict[str, Any]) -> None:
-    """Append one closed trade to history and persist."""
-    _DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with _lock:
-        try:
-            data = {"trades": _load_all()}
-            if not isinstance(data["trades"], list):
-                data["trades"] = []
-            data["trades"].append(_normalize_trade_record(trade))
-            data["updatedAt"] = __import__("datetime").datetime.now().isoformat()
-            with open(_HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-        except Exception:
-            pass
+    """Append one closed trade to the journal."""
+    try:
+        _journal.append(trade)
+    except Exception:
+        pass
 
 
-def get_trade_history(mode: str | None = None, session_id: str | None = None) -> list[dict[str, Any]]:
-    """Return all trades, optionally filtered by mode and/or session_id."""
-    trades = _load_all()
-    if mode:
-        trades = [t for t in trades if t.get("mode") == mode]
-    if session_id:
-        trades = [t for t in trades if t.get("session_id") == session_id]
-    return trades
+def get_trade_history(
+    mode: str | None = None,
+    session_id: str | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Return trades, optionally filtered by mode, session_id and entry date range (YYYY-MM-DD, inclusive)."""
+    return _journal.trades(mode=mode, session_id=session_id, from_date=from_date, to_date=to_date, limit=limit)
@@ -4,6 +4,8 @@ Same logic used by Backtest, Paper, and Live.
 """
 from __future__ import annotations
 
+import numpy as np
+
 from .constants import (
     NIFTY,
     BANKNIFTY,
@@ -15,12 +17,23 @@ from .constants import (
 from .live_data import fetch_nifty50_live, fetch_bank_nifty_live
 
 
+def _model_premium(use_ce: bool, strike: float, spot: float, distance: int) -> float:
+    """Synthetic premium used when no live quote exists (backtests, offline)."""
+    if use_ce:
+        prem = max(50, 80 - (strike - spot) / 2 + (30 if distance == 0 else 0))
+    else:
+        prem = max(50, 80 + (spot - strike) / 2 + (30 if distance == 0 else 0))
+    return round(prem, 2)
+
+
 def get_index_option_candidates(
-    index_name: str, bias: str, spot: float
+    index_name: str, bias: str, spot: float, live_premiums: bool = False
 ) -> list[dict]:
     """
     Build option candidates (ATM, 1 OTM, 2 OTM) for index in the given direction.
     CE for BULLISH, PE for BEARISH. Same premium model used by Live, Paper, and Backtest.
+    With live_premiums, premiums/lot size come from the shared option chain (one batched quote
+    refresh) and fall back to the model per strike when a quote is missing.
     Returns list of dicts: type, strike, premium, lotSize, distanceFromATM, etc.
     """
     index_name = normalize_index_name(index_name)
@@ -29,28 +42,48 @@ def get_index_option_candidates(
         spot = default_spot(index_name)
     base_strike = round(spot / strike_step) * strike_step
     use_ce = bias == "BULLISH"
+    side = "CE" if use_ce else "PE"
     strikes = (
         [base_strike, base_strike + strike_step, base_strike + 2 * strike_step]
         if use_ce
         else [base_strike, base_strike - strike_step, base_strike - 2 * strike_step]
     )
+    live: dict[int, float] = {}
+    ivs: dict[int, float] = {}
+    symbols: dict[int, str] = {}
+    if live_premiums:
+        try:
+            from engine.option_chain import get_option_chain_engine
+
+            chain = get_option_chain_engine().refresh(index_name, spot, strikes=strikes)
+        except Exception:
+            chain = None
+        if chain is not None:
+            live = {k: v for k, v in chain.values_at(side, "ltp", strikes).items() if v > 0}
+            ivs = chain.values_at(side, "iv", strikes)
+            for i in chain.indices_for(strikes):
+                symbols[int(chain.strikes[i])] = chain.symbols[side][i]
+            lot_size = chain.lot_size or lot_size
     options = []
     for i, strike in enumerate(strikes):
-        if use_ce:
-            prem = max(50, 80 - (strike - spot) / 2 + (30 if i == 0 else 0))
-        else:
-            prem = max(50, 80 + (spot - strike) / 2 + (30 if i == 0 else 0))
-        prem = round(prem, 2)
+        prem = round(live[int(strike)], 2) if int(strike) in live else _model_premium(use_ce, strike, spot, i)
         total_cost = prem * lot_size
-        options.append({
-            "type": "CE" if use_ce else "PE",
+        opt = {
+            "type": side,
             "strike": strike,
             "premium": prem,
             "lotSize": lot_size,
             "lotCost": total_cost,
             "totalCost": round(total_cost, 2),
             "distanceFromATM": i,
-        })
+        }
+        if live_premiums:
+            opt["premiumSource"] = "live" if int(strike) in live else "model"
+            if int(strike) in symbols:
+                opt["tradingsymbol"] = symbols[int(strike)]
+            if int(strike) in ivs:
+                opt["iv"] = round(ivs[int(strike)] * 100.0, 2)
+        options.append(opt)
     return options
 
 
@@ -104,14 +137,15 @@ def get_affordable_index_options(
     if spot <= 0:
         spot = default_spot(index_name)
 
-    candidates = get_index_option_candidates(index_name, bias, spot)
+    candidates = get_index_option_candidates(index_name, bias, spot, live_premiums=True)
     options_sorted = sorted(
         candidates, key=lambda x: (x["premium"], x["distanceFromATM"])
     )
-    for o in options_sorted:
-        total_cost = o["premium"] * o["lotSize"]
-        o["status"] = "Affordable" if total_cost <= max_risk_per_trade else "Over Budget"
-        o["canTrade"] = total_cost <= max_risk_per_trade
+    costs = np.array([o["premium"] * o["lotSize"] for o in options_sorted], dtype=float)
+    affordable = costs <= max_risk_per_trade
+    for o, ok in zip(options_sorted, affordable.tolist()):
+        o["status"] = "Affordable" if ok else "Over Budget"
+        o["canTrade"] = ok
     top = options_sorted[:3]
 
     use_ce = bias == "BULLISH"
@@ -5,6 +5,8 @@ from __future__ import annotations
 
 from typing import Any
 
+from .signals import StrategySignals
+
 # Preferred return type for check_entry (full observability for Manual Mode)
 EntryCheckResult = dict[str, Any]  # can_enter, entry_price, reason, conditions
 
@@ -12,9 +14,14 @@ EntryCheckResult = dict[str, Any]  # can_enter, entry_price, reason, conditions
 class BaseStrategy:
     """Base class for all trading strategies. Data provider supplies candles and LTP."""
 
-    def __init__(self, instrument: str, data_provider: Any):
+    # Tunable parameters with their defaults (walk-forward optimisation). Subclasses read
+    # self.params; unknown keys passed to __init__ are ignored.
+    PARAMS: dict[str, Any] = {}
+
+    def __init__(self, instrument: str, data_provider: Any, params: dict[str, Any] | None = None):
         self.instrument = instrument
         self.data = data_provider
+        self.params = {**self.PARAMS, **{k: v for k, v in (params or {}).items() if k in self.PARAMS}}
 
     def check_entry(self) -> tuple[bool, float | None] | dict[str, Any]:
         """
@@ -26,6 +33,15 @@ class BaseStrategy:
         """
         raise NotImplementedError
 
+    def compute_signals(self, frame: Any) -> StrategySignals | None:
+        """
+        Optional vectorized entry mode for backtests.
+        Evaluate check_entry / get_stop_loss / get_target for every bar of an OHLCV frame at once
+        (a SignalFrame, CandleStore or OHLC DataFrame) and return StrategySignals, or None when the
+        strategy only supports bar-by-bar evaluation. Results must match check_entry at each bar.
+        """
+        return None
+
     def check_exit(self, trade: dict[str, Any]) -> str | None:
         """
         Check if trade should exit. Returns "STOP_LOSS", "TARGET", "TRAILING", or None.
@@ -1,11 +1,18 @@
 """
 Data provider for strategies: recent candles and LTP. Uses engine.data_fetcher and zerodha.
+VWAP and RSI are streaming engine.indicators series per instrument, advanced by the bars closed
+since the previous call rather than recomputed over the whole window.
 """
 from __future__ import annotations
 
+import math
 from typing import Any
 
 from engine.data_fetcher import fetch_nse_ohlc
+from engine.indicators import RollingVWAP, SimpleRSI, candle_series
+from engine.market_snapshot import market_snapshot
+from engine.tick_profiler import profile_stage
+from engine.tick_stream import get_tick_stream, merge_streamed_candles
 from engine.zerodha_client import get_quote as _kite_get_quote
 from nifty_banknifty_engine.constants import nse_symbol as _nse_symbol
 
@@ -21,38 +28,25 @@ def _interval_kite(interval: str) -> str:
     return interval or "5m"
 
 
-def get_recent_candles(
-    instrument: str,
-    interval: str = "5m",
-    count: int = 20,
-    period: str = "1d",
-) -> list[dict[str, Any]]:
-    """
-    Return list of recent candles, newest last. Each candle: open, high, low, close, volume, date (iso).
-    interval can be "5m" or "5minute".
-    """
+def _load_candles(symbol: str, interval: str, period: str) -> list[dict[str, Any]]:
+    """All candles fetch_nse_ohlc returns for symbol/interval/period, newest last."""
     import logging
     logger = logging.getLogger(__name__)
-    
-    symbol = _nse_symbol(instrument)
-    kite_interval = _interval_kite(interval)
-    logger.info(f"Fetching candles: instrument={instrument}, symbol={symbol}, interval={kite_interval}, period={period}")
-    
-    df = fetch_nse_ohlc(symbol, interval=kite_interval, period=period)
+
+    logger.info(f"Fetching candles: symbol={symbol}, interval={interval}, period={period}")
+    df = fetch_nse_ohlc(symbol, interval=interval, period=period)
     if df is None:
-        logger.error(f"fetch_nse_ohlc returned None for symbol={symbol}, interval={kite_interval}")
+        logger.error(f"fetch_nse_ohlc returned None for symbol={symbol}, interval={interval}")
         return []
     if df.empty:
-        logger.error(f"fetch_nse_ohlc returned empty dataframe for symbol={symbol}, interval={kite_interval}")
+        logger.error(f"fetch_nse_ohlc returned empty dataframe for symbol={symbol}, interval={interval}")
         return []
     if "Close" not in df.columns:
         logger.error(f"fetch_nse_ohlc missing 'Close' column for symbol={symbol}. Columns: {list(df.columns)}")
         return []
     # Standardize column names (Zerodha returns Datetime, Open, High, Low, Close, Volume)
-    rename = {"Datetime": "date", "Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
-    use = {rename.get(c, c.lower()): c for c in df.columns if c in rename or c.lower() in ("open", "high", "low", "close", "volume", "datetime")}
     out = []
-    for _, row in df.tail(count).iterrows():
+    for _, row in df.iterrows():
         c = {}
         if "Datetime" in df.columns:
             d = row.get("Datetime")
@@ -65,64 +59,93 @@ def get_recent_candles(
         c["close"] = float(row.get("Close", row.get("close", 0)))
         c["volume"] = float(row.get("Volume", row.get("volume", 0)))
         out.append(c)
+    return out
+
+
+def get_recent_candles(
+    instrument: str,
+    interval: str = "5m",
+    count: int = 20,
+    period: str = "1d",
+) -> list[dict[str, Any]]:
+    """
+    Return list of recent candles, newest last. Each candle: open, high, low, close, volume, date (iso).
+    interval can be "5m" or "5minute".
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    symbol = _nse_symbol(instrument)
+    kite_interval = _interval_kite(interval)
+    stream = get_tick_stream()
+    streamed = stream.get_candles(symbol, kite_interval, count) if stream else []
+    if len(streamed) >= count:
+        return streamed
     
-    logger.info(f"Successfully fetched {len(out)} candles for {symbol}")
+    # Within an engine tick, every caller on this instrument slices one fetch from the market snapshot.
+    def load() -> list[dict[str, Any]]:
+        with profile_stage("candle_fetch"):
+            return _load_candles(symbol, kite_interval, period)
+
+    snapshot = market_snapshot(symbol)
+    candles = snapshot.candles(kite_interval, period, load) if snapshot else load()
+    if not candles:
+        return streamed
+    # Copies: the snapshot's candle dicts are shared by every session on this instrument.
+    out = merge_streamed_candles([dict(c) for c in candles[-count:]] if count > 0 else [], streamed, count)
     if len(out) < 3:
         logger.warning(f"Only {len(out)} candles available for {symbol} - may not be enough for strategy")
     
     return out
 
 
+def _quote(symbol: str, exchange: str) -> dict[str, Any]:
+    def load() -> dict[str, Any]:
+        return _kite_get_quote(symbol, exchange=exchange)
+
+    snapshot = market_snapshot(symbol, exchange)
+    return snapshot.quote(load) if snapshot else load()
+
+
 def get_quote(symbol: str, exchange: str = "NSE") -> dict[str, Any]:
     """Get quote from Zerodha. For NFO options pass exchange='NFO' and symbol as tradingsymbol."""
-    return _kite_get_quote(symbol, exchange=exchange)
+    stream = get_tick_stream()
+    streamed = stream.get_quote(symbol, exchange) if stream else None
+    if streamed:
+        return streamed
+    return dict(_quote(symbol, exchange))
 
 
 def get_ltp(instrument: str) -> float:
     """Return last traded price for instrument (NSE)."""
     symbol = _nse_symbol(instrument)
-    quote = _kite_get_quote(symbol)
+    stream = get_tick_stream()
+    streamed = stream.get_quote(symbol) if stream else None
+    if streamed:
+        return float(streamed["last"])
+    quote = _quote(symbol, "NSE")
     return float(quote.get("last", 0) or quote.get("last_price", 0))
 
 
 def get_vwap(instrument: str, interval: str = "5m", count: int = 50, period: str = "3d") -> float:
     """Volume-weighted average price from recent candles. Returns 0 if no data."""
     candles = get_recent_candles(instrument, interval=interval, count=count, period=period)
-    if not candles:
+    if not candles or count <= 0:
         return 0.0
-    total_vtp = 0.0
-    total_vol = 0.0
-    for c in candles:
-        typical = (c.get("high", 0) + c.get("low", 0) + c.get("close", 0)) / 3.0
-        vol = c.get("volume") or 0
-        total_vtp += typical * vol
-        total_vol += vol
-    if total_vol <= 0:
+    key = ("vwap", _nse_symbol(instrument), _interval_kite(interval), count)
+    value = candle_series(key, lambda: RollingVWAP(count)).value(candles[-count:])
+    if math.isnan(value):
         return float(candles[-1].get("close", 0))
-    return round(total_vtp / total_vol, 2)
-
-
-def _rsi_from_prices(prices: list[float], period: int) -> float | None:
-    if not prices or len(prices) < period + 1:
-        return None
-    changes = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
-    gains = [c if c > 0 else 0.0 for c in changes[-period:]]
-    losses = [-c if c < 0 else 0.0 for c in changes[-period:]]
-    avg_gain = sum(gains) / period
-    avg_loss = sum(losses) / period
-    if avg_loss == 0:
-        return 100.0
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+    return round(value, 2)
 
 
 def get_rsi(instrument: str, interval: str = "5m", period: int = 14, count: int | None = None, data_period: str = "2d") -> float | None:
     """RSI from recent close prices. Returns None if not enough data."""
     need = (count or period + 2)
     candles = get_recent_candles(instrument, interval=interval, count=need, period=data_period)
-    if not candles:
-        return None
-    closes = [float(c.get("close", 0)) for c in candles if c.get("close")]
-    if len(closes) < period + 1:
+    candles = [c for c in candles or [] if c.get("close")]
+    if len(candles) < period + 1:
         return None
-    return _rsi_from_prices(closes, period)
+    key = ("rsi", _nse_symbol(instrument), _interval_kite(interval), period)
+    value = candle_series(key, lambda: SimpleRSI(period)).value(candles)
+    return None if math.isnan(value) else value
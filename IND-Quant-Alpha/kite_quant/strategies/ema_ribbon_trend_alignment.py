@@ -3,7 +3,12 @@ EMA Ribbon Trend Alignment: 9/20/50 EMA stacked trend.
 """
 from __future__ import annotations
 
+import numpy as np
+
+from engine.indicators import ema_last
+
 from .base_strategy import BaseStrategy
+from .signals import SignalFrame, StrategySignals, round_at, rolling_max, rolling_min, window_ema
 
 
 class EMARibbonTrendAlignment(BaseStrategy):
@@ -12,11 +17,7 @@ class EMARibbonTrendAlignment(BaseStrategy):
     def _ema(self, candles: list[dict], period: int) -> float:
         if not candles or len(candles) < period:
             return 0.0
-        k = 2.0 / (period + 1)
-        ema = float(candles[0].get("close", 0))
-        for c in candles[1:]:
-            ema = float(c.get("close", 0)) * k + ema * (1 - k)
-        return ema
+        return ema_last([float(c.get("close", 0)) for c in candles], period)
 
     def check_entry(self) -> tuple[bool, float | None]:
         # EMA ribbon needs 50+ for multiple EMAs (9,21,50)
@@ -35,6 +36,34 @@ class EMARibbonTrendAlignment(BaseStrategy):
             return True, round(ltp, 2)
         return False, None
 
+    def compute_signals(self, frame) -> StrategySignals:
+        f = SignalFrame.from_any(frame)
+        n = len(f)
+        ema9 = window_ema(f.close, 15, 9)
+        ema20 = window_ema(f.close, 30, 20)
+        ema50 = window_ema(f.close, 50, 50)
+        ltp = f.close
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ready = (np.arange(n) >= 49) & (ema9 > 0)
+            near = np.abs(ltp - ema9) / ema9 < 0.002
+            stacked = ((ema9 > ema20) & (ema20 > ema50)) | ((ema9 < ema20) & (ema20 < ema50))
+        entry = ready & stacked & near
+        price = round_at(ltp, entry)
+        # Stop/target as get_stop_loss/get_target: 10-bar swing low/high, 2R target
+        last_open = f.open
+        sl = np.where(price > last_open, rolling_min(f.low, 10), rolling_max(f.high, 10))
+        sl = round_at(sl, entry)
+        risk = np.abs(price - sl)
+        target = np.where(
+            risk <= 0, price * 1.02, np.where(price > sl, price + risk * 2, price - risk * 2)
+        )
+        sig = StrategySignals.empty(n)
+        sig.entry = entry
+        sig.entry_price = price
+        sig.stop_loss = sl
+        sig.target = round_at(target, entry)
+        return sig
+
     def get_stop_loss(self, entry_price: float) -> float:
         candles = self.data.get_recent_candles(self.instrument, interval="5m", count=10)
         if not candles:
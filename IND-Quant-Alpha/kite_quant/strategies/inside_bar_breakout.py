@@ -3,7 +3,10 @@ Inside Bar Breakout: trade breakout from volatility coil (inside bar) with volum
 """
 from __future__ import annotations
 
+import numpy as np
+
 from .base_strategy import BaseStrategy
+from .signals import SignalFrame, StrategySignals, bars_available, lagged, round_at, rolling_sum
 
 
 class InsideBarBreakout(BaseStrategy):
@@ -37,6 +40,28 @@ class InsideBarBreakout(BaseStrategy):
 
         return False, None
 
+    def compute_signals(self, frame) -> StrategySignals:
+        f = SignalFrame.from_any(frame)
+        n = len(f)
+        avg_vol = rolling_sum(f.volume, 5) / np.maximum(bars_available(n, 5), 1)
+        inside_high, inside_low = lagged(f.high, 1), lagged(f.low, 1)
+        is_inside = (inside_high < lagged(f.high, 2)) & (inside_low > lagged(f.low, 2))
+        surge = f.volume > avg_vol
+        breakout = (f.close > inside_high) | (f.close < inside_low)
+        entry = (np.arange(n) >= 2) & (avg_vol > 0) & is_inside & surge & breakout
+        price = round_at(f.close, entry)
+        up = price > inside_high
+        range_size = inside_high - inside_low
+        target = np.where(
+            range_size <= 0, price * 1.01, np.where(up, price + range_size, price - range_size)
+        )
+        sig = StrategySignals.empty(n)
+        sig.entry = entry
+        sig.entry_price = price
+        sig.stop_loss = round_at(np.where(up, inside_low, inside_high), entry)
+        sig.target = round_at(target, entry)
+        return sig
+
     def get_stop_loss(self, entry_price: float) -> float:
         candles = self.data.get_recent_candles(self.instrument, interval="5m", count=3)
         if not candles or len(candles) < 2:
@@ -3,13 +3,20 @@ Momentum Breakout: new high with volume spike = entry. SL 0.5%, target 1%.
 """
 from __future__ import annotations
 
+import numpy as np
+
 from .base_strategy import BaseStrategy
+from .signals import SignalFrame, StrategySignals, bars_available, rolling_max, rolling_sum
 
 
 class MomentumBreakout(BaseStrategy):
+    # lookback: prior bars the breakout must clear; volume_mult: spike vs their average volume
+    PARAMS = {"lookback": 9, "volume_mult": 1.5}
+
     def check_entry(self) -> dict:
         # Momentum needs 5-10 recent candles for breakout detection
-        candles = self.data.get_recent_candles(self.instrument, interval="5m", count=10, period="2d")
+        lookback = int(self.params["lookback"])
+        candles = self.data.get_recent_candles(self.instrument, interval="5m", count=lookback + 1, period="2d")
         if not candles or len(candles) < 3:
             return {
                 "can_enter": False,
@@ -22,7 +29,7 @@ class MomentumBreakout(BaseStrategy):
         high_break = last["close"] > max(c["high"] for c in prev)
         avg_vol = sum(c.get("volume", 0) or 0 for c in prev) / max(len(prev), 1)
         vol = last.get("volume") or 0
-        volume_spike = avg_vol > 0 and vol >= 1.5 * avg_vol
+        volume_spike = avg_vol > 0 and vol >= self.params["volume_mult"] * avg_vol
         if high_break and volume_spike:
             return {
                 "can_enter": True,
@@ -50,6 +57,23 @@ class MomentumBreakout(BaseStrategy):
         # 2% target - VERY easy to hit, exits fast
         return round(entry_price * 1.02, 2)
 
+    def compute_signals(self, frame) -> StrategySignals:
+        f = SignalFrame.from_any(frame)
+        n = len(f)
+        lookback = int(self.params["lookback"])
+        prev_count = bars_available(n, lookback, lag=1)
+        high_break = f.close > rolling_max(f.high, lookback, lag=1)
+        avg_vol = rolling_sum(f.volume, lookback, lag=1) / np.maximum(prev_count, 1)
+        volume_spike = (avg_vol > 0) & (f.volume >= self.params["volume_mult"] * avg_vol)
+        entry = (prev_count >= 2) & high_break & volume_spike
+        sig = StrategySignals.empty(n)
+        sig.entry = entry
+        sig.entry_price[entry] = f.close[entry]
+        for i in np.flatnonzero(entry):
+            sig.stop_loss[i] = self.get_stop_loss(float(f.close[i]))
+            sig.target[i] = self.get_target(float(f.close[i]))
+        return sig
+
     def check_exit(self, trade: dict) -> str | None:
         # Use base strategy's trailing stop loss implementation
         return super().check_exit(trade)
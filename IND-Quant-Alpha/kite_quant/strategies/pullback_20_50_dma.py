@@ -3,6 +3,8 @@ Pullback to 20/50 EMA: intraday approximation of DMA pullback.
 """
 from __future__ import annotations
 
+from engine.indicators import ema_last
+
 from .base_strategy import BaseStrategy
 
 
@@ -12,11 +14,7 @@ class Pullback2050DMA(BaseStrategy):
     def _ema(self, candles: list[dict], period: int) -> float:
         if not candles or len(candles) < period:
             return 0.0
-        k = 2.0 / (period + 1)
-        ema = float(candles[0].get("close", 0))
-        for c in candles[1:]:
-            ema = float(c.get("close", 0)) * k + ema * (1 - k)
-        return ema
+        return ema_last([float(c.get("close", 0)) for c in candles], period)
 
     def check_entry(self) -> tuple[bool, float | None]:
         candles = self.data.get_recent_candles(self.instrument, interval="5m", count=60)
@@ -0,0 +1,116 @@
+"""
+Vectorized entry signals: whole-series counterparts of check_entry / get_stop_loss / get_target.
+
+A strategy that overrides BaseStrategy.compute_signals evaluates every bar of an OHLCV frame at
+once and returns StrategySignals; the backtest engine then reads bar i from the arrays instead of
+calling check_entry() on each candle. Trailing windows mirror get_recent_candles(count=N): the N
+bars ending at the current bar, truncated at the start of the series. Sums accumulate oldest-first
+and prices are rounded with Python's round(), so values match the bar-by-bar code exactly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+import numpy as np
+
+
+class SignalFrame(NamedTuple):
+    """OHLCV columns as contiguous float64 arrays (one element per bar)."""
+
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_any(cls, frame: Any) -> "SignalFrame":
+        """Build from a CandleStore (open/high/low/close/volume attributes) or an OHLC DataFrame."""
+        if isinstance(frame, cls):
+            return frame
+        columns = []
+        for name in cls._fields:
+            if hasattr(frame, "columns"):
+                key = name if name in frame.columns else name.capitalize()
+                values = frame[key].to_numpy() if key in frame.columns else np.zeros(len(frame))
+            else:
+                values = getattr(frame, name)
+            columns.append(np.ascontiguousarray(values, dtype=np.float64))
+        return cls(*columns)
+
+    def __len__(self) -> int:  # type: ignore[override]
+        return len(self.close)
+
+
+@dataclass
+class StrategySignals:
+    """Per-bar entry decision with the stop/target the strategy would set at that bar."""
+
+    entry: np.ndarray  # bool
+    entry_price: np.ndarray  # float64; stop/target/price are only meaningful where entry is set
+    stop_loss: np.ndarray
+    target: np.ndarray
+
+    @classmethod
+    def empty(cls, n: int) -> "StrategySignals":
+        nan = np.full(n, np.nan)
+        return cls(np.zeros(n, dtype=bool), nan.copy(), nan.copy(), nan.copy())
+
+
+def lagged(values: np.ndarray, lag: int, fill: float = np.nan) -> np.ndarray:
+    """values shifted forward by lag bars (bar i sees bar i - lag); the first lag bars get fill."""
+    if lag <= 0:
+        return values
+    out = np.full(len(values), fill, dtype=np.float64)
+    if lag < len(values):
+        out[lag:] = values[:-lag]
+    return out
+
+
+def bars_available(n: int, count: int, lag: int = 0) -> np.ndarray:
+    """How many bars a `count`-bar window ending lag bars back holds at each bar (truncated at the start)."""
+    return np.clip(np.arange(n) + 1 - lag, 0, count)
+
+
+def rolling_sum(values: np.ndarray, count: int, lag: int = 0) -> np.ndarray:
+    """Sum of the count bars ending lag bars back, added oldest-first like sum() over a candle slice."""
+    total = np.zeros(len(values), dtype=np.float64)
+    for k in range(count - 1, -1, -1):
+        total = total + lagged(values, lag + k, 0.0)
+    return total
+
+
+def rolling_max(values: np.ndarray, count: int, lag: int = 0) -> np.ndarray:
+    out = np.full(len(values), -np.inf)
+    for k in range(count):
+        out = np.maximum(out, lagged(values, lag + k, -np.inf))
+    return out
+
+
+def rolling_min(values: np.ndarray, count: int, lag: int = 0) -> np.ndarray:
+    out = np.full(len(values), np.inf)
+    for k in range(count):
+        out = np.minimum(out, lagged(values, lag + k, np.inf))
+    return out
+
+
+def window_ema(close: np.ndarray, length: int, period: int) -> np.ndarray:
+    """
+    EMA over the last `length` closes, seeded with the window's first close, at every bar:
+    the vector form of a strategy's _ema(candles[-length:], period). Bars with fewer than
+    `length` closes behind them are NaN.
+    """
+    k = 2.0 / (period + 1)
+    ema = lagged(close, length - 1)
+    for lag in range(length - 2, -1, -1):
+        ema = lagged(close, lag) * k + ema * (1 - k)
+    return ema
+
+
+def round_at(values: np.ndarray, mask: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """Python round() applied where mask is set (NumPy's rounding can differ in the last digit)."""
+    out = np.array(values, dtype=np.float64, copy=True)
+    for i in np.flatnonzero(mask):
+        out[i] = round(float(out[i]), ndigits)
+    return out
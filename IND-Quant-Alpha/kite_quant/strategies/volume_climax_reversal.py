@@ -3,7 +3,10 @@ Volume Climax Reversal: exhaustion after extreme volume spike.
 """
 from __future__ import annotations
 
+import numpy as np
+
 from .base_strategy import BaseStrategy
+from .signals import SignalFrame, StrategySignals, lagged, round_at, rolling_sum
 
 
 class VolumeClimaxReversal(BaseStrategy):
@@ -44,6 +47,29 @@ class VolumeClimaxReversal(BaseStrategy):
             return round(entry_price * 1.01, 2)
         return round(sum(c["close"] for c in candles) / len(candles), 2)
 
+    def compute_signals(self, frame) -> StrategySignals:
+        f = SignalFrame.from_any(frame)
+        n = len(f)
+        avg_vol = rolling_sum(f.volume, 10) / 10
+        avg_range = rolling_sum(np.abs(f.close - f.open), 10) / 10
+        c_open, c_close = lagged(f.open, 1), lagged(f.close, 1)
+        climax = (
+            (np.arange(n) >= 9)
+            & (avg_vol > 0) & (avg_range > 0)
+            & (lagged(f.volume, 1) > avg_vol * 3)
+            & (np.abs(c_close - c_open) > avg_range * 2)
+        )
+        bullish = (f.close > f.open) & (c_close < c_open)
+        bearish = (f.close < f.open) & (c_close > c_open)
+        entry = climax & (bullish | bearish)
+        sig = StrategySignals.empty(n)
+        sig.entry = entry
+        sig.entry_price = round_at(f.close, entry)
+        c_high, c_low = lagged(f.high, 1), lagged(f.low, 1)
+        sig.stop_loss = round_at(np.where(sig.entry_price < c_open, c_high, c_low), entry)
+        sig.target = round_at(rolling_sum(f.close, 10) / 10, entry)
+        return sig
+
     def check_exit(self, trade: dict) -> str | None:
         ltp = self._get_exit_ltp(trade)
         if ltp <= 0:
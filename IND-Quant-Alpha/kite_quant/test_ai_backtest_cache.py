@@ -0,0 +1,144 @@
+"""
+Test script for the AI backtest decision cache and parallel day simulation (backtest.ai_backtest).
+Runs synthetic NIFTY days offline on the stub LLM backend; the decision cache lives in a temp dir.
+"""
+import json
+import random
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backtest.ai_backtest import iter_day_results
+from engine.ai_strategy_advisor import build_gpt_prompt, get_ai_strategy_recommendation
+from engine.llm_decisions import DecisionCache, StubLLMBackend, get_decision_cache, set_decision_cache, set_llm_backend
+from engine.sim_clock import IST
+
+
+def _day_jobs(days=3, seed=5):
+    rng = random.Random(seed)
+    jobs = []
+    price = 22000.0
+    for d in range(days):
+        trade_date = date(2025, 1, 13) + timedelta(days=d)
+        start = datetime(trade_date.year, trade_date.month, trade_date.day, 9, 15, tzinfo=IST)
+        drift = 0.0006 if d % 2 == 0 else -0.0006
+        candles = []
+        for i in range(75):
+            o = price
+            c = o * (1 + drift + rng.gauss(0, 0.0012))
+            candles.append({
+                "timestamp": (start + timedelta(minutes=5 * i)).isoformat(),
+                "open": o, "close": c,
+                "high": max(o, c) * (1 + abs(rng.gauss(0, 0.0004))),
+                "low": min(o, c) * (1 - abs(rng.gauss(0, 0.0004))),
+                "volume": rng.randint(10000, 90000),
+            })
+            price = c
+        jobs.append({
+            "instrument": "NIFTY 50", "trade_date": trade_date, "candles": candles,
+            "current_capital": 100000.0, "risk_percent": 2.0, "ai_enabled": True, "ai_check_interval": 30,
+        })
+    return jobs
+
+
+def _fingerprint(results):
+    return [
+        (job["trade_date"].isoformat(), round(r["daily_pnl"], 6), r["ai_switches"],
+         [(t["entry_time"], t["exit_time"], t["strategy"], t["qty"], round(t["net_pnl"], 6)) for t in r["trades"]])
+        for job, r in results
+    ]
+
+
+def test_decision_cache_roundtrip():
+    """Keys are content hashes of (model, system, prompt); entries are visible to a second reader"""
+    print("\n=== TEST 1: Decision Cache ===")
+    prompt = build_gpt_prompt({"timestamp": "2025-01-13T09:45:00+05:30", "price_action": {
+        "trend": "bullish", "volume_spike": False, "range_low": 1.0, "range_high": 2.0}}, "RSI Reversal Fade")
+    stub = StubLLMBackend()
+    answer = json.loads(stub.complete("sys", prompt))
+    assert answer["recommended_strategy"] == "Momentum Breakout" and answer["switch_from_current"] is True
+    assert stub.complete("sys", prompt) == stub.complete("sys", prompt)
+    key = DecisionCache.key(stub.model, "sys", prompt)
+    assert key == DecisionCache.key(stub.model, "sys", prompt) != DecisionCache.key(stub.model, "sys", prompt + " ")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "decisions.jsonl"
+        writer, reader = DecisionCache(path), DecisionCache(path)
+        assert reader.get(key) is None
+        writer.put(key, stub.model, stub.complete("sys", prompt))
+        writer.put(key, stub.model, "{}")  # first answer wins
+        assert json.loads(reader.get(key)) == answer
+        assert len(reader) == 1 and reader.hits == 1 and reader.misses == 1
+    print("[PASS] content-addressed entries shared through the cache file")
+
+
+def test_rerun_replays_cached_decisions():
+    """A rerun over the same days makes no model calls and reproduces every trade"""
+    print("\n=== TEST 2: Cached Rerun ===")
+    jobs = _day_jobs()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "decisions.jsonl"
+            first_stub = StubLLMBackend()
+            set_llm_backend(first_stub)
+            first = _fingerprint(iter_day_results(jobs, max_workers=1, cache_path=path))
+            entries = len(DecisionCache(path))
+            assert first_stub.calls > 0 and entries > 0
+            rerun_stub = StubLLMBackend()
+            set_llm_backend(rerun_stub)
+            second = _fingerprint(iter_day_results(jobs, max_workers=1, cache_path=path))
+            assert rerun_stub.calls == 0, rerun_stub.calls
+            assert second == first and len(DecisionCache(path)) == entries
+            assert get_decision_cache() is None  # cache is scoped to the run
+    finally:
+        set_llm_backend(None)
+    assert sum(len(day[3]) for day in first) > 0
+    print(f"[PASS] {first_stub.calls} model calls on the first run, 0 on the rerun ({entries} cached decisions)")
+
+
+def test_parallel_days_match_sequential():
+    """Days simulated in worker processes match the in-process run and fill the shared cache"""
+    print("\n=== TEST 3: Parallel Days ===")
+    jobs = _day_jobs(4, seed=8)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            set_llm_backend(StubLLMBackend())
+            sequential = _fingerprint(iter_day_results(jobs, max_workers=1, cache_path=None))
+            path = Path(tmp) / "decisions.jsonl"
+            parallel_results = list(iter_day_results(jobs, max_workers=2, cache_path=path))
+            assert [job["trade_date"] for job, _ in parallel_results] == [job["trade_date"] for job in jobs]
+            assert _fingerprint(parallel_results) == sequential
+            assert len(DecisionCache(path)) > 0  # written by the workers
+            rerun_stub = StubLLMBackend()
+            set_llm_backend(rerun_stub)
+            assert _fingerprint(iter_day_results(jobs, max_workers=1, cache_path=path)) == sequential
+            assert rerun_stub.calls == 0
+    finally:
+        set_llm_backend(None)
+    print(f"[PASS] {len(jobs)} days identical across 2 workers and in-process")
+
+
+def test_live_calls_stay_uncached():
+    """Without an installed cache the advisor calls the backend every time"""
+    print("\n=== TEST 4: Live Path Uncached ===")
+    stub = StubLLMBackend()
+    set_llm_backend(stub)
+    try:
+        set_decision_cache(None)
+        context = {"timestamp": "2025-01-13T14:30:00+05:30"}
+        first = get_ai_strategy_recommendation(context, "Momentum Breakout")
+        second = get_ai_strategy_recommendation(context, "Momentum Breakout")
+        assert first == second and first["recommended_strategy"] == "Pullback Continuation"
+        assert first["rejected"] is False and stub.calls == 2
+    finally:
+        set_llm_backend(None)
+    print("[PASS] advisor uses the stub backend without caching")
+
+
+if __name__ == "__main__":
+    test_decision_cache_roundtrip()
+    test_rerun_replays_cached_decisions()
+    test_parallel_days_match_sequential()
+    test_live_calls_stay_uncached()
@@ -0,0 +1,113 @@
+"""
+Test script for the columnar BacktestDataProvider.
+Checks provider lookups and strategy entries match the list-of-dicts reference at every bar.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backtest.backtest_data_provider import BacktestDataProvider, CandleStore, _rsi_from_prices
+from candle_fixtures import make_candles
+from strategies.strategy_registry import STRATEGY_MAP
+
+
+class ListDataProvider:
+    """Reference provider: slices the candle list and recomputes on every call (pre-columnar behaviour)."""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.current_index = 0
+
+    def set_index(self, i):
+        self.current_index = max(0, min(i, len(self.candles) - 1))
+
+    def get_recent_candles(self, instrument, interval="5m", count=20, period="1d"):
+        end = self.current_index + 1
+        return self.candles[max(0, end - count):end]
+
+    def get_ltp(self, instrument):
+        c = self.candles[self.current_index]
+        return float(c.get("close", 0) or c.get("open", 0))
+
+    def get_quote(self, instrument, exchange="NSE"):
+        ltp = self.get_ltp(instrument)
+        return {"last": ltp, "last_price": ltp}
+
+    def get_vwap(self, instrument, interval="5m", count=50, period=None):
+        candles = self.get_recent_candles(instrument, count=count)
+        total_vtp = sum((c["high"] + c["low"] + c["close"]) / 3.0 * c["volume"] for c in candles)
+        total_vol = sum(c["volume"] for c in candles)
+        if total_vol <= 0:
+            return float(candles[-1]["close"])
+        return round(total_vtp / total_vol, 2)
+
+    def get_rsi(self, instrument, interval="5m", period=14, count=None, data_period=None):
+        candles = self.get_recent_candles(instrument, count=count or period + 2)
+        closes = [float(c["close"]) for c in candles if c.get("close")]
+        if len(closes) < period + 1:
+            return None
+        return _rsi_from_prices(closes, period)
+
+
+def test_candle_views_match_dicts():
+    """CandleWindow/CandleView expose the same values as the original dicts"""
+    print("\n=== TEST 1: Candle Views ===")
+    candles = make_candles(50, spike_prob=0.03)
+    provider = BacktestDataProvider(candles)
+    provider.set_index(30)
+    window = provider.get_recent_candles("NIFTY", count=10)
+    assert len(window) == 10
+    assert [c.to_dict() for c in window] == candles[21:31]
+    assert window[-1]["close"] == candles[30]["close"]
+    assert window[-3:][0].get("volume") == candles[28]["volume"]
+    assert window[0].get("missing", 0) == 0
+    assert list(window.column("close")) == [c["close"] for c in candles[21:31]]
+    print("[PASS] views match source dicts")
+
+
+def test_indicator_parity():
+    """VWAP/RSI/LTP lookups match the slice-and-recompute reference at every bar"""
+    print("\n=== TEST 2: Indicator Parity ===")
+    candles = make_candles(spike_prob=0.03)
+    ref = ListDataProvider(candles)
+    provider = BacktestDataProvider(CandleStore.from_candles(candles))
+    for i in range(len(candles)):
+        ref.set_index(i)
+        provider.set_index(i)
+        assert provider.get_ltp("NIFTY") == ref.get_ltp("NIFTY")
+        for count in (5, 10, 20, 50):
+            assert provider.get_vwap("NIFTY", count=count) == ref.get_vwap("NIFTY", count=count), (i, count)
+        for count in (None, 20):
+            a = provider.get_rsi("NIFTY", period=14, count=count)
+            b = ref.get_rsi("NIFTY", period=14, count=count)
+            assert (a is None and b is None) or abs(a - b) < 1e-9, (i, count, a, b)
+    print(f"[PASS] {len(candles)} bars checked")
+
+
+def test_strategy_entry_parity():
+    """Every registered strategy gives identical entries/stops/targets on both providers"""
+    print("\n=== TEST 3: Strategy Entry Parity ===")
+    candles = make_candles(400, spike_prob=0.03)
+    ref = ListDataProvider(candles)
+    provider = BacktestDataProvider(candles)
+    for name, strategy_class in STRATEGY_MAP.items():
+        s_ref = strategy_class("NIFTY", ref)
+        s_new = strategy_class("NIFTY", provider)
+        for i in range(len(candles)):
+            ref.set_index(i)
+            provider.set_index(i)
+            a = s_ref.check_entry()
+            b = s_new.check_entry()
+            assert a == b, (name, i, a, b)
+            entry = a.get("entry_price") if isinstance(a, dict) else a[1]
+            if entry is not None:
+                assert s_ref.get_stop_loss(entry) == s_new.get_stop_loss(entry), (name, i)
+                assert s_ref.get_target(entry) == s_new.get_target(entry), (name, i)
+    print(f"[PASS] {len(STRATEGY_MAP)} strategy entries checked")
+
+
+if __name__ == "__main__":
+    test_candle_views_match_dicts()
+    test_indicator_parity()
+    test_strategy_entry_parity()
@@ -0,0 +1,144 @@
+"""
+Test script for the parameter sweep runner (backtest.batch_runner).
+Candles come from a load_candles stub (synthetic 5-minute sessions), so no broker connection is
+needed; the sweep's leaderboard is checked against sequential run_backtest_on_candles runs.
+"""
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backtest import batch_runner
+from backtest.backtest_engine import run_backtest_on_candles
+from backtest.batch_runner import build_sweep_grid, rank_results, run_parameter_sweep, unique_strategy_names
+from strategies.strategy_registry import STRATEGY_MAP
+from candle_fixtures import SESSIONS, make_store
+
+STRATEGIES = ["Momentum Breakout", "VWAP Trend Ride"]
+DATE_RANGE = ("2024-01-01", "2024-01-08")
+RISKS = [{"risk_percent_per_trade": 1.0}, {"risk_percent_per_trade": 2.0, "max_trades": 5}]
+PRICES = {"NIFTY": 22000.0, "BANKNIFTY": 48000.0}
+
+
+def _series(instrument, days=8):
+    return make_store(days * 75, instrument, price=PRICES[instrument], vol=0.002, drift=0.0001, spike_prob=0.08, **SESSIONS)
+
+
+def test_build_sweep_grid():
+    """Grid is instruments x date ranges x strategies x risk settings with sequential job ids"""
+    print("\n=== TEST 1: Sweep Grid ===")
+    ranges = [DATE_RANGE, ("2024-01-09", "2024-01-16")]
+    jobs = build_sweep_grid(["NIFTY", "BANKNIFTY"], STRATEGIES, ranges, RISKS)
+    assert len(jobs) == 2 * 2 * 2 * 2
+    assert [j.job_id for j in jobs] == list(range(len(jobs)))
+    assert len({j.series_key for j in jobs}) == 4
+    assert {(j.instrument, j.strategy, j.from_date, j.risk["risk_percent_per_trade"]) for j in jobs} == {
+        (i, s, r[0], k["risk_percent_per_trade"]) for i in ("NIFTY", "BANKNIFTY") for s in STRATEGIES for r in ranges for k in RISKS
+    }
+    jobs[0].risk["max_trades"] = 1
+    assert "max_trades" not in jobs[2].risk  # each job owns its risk dict
+    default = build_sweep_grid(["NIFTY"], None, [DATE_RANGE])
+    names = unique_strategy_names()
+    assert [j.strategy for j in default] == names and all(j.risk == {} for j in default)
+    assert len({STRATEGY_MAP[n] for n in names}) == len(names) == len(set(STRATEGY_MAP.values()))
+    print(f"[PASS] {len(jobs)} jobs, default grid covers {len(names)} strategy classes")
+
+
+def test_rank_results():
+    """Net PnL first, then win rate, then lower drawdown; errored runs last and unranked"""
+    print("\n=== TEST 2: Leaderboard Ranking ===")
+    rows = [
+        {"job_id": 0, "net_pnl": 500, "win_rate": 50, "max_drawdown": 3},
+        {"job_id": 1, "net_pnl": 900, "win_rate": 40, "max_drawdown": 9},
+        {"job_id": 2, "net_pnl": 500, "win_rate": 60, "max_drawdown": 5},
+        {"job_id": 3, "net_pnl": 500, "win_rate": 60, "max_drawdown": 2},
+        {"job_id": 4, "net_pnl": 0, "error": "Insufficient candles"},
+        {"job_id": 5, "net_pnl": -100, "win_rate": 90, "max_drawdown": 1},
+    ]
+    ranked = rank_results(rows)
+    assert [r["job_id"] for r in ranked] == [1, 3, 2, 0, 5, 4]
+    assert [r.get("rank") for r in ranked] == [1, 2, 3, 4, 5, None]
+    print("[PASS] ranking order and tie-breaks")
+
+
+def test_sweep_matches_sequential_runs():
+    """Process-pool leaderboard equals sequential run_backtest_on_candles; each series loaded once"""
+    print("\n=== TEST 3: Sweep vs Sequential ===")
+    jobs = build_sweep_grid(["NIFTY", "BANKNIFTY"], STRATEGIES, [DATE_RANGE], RISKS)
+    loads = []
+
+    def load_candles(instrument, from_date, to_date, timeframe):
+        loads.append((instrument, from_date, to_date, timeframe))
+        return _series(instrument)
+
+    progress = []
+    sweep = run_parameter_sweep(jobs, max_workers=2, progress_callback=progress.append, load_candles=load_candles)
+    assert sorted(loads) == sorted({j.series_key for j in jobs}) and sweep["series_loaded"] == 2
+    assert sweep["total_runs"] == len(jobs) and sweep["failed_runs"] == 0
+    assert [p["done"] for p in progress] == list(range(1, len(jobs) + 1)) and progress[-1]["progress"] == 100
+
+    sequential = []
+    stores = {}
+    for job in jobs:
+        store = stores.setdefault(job.instrument, _series(job.instrument))
+        result = run_backtest_on_candles(
+            store, instrument=job.instrument, strategy_name=job.strategy, from_date=job.from_date,
+            to_date=job.to_date, timeframe=job.timeframe, **job.risk,
+        )
+        sequential.append(batch_runner._summarize(job, result))
+    expected = rank_results(sequential)
+    assert [r["job_id"] for r in sweep["leaderboard"]] == [r["job_id"] for r in expected]
+    for got, want in zip(sweep["leaderboard"], expected):
+        for key in ("net_pnl", "win_rate", "max_drawdown", "total_trades", "final_equity", "rank"):
+            assert got[key] == want[key], (got["job_id"], key, got[key], want[key])
+    assert any(r["total_trades"] for r in expected)
+    print(f"[PASS] {len(jobs)} runs ranked identically; leader: job {expected[0]['job_id']} net_pnl={expected[0]['net_pnl']}")
+
+
+def test_shared_memory_attach_and_cleanup():
+    """Workers see the published columns unchanged; every block is unlinked after the sweep"""
+    print("\n=== TEST 4: Shared Memory Attach / Cleanup ===")
+    store = _series("NIFTY", days=2)
+    shm, spec = batch_runner._publish(store)
+    attached = batch_runner._attach(spec)
+    assert batch_runner._attach(spec) is attached  # cached per process
+    assert len(attached) == len(store)
+    for name in batch_runner._SHARED_ROWS:
+        assert attached.column(name).tolist() == store.column(name).tolist(), name
+    # Drop the numpy views before closing, otherwise SharedMemory.close() raises BufferError
+    worker_shm, _ = batch_runner._attached.pop(spec[0])
+    del attached, _
+    worker_shm.close()
+    shm.close()
+    shm.unlink()
+
+    published = []
+    publish = batch_runner._publish
+
+    def recording_publish(s):
+        owner, spec = publish(s)
+        published.append(spec[0])
+        return owner, spec
+
+    batch_runner._publish = recording_publish
+    try:
+        jobs = build_sweep_grid(["NIFTY", "BANKNIFTY"], STRATEGIES[:1], [DATE_RANGE])
+        run_parameter_sweep(jobs, max_workers=2, load_candles=lambda i, f, t, tf: _series(i, days=2))
+    finally:
+        batch_runner._publish = publish
+    assert len(published) == 2
+    for name in published:
+        try:
+            shared_memory.SharedMemory(name=name).close()
+            raise AssertionError(f"shared memory block {name} was not unlinked")
+        except FileNotFoundError:
+            pass
+    print(f"[PASS] attach is zero-copy and cached; {len(published)} blocks unlinked")
+
+
+if __name__ == "__main__":
+    test_build_sweep_grid()
+    test_rank_results()
+    test_sweep_matches_sequential_runs()
+    test_shared_memory_attach_and_cleanup()
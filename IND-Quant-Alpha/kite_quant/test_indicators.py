@@ -0,0 +1,187 @@
+"""
+Test script for the shared indicator library (engine.indicators).
+Checks batch functions against the pandas/list implementations they replaced, streaming state
+against the batch functions at every bar, and the live provider's incremental VWAP/RSI.
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from candle_fixtures import frame, make_candles
+from engine import indicators
+import strategies.data_provider as data_provider
+
+# Low-priced series with flat bars and zero-volume bars (zero-change / zero-loss / zero-volume windows)
+EDGE_CASES = dict(price=1500.0, vol=0.0027, start=datetime(2024, 3, 4, 9, 15), flat_prob=0.05, zero_volume_prob=0.03)
+
+
+# Reference implementations (the per-module code engine.indicators replaced).
+
+def _ref_wilder(series, period):
+    return series.ewm(alpha=1 / period, adjust=False).mean()
+
+
+def _ref_rsi(series, period=14):
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0.0)
+    loss = (-delta).where(delta < 0, 0.0)
+    rs = _ref_wilder(gain, period) / _ref_wilder(loss, period).replace(0, float("nan"))
+    return 100 - (100 / (1 + rs))
+
+
+def _ref_tr(df):
+    tr1 = df["high"] - df["low"]
+    tr2 = (df["high"] - df["close"].shift(1)).abs()
+    tr3 = (df["low"] - df["close"].shift(1)).abs()
+    return pd.concat([tr1, tr2, tr3], axis=1).max(axis=1).fillna(0.0)
+
+
+def _ref_adx(df, period=14):
+    up_move = df["high"].diff()
+    down_move = -df["low"].diff()
+    plus_dm = pd.Series(np.where((up_move > down_move) & (up_move > 0), up_move, 0.0))
+    minus_dm = pd.Series(np.where((down_move > up_move) & (down_move > 0), down_move, 0.0))
+    atr = _ref_wilder(_ref_tr(df), period).replace(0, np.nan)
+    plus_di = 100 * _ref_wilder(plus_dm, period) / atr
+    minus_di = 100 * _ref_wilder(minus_dm, period) / atr
+    dx = (100 * (plus_di - minus_di).abs() / (plus_di + minus_di)).replace([np.inf, -np.inf], np.nan)
+    return _ref_wilder(dx.fillna(0.0), period).fillna(0.0)
+
+
+def _ref_atr_pct(df, period=14):
+    atr = _ref_wilder(_ref_tr(df), period)
+    return (atr / df["close"].replace(0, np.nan) * 100.0).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+
+def _ref_volume_ratio(df, lookback=20):
+    avg_vol = df["volume"].rolling(lookback, min_periods=max(5, lookback // 2)).mean()
+    return (df["volume"] / avg_vol.replace(0, np.nan)).replace([np.inf, -np.inf], np.nan).fillna(1.0)
+
+
+def _ref_rsi_from_prices(prices, period):
+    if not prices or len(prices) < period + 1:
+        return None
+    changes = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
+    gains = [c if c > 0 else 0.0 for c in changes[-period:]]
+    losses = [-c if c < 0 else 0.0 for c in changes[-period:]]
+    avg_gain = sum(gains) / period
+    avg_loss = sum(losses) / period
+    if avg_loss == 0:
+        return 100.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def _ref_vwap(candles):
+    total_vtp = sum((c["high"] + c["low"] + c["close"]) / 3.0 * (c["volume"] or 0) for c in candles)
+    total_vol = sum(c["volume"] or 0 for c in candles)
+    if total_vol <= 0:
+        return float(candles[-1]["close"])
+    return round(total_vtp / total_vol, 2)
+
+
+def _close(a, b, tol=1e-9):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return np.allclose(a, b, rtol=tol, atol=tol, equal_nan=True)
+
+
+def test_batch_matches_reference():
+    """Batch functions reproduce the pandas/list implementations they replaced"""
+    print("\n=== TEST 1: Batch Parity ===")
+    candles = make_candles(500, 3, **EDGE_CASES)
+    df = frame(candles)
+    h, l, c, v = (df[k].to_numpy() for k in ("high", "low", "close", "volume"))
+    assert _close(indicators.rsi(c, 14), _ref_rsi(df["close"], 14), 0)
+    assert _close(indicators.ema(c, 9), df["close"].ewm(span=9, adjust=False).mean(), 0)
+    assert _close(indicators.adx(h, l, c), _ref_adx(df), 1e-12)
+    assert _close(indicators.atr_pct(h, l, c), _ref_atr_pct(df), 1e-12)
+    assert _close(indicators.volume_ratio(v), _ref_volume_ratio(df), 1e-12)
+    closes = [x["close"] for x in candles]
+    for end in range(10, len(closes)):
+        assert indicators.rsi_simple_last(closes[:end], 14) == _ref_rsi_from_prices(closes[:end], 14)
+    print("[PASS] rsi/ema/adx/atr%/volume ratio/simple rsi")
+
+
+def test_streaming_matches_batch():
+    """Each streaming indicator, fed bar by bar, equals the batch series at every bar"""
+    print("\n=== TEST 2: Streaming Parity ===")
+    candles = make_candles(500, 3, **EDGE_CASES)
+    df = frame(candles)
+    h, l, c, v = (df[k].to_numpy() for k in ("high", "low", "close", "volume"))
+    cases = [
+        (indicators.EMA(20), indicators.ema(c, 20)),
+        (indicators.WilderRSI(14), indicators.rsi(c, 14)),
+        (indicators.ATR(14), indicators.atr(h, l, c, 14)),
+        (indicators.ADX(14), indicators.adx(h, l, c, 14)),
+        (indicators.RollingVWAP(20), indicators.rolling_vwap(h, l, c, v, 20)),
+        (indicators.VolumeRatio(20), indicators.volume_ratio(v, 20)),
+    ]
+    simple = indicators.rsi_simple(c, 14)
+    for state, expected in cases + [(indicators.SimpleRSI(14), simple)]:
+        fields = [df[f].to_numpy() for f in state.FIELDS]
+        got = []
+        for i in range(len(c)):
+            args = [f[i] for f in fields]
+            peeked = state.peek(*args)
+            got.append(state.update(*args))
+            assert _close(peeked, got[-1], 0), (type(state).__name__, i)
+        start = 14 if isinstance(state, indicators.SimpleRSI) else 0
+        assert _close(got[start:], expected[start:]), type(state).__name__
+    print(f"[PASS] {len(cases) + 1} streaming indicators over {len(c)} bars")
+
+
+def test_candle_series_incremental():
+    """A growing candle window (forming bar revised on every tick) commits each closed bar once"""
+    print("\n=== TEST 3: Incremental Candle Series ===")
+    candles = make_candles(300, 3, **EDGE_CASES)
+    series = indicators.CandleSeries(lambda: indicators.RollingVWAP(20))
+    rsi_series = indicators.CandleSeries(lambda: indicators.SimpleRSI(14))
+    for i in range(30, len(candles)):
+        forming = dict(candles[i])
+        for frac in (0.3, 1.0):  # forming bar revised before it closes
+            bar = dict(forming, close=forming["open"] + (forming["close"] - forming["open"]) * frac)
+            bar["high"], bar["low"] = max(bar["high"], bar["close"]), min(bar["low"], bar["close"])
+            window = candles[i - 19:i] + [bar]
+            value = series.value(window)
+            expected = _ref_vwap(window)
+            assert (np.isnan(value) and expected == window[-1]["close"]) or round(value, 2) == expected, i
+            closes = [c["close"] for c in candles[i - 15:i]] + [bar["close"]]
+            assert abs(rsi_series.value(candles[i - 15:i] + [bar]) - _ref_rsi_from_prices(closes, 14)) < 1e-9
+    assert series.rebuilds == 1 and series.updates == len(candles) - 12
+    # A window without the last committed bar rebuilds from the window instead of mixing histories.
+    series.value(candles[100:121])
+    assert series.rebuilds == 2
+    print(f"[PASS] {series.updates} bar updates, {series.rebuilds} rebuilds")
+
+
+def test_live_provider_streams_indicators():
+    """data_provider.get_vwap/get_rsi match the old full-window formulas on a moving window"""
+    print("\n=== TEST 4: Live Provider ===")
+    candles = make_candles(120, 9, **EDGE_CASES)
+    cursor = [40]
+    saved = data_provider.get_recent_candles
+    data_provider.get_recent_candles = lambda instrument, interval="5m", count=20, period="1d": candles[max(0, cursor[0] - count):cursor[0]]
+    indicators.clear_candle_series()
+    try:
+        for cursor[0] in range(40, len(candles)):
+            window = candles[cursor[0] - 20:cursor[0]]
+            assert data_provider.get_vwap("RELIANCE", count=20) == _ref_vwap(window)
+            closes = [c["close"] for c in candles[cursor[0] - 16:cursor[0]]]
+            assert abs(data_provider.get_rsi("RELIANCE", period=14) - _ref_rsi_from_prices(closes, 14)) < 1e-9
+        series = indicators.candle_series(("vwap", "RELIANCE", "5m", 20), lambda: None)
+        assert series.rebuilds == 1 and series.updates == len(candles) - 40 + 18
+    finally:
+        data_provider.get_recent_candles = saved
+        indicators.clear_candle_series()
+    print("[PASS] provider VWAP/RSI advance one bar per call")
+
+
+if __name__ == "__main__":
+    test_batch_matches_reference()
+    test_streaming_matches_batch()
+    test_candle_series_incremental()
+    test_live_provider_streams_indicators()
@@ -0,0 +1,109 @@
+"""
+Test script for the indexed instrument master (engine.instrument_master).
+Uses a synthetic Kite dump; no broker connection required.
+"""
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.instrument_master import InstrumentMaster, InstrumentMasterStore
+
+
+def _dumps():
+    nse = [
+        {"instrument_token": 256265, "tradingsymbol": "NIFTY 50", "name": "NIFTY 50", "instrument_type": "EQ", "segment": "INDICES", "exchange": "NSE"},
+        {"instrument_token": 738561, "tradingsymbol": "RELIANCE", "name": "RELIANCE INDUSTRIES", "instrument_type": "EQ", "segment": "NSE", "exchange": "NSE"},
+        {"instrument_token": 2953217, "tradingsymbol": "TCS", "name": "TATA CONSULTANCY SERV", "instrument_type": "EQ", "segment": "NSE", "exchange": "NSE"},
+        {"instrument_token": 884737, "tradingsymbol": "TATAMOTORS", "name": "TATA MOTORS", "instrument_type": "EQ", "segment": "NSE", "exchange": "NSE"},
+        {"instrument_token": 895745, "tradingsymbol": "TATASTEEL", "name": "TATA STEEL", "instrument_type": "EQ", "segment": "NSE", "exchange": "NSE"},
+    ]
+    nfo = [{"instrument_token": 9000001, "tradingsymbol": "NIFTY24FEBFUT", "name": "NIFTY", "instrument_type": "FUT",
+            "segment": "NFO-FUT", "exchange": "NFO", "expiry": date(2024, 2, 29), "strike": 0, "lot_size": 50}]
+    token = 10000000
+    for name, expiries in (("NIFTY", (date(2024, 2, 15), date(2024, 2, 8))), ("NIFTYNXT50", (date(2024, 2, 8),))):
+        for expiry in expiries:
+            for strike in (21900, 22000, 22500, 122000):
+                for opt in ("CE", "PE"):
+                    token += 1
+                    nfo.append({
+                        "instrument_token": token,
+                        "tradingsymbol": f"{name}{expiry:%y}{expiry.month}{expiry:%d}{strike}{opt}",
+                        "name": name, "instrument_type": opt, "segment": "NFO-OPT", "exchange": "NFO",
+                        "expiry": expiry, "strike": float(strike), "lot_size": 50,
+                    })
+    return {"NSE": nse, "NFO": nfo}
+
+
+def test_token_lookups():
+    """Tradingsymbol, index name and token lookups are hash hits"""
+    print("\n=== TEST 1: Token Lookups ===")
+    master = InstrumentMaster.from_dumps(_dumps(), as_of="2024-02-08")
+    assert master.token("reliance") == 738561
+    assert master.token("NIFTY 50") == 256265
+    assert master.token("NIFTY24FEBFUT", "NFO") == 9000001
+    assert master.token("UNKNOWN") is None
+    assert master.by_token(2953217)["tradingsymbol"] == "TCS"
+    print("[PASS] symbol/name/token lookups")
+
+
+def test_option_lookup():
+    """Exact strike on the nearest live expiry; NIFTYNXT50 and 122000 strikes never match NIFTY 22000"""
+    print("\n=== TEST 2: Option Lookup ===")
+    master = InstrumentMaster.from_dumps(_dumps(), as_of="2024-02-08")
+    assert master.expiries("NIFTY") == ["2024-02-08", "2024-02-15"]
+    assert master.expiries("NIFTY", on_or_after="2024-02-09") == ["2024-02-15"]
+    row = master.option("NIFTY", 22000, "CE", on_or_after="2024-02-08")
+    assert row["tradingsymbol"] == "NIFTY2420822000CE" and row["expiry"] == "2024-02-08"
+    row = master.option("NIFTY", 22000, "PE", on_or_after="2024-02-09")
+    assert row["expiry"] == "2024-02-15" and row["name"] == "NIFTY"
+    assert master.option("NIFTY", 22100, "CE") is None
+    chain = master.option_chain("NIFTY", "2024-02-15")
+    assert [(r["strike"], r["instrument_type"]) for r in chain[:3]] == [(21900.0, "CE"), (21900.0, "PE"), (22000.0, "CE")]
+    assert len(chain) == 8 and all(r["name"] == "NIFTY" for r in chain)
+    print(f"[PASS] {len(master.option_rows())} options indexed")
+
+
+def test_search_order():
+    """INDEX first, then FUT, then EQ with prefix matches before substring matches"""
+    print("\n=== TEST 3: Search ===")
+    master = InstrumentMaster.from_dumps(_dumps(), as_of="2024-02-08")
+    symbols = [r["symbol"] for r in master.search("TATA")]
+    assert symbols == ["TATAMOTORS", "TATASTEEL", "TCS"], symbols
+    symbols = [r["symbol"] for r in master.search("NIFTY")]
+    assert symbols[:3] == ["NIFTY 50", "NIFTY BANK", "MIDCPNIFTY"] and "NIFTY24FEBFUT" in symbols, symbols
+    assert [r["symbol"] for r in master.search("TATA", limit=1)] == ["TATAMOTORS"]
+    assert master.search("T") == []
+    print("[PASS] search ordering")
+
+
+def test_store_persists_and_falls_back():
+    """Cold start reads today's file; broker outage falls back to the latest persisted day"""
+    print("\n=== TEST 4: Daily Persistence ===")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return _dumps()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InstrumentMasterStore(tmp, fetch_dumps=fetch)
+        master = store.get(today=date(2024, 2, 8))
+        assert len(calls) == 1 and (Path(tmp) / "master_2024-02-08.json").exists()
+        assert store.get(today=date(2024, 2, 8)) is master and len(calls) == 1
+
+        cold = InstrumentMasterStore(tmp, fetch_dumps=fetch).get(today=date(2024, 2, 8))
+        assert len(calls) == 1 and cold.token("RELIANCE") == 738561
+
+        down = InstrumentMasterStore(tmp, fetch_dumps=lambda: None).get(today=date(2024, 2, 9))
+        assert down.as_of == "2024-02-08" and down.option("NIFTY", 22000, "CE") is not None
+    print("[PASS] persisted master reused; stale fallback works")
+
+
+if __name__ == "__main__":
+    test_token_lookups()
+    test_option_lookup()
+    test_search_order()
+    test_store_persists_and_falls_back()
@@ -0,0 +1,126 @@
+"""
+Test script for per-tick market snapshots (engine.market_snapshot) through strategies.data_provider.
+Broker calls are replaced by counting fakes; no Kite connection required.
+"""
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+import strategies.data_provider as data_provider
+from engine.market_snapshot import MARKET, snapshot_stats, snapshot_value
+from engine.tick_engine import SessionTickEngine
+
+calls = []
+_calls_lock = threading.Lock()
+
+
+def _fake_ohlc(symbol, interval="5m", period="1d"):
+    with _calls_lock:
+        calls.append(("ohlc", symbol, interval, period))
+    n = 300
+    idx = pd.date_range("2024-02-09 09:15", periods=n, freq="5min", tz="Asia/Kolkata")
+    close = [22000 + i for i in range(n)]
+    return pd.DataFrame({"Datetime": idx, "Open": close, "High": close, "Low": close, "Close": close, "Volume": [100] * n})
+
+
+def _fake_quote(symbol, exchange="NSE"):
+    with _calls_lock:
+        calls.append(("quote", symbol, exchange))
+    return {"last": 22299.0, "oi": 1000.0, "oi_day_low": 900.0}
+
+
+@contextmanager
+def _fake_broker():
+    saved = (data_provider.fetch_nse_ohlc, data_provider._kite_get_quote, os.environ.get("TICK_STREAM_ENABLED"))
+    data_provider.fetch_nse_ohlc = _fake_ohlc
+    data_provider._kite_get_quote = _fake_quote
+    os.environ["TICK_STREAM_ENABLED"] = "0"
+    try:
+        yield
+    finally:
+        data_provider.fetch_nse_ohlc, data_provider._kite_get_quote = saved[:2]
+        if saved[2] is None:
+            os.environ.pop("TICK_STREAM_ENABLED", None)
+        else:
+            os.environ["TICK_STREAM_ENABLED"] = saved[2]
+
+
+def _entry_check(session):
+    """The data an entry check + score + strategy asks for on one instrument."""
+    inst = session["instrument"]
+    data_provider.get_ltp(inst)
+    data_provider.get_recent_candles(inst, interval="5m", count=75, period="1d")
+    data_provider.get_recent_candles(inst, interval="5minute", count=20, period="1d")
+    data_provider.get_vwap(inst, interval="5m", count=50, period="3d")
+    data_provider.get_rsi(inst, interval="5m", period=14)
+    data_provider.get_quote("NIFTY2421522000CE", exchange="NFO")
+    data_provider.get_quote("NIFTY2421522000PE", exchange="NFO")
+    data_provider.get_ltp(inst)
+    snapshot_value(MARKET, "india_vix", lambda: _fake_quote("INDIA VIX"))
+    session["checked"] = True
+
+
+def _sessions(n):
+    return [{"sessionId": f"s{i}", "status": "ACTIVE", "instrument": "NIFTY"} for i in range(n)]
+
+
+def test_broker_calls_per_tick():
+    """Ten sessions on one index: one fetch per distinct item per tick instead of one per use"""
+    print("\n=== TEST 1: Broker Calls Per Tick ===")
+    with _fake_broker():
+        _run_broker_calls_per_tick()
+
+
+def _run_broker_calls_per_tick():
+    sessions = _sessions(10)
+    calls.clear()
+    for s in sessions:
+        _entry_check(dict(s))
+    without = len(calls)
+
+    calls.clear()
+    engine = SessionTickEngine(sessions_lock=threading.RLock(), save_sessions_fn=lambda: None, max_workers=8)
+    before = snapshot_stats()
+    stats = engine.run_tick(sessions, _entry_check)
+    with_snapshot = len(calls)
+    after = snapshot_stats()
+    assert all(s.get("checked") for s in sessions)
+    assert with_snapshot == 7, calls  # 3 candle periods + NIFTY 50 / CE / PE / VIX quotes
+    assert without >= 10 * with_snapshot, (without, with_snapshot)
+    assert stats["snapshot_misses"] == with_snapshot and stats["snapshot_hits"] > 0
+    assert after["misses"] - before["misses"] == with_snapshot
+    print(f"[PASS] {without} broker calls -> {with_snapshot} per tick "
+          f"(hits={stats['snapshot_hits']}, misses={stats['snapshot_misses']})")
+
+
+def test_slices_match_direct_fetch():
+    """Snapshot slices equal a direct fetch; callers get private candle copies"""
+    print("\n=== TEST 2: Slice Parity ===")
+    with _fake_broker():
+        _run_slices_match_direct_fetch()
+
+
+def _run_slices_match_direct_fetch():
+    direct = data_provider.get_recent_candles("NIFTY", count=20)
+    got = {}
+
+    def evaluate(session):
+        a = data_provider.get_recent_candles("NIFTY", count=75)
+        a[-1]["close"] = -1.0  # must not leak into other callers
+        got[session["sessionId"]] = data_provider.get_recent_candles("NIFTY", count=20)
+
+    engine = SessionTickEngine(sessions_lock=threading.RLock(), save_sessions_fn=lambda: None, max_workers=4)
+    engine.run_tick(_sessions(4), evaluate)
+    assert all(v == direct for v in got.values())
+    print("[PASS] slices identical to direct fetch")
+
+
+if __name__ == "__main__":
+    test_broker_calls_per_tick()
+    test_slices_match_direct_fetch()
@@ -0,0 +1,105 @@
+"""
+Test script for the persistent OHLC candle cache (engine.ohlc_cache).
+Uses a local stand-in for Kite historical_data, so it runs fully offline.
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from engine.ohlc_cache import IST, OHLCCache
+
+
+class FakeHistorical:
+    """Stand-in broker: a fixed 5-minute bar series, records every requested range."""
+
+    def __init__(self, start, bars):
+        self.frame = pd.DataFrame({
+            "Datetime": pd.date_range(start, periods=bars, freq="5min", tz=IST),
+            "Open": [100.0 + i for i in range(bars)],
+            "High": [101.0 + i for i in range(bars)],
+            "Low": [99.0 + i for i in range(bars)],
+            "Close": [100.5 + i for i in range(bars)],
+            "Volume": [1000.0 + i for i in range(bars)],
+        })
+        self.calls = []
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        dt = self.frame["Datetime"]
+        return self.frame[(dt >= start) & (dt <= end)].reset_index(drop=True)
+
+
+def test_tail_only_refresh():
+    """Second request inside the TTL is served from disk; later requests only fetch the tail"""
+    print("\n=== TEST 1: Tail-only Refresh ===")
+    day_open = datetime(2024, 2, 9, 9, 15, tzinfo=IST)
+    broker = FakeHistorical(day_open, 75)
+    with tempfile.TemporaryDirectory() as root:
+        cache = OHLCCache(root, refresh_ttl_sec=20)
+        now = day_open + timedelta(hours=1)
+        df = cache.fetch("NIFTY 50", "5minute", day_open, now, broker, now=now.timestamp())
+        assert len(df) == 13 and len(broker.calls) == 1
+
+        df = cache.fetch("NIFTY 50", "5minute", day_open, now, broker, now=now.timestamp() + 5)
+        assert len(df) == 13 and len(broker.calls) == 1, "within TTL must not hit the broker"
+
+        later = now + timedelta(minutes=30)
+        df = cache.fetch("NIFTY 50", "5minute", day_open, later, broker, now=later.timestamp())
+        assert len(df) == 19 and len(broker.calls) == 2
+        tail_start = broker.calls[-1][0]
+        assert tail_start == day_open + timedelta(minutes=60), f"tail fetched from {tail_start}"
+        assert df["Close"].tolist() == broker.frame["Close"][:19].tolist()
+        print(f"[PASS] broker calls: {len(broker.calls)}, tail from {tail_start.time()}")
+
+
+def test_offline_and_after_close():
+    """No broker client serves the cache; after market close no new fetch is made"""
+    print("\n=== TEST 2: Offline / After Close ===")
+    day_open = datetime(2024, 2, 9, 9, 15, tzinfo=IST)
+    broker = FakeHistorical(day_open, 75)
+    with tempfile.TemporaryDirectory() as root:
+        cache = OHLCCache(root)
+        close = day_open.replace(hour=15, minute=35)
+        cache.fetch("RELIANCE", "5minute", day_open, close, broker, now=close.timestamp())
+        evening = close + timedelta(hours=4)
+        df = cache.fetch("RELIANCE", "5minute", day_open, evening, broker, now=evening.timestamp())
+        assert len(df) == 75 and len(broker.calls) == 1
+
+        offline = OHLCCache(root)
+        df = offline.fetch("RELIANCE", "5minute", day_open, evening, None)
+        assert len(df) == 75
+        assert str(df["Datetime"].iloc[0].tz) == "Asia/Kolkata"
+
+        t0 = time.perf_counter()
+        for _ in range(100):
+            offline.fetch("RELIANCE", "5minute", day_open, evening, None)
+        per_read_ms = (time.perf_counter() - t0) * 10
+        print(f"[PASS] offline read {per_read_ms:.3f} ms/call")
+
+
+def test_head_extension():
+    """Asking for an earlier start fetches only the missing head"""
+    print("\n=== TEST 3: Head Extension ===")
+    day_open = datetime(2024, 2, 9, 9, 15, tzinfo=IST)
+    broker = FakeHistorical(day_open, 75)
+    with tempfile.TemporaryDirectory() as root:
+        cache = OHLCCache(root)
+        end = day_open.replace(hour=15, minute=35)
+        mid = day_open + timedelta(hours=3)
+        cache.fetch("SBIN", "5minute", mid, end, broker, now=end.timestamp())
+        df = cache.fetch("SBIN", "5minute", day_open, end, broker, now=end.timestamp() + 1)
+        assert len(df) == 75 and len(broker.calls) == 2
+        assert broker.calls[-1][1] == mid
+        print("[PASS] head fetched up to first cached bar")
+
+
+if __name__ == "__main__":
+    test_tail_only_refresh()
+    test_offline_and_after_close()
+    test_head_extension()
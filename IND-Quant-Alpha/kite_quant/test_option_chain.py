@@ -0,0 +1,145 @@
+"""
+Test script for the option-chain snapshot engine (engine.option_chain).
+Uses a synthetic instrument master and a counting fake quote source; no broker connection required.
+"""
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from engine.instrument_master import InstrumentMaster
+from engine.option_chain import (
+    OptionChainEngine,
+    bs_price,
+    implied_vol,
+    set_option_chain_engine,
+)
+import nifty_banknifty_engine.options as options_mod
+from nifty_banknifty_engine.options import get_affordable_index_options, get_index_option_candidates
+
+EXPIRY = date.today() + timedelta(days=7)
+STRIKES = list(range(21000, 23050, 50))
+
+
+def _master():
+    nfo = []
+    token = 10000000
+    for expiry in (EXPIRY, EXPIRY + timedelta(days=7)):
+        for strike in STRIKES:
+            for opt in ("CE", "PE"):
+                token += 1
+                nfo.append({
+                    "instrument_token": token,
+                    "tradingsymbol": f"NIFTY{expiry:%y%m%d}{strike}{opt}",
+                    "name": "NIFTY", "instrument_type": opt, "segment": "NFO-OPT", "exchange": "NFO",
+                    "expiry": expiry, "strike": float(strike), "lot_size": 75,
+                })
+    return InstrumentMaster.from_dumps({"NFO": nfo})
+
+
+def _oi(symbol):
+    strike = int(symbol[-7:-2])
+    side = symbol[-2:]
+    # Calls heavy above 22000, puts heavy below: max pain sits at 22000.
+    return float(1000 + max(0, strike - 22000) * 10) if side == "CE" else float(1000 + max(0, 22000 - strike) * 10)
+
+
+class _FakeQuotes:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(list(symbols))
+        out = {}
+        for s in symbols:
+            strike = int(s[-7:-2])
+            intrinsic = max(0, 22010 - strike) if s.endswith("CE") else max(0, strike - 22010)
+            out[s] = {"last": intrinsic + 40.0, "oi": _oi(s), "oi_day_low": _oi(s) * 0.8}
+        return out
+
+
+def _engine(clock=None):
+    quotes = _FakeQuotes()
+    kwargs = {"clock": clock} if clock else {}
+    return OptionChainEngine(master_fn=_master, quotes_fn=quotes, max_age_sec=1.0, **kwargs), quotes
+
+
+def test_vectorized_analytics():
+    """PCR, max pain and OI change agree with a per-strike reference loop"""
+    print("\n=== TEST 1: PCR / Max Pain ===")
+    engine, quotes = _engine()
+    chain = engine.refresh("NIFTY", 22010.0, n=len(STRIKES))
+    assert len(quotes.calls) == 1 and len(quotes.calls[0]) == 2 * len(STRIKES)
+    ce = {k: _oi(f"X{k}CE") for k in STRIKES}
+    pe = {k: _oi(f"X{k}PE") for k in STRIKES}
+    assert abs(chain.pcr() - sum(pe.values()) / sum(ce.values())) < 1e-12
+    pain = {s: sum(max(0, s - k) * ce[k] + max(0, k - s) * pe[k] for k in STRIKES) for s in STRIKES}
+    assert chain.max_pain() == float(min(pain, key=pain.get)) == 22000.0
+    pct = chain.oi_change_pct_at("CE", [22000])
+    assert abs(pct[22000] - 25.0) < 1e-9
+    print(f"[PASS] pcr={chain.pcr():.3f} max_pain={chain.max_pain():.0f}")
+
+
+def test_incremental_refresh():
+    """Only stale strikes in the window are re-quoted, in one call per refresh"""
+    print("\n=== TEST 2: Incremental Refresh ===")
+    now = [1000.0]
+    engine, quotes = _engine(clock=lambda: now[0])
+    engine.refresh("NIFTY", 22000.0, n=5)
+    assert len(quotes.calls[0]) == 22
+    engine.refresh("NIFTY", 22000.0, n=5)
+    assert len(quotes.calls) == 1  # still fresh
+    engine.refresh("NIFTY", 22050.0, n=5)
+    assert len(quotes.calls) == 2 and len(quotes.calls[1]) == 2  # one new strike at the top
+    now[0] += 2.0
+    engine.refresh("NIFTY", 22050.0, n=5)
+    assert len(quotes.calls[2]) == 22
+    assert engine.chain("NIFTY").expiry == EXPIRY.isoformat()
+    print(f"[PASS] {len(quotes.calls)} quote calls, stats={engine.stats}")
+
+
+def test_implied_vol_roundtrip():
+    """Vectorized IV recovers the volatility used to price the options"""
+    print("\n=== TEST 3: Implied Volatility ===")
+    strikes = np.array([21500.0, 22000.0, 22500.0])
+    sigma = np.array([0.12, 0.15, 0.18])
+    for is_call in (True, False):
+        prices = bs_price(22000.0, strikes, 7 / 365, sigma, is_call)
+        iv = implied_vol(22000.0, strikes, 7 / 365, prices, is_call)
+        assert np.allclose(iv, sigma, atol=1e-4), (iv, sigma)
+    assert np.isnan(implied_vol(22000.0, strikes, 7 / 365, np.array([0.0, np.nan, -1.0]), True)).all()
+    print("[PASS] IV recovered within 1e-4")
+
+
+def test_candidates_use_live_premiums():
+    """Recommendation candidates price off the chain; backtest candidates keep the model premium"""
+    print("\n=== TEST 4: Live Premium Candidates ===")
+    engine, quotes = _engine()
+    set_option_chain_engine(engine)
+    saved_live = options_mod.fetch_nifty50_live
+    options_mod.fetch_nifty50_live = lambda: {"price": 22010.0}
+    try:
+        live = get_index_option_candidates("NIFTY", "BULLISH", 22010.0, live_premiums=True)
+        assert [o["strike"] for o in live] == [22000, 22050, 22100]
+        assert [o["premium"] for o in live] == [50.0, 40.0, 40.0]
+        assert all(o["premiumSource"] == "live" and o["lotSize"] == 75 for o in live)
+        assert live[0]["tradingsymbol"].endswith("22000CE")
+        assert len(quotes.calls) == 1
+        model = get_index_option_candidates("NIFTY", "BULLISH", 22010.0)
+        assert "premiumSource" not in model[0] and model[0]["premium"] != live[0]["premium"]
+        options, _, _ = get_affordable_index_options("NIFTY", "BULLISH", 3200.0)
+        assert [o["canTrade"] for o in options] == [True, True, False]
+    finally:
+        options_mod.fetch_nifty50_live = saved_live
+        set_option_chain_engine(None)
+    print(f"[PASS] live premiums {[o['premium'] for o in live]}")
+
+
+if __name__ == "__main__":
+    test_vectorized_analytics()
+    test_incremental_refresh()
+    test_implied_vol_roundtrip()
+    test_candidates_use_live_premiums()
@@ -0,0 +1,139 @@
+"""
+Test script for the order lifecycle service (engine.order_lifecycle) against the deterministic
+FakeBroker (engine.fake_broker). No Kite connection required.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.fake_broker import FakeBroker
+from engine.order_lifecycle import OrderLifecycleService
+from engine.order_state import OrderRequest, OrderState
+
+
+def _service(broker, interval=0.02):
+    service = OrderLifecycleService(broker, poll_interval_sec=interval)
+    service.start()
+    return service
+
+
+def test_waiters_share_batched_polls():
+    """Twenty concurrent waiters are served by a few batched status calls, never per-order polls"""
+    print("\n=== TEST 1: Batched Polling ===")
+    broker = FakeBroker(fill_after_polls=3)
+    service = _service(broker)
+    try:
+        results = {}
+
+        def trade(i):
+            req = OrderRequest(symbol=f"SYM{i}", side="BUY", quantity=10)
+            service.send_order(req)
+            results[i] = service.wait_for_terminal(req.client_order_id, timeout_sec=5)
+
+        threads = [threading.Thread(target=trade, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert all(o.state == OrderState.FILLED and o.filled_quantity == 10 for o in results.values())
+        assert broker.calls["status"] == 0
+        assert broker.calls["batch_status"] <= 8, broker.calls
+        print(f"[PASS] 20 orders filled with {broker.calls['batch_status']} batched status calls")
+    finally:
+        service.stop()
+
+
+def test_slow_entry_does_not_block_exit():
+    """A slow-filling entry on one session does not delay an exit waiting on another"""
+    print("\n=== TEST 2: Independent Waiters ===")
+    broker = FakeBroker()
+    broker.script("SLOW", fill_after_polls=40)
+    broker.script("FAST", fill_after_polls=1)
+    service = _service(broker)
+    try:
+        slow = OrderRequest(symbol="SLOW", side="BUY", quantity=1)
+        fast = OrderRequest(symbol="FAST", side="SELL", quantity=1)
+        service.send_order(slow)
+        slow_thread = threading.Thread(target=service.wait_for_terminal, args=(slow.client_order_id, 5))
+        slow_thread.start()
+        time.sleep(0.05)
+        service.send_order(fast)
+        started = time.perf_counter()
+        order = service.wait_for_terminal(fast.client_order_id, timeout_sec=5)
+        fast_sec = time.perf_counter() - started
+        assert order.state == OrderState.FILLED
+        assert service.get_order(slow.client_order_id).state != OrderState.FILLED
+        assert fast_sec < 0.3, fast_sec
+        slow_thread.join()
+        assert service.get_order(slow.client_order_id).state == OrderState.FILLED
+        print(f"[PASS] exit filled in {fast_sec * 1000:.0f}ms while entry was still open")
+    finally:
+        service.stop()
+
+
+def test_timeout_and_order_update():
+    """Waiters time out with the latest state; a pushed order update resolves them without polling"""
+    print("\n=== TEST 3: Timeout + Order Updates ===")
+    broker = FakeBroker(fill_after_polls=1000)
+    service = _service(broker, interval=10.0)
+    try:
+        req = OrderRequest(symbol="NIFTY24FEB22000CE", side="BUY", quantity=50, exchange="NFO")
+        managed = service.send_order(req)
+        order = service.wait_for_terminal(req.client_order_id, timeout_sec=0.1)
+        assert order.state == OrderState.ACKNOWLEDGED and service.stats["timeouts"] == 1
+
+        def push():
+            time.sleep(0.05)
+            service.on_order_update({"order_id": managed.broker_order_id, "status": "COMPLETE",
+                                     "filled_quantity": 50, "avg_fill_price": 101.5})
+
+        threading.Thread(target=push).start()
+        started = time.perf_counter()
+        order = service.wait_for_terminal(req.client_order_id, timeout_sec=5)
+        assert order.state == OrderState.FILLED and order.avg_fill_price == 101.5
+        assert time.perf_counter() - started < 1.0
+        print(f"[PASS] update resolved waiter (polls={service.stats['polls']})")
+    finally:
+        service.stop()
+
+
+def test_external_order_cancel_confirmation():
+    """Orders placed outside the manager (stops/targets) are confirmed via the same batched poll"""
+    print("\n=== TEST 4: External Order Watch ===")
+    broker = FakeBroker()
+    service = _service(broker)
+    try:
+        stop_id = broker.add_order(status="TRIGGER PENDING")
+        assert service.wait_for_broker_order(stop_id, timeout_sec=0.1) is None
+        broker.cancel_order(stop_id)
+        payload = service.wait_for_broker_order(stop_id, timeout_sec=2)
+        assert payload and payload["status"] == "CANCELLED"
+        print("[PASS] external cancel confirmed")
+    finally:
+        service.stop()
+
+
+def test_partial_fill_open_status():
+    """Kite reports partial fills as OPEN with filled_quantity; the manager records PARTIAL_FILLED"""
+    print("\n=== TEST 5: Partial Fill ===")
+    broker = FakeBroker(fill_after_polls=1000, partial_fill_ratio=0.5)
+    service = OrderLifecycleService(broker)
+    req = OrderRequest(symbol="RELIANCE", side="BUY", quantity=10)
+    service.send_order(req)
+    polled = service.poll_open_orders()
+    order = polled[req.client_order_id]
+    assert order.state == OrderState.PARTIAL_FILLED and order.filled_quantity == 5
+    service.poll_open_orders()
+    assert broker.calls["batch_status"] == 2
+    print("[PASS] partial fill tracked")
+
+
+if __name__ == "__main__":
+    test_waiters_share_batched_polls()
+    test_slow_entry_does_not_block_exit()
+    test_timeout_and_order_update()
+    test_external_order_cancel_confirmation()
+    test_partial_fill_open_status()
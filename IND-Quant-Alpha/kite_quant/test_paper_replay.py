@@ -0,0 +1,172 @@
+"""
+Test script for the accelerated paper-trading replay (engine.paper_replay).
+Replays a synthetic recorded day through the tick engine, paper executor and risk engine on a
+virtual clock; no broker connection required and nothing is written to data/.
+"""
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.paper_replay import PaperReplay, ReplayConflictError, candles_to_ticks, signal_evaluator
+from engine.sim_clock import WallClock, get_clock
+from engine.tick_engine import SessionTickEngine
+from engine.tick_stream import IST, TickStream, get_tick_stream, set_tick_stream
+from execution import paper_executor
+from execution.trade_history_store import get_trade_journal
+
+SYMBOLS = {("RELIANCE", "NSE"): 738561, ("INFY", "NSE"): 408065, ("SBIN", "NSE"): 779521}
+
+
+def _recorded_day():
+    """One 1-minute candle per minute from 09:15 to 15:29 per symbol, random walk, fixed seed."""
+    rng = random.Random(42)
+    start = datetime(2025, 1, 15, 9, 15, tzinfo=IST).timestamp()
+    ticks = []
+    for (symbol, _), token in SYMBOLS.items():
+        price = 1000.0 + token % 700
+        candles = []
+        for minute in range(375):
+            o = price
+            c = max(1.0, o * (1 + rng.gauss(0, 0.0015)))
+            candles.append({
+                "date": start + minute * 60, "open": o, "close": c,
+                "high": max(o, c) * (1 + abs(rng.gauss(0, 0.0005))),
+                "low": min(o, c) * (1 - abs(rng.gauss(0, 0.0005))),
+                "volume": 1000,
+            })
+            price = c
+        ticks.extend(candles_to_ticks(candles, token))
+    return ticks
+
+
+def _sessions():
+    sessions = []
+    for i, (symbol, _) in enumerate(list(SYMBOLS) * 2):
+        sessions.append({
+            "sessionId": f"replay_{i}", "status": "ACTIVE", "execution_mode": "PAPER",
+            "instrument": symbol, "exchange": "NSE", "lot_size": 10, "virtual_balance": 100000.0,
+            "daily_trade_cap": 8,
+        })
+    return sessions
+
+
+def _momentum(session, candles, now):
+    """Enter long after three rising closes; stop/target a few ticks away."""
+    if len(candles) < 4 or now.hour >= 15:
+        return None
+    closes = [c["close"] for c in candles[-4:]]
+    if not (closes[0] < closes[1] < closes[2] < closes[3]):
+        return None
+    ltp = closes[-1]
+    return {"side": "BUY", "stop_loss": round(ltp * 0.997, 2), "target": round(ltp * 1.004, 2), "strategy": "momentum"}
+
+
+def _replay(seed, ticks):
+    return PaperReplay(ticks, instruments=SYMBOLS, seed=seed).run(_sessions(), signal_evaluator(_momentum))
+
+
+def _fingerprint(result):
+    return [
+        (t["session_id"], t["entry_time"], t["exit_time"], t["entry_price"], t["exit_price"], t["qty"], t["net_pnl"])
+        for t in sorted(result["trades"], key=lambda t: (t["session_id"], t["entry_time"]))
+    ]
+
+
+def test_full_day_replays_in_seconds():
+    """Six paper sessions over a full recorded day replay in seconds on virtual time"""
+    print("\n=== TEST 1: Full Day Replay ===")
+    journal = get_trade_journal()
+    started = time.perf_counter()
+    result = _replay(7, _recorded_day())
+    wall = time.perf_counter() - started
+    stats = result["stats"]
+    assert wall < 20, wall
+    assert stats["steps"] >= 375 and stats["trades"] > 0, stats
+    assert stats["simulated_latency_sec"] > 0
+    for t in result["trades"]:
+        assert t["mode"] == "PAPER" and t["entry_time"].startswith("2025-01-15T")
+        assert t["entry_time"] < t["exit_time"] <= "2025-01-15T15:31"
+    assert all(not s.get("current_trade") for s in result["sessions"])
+    assert any(s.get("daily_trade_count") for s in result["sessions"])
+    # Process state is restored after the replay.
+    assert isinstance(get_clock(), WallClock) and get_trade_journal() is journal
+    print(f"[PASS] {stats['trades']} trades over {stats['steps']} steps in {wall:.2f}s "
+          f"(simulated latency {stats['simulated_latency_sec']:.1f}s)")
+
+
+def test_seeded_replay_is_deterministic():
+    """Same feed + seed gives identical trades; another seed changes the fills"""
+    print("\n=== TEST 2: Deterministic Replay ===")
+    ticks = _recorded_day()
+    first = _fingerprint(_replay(11, ticks))
+    second = _fingerprint(_replay(11, ticks))
+    other = _fingerprint(_replay(12, ticks))
+    assert first and first == second
+    assert [t[3] for t in first] != [t[3] for t in other]
+    print(f"[PASS] {len(first)} identical trades across runs")
+
+
+def test_fill_model_per_session_streams():
+    """Seeded fill draws depend on the session, not on the order sessions are evaluated in"""
+    print("\n=== TEST 3: Per-Session Fill Model ===")
+    a = paper_executor.PaperFillModel(5)
+    b = paper_executor.PaperFillModel(5)
+    s1, s2 = {"sessionId": "one"}, {"sessionId": "two"}
+    first = [a.rng(s1).random(), a.rng(s2).random()]
+    second = [b.rng(s2).random(), b.rng(s1).random()]
+    assert first == second[::-1]
+    slipped = paper_executor._apply_slippage(100.0, "BUY", 0.05, 0.2, rng=paper_executor.PaperFillModel(5).rng(s1))
+    assert slipped == paper_executor._apply_slippage(100.0, "BUY", 0.05, 0.2, rng=paper_executor.PaperFillModel(5).rng(s1))
+    print("[PASS] fill draws are per session")
+
+
+def test_refuses_while_live_engine_runs():
+    """A replay does not swap the process-wide clock/stream/journal under a live engine or stream"""
+    print("\n=== TEST 4: Live Engine Guard ===")
+    ticks = _recorded_day()[:40]
+
+    class _Ticker:
+        def connect(self, threaded=True):
+            pass
+
+        def close(self):
+            pass
+
+    saved = get_tick_stream()
+    live_stream = TickStream(ticker_factory=_Ticker)
+    live_stream.start()
+    set_tick_stream(live_stream)
+    try:
+        try:
+            _replay(1, ticks)
+            raise AssertionError("replay ran under a live tick stream")
+        except ReplayConflictError:
+            pass
+    finally:
+        live_stream.stop()
+        set_tick_stream(saved)
+
+    live_engine = SessionTickEngine(sessions_lock=threading.Lock(), save_sessions_fn=lambda: None, max_workers=1)
+    live_engine.run_tick([{"sessionId": "live", "status": "ACTIVE"}], lambda s: None)
+    try:
+        try:
+            _replay(1, ticks)
+            raise AssertionError("replay ran while a live tick engine was ticking")
+        except ReplayConflictError:
+            pass
+    finally:
+        live_engine.shutdown()
+    assert _replay(1, ticks)["stats"]["steps"] > 0
+    print("[PASS] replay refused while the live stream or engine runs")
+
+
+if __name__ == "__main__":
+    test_full_day_replays_in_seconds()
+    test_seeded_replay_is_deterministic()
+    test_fill_model_per_session_streams()
+    test_refuses_while_live_engine_runs()
@@ -0,0 +1,120 @@
+"""
+Test script for the batched quote gateway (engine.quote_gateway) and the zerodha_client quote helpers.
+The broker is a counting fake; no Kite connection required.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import engine.zerodha_client as zerodha_client
+from engine.quote_gateway import QuoteGateway, TokenBucket, set_quote_gateway
+
+broker_calls = []
+_lock = threading.Lock()
+
+
+def _fake_quote(keys):
+    with _lock:
+        broker_calls.append(list(keys))
+    time.sleep(0.01)
+    return {k: {"last_price": 101.0 + i, "ohlc": {"open": 100.0, "high": 110.0, "low": 95.0}, "oi": 5000.0}
+            for i, k in enumerate(keys)}
+
+
+def test_concurrent_requests_coalesce():
+    """Concurrent callers for NSE and NFO keys share one multi-key broker call"""
+    print("\n=== TEST 1: Coalescing ===")
+    broker_calls.clear()
+    gateway = QuoteGateway(_fake_quote, ttl_sec=0.5, window_sec=0.05, rate_per_sec=100)
+    keys = ["NSE:NIFTY 50", "NSE:RELIANCE"] + [f"NFO:NIFTY24FEB{22000 + 50 * i}CE" for i in range(10)]
+    results = {}
+    start = threading.Barrier(len(keys))
+
+    def worker(key):
+        start.wait()
+        results[key] = gateway.get(key)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in keys]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(results[k] and results[k]["last_price"] > 0 for k in keys)
+    assert len(broker_calls) == 1, broker_calls
+    assert sorted(broker_calls[0]) == sorted(keys)
+    stats = gateway.stats()
+    assert stats["calls_saved"] == len(keys) - 1, stats
+    print(f"[PASS] {len(keys)} requests -> {len(broker_calls)} broker call ({stats['calls_saved']} saved)")
+
+
+def test_ttl_cache():
+    """Repeat requests inside the TTL are cache hits; after it they refetch"""
+    print("\n=== TEST 2: TTL Cache ===")
+    broker_calls.clear()
+    gateway = QuoteGateway(_fake_quote, ttl_sec=0.2, window_sec=0.0, rate_per_sec=100)
+    for _ in range(5):
+        gateway.get_many(["NSE:INFY", "NFO:BANKNIFTY24FEB48000PE"])
+    assert len(broker_calls) == 1
+    assert gateway.stats()["cache_hits"] == 8
+    time.sleep(0.25)
+    gateway.get("NSE:INFY")
+    assert len(broker_calls) == 2 and broker_calls[1] == ["NSE:INFY"]
+    print(f"[PASS] 6 requests -> {len(broker_calls)} broker calls")
+
+
+def test_rate_budget():
+    """Broker calls beyond the per-second budget wait for a token and are counted as throttled"""
+    print("\n=== TEST 3: Rate Budget ===")
+    now = [0.0]
+    slept = []
+
+    def sleep(sec):
+        slept.append(sec)
+        now[0] += sec
+
+    bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0], sleep=sleep)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits[0] == 0.0 and all(abs(w - 0.5) < 1e-9 for w in waits[1:]), waits
+    assert abs(now[0] - 1.5) < 1e-9
+
+    broker_calls.clear()
+    gateway = QuoteGateway(_fake_quote, ttl_sec=0.0, window_sec=0.0, rate_per_sec=20)
+    start = time.perf_counter()
+    for i in range(4):
+        gateway.get(f"NSE:SYM{i}")
+    elapsed = time.perf_counter() - start
+    stats = gateway.stats()
+    assert stats["broker_calls"] == 4 and stats["throttled_calls"] == 3, stats
+    assert elapsed >= 0.14, elapsed
+    print(f"[PASS] throttled={stats['throttled_calls']} wait={stats['throttle_wait_sec']}s")
+
+
+def test_client_helpers_use_gateway():
+    """get_quote / get_quotes / get_quotes_bulk convert gateway entries; NFO keys are supported in bulk"""
+    print("\n=== TEST 4: zerodha_client Helpers ===")
+    broker_calls.clear()
+    set_quote_gateway(QuoteGateway(_fake_quote, ttl_sec=1.0, window_sec=0.0, rate_per_sec=100))
+    try:
+        zerodha_client.prefetch_quotes([("NIFTY24FEB22000CE", "NFO"), ("NIFTY24FEB22000PE", "NFO")])
+        q = zerodha_client.get_quote("NIFTY24FEB22000CE", exchange="NFO")
+        assert q["last"] > 0 and q["oi"] == 5000.0
+        both = zerodha_client.get_quotes([("NIFTY24FEB22000CE", "NFO"), ("NIFTY24FEB22000PE", "NFO")])
+        assert len(both) == 2
+        assert len(broker_calls) == 1, broker_calls
+        bulk = zerodha_client.get_quotes_bulk(["reliance", "NFO:NIFTY24FEB22000PE"])
+        assert set(bulk) == {"RELIANCE", "NFO:NIFTY24FEB22000PE"}
+        assert bulk["RELIANCE"]["change_pct"] != 0
+        assert broker_calls[-1] == ["NSE:RELIANCE"]
+    finally:
+        set_quote_gateway(None)
+    print(f"[PASS] helpers served with {len(broker_calls)} broker calls")
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_coalesce()
+    test_ttl_cache()
+    test_rate_budget()
+    test_client_helpers_use_gateway()
@@ -0,0 +1,198 @@
+"""
+Test script for the streaming market regime service (engine.regime_service).
+Synthetic OHLCV bars are fed bar by bar and compared with engine.market_state's batch metrics.
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from candle_fixtures import OHLCV, frame, make_candles
+from engine.algo_engine import get_suggested_algos, load_algos
+from engine.market_state import _latest_metrics, detect_market_state
+from engine.regime_service import IST, RegimeService, get_regime, set_regime_service
+from engine.tick_stream import TickStore, TickStream
+
+DAY_OPEN = int(datetime(2024, 2, 9, 9, 15, tzinfo=IST).timestamp())
+
+
+def _bars(n, seconds, seed, drift=0.0, vol=0.002, start=DAY_OPEN):
+    candles = make_candles(n, seed, price=1000.0, vol=vol, drift=drift)
+    return [{"start": start + i * seconds, **{k: c[k] for k in OHLCV}} for i, c in enumerate(candles)]
+
+
+def _resample_15m(bars_5m):
+    out = {}
+    for b in bars_5m:
+        bucket = b["start"] // 900 * 900
+        if bucket not in out:
+            out[bucket] = {**b, "start": bucket}
+        else:
+            agg = out[bucket]
+            agg.update(high=max(agg["high"], b["high"]), low=min(agg["low"], b["low"]), close=b["close"], volume=agg["volume"] + b["volume"])
+    return list(out.values())
+
+
+def _metrics_of(row, tf):
+    return tuple(row["timeframes"][tf][k] for k in ("adx", "atr_pct", "volume_ratio", "trend_bias"))
+
+
+def test_streaming_matches_batch():
+    """Bar-by-bar metrics equal market_state's batch metrics over the same bars, at every bar"""
+    print("\n=== TEST 1: Streaming == Batch Metrics ===")
+    bars = _bars(120, 60, seed=1, drift=0.0004)
+    service = RegimeService(["RELIANCE"], min_bars=1)
+    for i, bar in enumerate(bars):
+        assert service.update_bar("reliance", "1m", bar)
+        assert not service.update_bar("RELIANCE", "1m", bar)  # duplicate close ignored
+        batch = _latest_metrics(frame(bars[: i + 1]))
+        streamed = service._metrics[0, 0]
+        assert np.allclose(streamed, [batch.adx, batch.atr_pct, batch.volume_ratio, batch.trend_bias], rtol=1e-9, atol=1e-9), i
+    assert not service.update_bar("TCS", "1m", bars[0]) and not service.update_bar("RELIANCE", "15m", bars[0])
+    print(f"[PASS] {len(bars)} bars match batch ADX/ATR%/volume ratio/trend bias")
+
+
+def test_15m_from_5m():
+    """15m bars are built from closed 5m bars; a missing 5m bar closes its bucket on the next one"""
+    print("\n=== TEST 2: 15m Derivation ===")
+    bars_5m = _bars(90, 300, seed=2)
+    del bars_5m[41]  # bucket 13 never gets its third bar: it closes when bucket 14 starts
+    service = RegimeService(["TCS"], min_bars=1)
+    for bar in bars_5m:
+        service.update_bar("TCS", "5m", bar)
+    bars_15m = _resample_15m(bars_5m)
+    assert service._bars[2, 0] == len(bars_15m) == 30
+    batch = _latest_metrics(frame(bars_15m))
+    assert np.allclose(service._metrics[2, 0], [batch.adx, batch.atr_pct, batch.volume_ratio, batch.trend_bias])
+    partial = RegimeService(["TCS"], min_bars=1)
+    for bar in bars_5m[:5]:  # 1.67 buckets: only the first 15m bar is closed
+        partial.update_bar("TCS", "5m", bar)
+    assert partial._bars[2, 0] == 1
+    print(f"[PASS] {len(bars_15m)} x 15m bars from {len(bars_5m)} x 5m")
+
+
+def test_table_matches_detect_market_state():
+    """One vectorized evaluation of the watchlist equals detect_market_state per symbol"""
+    print("\n=== TEST 3: Vectorized Regime Table ===")
+    setups = {"UP": (0.0015, 0.001), "DOWN": (-0.0015, 0.001), "FLAT": (0.0, 0.0004), "WILD": (0.0, 0.02), "CHOP": (0.0, 0.003)}
+    service = RegimeService(list(setups) + ["NODATA"])
+    frames = {}
+    for k, (symbol, (drift, vol)) in enumerate(setups.items()):
+        b1, b5 = _bars(100, 60, seed=10 + k, drift=drift, vol=vol), _bars(90, 300, seed=20 + k, drift=drift, vol=vol)
+        for bar in b1:
+            service.update_bar(symbol, "1m", bar)
+        for bar in b5:
+            service.update_bar(symbol, "5m", bar)
+        frames[symbol] = (frame(b1), frame(b5), frame(_resample_15m(b5)))
+    table = service.evaluate()
+    assert set(table) == set(setups) and service.regime("nodata") is None
+    regimes = set()
+    for symbol, (d1, d5, d15) in frames.items():
+        state = detect_market_state(d1, d5, d15)
+        row = table[symbol]
+        assert row["regime"] == state.regime and abs(row["quality_score"] - state.quality_score) < 1e-9, symbol
+        assert np.allclose(_metrics_of(row, "15m"), (state.metrics_15m.adx, state.metrics_15m.atr_pct,
+                                                     state.metrics_15m.volume_ratio, state.metrics_15m.trend_bias))
+        assert abs(row["adx_weighted"] - state.adx_weighted) < 1e-9
+        assert row["bar_time"] == "2024-02-09T10:55:00+05:30"
+        regimes.add(row["regime"])
+    assert len(regimes) >= 3, regimes
+    print(f"[PASS] {len(table)} symbols in one pass: {sorted(regimes)}")
+
+
+def test_tick_stream_listener():
+    """Bars closed by a tick batch reach the installed service once per batch"""
+    print("\n=== TEST 4: Tick Stream Bar-Close Listener ===")
+    tokens = {("RELIANCE", "NSE"): 738561, ("NIFTY 50", "NSE"): 256265}
+    stream = TickStream(ticker_factory=lambda: None, resolve_token=lambda s, e: tokens.get((s, e)), store=TickStore(stale_sec=None))
+    stream.sync_subscriptions(list(tokens))
+    service = RegimeService(["RELIANCE"], min_bars=3)
+    set_regime_service(service)
+    try:
+        prices = 2900 * np.cumprod(1 + np.random.default_rng(5).normal(0.0002, 0.001, 180))
+        batch = []
+        for i, price in enumerate(prices):  # one tick every 20s for an hour
+            ts = DAY_OPEN + 20 * i
+            batch.append({"instrument_token": 738561, "last_price": float(price), "volume_traded": 1000 + 50 * i, "exchange_timestamp": ts})
+            batch.append({"instrument_token": 256265, "last_price": 22000.0 + i, "exchange_timestamp": ts})
+            if len(batch) == 30:
+                stream._on_ticks(None, batch)
+                batch = []
+        stream._on_ticks(None, batch)
+        closed_1m = stream.store.candles(738561, "1m")[:-1]
+        assert service._series[("RELIANCE", "1m")].last_start == int(datetime.fromisoformat(closed_1m[-1]["date"]).timestamp())
+        assert list(service._bars[:, 0]) == [59, 11, 3], service._bars[:, 0]
+        assert service.evaluations == 12  # one evaluation per tick batch (15 ticks = 5 minutes, so each closes a bar)
+        row = get_regime("RELIANCE")
+        assert row is not None and row["regime"] in ("TREND_UP", "TREND_DOWN", "RANGE", "LOW_VOL", "HIGH_VOL")
+        assert get_regime("NIFTY 50") is None
+    finally:
+        set_regime_service(None)
+    assert get_regime("RELIANCE") is None
+    print(f"[PASS] {service._bars[0, 0]} x 1m bars streamed, regime {row['regime']}")
+
+
+def test_refresh_from_rest():
+    """REST refresh feeds closed bars only, once per bar interval, and skips current series"""
+    print("\n=== TEST 5: REST Refresh ===")
+    b1, b5 = _bars(61, 60, seed=7), _bars(31, 300, seed=8)
+    frames = {
+        "1m": pd.DataFrame([{"Datetime": datetime.fromtimestamp(b["start"], IST), **{k.capitalize(): b[k] for k in ("open", "high", "low", "close", "volume")}} for b in b1]),
+        "5m": pd.DataFrame([{"Datetime": datetime.fromtimestamp(b["start"], IST).replace(tzinfo=None), **{k.capitalize(): b[k] for k in ("open", "high", "low", "close", "volume")}} for b in b5]),
+    }
+    calls = []
+
+    def fetch(symbol, interval):
+        calls.append((symbol, interval))
+        return frames[interval]
+
+    service = RegimeService(["INFY", "SBIN"], min_bars=4)
+    now = DAY_OPEN + 60 * 60 + 30  # 10:15:30 - the 10:15 bars are still forming
+    service.refresh(fetch, now=now)
+    assert len(calls) == 4 and list(service._bars[:, 0]) == [60, 12, 4]
+    assert set(service.table()) == {"INFY", "SBIN"}
+    service.refresh(fetch, now=now + 10)
+    assert len(calls) == 4  # nothing closed since the last fetch
+    service.update_bar("INFY", "1m", b1[-1])  # 10:15 bar closed on the stream
+    service.refresh(fetch, now=DAY_OPEN + 61 * 60 + 5)
+    assert calls[4:] == [("SBIN", "1m")], calls[4:]
+    print(f"[PASS] {len(calls)} fetches, {service._bars[0, 1]} x 1m bars for SBIN")
+
+
+def test_suggested_algos_use_regime():
+    """get_suggested_algos favours algos that fit the published regime of the symbol"""
+    print("\n=== TEST 6: Regime-Aware Algo Suggestions ===")
+    types = {a["id"]: (a.get("marketType") or "").upper() for a in load_algos()}
+    neutral = {"score": 0, "prediction": "NEUTRAL", "rsi": 50, "sentiment_score": 0}
+    baseline = get_suggested_algos(neutral, top_n=3)
+    assert types[baseline[0]] == "RANGE"
+    trend = get_suggested_algos({**neutral, "regime": {"regime": "TREND_UP", "quality_score": 80}}, top_n=3)
+    assert all(types[a] == "TREND" for a in trend), trend
+    weak = get_suggested_algos({**neutral, "regime": {"regime": "TREND_UP", "quality_score": 5}}, top_n=3)
+    assert types[weak[0]] == "RANGE"  # low-quality regime barely moves the ranking
+    volatile = get_suggested_algos({**neutral, "regime": "HIGH_VOL"}, top_n=3)
+    assert all(types[a] in ("EVENT", "VOLATILE", "OPTIONS") for a in volatile), volatile
+
+    service = RegimeService(["RELIANCE"])
+    service._table = {"RELIANCE": {"symbol": "RELIANCE", "regime": "TREND_DOWN", "quality_score": 90.0}}
+    set_regime_service(service)
+    try:
+        by_symbol = get_suggested_algos({**neutral, "symbol": "reliance"}, top_n=3)
+        unknown = get_suggested_algos({**neutral, "symbol": "TCS"}, top_n=3)
+    finally:
+        set_regime_service(None)
+    assert types[by_symbol[0]] == "TREND" and unknown == baseline
+    print(f"[PASS] baseline {baseline[0]}, trend regime {trend[0]}, high vol {volatile[0]}")
+
+
+if __name__ == "__main__":
+    test_streaming_matches_batch()
+    test_15m_from_5m()
+    test_table_matches_detect_market_state()
+    test_tick_stream_listener()
+    test_refresh_from_rest()
+    test_suggested_algos_use_regime()
@@ -0,0 +1,134 @@
+"""
+Test script for incremental session persistence (engine.session_store).
+Uses temporary files; the real data/trade_sessions*.json files are never touched.
+"""
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import RLock
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.session_store import IST, SessionStore
+
+
+def _session(i, days_ago=0):
+    created = datetime.now(IST) - timedelta(days=days_ago)
+    return {"sessionId": f"ts_{i}", "status": "ACTIVE", "createdAt": created.isoformat(), "daily_pnl": 0.0, "trade_history": []}
+
+
+def _is_history(session, today):
+    return datetime.fromisoformat(session["createdAt"]).date() < today
+
+
+def _store(tmp, sessions, lock, **kwargs):
+    return SessionStore(
+        today_file=Path(tmp) / "trade_sessions.json",
+        history_file=Path(tmp) / "trade_sessions_history.json",
+        get_sessions_fn=lambda: sessions,
+        sessions_lock=lock,
+        is_history_fn=_is_history,
+        **kwargs,
+    )
+
+
+def _log_lines(tmp):
+    path = Path(tmp) / "trade_sessions.changes.jsonl"
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_only_dirty_sessions_written():
+    """A flush appends only the sessions whose content changed"""
+    print("\n=== TEST 1: Dirty Tracking ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = [_session(i) for i in range(20)]
+        store = _store(tmp, sessions, RLock())
+        store.load()
+        store.finish_recovery()
+        assert _log_lines(tmp) == []
+        sessions[3]["daily_pnl"] = 125.5
+        sessions[7]["status"] = "STOPPED"
+        assert store.flush() == 2
+        ids = [json.loads(line)["id"] for line in _log_lines(tmp)]
+        assert ids == ["ts_3", "ts_7"], ids
+        assert store.flush() == 0
+        print(f"[PASS] {len(ids)} of {len(sessions)} sessions written")
+
+
+def test_background_writer_coalesces():
+    """A burst of save requests becomes one background write; the caller never touches disk"""
+    print("\n=== TEST 2: Coalescing Writer ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = [_session(i) for i in range(5)]
+        store = _store(tmp, sessions, RLock(), coalesce_seconds=0.2)
+        store.load()
+        store.finish_recovery()
+        start = time.perf_counter()
+        for n in range(100):
+            sessions[n % 5]["daily_pnl"] = float(n)
+            store.request_save()
+        elapsed = time.perf_counter() - start
+        deadline = time.time() + 5
+        while store.stats["writes"] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        assert store.stats["writes"] == 1, store.stats
+        assert len(_log_lines(tmp)) == 5
+        store.stop()
+        print(f"[PASS] 100 requests in {elapsed * 1000:.2f}ms -> {store.stats['writes']} write")
+
+
+def test_recovery_from_snapshot_and_log():
+    """Snapshots + change log (with a torn last line) recover the latest state, including deletes"""
+    print("\n=== TEST 3: Startup Recovery ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        lock = RLock()
+        sessions = [_session(i) for i in range(4)] + [_session(9, days_ago=3)]
+        store = _store(tmp, sessions, lock)
+        store.load()
+        store.finish_recovery()
+        store.compact()
+        sessions[0]["daily_pnl"] = -40.0
+        del sessions[1]
+        sessions.append(_session(5))
+        store.flush()
+        with open(Path(tmp) / "trade_sessions.changes.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"id":"ts_2","session":{"sessionId":"ts_2","daily_pnl":99')
+
+        recovered = _store(tmp, [], lock).load()
+        by_id = {s["sessionId"]: s for s in recovered}
+        assert set(by_id) == {"ts_0", "ts_2", "ts_3", "ts_5", "ts_9"}, set(by_id)
+        assert by_id["ts_0"]["daily_pnl"] == -40.0 and by_id["ts_2"]["daily_pnl"] == 0.0
+        history = json.loads((Path(tmp) / "trade_sessions_history.json").read_text())["sessions"]
+        assert [s["sessionId"] for s in history] == ["ts_9"]
+        print(f"[PASS] recovered {len(recovered)} sessions")
+
+
+def test_compaction_clears_log():
+    """The log folds into the snapshots after compact_after lines"""
+    print("\n=== TEST 4: Compaction ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = [_session(i) for i in range(3)]
+        store = _store(tmp, sessions, RLock(), compact_after=5)
+        store.load()
+        store.finish_recovery()
+        for n in range(3):
+            sessions[0]["daily_pnl"] = float(n + 1)
+            sessions[1]["daily_pnl"] = float(n + 1)
+            store.flush()
+        assert store.stats["compactions"] >= 2 and len(_log_lines(tmp)) < 5
+        today = json.loads((Path(tmp) / "trade_sessions.json").read_text())["sessions"]
+        assert len(today) == 3
+        recovered = {s["sessionId"]: s for s in _store(tmp, [], RLock()).load()}
+        assert recovered["ts_1"]["daily_pnl"] == 3.0
+        print(f"[PASS] {store.stats['compactions']} compactions")
+
+
+if __name__ == "__main__":
+    test_only_dirty_sessions_written()
+    test_background_writer_coalesces()
+    test_recovery_from_snapshot_and_log()
+    test_compaction_clears_log()
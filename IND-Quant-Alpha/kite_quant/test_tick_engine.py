@@ -0,0 +1,229 @@
+"""
+Test script for the concurrent session tick engine (engine.tick_engine).
+Sessions are evaluated by a fake evaluator that sleeps like a slow broker call.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.tick_engine import SessionTickEngine, TickScope, current_tick_scope
+
+
+def _sessions(n, instruments=("NIFTY", "BANKNIFTY", "RELIANCE")):
+    return [
+        {"sessionId": f"s{i}", "status": "ACTIVE", "instrument": instruments[i % len(instruments)], "hourly_trade_count": 0}
+        for i in range(n)
+    ]
+
+
+def _engine(saves, deadline=5.0, on_orphaned_trade=None):
+    lock = threading.RLock()
+    return lock, SessionTickEngine(
+        sessions_lock=lock,
+        save_sessions_fn=lambda: saves.append(1),
+        max_workers=32,
+        session_deadline_sec=deadline,
+        on_orphaned_trade=on_orphaned_trade,
+    )
+
+
+def test_flat_latency_and_shared_data():
+    """30 sessions take about as long as 3; each instrument is fetched once per tick"""
+    print("\n=== TEST 1: Flat Latency / Shared Market Data ===")
+    fetches = []
+
+    def evaluate(session):
+        loader = lambda: fetches.append(session["instrument"]) or time.sleep(0.2) or [1, 2, 3]
+        candles = current_tick_scope().get(("ohlc", session["instrument"]), loader)
+        time.sleep(0.1)
+        session["last_entry_check"] = {"candles": len(candles)}
+
+    saves = []
+    _, engine = _engine(saves)
+    durations = {}
+    for n in (3, 30):
+        fetches.clear()
+        sessions = _sessions(n)
+        stats = engine.run_tick(sessions, evaluate)
+        durations[n] = stats["duration_sec"]
+        assert stats["completed"] == n and not stats["overrun"]
+        assert sorted(fetches) == ["BANKNIFTY", "NIFTY", "RELIANCE"], fetches
+        assert all(s["last_entry_check"] == {"candles": 3} for s in sessions)
+        assert stats["shared_loads"] == 3 and stats["shared_hits"] == n - 3
+    assert durations[30] < durations[3] * 2.5, durations
+    print(f"[PASS] 3 sessions {durations[3]:.2f}s, 30 sessions {durations[30]:.2f}s")
+
+
+def test_commit_keeps_concurrent_changes():
+    """Keys changed by API handlers during the tick survive; keys the tick changed are applied"""
+    print("\n=== TEST 2: Commit Merges Changed Keys ===")
+    saves = []
+    lock, engine = _engine(saves)
+    sessions = _sessions(1)
+    live = sessions[0]
+
+    def evaluate(session):
+        with lock:
+            live["stop_requested"] = True  # e.g. user action while the tick is fetching data
+        session["hourly_trade_count"] = 1
+
+    engine.run_tick(sessions, evaluate)
+    assert live["stop_requested"] is True and live["hourly_trade_count"] == 1
+    assert saves, "changed session must be saved"
+    print("[PASS] merge keeps concurrent updates")
+
+
+def test_deadline_and_in_flight_skip():
+    """A session over its deadline does not block the tick and is not evaluated twice"""
+    print("\n=== TEST 3: Deadline / In-flight Skip ===")
+    saves = []
+    _, engine = _engine(saves, deadline=1.0)
+    sessions = _sessions(2)
+    release = threading.Event()
+
+    def evaluate(session):
+        if session["sessionId"] == "s0":
+            release.wait(5)
+        session["evaluated"] = session.get("evaluated", 0) + 1
+
+    stats = engine.run_tick(sessions, evaluate)
+    assert stats["overrun"] == ["s0"] and stats["completed"] == 1
+    stats = engine.run_tick(sessions, evaluate)
+    assert stats["skipped_in_flight"] == ["s0"]
+    release.set()
+    time.sleep(0.2)
+    assert sessions[0]["evaluated"] == 1 and sessions[1]["evaluated"] == 2
+    print("[PASS] overrun committed late, skipped while in flight")
+
+
+def test_scope_single_flight_retry_on_error():
+    """A failed load is not cached; the next caller retries"""
+    print("\n=== TEST 4: Failed Loads Not Cached ===")
+    scope = TickScope(1)
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise RuntimeError("broker down")
+
+    try:
+        scope.get("q", boom)
+    except RuntimeError:
+        pass
+    assert scope.get("q", lambda: 42) == 42 and len(calls) == 1
+    print("[PASS] retry after failure")
+
+
+def test_commit_merges_nested_trade_fields():
+    """A trailing-stop update made during the tick survives the worker's older current_trade"""
+    print("\n=== TEST 5: Nested current_trade Merge ===")
+    saves = []
+    lock, engine = _engine(saves)
+    sessions = _sessions(1)
+    live = sessions[0]
+    live["current_trade"] = {"trade_id": "t1", "trailing_stop": 100.0, "high_since_entry": 110.0}
+
+    def evaluate(session):
+        with lock:
+            live["current_trade"]["trailing_stop"] = 104.0  # trailing sync tightened the broker stop
+        session["current_trade"]["high_since_entry"] = 112.0
+
+    engine.run_tick(sessions, evaluate)
+    assert live["current_trade"] == {"trade_id": "t1", "trailing_stop": 104.0, "high_since_entry": 112.0}, live
+    assert saves
+
+    def close(session):
+        with lock:
+            live["current_trade"]["trailing_stop"] = 106.0
+        session["current_trade"] = None  # the tick exited the trade
+
+    engine.run_tick(sessions, close)
+    assert live["current_trade"] is None, live
+    print("[PASS] nested fields merged, tick exit applied")
+
+
+def test_stop_during_tick_discards_result():
+    """A session stopped while a worker opens a trade does not keep the trade; the trade is handed off"""
+    print("\n=== TEST 6: Stop During Tick ===")
+    saves = []
+    orphaned = []
+    lock_free = []
+
+    def close_trade(session):
+        # Runs outside the sessions lock: another thread can take it while the exit is in flight
+        probe = threading.Thread(target=lambda: lock_free.append(lock.acquire(timeout=1) and (lock.release() or True)))
+        probe.start()
+        probe.join()
+        assert session["orphaned_exit_pending"] and session["status"] == "STOPPED"
+        orphaned.append(session["current_trade"])
+        session["current_trade"] = None
+        session["realized_pnl"] = 12.5
+
+    lock, engine = _engine(saves, on_orphaned_trade=close_trade)
+    sessions = _sessions(2)
+
+    def evaluate(session):
+        with lock:
+            sessions[0]["status"] = "STOPPED"  # kill API while the tick is placing the entry
+        session["current_trade"] = {"trade_id": session["sessionId"]}
+        session["hourly_trade_count"] = 1
+
+    engine.run_tick(sessions, evaluate)
+    stopped = sessions[0]
+    assert stopped["status"] == "STOPPED" and not stopped.get("current_trade"), stopped
+    assert stopped["hourly_trade_count"] == 0 and stopped["realized_pnl"] == 12.5
+    assert "orphaned_exit_pending" not in stopped
+    assert orphaned == [{"trade_id": "s0"}], orphaned
+    assert lock_free == [True], lock_free
+    assert sessions[1]["current_trade"] == {"trade_id": "s1"}
+    print("[PASS] stopped session left flat, opened trade closed outside the sessions lock")
+
+
+def test_scope_private_to_tick_workers():
+    """Threads outside the tick (API handlers) see no scope; work handed off with copy_context does"""
+    print("\n=== TEST 7: Tick Scope Visibility ===")
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    saves = []
+    _, engine = _engine(saves)
+    outside = []
+    started, release = threading.Event(), threading.Event()
+
+    def api_handler():
+        started.wait(2)
+        outside.append(current_tick_scope())
+        release.set()
+
+    handler = threading.Thread(target=api_handler)
+    handler.start()
+    helper = ThreadPoolExecutor(max_workers=1)
+
+    def evaluate(session):
+        scope = current_tick_scope()
+        started.set()
+        release.wait(2)
+        handed = helper.submit(contextvars.copy_context().run, current_tick_scope).result()
+        session["same_scope"] = scope is not None and handed is scope
+
+    sessions = _sessions(1)
+    engine.run_tick(sessions, evaluate)
+    handler.join()
+    helper.shutdown()
+    assert outside == [None], outside
+    assert sessions[0]["same_scope"] is True, sessions[0]
+    assert current_tick_scope() is None
+    print("[PASS] scope visible to tick workers only")
+
+
+if __name__ == "__main__":
+    test_flat_latency_and_shared_data()
+    test_commit_keeps_concurrent_changes()
+    test_deadline_and_in_flight_skip()
+    test_scope_single_flight_retry_on_error()
+    test_commit_merges_nested_trade_fields()
+    test_stop_during_tick_discards_result()
+    test_scope_private_to_tick_workers()
@@ -0,0 +1,174 @@
+"""
+Test script for the engine tick profiler (engine.tick_profiler).
+Drives SessionTickEngine with fake evaluators whose stages sleep, and a fake broker client.
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.tick_engine import SessionTickEngine
+from engine.tick_profiler import (
+    LatencyHistogram,
+    TickProfiler,
+    count_call,
+    get_tick_profiler,
+    profile_stage,
+    profiled_client,
+    set_tick_profiler,
+)
+
+
+class _FakeKite:
+    def __init__(self):
+        self.calls = 0
+
+    def ltp(self, symbols):
+        self.calls += 1
+        time.sleep(0.002)
+        return {s: {"last_price": 100.0} for s in symbols}
+
+    def margins(self):
+        self.calls += 1
+        return {"equity": {"available": {"live_balance": 1.0}}}
+
+
+def _engine():
+    return SessionTickEngine(sessions_lock=threading.RLock(), save_sessions_fn=lambda: None, max_workers=8)
+
+
+def test_histogram_percentiles():
+    """Percentiles interpolate within the bucket that holds the rank"""
+    print("\n=== TEST 1: Latency Histogram ===")
+    h = LatencyHistogram()
+    for i in range(1, 101):
+        h.observe(i / 1000.0)  # 1ms .. 100ms
+    s = h.summary()
+    assert s["count"] == 100 and abs(s["mean_ms"] - 50.5) < 1e-6 and s["max_ms"] == 100.0
+    assert 25.0 <= s["p50_ms"] <= 50.0, s
+    assert 50.0 <= s["p95_ms"] <= 100.0 and s["p95_ms"] <= s["p99_ms"] <= s["max_ms"], s
+    assert LatencyHistogram().summary()["count"] == 0
+    print(f"[PASS] p50={s['p50_ms']}ms p95={s['p95_ms']}ms p99={s['p99_ms']}ms")
+
+
+def test_disabled_is_noop():
+    """With profiling off, hooks return the shared no-op context and record nothing"""
+    print("\n=== TEST 2: Disabled Profiler ===")
+    set_tick_profiler(TickProfiler(enabled=False))
+    try:
+        profiler = get_tick_profiler()
+        assert profile_stage("a") is profile_stage("b") is profiler.session_scope("s1")
+        with profile_stage("entry_check"):
+            count_call("broker.ltp")
+        kite = _FakeKite()
+        assert profiled_client(kite) is kite
+        f = len
+        assert profiler.bind_session(f) is f
+        _engine().run_tick([{"sessionId": "s1", "status": "ACTIVE"}], lambda s: None)
+        assert profiler.snapshot() == {"enabled": False}
+    finally:
+        set_tick_profiler(None)
+    print("[PASS] no timing, counting or proxying when disabled")
+
+
+def test_per_session_attribution():
+    """Stages and broker calls land on the session that made them; slowest sessions ranked"""
+    print("\n=== TEST 3: Per-Session Attribution ===")
+    set_tick_profiler(TickProfiler(enabled=True, slowest=2))
+    kite = _FakeKite()
+    try:
+        profiler = get_tick_profiler()
+        client = profiled_client(kite)
+        delays = {"fast": 0.005, "medium": 0.03, "slow": 0.08}
+
+        def evaluate(session):
+            with profile_stage("strategy_select"):
+                time.sleep(delays[session["sessionId"]])
+            with profile_stage("entry_check"):
+                client.ltp([session["sessionId"]])
+
+        engine = _engine()
+        sessions = [{"sessionId": k, "status": "ACTIVE"} for k in delays]
+        for _ in range(3):
+            engine.run_tick(sessions, evaluate)
+        snap = profiler.snapshot()
+        assert snap["ticks"] == 3 and kite.calls == 9
+        assert snap["calls"]["broker.ltp"] == 9 and snap["broker_calls"] == 9
+        for stage in ("tick", "session", "commit", "strategy_select", "entry_check", "broker.ltp"):
+            assert snap["stages"][stage]["count"] > 0, stage
+        assert snap["stages"]["session"]["count"] == 9
+        last = snap["last_tick"]
+        assert last["tick_id"] == 3 and last["calls"] == {"broker.ltp": 3}
+        assert [s["session"] for s in last["slowest_sessions"]] == ["slow", "medium"]
+        slow = last["slowest_sessions"][0]
+        assert next(iter(slow["stages_ms"])) == "strategy_select" and slow["calls"] == {"broker.ltp": 1}
+        assert [s["session"] for s in snap["slowest_sessions"]] == ["slow", "medium"]
+        assert snap["slowest_sessions"][0]["slowest_stage"] == "strategy_select"
+        assert snap["slowest_sessions"][0]["ticks"] == 3
+    finally:
+        set_tick_profiler(None)
+    print(f"[PASS] slowest sessions {[s['session'] for s in last['slowest_sessions']]}, {snap['broker_calls']} broker calls")
+
+
+def test_bind_session_across_threads():
+    """Work handed to another pool (call_with_timeout) stays attributed to the calling session"""
+    print("\n=== TEST 4: Session Binding Across Threads ===")
+    set_tick_profiler(TickProfiler(enabled=True))
+    pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        profiler = get_tick_profiler()
+        client = profiled_client(_FakeKite())
+
+        def place(session):
+            client.margins()
+            with profile_stage("order_placement"):
+                return client.ltp(["X"])
+
+        def evaluate(session):
+            pool.submit(profiler.bind_session(place), session).result(timeout=5)
+            pool.submit(client.margins).result(timeout=5)  # unbound: global count only
+
+        _engine().run_tick([{"sessionId": "s1", "status": "ACTIVE"}], evaluate)
+        snap = profiler.snapshot()
+        run = snap["last_tick"]["slowest_sessions"][0]
+        assert run["calls"] == {"broker.margins": 1, "broker.ltp": 1}, run
+        assert "order_placement" in run["stages_ms"]
+        assert snap["calls"]["broker.margins"] == 2 and snap["broker_calls"] == 3
+    finally:
+        pool.shutdown(wait=True)
+        set_tick_profiler(None)
+    print("[PASS] bound calls attributed to the session, unbound counted globally")
+
+
+def test_prometheus_exposition():
+    """Cumulative buckets per stage, +Inf equal to the count, call counters"""
+    print("\n=== TEST 5: Prometheus Text ===")
+    profiler = TickProfiler(enabled=True)
+    for ms in (0.5, 3, 3, 40, 700):
+        profiler.observe("entry_check", ms / 1000.0)
+    profiler.count("broker.ltp", 4)
+    text = profiler.prometheus()
+    lines = text.splitlines()
+    assert "# TYPE engine_stage_seconds histogram" in lines
+    buckets = [l for l in lines if l.startswith('engine_stage_seconds_bucket{stage="entry_check"')]
+    values = [int(l.rsplit(" ", 1)[1]) for l in buckets]
+    assert values == sorted(values) and values[-1] == 5 and buckets[-1].endswith('le="+Inf"} 5')
+    assert 'engine_stage_seconds_bucket{stage="entry_check",le="0.001"} 1' in lines
+    assert 'engine_stage_seconds_bucket{stage="entry_check",le="0.005"} 3' in lines
+    assert 'engine_stage_seconds_count{stage="entry_check"} 5' in lines
+    assert 'engine_calls_total{name="broker.ltp"} 4' in lines
+    assert "engine_ticks_total 0" in lines
+    profiler.reset()
+    assert profiler.snapshot()["stages"] == {}
+    print(f"[PASS] {len(lines)} exposition lines")
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_disabled_is_noop()
+    test_per_session_attribution()
+    test_bind_session_across_threads()
+    test_prometheus_exposition()
@@ -0,0 +1,110 @@
+"""
+Test script for Kite tick streaming (engine.tick_stream) against the local replay server.
+The real KiteTicker client connects to engine.tick_replay over a local WebSocket.
+"""
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from engine.tick_replay import TickReplayServer, encode_frame
+from engine.tick_stream import IST, TickStore, TickStream, merge_streamed_candles
+
+NIFTY_TOKEN = 256265  # index token (segment 9)
+RELIANCE_TOKEN = 738561
+
+
+def _recorded_ticks():
+    """Two instruments, one tick every 20s from 09:15 to 09:29:40 IST."""
+    start = int(datetime(2024, 2, 9, 9, 15, tzinfo=IST).timestamp())
+    ticks = []
+    for i in range(45):
+        ts = start + 20 * i
+        ticks.append({"instrument_token": NIFTY_TOKEN, "last_price": 22000 + i, "exchange_timestamp": ts,
+                      "ohlc": {"open": 22000, "high": 22000 + i, "low": 22000, "close": 21950}})
+        ticks.append({"instrument_token": RELIANCE_TOKEN, "last_price": 2900 + (i % 7) * 0.5, "volume_traded": 1000 + 100 * i,
+                      "exchange_timestamp": ts, "ohlc": {"open": 2900, "high": 2903, "low": 2899, "close": 2890}})
+    return ticks
+
+
+def test_store_rolls_candles():
+    """Ticks roll into 1m/5m OHLCV bars; volume comes from cumulative day volume deltas"""
+    print("\n=== TEST 1: Candle Aggregation ===")
+    store = TickStore()
+    ticks = _recorded_ticks()
+    store.update(ticks)
+    bars_5m = store.candles(RELIANCE_TOKEN, "5minute")
+    bars_1m = store.candles(RELIANCE_TOKEN, "1m")
+    assert len(bars_5m) == 3 and len(bars_1m) == 15
+    assert bars_5m[0]["date"] == "2024-02-09T09:15:00+05:30"
+    rel = [t for t in ticks if t["instrument_token"] == RELIANCE_TOKEN]
+    first = [t["last_price"] for t in rel[:15]]
+    assert bars_5m[0]["open"] == first[0] and bars_5m[0]["close"] == first[-1]
+    assert bars_5m[0]["high"] == max(first) and bars_5m[0]["low"] == min(first)
+    assert sum(b["volume"] for b in bars_5m) == rel[-1]["volume_traded"] - rel[0]["volume_traded"]
+    assert store.candles(NIFTY_TOKEN, "5m", count=1)[0]["close"] == 22044
+    print(f"[PASS] {len(bars_1m)} x 1m, {len(bars_5m)} x 5m bars")
+
+
+def test_merge_with_history():
+    """Streamed bars replace the REST history from their first bar onwards"""
+    print("\n=== TEST 2: Merge With History ===")
+    history = [{"date": f"2024-02-09T09:{m:02d}:00+05:30", "close": 1.0} for m in (5, 10, 15)]
+    streamed = [{"date": f"2024-02-09T09:{m:02d}:00+05:30", "close": 2.0} for m in (15, 20)]
+    merged = merge_streamed_candles(history, streamed, count=10)
+    assert [c["close"] for c in merged] == [1.0, 1.0, 2.0, 2.0]
+    print("[PASS] history + stream merged")
+
+
+def test_replay_server_end_to_end():
+    """KiteTicker subscribed through TickStream receives replayed ticks; quotes/candles served lock-free"""
+    print("\n=== TEST 3: Replay Server -> KiteTicker -> TickStream ===")
+    from kiteconnect import KiteTicker
+
+    ticks = _recorded_ticks()
+    server = TickReplayServer(ticks).start()
+    tokens = {("NIFTY 50", "NSE"): NIFTY_TOKEN, ("RELIANCE", "NSE"): RELIANCE_TOKEN}
+    stream = TickStream(
+        ticker_factory=lambda: KiteTicker("test_key", "test_token", root=server.url, reconnect=False),
+        resolve_token=lambda symbol, exchange: tokens.get((symbol, exchange)),
+    )
+    try:
+        stream.sync_subscriptions([("NIFTY 50", "NSE"), ("RELIANCE", "NSE")])
+        assert stream.wait_connected(10), "ticker did not connect"
+        assert server.done.wait(20), "replay did not finish"
+        deadline = time.time() + 5
+        while stream.store.ticks_seen < len(ticks) and time.time() < deadline:
+            time.sleep(0.05)
+        assert stream.store.ticks_seen == len(ticks), stream.store.ticks_seen
+        assert server.subscribed == {NIFTY_TOKEN, RELIANCE_TOKEN}
+        quote = stream.get_quote("RELIANCE")
+        assert quote["last"] == ticks[-1]["last_price"] and quote["source"] == "stream"
+        assert stream.get_quote("NIFTY 50")["last"] == 22044
+        candles = stream.get_candles("RELIANCE", "5m", count=20)
+        assert len(candles) == 3 and candles[-1]["close"] == ticks[-1]["last_price"]
+        print(f"[PASS] {stream.store.ticks_seen} ticks over {server.frames_sent} frames")
+    finally:
+        stream.stop()
+        server.stop()
+
+
+def test_frame_encoding_roundtrip():
+    """Encoded frames parse back with KiteTicker's own binary parser"""
+    print("\n=== TEST 4: Binary Encoding ===")
+    from kiteconnect import KiteTicker
+
+    ticks = _recorded_ticks()[:2]
+    parsed = KiteTicker("k", "t")._parse_binary(encode_frame(ticks))
+    assert [p["instrument_token"] for p in parsed] == [NIFTY_TOKEN, RELIANCE_TOKEN]
+    assert parsed[1]["last_price"] == ticks[1]["last_price"] and parsed[1]["volume_traded"] == 1000
+    assert parsed[0]["tradable"] is False
+    print("[PASS] packets round-trip")
+
+
+if __name__ == "__main__":
+    test_store_rolls_candles()
+    test_merge_with_history()
+    test_frame_encoding_roundtrip()
+    test_replay_server_end_to_end()
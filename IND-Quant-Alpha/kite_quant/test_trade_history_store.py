@@ -0,0 +1,104 @@
+"""
+Test script for the append-only trade journal (execution.trade_history_store).
+Runs against a temporary journal; data/trade_history.json is never touched.
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from execution.trade_history_store import TradeJournal
+
+
+def _trade(i, mode="PAPER", day="2026-02-17", hour=10, strategy="Index Momentum", pnl=100.0):
+    return {
+        "session_id": f"s{i % 3}",
+        "mode": mode,
+        "symbol": "NIFTY2621725800CE",
+        "strategy": strategy,
+        "entry_time": f"{day}T{hour:02d}:15:00+05:30",
+        "exit_time": f"{day}T{hour:02d}:45:00+05:30",
+        "entry_price": 100.0,
+        "exit_price": 101.0,
+        "qty": 25,
+        "pnl": pnl,
+        "charges": 10.0,
+    }
+
+
+def test_append_is_one_line():
+    """Each append writes exactly one JSONL line and is queryable immediately"""
+    print("\n=== TEST 1: Append ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = TradeJournal(Path(tmp) / "trade_history.jsonl")
+        for i in range(5):
+            journal.append(_trade(i))
+        lines = (Path(tmp) / "trade_history.jsonl").read_text().splitlines()
+        assert len(lines) == 5 and json.loads(lines[0])["net_pnl"] == 100.0
+        assert len(journal.trades()) == 5
+        print(f"[PASS] {len(lines)} lines appended")
+
+
+def test_indexed_filters():
+    """Mode, session and date-range filters agree with a full scan"""
+    print("\n=== TEST 2: Indexed Filters ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = TradeJournal(Path(tmp) / "trade_history.jsonl")
+        for i in range(60):
+            journal.append(_trade(i, mode=("LIVE", "PAPER", "BACKTEST")[i % 4 % 3], day=f"2026-02-{10 + i % 7:02d}", pnl=(i % 5) - 2))
+        scan = [t for t in journal.trades() if t["mode"] == "PAPER" and t["session_id"] == "s1"
+                and "2026-02-12" <= t["entry_time"][:10] <= "2026-02-14"]
+        got = journal.trades(mode="paper", session_id="s1", from_date="2026-02-12", to_date="2026-02-14")
+        assert got == scan and got, (len(got), len(scan))
+        assert len(journal.trades(mode="LIVE", limit=3)) == 3
+        assert journal.trades(mode="LIVE", limit=3) == journal.trades(mode="LIVE")[-3:]
+        print(f"[PASS] {len(got)} trades via indexes")
+
+
+def test_running_aggregates():
+    """Daily P&L, strategy win rate and time-of-day P&L match the raw trades"""
+    print("\n=== TEST 3: Aggregates ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = TradeJournal(Path(tmp) / "trade_history.jsonl")
+        journal.append(_trade(0, day="2026-02-16", hour=9, pnl=500.0))
+        journal.append(_trade(1, day="2026-02-16", hour=14, pnl=-200.0, strategy="ORB"))
+        journal.append(_trade(2, day="2026-02-17", hour=13, pnl=300.0))
+        journal.append(_trade(3, mode="LIVE", day="2026-02-17", hour=13, pnl=-50.0))
+        daily = journal.daily_pnl(mode="PAPER")
+        assert [(d["date"], d["trades"], d["net_pnl"]) for d in daily] == [("2026-02-16", 2, 300.0), ("2026-02-17", 1, 300.0)]
+        assert journal.daily_pnl(from_date="2026-02-17")[0]["net_pnl"] == 250.0
+        stats = journal.strategy_stats(mode="PAPER")
+        assert stats["Index Momentum"]["win_rate_pct"] == 100.0 and stats["ORB"]["losses"] == 1
+        assert journal.strategy_stats()["Index Momentum"]["trades"] == 3
+        slots = journal.time_of_day_pnl()
+        assert slots["9-10 AM"] == 500.0 and slots["1-2 PM"] == 250.0 and slots["2-3 PM"] == -200.0
+        print("[PASS] aggregates maintained on insert")
+
+
+def test_legacy_import_and_external_appends():
+    """Legacy JSON is imported once; lines appended by another writer are picked up"""
+    print("\n=== TEST 4: Legacy Import / Tail ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "trade_history.json"
+        legacy.write_text(json.dumps({"trades": [_trade(0), _trade(1)]}))
+        path = Path(tmp) / "trade_history.jsonl"
+        journal = TradeJournal(path, legacy_path=legacy)
+        assert len(journal.trades()) == 2 and path.exists()
+        other = TradeJournal(path, legacy_path=legacy)
+        other.append(_trade(2, mode="LIVE"))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"mode": "LIVE", "entry_time": "2026-02-17T')  # partial line: ignored until complete
+        assert len(journal.trades(mode="LIVE")) == 1
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('11:00:00+05:30", "pnl": 1}\n')
+        assert len(journal.trades(mode="LIVE")) == 2
+        print("[PASS] import + tail")
+
+
+if __name__ == "__main__":
+    test_append_is_one_line()
+    test_indexed_filters()
+    test_running_aggregates()
+    test_legacy_import_and_external_appends()
@@ -0,0 +1,235 @@
+"""
+Test script for the vectorized intraday picks screener (engine.universe_screener).
+Loaders are synthetic; no broker, news or Yahoo connection required.
+"""
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from engine.instrument_master import InstrumentMaster
+from engine.strategy import compute_technicals
+from engine.universe_screener import (
+    ScreenContext,
+    SingleFlight,
+    UniverseScreener,
+    candle_panel,
+    panel_technicals,
+    score_universe,
+)
+
+
+def _closes(n, seed, drift=0.0):
+    rng = np.random.default_rng(seed)
+    return 1000 * np.cumprod(1 + rng.normal(drift, 0.015, n))
+
+
+def _daily(n, seed, drift=0.0):
+    return pd.DataFrame({"Close": _closes(n, seed, drift)})
+
+
+def _tech_of(symbols_closes):
+    panel, lengths = candle_panel(symbols_closes)
+    return panel_technicals(panel, lengths)
+
+
+def test_panel_matches_compute_technicals():
+    """Panel RSI / EMA cross equals compute_technicals per symbol, for unequal and short histories"""
+    print("\n=== TEST 1: Panel Technicals ===")
+    series = [_closes(n, seed) for seed, n in enumerate((60, 41, 20, 59, 25, 60))] + [_closes(12, 99), None]
+    for seed in range(300):  # include some symbols that just crossed
+        closes = _closes(60, 1000 + seed)
+        tech = compute_technicals(pd.DataFrame({"Close": closes}))
+        if tech["ema9_cross_up"] or tech["ema9_cross_down"]:
+            series.append(closes)
+        if len(series) >= 14:
+            break
+    tech = _tech_of(series)
+    crosses = 0
+    for i, closes in enumerate(series):
+        expected = compute_technicals(pd.DataFrame({"Close": closes})) if closes is not None else {}
+        assert bool(tech["valid"][i]) == bool(expected), i
+        if not expected:
+            assert not tech["cross_up"][i] and not tech["cross_down"][i]
+            continue
+        assert abs(tech["rsi"][i] - expected["rsi"]) < 1e-9, i
+        assert abs(tech["ema9"][i] - expected["ema9"]) < 1e-9 and abs(tech["ema15"][i] - expected["ema15"]) < 1e-9
+        assert bool(tech["cross_up"][i]) == expected["ema9_cross_up"] and bool(tech["cross_down"][i]) == expected["ema9_cross_down"]
+        crosses += expected["ema9_cross_up"] or expected["ema9_cross_down"]
+    assert crosses >= 2
+    print(f"[PASS] {len(series)} symbols, {crosses} EMA crosses")
+
+
+def test_scores_and_factors():
+    """Weights, factor wording, prediction and VIX cap follow Today's Market Prediction"""
+    print("\n=== TEST 2: Scores & Factors ===")
+    tech = {
+        "valid": np.array([True, True, False]),
+        "rsi": np.array([65.0, 35.0, np.nan]),
+        "cross_up": np.array([True, False, False]),
+        "cross_down": np.array([False, True, False]),
+    }
+    ctx = ScreenContext(us_bias=1, nifty_pct=0.5, bank_nifty_pct=0.4, vix_value=19.25, market_open=True)
+    quotes = {
+        "AAA": {"open": 100.0, "last": 101.0, "buy_quantity": 900, "sell_quantity": 100},
+        "BBB": {"open": 100.0, "last": 99.0, "buy_quantity": 100, "sell_quantity": 900},
+    }
+    first_bars = np.array([[100.0, 100.5], [100.0, 99.0], [np.nan, np.nan]])
+    picks = score_universe(["AAA", "BBB", "CCC"], tech, np.array([0.5, -0.4, 0.1]), ctx, quotes, first_bars)
+    a, b, c = picks
+    assert a["score"] == round(0.4 + 0.3 + 0.15 + 0.15 + 0.05 + 0.03 + 0.02 + 0.02, 2) == 1.12
+    assert a["tags"] == ["US Market: Bullish (+1%)", "Sentiment: Positive (0.50)", "RSI: Bullish (65.0)",
+                         "EMA: Bullish Cross", "Indices: Bullish (Nifty & Bank Nifty up)", "High VIX: cautious (19.2)"]
+    assert a["prediction"] == "BULLISH" and a["confidence"] == 72 and a["vix_high"] and a["rsi"] == 65.0
+    assert b["score"] == round(0.4 - 0.3 - 0.15 - 0.15 + 0.05 - 0.03 - 0.02 - 0.02, 2) == -0.22
+    assert b["prediction"] == "BEARISH" and b["confidence"] == 61 and b["tags"][2] == "RSI: Bearish (35.0)"
+    assert c["score"] == 0.45 and c["rsi"] is None and c["tags"][1] == "Sentiment: Neutral (0.10)"
+
+    closed = ScreenContext(us_bias=-1, nifty_pct=-0.5, bank_nifty_pct=0.1, vix_value=12)
+    a, b, c = score_universe(["AAA", "BBB", "CCC"], tech, np.zeros(3), closed, quotes, first_bars)
+    assert a["tags"] == ["US Market: Bearish (<-0.5%)", "Sentiment: Neutral (0.00)", "RSI: Bullish (65.0)", "EMA: Bullish Cross"]
+    assert a["score"] == -0.1 and a["prediction"] == "NEUTRAL" and a["confidence"] == 50 and not a["vix_high"]
+    assert c["score"] == -0.4 and c["prediction"] == "BEARISH" and c["confidence"] == 70
+    nan_rsi = dict(tech, rsi=np.array([np.nan, 50.0, np.nan]))
+    assert score_universe(["AAA", "BBB", "CCC"], nan_rsi, np.zeros(3), closed)[0]["tags"][2] == "RSI: Neutral (nan)"
+    print("[PASS] market-open and closed scoring")
+
+
+def test_scan_loads_and_timeouts():
+    """A scan loads each input once per symbol, caches sentiment / closed first bars, and marks slow symbols"""
+    print("\n=== TEST 3: Scan, Caches & Deadline ===")
+    calls = {"daily": 0, "sentiment": 0, "intraday": 0, "quotes": 0}
+    lock = threading.Lock()
+
+    def count(kind):
+        with lock:
+            calls[kind] += 1
+
+    def load_daily(symbol):
+        count("daily")
+        if symbol == "SLOW":
+            time.sleep(1.0)
+        if symbol == "BROKEN":
+            raise RuntimeError("no data")
+        return _daily(60, sum(map(ord, symbol)), drift=0.01 if symbol == "UP" else -0.01)
+
+    def load_intraday(symbol):
+        count("intraday")
+        return pd.DataFrame({"Open": [100.0, 101.0], "Close": [101.0, 100.0]})
+
+    def load_sentiment(symbol):
+        count("sentiment")
+        return 0.5 if symbol == "UP" else 0.0
+
+    def load_quotes(symbols):
+        count("quotes")
+        return {s: {"open": 100.0, "last": 100.0, "buy_quantity": 1, "sell_quantity": 1} for s in symbols}
+
+    screener = UniverseScreener(load_daily=load_daily, load_intraday=load_intraday, load_sentiment=load_sentiment,
+                                load_quotes=load_quotes, max_workers=4)
+    ctx = ScreenContext(market_open=True)
+    picks = screener.scan(["up", "DOWN", "SLOW", "BROKEN", "UP"], ctx, timeout_sec=0.5)
+    by_symbol = {p["symbol"]: p for p in picks}
+    assert [p["symbol"] for p in picks][0] == "UP" and len(picks) == 4
+    assert by_symbol["SLOW"]["tags"] == ["Timeout"] and by_symbol["BROKEN"]["rsi"] is None
+    assert "Intraday 15m: bullish" in by_symbol["UP"]["tags"]
+    assert calls == {"daily": 4, "sentiment": 4, "intraday": 4, "quotes": 1}, calls
+    assert screener.last_stats["timeouts"] == 1 and screener.last_stats["load_errors"] == 1
+
+    screener.scan(["UP", "DOWN"], ctx, timeout_sec=5)
+    assert calls["sentiment"] == 4 and calls["intraday"] == 4 and calls["daily"] == 6
+    assert screener.last_stats["sentiment_cached"] == 2 and screener.last_stats["first_bars_cached"] == 2
+    screener.sentiment_ttl_sec = 0
+    screener.scan(["UP"], ScreenContext(market_open=False), timeout_sec=5)
+    assert calls["sentiment"] == 5 and calls["quotes"] == 2 and calls["intraday"] == 4
+    print(f"[PASS] {calls}")
+
+
+def test_single_flight():
+    """Concurrent refreshes share one call; a background refresh starts once while one is in flight"""
+    print("\n=== TEST 4: Single-Flight ===")
+    flight = SingleFlight()
+    runs = []
+    release = threading.Event()
+
+    def slow():
+        runs.append(1)
+        release.wait(5)
+        return len(runs)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("picks", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    deadline = time.time() + 5
+    while flight.shared < 7 and time.time() < deadline:
+        time.sleep(0.01)
+    assert flight.in_flight("picks") and not flight.start("picks", slow)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert runs == [1] and results == [1] * 8 and not flight.in_flight("picks")
+
+    started = threading.Event()
+    gate = threading.Event()
+    assert flight.start("bg", lambda: (started.set(), gate.wait(5)))
+    started.wait(5)
+    assert not flight.start("bg", lambda: None)
+    gate.set()
+    deadline = time.time() + 5
+    while flight.in_flight("bg") and time.time() < deadline:
+        time.sleep(0.01)
+    assert flight.start("bg", lambda: None)
+    try:
+        flight.do("err", lambda: 1 / 0)
+        raise AssertionError("expected ZeroDivisionError")
+    except ZeroDivisionError:
+        pass
+    print("[PASS] 8 callers, 1 scan")
+
+
+def test_fno_universe_scan():
+    """The F&O universe comes from the instrument master and 200 names score in one pass"""
+    print("\n=== TEST 5: F&O Universe ===")
+    nse, nfo = [], []
+    for i in range(200):
+        name = f"STOCK{i:03d}"
+        nse.append({"instrument_token": 1000 + i, "tradingsymbol": name, "name": name, "instrument_type": "EQ", "exchange": "NSE"})
+        for month in (2, 3):
+            nfo.append({"instrument_token": 50000 + 10 * i + month, "tradingsymbol": f"{name}24{month}FUT", "name": name,
+                        "instrument_type": "FUT", "exchange": "NFO", "expiry": date(2024, month, 28), "lot_size": 100})
+    nse.append({"instrument_token": 256265, "tradingsymbol": "NIFTY 50", "name": "NIFTY 50", "instrument_type": "EQ", "exchange": "NSE"})
+    nfo.append({"instrument_token": 9000001, "tradingsymbol": "NIFTY24FEBFUT", "name": "NIFTY", "instrument_type": "FUT",
+                "exchange": "NFO", "expiry": date(2024, 2, 29), "lot_size": 50})
+    universe = InstrumentMaster.from_dumps({"NSE": nse, "NFO": nfo}, as_of="2024-02-08").fno_underlyings()
+    assert len(universe) == 200 and universe[0] == "STOCK000" and "NIFTY" not in universe
+
+    frames = {s: _daily(40 + i % 21, i) for i, s in enumerate(universe)}
+    screener = UniverseScreener(load_daily=frames.get, load_sentiment=lambda s: 0.0, load_quotes=lambda s: {},
+                                load_intraday=lambda s: None, max_workers=16)
+    started = time.perf_counter()
+    picks = screener.scan(universe, ScreenContext(us_bias=1), timeout_sec=10)
+    elapsed = time.perf_counter() - started
+    assert len(picks) == 200 and screener.last_stats["timeouts"] == 0 and screener.last_stats["panel_bars"] == 60
+    scores = [p["score"] for p in picks]
+    assert scores == sorted(scores, reverse=True)
+    for p in picks[:: 37]:
+        tech = compute_technicals(frames[p["symbol"]])
+        expected = 0.4 + (0.15 if tech["rsi"] > 60 else -0.15 if tech["rsi"] < 40 else 0)
+        expected += 0.15 if tech["ema9_cross_up"] else -0.15 if tech["ema9_cross_down"] else 0
+        assert p["score"] == round(expected, 2), p
+    print(f"[PASS] 200 symbols scored in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_panel_matches_compute_technicals()
+    test_scores_and_factors()
+    test_scan_loads_and_timeouts()
+    test_single_flight()
+    test_fno_universe_scan()
@@ -0,0 +1,69 @@
+"""
+Test script for vectorized signal mode (BaseStrategy.compute_signals).
+Every registered strategy must produce identical trades with and without the signal arrays.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backtest.backtest_data_provider import BacktestDataProvider
+from backtest.backtest_engine import run_backtest_on_candles
+from candle_fixtures import make_store
+from strategies.strategy_registry import STRATEGY_MAP
+
+
+def _vectorized_classes():
+    store = make_store(10, 11, spike_prob=0.03)
+    seen = {}
+    for name, cls in STRATEGY_MAP.items():
+        if cls not in seen and cls("NIFTY", BacktestDataProvider(store)).compute_signals(store) is not None:
+            seen[cls] = name
+    return seen
+
+
+def test_signals_match_check_entry():
+    """compute_signals agrees with check_entry/get_stop_loss/get_target at every bar"""
+    print("\n=== TEST 1: Signal Arrays vs check_entry ===")
+    store = make_store(3000, 11, spike_prob=0.03)
+    provider = BacktestDataProvider(store)
+    classes = _vectorized_classes()
+    assert classes, "no strategy implements compute_signals"
+    for cls, name in classes.items():
+        strategy = cls("NIFTY", provider)
+        sig = strategy.compute_signals(store)
+        hits = 0
+        for i in range(len(store)):
+            provider.set_index(i)
+            result = strategy.check_entry()
+            can_enter, entry = (result["can_enter"], result["entry_price"]) if isinstance(result, dict) else result
+            assert bool(sig.entry[i]) == bool(can_enter and entry is not None), (name, i)
+            if sig.entry[i]:
+                hits += 1
+                assert float(sig.entry_price[i]) == entry, (name, i)
+                assert float(sig.stop_loss[i]) == strategy.get_stop_loss(entry), (name, i)
+                assert float(sig.target[i]) == strategy.get_target(entry), (name, i)
+        print(f"[PASS] {name}: {hits} entry bars")
+
+
+def test_backtest_trade_parity():
+    """Backtest trades are identical in vectorized and bar-by-bar mode for every registered strategy"""
+    print("\n=== TEST 2: Backtest Trade Parity ===")
+    store = make_store(3000, 11, spike_prob=0.03)
+    for name in STRATEGY_MAP:
+        kwargs = dict(instrument="RELIANCE", strategy_name=name, from_date="2024-02-09", to_date="2024-03-31")
+        t0 = time.perf_counter()
+        slow = run_backtest_on_candles(store, vectorized=False, **kwargs)
+        t1 = time.perf_counter()
+        fast = run_backtest_on_candles(store, vectorized=True, **kwargs)
+        t2 = time.perf_counter()
+        assert fast["trades"] == slow["trades"], name
+        assert fast["net_pnl"] == slow["net_pnl"] and fast["equity_curve"] == slow["equity_curve"], name
+        print(f"  {name}: {len(fast['trades'])} trades, {t1 - t0:.3f}s -> {t2 - t1:.3f}s")
+    print(f"[PASS] {len(STRATEGY_MAP)} strategies")
+
+
+if __name__ == "__main__":
+    test_signals_match_check_entry()
+    test_backtest_trade_parity()
@@ -0,0 +1,156 @@
+"""
+Test script for walk-forward optimisation, Monte Carlo resampling and the backtest results store
+(backtest.walk_forward, backtest.monte_carlo, backtest.results_store).
+Runs on synthetic 5-minute sessions; the results store lives in a temp dir.
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from backtest.backtest_engine import load_backtest_results, run_backtest_on_candles, save_backtest_result
+from backtest.monte_carlo import MC_CHUNK_SIMS, equity_paths, max_drawdowns, run_monte_carlo, trade_metrics
+from backtest.results_store import BacktestResultStore, get_results_store, set_results_store
+from backtest.walk_forward import build_windows, day_bounds, run_walk_forward
+from candle_fixtures import SESSIONS, make_store
+
+# 5-minute sessions with a slight upward drift and occasional volume spikes (Momentum Breakout entries)
+MARKET = dict(vol=0.002, drift=0.0001, spike_prob=0.08, **SESSIONS)
+
+
+def _backtest(store, **params):
+    return run_backtest_on_candles(
+        store, instrument="NIFTY", strategy_name="Momentum Breakout", from_date="", to_date="", strategy_params=params or None
+    )
+
+
+def test_strategy_params():
+    """Default parameters reproduce the untuned backtest; stop/target multipliers move the exits"""
+    print("\n=== TEST 1: Strategy Parameters ===")
+    store = make_store(6 * 75, 4, **MARKET)
+    plain = _backtest(store)
+    defaults = _backtest(store, lookback=9, volume_mult=1.5, stop_mult=1.0, target_mult=1.0)
+    assert plain["trades"] == defaults["trades"] and plain["total_trades"] > 0
+    assert plain["strategy_params"] == {"lookback": 9, "volume_mult": 1.5, "stop_mult": 1.0, "target_mult": 1.0}
+    for vectorized in (True, False):
+        tuned = run_backtest_on_candles(
+            store, instrument="NIFTY", strategy_name="Momentum Breakout", from_date="", to_date="",
+            vectorized=vectorized, strategy_params={"lookback": 5, "stop_mult": 0.5, "target_mult": 2.0, "unknown": 1},
+        )
+        if vectorized:
+            first = tuned["trades"]
+        else:
+            assert tuned["trades"] == first  # bar-by-bar and vectorized agree on tuned parameters
+    assert first != plain["trades"] and tuned["strategy_params"]["lookback"] == 5
+    print(f"[PASS] {plain['total_trades']} default trades, {len(first)} tuned trades")
+
+
+def test_vectorized_equity_metrics():
+    """Matrix equity/drawdown equals the engine's trade-by-trade loop"""
+    print("\n=== TEST 2: Vectorized Equity ===")
+    result = _backtest(make_store(10 * 75, 4, **MARKET))
+    pnls = [t["pnl"] for t in result["trades"]]
+    metrics = trade_metrics(pnls, result["initial_capital"])
+    cents = 0.01 * len(pnls)  # engine totals use unrounded trade P&L
+    assert abs(metrics["net_pnl"] - result["net_pnl"]) <= cents and abs(metrics["final_equity"] - result["final_equity"]) <= cents
+    assert abs(metrics["max_drawdown"] - result["max_drawdown"]) <= 0.01 and metrics["win_rate"] == result["win_rate"]
+    rows = np.array([[100.0, -300.0, 50.0], [-50.0, -50.0, 500.0]])
+    equity = equity_paths(rows, 1000.0)
+    assert equity.tolist() == [[1000, 1100, 800, 850], [1000, 950, 900, 1400]]
+    assert np.allclose(max_drawdowns(equity), [300 / 1100, 0.1])
+    print(f"[PASS] {metrics['total_trades']} trades, drawdown {metrics['max_drawdown']}%")
+
+
+def test_monte_carlo():
+    """Seeded runs are reproducible and independent of worker count; shuffle keeps final equity"""
+    print("\n=== TEST 3: Monte Carlo ===")
+    pnls = np.random.default_rng(1).normal(40, 900, 250)
+    n_sims = MC_CHUNK_SIMS + 500
+    serial = run_monte_carlo(pnls, 100000.0, n_sims=n_sims, seed=7)
+    parallel = run_monte_carlo(pnls, 100000.0, n_sims=n_sims, seed=7, max_workers=2)
+    assert json.dumps(serial, sort_keys=True) == json.dumps(parallel, sort_keys=True)
+    assert serial["n_sims"] == n_sims and serial["trades"] == 250
+    final = serial["final_equity"]
+    assert final["p5"] == final["p95"] == serial["actual"]["final_equity"]  # order does not change the total
+    dd = serial["max_drawdown_pct"]
+    assert dd["p5"] <= dd["p50"] <= dd["p95"] <= dd["max"] and 0 < serial["actual_drawdown_rank"] < 1
+    boot = run_monte_carlo(pnls, 100000.0, n_sims=2000, seed=7, method="bootstrap")
+    assert boot["final_equity"]["p5"] < boot["final_equity"]["p95"] and 0 < boot["prob_loss"] < 1
+    assert run_monte_carlo([], 100000.0)["error"]
+    print(f"[PASS] drawdown p50={dd['p50']}% p95={dd['p95']}%, bootstrap P(loss)={boot['prob_loss']}")
+
+
+def test_results_store():
+    """Runs are indexed without a cap, read back in full, and the legacy JSON is imported once"""
+    print("\n=== TEST 4: Results Store ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "backtest_results.json"
+        legacy.write_text(json.dumps({"runs": [{"run_id": "bt_old", "instrument": "RELIANCE", "strategy": "VWAP Trend", "net_pnl": 5}]}))
+        store = BacktestResultStore(Path(tmp) / "backtest_results.jsonl", legacy_path=legacy)
+        set_results_store(store)
+        try:
+            for i in range(120):
+                save_backtest_result({"instrument": "NIFTY", "strategy": "Momentum Breakout", "net_pnl": i, "trades": [{"pnl": i}]})
+            store.save({"instrument": "NIFTY", "strategy": "Momentum Breakout", "windows": []}, kind="walk_forward")
+            reader = BacktestResultStore(store.path)  # another process
+            assert len(reader) == 122 and len(get_results_store().runs(kind="backtest")) == 121
+            assert [r["run_id"] for r in reader.runs(instrument="reliance")] == ["bt_old"]
+            recent = reader.runs(kind="backtest", strategy="Momentum Breakout", limit=3)
+            assert [r["net_pnl"] for r in recent] == [117, 118, 119] and "trades" not in recent[0]
+            assert reader.get(recent[-1]["run_id"])["trades"] == [{"pnl": 119}]
+            assert len({r["run_id"] for r in reader.runs()}) == 122
+            assert reader.runs(kind="walk_forward")[0]["run_id"].startswith("wf_")
+            assert len(load_backtest_results(limit=5)) == 5 and reader.get("missing") is None
+        finally:
+            set_results_store(None)
+    print("[PASS] 122 runs indexed (legacy import + 121 saves)")
+
+
+def test_walk_forward():
+    """Each window optimises in-sample only, replays the winner out-of-sample, and saves the result"""
+    print("\n=== TEST 5: Walk-Forward ===")
+    store = make_store(24 * 75, 4, **MARKET)
+    bounds = day_bounds(store)
+    assert len(bounds) == 25 and bounds[1] == 75
+    windows = build_windows(bounds, train_days=10, test_days=4)
+    assert [(w.train_start, w.test_start, w.test_end) for w in windows] == [(0, 750, 1050), (300, 1050, 1350), (600, 1350, 1650)]
+    assert [w.train_start for w in build_windows(bounds, 10, 4, anchored=True)] == [0, 0, 0]
+    grid = {"stop_mult": [0.5, 1.0], "target_mult": [1.0, 2.0], "lookback": [5, 9]}
+    with tempfile.TemporaryDirectory() as tmp:
+        set_results_store(BacktestResultStore(Path(tmp) / "results.jsonl"))
+        try:
+            kwargs = dict(train_days=10, test_days=4, load_candles=lambda *a: store, mc_sims=500, mc_seed=3)
+            result = run_walk_forward("NIFTY", "Momentum Breakout", "2024-01-01", "2024-01-24", grid, max_workers=2, **kwargs)
+            serial = run_walk_forward("NIFTY", "Momentum Breakout", "2024-01-01", "2024-01-24", grid, max_workers=1, save=False, **kwargs)
+            saved = get_results_store().get(result["run_id"])
+        finally:
+            set_results_store(None)
+    assert len(result["windows"]) == 3 and result["total_runs"] == 3 * 8 + 3
+    for w in result["windows"]:
+        train = store.take(np.arange(w["train_start"], w["train_end"]))
+        test = store.take(np.arange(w["test_start"], w["test_end"]))
+        scores = {json.dumps(p): _backtest(train, **p)["net_pnl"] for p in (
+            {"stop_mult": s, "target_mult": t, "lookback": lb} for s in (0.5, 1.0) for t in (1.0, 2.0) for lb in (5, 9))}
+        assert w["in_sample"]["net_pnl"] == max(scores.values()) == scores[json.dumps(w["best_params"])]
+        assert w["out_of_sample"]["net_pnl"] == _backtest(test, **w["best_params"])["net_pnl"]
+    oos = sum(w["out_of_sample"]["net_pnl"] for w in result["windows"])
+    assert abs(result["net_pnl"] - oos) < 0.05 and result["total_trades"] == len(result["trades"])
+    assert result["equity_curve"][-1]["equity"] == result["final_equity"]
+    assert sum(sum(v.values()) for v in result["param_stability"].values()) == 3 * len(grid)
+    assert result["monte_carlo"]["n_sims"] == 500
+    drop = ("run_id", "elapsed_sec")
+    assert {k: v for k, v in result.items() if k not in drop} == {k: v for k, v in serial.items() if k not in drop}
+    assert saved["kind"] == "walk_forward" and saved["windows"][0]["best_params"] == result["windows"][0]["best_params"]
+    print(f"[PASS] OOS net {result['net_pnl']} over {result['total_trades']} trades, efficiency {result['walk_forward_efficiency']}")
+
+
+if __name__ == "__main__":
+    test_strategy_params()
+    test_vectorized_equity_metrics()
+    test_monte_carlo()
+    test_results_store()
+    test_walk_forward()
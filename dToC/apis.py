@@ -3,7 +3,10 @@ import json
 import time
 from datetime import datetime
 import logging
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Tuple, Union
+from cms_calls import MAX_RETRIES, RETRY_STATUSES_NON_IDEMPOTENT, record_skipped_sleep
+from cms_client import CMS_CLIENT
+from vcomponent_sync import DEFAULT_MAX_WORKERS, fetch_all_pages
 logger = logging.getLogger(__name__)
 #API list:
 #generate_cms_token(url, profile_alias)
@@ -55,15 +58,44 @@ def generate_cms_token(url, profile_alias):
     }
     
     try:
-        response = requests.post(token_url, headers=headers)
+        response = CMS_CLIENT.post(token_url, "GenerateCMSToken", headers=headers, refresh_auth=False)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         logging.error(f"[ERROR] API Request Failed: {e}")
         return None
 
+def extract_cms_token(token_response):
+    """
+    Extracts the CMS login token string from a generate_cms_token() response.
+
+    Returns:
+        str: The token, or None if the response has none of the known token keys.
+    """
+    if not isinstance(token_response, dict):
+        return None
+    return (
+        token_response.get('token') or
+        token_response.get('Token') or
+        token_response.get('access_token') or
+        token_response.get('AccessToken') or
+        token_response.get('cmsToken') or
+        token_response.get('CMSToken')
+    )
+
+def register_cms_token_refresh(url, profile_alias):
+    """
+    Lets the shared CMS client regenerate the login token for this site when a call returns 401.
+
+    Args:
+        url (str): The base URL of the destination site.
+        profile_alias (str): The profile alias used for token generation.
+    """
+    if not url or not profile_alias:
+        return
+    CMS_CLIENT.register_token_refresher(url, lambda: extract_cms_token(generate_cms_token(url, profile_alias)))
+
 def export_mi_block_component(base_url,componentId,siteId, headers):
-    time.sleep(2)
     """
     Makes an API call to export a Mi-block component.
 
@@ -88,7 +120,8 @@ def export_mi_block_component(base_url,componentId,siteId, headers):
         "IsExportMiBlockFormat": True
     }
         
-        response = requests.post(api_url, json=payload, headers=headers)
+        # Throttling (429/5xx) is retried with backoff instead of the old fixed 2s + 1s sleeps
+        response = CMS_CLIENT.request("POST", api_url, "ExportMiBlockComponent", json=payload, headers=headers, timeout=120, replaces_sleep=2)
         response.raise_for_status()
         
         content_disposition = response.headers.get('Content-Disposition')
@@ -99,7 +132,6 @@ def export_mi_block_component(base_url,componentId,siteId, headers):
     except Exception as e:
         logging.error(f"[ERROR] Unexpected error during API call: {e}")
     
-    time.sleep(1)
     return None, None
 
 def get_active_pages_from_api(base_url, site_id, headers):
@@ -116,7 +148,7 @@ def get_active_pages_from_api(base_url, site_id, headers):
     """
     api_url = f"{base_url}/ccadmin/cms/api/PageApi/GetActivePages?siteId={site_id}"
     try:
-        response = requests.get(api_url, headers=headers)
+        response = CMS_CLIENT.get(api_url, headers=headers)
         response.raise_for_status()
         active_pages = response.json()
         valid_page_ids = {str(page["PageId"]).strip() for page in active_pages}
@@ -140,7 +172,7 @@ def get_active_pages_from_api_all(base_url, site_id, headers):
     """
     api_url = f"{base_url}/ccadmin/cms/api/PageApi/GetActivePages?siteId={site_id}"
     try:
-        response = requests.get(api_url, headers=headers)
+        response = CMS_CLIENT.get(api_url, headers=headers)
         response.raise_for_status()
         active_pages = response.json()
         print(f"[SUCCESS] Fetched {len(active_pages)} active Page records.")
@@ -181,7 +213,7 @@ def getComponentDetailsUsingVcompAlias(vcompalias, base_url, headers):
     }
 
     try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        response = CMS_CLIENT.post(api_url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         data = response.json()
         logging.info("[SUCCESS] Successfully fetched VComponents data from API.")
@@ -194,8 +226,6 @@ def getComponentDetailsUsingVcompAlias(vcompalias, base_url, headers):
 
 
 def addUpdateRecordsToCMS(base_url, headers, payload):
-    # Reduced sleep time since we're using bulk processing for most cases
-    time.sleep(0.5)
     # print("Updated")
     # return True
     """
@@ -211,6 +241,8 @@ def addUpdateRecordsToCMS(base_url, headers, payload):
                and the JSON response data or an error message.
     """
     api_url = f"{base_url}/ccadmin/cms/api/PageApi/SaveMiblockRecord?isDraft=true"
+    # Old fixed sleeps: 0.5s before and 2s after the batch
+    record_skipped_sleep("SaveMiblockRecord", 2.5)
     
     responses = {}
     try:
@@ -219,7 +251,8 @@ def addUpdateRecordsToCMS(base_url, headers, payload):
                 # print(api_url)
                 # print(record)
                 
-                response = requests.post(api_url, headers=headers, json=record, timeout=30)
+                response = CMS_CLIENT.request("POST", api_url, "SaveMiblockRecord", headers=headers, json=record, timeout=30,
+                                       retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT)
                 response.raise_for_status()
                 # print(response)
                 # print("============================================================")
@@ -229,7 +262,6 @@ def addUpdateRecordsToCMS(base_url, headers, payload):
                     responses[record_id] = result.get('result')
                 else:
                     return False, f"API response indicates failure for record: {record}"
-        time.sleep(2)
         return True, responses
 
     except requests.RequestException as e:
@@ -264,7 +296,8 @@ def addUpdateRecordsToCMS_bulk(base_url, headers, records_list):
         """Process a single record and store the response."""
         try:
             original_record_id = record.get('recordId', 0)  # Original recordId from payload
-            response = requests.post(api_url, headers=headers, json=record, timeout=30)
+            response = CMS_CLIENT.request("POST", api_url, "SaveMiblockRecord", headers=headers, json=record, timeout=30,
+                                   retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT)
             response.raise_for_status()
             result = response.json()
             
@@ -310,7 +343,7 @@ def addUpdateRecordsToCMS_bulk(base_url, headers, records_list):
                 logging.warning(f"  - {error}")
         
         if len(responses) == len(records_list):
-            time.sleep(1)  # Small delay after bulk operations
+            record_skipped_sleep("SaveMiblockRecord", 1)  # old fixed delay after bulk operations
             return True, responses
         elif len(responses) > 0:
             logging.warning(f"[BULK API] Partial success: {len(responses)}/{len(records_list)} records processed")
@@ -344,7 +377,7 @@ def publishPage(base_url, headers, site_id, page_id):
         
         logging.info(f"Attempting to publish PageId {page_id}...")
         
-        publish_resp = requests.post(publish_url, json=publish_payload, headers=headers, timeout=30)
+        publish_resp = CMS_CLIENT.request("POST", publish_url, "Publish", json=publish_payload, headers=headers, timeout=30)
         publish_resp.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
 
         if publish_resp.status_code // 100 == 2:
@@ -382,7 +415,7 @@ def get_page_info_by_id(base_url, page_id, headers):
     api_url = f"{base_url}/ccadmin/cms/api/PageApi/GetPageInfo?pageId={page_id}&isDraft=true"
     try:
         logging.info(f"Attempting to get page info for PageId: {page_id}")
-        response = requests.get(api_url, headers=headers)
+        response = CMS_CLIENT.get(api_url, headers=headers)
         response.raise_for_status()
         page_info = response.json()
         logging.info(f"[SUCCESS] Successfully fetched page info for PageId: {page_id}")
@@ -414,7 +447,7 @@ def get_vcomponent_detail_by_aliases_api(base_url, aliases, headers):
     payload = {"vComponentAliases": aliases}
 
     try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        response = CMS_CLIENT.post(api_url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()  # Raise an exception for bad status codes
         
         response_data = response.json()
@@ -441,7 +474,7 @@ def psMappingApi(base_url, headers, payload):
     api_url = f"{base_url}/api/PageApi/UpdatePageMiBlockMappingsDraftV2"
     try:
         logging.info("Calling Mapping API...")
-        response = requests.post(api_url, headers=headers, data=json.dumps(payload))
+        response = CMS_CLIENT.request("POST", api_url, "UpdatePageMiBlockMappingsDraftV2", headers=headers, data=json.dumps(payload), timeout=60)
         response.raise_for_status()
         logging.info(f"[SUCCESS] Mapping API call successful. Status: {response.status_code}")
         return response.json()
@@ -452,7 +485,7 @@ def psMappingApi(base_url, headers, payload):
 def psPublishApi(base_url, headers, site_id, payload):
     """
     Calls the Publish API to publish pages and miBlocks.
-    Includes delay to prevent API blocking/rate limiting.
+    Throttling (429) and server errors are retried with backoff (cms_calls.cms_request).
 
     Args:
         base_url (str): The base URL for the API.
@@ -462,15 +495,11 @@ def psPublishApi(base_url, headers, site_id, payload):
     """
     api_url = f"{base_url}/api/PublishApi/Publish_PSV2?siteId={site_id}&publishNotes=Published%2520from%2520Page%2520Studio"
     
-    # Add delay before API call to prevent blocking/rate limiting
-    # Publish API can get blocked if called too frequently
-    logging.info("[TIMING] Waiting 2 seconds before Publish API call to avoid rate limiting...")
-    time.sleep(2)
-    
     try:
         logging.info("Calling Publish API...")
         api_start = time.time()
-        response = requests.post(api_url, headers=headers, data=json.dumps(payload), timeout=60)
+        # Replaces the fixed 2s pre-call sleep: waits only if the Publish API actually pushes back
+        response = CMS_CLIENT.request("POST", api_url, "Publish_PSV2", headers=headers, data=json.dumps(payload), timeout=60, replaces_sleep=2)
         api_duration = time.time() - api_start
         response.raise_for_status()
         logging.info(f"[SUCCESS] Publish API call successful. Status: {response.status_code}, Duration: {api_duration:.2f} seconds")
@@ -483,7 +512,7 @@ def psPublishApi(base_url, headers, site_id, payload):
         if status_code == 500:
             logging.error(f"[ERROR] 500 Internal Server Error in psPublishApi")
             logging.error(f"[ERROR] Response text: {response_text[:500]}")
-            logging.warning(f"[WARNING] 500 error may be temporary. Consider retrying after a delay.")
+            logging.warning(f"[WARNING] 500 error persisted after {MAX_RETRIES} retries with backoff.")
             return {"status": "error", "message": "500 Internal Server Error", "status_code": 500, "retry_suggested": True}
         
         logging.error(f"[ERROR] HTTP error in psPublishApi: {http_err} (Status Code: {status_code})")
@@ -515,7 +544,7 @@ def get_page_info(base_url, page_id, headers):
     """
     api_url = f"{base_url}/ccadmin/cms/api/PageApi/GetPageInfo?pageId={page_id}&isDraft=true"
     try:
-        response = requests.get(api_url, headers=headers)
+        response = CMS_CLIENT.get(api_url, headers=headers)
         response.raise_for_status()
         logging.info(f"[SUCCESS] Fetched page info for page ID: {page_id}")
         return response.json()
@@ -541,7 +570,7 @@ def save_page_metadata_api(base_url, headers, template_id, payload):
     print(payload)
 
     try:
-        resp = requests.post(update_url, headers=headers, json=payload)
+        resp = CMS_CLIENT.post(update_url, headers=headers, json=payload)
         print(resp)
     
         resp.raise_for_status()
@@ -570,7 +599,7 @@ def menu_download_api(base_url):
 
     try:
         # Send a GET request to the full URL
-        response = requests.post(full_url, timeout=10)
+        response = CMS_CLIENT.post(full_url, timeout=10)
         
         # Raise an HTTPError for bad responses (4xx or 5xx)
         response.raise_for_status()
@@ -612,7 +641,7 @@ def getComponentInfo(componentName, base_url,headers):
     payload = json.dumps([componentName])
 
     try:
-        response = requests.post(api_url, headers=headers, data=payload)
+        response = CMS_CLIENT.post(api_url, headers=headers, data=payload)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
         print("API call successful.")
         return response.json()
@@ -645,16 +674,19 @@ def CreateComponentRecord(base_url, headers, payload):
     
     try:
         # 2. Send the POST request with the JSON payload
-        response = requests.post(
+        response = CMS_CLIENT.request(
+            "POST",
             api_url,
+            "SaveMiblockRecord",
             headers=headers,
             json=payload,  # 'json=payload' automatically sets Content-Type to application/json
-            timeout=10     # Set a timeout for the request
+            timeout=10,    # Set a timeout for the request
+            retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT,
+            replaces_sleep=2
         )
         
         # 3. Raise an exception for bad status codes (4xx or 5xx)
         response.raise_for_status()
-        time.sleep(2)
         # 4. Return the successful JSON response content
         return response.json()
 
@@ -709,11 +741,14 @@ def CreatePage(base_url, headers, payload,template_id):
     print(f"\n[API] Attempting ) ============================================?>>>>>>>>>>>>>>>>>>>")
     try:
         # 2. Send the POST request with the JSON payload
-        response = requests.post(
+        response = CMS_CLIENT.request(
+            "POST",
             api_url,
+            "SavePage",
             headers=headers,
             json=payload,  # 'json=payload' automatically sets Content-Type to application/json
-            timeout=10     # Set a timeout for the request
+            timeout=10,    # Set a timeout for the request
+            retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT  # a 500 may already have created the page
         )
         
         # 3. Raise an exception for bad status codes (4xx or 5xx)
@@ -774,15 +809,17 @@ def GetPageCategoryList(base_url, headers):
 
     try:
         # 2. Send GET request
-        response = requests.get(
-            api_url, 
+        response = CMS_CLIENT.request(
+            "GET",
+            api_url,
+            "GetPageCategoryList",
             headers=headers,
-            timeout=10
+            timeout=10,
+            replaces_sleep=2
         )
 
         # 3. Trigger exception for HTTP error codes (4xx, 5xx)
         response.raise_for_status()
-        time.sleep(2)
         # 4. Return JSON body (list of categories, or unwrap if API returns { "Data": [...] } etc.)
         data = response.json()
         if isinstance(data, list):
@@ -868,7 +905,7 @@ def CustomGetComponentAliasByName(base_url, headers, component_name):
     
     try:
         # 1. Send the POST request
-        response = requests.post(
+        response = CMS_CLIENT.post(
             api_url, 
             headers=headers, 
             data=json_payload_string, 
@@ -915,99 +952,91 @@ def CustomGetComponentAliasByName(base_url, headers, component_name):
         return {"error": "JSON Decode Error", "details": "Response was not valid JSON"}
 
 
-def GetAllVComponents(base_url: str, headers: Dict[str, str], page_size: int = 1000) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+# Listing filters shared by GetVComponentPage and GetAllVComponents (newest first)
+VCOMPONENT_LIST_PAYLOAD = {
+    "PageNumber": 1,
+    "PageSize": 1000,
+    "ShowInActiveRecords": True,
+    "HidePageStudioDerivedMiBlocks": True,
+    "ShowOnlyLibraryFormVComponents": True,
+    "searchBy": "name",
+    "searchByValue": "",
+    "showOnlyContentLibraryVComponents": False,
+    "categoryIds": [],
+    "createdByIds": [],
+    "vComponentIds": [],
+    "contentScope": [1, 3, 5],
+    "sortKey": "tv.createddate",
+    "sortOrder": "desc"
+}
+
+
+def GetVComponentPage(base_url: str, headers: Dict[str, str], page_number: int, page_size: int = 1000,
+                      sort_key: str = "tv.createddate") -> Tuple[List[Dict[str, Any]], int]:
     """
-    Retrieves ALL V-Components from the CMS by iterating through paginated API results.
+    Fetches one page of GetSiteVComponents, sorted by sort_key (newest first).
+
+    Used by vcomponent_sync for the concurrent full fetch and the incremental (changed since) read.
+
+    Returns:
+        tuple: (V-Component dictionaries on this page, TotalRecords).
+
+    Raises:
+        requests.exceptions.RequestException: On connection errors or an error status.
+        ValueError: If the response is not valid JSON.
+    """
+    api_url = f"{base_url}/ccadmin/cms/api/VisualComponentsApi/GetSiteVComponents"
+    payload = dict(VCOMPONENT_LIST_PAYLOAD, PageNumber=page_number, PageSize=page_size, sortKey=sort_key)
+    # Old fixed sleeps: 2s before the first page and 2s after every page
+    response = CMS_CLIENT.request(
+        "POST",
+        api_url,
+        "GetSiteVComponents",
+        headers=headers,
+        data=json.dumps(payload),
+        timeout=120,  # V-Component list can be large; allow 2 min per page
+        replaces_sleep=4 if page_number == 1 else 2
+    )
+    response.raise_for_status()
+    response_data = response.json()
+    v_components = response_data.get("vComponents") or []
+    logger.info(f"Fetched V-Component page {page_number} ({sort_key}): {len(v_components)} records of {response_data.get('TotalRecords', 0)}.")
+    return v_components, int(response_data.get("TotalRecords") or 0)
+
+
+def GetAllVComponents(base_url: str, headers: Dict[str, str], page_size: int = 1000,
+                      max_workers: int = DEFAULT_MAX_WORKERS) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Retrieves ALL V-Components from the CMS: page 1 first, then the remaining pages concurrently.
 
     Endpoint: /api/VisualComponentsApi/GetSiteVComponents
+    For repeated runs against the same site, prefer vcomponent_sync.sync_vcomponents (incremental).
 
     Args:
         base_url (str): The root URL for the API.
         headers (dict): HTTP headers, typically including Authorization and Content-Type.
-        page_size (int): The number of records to request per page (default is 50).
+        page_size (int): The number of records to request per page (default is 1000).
+        max_workers (int): Pages fetched concurrently once TotalRecords is known.
 
     Returns:
         list: A list of all V-Component dictionaries if successful.
         dict: An error dictionary if the API call fails at any point.
     """
-    time.sleep(2)
-    # --- 1. Base Payload Definition ---
-    BASE_PAYLOAD = {
-        "PageNumber": 1,
-        "PageSize": page_size,
-        "ShowInActiveRecords": True,
-        "HidePageStudioDerivedMiBlocks": True,
-        "ShowOnlyLibraryFormVComponents": True,
-        "searchBy": "name",
-        "searchByValue": "",
-        "showOnlyContentLibraryVComponents": False,
-        "categoryIds": [],
-        "createdByIds": [],
-        "vComponentIds": [],
-        "contentScope": [1, 3, 5],
-        "sortKey": "tv.createddate",
-        "sortOrder": "desc"
-    }
-    
-    api_url = f"{base_url}/ccadmin/cms/api/VisualComponentsApi/GetSiteVComponents"
-    all_components: List[Dict[str, Any]] = []
-    current_page = 1
-    total_records = float('inf')  # Start high to ensure the loop runs
-    records_fetched = 0
-    
     logger.info(f"Starting V-Component fetch with page size: {page_size}")
-
-    while records_fetched < total_records:
-        response = None  # Initialize to avoid UnboundLocalError in exception handlers
-        try:
-            # --- 2. Update Payload for Current Page ---
-            payload = BASE_PAYLOAD.copy()
-            payload["PageNumber"] = current_page
-            
-            json_payload_string = json.dumps(payload)
-            
-            # --- 3. Send API Request ---
-            response = requests.post(
-                api_url,
-                headers=headers,
-                data=json_payload_string,
-                timeout=120  # V-Component list can be large; allow 2 min per page
-            )
-            response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
-            
-            response_data = response.json()
-            time.sleep(2)
-            # --- 4. Process Response Data ---
-            v_components = response_data.get("vComponents", [])
-            total_records = response_data.get("TotalRecords", 0)
-            
-            if not v_components:
-                logger.info(f"Page {current_page} returned no components. Fetch complete.")
-                break # Exit loop if no components are returned
-
-            # Add components from this page to the main list
-            all_components.extend(v_components)
-            records_fetched += len(v_components)
-            
-            logger.info(f"Fetched Page {current_page}. Records this page: {len(v_components)}. Total fetched: {records_fetched} / {total_records}.")
-            
-            # --- 5. Prepare for Next Iteration ---
-            current_page += 1
-
-            if records_fetched >= total_records:
-                 logger.info("Total records retrieved. Fetch complete.")
-                 break
-
-        except requests.exceptions.RequestException as err:
-            status_code = response.status_code if response is not None else 'N/A'
-            logger.error(f"[ERROR] API Request Error on Page {current_page}: {err} (Status Code: {status_code})")
-            return {"error": "Request Error", "details": str(err), "status_code": status_code, "page": current_page}
-            
-        except json.JSONDecodeError:
-            response_text = response.text if response is not None else 'No response object.'
-            logger.error(f"[ERROR] JSON Decode Error on Page {current_page}. Response text: {response_text[:100]}...")
-            return {"error": "JSON Decode Error", "details": "Response was not valid JSON", "page": current_page}
-        
+    try:
+        all_components = fetch_all_pages(
+            lambda page_number, size, sort_key: GetVComponentPage(base_url, headers, page_number, size, sort_key),
+            page_size,
+            max_workers
+        )
+    except requests.exceptions.RequestException as err:
+        status_code = err.response.status_code if err.response is not None else 'N/A'
+        logger.error(f"[ERROR] API Request Error while fetching V-Components: {err} (Status Code: {status_code})")
+        return {"error": "Request Error", "details": str(err), "status_code": status_code}
+    except ValueError as err:
+        logger.error(f"[ERROR] JSON Decode Error while fetching V-Components: {err}")
+        return {"error": "JSON Decode Error", "details": "Response was not valid JSON"}
+    logger.info(f"Total records retrieved: {len(all_components)}. Fetch complete.")
     return all_components
 
 
@@ -1105,7 +1134,7 @@ def GetTemplatePageByName(base_url, headers, template_page_name):
         # print(f"\n📡 Attempting GET request to retrieve template pages from: {api_url}")
 
         # 1. Send GET request
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = CMS_CLIENT.get(api_url, headers=headers, timeout=10)
         response.raise_for_status()
 
         # 2. Parse response JSON
@@ -1191,7 +1220,7 @@ def get_theme_configuration(base_url: str, site_id: int, headers: Dict[str, str]
     
     try:
         logging.info(f"Fetching theme configuration for SiteId: {site_id}")
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        response = CMS_CLIENT.post(api_url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         
         response_data = response.json()
@@ -1281,7 +1310,7 @@ def get_group_record(base_url: str, payload: dict, headers: Dict[str, str]) -> U
         site_id = payload.get('SiteId')
         groups = payload.get('groups', [])
         logging.info(f"Fetching group records for SiteId: {site_id} with {len(groups)} groups")
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        response = CMS_CLIENT.post(api_url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         
         response_data = response.json()
@@ -1360,7 +1389,7 @@ def update_theme_configuration(base_url: str, payload: dict, headers: dict = Non
         logging.info(f"Payload: siteId={payload.get('siteId')}, themeId={payload.get('themeId')}, groups={len(payload.get('groups', []))}")
         
         # Make POST request
-        response = requests.post(
+        response = CMS_CLIENT.post(
             api_endpoint,
             json=payload,
             headers=headers,
@@ -1449,7 +1478,7 @@ def update_theme_variables(base_url: str, payload: dict, headers: dict = None) -
         logging.info(f"Payload: siteId={payload.get('siteId')}, themeId={payload.get('themeId')}, groups={len(payload.get('groups', []))}")
         
         # Make POST request
-        response = requests.post(
+        response = CMS_CLIENT.post(
             api_endpoint,
             json=payload,
             headers=headers,
@@ -1568,11 +1597,13 @@ def save_module_category(base_url: str, headers: dict, payload: dict) -> Union[D
         last_exception = None
         for api_url in api_urls:
             try:
-                response = requests.post(
+                response = CMS_CLIENT.post(
                     api_url,
+                    "SaveCategory",
                     headers=headers,
                     json=payload,
-                    timeout=30
+                    timeout=30,
+                    retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT  # a 500 may already have created the category
                 )
                 logging.info(f"SaveCategory API response status: {response.status_code} (URL: {api_url})")
                 if response.status_code != 404:
@@ -1670,8 +1701,10 @@ def update_miblock_record_asset(base_url: str, headers: dict, payload: dict) ->
         asset_fields_count = len(payload.get('AssetFields', []))
         logging.info(f"Calling UpdateMiblockRecordAsset API for MiBlockId: {mi_block_id}, RecordId: {record_id}, AssetFields: {asset_fields_count}")
         
-        response = requests.post(
+        response = CMS_CLIENT.request(
+            "POST",
             api_url,
+            "UpdateMiblockRecordAsset",
             headers=headers,
             json=payload,
             timeout=30
@@ -1799,8 +1832,10 @@ def get_miblock_records(base_url: str, headers: dict, params: dict) -> Union[Dic
         parent_record_id = params.get('parentRecordId', 'N/A')
         logging.info(f"Calling GetMiblockRecords API for MiblockId: {miblock_id}, ParentRecordId: {parent_record_id}")
         
-        response = requests.get(
+        response = CMS_CLIENT.request(
+            "GET",
             api_url,
+            "GetMiblockRecords",
             headers=headers,
             params=params,
             timeout=30
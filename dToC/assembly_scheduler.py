@@ -0,0 +1,181 @@
+"""
+Dependency-aware scheduler for page assembly.
+
+The processed sitemap (_simplified.json) is turned into a DAG of jobs:
+- a shared-component job for every distinct Header/Footer name used by any page;
+- a page job for every page down to level 4.
+
+A page depends on its parent page (the parent's CMS category must exist before the child
+is created), on the shared components it uses, and on the previous page that writes to the
+same output folder (output/{site_id}/{page_name} is keyed by the leaf page name only).
+Independent jobs run concurrently on a bounded worker pool; with max_workers=1 jobs run
+one at a time in sitemap (depth-first) order, exactly like the old recursive traversal.
+"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+MAX_PAGE_LEVEL = 4  # assemble_page_templates_level4 does not descend further
+HEADER_FOOTER_KEYS = ("Header1", "Header2", "Footer1", "Footer2")
+
+
+class AssemblyJob:
+    """One node of the assembly DAG: a page (kind="page") or a shared component (kind="component")."""
+
+    def __init__(self, key: str, kind: str, order: int, page_data: Optional[Dict[str, Any]] = None,
+                 level: int = 0, hierarchy: Optional[List[str]] = None, parent: Optional[str] = None):
+        self.key = key
+        self.kind = kind
+        self.order = order  # depth-first sitemap position, used as the tie-breaker between ready jobs
+        self.page_data = page_data or {}
+        self.level = level
+        self.hierarchy = hierarchy or []
+        self.parent = parent  # key of the parent page job, None for level 1 pages and components
+        self.deps: Set[str] = set()
+        self.children: List[str] = []
+
+    @property
+    def page_name(self) -> str:
+        return self.page_data.get("page_name", "UNKNOWN_PAGE")
+
+    def __repr__(self) -> str:
+        return f"AssemblyJob({self.key!r}, deps={sorted(self.deps)})"
+
+
+def page_key(hierarchy: List[str], page_name: str) -> str:
+    """Hierarchy key used by the stop/resume tracking (completed_pages.json)."""
+    return " > ".join(hierarchy + [page_name])
+
+
+def build_assembly_dag(pages: List[Dict[str, Any]], folder_name: Optional[Callable[[str], str]] = None) -> Dict[str, AssemblyJob]:
+    """
+    Builds the assembly DAG for the given top-level pages.
+
+    Args:
+        pages: Top-level pages from the processed JSON (each with optional 'sub_pages').
+        folder_name: Maps a page name to its output folder name; pages sharing a folder are
+                     serialised in sitemap order. Defaults to the page name itself.
+
+    Returns:
+        Dict of job key -> AssemblyJob, in depth-first sitemap order.
+    """
+    folder_name = folder_name or (lambda name: name)
+    jobs: Dict[str, AssemblyJob] = {}
+    last_in_folder: Dict[str, str] = {}
+    order = 0
+
+    def add_component(name: str) -> str:
+        nonlocal order
+        key = f"component:{name}"
+        if key not in jobs:
+            jobs[key] = AssemblyJob(key, "component", order)
+            jobs[key].page_data = {"page_name": name}
+            order += 1
+        return key
+
+    def add_page(page: Dict[str, Any], level: int, hierarchy: List[str], parent: Optional[str]) -> None:
+        nonlocal order
+        name = page.get("page_name", "UNKNOWN_PAGE")
+        key = page_key(hierarchy, name)
+        if key in jobs:
+            logging.warning(f"[SCHEDULER] Duplicate page '{key}' in sitemap; only the first occurrence is assembled.")
+            return
+        job = AssemblyJob(key, "page", order, page, level, hierarchy, parent)
+        order += 1
+        if parent:
+            job.deps.add(parent)
+            jobs[parent].children.append(key)
+        meta_info = page.get("meta_info") or {}
+        for hf_key in HEADER_FOOTER_KEYS:
+            if meta_info.get(hf_key):
+                job.deps.add(add_component(meta_info[hf_key]))
+        folder = folder_name(name)
+        if folder in last_in_folder:
+            job.deps.add(last_in_folder[folder])
+        last_in_folder[folder] = key
+        jobs[key] = job
+        if level < MAX_PAGE_LEVEL:
+            for sub_page in page.get("sub_pages", []):
+                add_page(sub_page, level + 1, hierarchy + [name], key)
+
+    for page in pages:
+        add_page(page, 1, [], None)
+    return jobs
+
+
+def run_assembly_dag(
+    jobs: Dict[str, AssemblyJob],
+    run_job: Callable[[AssemblyJob], bool],
+    max_workers: int = 1,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the DAG on a bounded thread pool.
+
+    run_job(job) returns True when the job's children should be assembled (the page-level
+    functions return False for pages filtered out or halted); a job whose parent returned
+    False is skipped together with its whole subtree. Any other dependency only orders jobs:
+    a failed or skipped dependency does not skip its dependants. Once should_stop() returns
+    True no new job is started; jobs already running finish.
+
+    Returns:
+        Dict with 'completed', 'skipped' and 'pending' job keys and a 'stopped' flag.
+    """
+    max_workers = max(1, int(max_workers or 1))
+    should_stop = should_stop or (lambda: False)
+    remaining: Dict[str, Set[str]] = {key: set(job.deps) for key, job in jobs.items()}
+    dependants: Dict[str, List[str]] = {key: [] for key in jobs}
+    for key, job in jobs.items():
+        for dep in job.deps:
+            dependants[dep].append(key)
+    blocked: Set[str] = set()  # subtrees of pages whose parent said "do not descend"
+    completed: List[str] = []
+    skipped: List[str] = []
+    stopped = False
+
+    def finish(key: str, descend: bool) -> None:
+        if not descend:
+            stack = list(jobs[key].children)
+            while stack:
+                child = stack.pop()
+                blocked.add(child)
+                stack.extend(jobs[child].children)
+        for dependant in dependants[key]:
+            remaining[dependant].discard(key)
+
+    def call(job: AssemblyJob) -> bool:
+        try:
+            return bool(run_job(job))
+        except Exception as e:
+            logging.error(f"[SCHEDULER] Job '{job.key}' failed: {e}")
+            logging.exception("Full traceback:")
+            return True
+
+    running: Dict[Any, str] = {}
+    started: Set[str] = set()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="assembly") as pool:
+        while True:
+            if not stopped and should_stop():
+                stopped = True
+            # Jobs whose dependencies are all done, in sitemap order; blocked ones are skipped at once
+            ready = sorted((k for k in jobs if k not in started and not remaining[k]), key=lambda k: jobs[k].order)
+            for key in ready:
+                if key in blocked:
+                    started.add(key)
+                    skipped.append(key)
+                    finish(key, False)
+                elif not stopped and len(running) < max_workers:
+                    started.add(key)
+                    running[pool.submit(call, jobs[key])] = key
+            if not running:
+                if stopped or len(started) == len(jobs) or not ready:
+                    break
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: jobs[running[f]].order):
+                key = running.pop(future)
+                completed.append(key)
+                finish(key, future.result())
+
+    pending = [k for k in jobs if k not in started]
+    return {"completed": completed, "skipped": skipped, "pending": pending, "stopped": stopped}
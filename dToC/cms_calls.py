@@ -0,0 +1,210 @@
+"""
+CMS call layer: backoff on throttling/server errors, adaptive readiness polling, and a wait report.
+
+The CMS wrappers used to sleep a fixed 0.5-5 seconds before/after most calls, either to "avoid
+rate limiting" or to give the CMS time to make a write visible (eventual consistency). Instead:
+- cms_request() sends the request immediately and only waits when the CMS answers 429 or 5xx,
+  using exponential backoff with full jitter (Retry-After is honoured when present);
+- poll_until() checks readiness right away and then at growing intervals (0.1s, 0.2s, 0.4s ...)
+  until the condition holds or the timeout expires, so a write that is visible after 150ms costs
+  ~150ms instead of the old fixed 3-5 seconds;
+- WAIT_REPORT records, per endpoint, how long the old fixed sleeps would have taken versus the
+  time actually spent in backoff and polling (see wait_report()).
+
+stub_cms.py runs these against a local stub CMS that simulates throttling and eventual consistency.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import requests
+
+# Status codes that mean "try again later"; anything else is returned to the caller as-is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# For writes that are not idempotent (SavePage, SaveMiblockRecord): a 500 may already have created
+# the page/record, so only retry when the CMS refused the request before processing it.
+RETRY_STATUSES_NON_IDEMPOTENT = frozenset({429, 503})
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+MAX_RETRIES = 4
+
+
+class WaitReport:
+    """Thread-safe per-endpoint counters of fixed sleeps removed vs. time actually spent waiting."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, endpoint: str) -> Dict[str, float]:
+        entry = self._stats.get(endpoint)
+        if entry is None:
+            entry = self._stats[endpoint] = {
+                "calls": 0, "request_seconds": 0.0, "retries": 0, "backoff_seconds": 0.0,
+                "polls": 0, "poll_seconds": 0.0, "poll_timeouts": 0, "fixed_sleep_seconds": 0.0,
+            }
+        return entry
+
+    def add(self, endpoint: str, **values: float) -> None:
+        with self._lock:
+            entry = self._entry(endpoint)
+            for key, value in values.items():
+                entry[key] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-endpoint rows (most time saved first) plus totals."""
+        with self._lock:
+            rows = []
+            for endpoint, entry in self._stats.items():
+                waited = entry["backoff_seconds"] + entry["poll_seconds"]
+                rows.append(dict(entry, endpoint=endpoint, waited_seconds=round(waited, 3),
+                                 saved_seconds=round(entry["fixed_sleep_seconds"] - waited, 3)))
+        for row in rows:
+            for key in ("request_seconds", "backoff_seconds", "poll_seconds", "fixed_sleep_seconds"):
+                row[key] = round(row[key], 3)
+        rows.sort(key=lambda r: r["saved_seconds"], reverse=True)
+        totals = {
+            key: round(sum(r[key] for r in rows), 3)
+            for key in ("calls", "retries", "polls", "request_seconds", "fixed_sleep_seconds", "waited_seconds", "saved_seconds")
+        }
+        return {"endpoints": rows, "totals": totals}
+
+
+WAIT_REPORT = WaitReport()
+
+
+def wait_report() -> Dict[str, Any]:
+    """Wait statistics since the last reset_wait_report()."""
+    return WAIT_REPORT.summary()
+
+
+def reset_wait_report() -> None:
+    WAIT_REPORT.reset()
+
+
+def log_wait_report(report: Optional[Dict[str, Any]] = None) -> None:
+    """Logs the wait report as a table (fixed sleeps removed vs. actual backoff/poll waiting)."""
+    report = report or wait_report()
+    if not report["endpoints"]:
+        return
+    logging.info(f"{'Endpoint':<40} {'Calls':<7} {'Retries':<8} {'Polls':<7} {'Fixed sleep (s)':<16} {'Waited (s)':<11} {'Saved (s)':<10}")
+    for row in report["endpoints"]:
+        logging.info(f"{row['endpoint']:<40} {row['calls']:<7} {row['retries']:<8} {row['polls']:<7} "
+                     f"{row['fixed_sleep_seconds']:<16.2f} {row['waited_seconds']:<11.2f} {row['saved_seconds']:<10.2f}")
+    totals = report["totals"]
+    logging.info(f"[WAIT REPORT] Fixed sleeps replaced: {totals['fixed_sleep_seconds']:.2f}s, actually waited: "
+                 f"{totals['waited_seconds']:.2f}s, saved: {totals['saved_seconds']:.2f}s")
+
+
+def record_skipped_sleep(endpoint: str, seconds: float) -> None:
+    """Credits a fixed sleep that was removed outright (pure rate-limit courtesy, now covered by backoff)."""
+    WAIT_REPORT.add(endpoint, fixed_sleep_seconds=seconds)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None, base: float = BACKOFF_BASE_SECONDS,
+                  cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based); Retry-After (seconds) is a floor."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, min(cap, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+
+def cms_request(method: str, url: str, endpoint: Optional[str] = None, *,
+                retry_statuses: Iterable[int] = RETRY_STATUSES, max_retries: int = MAX_RETRIES,
+                replaces_sleep: float = 0.0, sender: Optional[Callable[..., requests.Response]] = None,
+                **kwargs: Any) -> requests.Response:
+    """
+    Sends a CMS request, retrying with backoff only while the response status is in retry_statuses.
+
+    Args:
+        method: HTTP method ("GET", "POST", ...).
+        url: Full request URL.
+        endpoint: Name used in the wait report (defaults to the last URL path segment).
+        retry_statuses: Status codes that are retried (default 429 and 5xx).
+        max_retries: Retries after the first attempt.
+        replaces_sleep: Seconds of fixed sleep this call used to be wrapped in (for the wait report).
+        sender: Function used to send the request (defaults to requests.request).
+        **kwargs: Passed to the sender (headers, json, data, params, timeout ...).
+
+    Returns:
+        The last response; callers still call raise_for_status() as before.
+        Connection errors and timeouts are raised as usual.
+    """
+    endpoint = endpoint or url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    sender = sender or requests.request
+    retry_statuses = frozenset(retry_statuses)
+    WAIT_REPORT.add(endpoint, fixed_sleep_seconds=replaces_sleep)
+    attempt = 0
+    while True:
+        started = time.time()
+        response = sender(method, url, **kwargs)
+        WAIT_REPORT.add(endpoint, calls=1, request_seconds=time.time() - started)
+        if response.status_code not in retry_statuses or attempt >= max_retries:
+            return response
+        delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+        logging.warning(f"[CMS] {endpoint} returned {response.status_code}; retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+        time.sleep(delay)
+        WAIT_REPORT.add(endpoint, retries=1, backoff_seconds=delay)
+        attempt += 1
+
+
+def poll_until(check: Callable[[], Any], endpoint: str, *, timeout: float, replaces_sleep: float = 0.0,
+               initial_interval: float = 0.1, max_interval: float = 2.0, factor: float = 2.0) -> Any:
+    """
+    Calls check() until it returns a truthy value or timeout seconds have passed.
+
+    The first check runs immediately; later checks back off geometrically from initial_interval
+    up to max_interval. Returns the last value of check() (falsy on timeout).
+
+    Args:
+        check: Readiness probe (e.g. "are the CMS-generated sub-records visible yet?").
+        endpoint: Name used in the wait report.
+        timeout: Maximum total wait in seconds.
+        replaces_sleep: Seconds of fixed sleep this poll replaces (for the wait report).
+    """
+    WAIT_REPORT.add(endpoint, fixed_sleep_seconds=replaces_sleep)
+    started = time.time()
+    interval = initial_interval
+    polls = 0
+    while True:
+        value = check()
+        polls += 1
+        elapsed = time.time() - started
+        if value or elapsed >= timeout:
+            WAIT_REPORT.add(endpoint, polls=polls, poll_seconds=elapsed, poll_timeouts=0 if value else 1)
+            return value
+        time.sleep(min(interval, max(0.0, timeout - elapsed)))
+        interval = min(max_interval, interval * factor)
+
+
+def file_ready(path: str) -> bool:
+    """True when path exists and can be opened for reading (not locked by the extracting process)."""
+    try:
+        with open(path, "r") as f:
+            f.read(1)
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def poll_for_file(path: str, endpoint: str, timeout: float = 120.0, replaces_sleep: float = 0.0) -> bool:
+    """poll_until() for a file written by an export/unzip step."""
+    return bool(poll_until(lambda: file_ready(path), endpoint, timeout=timeout, replaces_sleep=replaces_sleep,
+                           initial_interval=0.05, max_interval=1.0))
+
+
+def count_ready(records: Any, expected: int) -> bool:
+    """Readiness helper: True when a records list has at least `expected` items."""
+    return isinstance(records, list) and len(records) >= expected
+
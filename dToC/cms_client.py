@@ -0,0 +1,233 @@
+"""
+Shared HTTP client for the CMS API wrappers in apis.py.
+
+Every wrapper used to call requests.get/post directly, which opened a new TCP/TLS connection per
+request. CMS_CLIENT keeps one pooled requests.Session instead:
+- keep-alive connections, at most `pool_maxsize` per host (pool_block=True makes extra threads
+  wait for a free connection instead of opening more);
+- a default timeout for calls that do not pass one;
+- backoff on 429/5xx via cms_calls.cms_request (the wait report keeps working);
+- on 401, the bearer token is regenerated with the refresher registered for that host
+  (register_token_refresher) and the request is sent once more;
+- per-endpoint request/latency metrics (see CMS_CLIENT.metrics()).
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cms_calls import MAX_RETRIES, RETRY_STATUSES, cms_request
+
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_POOL_MAXSIZE = 8       # connections per host; keep >= the number of assembly workers
+DEFAULT_POOL_CONNECTIONS = 10  # number of hosts whose pools are kept
+LATENCY_SAMPLES = 500          # per endpoint, for the percentiles in metrics()
+
+
+class CMSClient:
+    """Pooled, retrying session shared by all CMS API wrappers."""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT_SECONDS, max_retries: int = MAX_RETRIES,
+                 retry_statuses: Iterable[int] = RETRY_STATUSES, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # serialises refreshes; the refresher itself goes through _send
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._token_refreshes = 0
+        self._refreshers: Dict[str, Callable[[], Optional[str]]] = {}
+        self._tokens: Dict[str, str] = {}        # host -> current bearer token (after a refresh)
+        self._stale_tokens: Dict[str, set] = {}  # host -> tokens replaced by a refresh
+        self.session: Optional[requests.Session] = None
+        self.configure(timeout=timeout, max_retries=max_retries, retry_statuses=retry_statuses,
+                       pool_maxsize=pool_maxsize, pool_connections=pool_connections)
+
+    def configure(self, timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                  retry_statuses: Optional[Iterable[int]] = None, pool_maxsize: Optional[int] = None,
+                  pool_connections: Optional[int] = None) -> None:
+        """
+        Updates the client settings; changing the pool sizes replaces the session (open connections are closed).
+
+        Args:
+            timeout: Default timeout (seconds) for requests that do not pass one.
+            max_retries: Retries on retry_statuses before the last response is returned.
+            retry_statuses: Status codes retried with backoff.
+            pool_maxsize: Maximum open connections per host.
+            pool_connections: Number of per-host pools kept.
+        """
+        if timeout is not None:
+            self.timeout = float(timeout)
+        if max_retries is not None:
+            self.max_retries = int(max_retries)
+        if retry_statuses is not None:
+            self.retry_statuses = frozenset(int(s) for s in retry_statuses)
+        rebuild = self.session is None
+        if pool_maxsize is not None and pool_maxsize != getattr(self, "pool_maxsize", None):
+            self.pool_maxsize = max(1, int(pool_maxsize))
+            rebuild = True
+        if pool_connections is not None and pool_connections != getattr(self, "pool_connections", None):
+            self.pool_connections = max(1, int(pool_connections))
+            rebuild = True
+        if rebuild:
+            session = requests.Session()
+            # Retries are done by cms_request (with backoff + wait report), not by urllib3
+            adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                  max_retries=0, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            old_session, self.session = self.session, session
+            if old_session is not None:
+                old_session.close()
+
+    def register_token_refresher(self, base_url: str, refresher: Callable[[], Optional[str]]) -> None:
+        """Registers a function returning a fresh bearer token for base_url's host (used on 401)."""
+        with self._lock:
+            self._refreshers[urlparse(base_url).netloc.lower()] = refresher
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, *,
+                retry_statuses: Optional[Iterable[int]] = None, max_retries: Optional[int] = None,
+                replaces_sleep: float = 0.0, refresh_auth: bool = True, **kwargs: Any) -> requests.Response:
+        """
+        Sends a request through the pooled session; same contract as cms_calls.cms_request.
+
+        Args:
+            method: HTTP method.
+            url: Full request URL.
+            endpoint: Name used in the metrics and wait report (defaults to the last URL path segment).
+            retry_statuses: Overrides the client's retried status codes (e.g. RETRY_STATUSES_NON_IDEMPOTENT).
+            max_retries: Overrides the client's retry count.
+            replaces_sleep: Seconds of fixed sleep this call replaces (wait report).
+            refresh_auth: Regenerate the token and resend once on 401 (False for the token call itself).
+            **kwargs: Passed to requests (headers, json, data, params, timeout ...).
+
+        Returns:
+            The last response; connection errors and timeouts are raised as usual.
+        """
+        endpoint = endpoint or url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc.lower()
+
+        def send(method: str, url: str, **send_kwargs: Any) -> requests.Response:
+            return self._send(endpoint, host, method, url, **send_kwargs)
+
+        options = dict(
+            retry_statuses=self.retry_statuses if retry_statuses is None else retry_statuses,
+            max_retries=self.max_retries if max_retries is None else max_retries,
+            sender=send,
+        )
+        response = cms_request(method, url, endpoint, replaces_sleep=replaces_sleep, **options, **kwargs)
+        if response.status_code == 401 and refresh_auth and self._refresh_token(host, response):
+            response = cms_request(method, url, endpoint, **options, **kwargs)
+        return response
+
+    def get(self, url: str, endpoint: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def post(self, url: str, endpoint: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, endpoint, **kwargs)
+
+    def _send(self, endpoint: str, host: str, method: str, url: str, **kwargs: Any) -> requests.Response:
+        headers = kwargs.get("headers")
+        if headers and host in self._tokens:
+            # Callers keep passing the headers dict built at the start of the run; swap in the refreshed token
+            if _bearer(headers) in self._stale_tokens.get(host, ()):
+                kwargs["headers"] = dict(headers, Authorization=f"Bearer {self._tokens[host]}")
+        started = time.time()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            self._record(endpoint, time.time() - started, type(e).__name__)
+            raise
+        self._record(endpoint, time.time() - started, str(response.status_code))
+        # Token actually sent, so a 401 can tell "expired" from "already refreshed by another thread"
+        response.cms_auth_token = _bearer(kwargs.get("headers"))
+        return response
+
+    def _refresh_token(self, host: str, response: requests.Response) -> bool:
+        """Regenerates the host's token once per expiry (concurrent 401s share the refresh)."""
+        refresher = self._refreshers.get(host)
+        sent_token = getattr(response, "cms_auth_token", None)
+        if not refresher or not sent_token:
+            return False
+        with self._refresh_lock:
+            current = self._tokens.get(host)
+            if current and current != sent_token:
+                return True  # another thread already refreshed it; the retry will swap it in
+            try:
+                new_token = refresher()
+            except Exception as e:
+                logging.error(f"[CMS CLIENT] Token refresh for {host} failed: {e}")
+                return False
+            if not new_token:
+                logging.error(f"[CMS CLIENT] Token refresh for {host} returned no token")
+                return False
+            with self._lock:
+                self._stale_tokens.setdefault(host, set()).add(sent_token)
+                if current:
+                    self._stale_tokens[host].add(current)
+                self._tokens[host] = new_token
+                self._token_refreshes += 1
+        logging.info(f"[CMS CLIENT] Regenerated CMS token for {host} after 401")
+        return True
+
+    def _record(self, endpoint: str, seconds: float, outcome: str) -> None:
+        with self._lock:
+            entry = self._metrics.get(endpoint)
+            if entry is None:
+                entry = self._metrics[endpoint] = {"requests": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                                                   "outcomes": {}, "latencies": []}
+            entry["requests"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["outcomes"][outcome] = entry["outcomes"].get(outcome, 0) + 1
+            latencies: List[float] = entry["latencies"]
+            latencies.append(seconds)
+            if len(latencies) > LATENCY_SAMPLES:
+                del latencies[0]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-endpoint request counts, status/exception outcomes and latency (avg, p50, p95, max), plus token refreshes."""
+        with self._lock:
+            endpoints = []
+            for endpoint, entry in self._metrics.items():
+                latencies = sorted(entry["latencies"])
+                endpoints.append({
+                    "endpoint": endpoint,
+                    "requests": entry["requests"],
+                    "outcomes": dict(entry["outcomes"]),
+                    "avg_seconds": round(entry["total_seconds"] / entry["requests"], 3),
+                    "p50_seconds": round(latencies[len(latencies) // 2], 3),
+                    "p95_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                    "max_seconds": round(entry["max_seconds"], 3),
+                })
+            token_refreshes = self._token_refreshes
+        endpoints.sort(key=lambda e: e["requests"], reverse=True)
+        return {"endpoints": endpoints, "token_refreshes": token_refreshes}
+
+    def reset_metrics(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._token_refreshes = 0
+
+    def log_metrics(self) -> None:
+        """Logs metrics() as a table."""
+        report = self.metrics()
+        if not report["endpoints"]:
+            return
+        logging.info(f"{'Endpoint':<40} {'Requests':<9} {'Avg (s)':<9} {'p95 (s)':<9} {'Max (s)':<9} Outcomes")
+        for row in report["endpoints"]:
+            logging.info(f"{row['endpoint']:<40} {row['requests']:<9} {row['avg_seconds']:<9.3f} "
+                         f"{row['p95_seconds']:<9.3f} {row['max_seconds']:<9.3f} {row['outcomes']}")
+        if report["token_refreshes"]:
+            logging.info(f"[CMS CLIENT] Token refreshes: {report['token_refreshes']}")
+
+
+def _bearer(headers: Optional[Dict[str, str]]) -> Optional[str]:
+    authorization = (headers or {}).get("Authorization") or ""
+    return authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
+
+
+CMS_CLIENT = CMSClient()
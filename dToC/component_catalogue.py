@@ -0,0 +1,154 @@
+"""
+Indexed V-component catalogue used by check_component_availability.
+
+GetAllVComponents returns thousands of V-components, and every component on every page used to be
+resolved by scanning that list with startswith(). ComponentCatalogue is still the same list (so code
+that iterates component_cache keeps working), built once per run with:
+- a code index: the name up to and including the first hyphen ('L10-2 Column Snippet' -> 'L10-'),
+  which answers the usual 'L10-' lookups with one dict hit;
+- a character trie for any other prefix ('Gallery'), each node holding the first usable match;
+- exact-name and alias indexes.
+Lookups return the same component the linear scan did: the first usable one in API order.
+
+load_component_catalogue() gets the list through vcomponent_sync, which keeps it per site on disk
+and on later runs only pulls the V-components created or changed since the last sync.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from vcomponent_sync import DEFAULT_FULL_REFRESH_HOURS, DEFAULT_MAX_WORKERS, FetchPage, catalogue_watermark, change_order, sync_vcomponents
+
+
+def component_code(name: str) -> str:
+    """Component code used for lookups: up to and including the first hyphen, else the whole name."""
+    hyphen_index = name.find('-')
+    return (name[:hyphen_index + 1] if hyphen_index != -1 else name).strip()
+
+
+def _is_usable(component: Dict[str, Any]) -> bool:
+    """Same completeness check check_component_availability applies to a prefix match."""
+    return (component.get("vComponentId") is not None and component.get("alias") is not None
+            and (component.get("component") or {}).get("componentId") is not None)
+
+
+class ComponentCatalogue(list):
+    """
+    Read-only list of V-components with prefix, name and alias indexes.
+
+    Build it once from the GetAllVComponents result; mutating the list afterwards does not
+    update the indexes.
+    """
+
+    def __init__(self, components: List[Dict[str, Any]], version: Optional[str] = None):
+        super().__init__(components)
+        self.version = version
+        self._by_code: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_alias: Dict[str, int] = {}
+        self._trie: Dict[str, Any] = {}
+        self._resolved: Dict[str, Optional[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        for index, component in enumerate(self):
+            if not _is_usable(component):
+                continue
+            name = component.get("name", "") or ""
+            self._by_name.setdefault(name, index)
+            self._by_alias.setdefault(component.get("alias"), index)
+            hyphen_index = name.find('-')
+            if hyphen_index != -1:
+                self._by_code.setdefault(name[:hyphen_index + 1], index)
+            self._add_to_trie(name, index)
+
+    def _add_to_trie(self, name: str, index: int) -> None:
+        # Components are added in list order, so the first index stored on a node is the first match
+        node = self._trie
+        node.setdefault("", index)
+        for char in name:
+            node = node.setdefault(char, {"": index})
+
+    def find_by_prefix(self, prefix: str) -> Optional[Dict[str, Any]]:
+        """First usable component (in API order) whose name starts with prefix, like the old linear scan."""
+        if prefix in self._resolved:
+            index = self._resolved[prefix]
+        else:
+            if prefix.endswith('-') and prefix.find('-') == len(prefix) - 1:
+                # Names starting with 'L10-' have their first hyphen exactly there: one dict lookup
+                index = self._by_code.get(prefix)
+            else:
+                node = self._trie
+                for char in prefix:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                index = node.get("") if node is not None else None
+            self._resolved[prefix] = index
+        if index is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self[index]
+
+    def find_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        index = self._by_name.get(name)
+        return self[index] if index is not None else None
+
+    def find_by_alias(self, alias: str) -> Optional[Dict[str, Any]]:
+        index = self._by_alias.get(alias)
+        return self[index] if index is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"components": len(self), "codes": len(self._by_code), "distinct_lookups": len(self._resolved),
+                "hits": self.hits, "misses": self.misses, "version": self.version}
+
+
+def catalogue_file_path(cache_folder: str, site_id: Any) -> str:
+    return os.path.join(cache_folder, f"component_catalogue_{site_id}.json")
+
+
+def load_component_catalogue(
+    fetch_page: FetchPage,
+    site_id: Any,
+    cache_folder: str,
+    max_age_hours: float = DEFAULT_FULL_REFRESH_HOURS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Union[ComponentCatalogue, Dict[str, Any]]:
+    """
+    Returns the site's component catalogue, synced incrementally against the copy saved on disk.
+
+    Args:
+        fetch_page: One GetSiteVComponents page (e.g. functools.partial(GetVComponentPage, base_url, headers)).
+        site_id: Site the catalogue belongs to (part of the file name and checked on load).
+        cache_folder: Folder for component_catalogue_{site_id}.json.
+        max_age_hours: Refetch every page when the last full fetch is older than this (0 = never).
+        max_workers: Pages fetched concurrently during a full fetch.
+
+    Returns:
+        ComponentCatalogue on success; otherwise the sync's error dict, so callers keep their
+        existing error handling.
+    """
+    components = sync_vcomponents(fetch_page, catalogue_file_path(cache_folder, site_id), str(site_id),
+                                  full_refresh_hours=max_age_hours, max_workers=max_workers)
+    if not isinstance(components, list):
+        return components
+    watermark = catalogue_watermark(components, change_order(components))
+    catalogue = ComponentCatalogue(components, f"{len(components)}:{watermark}")
+    logging.info(f"[CATALOGUE] Component catalogue for site {site_id}: {len(catalogue)} components (version {catalogue.version}).")
+    return catalogue
+
+
+def resolve_component(catalogue: Union[ComponentCatalogue, List[Dict[str, Any]]], search_key: str) -> Optional[Dict[str, Any]]:
+    """Prefix lookup that uses the indexes when given a ComponentCatalogue and scans a plain list otherwise."""
+    if isinstance(catalogue, ComponentCatalogue):
+        return catalogue.find_by_prefix(search_key)
+    for component in catalogue:
+        if (component.get("name", "") or "").startswith(search_key) and _is_usable(component):
+            return component
+    return None
+
+
+def component_result(component: Dict[str, Any]) -> Tuple[Any, Any, Any, str]:
+    """(vComponentId, alias, componentId, cms_component_name) of a resolved component."""
+    return (component.get("vComponentId"), component.get("alias"),
+            (component.get("component") or {}).get("componentId"), component.get("name", ""))
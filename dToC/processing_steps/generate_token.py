@@ -5,7 +5,7 @@ import sys
 from typing import Dict, Any, Optional
 
 # Import the REAL token generation API function
-from apis import generate_cms_token
+from apis import generate_cms_token, extract_cms_token
 
 # Import configuration settings
 try:
@@ -181,14 +181,7 @@ def run_token_generation_step(
     
     # Extract the token from the API response
     # The API returns a dict with the token - common keys are 'token', 'access_token', 'Token', etc.
-    cms_login_token = (
-        token_response.get('token') or 
-        token_response.get('Token') or 
-        token_response.get('access_token') or 
-        token_response.get('AccessToken') or
-        token_response.get('cmsToken') or
-        token_response.get('CMSToken')
-    )
+    cms_login_token = extract_cms_token(token_response)
     
     if not cms_login_token:
         # If token not found in expected keys, log the full response for debugging
@@ -13,11 +13,16 @@ import zipfile # <-- Required for handling exported component files
 import html # <-- Required for HTML entity decoding
 import shutil # <-- Required for cloning component folders
 import traceback # <-- Required for detailed error logging
+import threading # <-- Required for the parallel page assembly scheduler
 from datetime import datetime
 from typing import Dict, Any, List, Union, Tuple, Optional
 from urllib.parse import urlparse
 # Assuming apis.py now contains: GetAllVComponents, export_mi_block_component
-from apis import GetAllVComponents, export_mi_block_component,addUpdateRecordsToCMS,addUpdateRecordsToCMS_bulk,generatecontentHtml,GetTemplatePageByName,psMappingApi,psPublishApi,GetPageCategoryList,CustomGetComponentAliasByName,update_miblock_record_asset,get_miblock_records
+from assembly_scheduler import build_assembly_dag, run_assembly_dag
+from cms_client import CMS_CLIENT
+from component_catalogue import component_code, component_result, load_component_catalogue, resolve_component
+from cms_calls import count_ready, log_wait_report, poll_for_file, poll_until, record_skipped_sleep, reset_wait_report, wait_report
+from apis import register_cms_token_refresh, GetVComponentPage, export_mi_block_component,addUpdateRecordsToCMS,addUpdateRecordsToCMS_bulk,generatecontentHtml,GetTemplatePageByName,psMappingApi,psPublishApi,GetPageCategoryList,CustomGetComponentAliasByName,update_miblock_record_asset,get_miblock_records
 # ================= CONFIG/UTILITY DEFINITIONS (BASED ON USER PATTERN) =================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, '..', 'uploads')
@@ -140,6 +145,7 @@ ASSEMBLY_STATUS_LOG: List[Dict[str, Any]] = []
 
 # --- 2. GLOBAL TIMING TRACKER ---
 TIMING_TRACKER: Dict[str, List[float]] = {}  # Function name -> list of execution times
+# Pages are assembled on worker threads (assembly_scheduler): append with TIMING_TRACKER.setdefault(name, []).append(...)
 
 # --- 3. GLOBAL GUID TRACKER (for verification) ---
 COMPONENT_GUID_TRACKER: Dict[str, str] = {}  # component_id -> pageSectionGuid (for verification)
@@ -153,6 +159,15 @@ PAGE_COMPONENT_SECTIONGUID_MAP: Dict[Tuple[str, int], str] = {}  # (page_name, c
 # Each entry: {"page_id": int, "page_name": str, "header_footer_details": Dict[str, Any]}
 PAGES_TO_PUBLISH: List[Dict[str, Any]] = []
 
+# --- 4.5. PARALLEL ASSEMBLY ---
+# Default number of pages assembled concurrently (override with "assembly_workers" in global_config.json; 1 = sequential)
+ASSEMBLY_MAX_WORKERS = 4
+# Serialises the read-modify-write files shared by concurrently assembled pages
+# (debug log, completed_pages.json, pages_to_publish_pending.json)
+_ASSEMBLY_FILE_LOCK = threading.RLock()
+# Header/footer name -> (vComponentId, alias, componentId); resolved once per run by the scheduler's shared-component jobs
+_HEADER_FOOTER_ALIAS_CACHE: Dict[str, Tuple[Any, Any, Any]] = {}
+
 # --- 5. DEBUG LOG FILE (for deep investigation) ---
 # This will be set dynamically based on site_id when needed
 def get_debug_log_filepath(site_id: Optional[int] = None) -> str:
@@ -184,18 +199,19 @@ def append_page_to_publish_pending(site_id: Optional[int], entry: Dict[str, Any]
     }
     try:
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        existing: List[Dict[str, Any]] = []
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-            except Exception:
+        with _ASSEMBLY_FILE_LOCK:
+            existing: List[Dict[str, Any]] = []
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        existing = json.load(f)
+                except Exception:
+                    existing = []
+            if not isinstance(existing, list):
                 existing = []
-        if not isinstance(existing, list):
-            existing = []
-        existing.append(slim_entry)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(existing, f, indent=2)
+            existing.append(slim_entry)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(existing, f, indent=2)
         logging.info(f"[PUBLISH PENDING] Persisted page_id={slim_entry['page_id']} page='{slim_entry['page_name']}' to {path}")
     except Exception as e:
         logging.error(f"[PUBLISH PENDING] Failed to persist page to {path}: {e}")
@@ -355,16 +371,17 @@ def _clear_completed_pages() -> None:
 def _mark_page_completed(hierarchy_key: str) -> None:
     """Add hierarchy_key to the in-memory set and persist to completed_pages.json."""
     global _COMPLETED_PAGES
-    _COMPLETED_PAGES.add(hierarchy_key)
     path = _completed_pages_path()
-    if not path:
-        return
-    try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump({'completed': sorted(_COMPLETED_PAGES)}, f, indent=2)
-    except Exception as e:
-        logging.warning(f"[RESUME] Failed to persist completed page '{hierarchy_key}': {e}")
+    with _ASSEMBLY_FILE_LOCK:
+        _COMPLETED_PAGES.add(hierarchy_key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'completed': sorted(_COMPLETED_PAGES)}, f, indent=2)
+        except Exception as e:
+            logging.warning(f"[RESUME] Failed to persist completed page '{hierarchy_key}': {e}")
 
 def append_debug_log(section: str, data: Dict[str, Any], site_id: Optional[int] = None) -> None:
     """
@@ -382,8 +399,9 @@ def append_debug_log(section: str, data: Dict[str, Any], site_id: Optional[int]
             "data": data,
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         }
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with _ASSEMBLY_FILE_LOCK, open(log_file, "a", encoding="utf-8") as f:
+            f.write(line)
     except Exception:
         # Never let debug logging break the main flow
         pass
@@ -473,6 +491,7 @@ def check_component_availability(component_name: str, component_cache: List[Dict
     """
     Checks component availability by performing a LOCAL prefix search up to the first hyphen.
     Strips bracket info (Block-X,Main-X,Sub-Y) from component name before searching.
+    With a ComponentCatalogue (built once per run) the search is an index lookup; a plain list is scanned.
     
     Returns the tuple (vComponentId, alias, componentId, cms_component_name, block_count, main_count, sub_count) on success, 
     or None on failure.
@@ -480,41 +499,18 @@ def check_component_availability(component_name: str, component_cache: List[Dict
     # Parse bracket info and get clean name
     clean_component_name, block_count, main_count, sub_count = parse_component_bracket_info(component_name)
     
-    hyphen_index = clean_component_name.find('-')
+    # The search key is the component code up to AND including the first hyphen ('L10-2 Column Snippet' -> 'L10-'),
+    # or the whole name if there is no hyphen (e.g. 'Gallery').
+    search_key = component_code(clean_component_name)
     
-    # 1. Determine the search key: The component code up to AND including the first hyphen.
-    if hyphen_index != -1:
-        # Example: 'L10-2 Column Snippet' -> 'L10-'
-        search_key = clean_component_name[:hyphen_index + 1].strip()
-    else:
-        # If no hyphen (e.g., 'Gallery'), use the whole name.
-        search_key = clean_component_name.strip()
-        
-    logging.info(f"    Searching cache for prefix: **{search_key}** (Original: {component_name}, Clean: {clean_component_name}, Block: {block_count}, Main: {main_count}, Sub: {sub_count})")
-    
-    for component in component_cache:
-        cms_component_name = component.get("name", "")
-        
-        # 2. Perform the prefix match against the CMS component name.
-        # This will match 'L10-2 Column Snippet' (cache) against 'L10-' (search_key).
-        if cms_component_name.startswith(search_key):
-            
-            # Additional check: If the search key is only the prefix (ends in '-'), 
-            # we must ensure the cache name isn't identical to the search key 
-            # (unless that's a valid component name).
-            # We assume if it matches the prefix, it is the correct component family.
-            
-            vComponentId = component.get("vComponentId")
-            component_alias = component.get("alias")
-            nested_component_details = component.get("component", {}) 
-            component_id = nested_component_details.get("componentId")
-            
-            if vComponentId is not None and component_alias is not None and component_id is not None:
-                logging.info(f"    [SUCCESS] Component '{component_name}' found in cache as '{cms_component_name}'. Block: {block_count}, Main: {main_count}, Sub: {sub_count}")
-                # Return the CMS name as the 4th element, and block_count/main_count/sub_count as 5th, 6th, and 7th
-                return (vComponentId, component_alias, component_id, cms_component_name, block_count, main_count, sub_count)
+    component = resolve_component(component_cache, search_key)
+    if component is not None:
+        vComponentId, component_alias, component_id, cms_component_name = component_result(component)
+        logging.debug(f"    [SUCCESS] Component '{component_name}' found in cache as '{cms_component_name}' (prefix {search_key}). Block: {block_count}, Main: {main_count}, Sub: {sub_count}")
+        # Return the CMS name as the 4th element, and block_count/main_count/sub_count as 5th, 6th, and 7th
+        return (vComponentId, component_alias, component_id, cms_component_name, block_count, main_count, sub_count)
     
-    logging.warning(f"    [ERROR] Component prefix '{search_key}' not found in the component cache.'")
+    logging.warning(f"    [ERROR] Component prefix '{search_key}' not found in the component cache (Original: {component_name}).")
     return None
 
 
@@ -1118,7 +1114,7 @@ def update_subrecords_data_from_payload(
             logging.warning(
                 f"[SUBRECORD DATA UPDATE] Failed to update record {sub_record_id}: {resp}"
             )
-        time.sleep(0.5)
+        record_skipped_sleep("SaveMiblockRecord", 0.5)
 
 
 def fetch_and_update_cms_generated_subrecords(
@@ -1208,27 +1204,26 @@ def fetch_and_update_cms_generated_subrecords(
             "sub_records": all_sub_records[:2] if all_sub_records else None  # Log first 2 for debugging
         })
         
-        # If no sub-records found, retry once after a delay (CMS might need more time)
+        # If no sub-records found yet, poll until the CMS has generated them (eventual consistency)
+        # instead of the old fixed 2s sleep + single retry
         if not all_sub_records:
-            logging.warning(f"[SUBRECORD UPDATE] No sub-records found on first attempt. Waiting 2 seconds and retrying...")
-            time.sleep(2)
-            
-            # Retry fetching sub-records
-            for child_comp_id in child_component_ids:
-                params = {
-                    "miblockId": child_comp_id,
-                    "pageSectionGuid": page_section_guid,
-                    "parentRecordId": parent_record_id,
-                    "languageId": 0
-                }
-                
-                logging.info(f"[SUBRECORD UPDATE] Retry: Fetching CMS-generated sub-records for parent {parent_record_id} using child component {child_comp_id}")
-                sub_records = get_miblock_records(base_url, headers, params)
-                
-                if sub_records:
-                    all_sub_records.extend(sub_records)
-                    logging.info(f"[SUBRECORD UPDATE] Retry successful: Found {len(sub_records)} sub-record(s) using child component {child_comp_id}")
-                    break  # Found records, no need to try other components
+            logging.warning(f"[SUBRECORD UPDATE] No sub-records found on first attempt. Polling until the CMS generates them...")
+
+            def _fetch_generated_subrecords():
+                for child_comp_id in child_component_ids:
+                    params = {
+                        "miblockId": child_comp_id,
+                        "pageSectionGuid": page_section_guid,
+                        "parentRecordId": parent_record_id,
+                        "languageId": 0
+                    }
+                    sub_records = get_miblock_records(base_url, headers, params)
+                    if sub_records:
+                        logging.info(f"[SUBRECORD UPDATE] Retry successful: Found {len(sub_records)} sub-record(s) using child component {child_comp_id}")
+                        return sub_records  # Found records, no need to try other components
+                return []
+
+            all_sub_records = list(poll_until(_fetch_generated_subrecords, "GetMiblockRecords", timeout=10, replaces_sleep=2) or [])
         
         if not all_sub_records:
             logging.warning(f"[SUBRECORD UPDATE] No sub-records found for parent {parent_record_id} after retry. CMS may not have auto-generated sub-records for this component type.")
@@ -1361,8 +1356,7 @@ def fetch_and_update_cms_generated_subrecords(
                     
                     if success:
                         logging.info(f"[SUBRECORD UPDATE] Successfully updated assets for sub-record {sub_record_id}")
-                        # Small delay after asset update to ensure CMS processes it
-                        time.sleep(0.5)
+                        record_skipped_sleep("UpdateMiblockRecordAsset", 0.5)
                     else:
                         logging.warning(f"[SUBRECORD UPDATE] Failed to update assets for sub-record {sub_record_id}")
                 else:
@@ -1482,8 +1476,8 @@ def add_records_for_page(page_name: str, vComponentId: int, componentId: int, ba
             else:
                 logging.info("Skipping file save/unzip as export_mi_block_component returned no content.")
             
-            # Give OS a moment to finish file operations after unzipping/deleting the zip.
-            time.sleep(2) 
+            # extractall() has returned, so the files are complete; the config file poll below covers the rest
+            record_skipped_sleep("ExportMiBlockComponent:unzip", 2)
 
             # 2. Convert .txt files to .json (if they exist)
             logging.info("[PROCESSING] Starting TXT to JSON conversion...")
@@ -1506,9 +1500,7 @@ def add_records_for_page(page_name: str, vComponentId: int, componentId: int, ba
                         with open(new_file_path, 'w', encoding="utf-8") as json_file:
                             json.dump(json_content, json_file, indent=4)
                         
-                        # Add a micro-sleep to help OS release the file handle before deletion
-                        time.sleep(0.05) 
-                        
+                        # Both 'with' blocks have closed their handles, so the file can be removed right away
                         os.remove(extracted_file_path)
                         converted_count += 1
                         logging.info(f"   [SUCCESS] Successfully converted: {extracted_file}")
@@ -1523,26 +1515,8 @@ def add_records_for_page(page_name: str, vComponentId: int, componentId: int, ba
             config_file_path = os.path.join(save_folder, config_file_name)
             
             MAX_WAIT_SECONDS = 120 # 2 minutes max wait
-            POLL_INTERVAL = 5      # Check every 5 seconds
-            start_time = time.time()
-            file_ready = False
-
-            # print(f"Waiting up to {MAX_WAIT_SECONDS} seconds for {config_file_name} to be available...")
-
-            while time.time() - start_time < MAX_WAIT_SECONDS:
-                if os.path.exists(config_file_path):
-                    # Try to open the file to check if it's locked
-                    try:
-                        with open(config_file_path, 'r') as f:
-                            f.read(1) # Read a byte to confirm accessibility
-                        file_ready = True
-                        break
-                    except IOError:
-                        print(f"File {config_file_name} exists but is locked. Retrying in {POLL_INTERVAL}s...")
-                else:
-                    print(f"File {config_file_name} not found yet. Retrying in {POLL_INTERVAL}s...")
-                
-                time.sleep(POLL_INTERVAL)
+            # Checked right away, then at growing intervals (instead of a flat 5s between checks)
+            file_ready = poll_for_file(config_file_path, "ExportMiBlockComponent:config", timeout=MAX_WAIT_SECONDS)
 
             if not file_ready:
                 raise FileNotFoundError(f"[TIMEOUT] Required configuration file {config_file_name} was not generated or released within {MAX_WAIT_SECONDS} seconds.")
@@ -1597,9 +1571,9 @@ def add_records_for_page(page_name: str, vComponentId: int, componentId: int, ba
         # NOTE: Sub-record migration removed - CMS handles this automatically
         # See REMOVED_FEATURES.md for restoration instructions if needed in future
         
-        # Wait for CMS to finalize all sub-record processing before generating HTML
-        logging.info(f"[HTML GENERATION] Waiting 4 seconds for CMS to finalize sub-records before generating HTML for component {component_id}...")
-        time.sleep(4)
+        # generatecontentHtml() only builds the section markup locally (no CMS read), so the old 4s
+        # "let the CMS finalize sub-records" sleep is dropped; mainComp already polls for the sub-records
+        record_skipped_sleep("generatecontentHtml", 4)
 
         # 2. Use the component_alias (string) for HTML generation
         logging.info(f"[HTML GENERATION] Generating HTML for component {component_id} (alias: {component_alias}, sectionGuid: {pageSectionGuid})...")
@@ -1672,9 +1646,7 @@ def pageAction(base_url, headers,final_html,page_name,page_template_id,DefaultTi
     logging.info(f"[TIMING] CreatePage completed in {create_time:.2f} seconds")
     
     # Track timing
-    if "CreatePage" not in TIMING_TRACKER:
-        TIMING_TRACKER["CreatePage"] = []
-    TIMING_TRACKER["CreatePage"].append(create_time)
+    TIMING_TRACKER.setdefault("CreatePage", []).append(create_time)
     
     # Check if CreatePage returned an error
     if isinstance(data, dict) and "error" in data:
@@ -1711,9 +1683,7 @@ def pageAction(base_url, headers,final_html,page_name,page_template_id,DefaultTi
         logging.info(f"[TIMING] updatePageMapping completed in {mapping_time:.2f} seconds")
         
         # Track timing
-        if "updatePageMapping" not in TIMING_TRACKER:
-            TIMING_TRACKER["updatePageMapping"] = []
-        TIMING_TRACKER["updatePageMapping"].append(mapping_time)
+        TIMING_TRACKER.setdefault("updatePageMapping", []).append(mapping_time)
     except Exception as e:
         logging.error(f"[ERROR] updatePageMapping failed for page '{page_name}' (ID: {page_id}): {e}")
         logging.exception("Full traceback:")
@@ -1927,8 +1897,7 @@ def updatePageMapping(base_url: str, headers: Dict[str, str], page_id: int, site
         home_debug_log_callback("mapping_payload", {"page_id": page_id, "payload": new_api_payload})
 
     try:
-        # Add small delay before mapping API to avoid rate limiting
-        time.sleep(1)
+        # Rate limiting is handled inside psMappingApi (backoff on 429/5xx) instead of a fixed 1s delay
         # Call the API to update the page mapping
         logging.info(f"[TIMING] Calling psMappingApi with {len(new_api_payload)} mappings...")
         mapping_api_start = time.time()
@@ -1937,24 +1906,11 @@ def updatePageMapping(base_url: str, headers: Dict[str, str], page_id: int, site
         logging.info(f"[TIMING] psMappingApi completed in {mapping_api_time:.2f} seconds")
         
         # Track timing
-        if "psMappingApi" not in TIMING_TRACKER:
-            TIMING_TRACKER["psMappingApi"] = []
-        TIMING_TRACKER["psMappingApi"].append(mapping_api_time)
+        TIMING_TRACKER.setdefault("psMappingApi", []).append(mapping_api_time)
         
-        # Check for 500 error response
+        # 500s were already retried with backoff inside psMappingApi (replaces the old sleep 5 + retry once)
         if isinstance(api_response_data, dict) and api_response_data.get("status_code") == 500:
-            logging.error(f"[ERROR] 500 Internal Server Error during page mapping for Page ID {page_id}")
-            logging.warning(f"[WARNING] Retrying mapping after 5 second delay...")
-            time.sleep(5)
-            # Retry once
-            try:
-                api_response_data = psMappingApi(base_url, headers, new_api_payload)
-                if api_response_data == "Page Content Mappings updated successfully.":
-                    logging.info(f"[SUCCESS] Page mapping retry successful for Page ID {page_id}")
-                else:
-                    logging.error(f"[ERROR] Page mapping retry failed for Page ID {page_id}")
-            except Exception as retry_err:
-                logging.error(f"[ERROR] Page mapping retry exception: {retry_err}")
+            logging.error(f"[ERROR] 500 Internal Server Error during page mapping for Page ID {page_id} (retries exhausted)")
         
         # Check for the specific success string (Your original success logic)
         if api_response_data == "Page Content Mappings updated successfully.":
@@ -2346,9 +2302,8 @@ def publishPage(base_url: str, headers: Dict[str, str], page_id: int, site_id: i
         home_debug_log_callback("publish_payload", {"page_id": page_id, "payload": final_api_payload})
     
     # Pass the final DICTIONARY payload to your publishing API function
-    # Add delay before API call to avoid blocking (publish API can get rate-limited)
-    logging.info(f"[TIMING] Waiting 2 seconds before calling psPublishApi to avoid rate limiting...")
-    time.sleep(2)
+    # (psPublishApi backs off on 429/5xx itself, so there is no fixed pre-call delay here)
+    record_skipped_sleep("Publish_PSV2", 2)
     
     try:
         logging.info(f"[TIMING] Calling psPublishApi with {len(publish_payload)} items...")
@@ -2362,24 +2317,11 @@ def publishPage(base_url: str, headers: Dict[str, str], page_id: int, site_id: i
         append_debug_log("publish_api_response", {"page_id": page_id, "response": api_result})
         
         # Track timing
-        if "psPublishApi" not in TIMING_TRACKER:
-            TIMING_TRACKER["psPublishApi"] = []
-        TIMING_TRACKER["psPublishApi"].append(api_time)
+        TIMING_TRACKER.setdefault("psPublishApi", []).append(api_time)
         
-        # Check for 500 error and retry
+        # 500s were already retried with backoff inside psPublishApi (replaces the old sleep 5 + retry once)
         if isinstance(api_result, dict) and api_result.get("status_code") == 500:
-            logging.error(f"[ERROR] 500 Internal Server Error during publish for Page ID {page_id}")
-            logging.warning(f"[WARNING] Retrying publish after 5 second delay...")
-            time.sleep(5)
-            # Retry once
-            try:
-                api_result = psPublishApi(base_url, headers, site_id, final_api_payload)
-                if isinstance(api_result, dict) and api_result.get("status") == "error":
-                    logging.error(f"[ERROR] Publish retry failed for Page ID {page_id}")
-                else:
-                    logging.info(f"[SUCCESS] Publish retry successful for Page ID {page_id}")
-            except Exception as retry_err:
-                logging.error(f"[ERROR] Publish retry exception: {retry_err}")
+            logging.error(f"[ERROR] 500 Internal Server Error during publish for Page ID {page_id} (retries exhausted)")
                 
     except Exception as e:
         logging.error(f"\n[ERROR] **CRITICAL API ERROR:** An exception occurred during the API call: {e}")
@@ -2415,9 +2357,8 @@ def publish_queued_pages(base_url: str, headers: Dict[str, str], site_id: int) -
             logging.warning(f"[PUBLISH] Skipping queued entry {idx}/{total_pages}: missing page_id.")
             continue
         
-        # Add delay before publish to avoid API blocking (publish API can get blocked)
-        logging.info(f"[TIMING] Waiting 3 seconds before publish of queued page '{page_name}' (ID: {page_id}) to avoid API blocking...")
-        time.sleep(3)
+        # No fixed 3s gap between queued publishes: psPublishApi backs off only if the CMS throttles
+        record_skipped_sleep("Publish_PSV2", 3)
         
         # Extract just the page name for folder lookup (in case page_name includes hierarchy)
         page_name_for_folder = page_name.split("/")[-1] if "/" in page_name else page_name
@@ -2430,9 +2371,7 @@ def publish_queued_pages(base_url: str, headers: Dict[str, str], site_id: int) -
             logging.info(f"[TIMING] publishPage for '{page_name}' completed in {publish_time:.2f} seconds")
             
             # Track timing
-            if "publishPage" not in TIMING_TRACKER:
-                TIMING_TRACKER["publishPage"] = []
-            TIMING_TRACKER["publishPage"].append(publish_time)
+            TIMING_TRACKER.setdefault("publishPage", []).append(publish_time)
             
             success_count += 1
         except Exception as e:
@@ -2463,8 +2402,8 @@ def publish_created_pages_from_pending_file(base_url: str, headers: Dict[str, st
         page_name = entry.get("page_name", f"Page-{page_id}")
         if not page_id:
             continue
-        logging.info(f"[TIMING] Waiting 3 seconds before publish of '{page_name}' (ID: {page_id}) [{idx}/{total}]...")
-        time.sleep(3)
+        logging.info(f"[PUBLISH] Publishing '{page_name}' (ID: {page_id}) [{idx}/{total}]...")
+        record_skipped_sleep("Publish_PSV2", 3)
         page_name_for_folder = page_name.split("/")[-1] if "/" in page_name else page_name
         try:
             # Pass empty header_footer_details and no mapping_payload (not stored to keep file small/safe).
@@ -2939,9 +2878,9 @@ def mainComp(save_folder, component_id, pageSectionGuid, base_url, headers,compo
                     if has_img:
                         update_record_asset_if_needed(record, main_component_new_id, component_id, base_url, headers)
                     
-                    # Add delay before fetching sub-records to ensure parent record is fully processed by CMS
-                    logging.info(f"[MAINCOMP] Waiting 3 seconds before fetching sub-records for parent {main_component_new_id} to ensure CMS has processed the parent record...")
-                    time.sleep(3)
+                    # No fixed wait for the CMS to process the parent: fetch_and_update_cms_generated_subrecords
+                    # polls until the generated sub-records are visible
+                    record_skipped_sleep("GetMiblockRecords", 3)
                     
                     # Fetch and update CMS-generated sub-records (since CMS auto-generates them)
                     logging.info(f"[MAINCOMP] Checking for CMS-generated sub-records for parent {main_component_new_id} (component {component_id})...")
@@ -2982,9 +2921,9 @@ def mainComp(save_folder, component_id, pageSectionGuid, base_url, headers,compo
                         
                         # --- SUB-RECORD DUPLICATION LOGIC (Sub-Z) ---
                         if sub_count > 1:  # Only duplicate if we need more than 1 (CMS creates 1 by default)
-                            # Wait a bit more to ensure CMS has created all sub-records
-                            logging.info(f"[SUBRECORD DUPLICATE] Sub_count={sub_count} specified. Waiting 1 second then duplicating...")
-                            time.sleep(1)
+                            # The sub-records were just polled for above, so duplication starts right away
+                            logging.info(f"[SUBRECORD DUPLICATE] Sub_count={sub_count} specified. Duplicating...")
+                            record_skipped_sleep("GetMiblockRecords", 1)
                             logging.info(f"[SUBRECORD DUPLICATE] Will fetch CMS-generated sub-records and duplicate them...")
                             
                             try:
@@ -3097,10 +3036,6 @@ def mainComp(save_folder, component_id, pageSectionGuid, base_url, headers,compo
                                                     if new_record_id:
                                                         logging.info(f"[SUBRECORD DUPLICATE] Created sub-record {i+1}/{records_to_create} with ID {new_record_id}")
                                                         
-                                                        # Wait for CMS to process the record before updating assets
-                                                        logging.info(f"[SUBRECORD DUPLICATE] Waiting 1 second for CMS to process record {new_record_id} before updating assets...")
-                                                        time.sleep(1)
-                                                        
                                                         # Update assets for new sub-record
                                                         source_record = component_records_map.get(child_comp_id)
                                                         has_images = source_record.get("has_image", False) if source_record else False
@@ -3108,10 +3043,12 @@ def mainComp(save_folder, component_id, pageSectionGuid, base_url, headers,compo
                                                         if has_images or template_record.get("has_image"):
                                                             logging.info(f"[SUBRECORD DUPLICATE] Updating assets for new sub-record {new_record_id}...")
                                                             record_for_update = source_record if source_record else template_record
-                                                            update_success = update_record_asset_if_needed(record_for_update, new_record_id, child_comp_id, base_url, headers)
-                                                            if update_success:
-                                                                # Small delay after asset update to ensure CMS processes it
-                                                                time.sleep(0.5)
+                                                            # Try right away and retry at growing intervals while the CMS is still
+                                                            # processing the new record (replaces the fixed 1s + 0.5s sleeps)
+                                                            poll_until(
+                                                                lambda: update_record_asset_if_needed(record_for_update, new_record_id, child_comp_id, base_url, headers),
+                                                                "UpdateMiblockRecordAsset", timeout=5, replaces_sleep=1.5
+                                                            )
                                                         else:
                                                             logging.info(f"[SUBRECORD DUPLICATE] Sub-record {new_record_id} has no images, skipping asset update")
                                                     else:
@@ -3119,16 +3056,18 @@ def mainComp(save_folder, component_id, pageSectionGuid, base_url, headers,compo
                                                 else:
                                                     logging.error(f"[SUBRECORD DUPLICATE] Failed to create sub-record {i+1}: {resp_data}")
                                                 
-                                                # Small delay between creations
-                                                time.sleep(0.5)
+                                                record_skipped_sleep("SaveMiblockRecord", 0.5)  # old fixed delay between creations
                                                 
                                             except Exception as e:
                                                 logging.error(f"[SUBRECORD DUPLICATE] Error creating sub-record {i+1}: {e}")
                                                 logging.exception("Full traceback:")
                                         
-                                        # After creating all duplicates, wait extra time for CMS to process them all
-                                        logging.info(f"[SUBRECORD DUPLICATE] Finished creating {records_to_create} sub-records. Waiting 5 seconds for CMS to process all new records and assets...")
-                                        time.sleep(5)
+                                        # After creating all duplicates, poll until the CMS lists all of them
+                                        # (instead of a fixed 5s wait)
+                                        logging.info(f"[SUBRECORD DUPLICATE] Finished creating {records_to_create} sub-records. Waiting for the CMS to list all {sub_count}...")
+                                        if not poll_until(lambda: count_ready(get_miblock_records(base_url, headers, params), sub_count),
+                                                          "GetMiblockRecords", timeout=15, replaces_sleep=5):
+                                            logging.warning(f"[SUBRECORD DUPLICATE] CMS did not list {sub_count} sub-records for parent {main_component_new_id} within 15s; continuing")
                                         
                                     break  # Done with this child component
                                 
@@ -3926,6 +3865,22 @@ def createRecordsPayload(site_id, component_id, page_name: Optional[str] = None)
 # from your_globals import ASSEMBLY_STATUS_LOG 
 
 # --- Helper Function for Headers/Footers ---
+def resolve_header_footer_alias(base_url: str, headers: Dict[str, str], headerFooterCompName: str) -> Tuple[Any, Any, Any]:
+    """
+    Returns (vComponentId, component_alias, component_id) for a Header/Footer component name.
+    Successful lookups are cached for the run: the same header/footer is shared by most pages,
+    and the scheduler resolves each one once before the pages that use it.
+    """
+    cached = _HEADER_FOOTER_ALIAS_CACHE.get(headerFooterCompName)
+    if cached is not None:
+        return cached
+    result = CustomGetComponentAliasByName(base_url, headers, headerFooterCompName)
+    if isinstance(result, tuple) and len(result) == 3:
+        _HEADER_FOOTER_ALIAS_CACHE[headerFooterCompName] = result
+        return result
+    raise ValueError(f"Header/Footer component '{headerFooterCompName}' not resolved: {result}")
+
+
 def getHeaderFooter_html(base_url: str, headers: Dict[str, str], headerFooterCompName: str) -> Tuple[Optional[str], Optional[str], Optional[int], str, Optional[str]]:
     """
     Fetches the necessary IDs and generates the HTML structure for a given 
@@ -3935,8 +3890,8 @@ def getHeaderFooter_html(base_url: str, headers: Dict[str, str], headerFooterCom
         vComponentId, component_alias, component_id, section_html, pageSectionGuid
     """
     try:
-        # Assuming CustomGetComponentAliasByName returns vComponentId, alias, component_id
-        vComponentId, component_alias, component_id = CustomGetComponentAliasByName(base_url, headers, headerFooterCompName)
+        # CustomGetComponentAliasByName returns vComponentId, alias, component_id (cached per run)
+        vComponentId, component_alias, component_id = resolve_header_footer_alias(base_url, headers, headerFooterCompName)
         
         pageSectionGuid = str(uuid.uuid4()) 
         # Assuming generatecontentHtml generates the structural HTML snippet
@@ -4220,9 +4175,7 @@ def _process_page_components(page_data: Dict[str, Any], page_level: int, hierarc
                 logging.info(f"[TIMING] add_records_for_page completed in {records_time:.2f} seconds")
                 
                 # Track timing
-                if "add_records_for_page" not in TIMING_TRACKER:
-                    TIMING_TRACKER["add_records_for_page"] = []
-                TIMING_TRACKER["add_records_for_page"].append(records_time)
+                TIMING_TRACKER.setdefault("add_records_for_page", []).append(records_time)
                 status_entry["status"] = "SUCCESS: Content retrieved and records added to assembly queue."
             except Exception as e:
                 logging.error(f"Content retrieval failed for {page_name}/{component_name}: {e}")
@@ -4381,7 +4334,8 @@ def _process_page_components(page_data: Dict[str, Any], page_level: int, hierarc
         
 # --- TRAVERSAL FUNCTIONS TO PASS CACHE AND NEW PARAMS ---
 
-def assemble_page_templates_level4(page_data: Dict[str, Any], page_level: int, hierarchy: List[str], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str], component_cache_for_mapping: Optional[List[Dict[str, Any]]] = None):
+def assemble_page_templates_level4(page_data: Dict[str, Any], page_level: int, hierarchy: List[str], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str], component_cache_for_mapping: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """Assembles one level 4 page (deeper pages are not assembled). Returns False if the page was not processed."""
     logging.info(f"\n--- Level {page_level} Page: {page_data.get('page_name')} ---")
     matched_category_id = 0
     current_page_name = page_data.get('page_name', 'UNKNOWN_PAGE')
@@ -4391,12 +4345,12 @@ def assemble_page_templates_level4(page_data: Dict[str, Any], page_level: int, h
         logging.info(f"[STOP] Stop requested. Halting at '{current_page_name}' (level {page_level}).")
         append_debug_log("assembly_stopped", {"stopped_at": current_page_name, "level": page_level})
         _set_assembly_was_stopped(True)
-        return
+        return False
 
     hierarchy_key_l4 = " > ".join(hierarchy + [current_page_name])
     if hierarchy_key_l4 in _COMPLETED_PAGES:
         logging.info(f"[RESUME] Skipping already-completed page '{hierarchy_key_l4}'.")
-        return
+        return False
 
     # Fetch categories list
     categories = GetPageCategoryList(api_base_url, api_headers)
@@ -4405,7 +4359,7 @@ def assemble_page_templates_level4(page_data: Dict[str, Any], page_level: int, h
     # Check for API errors
     if isinstance(categories, dict) and categories.get("error"):
         logging.error(f"[ERROR] Unable to load page categories. Aborting processing for page '{current_page_name}'. Error: {categories.get('details')}")
-        return
+        return False
     
     # Category Matching Logic - For level 4 pages, use the direct parent (last entry in hierarchy)
     # so that each page is categorised under its immediate parent, not always the top-level.
@@ -4423,8 +4377,13 @@ def assemble_page_templates_level4(page_data: Dict[str, Any], page_level: int, h
         logging.warning(f"[WARNING] No matching category found for page '{current_page_name}', using CategoryId = 0")
     
     _process_page_components(page_data, page_level, hierarchy, component_cache, api_base_url, site_id, api_headers, category_id=matched_category_id, component_cache_for_mapping=component_cache_for_mapping or component_cache)
+    return True
 
-def assemble_page_templates_level3(page_data: Dict[str, Any], page_level: int, hierarchy: List[str], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str], parent_page_name: str, component_cache_for_mapping: Optional[List[Dict[str, Any]]] = None, page_filter: Optional[str] = None):
+def assemble_page_templates_level3(page_data: Dict[str, Any], page_level: int, hierarchy: List[str], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str], parent_page_name: str, component_cache_for_mapping: Optional[List[Dict[str, Any]]] = None, page_filter: Optional[str] = None, recurse: bool = True) -> bool:
+    """
+    Assembles one level 3 page, then (if recurse) its level 4 sub-pages.
+    Returns True when the sub-pages should be assembled (the parallel scheduler calls this with recurse=False).
+    """
     logging.info(f"\n--- Level {page_level} Page: {page_data.get('page_name')} ---")
     matched_category_id = 0
     current_page_name = page_data.get('page_name', 'UNKNOWN_PAGE')
@@ -4434,24 +4393,24 @@ def assemble_page_templates_level3(page_data: Dict[str, Any], page_level: int, h
         logging.info(f"[STOP] Stop requested. Halting at '{current_page_name}' (level {page_level}).")
         append_debug_log("assembly_stopped", {"stopped_at": current_page_name, "level": page_level})
         _set_assembly_was_stopped(True)
-        return
+        return False
 
     hierarchy_key_l3 = " > ".join(hierarchy + [current_page_name])
     if hierarchy_key_l3 in _COMPLETED_PAGES:
         logging.info(f"[RESUME] Skipping already-completed page '{hierarchy_key_l3}'.")
         new_hierarchy_l3 = hierarchy + [current_page_name]
         new_level_l3 = page_level + 1
-        for sub_page_data in page_data.get("sub_pages", []):
+        for sub_page_data in page_data.get("sub_pages", []) if recurse else []:
             assemble_page_templates_level4(sub_page_data, new_level_l3, new_hierarchy_l3,
                                            component_cache, api_base_url, site_id, api_headers,
                                            component_cache_for_mapping=component_cache_for_mapping or component_cache)
-        return
+        return True
 
     # Check page filter - if set and current page doesn't match any filter, skip
     page_filters = _parse_page_filter(page_filter)
     if page_filters and current_page_name not in page_filters:
         logging.info(f"[DEBUG] Skipping page '{current_page_name}' (doesn't match filter(s) {sorted(page_filters)})")
-        return
+        return False
 
     logging.info(f"\n--- Level {page_level} Page: {current_page_name} ---")
     
@@ -4472,7 +4431,7 @@ def assemble_page_templates_level3(page_data: Dict[str, Any], page_level: int, h
                 "error": f"categories API error: {err_detail}",
             },
         )
-        return
+        return False
 
     # Category Matching Logic
     # For level 3 pages, use the direct parent page name (parent_page_name = L2 page name)
@@ -4512,8 +4471,9 @@ def assemble_page_templates_level3(page_data: Dict[str, Any], page_level: int, h
 
     new_hierarchy = hierarchy + [current_page_name]
     new_level = page_level + 1
-    for sub_page_data in page_data.get("sub_pages", []):
+    for sub_page_data in page_data.get("sub_pages", []) if recurse else []:
         assemble_page_templates_level4(sub_page_data, new_level, new_hierarchy, component_cache, api_base_url, site_id, api_headers, component_cache_for_mapping=component_cache_for_mapping or component_cache)
+    return True
 
 
 def assemble_page_templates_level2(
@@ -4526,8 +4486,13 @@ def assemble_page_templates_level2(
     api_headers: Dict[str, str],
     parent_page_name: str,
     component_cache_for_mapping: Optional[List[Dict[str, Any]]] = None,
-    page_filter: Optional[str] = None
-):
+    page_filter: Optional[str] = None,
+    recurse: bool = True
+) -> bool:
+    """
+    Assembles one level 2 page, then (if recurse) its level 3 sub-pages.
+    Returns True when the sub-pages should be assembled (the parallel scheduler calls this with recurse=False).
+    """
     # Initialize the ID variable at the start. Default to 0 if no match is found.
     matched_category_id = 0
     current_page_name = page_data.get('page_name', 'UNKNOWN_PAGE')
@@ -4537,7 +4502,7 @@ def assemble_page_templates_level2(
         logging.info(f"[STOP] Stop requested. Halting assembly at page '{current_page_name}' (level {page_level}).")
         append_debug_log("assembly_stopped", {"stopped_at": current_page_name, "level": page_level})
         _set_assembly_was_stopped(True)
-        return
+        return False
 
     hierarchy_key_l2 = " > ".join(hierarchy + [current_page_name])
     if hierarchy_key_l2 in _COMPLETED_PAGES:
@@ -4545,13 +4510,13 @@ def assemble_page_templates_level2(
         # Still recurse into sub-pages in case some are not yet completed
         new_hierarchy_l2 = hierarchy + [current_page_name]
         new_level_l2 = page_level + 1
-        for sub_page_data in page_data.get("sub_pages", []):
+        for sub_page_data in page_data.get("sub_pages", []) if recurse else []:
             assemble_page_templates_level3(sub_page_data, new_level_l2, new_hierarchy_l2,
                                            component_cache, api_base_url, site_id, api_headers,
                                            current_page_name,
                                            component_cache_for_mapping=component_cache_for_mapping or component_cache,
                                            page_filter=page_filter)
-        return
+        return True
 
     page_filters = _parse_page_filter(page_filter)
 
@@ -4591,7 +4556,7 @@ def assemble_page_templates_level2(
                 # Don't write level2_page_skipped on re-run: it would overwrite existing Success/No Content/Stopped in Page Status
                 if not _ASSEMBLY_IS_RERUN:
                     append_debug_log("level2_page_skipped", {"page_name": current_page_name, "hierarchy": " > ".join(hierarchy + [current_page_name]), "reason": "doesn't match filter and has no matching sub-page", "page_filter": page_filter})
-                return
+                return False
         else:
             # Page matches one of the filters - log this
             logging.info(f"[DEBUG] Page '{current_page_name}' matches filter(s) {sorted(page_filters)} - processing")
@@ -4622,7 +4587,7 @@ def assemble_page_templates_level2(
                 "page_filter": page_filter,
             },
         )
-        return
+        return False
 
     # Category Matching Logic: use PARENT page name (e.g. "Our Resort") to get category so child (e.g. "Resort Amenities") is under it
     normalized_parent = normalize_page_name(parent_page_name)
@@ -4680,7 +4645,7 @@ def assemble_page_templates_level2(
     new_hierarchy = hierarchy + [current_page_name]
     new_level = page_level + 1
     parent_page_name = current_page_name
-    for sub_page_data in page_data.get("sub_pages", []):
+    for sub_page_data in page_data.get("sub_pages", []) if recurse else []:
         assemble_page_templates_level3(
             sub_page_data, 
             new_level, 
@@ -4693,6 +4658,7 @@ def assemble_page_templates_level2(
             component_cache_for_mapping=component_cache_for_mapping or component_cache,
             page_filter=page_filter
         )
+    return True
 
 def _parse_page_filter(page_filter: Optional[str]) -> set:
     """Parses a comma-separated page filter string into a set of page names (& normalised to 'and')."""
@@ -4780,6 +4746,108 @@ def _set_assembly_running(running: bool) -> None:
             pass
 
 
+def _page_contains_subpage(page: Dict[str, Any], target_name: str) -> bool:
+    """Check if page or any of its sub-pages matches target_name."""
+    if page.get('page_name') == target_name:
+        return True
+    for sub_page in page.get('sub_pages', []):
+        if _page_contains_subpage(sub_page, target_name):
+            return True
+    return False
+
+
+def _assemble_level1_page(top_level_page: Dict[str, Any], page_filters: set, page_filter: Optional[str], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str]) -> bool:
+    """
+    Assembles one top-level page. Returns False when the page and its sub-pages are filtered out;
+    sub-pages are scheduled by assemble_page_templates_level1.
+    """
+    initial_level = 1
+    initial_hierarchy: List[str] = []
+
+    current_page_name = top_level_page.get('page_name', 'UNKNOWN_PAGE')
+
+    # --- Resume check (stop requests are handled by the scheduler) ---
+    if current_page_name in _COMPLETED_PAGES:
+        logging.info(f"[RESUME] Skipping already-completed page '{current_page_name}'.")
+        # Still recurse so sub-pages can be checked
+    
+    # If page_filters is set and current page doesn't match any filter, skip processing its components
+    # but still allow traversal to sub-pages (which might match the filter)
+    should_process_components = current_page_name not in _COMPLETED_PAGES
+    logging.info(f"[DEBUG] Processing page '{current_page_name}' with filter(s) {sorted(page_filters) if page_filters else 'none'}")
+    
+    if page_filters and current_page_name not in page_filters:
+        logging.info(f"[DEBUG] Page '{current_page_name}' doesn't match filter(s) {sorted(page_filters)}. Checking if it contains matching sub-page...")
+        has_subpage = any(_page_contains_subpage(top_level_page, name) for name in page_filters)
+        logging.info(f"[DEBUG] has matching sub-page = {has_subpage}")
+        
+        if not has_subpage:
+            logging.info(f"[DEBUG] Skipping page '{current_page_name}' (doesn't match any filter and has no matching sub-page)")
+            return False  # Skip this page and its sub-pages entirely
+        else:
+            logging.info(f"[DEBUG] Page '{current_page_name}' contains a filtered sub-page. Skipping component processing for parent page.")
+            should_process_components = False
+    elif page_filters and current_page_name in page_filters:
+        logging.info(f"[DEBUG] Page '{current_page_name}' matches filter(s). Will process components.")
+    elif not page_filters:
+        logging.info(f"[DEBUG] No filter set. Will process components for '{current_page_name}'.")
+    
+    # Debug: Log if page name contains "/"
+    if '/' in current_page_name:
+        logging.info(f"[DEBUG] Level 1 page name contains '/': '{current_page_name}'")
+
+    # Debug log into separate file so we can see exactly which pages/components are being processed
+    append_debug_log(
+        "level1_page_start",
+        {
+            "page_name": current_page_name,
+            "components": top_level_page.get("components", []),
+            "source": "_simplified.json",
+            "page_filter": page_filter,
+            "will_process_components": should_process_components,
+        },
+    )
+
+    print(current_page_name)
+    logging.info(f"\n--- Level {initial_level} Page: {current_page_name} ---")
+
+    # Default category ID
+    category_id = 0
+
+    # Only process page components if should_process_components is True
+    if should_process_components:
+        logging.info(f"[DEBUG] Processing components for '{current_page_name}' (should_process_components=True)")
+        try:
+            _process_page_components(
+                top_level_page,
+                initial_level,
+                initial_hierarchy,
+                component_cache,
+                api_base_url,
+                site_id,
+                api_headers,
+                category_id,
+                component_cache_for_mapping=component_cache
+            )
+        except Exception as e:
+            logging.error(f"[ERROR] Processing failed for page '{current_page_name}': {e}")
+            logging.exception("Full traceback:")
+            append_debug_log(
+                "page_error",
+                {
+                    "page_name": current_page_name,
+                    "page_level": initial_level,
+                    "hierarchy": current_page_name,
+                    "error": str(e),
+                },
+            )
+    else:
+        logging.warning(f"[SKIP] Skipping component processing for '{current_page_name}' (filter(s): {sorted(page_filters)}, should_process_components=False)")
+        logging.info(f"[SKIP] Will still traverse to sub-pages to find filter(s): {sorted(page_filters)}")
+
+    return True
+
+
 def assemble_page_templates_level1(processed_json: Dict[str, Any], component_cache: List[Dict[str, Any]], api_base_url: str, site_id: int, api_headers: Dict[str, str]):
     logging.info("\n========================================================")
     logging.info("START: Component-Based Template Assembly (Level 1 Traversal)")
@@ -4842,16 +4910,6 @@ def assemble_page_templates_level1(processed_json: Dict[str, Any], component_cac
     else:
         logging.info(f"[FILTER] No global_config found. Processing all pages.")
     
-    # Helper function to recursively check if a page contains a sub-page with target name
-    def page_contains_subpage(page, target_name):
-        """Check if page or any of its sub-pages matches target_name."""
-        if page.get('page_name') == target_name:
-            return True
-        for sub_page in page.get('sub_pages', []):
-            if page_contains_subpage(sub_page, target_name):
-                return True
-        return False
-    
     # Helper function to get all page names recursively
     def get_all_page_names(pages_list, level=1):
         """Get all page names from all levels."""
@@ -4870,7 +4928,7 @@ def assemble_page_templates_level1(processed_json: Dict[str, Any], component_cac
         
         # Also include parent pages that contain a matching sub-page
         for p in pages:
-            if p not in filtered_pages and any(page_contains_subpage(p, name) for name in page_filters):
+            if p not in filtered_pages and any(_page_contains_subpage(p, name) for name in page_filters):
                 filtered_pages.append(p)
 
         if not filtered_pages:
@@ -4880,107 +4938,45 @@ def assemble_page_templates_level1(processed_json: Dict[str, Any], component_cac
         pages = filtered_pages
         logging.info(f"[DEBUG] Processing ONLY page(s): {sorted(page_filters)} (filtered from {len(processed_json.get('pages', []))} total pages)")
 
-    initial_level = 1
-    initial_hierarchy: List[str] = []
-
     _set_assembly_running(True)
-    for top_level_page in pages:
-        current_page_name = top_level_page.get('page_name', 'UNKNOWN_PAGE')
-
-        # --- Stop / resume checks ---
-        if _is_stop_requested():
-            logging.info(f"[STOP] Stop requested. Halting assembly at page '{current_page_name}'.")
-            append_debug_log("assembly_stopped", {"stopped_at": current_page_name, "level": 1})
-            _set_assembly_running(False)
-            _set_assembly_was_stopped(True)
-            return
+    _HEADER_FOOTER_ALIAS_CACHE.clear()
 
-        if current_page_name in _COMPLETED_PAGES:
-            logging.info(f"[RESUME] Skipping already-completed page '{current_page_name}'.")
-            # Still recurse so sub-pages can be checked
-        
-        # If page_filters is set and current page doesn't match any filter, skip processing its components
-        # but still allow traversal to sub-pages (which might match the filter)
-        should_process_components = current_page_name not in _COMPLETED_PAGES
-        logging.info(f"[DEBUG] Processing page '{current_page_name}' with filter(s) {sorted(page_filters) if page_filters else 'none'}")
-        
-        if page_filters and current_page_name not in page_filters:
-            logging.info(f"[DEBUG] Page '{current_page_name}' doesn't match filter(s) {sorted(page_filters)}. Checking if it contains matching sub-page...")
-            has_subpage = any(page_contains_subpage(top_level_page, name) for name in page_filters)
-            logging.info(f"[DEBUG] has matching sub-page = {has_subpage}")
-            
-            if not has_subpage:
-                logging.info(f"[DEBUG] Skipping page '{current_page_name}' (doesn't match any filter and has no matching sub-page)")
-                continue  # Skip this page entirely
-            else:
-                logging.info(f"[DEBUG] Page '{current_page_name}' contains a filtered sub-page. Skipping component processing for parent page.")
-                should_process_components = False
-        elif page_filters and current_page_name in page_filters:
-            logging.info(f"[DEBUG] Page '{current_page_name}' matches filter(s). Will process components.")
-        elif not page_filters:
-            logging.info(f"[DEBUG] No filter set. Will process components for '{current_page_name}'.")
-        
-        # Debug: Log if page name contains "/"
-        if '/' in current_page_name:
-            logging.info(f"[DEBUG] Level 1 page name contains '/': '{current_page_name}'")
-
-        # Debug log into separate file so we can see exactly which pages/components are being processed
-        append_debug_log(
-            "level1_page_start",
-            {
-                "page_name": current_page_name,
-                "components": top_level_page.get("components", []),
-                "source": "_simplified.json",
-                "page_filter": page_filter,
-                "will_process_components": should_process_components,
-            },
-        )
-
-        print(current_page_name)
-        logging.info(f"\n--- Level {initial_level} Page: {current_page_name} ---")
-
-        # Default category ID
-        category_id = 0
-
-        # Only process page components if should_process_components is True
-        if should_process_components:
-            logging.info(f"[DEBUG] Processing components for '{current_page_name}' (should_process_components=True)")
-            try:
-                _process_page_components(
-                    top_level_page,
-                    initial_level,
-                    initial_hierarchy,
-                    component_cache,
-                    api_base_url,
-                    site_id,
-                    api_headers,
-                    category_id,
-                    component_cache_for_mapping=component_cache
-                )
-            except Exception as e:
-                logging.error(f"[ERROR] Processing failed for page '{current_page_name}': {e}")
-                logging.exception("Full traceback:")
-                append_debug_log(
-                    "page_error",
-                    {
-                        "page_name": current_page_name,
-                        "page_level": initial_level,
-                        "hierarchy": current_page_name,
-                        "error": str(e),
-                    },
-                )
-        else:
-            logging.warning(f"[SKIP] Skipping component processing for '{current_page_name}' (filter(s): {sorted(page_filters)}, should_process_components=False)")
-            logging.info(f"[SKIP] Will still traverse to sub-pages to find filter(s): {sorted(page_filters)}")
-
-        next_level = initial_level + 1
-        new_hierarchy = initial_hierarchy + [current_page_name]
-        parent_page_name = current_page_name
-        # Go to sub-pages (level2)
-        # IMPORTANT: Process sub_pages in the exact order they appear in simplified.json
-        # Do NOT sort or reorder - maintain sequence as defined in JSON
-        for sub_page_data in top_level_page.get("sub_pages", []):
-            assemble_page_templates_level2(sub_page_data, next_level, new_hierarchy, component_cache, api_base_url, site_id, api_headers, parent_page_name, component_cache_for_mapping=component_cache, page_filter=page_filter)
+    jobs = build_assembly_dag(pages, folder_name=sanitize_page_name_for_filesystem)
+    max_workers = ASSEMBLY_MAX_WORKERS
+    if global_config and global_config.get("assembly_workers"):
+        try:
+            max_workers = max(1, int(global_config["assembly_workers"]))
+        except (TypeError, ValueError):
+            logging.warning(f"[SCHEDULER] Invalid assembly_workers '{global_config.get('assembly_workers')}'. Using {ASSEMBLY_MAX_WORKERS}.")
+    page_jobs = sum(1 for job in jobs.values() if job.kind == "page")
+    logging.info(f"[SCHEDULER] Assembly DAG: {page_jobs} page(s), {len(jobs) - page_jobs} shared component(s), {max_workers} worker(s).")
+    append_debug_log("assembly_schedule", {"pages": page_jobs, "shared_components": len(jobs) - page_jobs, "workers": max_workers})
+
+    def run_job(job) -> bool:
+        if job.kind == "component":
+            resolve_header_footer_alias(api_base_url, api_headers, job.page_name)
+            return True
+        parent_page_name = job.hierarchy[-1] if job.hierarchy else ""
+        if job.level == 1:
+            return _assemble_level1_page(job.page_data, page_filters, page_filter, component_cache, api_base_url, site_id, api_headers)
+        if job.level == 2:
+            return assemble_page_templates_level2(job.page_data, job.level, job.hierarchy, component_cache, api_base_url, site_id, api_headers, parent_page_name, component_cache_for_mapping=component_cache, page_filter=page_filter, recurse=False)
+        if job.level == 3:
+            return assemble_page_templates_level3(job.page_data, job.level, job.hierarchy, component_cache, api_base_url, site_id, api_headers, parent_page_name, component_cache_for_mapping=component_cache, page_filter=page_filter, recurse=False)
+        return assemble_page_templates_level4(job.page_data, job.level, job.hierarchy, component_cache, api_base_url, site_id, api_headers, component_cache_for_mapping=component_cache)
+
+    # Sub-pages are scheduled only after their parent page finishes; ready pages start in simplified.json order
+    result = run_assembly_dag(jobs, run_job, max_workers=max_workers, should_stop=_is_stop_requested)
+    logging.info(f"[SCHEDULER] Completed {len(result['completed'])} job(s), skipped {len(result['skipped'])}, pending {len(result['pending'])}.")
+
+    if result["stopped"]:
+        pending_pages = [jobs[k] for k in result["pending"] if jobs[k].kind == "page"]
+        stopped_at = pending_pages[0].page_name if pending_pages else None
+        logging.info(f"[STOP] Stop requested. Halting assembly at page '{stopped_at}'.")
+        append_debug_log("assembly_stopped", {"stopped_at": stopped_at, "level": pending_pages[0].level if pending_pages else None})
+        _set_assembly_running(False)
+        _set_assembly_was_stopped(True)
+        return
 
     _set_assembly_running(False)
     logging.info("[ASSEMBLY] Cleared ASSEMBLY_RUNNING flag.")
@@ -5163,7 +5159,11 @@ def update_menu_navigation(file_prefix: str, api_base_url: str, site_id: int, ap
         # 2.5. Call API to get all components and save the response
         try:
             logging.info("Calling API to fetch all components...")
-            all_components_response = GetAllVComponents(api_base_url, api_headers, page_size=1000)
+            all_components_response = load_component_catalogue(
+                lambda page_number, page_size, sort_key: GetVComponentPage(api_base_url, api_headers, page_number, page_size, sort_key),
+                site_id,
+                get_site_upload_folder(site_id),
+            )
             
             if all_components_response and isinstance(all_components_response, list):
                 # Save the full component list response to a JSON file for debugging
@@ -5301,9 +5301,7 @@ def update_menu_navigation(file_prefix: str, api_base_url: str, site_id: int, ap
                                                 with open(new_file_path, 'w', encoding="utf-8") as json_file:
                                                     json.dump(json_content, json_file, indent=4)
                                                 
-                                                # Add a micro-sleep to help OS release the file handle before deletion
-                                                time.sleep(0.05) 
-                                                
+                                                # Both 'with' blocks have closed their handles, so the file can be removed right away
                                                 os.remove(extracted_file_path)
                                                 converted_count += 1
                                                 logging.info(f"   [SUCCESS] Successfully converted: {extracted_file}")
@@ -5335,26 +5333,8 @@ def update_menu_navigation(file_prefix: str, api_base_url: str, site_id: int, ap
                                 config_file_path = os.path.join(save_folder, config_file_name)
                                 
                                 MAX_WAIT_SECONDS = 120 # 2 minutes max wait
-                                POLL_INTERVAL = 5      # Check every 5 seconds
-                                start_time = time.time()
-                                file_ready = False
-
-                                # print(f"Waiting up to {MAX_WAIT_SECONDS} seconds for {config_file_name} to be available...")
-
-                                while time.time() - start_time < MAX_WAIT_SECONDS:
-                                    if os.path.exists(config_file_path):
-                                        # Try to open the file to check if it's locked
-                                        try:
-                                            with open(config_file_path, 'r') as f:
-                                                f.read(1) # Read a byte to confirm accessibility
-                                            file_ready = True
-                                            break
-                                        except IOError:
-                                            print(f"File {config_file_name} exists but is locked. Retrying in {POLL_INTERVAL}s...")
-                                    else:
-                                        print(f"File {config_file_name} not found yet. Retrying in {POLL_INTERVAL}s...")
-                                    
-                                    time.sleep(POLL_INTERVAL)
+                                # Checked right away, then at growing intervals (instead of a flat 5s between checks)
+                                file_ready = poll_for_file(config_file_path, "ExportMiBlockComponent:config", timeout=MAX_WAIT_SECONDS)
 
                                 if not file_ready:
                                     raise FileNotFoundError(f"[TIMEOUT] Required configuration file {config_file_name} was not generated or released within {MAX_WAIT_SECONDS} seconds.")
@@ -7158,8 +7138,8 @@ def pre_download_all_components(
             except Exception as e:
                 logging.error(f"  [ERROR] Failed to unzip {component_id} for page '{page_name}': {e}")
     
-    # Give OS time to finish file operations
-    time.sleep(2)
+    # extractall() has returned for every archive, so the files are complete
+    record_skipped_sleep("ExportMiBlockComponent:unzip", 2)
     
     # Step 4: Convert all TXT files to JSON
     logging.info("\n========================================================")
@@ -7299,6 +7279,8 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
     _set_assembly_was_stopped(False)
     # Ensure publish queue is clean for this run so we don't re-publish pages from previous runs
     PAGES_TO_PUBLISH.clear()
+    reset_wait_report()
+    CMS_CLIENT.reset_metrics()
     # --- 1. Setup/File Extraction ---
     # (site_id will be set below; we'll load/merge pending file after we have it)
     data_to_process = processed_json
@@ -7353,6 +7335,13 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
             'ms_cms_clientapp': 'ProgrammingApp',
             'Authorization': f'Bearer {raw_token}', 
         }
+        # Regenerate the token on 401 instead of failing the rest of a long run
+        register_cms_token_refresh(api_base_url, settings.get("profile_alias"))
+        # Optional HTTP client overrides, e.g. "cms_client": {"timeout": 60, "max_retries": 6, "pool_maxsize": 8}
+        client_options = (load_global_config(site_id) or {}).get("cms_client")
+        if isinstance(client_options, dict):
+            CMS_CLIENT.configure(**{k: v for k, v in client_options.items()
+                                    if k in ("timeout", "max_retries", "retry_statuses", "pool_maxsize", "pool_connections")})
         
         logging.info(f"Configuration loaded. API Base URL: {api_base_url}, Destination ID: {site_id}")
 
@@ -7398,14 +7387,18 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
     try:
         logging.info("[TIMING] Starting GetAllVComponents...")
         cache_start_time = time.time()
-        vcomponent_cache = GetAllVComponents(api_base_url, api_headers, page_size=1000)
+        # Indexed catalogue; synced incrementally against the copy saved for this site
+        vcomponent_cache = load_component_catalogue(
+            lambda page_number, page_size, sort_key: GetVComponentPage(api_base_url, api_headers, page_number, page_size, sort_key),
+            site_id,
+            get_site_upload_folder(site_id),
+            max_age_hours=float((load_global_config(site_id) or {}).get("component_catalogue_max_age_hours", 24)),
+        )
         cache_time = time.time() - cache_start_time
         logging.info(f"[TIMING] GetAllVComponents completed in {cache_time:.2f} seconds")
         
         # Track timing
-        if "GetAllVComponents" not in TIMING_TRACKER:
-            TIMING_TRACKER["GetAllVComponents"] = []
-        TIMING_TRACKER["GetAllVComponents"].append(cache_time)
+        TIMING_TRACKER.setdefault("GetAllVComponents", []).append(cache_time)
     except Exception as e:
         logging.error(f"FATAL: Exception during V-Component list retrieval: {e}")
         logging.exception("Full exception traceback:")
@@ -7447,9 +7440,7 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
         logging.info(f"[TIMING] pre_download_all_components completed in {pre_download_time:.2f} seconds")
         
         # Track timing
-        if "pre_download_all_components" not in TIMING_TRACKER:
-            TIMING_TRACKER["pre_download_all_components"] = []
-        TIMING_TRACKER["pre_download_all_components"].append(pre_download_time)
+        TIMING_TRACKER.setdefault("pre_download_all_components", []).append(pre_download_time)
         
         successful_downloads = sum(1 for success in pre_download_results.values() if success)
         logging.info(f"Pre-download complete: {successful_downloads}/{len(pre_download_results)} components ready")
@@ -7466,9 +7457,9 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
     logging.info(f"[TIMING] assemble_page_templates_level1 completed in {assembly_time:.2f} seconds")
     
     # Track timing
-    if "assemble_page_templates_level1" not in TIMING_TRACKER:
-        TIMING_TRACKER["assemble_page_templates_level1"] = []
-    TIMING_TRACKER["assemble_page_templates_level1"].append(assembly_time)
+    TIMING_TRACKER.setdefault("assemble_page_templates_level1", []).append(assembly_time)
+    if hasattr(vcomponent_cache, "stats"):
+        logging.info(f"[CATALOGUE] Component lookups: {vcomponent_cache.stats()}")
     
     # Menu navigation is now a separate processing step before this one
 
@@ -7567,6 +7558,28 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
             logging.info(f"[SUCCESS] Timing summary saved to: {timing_file}")
         except Exception as e:
             logging.error(f"[ERROR] Failed to save timing summary: {e}")
+
+    # --- 7.1. Wait Report: fixed sleeps removed vs. time actually spent in backoff/polling ---
+    cms_wait_report = wait_report()
+    http_metrics = CMS_CLIENT.metrics()
+    if cms_wait_report["endpoints"]:
+        logging.info("WAIT REPORT - CMS backoff and readiness polling")
+        log_wait_report(cms_wait_report)
+        logging.info("HTTP CLIENT - requests and latency per endpoint")
+        CMS_CLIENT.log_metrics()
+        try:
+            site_folder = get_site_upload_folder(site_id)
+            wait_report_file = os.path.join(site_folder, f"{file_prefix}_wait_report.json")
+            with open(wait_report_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "file_prefix": file_prefix,
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "wait_report": cms_wait_report,
+                    "http_metrics": http_metrics
+                }, f, indent=4, ensure_ascii=False)
+            logging.info(f"[SUCCESS] Wait report saved to: {wait_report_file}")
+        except Exception as e:
+            logging.error(f"[ERROR] Failed to save wait report: {e}")
     
     # --- 7.5. CLEANUP: Move log files and remaining JSON files to site_id folder ---
     try:
@@ -7585,7 +7598,9 @@ def run_assembly_processing_step(processed_json: Union[Dict[str, Any], str], *ar
         "assembly_status": "SUCCESS: Pages and components processed.",
         "file_prefix": file_prefix, 
         "report_filename": status_filename, 
-        "timing_summary": timing_summary
+        "timing_summary": timing_summary,
+        "wait_report": cms_wait_report,
+        "http_metrics": http_metrics
     }
 
     ASSEMBLY_STATUS_LOG.clear()
@@ -7,7 +7,7 @@ import re
 from typing import Dict, Any, List, Tuple, Optional, Union, Set
 
 from apis import (
-    GetAllVComponents,
+    GetVComponentPage,
     export_mi_block_component,
     addUpdateRecordsToCMS,
     addUpdateRecordsToCMS_bulk,
@@ -27,6 +27,7 @@ from processing_steps.process_assembly import (
     sanitize_page_name_for_filesystem,
     generate_page_alias,
 )
+from component_catalogue import component_code, component_result, load_component_catalogue, resolve_component
 import zipfile
 
 
@@ -116,7 +117,7 @@ def check_component_availability_home(
     Homepage-local variant of check_component_availability.
     Strips bracket info (Block-X,Main-X,Sub-Y) from component name before searching.
 
-    Performs a prefix search up to the first hyphen and returns:
+    Performs a prefix search up to the first hyphen (index lookup on a ComponentCatalogue) and returns:
         (vComponentId, alias, componentId, cms_component_name, block_count, main_count, sub_count)
     """
     # Import here to avoid circular dependency
@@ -125,29 +126,17 @@ def check_component_availability_home(
     # Parse bracket info and get clean name
     clean_component_name, block_count, main_count, sub_count = parse_component_bracket_info(component_name)
     
-    hyphen_index = clean_component_name.find("-")
-    if hyphen_index != -1:
-        search_key = clean_component_name[: hyphen_index + 1].strip()
-    else:
-        search_key = clean_component_name.strip()
-
-    logging.info(f"[HOME] Searching cache for prefix: **{search_key}** (Original: {component_name}, Clean: {clean_component_name}, Block: {block_count}, Main: {main_count}, Sub: {sub_count})")
-
-    for component in component_cache:
-        cms_component_name = component.get("name", "")
-        if cms_component_name.startswith(search_key):
-            vComponentId = component.get("vComponentId")
-            component_alias = component.get("alias")
-            nested = component.get("component", {})
-            component_id = nested.get("componentId")
-
-            if vComponentId is not None and component_alias is not None and component_id is not None:
-                logging.info(
-                    f"[HOME] [SUCCESS] Component '{component_name}' found in cache as '{cms_component_name}'. Block: {block_count}, Main: {main_count}, Sub: {sub_count}"
-                )
-                return vComponentId, component_alias, component_id, cms_component_name, block_count, main_count, sub_count
+    search_key = component_code(clean_component_name)
 
-    logging.warning(f"[HOME] [ERROR] Component prefix '{search_key}' not found in the component cache.")
+    component = resolve_component(component_cache, search_key)
+    if component is not None:
+        vComponentId, component_alias, component_id, cms_component_name = component_result(component)
+        logging.debug(
+            f"[HOME] [SUCCESS] Component '{component_name}' found in cache as '{cms_component_name}' (prefix {search_key}). Block: {block_count}, Main: {main_count}, Sub: {sub_count}"
+        )
+        return vComponentId, component_alias, component_id, cms_component_name, block_count, main_count, sub_count
+
+    logging.warning(f"[HOME] [ERROR] Component prefix '{search_key}' not found in the component cache (Original: {component_name}).")
     return None
 
 
@@ -984,7 +973,11 @@ def run_homepage_processing_step(
 
         # Build component cache
         logging.info("[HOME] Loading V-Component cache for homepage...")
-        vcomponent_cache = GetAllVComponents(api_base_url, api_headers, page_size=1000)
+        vcomponent_cache = load_component_catalogue(
+            lambda page_number, page_size, sort_key: GetVComponentPage(api_base_url, api_headers, page_number, page_size, sort_key),
+            site_id,
+            get_site_upload_folder(site_id),
+        )
         if not isinstance(vcomponent_cache, list) or not vcomponent_cache:
             logging.warning("[HOME] V-Component cache is empty or invalid. Homepage assembly may fail.")
             append_home_debug_log("vcomponent_cache_warning", {"valid_list": isinstance(vcomponent_cache, list), "len": len(vcomponent_cache) if isinstance(vcomponent_cache, list) else None})
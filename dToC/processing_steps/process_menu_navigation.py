@@ -27,7 +27,8 @@ def _append_menu_debug(section: str, data: Dict[str, Any], site_id=None) -> None
         logging.warning(f"menu_debug log write failed: {e}")
 
 # Import required functions from other modules
-from apis import GetAllVComponents, export_mi_block_component
+from apis import GetVComponentPage, export_mi_block_component
+from component_catalogue import load_component_catalogue
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, '..', 'uploads')
@@ -565,7 +566,13 @@ def run_menu_navigation_step(
         logging.info(f"Extracted {len(pages_tree)} main pages")
         
         # 2. Fetch components and download menu component
-        all_components_response = GetAllVComponents(api_base_url, api_headers, page_size=1000)
+        site_folder = os.path.join(UPLOAD_FOLDER, str(site_id))
+        os.makedirs(site_folder, exist_ok=True)
+        all_components_response = load_component_catalogue(
+            lambda page_number, page_size, sort_key: GetVComponentPage(api_base_url, api_headers, page_number, page_size, sort_key),
+            site_id,
+            site_folder,
+        )
         
         if not all_components_response or not isinstance(all_components_response, list):
             _append_menu_debug("components_api_empty", {"has_response": bool(all_components_response), "is_list": isinstance(all_components_response, list)}, site_id)
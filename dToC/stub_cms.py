@@ -0,0 +1,236 @@
+"""
+Local stub CMS for exercising the backoff/polling call layer (cms_calls.py) without a real site.
+
+Serves the handful of endpoints the assembly step hammers hardest and simulates the two things
+the old fixed sleeps were guarding against:
+- throttling: every Nth write answers 429 (with Retry-After) and every Mth publish answers 503;
+- eventual consistency: a saved record (and the sub-record the CMS auto-generates for it) only
+  shows up in GetMiblockRecords after `visibility_delay` seconds;
+- token expiry: after `token_ttl_requests` authorised calls the bearer token is rejected with 401
+  until a new one is fetched from GenerateCMSToken.
+It also lists `vcomponent_count` V-components through GetSiteVComponents (paged, sorted by created or
+modified date) for the incremental V-component sync (vcomponent_sync.py).
+
+Run `python stub_cms.py` to drive the real apis.py wrappers against it and print the wait report
+and the HTTP client metrics.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class StubCMS:
+    """In-memory CMS state shared by the request handler threads."""
+
+    def __init__(self, visibility_delay: float = 0.3, throttle_every: int = 4, publish_unavailable_every: int = 3,
+                 retry_after: Optional[str] = None, token_ttl_requests: int = 12, vcomponent_count: int = 2500):
+        self.visibility_delay = visibility_delay
+        self.throttle_every = throttle_every
+        self.publish_unavailable_every = publish_unavailable_every
+        self.retry_after = retry_after
+        self.token_ttl_requests = token_ttl_requests
+        self._token = "stub-token-0"
+        self._tokens_issued = 0
+        self._token_uses = 0
+        self.connections = 0  # TCP connections accepted (keep-alive reuse keeps this low)
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self._writes = 0
+        self._publishes = 0
+        self.records: List[Dict[str, Any]] = []  # each with "visible_at"
+        self._clock = datetime(2024, 1, 1)
+        self.vcomponents: List[Dict[str, Any]] = []
+        for _ in range(vcomponent_count):
+            self.add_vcomponent()
+
+    def _tick(self) -> str:
+        self._clock += timedelta(minutes=1)
+        return self._clock.isoformat() + ".1234567"  # .NET-style 7-digit fraction
+
+    def add_vcomponent(self) -> Dict[str, Any]:
+        with self._lock:
+            vcomponent_id = len(self.vcomponents) + 1
+            now = self._tick()
+            component = {"vComponentId": vcomponent_id, "name": f"L{vcomponent_id}-Stub Component",
+                         "alias": f"stub_{vcomponent_id}", "component": {"componentId": 9000 + vcomponent_id},
+                         "createdDate": now, "modifiedDate": now}
+            self.vcomponents.append(component)
+            return component
+
+    def touch_vcomponent(self, vcomponent_id: int) -> None:
+        with self._lock:
+            component = self.vcomponents[vcomponent_id - 1]
+            component["modifiedDate"] = self._tick()
+
+    def list_vcomponents(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            date_field = "modifiedDate" if body.get("sortKey") == "tv.modifieddate" else "createdDate"
+            ordered = sorted(self.vcomponents, key=lambda c: c[date_field], reverse=True)
+            page_size = max(1, min(int(body.get("PageSize") or 50), 1000))
+            start = (int(body.get("PageNumber") or 1) - 1) * page_size
+            return {"vComponents": [dict(c) for c in ordered[start:start + page_size]], "TotalRecords": len(ordered)}
+
+    def new_token(self) -> str:
+        with self._lock:
+            self._tokens_issued += 1
+            self._token = f"stub-token-{self._tokens_issued}"
+            self._token_uses = 0
+            return self._token
+
+    def authorised(self, authorization: Optional[str]) -> bool:
+        with self._lock:
+            if authorization != f"Bearer {self._token}":
+                return False
+            self._token_uses += 1
+            if self.token_ttl_requests and self._token_uses > self.token_ttl_requests:
+                self._token = self._token + "-expired"
+                return False
+            return True
+
+    def save_record(self, body: Dict[str, Any]) -> Optional[int]:
+        """Stores a record (None when throttled); a parent record also gets one auto-generated sub-record."""
+        with self._lock:
+            self._writes += 1
+            if self.throttle_every and self._writes % self.throttle_every == 0:
+                return None
+            self._next_id += 1
+            record_id = self._next_id
+            visible_at = time.time() + self.visibility_delay
+            self.records.append({"Id": record_id, "MiblockId": body.get("componentId"), "visible_at": visible_at,
+                                 "ParentId": body.get("parentRecordId", 0), "RecordJsonString": body.get("recordDataJson", "{}")})
+            if not body.get("parentRecordId"):
+                self._next_id += 1
+                self.records.append({"Id": self._next_id, "MiblockId": body.get("componentId"), "visible_at": visible_at,
+                                     "ParentId": record_id, "RecordJsonString": "{}"})
+            return record_id
+
+    def visible_records(self, parent_record_id: int) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [{k: v for k, v in r.items() if k != "visible_at"} for r in self.records
+                    if r["ParentId"] == parent_record_id and r["visible_at"] <= now]
+
+    def publish_allowed(self) -> bool:
+        with self._lock:
+            self._publishes += 1
+            return not (self.publish_unavailable_every and self._publishes % self.publish_unavailable_every == 0)
+
+
+def _make_handler(cms: StubCMS):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse by the client is visible
+
+        def setup(self):
+            super().setup()
+            with cms._lock:
+                cms.connections += 1
+
+        def log_message(self, format, *args):  # keep the demo output readable
+            pass
+
+        def _send(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else {}
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not cms.authorised(self.headers.get("Authorization")):
+                self._send(401, {"error": "Unauthorized"})
+            elif url.path.endswith("/GetMiblockRecords"):
+                query = parse_qs(url.query)
+                parent_record_id = int(query.get("parentRecordId", ["0"])[0])
+                self._send(200, cms.visible_records(parent_record_id))
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self._body()
+            if url.path.endswith("/GenerateCMSToken"):
+                self._send(200, {"token": cms.new_token()})
+            elif not cms.authorised(self.headers.get("Authorization")):
+                self._send(401, {"error": "Unauthorized"})
+            elif url.path.endswith("/SaveMiblockRecord"):
+                record_id = cms.save_record(body)
+                if record_id is None:
+                    self._send(429, {"error": "Too Many Requests"}, {"Retry-After": cms.retry_after} if cms.retry_after else None)
+                else:
+                    self._send(200, {"result": record_id})
+            elif url.path.endswith("/GetSiteVComponents"):
+                self._send(200, cms.list_vcomponents(body))
+            elif url.path.endswith("/Publish_PSV2"):
+                if cms.publish_allowed():
+                    self._send(200, {"status": "ok"})
+                else:
+                    self._send(503, {"error": "Service Unavailable"})
+            else:
+                self._send(404, {"error": "not found"})
+
+    return Handler
+
+
+def start_stub_cms(port: int = 0, **options: Any):
+    """Starts the stub on a background thread; returns (server, base_url, cms). Call server.shutdown() when done."""
+    cms = StubCMS(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(cms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", cms
+
+
+if __name__ == "__main__":
+    import tempfile
+    from apis import GetVComponentPage, addUpdateRecordsToCMS, get_miblock_records, psPublishApi, register_cms_token_refresh
+    from cms_calls import log_wait_report, poll_until, reset_wait_report
+    from cms_client import CMS_CLIENT
+    from component_catalogue import load_component_catalogue
+
+    server, base_url, cms = start_stub_cms()
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer stub-token-0"}
+    register_cms_token_refresh(base_url, "stub-profile")
+    reset_wait_report()
+    CMS_CLIENT.reset_metrics()
+    started = time.time()
+    try:
+        for i in range(5):
+            ok, resp = addUpdateRecordsToCMS(base_url, headers, {"main_record_set": [
+                {"componentId": 501, "recordId": i, "parentRecordId": 0, "recordDataJson": "{}"}]})
+            if not ok:
+                logging.error(f"[STUB] Save failed: {resp}")
+                continue
+            parent_id = resp[i]
+            params = {"miblockId": 501, "parentRecordId": parent_id, "languageId": 0}
+            # Same readiness wait process_assembly uses for CMS-generated sub-records
+            poll_until(lambda: get_miblock_records(base_url, headers, params), "GetMiblockRecords", timeout=10, replaces_sleep=3)
+            psPublishApi(base_url, headers, 1, [{"PageId": parent_id}])
+
+        # V-component catalogue: full (parallel) sync, then an incremental one after two changes
+        fetch_page = lambda page_number, page_size, sort_key: GetVComponentPage(base_url, headers, page_number, page_size, sort_key)
+        with tempfile.TemporaryDirectory() as cache_folder:
+            first = load_component_catalogue(fetch_page, "stub", cache_folder)
+            cms.touch_vcomponent(7)
+            cms.add_vcomponent()
+            second = load_component_catalogue(fetch_page, "stub", cache_folder)
+            logging.info(f"[STUB] Catalogue: {len(first)} -> {len(second)} components; newest {second[0]['name']}; "
+                         f"component 7 modified {second.find_by_alias('stub_7')['modifiedDate']}")
+    finally:
+        server.shutdown()
+    logging.info(f"[STUB] Demo finished in {time.time() - started:.2f}s")
+    log_wait_report()
+    CMS_CLIENT.log_metrics()
+    logging.info(f"[STUB] TCP connections opened: {cms.connections}")
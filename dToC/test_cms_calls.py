@@ -0,0 +1,189 @@
+"""
+Test script for the CMS call layer (cms_calls.py) against the local stub CMS (stub_cms.py).
+Checks retry counts and backoff timing on 429/503, poll_until success and timeout, and the
+wait report totals. No real CMS site is needed.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from cms_calls import (
+    BACKOFF_BASE_SECONDS,
+    RETRY_STATUSES_NON_IDEMPOTENT,
+    backoff_delay,
+    cms_request,
+    poll_until,
+    record_skipped_sleep,
+    reset_wait_report,
+    wait_report,
+)
+from stub_cms import start_stub_cms
+
+HEADERS = {"Content-Type": "application/json", "Authorization": "Bearer stub-token-0"}
+
+
+def _stub(**options):
+    options.setdefault("token_ttl_requests", 0)  # 401 + token refresh is CMS_CLIENT's job, not cms_request's
+    options.setdefault("vcomponent_count", 0)
+    return start_stub_cms(**options)
+
+
+def _row(endpoint):
+    return next(r for r in wait_report()["endpoints"] if r["endpoint"] == endpoint)
+
+
+def _save(base_url, record_id=1, **kwargs):
+    body = {"componentId": 501, "recordId": record_id, "parentRecordId": 0, "recordDataJson": "{}"}
+    return cms_request("POST", f"{base_url}/api/MiblockApi/SaveMiblockRecord", headers=HEADERS, json=body, timeout=5, **kwargs)
+
+
+def test_backoff_delay_bounds():
+    """Full jitter stays within base * 2^attempt (capped); Retry-After is a floor"""
+    print("\n=== TEST 1: Backoff Delay Bounds ===")
+    random.seed(7)
+    for attempt in range(8):
+        for _ in range(200):
+            delay = backoff_delay(attempt, cap=4.0)
+            assert 0 <= delay <= min(4.0, BACKOFF_BASE_SECONDS * 2 ** attempt), (attempt, delay)
+    assert backoff_delay(0, retry_after="1.5") >= 1.5
+    assert backoff_delay(0, retry_after="90", cap=5.0) == 5.0
+    assert backoff_delay(0, retry_after="Wed, 21 Oct 2015 07:28:00 GMT") <= BACKOFF_BASE_SECONDS
+    print("[PASS] jittered delays within bounds, Retry-After honoured and capped")
+
+
+def test_retry_on_429_honours_retry_after():
+    """A throttled write is retried once after at least Retry-After seconds, then succeeds"""
+    print("\n=== TEST 2: Retry on 429 ===")
+    server, base_url, cms = _stub(throttle_every=2, retry_after="0.3")
+    reset_wait_report()
+    try:
+        assert _save(base_url, 1).status_code == 200
+        started = time.time()
+        response = _save(base_url, 2)
+        elapsed = time.time() - started
+    finally:
+        server.shutdown()
+    assert response.status_code == 200, response.status_code
+    row = _row("SaveMiblockRecord")
+    assert row["calls"] == 3 and row["retries"] == 1, row
+    assert 0.3 <= row["backoff_seconds"] <= elapsed, (row, elapsed)
+    assert len(cms.records) == 4  # two parents plus their auto-generated sub-records
+    print(f"[PASS] 1 retry, backoff {row['backoff_seconds']:.2f}s")
+
+
+def test_retry_gives_up_on_persistent_503():
+    """A publish that keeps answering 503 is sent max_retries + 1 times and the last response returned"""
+    print("\n=== TEST 3: Give Up After max_retries ===")
+    server, base_url, _ = _stub(publish_unavailable_every=1)
+    reset_wait_report()
+    try:
+        response = cms_request("POST", f"{base_url}/api/PageApi/Publish_PSV2", headers=HEADERS, json={}, timeout=5,
+                               retry_statuses=RETRY_STATUSES_NON_IDEMPOTENT, max_retries=2)
+    finally:
+        server.shutdown()
+    assert response.status_code == 503
+    row = _row("Publish_PSV2")
+    assert row["calls"] == 3 and row["retries"] == 2, row
+    assert row["backoff_seconds"] <= BACKOFF_BASE_SECONDS * (1 + 2), row
+    print(f"[PASS] 3 calls, 2 retries, backoff {row['backoff_seconds']:.2f}s")
+
+
+def test_no_retry_outside_retry_statuses():
+    """A status outside retry_statuses (404) is returned at once"""
+    print("\n=== TEST 4: No Retry for Other Statuses ===")
+    server, base_url, _ = _stub()
+    reset_wait_report()
+    try:
+        response = cms_request("POST", f"{base_url}/api/PageApi/Unknown", headers=HEADERS, json={}, timeout=5)
+    finally:
+        server.shutdown()
+    assert response.status_code == 404
+    row = _row("Unknown")
+    assert row["calls"] == 1 and row["retries"] == 0 and row["backoff_seconds"] == 0, row
+    print("[PASS] returned without retrying")
+
+
+def test_poll_until_ready():
+    """Records that become visible after the stub's delay are picked up shortly after, not after the old fixed sleep"""
+    print("\n=== TEST 5: poll_until Success ===")
+    server, base_url, _ = _stub(visibility_delay=0.3, throttle_every=0)
+    reset_wait_report()
+    try:
+        parent_id = _save(base_url).json()["result"]
+        url = f"{base_url}/api/MiblockApi/GetMiblockRecords"
+        check = lambda: requests.get(url, headers=HEADERS, params={"parentRecordId": parent_id}, timeout=5).json()
+        assert check() == []
+        started = time.time()
+        records = poll_until(check, "GetMiblockRecords", timeout=10, replaces_sleep=3)
+        elapsed = time.time() - started
+    finally:
+        server.shutdown()
+    assert len(records) == 1 and records[0]["ParentId"] == parent_id, records
+    assert elapsed < 1.5, elapsed
+    row = _row("GetMiblockRecords")
+    assert row["polls"] >= 2 and row["poll_timeouts"] == 0 and row["fixed_sleep_seconds"] == 3, row
+    assert row["saved_seconds"] > 1.5, row
+    print(f"[PASS] ready after {elapsed:.2f}s in {row['polls']} polls")
+
+
+def test_poll_until_timeout():
+    """A condition that never holds in time returns falsy after about `timeout` seconds"""
+    print("\n=== TEST 6: poll_until Timeout ===")
+    checks = []
+    started = time.time()
+    value = poll_until(lambda: checks.append(time.time()) and False, "NeverReady", timeout=0.5,
+                       initial_interval=0.05, max_interval=0.2)
+    elapsed = time.time() - started
+    assert not value
+    assert 0.5 <= elapsed < 0.8, elapsed
+    gaps = [b - a for a, b in zip(checks, checks[1:])]
+    assert gaps[1] > gaps[0], gaps  # intervals grow
+    row = _row("NeverReady")
+    assert row["poll_timeouts"] == 1 and row["polls"] == len(checks), row
+    print(f"[PASS] timed out after {elapsed:.2f}s with {len(checks)} checks")
+
+
+def test_wait_report_totals():
+    """Totals are the sum of the endpoint rows; saved = fixed sleeps removed - time actually waited"""
+    print("\n=== TEST 7: Wait Report Totals ===")
+    reset_wait_report()
+    record_skipped_sleep("GetTemplatePageByName", 2.0)
+    record_skipped_sleep("GetTemplatePageByName", 2.0)
+    poll_until(lambda: True, "GetMiblockRecords", timeout=5, replaces_sleep=3)
+    server, base_url, _ = _stub(throttle_every=2, retry_after="0.1")
+    try:
+        _save(base_url, 1, replaces_sleep=1)
+        _save(base_url, 2, replaces_sleep=1)
+    finally:
+        server.shutdown()
+    report = wait_report()
+    rows = {r["endpoint"]: r for r in report["endpoints"]}
+    assert rows["GetTemplatePageByName"]["fixed_sleep_seconds"] == 4.0
+    assert rows["GetTemplatePageByName"]["calls"] == 0
+    assert rows["SaveMiblockRecord"]["calls"] == 3 and rows["SaveMiblockRecord"]["retries"] == 1
+    for row in report["endpoints"]:
+        assert abs(row["saved_seconds"] - (row["fixed_sleep_seconds"] - row["waited_seconds"])) < 0.002, row
+    totals = report["totals"]
+    for key in ("calls", "retries", "polls", "fixed_sleep_seconds", "waited_seconds", "saved_seconds"):
+        assert abs(totals[key] - sum(r[key] for r in report["endpoints"])) < 0.005, key
+    assert totals["fixed_sleep_seconds"] == 9.0
+    saved = [r["saved_seconds"] for r in report["endpoints"]]
+    assert saved == sorted(saved, reverse=True)
+    reset_wait_report()
+    assert wait_report() == {"endpoints": [], "totals": dict.fromkeys(totals, 0)}
+    print(f"[PASS] totals: fixed {totals['fixed_sleep_seconds']}s, saved {totals['saved_seconds']}s")
+
+
+if __name__ == "__main__":
+    test_backoff_delay_bounds()
+    test_retry_on_429_honours_retry_after()
+    test_retry_gives_up_on_persistent_503()
+    test_no_retry_outside_retry_statuses()
+    test_poll_until_ready()
+    test_poll_until_timeout()
+    test_wait_report_totals()
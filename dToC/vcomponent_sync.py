@@ -0,0 +1,292 @@
+"""
+Incremental, parallel sync of a site's V-component list (GetSiteVComponents).
+
+GetAllVComponents used to walk the pages one at a time with a fixed 2s sleep around every call,
+and every run refetched the whole catalogue. The dToC assembly pipeline and the CMS-AI-agent
+downloader now both go through this module:
+- fetch_all_pages() reads page 1, takes TotalRecords from it and fetches the remaining pages
+  concurrently (results are put back in API order);
+- sync_vcomponents() keeps the list in a local JSON store with a watermark: the newest
+  last-modified date seen. Later runs read the list newest-change-first in small pages, stop at
+  the first component older than the watermark and merge the changes by vComponentId.
+  It falls back to a full fetch when the merged count differs from TotalRecords (deletions), when
+  a page is visibly out of date order, when the components carry no date field, or once the last
+  full fetch is older than full_refresh_hours. A CMS that silently ignores the modified-date sort
+  key still yields new components; edits to older ones then wait for that full refresh.
+
+API details stay in apis.py: callers pass fetch_page(page_number, page_size, sort_key), which
+returns (components, total_records) and raises on failure (apis.GetVComponentPage).
+
+CMS-AI-agent imports this module from here (CMS-AI-agent/shared_modules.py); there is no copy.
+"""
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+STORE_FORMAT = 1  # bump when the on-disk layout changes
+CREATED_SORT_KEY = "tv.createddate"
+MODIFIED_SORT_KEY = "tv.modifieddate"
+# Field names differ between CMS versions; the first one present on a component is used
+MODIFIED_DATE_FIELDS = ("modifiedDate", "ModifiedDate", "modifiedOn", "ModifiedOn",
+                        "updatedDate", "UpdatedDate", "lastModifiedDate", "LastModifiedDate")
+CREATED_DATE_FIELDS = ("createdDate", "CreatedDate", "createdOn", "CreatedOn")
+# Watermark candidates, best first: with only a created date, edits are picked up by the full refresh
+CHANGE_ORDERS = ((MODIFIED_SORT_KEY, MODIFIED_DATE_FIELDS), (CREATED_SORT_KEY, CREATED_DATE_FIELDS))
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_CHANGE_PAGE_SIZE = 100
+DEFAULT_MAX_WORKERS = 4           # concurrent page requests; stays below the CMS client's per-host pool
+DEFAULT_FULL_REFRESH_HOURS = 24   # 0 = only refetch everything when the incremental check fails
+
+FetchPage = Callable[[int, int, str], Tuple[List[Dict[str, Any]], int]]
+
+_MS_DATE = re.compile(r"/Date\((-?\d+)")
+_LONG_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+def component_timestamp(component: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[float]:
+    """
+    Epoch seconds of the first date field present on the component, or None.
+
+    Accepts ISO 8601 strings (with or without offset; .NET's 7 fractional digits are trimmed),
+    '/Date(ms)/' strings and epoch numbers (seconds or milliseconds). Naive dates are read as UTC,
+    which is only ever compared with other dates from the same CMS.
+    """
+    for field in fields:
+        value = component.get(field)
+        if value is None or value == "":
+            continue
+        if isinstance(value, (int, float)):
+            return float(value) / 1000.0 if value > 1e11 else float(value)
+        text = str(value).strip()
+        match = _MS_DATE.match(text)
+        if match:
+            return int(match.group(1)) / 1000.0
+        try:
+            parsed = datetime.fromisoformat(_LONG_FRACTION.sub(r"\1", text.replace("Z", "+00:00")))
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def change_order(components: List[Dict[str, Any]]) -> Optional[str]:
+    """Sort key the watermark can be kept on for these components (modified date, else created date)."""
+    for sort_key, fields in CHANGE_ORDERS:
+        if components and all(component_timestamp(c, fields) is not None for c in components):
+            return sort_key
+    return None
+
+
+def catalogue_watermark(components: List[Dict[str, Any]], sort_key: Optional[str]) -> Optional[float]:
+    """Newest date (for sort_key's date fields) among the components, or None."""
+    if not sort_key or not components:
+        return None
+    fields = dict(CHANGE_ORDERS)[sort_key]
+    return max(component_timestamp(c, fields) or 0.0 for c in components)
+
+
+def _dedupe(components: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # A component created while the pages are read shifts the list by one, so a page can repeat the
+    # previous page's last item
+    seen = set()
+    unique = []
+    for component in components:
+        component_id = component.get("vComponentId")
+        if component_id is not None and component_id in seen:
+            continue
+        seen.add(component_id)
+        unique.append(component)
+    return unique
+
+
+def fetch_all_pages(fetch_page: FetchPage, page_size: int = DEFAULT_PAGE_SIZE,
+                    max_workers: int = DEFAULT_MAX_WORKERS, sort_key: str = CREATED_SORT_KEY) -> List[Dict[str, Any]]:
+    """
+    Fetches the whole list: page 1 first (for TotalRecords), then the other pages concurrently.
+
+    Raises whatever fetch_page raises; the first failing page (in page order) wins.
+    """
+    first_page, total_records = fetch_page(1, page_size, sort_key)
+    components = list(first_page)
+    if not first_page or len(first_page) >= total_records:
+        return components
+    # The CMS may cap the page size; page numbers follow the size it actually used
+    effective_size = len(first_page)
+    page_count = -(-total_records // effective_size)
+    page_numbers = range(2, page_count + 1)
+    workers = max(1, min(int(max_workers or 1), len(page_numbers)))
+    logging.info(f"[VCOMPONENTS] {total_records} V-Components in {page_count} pages; fetching pages 2-{page_count} with {workers} workers.")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vcomponents") as pool:
+        for page, _ in pool.map(lambda page_number: fetch_page(page_number, effective_size, sort_key), page_numbers):
+            components.extend(page)
+    components = _dedupe(components)
+    if len(components) != total_records:
+        logging.warning(f"[VCOMPONENTS] Fetched {len(components)} V-Components, CMS reports {total_records} "
+                        f"(catalogue changed while reading).")
+    return components
+
+
+def fetch_changes_since(fetch_page: FetchPage, watermark: float, sort_key: str,
+                        page_size: int = DEFAULT_CHANGE_PAGE_SIZE) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """
+    Components dated at or after the watermark, read newest first until an older one shows up.
+
+    Returns:
+        (changed components, TotalRecords), or None when the list cannot be trusted for an
+        incremental read (a component without the date field, or dates not in descending order).
+    """
+    fields = dict(CHANGE_ORDERS)[sort_key]
+    changed: List[Dict[str, Any]] = []
+    previous: Optional[float] = None
+    page_number = 1
+    while True:
+        page, total_records = fetch_page(page_number, page_size, sort_key)
+        for component in page:
+            stamp = component_timestamp(component, fields)
+            if stamp is None:
+                logging.info(f"[VCOMPONENTS] Component {component.get('vComponentId')} has no {fields[0]}; full fetch needed.")
+                return None
+            if previous is not None and stamp > previous:
+                logging.info(f"[VCOMPONENTS] CMS did not return the list sorted by {sort_key}; full fetch needed.")
+                return None
+            previous = stamp
+            if stamp < watermark:
+                return changed, total_records
+            changed.append(component)
+        if len(page) < page_size or page_number * page_size >= total_records:
+            return changed, total_records
+        page_number += 1
+
+
+def merge_changes(components: List[Dict[str, Any]], changed: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Applies changed components to the stored list, keeping the API order (newest created first).
+
+    Known components are replaced in place; new ones go to the front, newest created first.
+
+    Returns:
+        (merged list, number added, number updated)
+    """
+    changed_by_id = {c.get("vComponentId"): c for c in changed}
+    merged = []
+    known = set()
+    updated = 0
+    for component in components:
+        component_id = component.get("vComponentId")
+        known.add(component_id)
+        replacement = changed_by_id.get(component_id, component)
+        updated += replacement != component  # the component dated exactly at the watermark comes back unchanged
+        merged.append(replacement)
+    added = [c for c in changed_by_id.values() if c.get("vComponentId") not in known]
+    created = [component_timestamp(c, CREATED_DATE_FIELDS) for c in added]
+    if all(stamp is not None for stamp in created):
+        added = [c for _, c in sorted(zip(created, added), key=lambda pair: pair[0], reverse=True)]
+    return added + merged, len(added), updated
+
+
+def load_store(path: str, source: str) -> Optional[Dict[str, Any]]:
+    """Returns the saved store if it is readable, in the current format and for the same source."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            store = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"[VCOMPONENTS] Ignoring unreadable V-Component store {path}: {e}")
+        return None
+    if not isinstance(store, dict) or store.get("format") != STORE_FORMAT or str(store.get("source")) != str(source):
+        return None
+    if not isinstance(store.get("components"), list):
+        return None
+    return store
+
+
+def save_store(path: str, store: Dict[str, Any]) -> None:
+    """Writes the store atomically (temp file + replace) so a crash cannot leave a torn file."""
+    tmp_path = f"{path}.tmp"
+    try:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(store, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        logging.warning(f"[VCOMPONENTS] Could not save V-Component store to {path}: {e}")
+
+
+def sync_vcomponents(
+    fetch_page: FetchPage,
+    store_path: str,
+    source: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    change_page_size: int = DEFAULT_CHANGE_PAGE_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    full_refresh_hours: float = DEFAULT_FULL_REFRESH_HOURS,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Returns the site's V-Components, pulling only what changed since the stored watermark.
+
+    Args:
+        fetch_page: fetch_page(page_number, page_size, sort_key) -> (components, TotalRecords).
+        store_path: JSON file holding the components and watermark between runs.
+        source: Site the store belongs to (site id or URL); a store for another source is ignored.
+        page_size: Page size for a full fetch.
+        change_page_size: Page size for the incremental read (usually only its first page is needed).
+        max_workers: Concurrent page requests during a full fetch.
+        full_refresh_hours: Refetch everything when the last full fetch is older than this (0 = never).
+
+    Returns:
+        list: The V-Components in API order (newest created first).
+        dict: An error dictionary if the CMS could not be read.
+    """
+    started = time.time()
+    store = load_store(store_path, source)
+    try:
+        components = None
+        mode = "full"
+        added = updated = 0
+        if store and store.get("watermark") is not None and store.get("sort_key"):
+            age_hours = (started - store.get("full_synced_at", 0)) / 3600.0
+            if full_refresh_hours and age_hours > full_refresh_hours:
+                logging.info(f"[VCOMPONENTS] Last full fetch {age_hours:.1f}h ago (max {full_refresh_hours}h); refetching everything.")
+            else:
+                changes = fetch_changes_since(fetch_page, store["watermark"], store["sort_key"], change_page_size)
+                if changes is not None:
+                    changed, total_records = changes
+                    merged, added, updated = merge_changes(store["components"], changed)
+                    if len(merged) == total_records:
+                        components, mode = merged, "incremental"
+                    else:
+                        logging.info(f"[VCOMPONENTS] Stored {len(merged)} V-Components after merge, CMS reports "
+                                     f"{total_records} (components deleted); refetching everything.")
+        if components is None:
+            components = fetch_all_pages(fetch_page, page_size, max_workers)
+            added = updated = 0
+            full_synced_at = started
+        else:
+            full_synced_at = store.get("full_synced_at", started)
+    except (OSError, ValueError, KeyError, TypeError) as e:  # requests' exceptions are OSErrors
+        logging.error(f"[VCOMPONENTS] V-Component sync for {source} failed: {e}")
+        return {"error": "V-Component Sync Error", "details": str(e)}
+
+    sort_key = change_order(components)
+    if sort_key is None and components:
+        logging.info("[VCOMPONENTS] V-Components carry no created/modified date; every sync will be a full fetch.")
+    watermark = catalogue_watermark(components, sort_key)
+    save_store(store_path, {"format": STORE_FORMAT, "source": source, "sort_key": sort_key, "watermark": watermark,
+                            "synced_at": time.time(), "full_synced_at": full_synced_at, "components": components})
+    if mode == "incremental":
+        logging.info(f"[VCOMPONENTS] Incremental sync for {source}: {added} added, {updated} updated, "
+                     f"{len(components)} total in {time.time() - started:.2f}s.")
+    else:
+        logging.info(f"[VCOMPONENTS] Full sync for {source}: {len(components)} V-Components in {time.time() - started:.2f}s.")
+    return components